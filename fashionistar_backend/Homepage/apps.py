@@ -4,3 +4,7 @@
 class HomepageConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Homepage'
+
+    def ready(self):
+        super().ready()
+        import Homepage.signals  # Bumps the catalog versions on brand, category, collection and product writes
@@ -2,9 +2,11 @@
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAdminUser, AllowAny
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from admin_backend.models import Brand
 from admin_backend.serializers import BrandSerializer
+from Homepage.catalog import BRANDS, catalog_response
 
 
 
@@ -12,29 +14,33 @@
 
 class BrandListView(APIView):
     """
-    View to retrieve all brands.
+    View to retrieve all brands, served from the versioned catalog cache with an ETag.
     """
     permission_classes = (AllowAny,)
 
     def get(self, request):
         try:
-            brands = Brand.objects.all()
-            serializer = BrandSerializer(brands, many=True)
-            return Response({"message": "Brands retrieved successfully.", "data": serializer.data}, status=status.HTTP_200_OK)
+            return catalog_response(request, BRANDS, lambda: {
+                "message": "Brands retrieved successfully.",
+                "data": BrandSerializer(Brand.objects.all(), many=True).data,
+            })
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class BrandDetailView(APIView):
     """
-    View to retrieve a specific brand by its slug.
+    View to retrieve a specific brand by its slug, served from the versioned catalog cache with an ETag.
     """
     permission_classes = (AllowAny,)
 
     def get(self, request, slug):
         try:
-            brand = get_object_or_404(Brand, slug=slug)
-            serializer = BrandSerializer(brand)
-            return Response({"message": "Brand retrieved successfully.", "data": serializer.data}, status=status.HTTP_200_OK)
+            return catalog_response(request, BRANDS, lambda: {
+                "message": "Brand retrieved successfully.",
+                "data": BrandSerializer(get_object_or_404(Brand, slug=slug)).data,
+            }, slug)
+        except Http404:
+            return Response({"error": "Brand not found."}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
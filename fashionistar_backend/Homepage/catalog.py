@@ -0,0 +1,145 @@
+'''
+Catalog read layer for the public Homepage endpoints (brands, categories, collections, products).
+
+Every resource has a version counter in the cache, bumped by the model signals in
+Homepage/signals.py whenever a row that appears in its payload is written. Serialized responses
+are cached under the resource version and a hash of the request variant (query string, slug,
+host), so a write makes every cached page of that resource unreachable at once without having
+to know which keys exist. Old entries simply expire (``CATALOG_CACHE_TTL``).
+
+The version is also the ETag: a client revalidating with ``If-None-Match`` gets a 304 after one
+cache read, before any query or serialization.
+
+Product counters that change on every sale or page view (``order_count``, ``views``, ``saved``)
+do not bump the version; they can lag by up to ``CATALOG_CACHE_TTL`` seconds.
+'''
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, FloatField, IntegerField, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.cache import get_conditional_response
+from rest_framework.response import Response
+
+from store.models import CartOrderItem, Gallery, Product, Review
+
+BRANDS = 'brands'
+CATEGORIES = 'categories'
+COLLECTIONS = 'collections'
+PRODUCTS = 'products'
+
+
+def catalog_version_cache_key(resource):
+    return f"catalog_version:{resource}"
+
+
+def catalog_version(resource):
+    '''
+    Current version of a resource. A missing counter (first use, or evicted) starts from the
+    clock, so it never goes back to a number that older cached payloads were stored under.
+    '''
+    key = catalog_version_cache_key(resource)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_catalog_version(*resources):
+    '''
+    Invalidates every cached payload of the given resources.
+    '''
+    for resource in resources:
+        key = catalog_version_cache_key(resource)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns() // 1000, timeout=None)
+
+
+def catalog_variant(request, *parts):
+    '''
+    Identifies the request variant of a payload: the extra ``parts`` (e.g. a slug), the host
+    (payloads hold absolute URLs) and the query string, independent of parameter order.
+    '''
+    query = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    raw = json.dumps([parts, request.get_host(), request.is_secure(), query], default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def catalog_response(request, resource, build, *parts):
+    '''
+    Serves a catalog payload from the versioned cache, with an ETag and conditional GET.
+
+    Args:
+        request: The DRF request.
+        resource (str): BRANDS, CATEGORIES, COLLECTIONS or PRODUCTS.
+        build (callable): Returns the payload (JSON-serializable data) on a cache miss. It may
+            raise (e.g. Http404); nothing is cached then.
+        *parts: Extra values that identify the variant (e.g. the slug of a detail view).
+
+    Returns:
+        Response: 200 with the payload, or 304 when the client's ETag is current.
+    '''
+    version = catalog_version(resource)
+    variant = catalog_variant(request, *parts)
+    etag = f'W/"{resource}-{version}-{variant[:16]}"'
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified['ETag'] = etag
+        return not_modified
+
+    key = f"catalog:{resource}:{version}:{variant}"
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, timeout=getattr(settings, 'CATALOG_CACHE_TTL', 300))
+
+    response = Response(payload)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+def catalog_products():
+    '''
+    Published products with everything a product card renders loaded in a fixed number of
+    queries: the vendor is joined, the categories, gallery, specifications, sizes and colors are
+    prefetched, and the ratings and paid order count are annotated as subqueries (separate
+    subqueries, so the review and order joins cannot multiply each other's rows).
+    '''
+    reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+    paid_items = CartOrderItem.objects.filter(
+        product=OuterRef('pk'), order__payment_status='paid'
+    ).order_by().values('product')
+
+    return (
+        Product.objects.filter(status='published')
+        .select_related('vendor')
+        .prefetch_related(
+            'category',
+            Prefetch('product_gallery', queryset=Gallery.objects.all()),
+            'product_specification',
+            'product_size',
+            'product_color',
+        )
+        .annotate(
+            average_rating=Coalesce(
+                Subquery(reviews.annotate(value=Avg('rating')).values('value'), output_field=FloatField()),
+                Value(0.0),
+            ),
+            review_count=Coalesce(
+                Subquery(reviews.annotate(value=Count('id')).values('value'), output_field=IntegerField()),
+                Value(0),
+            ),
+            paid_order_count=Coalesce(
+                Subquery(paid_items.annotate(value=Count('id')).values('value'), output_field=IntegerField()),
+                Value(0),
+            ),
+        )
+    )
@@ -2,36 +2,42 @@
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAdminUser, AllowAny
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from admin_backend.models import Category
 from admin_backend.serializers import CategorySerializer
+from Homepage.catalog import CATEGORIES, catalog_response
 
 # Similarly, create views for Category and Brand models
 class CategoryListView(APIView):
     """
-    View to retrieve all categories.
+    View to retrieve all categories, served from the versioned catalog cache with an ETag.
     """
     permission_classes = (AllowAny,)
 
     def get(self, request):
         try:
-            categories = Category.objects.all()
-            serializer = CategorySerializer(categories, many=True)
-            return Response({"message": "Categories retrieved successfully.", "data": serializer.data}, status=status.HTTP_200_OK)
+            return catalog_response(request, CATEGORIES, lambda: {
+                "message": "Categories retrieved successfully.",
+                "data": CategorySerializer(Category.objects.all(), many=True).data,
+            })
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class CategoryDetailView(APIView):
     """
-    View to retrieve a specific category by its slug.
+    View to retrieve a specific category by its slug, served from the versioned catalog cache with an ETag.
     """
     permission_classes = (AllowAny,)
 
     def get(self, request, slug):
         try:
-            category = get_object_or_404(Category, slug=slug)
-            serializer = CategorySerializer(category)
-            return Response({"message": "Category retrieved successfully.", "data": serializer.data}, status=status.HTTP_200_OK)
+            return catalog_response(request, CATEGORIES, lambda: {
+                "message": "Category retrieved successfully.",
+                "data": CategorySerializer(get_object_or_404(Category, slug=slug)).data,
+            }, slug)
+        except Http404:
+            return Response({"error": "Category not found."}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
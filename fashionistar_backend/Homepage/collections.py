@@ -2,35 +2,41 @@
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAdminUser, AllowAny
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from admin_backend.models import Collections
 from admin_backend.serializers import CollectionsSerializer
+from Homepage.catalog import COLLECTIONS, catalog_response
 
 class CollectionsListView(APIView):
     """
-    View to retrieve all collections.
+    View to retrieve all collections, served from the versioned catalog cache with an ETag.
     """
     permission_classes = (AllowAny,)
 
     def get(self, request):
         try:
-            collections = Collections.objects.all()
-            serializer = CollectionsSerializer(collections, many=True)
-            return Response({"message": "Collections retrieved successfully.", "data": serializer.data}, status=status.HTTP_200_OK)
+            return catalog_response(request, COLLECTIONS, lambda: {
+                "message": "Collections retrieved successfully.",
+                "data": CollectionsSerializer(Collections.objects.all(), many=True).data,
+            })
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class CollectionsDetailView(APIView):
     """
-    View to retrieve a specific collection by its slug.
+    View to retrieve a specific collection by its slug, served from the versioned catalog cache with an ETag.
     """
     permission_classes = (AllowAny,)
 
     def get(self, request, slug):
         try:
-            collection = get_object_or_404(Collections, slug=slug)
-            serializer = CollectionsSerializer(collection)
-            return Response({"message": "Collection retrieved successfully.", "data": serializer.data}, status=status.HTTP_200_OK)
+            return catalog_response(request, COLLECTIONS, lambda: {
+                "message": "Collection retrieved successfully.",
+                "data": CollectionsSerializer(get_object_or_404(Collections, slug=slug)).data,
+            }, slug)
+        except Http404:
+            return Response({"error": "Collection not found."}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
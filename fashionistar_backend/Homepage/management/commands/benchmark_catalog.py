@@ -0,0 +1,167 @@
+import json
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from admin_backend.models import Category
+from Homepage.catalog import PRODUCTS, bump_catalog_version
+from Homepage.product import ProductListView
+from Homepage.serializers import (
+    HomeColorSerializer, HomeGallerySerializer, HomeSizeSerializer, HomeSpecificationSerializer,
+    ProductListDetailSerializer,
+)
+from store.models import Gallery, Product, Review
+from vendor.models import Vendor
+
+User = get_user_model()
+
+
+class LegacyProductSerializer(ProductListDetailSerializer):
+    """The previous product card: nested lists and counters resolved per product by model methods."""
+    gallery = HomeGallerySerializer(many=True, read_only=True)
+    specification = HomeSpecificationSerializer(many=True, read_only=True)
+    size = HomeSizeSerializer(many=True, read_only=True)
+    color = HomeColorSerializer(many=True, read_only=True)
+    product_rating = serializers.ReadOnlyField()
+    rating_count = serializers.ReadOnlyField()
+    order_count = serializers.ReadOnlyField()
+    average_rating = serializers.FloatField(source='product_rating', read_only=True)
+
+
+class LegacyProductListView(ProductListView):
+    """The previous listing: every published product serialized in one unpaginated response."""
+    serializer_class = LegacyProductSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        return Product.objects.filter(status="published")
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.filter_queryset(self.get_queryset()), many=True)
+        return Response(serializer.data)
+
+
+class Command(BaseCommand):
+    """
+    Measures the public product listing (/api/home/products/) over a large catalog.
+
+    Creates ``--products`` published products (one vendor, a handful of categories, one gallery
+    image each and reviews on every fifth product) with bulk inserts, then times each scenario
+    ``--repeat`` times (median, including JSON rendering) and counts its queries:
+
+    *   legacy: the previous view, every published product unpaginated, queries per product.
+    *   cold_page: first page after a version bump (prefetches and annotations).
+    *   cold_deep_page: the last page of the catalog after a version bump.
+    *   warm_page: the same page from the versioned cache.
+    *   not_modified: a revalidation with the page's ETag (HTTP 304).
+
+    The legacy scenario runs once and can take minutes at 50k products; skip it with
+    ``--skip-legacy``. The benchmark products are deleted at the end.
+
+    Usage:
+        python manage.py benchmark_catalog
+        python manage.py benchmark_catalog --products 50000 --repeat 5 --skip-legacy --json
+    """
+    help = "Benchmarks the product listing before and after versioned catalog caching and pagination"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=50000, help="Published products to create")
+        parser.add_argument('--repeat', type=int, default=5, help="Runs per scenario (median is reported)")
+        parser.add_argument('--skip-legacy', action='store_true', help="Do not run the unpaginated legacy listing")
+        parser.add_argument('--json', action='store_true', help="Output the report as JSON")
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:6]
+        count = options['products']
+        vendor_user = User.objects.create_user(email=f"bench-catalog-{run_id}@example.com", password=uuid.uuid4().hex)
+        vendor = Vendor.objects.create(user=vendor_user, name=f"Bench Vendor {run_id}")
+        categories = [Category.objects.create(name=f"bench-{run_id}-{index}", slug=f"bench-{run_id}-{index}") for index in range(5)]
+        self.factory = APIRequestFactory()
+
+        try:
+            started = time.perf_counter()
+            self._create_catalog(run_id, count, vendor, categories, vendor_user)
+            seed_seconds = round(time.perf_counter() - started, 1)
+
+            last_page = max((count + 9) // 10, 1)
+            report = {
+                'products': count,
+                'seed_seconds': seed_seconds,
+                'cold_page': self._measure(options['repeat'], {}, clear_cache=True),
+                'cold_deep_page': self._measure(options['repeat'], {'page': last_page}, clear_cache=True),
+                'warm_page': self._measure(options['repeat'], {}),
+            }
+            etag = self._get(ProductListView, {})['ETag']
+            report['not_modified'] = self._measure(options['repeat'], {}, etag=etag)
+            if not options['skip_legacy']:
+                report['legacy'] = self._measure(1, {}, view=LegacyProductListView)
+        finally:
+            Product.objects.filter(vendor=vendor).delete()
+            Category.objects.filter(pk__in=[category.pk for category in categories]).delete()
+            vendor.delete()
+            vendor_user.delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"products={count} seeded in {seed_seconds}s")
+        for name in ('legacy', 'cold_page', 'cold_deep_page', 'warm_page', 'not_modified'):
+            if name in report:
+                scenario = report[name]
+                self.stdout.write(
+                    f"{name:<15} {scenario['ms']:>10}ms  {scenario['queries']:>7} queries  "
+                    f"{scenario['kb']:>9}KB  HTTP {scenario['status']}"
+                )
+
+    def _create_catalog(self, run_id, count, vendor, categories, reviewer):
+        batch_size = 2000
+        for offset in range(0, count, batch_size):
+            products = Product.objects.bulk_create([
+                Product(
+                    pid=f"b{run_id}{index:08d}", sku=f"BENCH{run_id}{index}", slug=f"bench-{run_id}-{index}",
+                    vendor=vendor, title=f"Bench dress {index}", description="Bench product",
+                    price=Decimal('100.00'), total_price=Decimal('1100.00'), status="published",
+                )
+                for index in range(offset, min(offset + batch_size, count))
+            ])
+            Product.category.through.objects.bulk_create([
+                Product.category.through(product_id=product.pk, category_id=categories[product.pk % len(categories)].pk)
+                for product in products
+            ])
+            Gallery.objects.bulk_create([Gallery(product=product) for product in products])
+            Review.objects.bulk_create([
+                Review(product=product, user=reviewer, rating=product.pk % 5 + 1) for product in products[::5]
+            ])
+
+    def _get(self, view, params, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        response = view.as_view()(self.factory.get('/api/home/products/', params, **headers))
+        if hasattr(response, 'render'):  # a 304 is a plain HttpResponse
+            response.render()
+        return response
+
+    def _measure(self, repeat, params, view=ProductListView, etag=None, clear_cache=False):
+        timings = []
+        for _ in range(repeat):
+            if clear_cache:
+                bump_catalog_version(PRODUCTS)
+            queries = []
+            with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+                started = time.perf_counter()
+                response = self._get(view, params, etag)
+                timings.append((time.perf_counter() - started) * 1000)
+        return {
+            'ms': round(statistics.median(timings), 2),
+            'queries': len(queries),
+            'kb': round(len(response.content) / 1024, 1),
+            'status': response.status_code,
+        }
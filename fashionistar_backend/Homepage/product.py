@@ -4,12 +4,16 @@
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.exceptions import APIException, NotFound, PermissionDenied
+from django.http import Http404
 import logging
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 
 from store.models import Product
+from store.search import ProductSearchFilter, product_facets
+from Homepage.catalog import PRODUCTS, catalog_products, catalog_response
+from Homepage.pagination import CatalogPagination
 from Homepage.serializers import ProductListDetailSerializer
 
 # Get logger for application
@@ -24,24 +28,33 @@ class ProductListView(generics.ListAPIView):
     *   *Query Parameters:* (Optional, for filtering and pagination)
     *   *Category (str): Filters all products that is inside any Category type
     *   *tags: (string): Filters all products that matches all tags.
-    *   *search (string) : Searches all products that matches a certain keyword
+    *   *search (string) : Full-text search over title, description, category, brand, tags and vendor
+        (see store/search.py); results are ranked best match first and the response adds "facets"
+        (category, price bucket and vendor counts of all matches).
         *   *page (int): Page number for pagination. Defaults to 1.
         *   *page_size (int): Number of products per page. Defaults to 10.
         *   *ordering (string): sort products by a certain field.
+        *   *Caching:* Pages are served from the versioned catalog cache (see Homepage/catalog.py)
+            with an ETag; a request with a matching If-None-Match gets HTTP 304.
         *   *Response (JSON):*
               *   On success (HTTP 200 OK):
                        json
-                       [
-                            {
-                            "id": "96609158-5597-465b-903e-85f35e4289d9",
-                             "sku": "SKU238584",
-                             "vendor": "ee82962d-6116-49eb-ac26-c76723e87d85",
-                             "title": "Socks",
-                             "image": null,
-                              ...
-                              },
-                           ....
-                        ]
+                       {
+                           "count": 120,
+                           "next": "https://.../api/home/products/?page=2",
+                           "previous": null,
+                           "results": [
+                                {
+                                "pid": "kwzqsmbzvyra",
+                                 "sku": "SKU238584",
+                                 "vendor": {...},
+                                 "title": "Socks",
+                                 "image": null,
+                                  ...
+                                  },
+                               ....
+                           ]
+                       }
                       
                 *   On failure (HTTP 500):
                      json
@@ -55,26 +68,39 @@ class ProductListView(generics.ListAPIView):
     serializer_class = ProductListDetailSerializer
     permission_classes = (AllowAny,)
     queryset = Product.objects.filter(status="published")
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = CatalogPagination
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, filters.OrderingFilter]
 
     #The filter of all results of the API
     filterset_fields = ['category__name', 'tags'] # Enables the filtering for the API with Category, Tags, Title and Status as well
-    search_fields = ['title', 'description']  # Enable Search filter for the API ( description and the tilte)
     ordering_fields = ['title', 'price', 'date'] # Can order it by title, price or date if required
 
+    def get_queryset(self):
+        return catalog_products()
+
     def list(self, request, *args, **kwargs):
         """
-        Lists the serialized data.
+        Lists one page of the serialized data.
         """
         try:
-            queryset = self.filter_queryset(self.get_queryset())
-            serializer = self.get_serializer(queryset, many=True)
+            response = catalog_response(request, PRODUCTS, self.build_page)
             application_logger.info(f"Successfully retrieved and listed products for client")
-            return Response(serializer.data)
+            return response
+        except (Http404, APIException):
+            raise
         except Exception as e:
             application_logger.error(f"An unexpected error occurred while retrieving and listing the product for a client, {e}")
             return Response({'error': f'An error occurred: {e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def build_page(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        data = self.get_paginated_response(serializer.data).data
+        if ProductSearchFilter().get_search_query(self.request):
+            data['facets'] = product_facets(queryset)
+        return data
+
 
 
 
@@ -119,16 +145,22 @@ class ProductDetailView(generics.RetrieveAPIView):
     queryset = Product.objects.all()
     lookup_field = 'slug'
 
+    def get_queryset(self):
+        return catalog_products()
+
     def retrieve(self, request, *args, **kwargs):
         """
         Retrieves the serialized data for a specific product using the slug.
         """
         try:
             slug = self.kwargs['slug']
-            product = Product.objects.get(slug=slug, status="published")  # Only published products
-            serializer = self.get_serializer(product)
+            response = catalog_response(
+                request, PRODUCTS,
+                lambda: self.get_serializer(self.get_queryset().get(slug=slug)).data,  # Only published products
+                slug,
+            )
             application_logger.info(f"Successfully retrieved product with slug: {slug}")
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return response
         except Product.DoesNotExist:
             application_logger.error(f"Product with slug {slug} not found.")
             return Response({'error': 'Product not found', 'REASON' : f'Product with slug = {slug} is not found'}, status=status.HTTP_404_NOT_FOUND)
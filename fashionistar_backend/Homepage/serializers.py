@@ -49,6 +49,10 @@ class ProductListDetailSerializer(serializers.ModelSerializer):
     
     This serializer provides a concise representation of a product,
     including a hyperlink to its detail view, optimized for list displays.
+
+    Expects products from ``Homepage.catalog.catalog_products()``: the nested lists read the
+    prefetched relations and the rating and order counters read the queryset annotations, so a
+    page of products is serialized without a query per product.
     """
     # Hyperlink to the product's public detail page.
     # The view_name must match the `name` provided in the store's urls.py.
@@ -58,18 +62,19 @@ class ProductListDetailSerializer(serializers.ModelSerializer):
     )
     vendor = HomeVendorSerializer(read_only=True)
     category = HomeCategorySerializer(many=True, read_only=True)
-    gallery = HomeGallerySerializer(many=True, read_only=True)
-    specification = HomeSpecificationSerializer(many=True, read_only=True)
-    size = HomeSizeSerializer(many=True, read_only=True)
-    color = HomeColorSerializer(many=True, read_only=True)
-
-    product_rating = serializers.ReadOnlyField()
-    rating_count = serializers.ReadOnlyField()
+    gallery = HomeGallerySerializer(source='product_gallery', many=True, read_only=True)
+    specification = HomeSpecificationSerializer(source='product_specification', many=True, read_only=True)
+    size = HomeSizeSerializer(source='product_size', many=True, read_only=True)
+    color = HomeColorSerializer(source='product_color', many=True, read_only=True)
+
+    product_rating = serializers.FloatField(source='average_rating', read_only=True)
+    rating_count = serializers.IntegerField(source='review_count', read_only=True)
+    order_count = serializers.IntegerField(source='paid_order_count', read_only=True)
     get_precentage = serializers.ReadOnlyField()
     
     # Adding model methods/properties to the output
     discount_percentage = serializers.FloatField(source='get_precentage', read_only=True)
-    average_rating = serializers.FloatField(source='product_rating', read_only=True)
+    average_rating = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Product
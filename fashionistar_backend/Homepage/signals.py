@@ -0,0 +1,70 @@
+# Homepage/signals.py
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from admin_backend.models import Brand, Category, Collections
+from Homepage.catalog import BRANDS, CATEGORIES, COLLECTIONS, PRODUCTS, bump_catalog_version
+from store.models import Color, Gallery, Product, Review, Size, Specification
+from store.search import product_search_indexed
+from vendor.models import Vendor
+
+# Vendor fields rendered on the product cards (HomeVendorSerializer)
+VENDOR_CARD_FIELDS = {'name', 'image', 'vid'}
+
+
+def bump_on_commit(*resources):
+    """
+    Bumps the versions once the write is committed: a payload rebuilt before the commit (from the
+    rows as they were) would otherwise be cached under the new version and served stale.
+    """
+    transaction.on_commit(lambda: bump_catalog_version(*resources))
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def bump_brands(sender, **kwargs):
+    bump_on_commit(BRANDS)
+
+
+@receiver(post_save, sender=Collections)
+@receiver(post_delete, sender=Collections)
+def bump_collections(sender, **kwargs):
+    bump_on_commit(COLLECTIONS)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_categories(sender, **kwargs):
+    """
+    Product cards embed their categories, so the product listings are refreshed as well.
+    """
+    bump_on_commit(CATEGORIES, PRODUCTS)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Gallery)
+@receiver(post_delete, sender=Gallery)
+@receiver(post_save, sender=Specification)
+@receiver(post_delete, sender=Specification)
+@receiver(post_save, sender=Size)
+@receiver(post_delete, sender=Size)
+@receiver(post_save, sender=Color)
+@receiver(post_delete, sender=Color)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(m2m_changed, sender=Product.category.through)
+@receiver(product_search_indexed)
+def bump_products(sender, **kwargs):
+    bump_on_commit(PRODUCTS)
+
+
+@receiver(post_save, sender=Vendor)
+def bump_products_of_vendor(sender, update_fields=None, **kwargs):
+    """
+    Vendors are saved for wallet and profile changes alike; only the fields shown on the product
+    cards invalidate the listings.
+    """
+    if update_fields is None or VENDOR_CARD_FIELDS & set(update_fields):
+        bump_on_commit(PRODUCTS)
@@ -1,3 +1,105 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from admin_backend.models import Brand, Category
+from Homepage.catalog import PRODUCTS, catalog_version
+from store.models import Gallery, Product, Review, Size
+from vendor.models import Vendor
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CatalogReadsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        vendor_user = User.objects.create_user(email='catalogvendor@example.com', password='password123', role=User.VENDOR)
+        self.vendor = Vendor.objects.create(user=vendor_user, name='Catalog Vendor')
+        self.shopper = User.objects.create_user(email='catalogshopper@example.com', password='password123')
+        self.category = Category.objects.create(name='Dresses', slug='dresses')
+
+        for index in range(15):
+            product = Product.objects.create(vendor=self.vendor, title=f'Dress {index}', price=Decimal('100.00'))
+            product.category.add(self.category)
+            Gallery.objects.create(product=product)
+            Size.objects.create(product=product, name='M', price=Decimal('0.00'))
+            Review.objects.create(product=product, user=self.shopper, rating=4)
+        self.product = product
+        self.url = reverse('home:product-list')
+
+    def test_product_page_is_built_with_a_fixed_number_of_queries(self):
+        # count, page, then one prefetch each for categories, gallery, specifications, sizes and colors
+        with self.assertNumQueries(7):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 15)
+        self.assertEqual(len(response.data['results']), 10)
+
+        card = response.data['results'][0]
+        self.assertEqual(card['vendor']['name'], 'Catalog Vendor')
+        self.assertEqual(card['category'][0]['name'], 'Dresses')
+        self.assertEqual(len(card['gallery']), 1)
+        self.assertEqual(card['average_rating'], 4.0)
+        self.assertEqual(card['rating_count'], 1)
+        self.assertEqual(card['order_count'], 0)
+
+        self.assertEqual(len(self.client.get(self.url, {'page': 2}).data['results']), 5)
+
+    def test_warm_reads_and_revalidation_skip_the_database(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+            revalidated = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.data, first.data)
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_writes_invalidate_the_cached_payloads(self):
+        first = self.client.get(self.url)
+        detail_url = reverse('home:product-detail', kwargs={'slug': self.product.slug})
+        self.client.get(detail_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.title = 'Renamed dress'
+            self.product.save()
+
+        stale = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(stale.status_code, 200)
+        self.assertNotEqual(stale['ETag'], first['ETag'])
+        self.assertEqual(stale.data['results'][0]['title'], 'Renamed dress')
+        self.assertEqual(self.client.get(detail_url).data['title'], 'Renamed dress')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.product, user=self.shopper, rating=2)
+        self.assertEqual(self.client.get(detail_url).data['average_rating'], 3.0)
+
+    def test_brand_reads_are_cached_until_a_brand_changes(self):
+        url = reverse('home:brand-list')
+        Brand.objects.create(title='Ankara House', slug='ankara-house')
+        self.assertEqual(len(self.client.get(url).data['data']), 1)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Brand.objects.create(title='Aso Oke Co', slug='aso-oke-co')
+        self.assertEqual(len(self.client.get(url).data['data']), 2)
+
+        missing = self.client.get(reverse('home:brand-detail', kwargs={'slug': 'missing'}))
+        self.assertEqual(missing.status_code, 404)
+
+    def test_versions_are_bumped_when_the_write_commits(self):
+        version = catalog_version(PRODUCTS)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.product.title = 'Renamed dress'
+            self.product.save()
+        # a payload rebuilt before the commit is still stored under the old version
+        self.assertEqual(catalog_version(PRODUCTS), version)
+
+        for callback in callbacks:
+            callback()
+        self.assertGreater(catalog_version(PRODUCTS), version)
@@ -10,7 +10,8 @@
 import logging
 import json
 from Paystack_Webhoook_Prod.serializers__BankAccountDetails import BankAccountDetailsSerializer
-from Paystack_Webhoook_Prod.UTILS.utils_TransferRecipient import create_transfer_recipient, update_transfer_recipient, delete_transfer_recipient, fetch_transfer_recipient, validate_bank_details
+from Paystack_Webhoook_Prod.bank_directory import forget_recipient, get_account_resolver, get_bank_directory
+from Paystack_Webhoook_Prod.UTILS.utils_TransferRecipient import update_transfer_recipient, delete_transfer_recipient, fetch_transfer_recipient, validate_bank_details
 from requests.exceptions import ConnectionError, Timeout, RequestException
 from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
 from rest_framework.pagination import PageNumberPagination
@@ -152,7 +153,8 @@ def create(self, request, *args, **kwargs):
                     paystack_logger.info(f"Payload for creating transfer recipient: {recipient_data}")
 
                     try:
-                        recipient_response = create_transfer_recipient(recipient_data)
+                        # Cached per account and name: resubmitting the same details does not call Paystack again
+                        recipient_response = get_account_resolver().create_recipient(recipient_data)
                         if recipient_response['status'] is False:
                             paystack_logger.error(f"Failed to create transfer recipient for vendor {user.email}, Paystack response: {recipient_response}")
                             message = recipient_response.get('message', 'An unexpected error occurred with Paystack.')
@@ -388,6 +390,7 @@ def update(self, request, *args, **kwargs):
                                     'paystack_response': recipient_response}, status=status.HTTP_400_BAD_REQUEST
                                 )
                         paystack_logger.info(f"Successfully updated transfer recipient for vendor {user.email}, response is {recipient_response}")
+                        forget_recipient(bank_details.bank_code, bank_details.account_number)
 
                         bank_details.account_number = serializer.validated_data.get('account_number')
                         bank_details.account_full_name = serializer.validated_data.get('account_full_name')
@@ -651,6 +654,7 @@ def destroy(self, request, *args, **kwargs):
                              'paystack_response': recipient_response}, status=status.HTTP_400_BAD_REQUEST
                         )
                     paystack_logger.info(f"Successfully deleted transfer recipient for vendor {user.email}, response is {recipient_response}")
+                    forget_recipient(instance.bank_code, instance.account_number)
 
                 application_logger.info(f"Successfully deleted bank details for vendor {user.email}, with id: {self.kwargs['pk']}")
                 instance.delete()
@@ -658,3 +662,107 @@ def destroy(self, request, *args, **kwargs):
         except Exception as e:
             application_logger.error(f"An error occurred: {e} for user {user.email}")
             return Response({'error': f"An error occurred, please check your input or contact support. {e}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+
+
+class BankListView(APIView):
+    """
+    API endpoint for listing and searching the supported banks.
+
+    *   *URL:* /api/vendor/banks/
+    *   *Method:* GET
+    *   *Authentication:* Requires a valid authentication token in the Authorization header.
+    *   *Query Parameters:*
+        *   `search` (string, optional): Returns the banks whose name starts with this text (case insensitive).
+        *   `bank_code` (string, optional): Returns the banks with this code.
+        *   `slug` (string, optional): Returns the bank with this slug, e.g. `access-bank`.
+    *   *Response (JSON):*
+        *   On success (HTTP 200 OK):
+            ```json
+            {
+                "count": 1,
+                "results": [
+                    {"bank_code": "044", "bank_name": "Access Bank", "slug": "access-bank"}
+                ]
+            }
+            ```
+    *   The banks are served from an in-memory index built once per process, no database or Paystack call is made.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        directory = get_bank_directory()
+        if request.query_params.get('bank_code'):
+            banks = directory.by_code(request.query_params['bank_code'])
+        elif request.query_params.get('slug'):
+            bank = directory.by_slug(request.query_params['slug'])
+            banks = [bank] if bank else []
+        elif request.query_params.get('search'):
+            banks = directory.search(request.query_params['search'])
+        else:
+            banks = list(directory.banks)
+        return Response({'count': len(banks), 'results': banks}, status=status.HTTP_200_OK)
+
+
+
+
+class BankAccountResolveView(APIView):
+    """
+    API endpoint for resolving the name on a bank account before the bank details are saved.
+
+    *   *URL:* /api/vendor/bank-details/resolve/
+    *   *Method:* GET
+    *   *Authentication:* Requires a valid authentication token in the Authorization header.
+    *   *Query Parameters:*
+        *   `account_number` (string, required): The 10 digit account number.
+        *   `bank_name` (string, required unless `bank_code` is given): A bank name from `BANKS_LIST`.
+        *   `bank_code` (string, optional): The bank code, instead of `bank_name`.
+    *   *Response (JSON):*
+        *   On success (HTTP 200 OK):
+            ```json
+            {
+                "Account Number": "1234567890",
+                "Account Name": "JOHN DOE",
+                "Bank Name": "Access Bank"
+            }
+            ```
+        *   On failure (HTTP 400 Bad Request):
+            ```json
+            {
+                "error": "Error message" // Error message explaining the failure
+            }
+            ```
+    *   Resolutions are cached for `BANK_ACCOUNT_CACHE_TTL` seconds, and identical lookups made at the same time share one Paystack call.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        account_number = request.query_params.get('account_number', '')
+        if not account_number.isdigit() or len(account_number) != 10:
+            return Response({'error': "Account number must be exactly 10 digits."}, status=status.HTTP_400_BAD_REQUEST)
+
+        directory = get_bank_directory()
+        if request.query_params.get('bank_code'):
+            banks = directory.by_code(request.query_params['bank_code'])
+            bank = banks[0] if banks else None
+        else:
+            bank = directory.by_name(request.query_params.get('bank_name', ''))
+        if bank is None:
+            return Response({'error': "Invalid bank name"}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = get_account_resolver().resolve(account_number, bank['bank_code'])
+        if not response.get('status'):
+            paystack_logger.error(f"Failed to resolve account {account_number} at bank {bank['bank_code']} for user {request.user.email}, Paystack response: {response}")
+            return Response(
+                {'error': "Could not resolve the account name. Please re-check the account number and bank and try again."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(
+            {
+                "Account Number": response['data'].get('account_number', account_number),
+                "Account Name": response['data'].get('account_name'),
+                "Bank Name": bank['bank_name'],
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -3,7 +3,8 @@
 '''
 import secrets
 import requests
-from backend.settings import PAYSTACK_TEST_KEY, PAYSTACK_SECRET_KEY
+from decimal import Decimal
+from backend.settings import PAYSTACK_TEST_KEY, PAYSTACK_SECRET_KEY, PAYSTACK_TIMEOUT
 
 
 HEADERS = {
@@ -52,10 +53,11 @@ class Transfer:
         '''
         The Transactions API allows you create and manage payments on your integration
         '''
-        def __init__(self, amount=None, currency="NGN", recipient_code=None,reason=None):
-            self.reference = str(set_ref())
+        def __init__(self, amount=None, currency="NGN", recipient_code=None,reason=None, reference=None):
+            # A caller supplied reference makes retries idempotent: Paystack rejects a second transfer with the same reference
+            self.reference = str(reference or set_ref())
             if amount:
-              self.amount = str(int(amount) * 100)
+              self.amount = str(int(Decimal(str(amount)) * 100))
             self.currency = str(currency)
             self.recipient_code = recipient_code
             self.reason = reason
@@ -72,11 +74,12 @@ def initiate_transfer(self):
                 "reason": self.reason,
                 "amount": self.amount,
                 "recipient": self.recipient_code,
+                "reference": self.reference,
              }
             # Log the request data
             print('transfer_data',transfer_data)
             try:
-                res = requests.post(url, headers=HEADERS, json=transfer_data)
+                res = requests.post(url, headers=HEADERS, json=transfer_data, timeout=PAYSTACK_TIMEOUT)
                 res.raise_for_status()
                 return res.json()
             except requests.exceptions.RequestException as e:
@@ -105,11 +108,24 @@ def initiate_transfer(self):
                        "status": False,
                        "message": f"Failed to transfer funds: {e}",
                         "meta": {'nextStep': 'Try again later'},
-                        "type": 'api_error',
+                        "type": 'connection_error',
                         "code": 'unknown',
                     }
 
 
+def verify_transfer(reference):
+    '''
+    Fetch the status of a transfer by the reference it was initiated with.
+    Returns None when Paystack has no transfer with that reference.
+    '''
+    url = "https://api.paystack.co/transfer/verify/" + reference
+    res = requests.get(url, headers=HEADERS, timeout=PAYSTACK_TIMEOUT)
+    if res.status_code == 404:
+        return None
+    res.raise_for_status()
+    return res.json()
+
+
 
 
 
@@ -0,0 +1,114 @@
+'''
+Transfer providers used by the vendor withdrawal outbox worker.
+
+Every provider exposes the same two calls:
+
+*   ``initiate(reference, amount, recipient_code, reason)`` sends a transfer and returns
+    ``{'status': bool, 'retryable': bool, 'transfer_code': str | None, 'message': str}``.
+*   ``lookup(reference)`` returns ``{'transfer_code': ..., 'status': ...}`` for a transfer that was
+    already created with that reference, or ``None``. The worker calls it before re-sending a
+    transfer, so a retry after a lost response never pays the vendor twice.
+'''
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from Paystack_Webhoook_Prod.UTILS.paystack import Transfer as PaystackTransfer, verify_transfer
+
+# Get logger for paystack
+paystack_logger = logging.getLogger('paystack')
+
+RETRYABLE_ERROR_TYPES = ('server_error', 'connection_error')
+
+
+class PaystackTransferProvider:
+    '''
+    Sends transfers through the Paystack Transfer API.
+    '''
+
+    def initiate(self, reference, amount, recipient_code, reason=None):
+        response = PaystackTransfer(
+            amount=amount,
+            recipient_code=recipient_code,
+            reason=reason,
+            reference=reference,
+        ).initiate_transfer()
+
+        if response.get('status'):
+            data = response.get('data') or {}
+            return {
+                'status': True,
+                'retryable': False,
+                'transfer_code': data.get('transfer_code'),
+                'message': response.get('message', ''),
+            }
+
+        paystack_logger.error(f"Paystack transfer {reference} failed: {response}")
+        return {
+            'status': False,
+            'retryable': response.get('type') in RETRYABLE_ERROR_TYPES,
+            'transfer_code': None,
+            'message': response.get('message', 'An unexpected error occurred with Paystack.'),
+        }
+
+    def lookup(self, reference):
+        response = verify_transfer(reference)
+        if not response or not response.get('status'):
+            return None
+        data = response.get('data') or {}
+        return {'transfer_code': data.get('transfer_code'), 'status': data.get('status')}
+
+
+class FakeTransferProvider:
+    '''
+    Local stand-in for Paystack used by benchmarks and development setups.
+
+    Sleeps for ``latency`` seconds per call to mimic the provider round-trip, fails a ``failure_rate``
+    share of calls with a retryable error, and rejects a repeated reference the way Paystack does.
+    Transfers are kept in memory for the lifetime of the process.
+    '''
+    _transfers = {}
+    _lock = threading.Lock()
+
+    def __init__(self, latency=None, failure_rate=0.0):
+        self.latency = getattr(settings, 'WITHDRAWAL_FAKE_TRANSFER_LATENCY', 0.3) if latency is None else latency
+        self.failure_rate = failure_rate
+
+    def initiate(self, reference, amount, recipient_code, reason=None):
+        time.sleep(self.latency)
+
+        if random.random() < self.failure_rate:
+            return {'status': False, 'retryable': True, 'transfer_code': None, 'message': 'Fake provider timeout'}
+
+        with self._lock:
+            if reference in self._transfers:
+                return {'status': False, 'retryable': False, 'transfer_code': None, 'message': 'Duplicate Transfer Reference'}
+            transfer = {'transfer_code': f"TRF_fake_{reference[-12:]}", 'status': 'pending'}
+            self._transfers[reference] = transfer
+
+        return {'status': True, 'retryable': False, 'transfer_code': transfer['transfer_code'], 'message': 'Transfer has been queued'}
+
+    def lookup(self, reference):
+        time.sleep(self.latency)
+        with self._lock:
+            return self._transfers.get(reference)
+
+
+TRANSFER_PROVIDERS = {
+    'paystack': PaystackTransferProvider,
+    'fake': FakeTransferProvider,
+}
+
+
+def get_transfer_provider(name=None):
+    '''
+    Returns the transfer provider configured in ``WITHDRAWAL_TRANSFER_PROVIDER``
+    ('paystack', 'fake' or a dotted path to a provider class).
+    '''
+    name = name or getattr(settings, 'WITHDRAWAL_TRANSFER_PROVIDER', 'paystack')
+    provider_class = TRANSFER_PROVIDERS.get(name) or import_string(name)
+    return provider_class()
@@ -105,6 +105,28 @@ def fetch_transfer_recipient(recipient_code):
         return {"status": False, "message": f"Failed to fetch transfer recipient: {e}"}
 
 
+def resolve_account_number(account_number, bank_code):
+    '''
+    This function is used to resolve the name on a bank account with paystack.
+    '''
+    url = "https://api.paystack.co/bank/resolve"
+    headers = {
+            "Authorization": "Bearer "+ settings.PAYSTACK_SECRET_KEY,
+        }
+    try:
+        res = requests.get(
+            url,
+            params={"account_number": account_number, "bank_code": bank_code},
+            headers=headers,
+            timeout=getattr(settings, 'PAYSTACK_TIMEOUT', 30),
+        )
+        res.raise_for_status()
+        return res.json()
+    except requests.exceptions.RequestException as e:
+        paystack_logger.error(f"Failed to resolve account number, paystack error: {e}")
+        return {"status": False, "message": f"Failed to resolve account number: {e}"}
+
+
 
 
 
@@ -3,19 +3,16 @@
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from vendor.models import Vendor
-from Paystack_Webhoook_Prod.models import BankAccountDetails, Transaction
+from Paystack_Webhoook_Prod.models import BankAccountDetails
 from userauths.models import  Profile, User
 from decimal import Decimal
-from django.db import transaction
 import logging
-import json
 from Paystack_Webhoook_Prod.serializers__BankAccountDetails import BankAccountDetailsSerializer
 from Paystack_Webhoook_Prod.UTILS.utils_TransferRecipient import create_transfer_recipient, fetch_user_and_vendor
 from requests.exceptions import ConnectionError, Timeout, RequestException
 from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
 from Paystack_Webhoook_Prod.serializers_WITHDRAWAL import  VendorWithdrawSerializer
-from Paystack_Webhoook_Prod.UTILS.paystack import Transfer as PaystackTransfer
+from Paystack_Webhoook_Prod.withdrawals import InsufficientBalanceError, reserve_withdrawal
 from rest_framework.exceptions import PermissionDenied
 from vendor.utils import fetch_user_and_vendor, vendor_is_owner
 # Get logger for application
@@ -26,6 +23,11 @@
 class VendorWithdrawView(generics.CreateAPIView):
     """
      API endpoint for vendors to initiate a withdrawal from their wallet.
+
+     The amount is reserved (wallet debited, pending debit transaction recorded) in one short
+     transaction and the Paystack transfer is sent afterwards by the withdrawal outbox worker
+     (see Paystack_Webhoook_Prod/withdrawals.py). The transfer code is stored on the transaction
+     once Paystack accepts the transfer; if the transfer fails the amount is returned to the wallet.
     *   *URL:* /api/vendor/withdraw/
     *   *Method:* POST
     *   *Authentication:* Requires a valid authentication token in the Authorization header.
@@ -48,7 +50,9 @@ class VendorWithdrawView(generics.CreateAPIView):
                          {
                            "message": "Withdrawal initiated",
                            "new_balance": 120.00,
-                            "transfer_code": "TRF_xxx", // The transfer code from paystack
+                            "transaction_id": "uuid", // The pending debit transaction
+                            "reference": "wd-xxx", // The transfer reference sent to paystack
+                            "status": "pending",
                             "data": {...}
                          }
                       
@@ -67,14 +71,12 @@ class VendorWithdrawView(generics.CreateAPIView):
                         *   "Invalid transaction password": If an incorrect transaction password was provided.
                         *  "Insufficient balance": If the vendor's balance is lower than the withdrawal amount.
                         *  "Bank details not found": If no bank details is found with that ID.
-                        *  "Failed to initiate transfer on paystack {paystack_error_message}": If the paystack transfer request fails, includes the paystack error message
-                        *   "Failed to initiate transfer. Please check your internet connection or try again.": If there is any connection error to the paystack servers.
+                        *  "Bank account is not set up for transfers": If the bank details have no paystack transfer recipient.
                          *  "Invalid user role": If the user role is not vendor.
     """
     serializer_class = VendorWithdrawSerializer
     permission_classes = (IsAuthenticated,)
   
-    @transaction.atomic
     def create(self, request, *args, **kwargs):
         """
         Handles the creation of a withdrawal request
@@ -125,76 +127,33 @@ def create(self, request, *args, **kwargs):
                 application_logger.error(f"Invalid transaction password entered for user {user.email}")
                 return Response({'error': 'Invalid transaction password'}, status=status.HTTP_400_BAD_REQUEST)
 
-            if vendor_obj.wallet_balance < amount:
-                 application_logger.error(f"Insufficient balance for withdrawal for vendor {user.email}")
-                 return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
-
-
-            with transaction.atomic():
-
-                # ================== MOST IMPORTANT CODE TO WORK WITH  FOR LOCKING THE VENDOR'S RELATED DATABASE INSTANCE WHILE PERFORMING A TRANSACTION BUSINESS ON THE VENDOR'S DATABASE COLUMNS ================
-
-                # Update vendor Balance
-                vendor_obj = Vendor.objects.select_for_update().get(pk=vendor_obj.pk)
-                vendor_obj.wallet_balance -= amount
-                vendor_obj.save()
-
-                application_logger.info(f"Withdrawal of {amount} initiated by vendor: {user.email}")
-
-                # ================== MOST IMPORTANT CODE TO WORK WITH  FOR LOCKING THE VENDOR'S RELATED DATABASE INSTANCE WHILE PERFORMING A TRANSACTION BUSINESS ON THE VENDOR'S DATABASE COLUMNS ================
-
-
+            if not bank_details.paystack_Recipient_Code:
+                application_logger.error(f"Bank details {bank_details_id} have no transfer recipient for vendor {user.email}")
+                return Response({'error': 'Bank account is not set up for transfers'}, status=status.HTTP_400_BAD_REQUEST)
 
-
-                
-
-                # Create a new debit transaction
-                transaction_obj = Transaction.objects.create(
-                    vendor=vendor_obj,
-                    transaction_type='debit',
-                    amount=amount,
-                    status='pending',
-                    description=reason if reason else None,
-                   
+            # Phase one: reserve the amount and queue the transfer. The vendor row is only locked for
+            # this short transaction; the Paystack call happens later in the outbox worker.
+            try:
+                transaction_obj, outbox, new_balance = reserve_withdrawal(
+                    vendor_obj,
+                    amount,
+                    recipient_code=bank_details.paystack_Recipient_Code,
+                    reason=reason,
                 )
-
-                #initialize transfer
-                paystack_transfer = PaystackTransfer(amount=amount, recipient_code=bank_details.paystack_Recipient_Code)
-                transfer_response = paystack_transfer.initiate_transfer()
-                print(transfer_response)
-
-                if not transfer_response['status']:
-                    paystack_logger.error(f"Failed to transfer funds for user: {user.email}, paystack error response: {transfer_response}")
-                    message = transfer_response.get('message', 'An unexpected error occurred with Paystack.')
-                    #check if the message is a json
-                    try:
-                        message_json = json.loads(message)
-                        if isinstance(message_json, dict) and message_json.get('message'):
-                            message = message_json['message']
-                               
-                    except json.JSONDecodeError:
-                        pass  # do nothing, just use the normal message
-
-                    #Rollback the transaction if paystack fails
-                    transaction_obj.status = "failed"
-                    transaction_obj.save()
-                    vendor_obj.wallet_balance += amount
-                    vendor_obj.save()
-                    return Response({"error": f"Failed to initiate transfer on paystack {message}"}, status=status.HTTP_400_BAD_REQUEST)
-                
-                #update the transfer_code in transaction record
-                transaction_obj.paystack_payment_reference = transfer_response['data'].get('reference', None)
-                transaction_obj.paystack_transfer_code = transfer_response['data'].get('transfer_code', None)
-                transaction_obj.save()
-                application_logger.info(f"Withdrawal of {amount} initiated by vendor: {user.email}, transfer code is: {transfer_response['data'].get('transfer_code', None)}")
-
-
-                return Response({
-                    'message': 'Withdrawal initiated',
-                    'new_balance': vendor_obj.wallet_balance,
-                    'transfer_code':transfer_response['data'].get('transfer_code', None),
-                    'data': serializer.data
-                    }, status=status.HTTP_200_OK)
+            except InsufficientBalanceError:
+                application_logger.error(f"Insufficient balance for withdrawal for vendor {user.email}")
+                return Response({'error': 'Insufficient balance'}, status=status.HTTP_400_BAD_REQUEST)
+
+            application_logger.info(f"Withdrawal of {amount} initiated by vendor: {user.email}, reference is: {outbox.reference}")
+
+            return Response({
+                'message': 'Withdrawal initiated',
+                'new_balance': new_balance,
+                'transaction_id': str(transaction_obj.id),
+                'reference': outbox.reference,
+                'status': transaction_obj.status,
+                'data': serializer.data
+                }, status=status.HTTP_200_OK)
 
         except PermissionDenied as e:
             application_logger.error(f"Permission denied: {e} for vendor {user.email}")
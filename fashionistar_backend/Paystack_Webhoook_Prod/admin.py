@@ -1,6 +1,22 @@
 from django.contrib import admin
-from Paystack_Webhoook_Prod.models import Transaction, BankAccountDetails
+from Paystack_Webhoook_Prod.models import Transaction, BankAccountDetails, WithdrawalOutbox, PaystackWebhookEvent
 
 admin.site.register(Transaction)
 admin.site.register(BankAccountDetails)
+
+
+@admin.register(WithdrawalOutbox)
+class WithdrawalOutboxAdmin(admin.ModelAdmin):
+    list_display = ('reference', 'vendor', 'amount', 'status', 'attempts', 'next_attempt_at', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('reference', 'recipient_code')
+    readonly_fields = ('transaction', 'vendor', 'amount', 'recipient_code', 'reference', 'attempts', 'last_error')
+
+
+@admin.register(PaystackWebhookEvent)
+class PaystackWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('event', 'reference', 'status', 'result', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('event', 'status')
+    search_fields = ('reference',)
+    readonly_fields = ('event', 'reference', 'payload', 'attempts', 'result', 'last_error', 'received_at', 'processed_at')
 # Register your models here.
@@ -4,3 +4,9 @@
 class PaystackWebhoookProdConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Paystack_Webhoook_Prod'
+
+    def ready(self):
+        super().ready()
+        from Paystack_Webhoook_Prod.bank_directory import get_bank_directory
+
+        get_bank_directory()  # Index BANKS_LIST once per process, before the first request
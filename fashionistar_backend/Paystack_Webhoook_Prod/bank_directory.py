@@ -0,0 +1,260 @@
+'''
+Bank directory and account resolution for bank details submitted by vendors and clients.
+
+* ``BANK_CHOICES`` (BANKS_LIST.py) is indexed once per process when the app is ready: banks by
+  code, by slug and by name, plus a sorted name list that answers prefix searches with a binary
+  search instead of a scan.
+* Account number -> account name resolutions and created transfer recipients are cached with a
+  TTL (Redis in production), so resubmitting or re-checking the same bank details does not call
+  Paystack again. Failed calls are not cached.
+* Identical resolutions running at the same time in one process share a single outbound call.
+* The provider is pluggable through ``BANK_ACCOUNT_PROVIDER``: 'paystack', 'fake' (local
+  benchmarks, see the benchmark_bank_resolution command) or a dotted path to a provider class.
+'''
+import hashlib
+import logging
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import Future
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.text import slugify
+
+from Paystack_Webhoook_Prod.BANKS_LIST import BANK_CHOICES
+from Paystack_Webhoook_Prod.UTILS.utils_TransferRecipient import create_transfer_recipient, resolve_account_number
+
+# Get logger for paystack
+paystack_logger = logging.getLogger('paystack')
+
+
+def normalize_bank_name(name):
+    return ' '.join(str(name).casefold().split())
+
+
+class BankDirectory:
+    """
+    Read-only index over ``{'bank_code', 'bank_name'}`` entries. Every bank is returned as
+    ``{'bank_code', 'bank_name', 'slug'}``.
+    """
+
+    def __init__(self, banks):
+        self.banks = tuple({'bank_code': bank['bank_code'], 'bank_name': bank['bank_name'], 'slug': slugify(bank['bank_name'])} for bank in banks)
+        self._by_code = {}
+        for bank in self.banks:
+            # A few codes are shared by more than one bank
+            self._by_code.setdefault(bank['bank_code'], []).append(bank)
+        self._by_slug = {bank['slug']: bank for bank in self.banks}
+        self._by_name = {normalize_bank_name(bank['bank_name']): bank for bank in self.banks}
+        self._names = sorted(self._by_name.items())
+        self._name_keys = [name for name, _ in self._names]
+
+    def __len__(self):
+        return len(self.banks)
+
+    def by_code(self, bank_code):
+        return list(self._by_code.get(bank_code, ()))
+
+    def by_slug(self, slug):
+        return self._by_slug.get(slug)
+
+    def by_name(self, bank_name):
+        return self._by_name.get(normalize_bank_name(bank_name))
+
+    def search(self, prefix, limit=20):
+        '''
+        Banks whose name starts with ``prefix`` (case and spacing insensitive), in name order.
+        '''
+        prefix = normalize_bank_name(prefix)
+        matches = []
+        for name, bank in self._names[bisect_left(self._name_keys, prefix):]:
+            if len(matches) >= limit or not name.startswith(prefix):
+                break
+            matches.append(bank)
+        return matches
+
+
+@lru_cache(maxsize=None)
+def get_bank_directory():
+    return BankDirectory(BANK_CHOICES)
+
+
+class PaystackAccountProvider:
+    '''
+    Resolves account numbers and creates transfer recipients through the Paystack API. Both calls
+    return the Paystack response (``{'status': bool, 'message': str, 'data': {...}}``).
+    '''
+
+    def resolve(self, account_number, bank_code):
+        return resolve_account_number(account_number, bank_code)
+
+    def create_recipient(self, recipient_data):
+        return create_transfer_recipient(recipient_data)
+
+
+class FakeAccountProvider:
+    '''
+    Local stand-in for Paystack used by benchmarks and development setups.
+
+    Sleeps for ``latency`` seconds per call to mimic the provider round-trip and counts the calls
+    it receives. Any 10 digit account number resolves to a made-up name.
+    '''
+
+    def __init__(self, latency=None):
+        self.latency = getattr(settings, 'BANK_FAKE_RESOLVE_LATENCY', 0.2) if latency is None else latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _call(self):
+        time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+
+    def resolve(self, account_number, bank_code):
+        self._call()
+        if not str(account_number).isdigit() or len(str(account_number)) != 10 or not get_bank_directory().by_code(bank_code):
+            return {'status': False, 'message': 'Could not resolve account name. Check parameters or try again.'}
+        return {
+            'status': True,
+            'message': 'Account number resolved',
+            'data': {'account_number': account_number, 'account_name': f"FAKE ACCOUNT {account_number[-4:]}", 'bank_id': None},
+        }
+
+    def create_recipient(self, recipient_data):
+        self._call()
+        account_number, bank_code = recipient_data['account_number'], recipient_data['bank_code']
+        banks = get_bank_directory().by_code(bank_code)
+        return {
+            'status': True,
+            'message': 'Transfer recipient created successfully',
+            'data': {
+                'recipient_code': f"RCP_fake_{hashlib.sha1(f'{bank_code}:{account_number}'.encode()).hexdigest()[:12]}",
+                'name': recipient_data['name'],
+                'updatedAt': timezone.now().isoformat().replace('+00:00', 'Z'),
+                'details': {
+                    'account_number': account_number,
+                    'bank_code': bank_code,
+                    'bank_name': banks[0]['bank_name'] if banks else None,
+                },
+            },
+        }
+
+
+ACCOUNT_PROVIDERS = {
+    'paystack': PaystackAccountProvider,
+    'fake': FakeAccountProvider,
+}
+
+
+def get_account_provider(name=None):
+    '''
+    Returns the provider configured in ``BANK_ACCOUNT_PROVIDER`` ('paystack', 'fake' or a dotted
+    path to a provider class).
+    '''
+    name = name or getattr(settings, 'BANK_ACCOUNT_PROVIDER', 'paystack')
+    provider_class = ACCOUNT_PROVIDERS.get(name) or import_string(name)
+    return provider_class()
+
+
+def account_cache_key(bank_code, account_number):
+    return f"bank_account:{bank_code}:{account_number}"
+
+
+def recipient_cache_key(bank_code, account_number):
+    return f"bank_recipient:{bank_code}:{account_number}"
+
+
+class AccountResolver:
+    '''
+    Cached, coalescing front of an account provider.
+
+    ``stats`` counts the requests answered from the cache (``hits``), the ones that joined a call
+    already in flight (``coalesced``) and the outbound ``calls``.
+    '''
+
+    def __init__(self, provider=None):
+        self.provider = provider or get_account_provider()
+        self.stats = {'hits': 0, 'coalesced': 0, 'calls': 0}
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _single_flight(self, key, load):
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = Future()
+        if not leader:
+            self._count('coalesced')
+            return call.result()
+
+        self._count('calls')
+        try:
+            result = load()
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def resolve(self, account_number, bank_code):
+        '''
+        Resolves the name on an account, as the Paystack ``/bank/resolve`` response.
+        '''
+        key = account_cache_key(bank_code, account_number)
+        cached = cache.get(key)
+        if cached is not None:
+            self._count('hits')
+            return cached
+
+        def load():
+            response = self.provider.resolve(account_number, bank_code)
+            if response.get('status'):
+                cache.set(key, response, getattr(settings, 'BANK_ACCOUNT_CACHE_TTL', 86400))
+            return response
+
+        return self._single_flight(key, load)
+
+    def create_recipient(self, recipient_data):
+        '''
+        Creates a transfer recipient, or returns the one created earlier for the same account,
+        bank and name, as the Paystack ``/transferrecipient`` response.
+        '''
+        key = recipient_cache_key(recipient_data['bank_code'], recipient_data['account_number'])
+        name = normalize_bank_name(recipient_data.get('name', ''))
+        cached = cache.get(key)
+        if cached is not None and cached['name'] == name:
+            self._count('hits')
+            return cached['response']
+
+        def load():
+            response = self.provider.create_recipient(recipient_data)
+            if response.get('status'):
+                cache.set(key, {'name': name, 'response': response}, getattr(settings, 'BANK_RECIPIENT_CACHE_TTL', 86400))
+            return response
+
+        return self._single_flight(f"{key}:{name}", load)
+
+
+@lru_cache(maxsize=None)
+def get_account_resolver():
+    return AccountResolver()
+
+
+def forget_recipient(bank_code, account_number):
+    '''
+    Drops the cached recipient of an account once it is updated or deleted on Paystack.
+    '''
+    cache.delete(recipient_cache_key(bank_code, account_number))
@@ -0,0 +1,103 @@
+import json
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from Paystack_Webhoook_Prod.bank_directory import AccountResolver, FakeAccountProvider, account_cache_key, get_bank_directory
+
+
+class Command(BaseCommand):
+    """
+    Measures the hit rate and latency of bank account resolution.
+
+    Both flows use FakeAccountProvider, so no request reaches Paystack:
+
+    *   direct: every lookup calls the provider, as the bank details views did before.
+    *   cached: lookups go through AccountResolver (cache plus coalescing of identical calls).
+
+    Lookups are spread at random over ``--accounts`` account numbers that are new to the cache, and
+    run ``--concurrency`` at a time. The cache entries created by the run are deleted at the end.
+
+    Usage:
+        python manage.py benchmark_bank_resolution
+        python manage.py benchmark_bank_resolution --lookups 500 --accounts 50 --latency 300 --json
+    """
+    help = "Benchmarks hit rate and latency of cached bank account resolution against direct provider calls"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lookups', type=int, default=200, help="Account lookups per flow")
+        parser.add_argument('--accounts', type=int, default=20, help="Distinct account numbers looked up")
+        parser.add_argument('--concurrency', type=int, default=16, help="Lookups in flight at a time")
+        parser.add_argument('--latency', type=float, default=200, help="Simulated provider round-trip in milliseconds")
+        parser.add_argument('--json', action='store_true', help="Output the report as JSON")
+
+    def handle(self, *args, **options):
+        bank_code = get_bank_directory().banks[0]['bank_code']
+        prefix = f"{random.randrange(10 ** 5):05d}"
+        accounts = [f"{prefix}{number:05d}" for number in range(options['accounts'])]
+        lookups = [random.choice(accounts) for _ in range(options['lookups'])]
+        latency = options['latency'] / 1000
+
+        try:
+            direct = FakeAccountProvider(latency=latency)
+            resolver = AccountResolver(provider=FakeAccountProvider(latency=latency))
+            report = {
+                'lookups': options['lookups'],
+                'accounts': options['accounts'],
+                'concurrency': options['concurrency'],
+                'latency_ms': options['latency'],
+                'direct': self._run(lookups, options['concurrency'], lambda account: direct.resolve(account, bank_code)),
+                'cached': self._run(lookups, options['concurrency'], lambda account: resolver.resolve(account, bank_code)),
+            }
+        finally:
+            cache.delete_many([account_cache_key(bank_code, account) for account in accounts])
+
+        report['direct'].update(provider_calls=direct.calls, hit_rate=0.0)
+        report['cached'].update(
+            provider_calls=resolver.provider.calls,
+            hit_rate=round(resolver.stats['hits'] / len(lookups), 3),
+            coalesced=resolver.stats['coalesced'],
+        )
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"lookups={len(lookups)} accounts={options['accounts']} concurrency={options['concurrency']} "
+            f"provider_latency={options['latency']}ms"
+        )
+        for flow in ('direct', 'cached'):
+            result = report[flow]
+            self.stdout.write(
+                f"{flow:<7} provider calls {result['provider_calls']:>5}  hit rate {result['hit_rate']:>6.1%}  "
+                f"latency avg {result['latency_ms']['avg']:>8}ms  p95 {result['latency_ms']['p95']:>8}ms  "
+                f"total {result['seconds']}s"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['cached'].get('coalesced', 0)} lookups joined a call in flight, "
+            f"{report['direct']['provider_calls'] - report['cached']['provider_calls']} provider calls saved"
+        ))
+
+    def _timed(self, resolve, account):
+        started = time.perf_counter()
+        resolve(account)
+        return time.perf_counter() - started
+
+    def _run(self, lookups, concurrency, resolve):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = sorted(seconds * 1000 for seconds in executor.map(lambda account: self._timed(resolve, account), lookups))
+        elapsed = time.perf_counter() - started
+        return {
+            'seconds': round(elapsed, 3),
+            'latency_ms': {
+                'avg': round(statistics.mean(latencies), 2),
+                'p95': round(latencies[max(int(len(latencies) * 0.95) - 1, 0)], 2),
+                'max': round(latencies[-1], 2),
+            },
+        }
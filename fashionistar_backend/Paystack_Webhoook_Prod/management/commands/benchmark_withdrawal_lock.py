@@ -0,0 +1,112 @@
+import json
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Paystack_Webhoook_Prod.models import Transaction, WithdrawalOutbox
+from Paystack_Webhoook_Prod.UTILS.transfer_providers import FakeTransferProvider
+from Paystack_Webhoook_Prod.withdrawals import dispatch_withdrawal, new_withdrawal_reference, reserve_withdrawal
+from userauths.models import User
+from vendor.models import Vendor
+
+
+class Command(BaseCommand):
+    """
+    Compares how long a vendor withdrawal holds the vendor row lock.
+
+    Both flows use FakeTransferProvider, so no request reaches Paystack:
+
+    *   legacy: the previous VendorWithdrawView flow, which calls the provider inside the
+        transaction that locked the vendor row.
+    *   two_phase: reserve_withdrawal (the only transaction touching the vendor row) followed by
+        dispatch_withdrawal outside any lock.
+
+    A temporary vendor is created and deleted at the end.
+
+    Usage:
+        python manage.py benchmark_withdrawal_lock
+        python manage.py benchmark_withdrawal_lock --withdrawals 50 --latency 500 --json
+    """
+    help = "Benchmarks vendor row lock hold time of the legacy and two-phase withdrawal flows"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--withdrawals', type=int, default=20, help="Withdrawals per flow")
+        parser.add_argument('--latency', type=float, default=300, help="Simulated provider round-trip in milliseconds")
+        parser.add_argument('--json', action='store_true', help="Output the report as JSON")
+
+    def handle(self, *args, **options):
+        provider = FakeTransferProvider(latency=options['latency'] / 1000)
+        count = options['withdrawals']
+        amount = Decimal('10.00')
+
+        run_id = uuid.uuid4().hex[:8]
+        user = User.objects.create_user(email=f"bench-withdraw-{run_id}@example.com", password=uuid.uuid4().hex, role=User.VENDOR)
+        vendor = Vendor.objects.create(user=user, name=f"bench-{run_id}", wallet_balance=amount * count * 2)
+
+        try:
+            report = {
+                'withdrawals': count,
+                'latency_ms': options['latency'],
+                'legacy': self._run(count, lambda: self._legacy_withdrawal(vendor, amount, provider)),
+                'two_phase': self._run(count, lambda: self._two_phase_withdrawal(vendor, amount, provider)),
+            }
+        finally:
+            WithdrawalOutbox.objects.filter(vendor=vendor).delete()
+            Transaction.objects.filter(vendor=vendor).delete()
+            vendor.delete()
+            user.delete()
+
+        legacy_hold = report['legacy']['lock_hold_ms']['avg']
+        two_phase_hold = report['two_phase']['lock_hold_ms']['avg']
+        report['lock_hold_reduction'] = round(legacy_hold / two_phase_hold, 1) if two_phase_hold else None
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(f"withdrawals={count} provider_latency={options['latency']}ms")
+        for flow in ('legacy', 'two_phase'):
+            hold = report[flow]['lock_hold_ms']
+            self.stdout.write(
+                f"{flow:<10} lock hold avg {hold['avg']:>8}ms  p95 {hold['p95']:>8}ms  max {hold['max']:>8}ms  "
+                f"total {report[flow]['seconds']}s"
+            )
+        self.stdout.write(self.style.SUCCESS(f"lock hold reduced {report['lock_hold_reduction']}x"))
+
+    def _run(self, count, withdraw):
+        started = time.perf_counter()
+        holds = sorted(withdraw() * 1000 for _ in range(count))
+        elapsed = time.perf_counter() - started
+        return {
+            'seconds': round(elapsed, 3),
+            'lock_hold_ms': {
+                'avg': round(statistics.mean(holds), 2),
+                'p95': round(holds[max(int(len(holds) * 0.95) - 1, 0)], 2),
+                'max': round(holds[-1], 2),
+            },
+        }
+
+    def _legacy_withdrawal(self, vendor, amount, provider):
+        """The previous flow: the provider is called while the vendor row is locked."""
+        started = time.perf_counter()
+        with transaction.atomic():
+            vendor_obj = Vendor.objects.select_for_update().get(pk=vendor.pk)
+            vendor_obj.wallet_balance -= amount
+            vendor_obj.save()
+            transaction_obj = Transaction.objects.create(vendor=vendor_obj, transaction_type='debit', amount=amount, status='pending')
+            result = provider.initiate(reference=new_withdrawal_reference(), amount=amount, recipient_code='RCP_bench')
+            transaction_obj.paystack_transfer_code = result['transfer_code']
+            transaction_obj.save()
+        return time.perf_counter() - started
+
+    def _two_phase_withdrawal(self, vendor, amount, provider):
+        """Only phase one holds the lock; the dispatch runs after it commits."""
+        started = time.perf_counter()
+        _, outbox, _ = reserve_withdrawal(vendor, amount, recipient_code='RCP_bench', enqueue=False)
+        held = time.perf_counter() - started
+        dispatch_withdrawal(outbox.pk, provider=provider)
+        return held
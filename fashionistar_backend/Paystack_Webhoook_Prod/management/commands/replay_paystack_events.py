@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from Paystack_Webhoook_Prod.models import PaystackEventStatus, PaystackWebhookEvent
+from Paystack_Webhoook_Prod.webhook_events import apply_due_webhook_events, replay_webhook_events
+
+
+class Command(BaseCommand):
+    """
+    Replays Paystack webhook events in batch.
+
+    *   With a file: stores and applies events the webhook missed (a JSON list of events or one
+        event per line, e.g. exported from the Paystack dashboard). Events that were already
+        received are skipped, so the same file can be replayed safely.
+    *   With --retry: puts failed events (and, with --include-ignored, unmatched ones) back in the
+        queue and applies every due event.
+
+    Usage:
+        python manage.py replay_paystack_events missed_events.json
+        python manage.py replay_paystack_events missed_events.jsonl --queue
+        python manage.py replay_paystack_events --retry --include-ignored
+    """
+    help = "Replays missed or failed Paystack webhook events exactly once"
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', nargs='?', help="JSON or JSON lines file of Paystack events")
+        parser.add_argument('--queue', action='store_true', help="Queue new events for the Celery worker instead of applying them inline")
+        parser.add_argument('--retry', action='store_true', help="Re-apply stored events that failed")
+        parser.add_argument('--include-ignored', action='store_true', help="With --retry, also re-apply events that matched no transaction")
+
+    def handle(self, *args, **options):
+        if not options['file'] and not options['retry']:
+            raise CommandError("Pass a file of events and/or --retry")
+
+        if options['file']:
+            stats = replay_webhook_events(self._load(options['file']), apply=not options['queue'])
+            self.stdout.write(f"replay: {stats}")
+
+        if options['retry']:
+            statuses = [PaystackEventStatus.FAILED]
+            if options['include_ignored']:
+                statuses.append(PaystackEventStatus.IGNORED)
+            requeued = PaystackWebhookEvent.objects.filter(status__in=statuses).update(
+                status=PaystackEventStatus.RECEIVED, attempts=0, next_attempt_at=timezone.now()
+            )
+            stats = apply_due_webhook_events(limit=max(requeued, 500))
+            self.stdout.write(f"retry: requeued={requeued} {stats}")
+
+        self.stdout.write(self.style.SUCCESS("Replay finished"))
+
+    def _load(self, path):
+        with open(path, encoding='utf-8') as f:
+            content = f.read().strip()
+        try:
+            if content.startswith('['):
+                return json.loads(content)
+            return [json.loads(line) for line in content.splitlines() if line.strip()]
+        except json.JSONDecodeError as e:
+            raise CommandError(f"Invalid event file {path}: {e}")
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 import uuid
 from userauths.models import User
 from django.utils.translation import gettext_lazy as _
@@ -73,6 +74,106 @@ def __str__(self):
 
 
 
+class WithdrawalOutboxStatus(models.TextChoices):
+    PENDING = 'pending', _('Pending')
+    PROCESSING = 'processing', _('Processing')
+    SENT = 'sent', _('Sent')
+    FAILED = 'failed', _('Failed')
+    # The provider may or may not have made the transfer: the reserved amount is held until someone checks
+    REVIEW = 'review', _('Needs review')
+
+
+class WithdrawalOutbox(models.Model):
+    """
+    A transfer waiting to be sent to the payment provider for a reserved vendor withdrawal.
+
+    The row is written in the same short transaction that debits the vendor's wallet and creates
+    the pending debit Transaction, so a withdrawal is either fully reserved with its transfer queued
+    or not recorded at all. The outbox worker sends the transfer afterwards, outside any row lock.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    transaction = models.OneToOneField(Transaction, on_delete=models.CASCADE, related_name='withdrawal_outbox')
+    vendor = models.ForeignKey("vendor.Vendor", on_delete=models.CASCADE, related_name='withdrawal_outbox')
+
+    amount = models.DecimalField(max_digits=100, decimal_places=2)
+    recipient_code = models.CharField(max_length=100)
+    reason = models.TextField(blank=True, null=True)
+    # Sent to the provider as the transfer reference; retries reuse it so a transfer is never paid twice
+    reference = models.CharField(max_length=100, unique=True)
+
+    status = models.CharField(max_length=20, choices=WithdrawalOutboxStatus.choices, default=WithdrawalOutboxStatus.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Withdrawal Outbox"
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"Withdrawal {self.reference} of {self.amount} - {self.get_status_display()}"
+
+
+
+
+
+
+
+class PaystackEventStatus(models.TextChoices):
+    RECEIVED = 'received', _('Received')
+    PROCESSING = 'processing', _('Processing')
+    PROCESSED = 'processed', _('Processed')
+    IGNORED = 'ignored', _('Ignored')
+    FAILED = 'failed', _('Failed')
+
+
+class PaystackWebhookEvent(models.Model):
+    """
+    A verified Paystack webhook event, stored as received before it is applied.
+
+    The webhook view only writes this row and answers 200; a Celery worker applies the event
+    afterwards. Paystack delivers an event at least once, so (event, reference) is unique: a
+    redelivered or replayed event hits the constraint and is never applied a second time.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event = models.CharField(max_length=50)
+    reference = models.CharField(max_length=100)
+    payload = models.JSONField()
+
+    status = models.CharField(max_length=20, choices=PaystackEventStatus.choices, default=PaystackEventStatus.RECEIVED)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    result = models.CharField(max_length=50, blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        verbose_name_plural = "Paystack Webhook Events"
+        ordering = ['received_at']
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'reference'], name='unique_paystack_event_reference'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event} {self.reference} - {self.get_status_display()}"
+
+
+
+
+
+
+
 class BankAccountDetails(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='user_bank_details')
@@ -2,6 +2,7 @@
 from userauths.models import User
 from vendor.models import Vendor
 from Paystack_Webhoook_Prod.models import BankAccountDetails
+from Paystack_Webhoook_Prod.bank_directory import get_bank_directory
 from rest_framework.exceptions import ValidationError
 from collections import OrderedDict
 
@@ -51,13 +52,11 @@ def errors(self):
     def to_internal_value(self, data):
         data = super().to_internal_value(data)
         if data.get('bank_name'):
-            from Paystack_Webhoook_Prod.BANKS_LIST import BANK_CHOICES
-            bank_name = data.get('bank_name')
-            for bank in BANK_CHOICES:
-              if bank['bank_name'] == bank_name:
-                  data['bank_code'] = bank['bank_code']
-                  return data
-            raise serializers.ValidationError("Invalid bank name")
+            bank = get_bank_directory().by_name(data['bank_name'])
+            if bank is None:
+                raise serializers.ValidationError("Invalid bank name")
+            data['bank_name'] = bank['bank_name']
+            data['bank_code'] = bank['bank_code']
         return data
 
 
@@ -0,0 +1,85 @@
+# Paystack_Webhoook_Prod/tasks.py
+
+from celery import shared_task
+import logging
+
+from Paystack_Webhoook_Prod.models import PaystackEventStatus, WithdrawalOutboxStatus
+from Paystack_Webhoook_Prod.webhook_events import apply_due_webhook_events, apply_webhook_event, enqueue_webhook_event
+from Paystack_Webhoook_Prod.withdrawals import dispatch_due_withdrawals, dispatch_withdrawal, enqueue_withdrawal
+
+# Get logger for application
+application_logger = logging.getLogger('application')
+
+
+@shared_task(name="dispatch_withdrawal_transfer")
+def dispatch_withdrawal_transfer(outbox_id: str) -> str | None:
+    """
+    Sends the transfer for a reserved vendor withdrawal (phase two of the withdrawal).
+
+    Retryable failures are written back to the outbox with their next attempt time and re-queued
+    for that time; the periodic sweep covers the case where the re-queue is lost.
+
+    Args:
+        outbox_id (str): The WithdrawalOutbox id.
+
+    Returns:
+        str | None: The outbox status after this attempt, or None if the row was not due.
+    """
+    outbox = dispatch_withdrawal(outbox_id)
+    if outbox is None:
+        return None
+
+    if outbox.status == WithdrawalOutboxStatus.PENDING:
+        enqueue_withdrawal(outbox.pk, eta=outbox.next_attempt_at)
+    return outbox.status
+
+
+@shared_task(name="dispatch_pending_withdrawals")
+def dispatch_pending_withdrawals() -> dict:
+    """
+    Periodic sweep over the withdrawal outbox (see CELERY_BEAT_SCHEDULE).
+
+    Returns:
+        dict: Number of rows per resulting status.
+    """
+    stats = dispatch_due_withdrawals()
+    if stats['due']:
+        application_logger.info(f"Withdrawal outbox sweep: {stats}")
+    return stats
+
+
+@shared_task(name="apply_paystack_webhook_event")
+def apply_paystack_webhook_event(event_id: str) -> str | None:
+    """
+    Applies a stored Paystack webhook event (see webhook_events.py).
+
+    A failed attempt is re-queued for its next attempt time; the periodic sweep covers the case
+    where the re-queue is lost.
+
+    Args:
+        event_id (str): The PaystackWebhookEvent id.
+
+    Returns:
+        str | None: The event status after this attempt, or None if it was not due.
+    """
+    event = apply_webhook_event(event_id)
+    if event is None:
+        return None
+
+    if event.status == PaystackEventStatus.RECEIVED:
+        enqueue_webhook_event(event.pk, eta=event.next_attempt_at)
+    return event.status
+
+
+@shared_task(name="apply_pending_webhook_events")
+def apply_pending_webhook_events() -> dict:
+    """
+    Periodic sweep over stored Paystack webhook events (see CELERY_BEAT_SCHEDULE).
+
+    Returns:
+        dict: Number of events per resulting status.
+    """
+    stats = apply_due_webhook_events()
+    if stats['due']:
+        application_logger.info(f"Paystack webhook event sweep: {stats}")
+    return stats
@@ -1,3 +1,303 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from Paystack_Webhoook_Prod.BANKS_LIST import BANK_CHOICES
+from Paystack_Webhoook_Prod.bank_directory import AccountResolver, FakeAccountProvider, forget_recipient, get_bank_directory, normalize_bank_name
+from Paystack_Webhoook_Prod.models import PaystackEventStatus, PaystackWebhookEvent, Transaction, TransactionStatus, WithdrawalOutbox, WithdrawalOutboxStatus
+from Paystack_Webhoook_Prod.serializers__BankAccountDetails import BankAccountDetailsSerializer
+from Paystack_Webhoook_Prod.webhook import paystack_webhook_view
+from Paystack_Webhoook_Prod.webhook_events import apply_due_webhook_events, apply_webhook_event, replay_webhook_events
+from Paystack_Webhoook_Prod.withdrawals import InsufficientBalanceError, dispatch_due_withdrawals, dispatch_withdrawal, release_withdrawal, reserve_withdrawal
+from userauths.models import Profile, User
+from vendor.models import Vendor
+
+TEST_SECRET = 'sk_test_local_signer'
+
+
+class FakePaystackSigner:
+    """Signs webhook bodies the way Paystack does (HMAC-SHA512 of the body with the secret key)."""
+
+    def __init__(self, secret=TEST_SECRET):
+        self.secret = secret
+
+    def sign(self, body):
+        return hmac.new(self.secret.encode('utf-8'), body.encode('utf-8'), hashlib.sha512).hexdigest()
+
+    def request(self, payload):
+        body = json.dumps(payload)
+        return RequestFactory().post(
+            '/api/paystack/webhook/', data=body, content_type='application/json',
+            HTTP_X_PAYSTACK_SIGNATURE=self.sign(body),
+        )
+
+
+def charge_success(reference, amount_kobo):
+    return {'event': 'charge.success', 'data': {'reference': reference, 'amount': amount_kobo, 'status': 'success'}}
+
+
+@override_settings(PAYSTACK_SECRET_KEY=TEST_SECRET)
+class PaystackWebhookIngestionTest(TestCase):
+    def setUp(self):
+        self.signer = FakePaystackSigner()
+        self.user = User.objects.create_user(email='payer@example.com', password='password123')
+        self.profile, _ = Profile.objects.get_or_create(user=self.user)
+
+    def _deposit(self, amount='100.00'):
+        reference = f"ref-{uuid.uuid4().hex}"
+        Transaction.objects.create(
+            user=self.user, transaction_type='credit', amount=Decimal(amount),
+            paystack_payment_reference=reference, status=TransactionStatus.PENDING,
+        )
+        return reference
+
+    def _balance(self):
+        return Profile.objects.get(pk=self.profile.pk).wallet_balance
+
+    def test_rejects_invalid_signature(self):
+        request = self.signer.request(charge_success('ref-x', 1000))
+        request.META['HTTP_X_PAYSTACK_SIGNATURE'] = FakePaystackSigner('wrong').sign(request.body.decode())
+        self.assertEqual(paystack_webhook_view(request).status_code, 401)
+        self.assertFalse(PaystackWebhookEvent.objects.exists())
+
+    def test_view_stores_event_without_applying_it(self):
+        reference = self._deposit()
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = paystack_webhook_view(self.signer.request(charge_success(reference, 10000)))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(callbacks), 1)
+        event = PaystackWebhookEvent.objects.get(reference=reference)
+        self.assertEqual(event.status, PaystackEventStatus.RECEIVED)
+        self.assertEqual(self._balance(), Decimal('0'))
+
+    def test_redelivered_event_is_applied_once(self):
+        reference = self._deposit()
+        for _ in range(3):
+            self.assertEqual(paystack_webhook_view(self.signer.request(charge_success(reference, 10000))).status_code, 200)
+
+        self.assertEqual(PaystackWebhookEvent.objects.filter(reference=reference).count(), 1)
+        stats = apply_due_webhook_events()
+        self.assertEqual(stats['processed'], 1)
+        self.assertIsNone(apply_webhook_event(PaystackWebhookEvent.objects.get(reference=reference).pk))
+        self.assertEqual(self._balance(), Decimal('100.00'))
+
+    def test_batch_replay_skips_events_already_received(self):
+        references = [self._deposit() for _ in range(5)]
+        paystack_webhook_view(self.signer.request(charge_success(references[0], 10000)))
+        apply_due_webhook_events()
+
+        payloads = [charge_success(reference, 10000) for reference in references]
+        stats = replay_webhook_events(payloads + payloads)
+        self.assertEqual(stats['duplicates'], 6)
+        self.assertEqual(stats['processed'], 4)
+        self.assertEqual(replay_webhook_events(payloads)['processed'], 0)
+        self.assertEqual(self._balance(), Decimal('500.00'))
+
+    def test_failed_transfer_refunds_vendor_once(self):
+        vendor_user = User.objects.create_user(email='vendor@example.com', password='password123', role=User.VENDOR)
+        vendor = Vendor.objects.create(user=vendor_user, name='vendor', wallet_balance=Decimal('0'))
+        Transaction.objects.create(
+            vendor=vendor, transaction_type='debit', amount=Decimal('50.00'), status=TransactionStatus.PENDING,
+            paystack_payment_reference='wd-1', paystack_transfer_code='TRF_1',
+        )
+        failed = {'event': 'transfer.failed', 'data': {'transfer_code': 'TRF_1', 'reference': 'wd-1', 'status': 'failed', 'reason': 'x'}}
+        reversed_ = {'event': 'transfer.reversed', 'data': {'transfer_code': 'TRF_1', 'reference': 'wd-1', 'status': 'reversed', 'reason': 'x', 'amount': 5000}}
+
+        replay_webhook_events([failed, reversed_])
+        self.assertEqual(Vendor.objects.get(pk=vendor.pk).wallet_balance, Decimal('50.00'))
+
+    def test_bulk_ingest_then_apply(self):
+        count = 200
+        references = [self._deposit('1.00') for _ in range(count)]
+        requests = [self.signer.request(charge_success(reference, 100)) for reference in references]
+
+        for request in requests:
+            self.assertEqual(paystack_webhook_view(request).status_code, 200)
+
+        stats = apply_due_webhook_events(limit=count)
+        self.assertEqual(stats['processed'], count)
+        self.assertEqual(self._balance(), Decimal(count))
+
+
+class ScriptedTransferProvider:
+    """Transfer provider that answers ``initiate`` with queued results and ``lookup`` with ``found``."""
+
+    def __init__(self, *results, found=None, lookup_error=None):
+        self.results = list(results)
+        self.found = found
+        self.lookup_error = lookup_error
+        self.initiated = []
+        self.lookups = 0
+
+    def initiate(self, reference, amount, recipient_code, reason=None):
+        self.initiated.append(reference)
+        return self.results.pop(0)
+
+    def lookup(self, reference):
+        self.lookups += 1
+        if self.lookup_error:
+            raise self.lookup_error
+        return self.found
+
+
+SENT = {'status': True, 'retryable': False, 'transfer_code': 'TRF_sent', 'message': 'Transfer has been queued'}
+TIMEOUT = {'status': False, 'retryable': True, 'transfer_code': None, 'message': 'Read timed out'}
+REJECTED = {'status': False, 'retryable': False, 'transfer_code': None, 'message': 'Invalid recipient'}
+
+
+@override_settings(WITHDRAWAL_MAX_ATTEMPTS=2)
+class WithdrawalOutboxTest(TestCase):
+    def setUp(self):
+        vendor_user = User.objects.create_user(email='withdrawer@example.com', password='password123', role=User.VENDOR)
+        self.vendor = Vendor.objects.create(user=vendor_user, name='withdrawer', wallet_balance=Decimal('100.00'))
+        self.transaction, self.outbox, self.balance = reserve_withdrawal(self.vendor, Decimal('40.00'), 'RCP_1', enqueue=False)
+
+    def _wallet(self):
+        return Vendor.objects.get(pk=self.vendor.pk).wallet_balance
+
+    def _status(self):
+        return WithdrawalOutbox.objects.get(pk=self.outbox.pk).status, Transaction.objects.get(pk=self.transaction.pk).status
+
+    def _dispatch(self, provider):
+        # Retries are scheduled with a backoff: make the row due again
+        WithdrawalOutbox.objects.filter(pk=self.outbox.pk).update(next_attempt_at=timezone.now())
+        return dispatch_withdrawal(self.outbox.pk, provider=provider)
+
+    def test_reserve_debits_wallet_and_queues_transfer(self):
+        self.assertEqual(self.balance, Decimal('60.00'))
+        self.assertEqual(self._status(), (WithdrawalOutboxStatus.PENDING, TransactionStatus.PENDING))
+        self.assertEqual(self.outbox.reference, self.transaction.paystack_payment_reference)
+
+        with self.assertRaises(InsufficientBalanceError):
+            reserve_withdrawal(self.vendor, Decimal('60.01'), 'RCP_1', enqueue=False)
+        self.assertEqual(self._wallet(), Decimal('60.00'))
+        self.assertEqual(WithdrawalOutbox.objects.count(), 1)
+
+    def test_dispatch_records_transfer_code_once(self):
+        provider = ScriptedTransferProvider(SENT)
+        self.assertEqual(self._dispatch(provider).status, WithdrawalOutboxStatus.SENT)
+        self.assertEqual(Transaction.objects.get(pk=self.transaction.pk).paystack_transfer_code, 'TRF_sent')
+        self.assertIsNone(self._dispatch(provider))
+        self.assertEqual(len(provider.initiated), 1)
+
+    def test_retry_reuses_reference_and_looks_up_first(self):
+        provider = ScriptedTransferProvider(TIMEOUT, SENT)
+        outbox = self._dispatch(provider)
+        self.assertEqual((outbox.status, outbox.attempts), (WithdrawalOutboxStatus.PENDING, 1))
+        self.assertGreater(WithdrawalOutbox.objects.get(pk=self.outbox.pk).next_attempt_at, timezone.now())
+
+        self.assertEqual(self._dispatch(provider).status, WithdrawalOutboxStatus.SENT)
+        self.assertEqual(provider.initiated, [self.outbox.reference] * 2)
+        self.assertEqual(provider.lookups, 1)
+        self.assertEqual(self._wallet(), Decimal('60.00'))
+
+    def test_definitive_failure_releases_once(self):
+        outbox = self._dispatch(ScriptedTransferProvider(REJECTED))
+        self.assertEqual(self._status(), (WithdrawalOutboxStatus.FAILED, TransactionStatus.FAILED))
+        self.assertEqual(self._wallet(), Decimal('100.00'))
+
+        release_withdrawal(outbox, 'released again')
+        self.assertEqual(self._wallet(), Decimal('100.00'))
+
+    def test_last_timeout_releases_when_transfer_does_not_exist(self):
+        provider = ScriptedTransferProvider(TIMEOUT, TIMEOUT)
+        self._dispatch(provider)
+        self.assertEqual(self._dispatch(provider).status, WithdrawalOutboxStatus.FAILED)
+        self.assertEqual(self._wallet(), Decimal('100.00'))
+
+    def test_last_timeout_marks_sent_when_transfer_exists(self):
+        provider = ScriptedTransferProvider(TIMEOUT, TIMEOUT)
+        self._dispatch(provider)
+        provider.found = {'transfer_code': 'TRF_late', 'status': 'success'}
+        # The lookup before the second send already finds it
+        self.assertEqual(self._dispatch(provider).status, WithdrawalOutboxStatus.SENT)
+        self.assertEqual(Transaction.objects.get(pk=self.transaction.pk).paystack_transfer_code, 'TRF_late')
+        self.assertEqual(self._wallet(), Decimal('60.00'))
+
+    def test_last_timeout_with_unknown_outcome_is_held_for_review(self):
+        provider = ScriptedTransferProvider(TIMEOUT, TIMEOUT)
+        self._dispatch(provider)
+        provider.lookup_error = ConnectionError('Paystack unreachable')
+        self.assertEqual(self._dispatch(provider).status, WithdrawalOutboxStatus.REVIEW)
+        self.assertEqual(self._status(), (WithdrawalOutboxStatus.REVIEW, TransactionStatus.PENDING))
+        self.assertEqual(self._wallet(), Decimal('60.00'))
+        # Not picked up again by the sweep
+        self.assertEqual(dispatch_due_withdrawals(provider=provider)['due'], 0)
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class BankDirectoryTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = get_bank_directory()
+
+    def test_lookups_by_code_slug_and_name(self):
+        self.assertEqual(len(self.directory), len(BANK_CHOICES))
+        self.assertEqual([bank['bank_name'] for bank in self.directory.by_code('044')], ['Access Bank'])
+        # Codes shared by two banks return both
+        self.assertEqual(len(self.directory.by_code('50739')), 2)
+        self.assertEqual(self.directory.by_slug('access-bank-diamond')['bank_code'], '063')
+        self.assertEqual(self.directory.by_name('  access   BANK ')['bank_code'], '044')
+        self.assertIsNone(self.directory.by_name('Not A Bank'))
+
+    def test_prefix_search_matches_a_scan(self):
+        for prefix in ('acc', 'Access Bank', 'z', 'mfb', '9', ''):
+            expected = sorted(
+                (bank for bank in BANK_CHOICES if normalize_bank_name(bank['bank_name']).startswith(normalize_bank_name(prefix))),
+                key=lambda bank: normalize_bank_name(bank['bank_name']),
+            )[:20]
+            self.assertEqual([bank['bank_code'] for bank in self.directory.search(prefix)], [bank['bank_code'] for bank in expected])
+
+    def test_serializer_maps_bank_name_to_code(self):
+        serializer = BankAccountDetailsSerializer(data={'account_number': '0123456789', 'account_full_name': 'Jane Doe', 'bank_name': 'access bank'})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual((serializer.validated_data['bank_name'], serializer.validated_data['bank_code']), ('Access Bank', '044'))
+        self.assertFalse(BankAccountDetailsSerializer(data={'bank_name': 'Not A Bank'}).is_valid())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AccountResolutionTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.resolver = AccountResolver(provider=FakeAccountProvider(latency=0.05))
+
+    def test_resolutions_are_cached(self):
+        first = self.resolver.resolve('0123456789', '044')
+        self.assertEqual(first['data']['account_name'], 'FAKE ACCOUNT 6789')
+        self.assertEqual(self.resolver.resolve('0123456789', '044'), first)
+        self.assertEqual(self.resolver.provider.calls, 1)
+        self.assertEqual(self.resolver.stats['hits'], 1)
+
+        # Failures are not cached
+        self.assertFalse(self.resolver.resolve('0123456789', 'XXX')['status'])
+        self.resolver.resolve('0123456789', 'XXX')
+        self.assertEqual(self.resolver.provider.calls, 3)
+
+    def test_concurrent_identical_resolutions_share_one_call(self):
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            results = list(executor.map(lambda _: self.resolver.resolve('0123456789', '044'), range(10)))
+        self.assertEqual(self.resolver.provider.calls, 1)
+        self.assertEqual(self.resolver.stats['coalesced'] + self.resolver.stats['hits'], 9)
+        self.assertTrue(all(result == results[0] for result in results))
+
+    def test_recipients_are_reused_for_the_same_account_and_name(self):
+        recipient_data = {'type': 'nuban', 'name': 'Jane Doe', 'account_number': '0123456789', 'bank_code': '044'}
+        created = self.resolver.create_recipient(recipient_data)
+        self.assertEqual(self.resolver.create_recipient({**recipient_data, 'name': 'JANE  DOE'}), created)
+        self.assertEqual(self.resolver.provider.calls, 1)
+
+        self.resolver.create_recipient({**recipient_data, 'name': 'John Doe'})
+        self.assertEqual(self.resolver.provider.calls, 2)
+
+        forget_recipient('044', '0123456789')
+        self.resolver.create_recipient({**recipient_data, 'name': 'John Doe'})
+        self.assertEqual(self.resolver.provider.calls, 3)
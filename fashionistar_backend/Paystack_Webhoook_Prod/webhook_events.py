@@ -0,0 +1,384 @@
+'''
+Paystack webhook ingestion.
+
+The webhook view verifies the signature and calls ``record_webhook_event``: the raw event is
+stored in ``PaystackWebhookEvent`` and Paystack gets its 200 straight away. The Celery worker
+applies the event afterwards (``apply_webhook_event``), and the periodic sweep picks up events
+whose task was lost or failed.
+
+An event is applied exactly once:
+
+*   A redelivered or replayed event hits the (event, reference) unique constraint and is not
+    stored again.
+*   A stored event is claimed with a conditional update, so two workers never apply it together.
+*   The handler and the event's processed status are written in one transaction; a worker that
+    dies mid-way leaves nothing behind and the event is claimed again when its lease expires.
+*   Wallets are credited with ``F()`` updates, and only by the call that moves the Transaction to
+    its new status, so even two differently keyed events for the same payment cannot credit twice.
+'''
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from Paystack_Webhoook_Prod.models import PaystackEventStatus, PaystackWebhookEvent, Transaction, TransactionStatus
+from userauths.models import Profile
+from vendor.models import Vendor
+
+# Get logger for webhook
+webhook_logger = logging.getLogger('webhook')
+
+# Outcomes of an event handler, stored in PaystackWebhookEvent.result
+APPLIED = 'applied'
+DUPLICATE = 'duplicate'
+UNMATCHED = 'unmatched'
+UNHANDLED = 'unhandled'
+
+
+def event_reference(payload, raw_body=None):
+    '''
+    The key an event is stored under: Paystack's ``reference``, falling back to the transfer code,
+    the event id and finally a hash of the body for events that carry none of them.
+    '''
+    data = payload.get('data') or {}
+    for field in ('reference', 'transfer_code', 'id'):
+        if data.get(field):
+            return str(data[field])[:100]
+    body = raw_body if raw_body is not None else json.dumps(payload, sort_keys=True)
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+
+def record_webhook_event(payload, raw_body=None, enqueue=True):
+    '''
+    Stores a verified webhook event and queues it for the worker on commit.
+
+    Args:
+        payload (dict): The decoded event.
+        raw_body (str, optional): The request body, used to key events without a reference.
+        enqueue (bool): Queue the apply task on commit.
+
+    Returns:
+        tuple: (PaystackWebhookEvent, created). ``created`` is False for a redelivered event.
+    '''
+    event_name = payload.get('event') or 'unknown'
+    reference = event_reference(payload, raw_body)
+    try:
+        with transaction.atomic():
+            event = PaystackWebhookEvent.objects.create(event=event_name, reference=reference, payload=payload)
+    except IntegrityError:
+        webhook_logger.info(f"Duplicate webhook event {event_name} for reference {reference} ignored")
+        return PaystackWebhookEvent.objects.get(event=event_name, reference=reference), False
+
+    if enqueue:
+        transaction.on_commit(lambda: enqueue_webhook_event(event.pk))
+    return event, True
+
+
+def enqueue_webhook_event(event_id, eta=None):
+    '''
+    Hands a stored event to the Celery worker. If the broker is unreachable the event stays
+    received and the periodic ``apply_pending_webhook_events`` task picks it up.
+    '''
+    from Paystack_Webhoook_Prod.tasks import apply_paystack_webhook_event
+
+    try:
+        apply_paystack_webhook_event.apply_async(args=[str(event_id)], eta=eta)
+    except Exception as e:
+        webhook_logger.warning(f"Could not enqueue webhook event {event_id}, it will be picked up by the sweep: {e}")
+
+
+def claim_webhook_event(event_id):
+    '''
+    Marks a due event as processing and leases it to the caller.
+
+    Returns:
+        PaystackWebhookEvent | None: The claimed event, or None if it is not due or already applied.
+    '''
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'PAYSTACK_WEBHOOK_CLAIM_LEASE', 300))
+    claimed = PaystackWebhookEvent.objects.filter(
+        pk=event_id,
+        status__in=[PaystackEventStatus.RECEIVED, PaystackEventStatus.PROCESSING],
+        next_attempt_at__lte=now,
+    ).update(
+        status=PaystackEventStatus.PROCESSING,
+        attempts=F('attempts') + 1,
+        next_attempt_at=now + lease,
+    )
+    if not claimed:
+        return None
+    return PaystackWebhookEvent.objects.get(pk=event_id)
+
+
+def apply_webhook_event(event_id):
+    '''
+    Applies one stored event and records the outcome.
+
+    A handler error puts the event back with a backoff delay until ``PAYSTACK_WEBHOOK_MAX_ATTEMPTS``
+    is reached, after which it is marked failed for manual replay.
+
+    Returns:
+        PaystackWebhookEvent | None: The event with its new status, or None if it was not claimable.
+    '''
+    event = claim_webhook_event(event_id)
+    if event is None:
+        return None
+
+    try:
+        with transaction.atomic():
+            result = handle_paystack_event(event.payload)
+            event.status = PaystackEventStatus.IGNORED if result in (UNMATCHED, UNHANDLED) else PaystackEventStatus.PROCESSED
+            event.result = result
+            event.processed_at = timezone.now()
+            PaystackWebhookEvent.objects.filter(pk=event.pk).update(
+                status=event.status, result=result, processed_at=event.processed_at, last_error=None
+            )
+        return event
+    except Exception as e:
+        webhook_logger.error(f"Error applying webhook event {event.event} for reference {event.reference}: {e}")
+        event.last_error = str(e)
+
+    if event.attempts < getattr(settings, 'PAYSTACK_WEBHOOK_MAX_ATTEMPTS', 5):
+        event.status = PaystackEventStatus.RECEIVED
+        base = getattr(settings, 'PAYSTACK_WEBHOOK_RETRY_DELAY', 60)
+        event.next_attempt_at = timezone.now() + timedelta(seconds=min(base * 2 ** (event.attempts - 1), 3600))
+    else:
+        event.status = PaystackEventStatus.FAILED
+    PaystackWebhookEvent.objects.filter(pk=event.pk).update(
+        status=event.status, next_attempt_at=event.next_attempt_at, last_error=event.last_error
+    )
+    return event
+
+
+def apply_due_webhook_events(limit=500):
+    '''
+    Applies stored events that are due: events whose task never ran, scheduled retries and
+    events whose worker lease expired.
+
+    Returns:
+        dict: Number of events per resulting status.
+    '''
+    due_ids = list(
+        PaystackWebhookEvent.objects.filter(
+            status__in=[PaystackEventStatus.RECEIVED, PaystackEventStatus.PROCESSING],
+            next_attempt_at__lte=timezone.now(),
+        ).order_by('received_at').values_list('id', flat=True)[:limit]
+    )
+    return _apply_events(due_ids, {'due': len(due_ids)})
+
+
+def replay_webhook_events(payloads, apply=True):
+    '''
+    Batch replay of events missed by the webhook (e.g. exported from the Paystack dashboard
+    during an outage). Events already stored are skipped, new ones are inserted in bulk.
+
+    Args:
+        payloads (list[dict]): Decoded events.
+        apply (bool): Apply the new events inline instead of queueing them for the worker.
+
+    Returns:
+        dict: Number of events received, skipped as duplicates and per resulting status.
+    '''
+    keyed = {}
+    for payload in payloads:
+        keyed.setdefault((payload.get('event') or 'unknown', event_reference(payload)), payload)
+
+    existing = set(
+        PaystackWebhookEvent.objects.filter(reference__in={reference for _, reference in keyed})
+        .values_list('event', 'reference')
+    )
+    new_events = [
+        PaystackWebhookEvent(event=event_name, reference=reference, payload=payload)
+        for (event_name, reference), payload in keyed.items()
+        if (event_name, reference) not in existing
+    ]
+    # A concurrent webhook delivery of the same event wins the constraint; claiming skips the loser
+    PaystackWebhookEvent.objects.bulk_create(new_events, batch_size=500, ignore_conflicts=True)
+
+    stats = {'received': len(payloads), 'duplicates': len(payloads) - len(new_events)}
+    event_ids = [event.pk for event in new_events]
+    if not apply:
+        for event_id in event_ids:
+            enqueue_webhook_event(event_id)
+        stats['queued'] = len(event_ids)
+        return stats
+    return _apply_events(event_ids, stats)
+
+
+def _apply_events(event_ids, stats):
+    stats.update({'processed': 0, 'ignored': 0, 'retrying': 0, 'failed': 0, 'skipped': 0})
+    for event_id in event_ids:
+        event = apply_webhook_event(event_id)
+        if event is None:
+            stats['skipped'] += 1
+        elif event.status == PaystackEventStatus.RECEIVED:
+            stats['retrying'] += 1
+        else:
+            stats[event.status] += 1
+    return stats
+
+
+def handle_paystack_event(payload):
+    '''
+    Dispatches an event to its handler.
+
+    Returns:
+        str: The handler outcome (APPLIED, DUPLICATE, UNMATCHED or UNHANDLED).
+    '''
+    event = payload.get('event')
+    data = payload.get('data') or {}
+    handlers = {
+        'charge.success': handle_successful_charge,
+        'charge.failed': handle_failed_charge,
+        'transfer.success': handle_successful_transfer,
+        'transfer.failed': handle_failed_transfer,
+        'transfer.reversed': handle_reversed_transfer,
+    }
+    handler = handlers.get(event)
+    if handler is None:
+        webhook_logger.warning(f"Unhandled webhook event: {event}, payload is {payload}")
+        return UNHANDLED
+    return handler(data)
+
+
+def handle_successful_charge(data):
+    '''
+    Marks a deposit successful and credits the wallet of its owner.
+    '''
+    reference = data['reference']
+    amount = Decimal(data['amount']) / 100
+    paystack_transaction = Transaction.objects.select_related('vendor').filter(paystack_payment_reference=reference).first()
+    if paystack_transaction is None:
+        webhook_logger.error(f"Transaction record does not exist for reference {reference}")
+        return UNMATCHED
+
+    # Only the call that moves the transaction to success credits the wallet
+    verified = Transaction.objects.filter(pk=paystack_transaction.pk).exclude(
+        status=TransactionStatus.SUCCESS
+    ).update(status=TransactionStatus.SUCCESS)
+    if not verified:
+        webhook_logger.info(f"Payment already verified, reference:{reference}")
+        return DUPLICATE
+
+    if paystack_transaction.user_id:
+        Profile.objects.filter(user_id=paystack_transaction.user_id).update(wallet_balance=F('wallet_balance') + amount)
+        webhook_logger.info(f"Updated user {paystack_transaction.user_id} balance, transaction reference: {reference}")
+    elif paystack_transaction.vendor_id:
+        Profile.objects.filter(user_id=paystack_transaction.vendor.user_id).update(wallet_balance=F('wallet_balance') + amount)
+        webhook_logger.info(f"Updated vendor {paystack_transaction.vendor} balance, transaction reference: {reference}")
+    return APPLIED
+
+
+def handle_failed_charge(data):
+    '''
+    Marks a pending deposit as failed. A charge that already succeeded is left alone.
+    '''
+    reference = data['reference']
+    status = data['status']
+    if not Transaction.objects.filter(paystack_payment_reference=reference).exists():
+        webhook_logger.error(f"Transaction record does not exist for reference: {reference}")
+        return UNMATCHED
+
+    updated = Transaction.objects.filter(
+        paystack_payment_reference=reference, status=TransactionStatus.PENDING
+    ).update(status=status)
+    if not updated:
+        webhook_logger.info(f"Transaction is no longer pending, reference {reference}")
+        return DUPLICATE
+    webhook_logger.info(f"Updated transaction status to: {status}, reference {reference}")
+    return APPLIED
+
+
+def handle_successful_transfer(data):
+    '''
+    Marks a vendor withdrawal transfer as successful.
+    '''
+    transfer_code = data.get('transfer_code')
+    paystack_transaction = _transfer_transaction(data)
+    if paystack_transaction is None:
+        webhook_logger.error(f"Transaction record does not exist for transfer code: {transfer_code}")
+        return UNMATCHED
+
+    updated = Transaction.objects.filter(pk=paystack_transaction.pk, status=TransactionStatus.PENDING).update(
+        status=TransactionStatus.SUCCESS, paystack_transfer_code=transfer_code
+    )
+    if not updated:
+        if paystack_transaction.status != TransactionStatus.SUCCESS:
+            webhook_logger.error(f"Transfer {transfer_code} succeeded but its transaction is {paystack_transaction.status}")
+        else:
+            webhook_logger.info(f"Transfer already verified, transfer code: {transfer_code}")
+        return DUPLICATE
+    webhook_logger.info(f"Updated transfer status to success, transfer code: {transfer_code}")
+    return APPLIED
+
+
+def handle_failed_transfer(data):
+    '''
+    Marks a vendor withdrawal transfer as failed and returns the amount to the vendor's wallet.
+    '''
+    transfer_code = data.get('transfer_code')
+    reason = data.get('reason')
+    paystack_transaction = _transfer_transaction(data)
+    if paystack_transaction is None:
+        webhook_logger.error(f"Transaction record not found for transfer code: {transfer_code}")
+        return UNMATCHED
+
+    if not _refund_transfer(paystack_transaction, TransactionStatus.FAILED, paystack_transaction.amount):
+        webhook_logger.info(f"Transfer {transfer_code} was already refunded, status is {paystack_transaction.status}")
+        return DUPLICATE
+    webhook_logger.info(f"Failed transfer for vendor: {paystack_transaction.vendor_id}, amount {paystack_transaction.amount} was returned, Reason for failiure is {reason}, transfer code is : {transfer_code}")
+    return APPLIED
+
+
+def handle_reversed_transfer(data):
+    '''
+    Marks a vendor withdrawal transfer as reversed and returns the reversed amount to the vendor's wallet.
+    '''
+    transfer_code = data.get('transfer_code')
+    reason = data.get('reason')
+    amount = Decimal(data['amount']) / 100
+    paystack_transaction = _transfer_transaction(data)
+    if paystack_transaction is None:
+        webhook_logger.error(f"Transaction record not found for transfer code: {transfer_code}")
+        return UNMATCHED
+
+    if not _refund_transfer(paystack_transaction, data.get('status') or 'reversed', amount):
+        webhook_logger.info(f"Transfer {transfer_code} was already refunded, status is {paystack_transaction.status}")
+        return DUPLICATE
+    webhook_logger.info(f"Reversed transfer for vendor: {paystack_transaction.vendor_id}, amount {amount} was returned, Reason for failiure is {reason}, transfer code is : {transfer_code}")
+    return APPLIED
+
+
+def _transfer_transaction(data):
+    '''
+    Finds the debit Transaction of a transfer by its transfer code or, when the webhook arrives
+    before the outbox worker stored the code, by the withdrawal reference.
+    '''
+    lookup = Q()
+    if data.get('transfer_code'):
+        lookup |= Q(paystack_transfer_code=data['transfer_code'])
+    if data.get('reference'):
+        lookup |= Q(paystack_payment_reference=data['reference'])
+    if not lookup:
+        return None
+    return Transaction.objects.filter(lookup, transaction_type='debit').first()
+
+
+def _refund_transfer(paystack_transaction, status, amount):
+    '''
+    Moves a withdrawal to a failed/reversed status and credits the vendor. Only pending or
+    successful withdrawals are refunded, so a transfer that failed (or was released by the
+    outbox worker) and is later reported reversed is not refunded twice.
+    '''
+    moved = Transaction.objects.filter(
+        pk=paystack_transaction.pk, status__in=[TransactionStatus.PENDING, TransactionStatus.SUCCESS]
+    ).update(status=status)
+    if moved and paystack_transaction.vendor_id:
+        Vendor.objects.filter(pk=paystack_transaction.vendor_id).update(wallet_balance=F('wallet_balance') + amount)
+    return bool(moved)
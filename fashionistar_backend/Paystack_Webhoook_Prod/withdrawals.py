@@ -0,0 +1,290 @@
+'''
+Two-phase vendor withdrawals.
+
+Phase one (``reserve_withdrawal``) runs in the request: one short transaction debits the vendor's
+wallet with a conditional ``F()`` update, writes the pending debit ``Transaction`` and a
+``WithdrawalOutbox`` row. No outbound call is made while the vendor row is locked.
+
+Phase two (``dispatch_withdrawal``) runs in the Celery worker: it claims the outbox row, sends the
+transfer outside any lock and records the outcome. Retryable failures are rescheduled with
+exponential backoff and the same transfer reference; a definitive failure, or running out of
+attempts, releases the reserved amount back to the vendor's wallet.
+
+A timeout or connection error does not tell whether the provider made the transfer. When one ends
+the last attempt, the transfer is looked up by its reference first: a transfer that exists is
+marked sent, and a row whose outcome is still unknown is held for manual review instead of being
+released, so the vendor is never refunded for a transfer that went through.
+'''
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from Paystack_Webhoook_Prod.models import Transaction, TransactionStatus, WithdrawalOutbox, WithdrawalOutboxStatus
+from Paystack_Webhoook_Prod.UTILS.transfer_providers import get_transfer_provider
+from vendor.models import Vendor
+
+# Get logger for application
+application_logger = logging.getLogger('application')
+# Get logger for paystack
+paystack_logger = logging.getLogger('paystack')
+
+
+class InsufficientBalanceError(Exception):
+    '''
+    Raised when the vendor's wallet cannot cover the withdrawal amount.
+    '''
+
+
+def new_withdrawal_reference():
+    '''
+    Transfer reference for a withdrawal (lowercase, as Paystack requires).
+    '''
+    return f"wd-{uuid.uuid4().hex}"
+
+
+def retry_delay(attempts):
+    '''
+    Delay before the next dispatch attempt (exponential backoff, capped at one hour).
+    '''
+    base = getattr(settings, 'WITHDRAWAL_RETRY_DELAY', 60)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), 3600))
+
+
+def reserve_withdrawal(vendor, amount, recipient_code, reason=None, enqueue=True):
+    '''
+    Phase one: reserves the amount and queues the transfer in a single short transaction.
+
+    Args:
+        vendor (Vendor): The withdrawing vendor.
+        amount (Decimal): Amount to withdraw.
+        recipient_code (str): Paystack transfer recipient of the vendor's bank account.
+        reason (str, optional): The vendor's reason for the withdrawal.
+        enqueue (bool): Queue the dispatch task on commit (benchmarks dispatch inline).
+
+    Returns:
+        tuple: (Transaction, WithdrawalOutbox, new wallet balance)
+
+    Raises:
+        InsufficientBalanceError: If the wallet balance is lower than the amount.
+    '''
+    with transaction.atomic():
+        # The balance check and the debit are one statement, so concurrent withdrawals cannot overdraw
+        reserved = Vendor.objects.filter(pk=vendor.pk, wallet_balance__gte=amount).update(
+            wallet_balance=F('wallet_balance') - amount
+        )
+        if not reserved:
+            raise InsufficientBalanceError("Insufficient balance")
+
+        reference = new_withdrawal_reference()
+        transaction_obj = Transaction.objects.create(
+            vendor=vendor,
+            transaction_type='debit',
+            amount=amount,
+            status=TransactionStatus.PENDING,
+            description=reason if reason else None,
+            paystack_payment_reference=reference,
+        )
+        outbox = WithdrawalOutbox.objects.create(
+            transaction=transaction_obj,
+            vendor=vendor,
+            amount=amount,
+            recipient_code=recipient_code,
+            reason=reason,
+            reference=reference,
+        )
+        new_balance = Vendor.objects.values_list('wallet_balance', flat=True).get(pk=vendor.pk)
+
+        if enqueue:
+            transaction.on_commit(lambda: enqueue_withdrawal(outbox.pk))
+
+    application_logger.info(f"Withdrawal {reference} of {amount} reserved for vendor {vendor.pk}")
+    return transaction_obj, outbox, new_balance
+
+
+def enqueue_withdrawal(outbox_id, eta=None):
+    '''
+    Hands an outbox row to the Celery worker. If the broker is unreachable the row stays
+    pending and the periodic ``dispatch_pending_withdrawals`` task picks it up.
+    '''
+    from Paystack_Webhoook_Prod.tasks import dispatch_withdrawal_transfer
+
+    try:
+        dispatch_withdrawal_transfer.apply_async(args=[str(outbox_id)], eta=eta)
+    except Exception as e:
+        application_logger.warning(f"Could not enqueue withdrawal {outbox_id}, it will be picked up by the sweep: {e}")
+
+
+def claim_withdrawal(outbox_id):
+    '''
+    Marks a due outbox row as processing and leases it to the caller.
+
+    A processing row whose lease has expired (the worker died mid-dispatch) can be claimed again.
+
+    Returns:
+        WithdrawalOutbox | None: The claimed row, or None if it is not due or already handled.
+    '''
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'WITHDRAWAL_CLAIM_LEASE', 300))
+    claimed = WithdrawalOutbox.objects.filter(
+        pk=outbox_id,
+        status__in=[WithdrawalOutboxStatus.PENDING, WithdrawalOutboxStatus.PROCESSING],
+        next_attempt_at__lte=now,
+    ).update(
+        status=WithdrawalOutboxStatus.PROCESSING,
+        attempts=F('attempts') + 1,
+        next_attempt_at=now + lease,
+    )
+    if not claimed:
+        return None
+    return WithdrawalOutbox.objects.get(pk=outbox_id)
+
+
+def dispatch_withdrawal(outbox_id, provider=None):
+    '''
+    Phase two: sends the transfer for one outbox row and records the outcome.
+
+    Args:
+        outbox_id: The WithdrawalOutbox id.
+        provider: Transfer provider (defaults to ``WITHDRAWAL_TRANSFER_PROVIDER``).
+
+    Returns:
+        WithdrawalOutbox | None: The row with its new status, or None if it was not claimable.
+    '''
+    outbox = claim_withdrawal(outbox_id)
+    if outbox is None:
+        return None
+
+    provider = provider or get_transfer_provider()
+    try:
+        # An earlier attempt may have reached the provider before failing; never send twice
+        existing = provider.lookup(outbox.reference) if outbox.attempts > 1 else None
+        if existing:
+            return _mark_sent(outbox, existing.get('transfer_code'))
+
+        result = provider.initiate(
+            reference=outbox.reference,
+            amount=outbox.amount,
+            recipient_code=outbox.recipient_code,
+            reason=outbox.reason,
+        )
+    except Exception as e:
+        result = {'status': False, 'retryable': True, 'transfer_code': None, 'message': str(e)}
+
+    if result['status']:
+        return _mark_sent(outbox, result['transfer_code'])
+
+    max_attempts = getattr(settings, 'WITHDRAWAL_MAX_ATTEMPTS', 5)
+    if result['retryable'] and outbox.attempts < max_attempts:
+        return _schedule_retry(outbox, result['message'])
+
+    if result['retryable']:
+        try:
+            existing = provider.lookup(outbox.reference)
+        except Exception as e:
+            return hold_withdrawal_for_review(outbox, f"{result['message']} (transfer lookup failed: {e})")
+        if existing:
+            return _mark_sent(outbox, existing.get('transfer_code'))
+
+    return release_withdrawal(outbox, result['message'])
+
+
+def dispatch_due_withdrawals(limit=100, provider=None):
+    '''
+    Dispatches outbox rows that are due: new rows whose task never ran, scheduled retries
+    and rows whose worker lease expired.
+
+    Returns:
+        dict: Number of rows per resulting status.
+    '''
+    due_ids = list(
+        WithdrawalOutbox.objects.filter(
+            status__in=[WithdrawalOutboxStatus.PENDING, WithdrawalOutboxStatus.PROCESSING],
+            next_attempt_at__lte=timezone.now(),
+        ).order_by('next_attempt_at').values_list('id', flat=True)[:limit]
+    )
+
+    stats = {'due': len(due_ids), 'sent': 0, 'pending': 0, 'failed': 0, 'review': 0, 'skipped': 0}
+    provider = provider or get_transfer_provider()
+    for outbox_id in due_ids:
+        outbox = dispatch_withdrawal(outbox_id, provider=provider)
+        stats[outbox.status if outbox else 'skipped'] += 1
+    return stats
+
+
+def release_withdrawal(outbox, error):
+    '''
+    Compensating step: fails the withdrawal and returns the reserved amount to the vendor.
+
+    The credit only happens if this call moves the debit Transaction out of pending, so a release
+    racing with a ``transfer.failed`` webhook for the same withdrawal cannot refund twice.
+    '''
+    with transaction.atomic():
+        released = WithdrawalOutbox.objects.filter(
+            pk=outbox.pk, status=WithdrawalOutboxStatus.PROCESSING
+        ).update(status=WithdrawalOutboxStatus.FAILED, last_error=error)
+        if released:
+            failed = Transaction.objects.filter(
+                pk=outbox.transaction_id, status=TransactionStatus.PENDING
+            ).update(status=TransactionStatus.FAILED)
+            if failed:
+                Vendor.objects.filter(pk=outbox.vendor_id).update(
+                    wallet_balance=F('wallet_balance') + outbox.amount
+                )
+
+    paystack_logger.error(f"Withdrawal {outbox.reference} failed after {outbox.attempts} attempt(s), amount released: {error}")
+    outbox.status = WithdrawalOutboxStatus.FAILED
+    outbox.last_error = error
+    return outbox
+
+
+def hold_withdrawal_for_review(outbox, error):
+    '''
+    Parks a withdrawal whose transfer may or may not have been made. The debit Transaction stays
+    pending and the reserved amount stays debited; a ``transfer.success`` / ``transfer.failed``
+    webhook, or an admin checking the reference on Paystack, settles it.
+    '''
+    WithdrawalOutbox.objects.filter(pk=outbox.pk, status=WithdrawalOutboxStatus.PROCESSING).update(
+        status=WithdrawalOutboxStatus.REVIEW, last_error=error
+    )
+
+    paystack_logger.error(f"Withdrawal {outbox.reference} outcome unknown after {outbox.attempts} attempt(s), held for review: {error}")
+    outbox.status = WithdrawalOutboxStatus.REVIEW
+    outbox.last_error = error
+    return outbox
+
+
+def _mark_sent(outbox, transfer_code):
+    '''
+    Records the provider's transfer code. The debit Transaction stays pending until the
+    ``transfer.success`` / ``transfer.failed`` webhook arrives.
+    '''
+    with transaction.atomic():
+        WithdrawalOutbox.objects.filter(pk=outbox.pk).update(
+            status=WithdrawalOutboxStatus.SENT, last_error=None
+        )
+        Transaction.objects.filter(pk=outbox.transaction_id).update(paystack_transfer_code=transfer_code)
+
+    application_logger.info(f"Withdrawal {outbox.reference} sent, transfer code is: {transfer_code}")
+    outbox.status = WithdrawalOutboxStatus.SENT
+    return outbox
+
+
+def _schedule_retry(outbox, error):
+    '''
+    Puts the row back in the outbox with a backoff delay.
+    '''
+    next_attempt_at = timezone.now() + retry_delay(outbox.attempts)
+    WithdrawalOutbox.objects.filter(pk=outbox.pk).update(
+        status=WithdrawalOutboxStatus.PENDING, next_attempt_at=next_attempt_at, last_error=error
+    )
+
+    paystack_logger.warning(f"Withdrawal {outbox.reference} attempt {outbox.attempts} failed, retrying at {next_attempt_at}: {error}")
+    outbox.status = WithdrawalOutboxStatus.PENDING
+    outbox.next_attempt_at = next_attempt_at
+    outbox.last_error = error
+    return outbox
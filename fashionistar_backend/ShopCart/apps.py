@@ -4,3 +4,7 @@
 class ShopcartConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ShopCart'
+
+    def ready(self):
+        super().ready()
+        import ShopCart.signals  # Invalidates cached cart summaries on cart and product writes
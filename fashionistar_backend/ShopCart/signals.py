@@ -0,0 +1,48 @@
+# ShopCart/signals.py
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from ShopCart.models import Cart
+from ShopCart.summary import invalidate_cart_summary
+from store.models import Product
+
+
+@receiver(post_save, sender=Cart)
+@receiver(post_delete, sender=Cart)
+def invalidate_cart_summary_on_write(sender, instance, **kwargs):
+    """
+    Drops the cached summary of the cart a row was written to or deleted from.
+    """
+    invalidate_cart_summary(instance.cart_id)
+
+
+# Product fields that cart totals depend on; other product fields shown in a cart may lag behind
+# until the summary expires (CART_SUMMARY_CACHE_TTL)
+CART_PRODUCT_FIELDS = ('title', 'price', 'old_price', 'shipping_amount', 'total_price', 'stock_qty', 'in_stock', 'status')
+
+
+def cart_product_fields(product):
+    return tuple(product.__dict__.get(field) for field in CART_PRODUCT_FIELDS)
+
+
+@receiver(post_init, sender=Product)
+def remember_cart_product_fields(sender, instance, **kwargs):
+    instance._cart_product_fields = cart_product_fields(instance)
+
+
+@receiver(post_save, sender=Product)
+def invalidate_cart_summaries_of_product(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Refreshes the carts holding a product whose price or stock changed. Other saves (ratings,
+    view counters, ...) skip the cart lookup.
+    """
+    if created:
+        return
+    if update_fields is not None and not set(update_fields) & set(CART_PRODUCT_FIELDS):
+        return
+    fields = cart_product_fields(instance)
+    if fields == getattr(instance, '_cart_product_fields', None):
+        return
+    instance._cart_product_fields = fields
+    cart_ids = Cart.objects.filter(product=instance).values_list('cart_id', flat=True).distinct()
+    invalidate_cart_summary(*cart_ids)
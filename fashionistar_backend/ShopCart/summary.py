@@ -0,0 +1,138 @@
+'''
+Cart summary service.
+
+The cart endpoints (list, total, detail and checkout) all read the same summary: the cart's
+items, rendered with their product, and its totals. The summary is built with one ``aggregate()``
+for the totals and one ``select_related`` query for the items (their relations are prefetched,
+see ``CART_PRODUCT_PREFETCH``), and kept in the cache under a single key per ``cart_id`` and cart version, so a
+polling frontend costs two cache reads per request. Every write to a ``Cart`` row, and every change
+to the price or stock of a product in the cart, bumps the version (see ShopCart/signals.py).
+
+The version is read before the summary is built, so a summary built from rows read before a
+write is stored under the old version and is never served after the write. The version is
+bumped again when the writing transaction commits, which covers a summary built between the
+write and its commit.
+
+One cache entry holds every variant of a cart (the whole cart and its rows for a given user), so
+a bump invalidates them all at once.
+'''
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from ShopCart.models import Cart
+from userauths.models import User
+
+ZERO = Decimal('0.00')
+
+
+def cart_summary_cache_key(cart_id, version):
+    return f"cart_summary:{cart_id}:{version}"
+
+
+def cart_version_cache_key(cart_id):
+    return f"cart_version:{cart_id}"
+
+
+def cart_version(cart_id):
+    '''
+    Current version of a cart's summary. A missing counter (first use, expired or evicted)
+    starts from the clock, so it never goes back to a version older summaries were stored under.
+    '''
+    key = cart_version_cache_key(cart_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, timeout=getattr(settings, 'CART_SUMMARY_CACHE_TTL', 300))
+        version = cache.get(key)
+    return version
+
+
+# Relations rendered by CartSerializer (depth 3) and ProductSerializer, loaded with one query
+# each for the whole cart. The product aggregates (ratings, order counts) still run per product.
+CART_PRODUCT_PREFETCH = (
+    'product__category', 'product__product_gallery', 'product__product_specification',
+    'product__product_size', 'product__product_color', 'user__groups', 'user__user_permissions',
+)
+
+
+def cart_items(cart_id, user_id=None):
+    '''
+    The rows of a cart, with the product and user needed to render them.
+    '''
+    queryset = Cart.objects.filter(cart_id=cart_id)
+    if user_id is not None:
+        queryset = queryset.filter(user_id=user_id)
+    return queryset.select_related('product', 'user').prefetch_related(*CART_PRODUCT_PREFETCH).order_by('date')
+
+
+def build_cart_summary(cart_id, user_id=None):
+    '''
+    Computes the summary from the database, without the cache.
+
+    Raises:
+        User.DoesNotExist: If ``user_id`` does not match a user.
+    '''
+    from ShopCart.serializers import CartSerializer
+
+    if user_id is not None and not User.objects.filter(id=user_id).exists():
+        raise User.DoesNotExist(f"User {user_id} does not exist")
+
+    items = cart_items(cart_id, user_id)
+    totals = items.order_by().aggregate(
+        total_quantity=Sum('qty'),
+        sub_total=Sum('sub_total'),
+        total=Sum('total'),
+        item_count=Count('id'),
+    )
+    return {
+        'total_quantity': totals['total_quantity'] or 0,
+        'sub_total': totals['sub_total'] or ZERO,
+        'total': totals['total'] or ZERO,
+        'item_count': totals['item_count'],
+        'cart_items': CartSerializer(items, many=True).data,
+    }
+
+
+def get_cart_summary(cart_id, user_id=None):
+    '''
+    Returns the cart summary, from the cache when possible.
+
+    Returns:
+        dict: ``total_quantity``, ``sub_total``, ``total``, ``item_count`` and ``cart_items``.
+    '''
+    key = cart_summary_cache_key(cart_id, cart_version(cart_id))
+    variant = str(user_id) if user_id is not None else '*'
+
+    variants = cache.get(key) or {}
+    summary = variants.get(variant)
+    if summary is None:
+        summary = build_cart_summary(cart_id, user_id)
+        variants[variant] = summary
+        cache.set(key, variants, timeout=getattr(settings, 'CART_SUMMARY_CACHE_TTL', 300))
+    return summary
+
+
+def bump_cart_versions(cart_ids):
+    for cart_id in cart_ids:
+        key = cart_version_cache_key(cart_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns() // 1000, timeout=getattr(settings, 'CART_SUMMARY_CACHE_TTL', 300))
+
+
+def invalidate_cart_summary(*cart_ids):
+    '''
+    Makes the cached summaries of the given carts unreachable, now and again once the current
+    transaction commits.
+    '''
+    cart_ids = {cart_id for cart_id in cart_ids if cart_id}
+    if not cart_ids:
+        return
+    bump_cart_versions(cart_ids)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_cart_versions(cart_ids))
@@ -1,3 +1,113 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from ShopCart import summary
+from ShopCart.models import Cart
+from ShopCart.views import CartDetailView, CartListView, CartTotalView
+from store.models import Product
+from vendor.models import Vendor
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CartSummaryViewsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        vendor_user = User.objects.create_user(email='cartvendor@example.com', password='password123', role=User.VENDOR)
+        self.vendor = Vendor.objects.create(user=vendor_user, name='Cart Vendor')
+        self.user = User.objects.create_user(email='shopper@example.com', password='password123')
+
+        for index in range(5):
+            product = Product.objects.create(vendor=self.vendor, title=f'Product {index}', price=Decimal('100.00'))
+            Cart.objects.create(
+                cart_id='cart-1', user=self.user, product=product, qty=2, price=Decimal('100.00'),
+                sub_total=Decimal('200.00'), total=Decimal('200.00'),
+            )
+        self.factory = APIRequestFactory()
+
+    def _get(self, view, **kwargs):
+        return view.as_view()(self.factory.get('/'), cart_id='cart-1', **kwargs)
+
+    def test_cold_summary_prefetches_the_product_relations(self):
+        # one aggregate for the totals, one select_related query for the items, one query per
+        # prefetched relation, then the five aggregates ProductSerializer runs per product
+        with self.assertNumQueries(2 + len(summary.CART_PRODUCT_PREFETCH) + 5 * 5):
+            response = self._get(CartListView)
+        self.assertEqual(response.data['total_quantity'], 10)
+        self.assertEqual(response.data['total_price'], Decimal('1000.00'))
+        self.assertEqual(len(response.data['cart_items']), 5)
+        self.assertEqual(response.data['cart_items'][0]['product']['title'], 'Product 0')
+        self.assertEqual(response.data['cart_items'][0]['product']['gallery'], [])
+        self.assertEqual(response.data['cart_items'][0]['user']['email'], 'shopper@example.com')
+
+    def test_list_total_and_detail_share_the_cached_summary(self):
+        self._get(CartListView)
+        with self.assertNumQueries(0):
+            total = self._get(CartTotalView)
+            detail = self._get(CartDetailView)
+        self.assertEqual(total.data, {'sub_total': Decimal('1000.00'), 'total': Decimal('1000.00')})
+        self.assertEqual(detail.data, {'sub_total': 1000.0, 'total': 1000.0})
+
+    def test_user_filtered_summary(self):
+        with self.assertNumQueries(3 + len(summary.CART_PRODUCT_PREFETCH) + 5 * 5):
+            response = self._get(CartTotalView, user_id=self.user.id)
+        self.assertEqual(response.data['sub_total'], Decimal('1000.00'))
+        self.assertEqual(self._get(CartTotalView, user_id=999999).status_code, 404)
+
+    def test_cart_write_invalidates_summary(self):
+        self._get(CartTotalView)
+        item = Cart.objects.filter(cart_id='cart-1').first()
+        item.qty = 4
+        item.sub_total = Decimal('400.00')
+        item.save()
+        self.assertEqual(self._get(CartTotalView).data['sub_total'], Decimal('1200.00'))
+
+        Cart.objects.filter(cart_id='cart-1').delete()
+        response = self._get(CartListView)
+        self.assertEqual(response.data['total_quantity'], 0)
+        self.assertEqual(response.data['cart_items'], [])
+
+    def test_summary_built_during_a_write_is_not_served_after_it(self):
+        build = summary.build_cart_summary
+
+        def build_then_write(cart_id, user_id=None):
+            stale = build(cart_id, user_id)
+            Cart.objects.filter(cart_id='cart-1').first().delete()
+            return stale
+
+        with mock.patch.object(summary, 'build_cart_summary', side_effect=build_then_write):
+            self.assertEqual(self._get(CartListView).data['total_quantity'], 10)
+        self.assertEqual(self._get(CartListView).data['total_quantity'], 8)
+
+    def test_version_is_bumped_again_on_commit(self):
+        item = Cart.objects.filter(cart_id='cart-1').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            item.qty = 3
+            item.save()
+            written = summary.cart_version('cart-1')
+            self._get(CartListView)
+        self.assertGreater(summary.cart_version('cart-1'), written)
+
+    def test_only_price_and_stock_changes_refresh_carts_holding_the_product(self):
+        self._get(CartTotalView)
+        product = Product.objects.get(title='Product 0')
+
+        with self.assertNumQueries(1):
+            product.views = 10
+            product.save()
+        with self.assertNumQueries(1):
+            product.save(update_fields=['rating'])
+        self.assertNumQueries(0, self._get, CartTotalView)
+
+        product.price = Decimal('150.00')
+        product.save()
+        with self.assertNumQueries(2 + len(summary.CART_PRODUCT_PREFETCH) + 5 * 5):
+            self._get(CartListView)
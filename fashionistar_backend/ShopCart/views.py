@@ -1,6 +1,5 @@
 # Django Packages
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 
@@ -13,6 +12,7 @@
 
 # Serializers
 from ShopCart.serializers import CartSerializer
+from ShopCart.summary import CART_PRODUCT_PREFETCH, cart_items, get_cart_summary
 
 # Models
 from userauths.models import User
@@ -51,7 +51,7 @@ class CartApiView(generics.ListCreateAPIView):
     '''
     
     serializer_class = CartSerializer
-    queryset = Cart.objects.all()
+    queryset = Cart.objects.select_related('product', 'user').prefetch_related(*CART_PRODUCT_PREFETCH)
     permission_classes = (AllowAny,)
 
     def create(self, request, *args, **kwargs):
@@ -132,40 +132,15 @@ class CartListView(generics.ListAPIView):
     permission_classes = (AllowAny,)
 
     def get_queryset(self):
-        cart_id = self.kwargs['cart_id']
-        user_id = self.kwargs.get('user_id')
-
-        if user_id is not None:
-            user = get_object_or_404(User, id=user_id)
-            queryset = Cart.objects.filter(Q(user=user, cart_id=cart_id) | Q(user=user))
-        else:
-            queryset = Cart.objects.filter(cart_id=cart_id)
-        
-        return queryset
-
-    def list(self, request, *args, **kwargs):
-        try:
-            queryset = self.get_queryset()
-            serializer = CartSerializer(queryset, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except ObjectDoesNotExist as e:
-            return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-    def get_cart_total(self, cart_items):
-        total_qty = sum(item.qty for item in cart_items)
-        total_price = sum(item.sub_total for item in cart_items)
-        return total_qty, total_price
+        return cart_items(self.kwargs['cart_id'], self.kwargs.get('user_id'))
 
     def get(self, request, *args, **kwargs):
         try:
-            cart_items = self.get_queryset()
-            total_qty, total_price = self.get_cart_total(cart_items)
+            summary = get_cart_summary(self.kwargs['cart_id'], self.kwargs.get('user_id'))
             data = {
-                "total_quantity": total_qty,
-                "total_price": total_price,
-                "cart_items": CartSerializer(cart_items, many=True).data
+                "total_quantity": summary['total_quantity'],
+                "total_price": summary['sub_total'],
+                "cart_items": summary['cart_items']
             }
             return Response(data, status=status.HTTP_200_OK)
         except ObjectDoesNotExist as e:
@@ -189,39 +164,14 @@ class CartTotalView(generics.ListAPIView):
     permission_classes = (AllowAny,)
 
     def get_queryset(self):
-        cart_id = self.kwargs['cart_id']
-        user_id = self.kwargs.get('user_id')
-
-        if user_id is not None:
-            user = get_object_or_404(User, id=user_id)
-            queryset = Cart.objects.filter(cart_id=cart_id, user=user)
-        else:
-            queryset = Cart.objects.filter(cart_id=cart_id)
-        
-        return queryset
-
-    def list(self, request, *args, **kwargs):
-        try:
-            queryset = self.get_queryset()
-            serializer = CartSerializer(queryset, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except ObjectDoesNotExist as e:
-            return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-
-    def get_total_values(self, cart_items):
-        total_sub_total = sum(item.sub_total for item in cart_items)
-        total_total = sum(item.total for item in cart_items)
-        return total_sub_total, total_total
+        return cart_items(self.kwargs['cart_id'], self.kwargs.get('user_id'))
 
     def get(self, request, *args, **kwargs):
         try:
-            cart_items = self.get_queryset()
-            total_sub_total, total_total = self.get_total_values(cart_items)
+            summary = get_cart_summary(self.kwargs['cart_id'], self.kwargs.get('user_id'))
             data = {
-                "sub_total": total_sub_total,
-                "total": total_total
+                "sub_total": summary['sub_total'],
+                "total": summary['total']
             }
             return Response(data, status=status.HTTP_200_OK)
         except ObjectDoesNotExist as e:
@@ -253,55 +203,25 @@ class CartDetailView(generics.RetrieveAPIView):
 
         def get_queryset(self):
             # Get 'cart_id' and 'user_id' from the URL kwargs
-            cart_id = self.kwargs['cart_id']
-            user_id = self.kwargs.get('user_id')  # Use get() to handle cases where 'user_id' is not present
-
-            if user_id is not None:
-                # If 'user_id' is provided, filter the queryset by both 'cart_id' and 'user_id'
-                user = User.objects.get(id=user_id)
-                queryset = Cart.objects.filter(cart_id=cart_id, user=user)
-            else:
-                # If 'user_id' is not provided, filter the queryset by 'cart_id' only
-                queryset = Cart.objects.filter(cart_id=cart_id)
-
-            return queryset
+            return cart_items(self.kwargs['cart_id'], self.kwargs.get('user_id'))
 
         def get(self, request, *args, **kwargs):
-            # Get the queryset of cart items based on 'cart_id' and 'user_id' (if provided)
-            queryset = self.get_queryset()
-
-            # Initialize sums for various cart item attributes
-            total_sub_total = 0.0
-            total_total = 0.0
-
-            # Iterate over the queryset of cart items to calculate cumulative sums
-            for cart_item in queryset:
-                # Calculate the cumulative shipping, tax, service_fee, and total values
-                
-                total_sub_total += float(self.calculate_sub_total(cart_item))
-                total_total += round(float(self.calculate_total(cart_item)), 2)
+            try:
+                # Totals come from the cached cart summary (one aggregate query on a cache miss)
+                summary = get_cart_summary(self.kwargs['cart_id'], self.kwargs.get('user_id'))
+            except ObjectDoesNotExist as e:
+                return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
 
             # Create a data dictionary to store the cumulative values
             data = {
                 
-                'sub_total': total_sub_total,
-                'total': total_total,
+                'sub_total': float(summary['sub_total']),
+                'total': round(float(summary['total']), 2),
             }
 
             # Return the data in the response
             return Response(data)
 
-       
-        def calculate_sub_total(self, cart_item):
-            # Implement your service fee calculation logic here for a single cart item
-            # Example: Calculate based on service type, cart total, etc.
-            return cart_item.sub_total
-
-        def calculate_total(self, cart_item):
-            # Implement your total calculation logic here for a single cart item
-            # Example: Sum of sub_total, shipping, tax, and service_fee
-            return cart_item.total    
-
 
 
 
@@ -318,7 +238,7 @@ class CartUpdateApiView(generics.UpdateAPIView):
                 
     '''
     serializer_class = CartSerializer
-    queryset = Cart.objects.all()
+    queryset = Cart.objects.select_related('product', 'user').prefetch_related(*CART_PRODUCT_PREFETCH)
     permission_classes = (AllowAny,)
     lookup_field = 'item_id'  # Including lookup_field
 
@@ -328,10 +248,10 @@ def get_object(self, cart_id, item_id, user_id=None):
             # Fetch the User object
             user = get_object_or_404(User, id=user_id)
             # Fetch the Cart item associated with cart_id, item_id, and user
-            cart_item = get_object_or_404(Cart, cart_id=cart_id, id=item_id, user=user)
+            cart_item = get_object_or_404(self.queryset, cart_id=cart_id, id=item_id, user=user)
         else:
             # Fetch the Cart item associated with cart_id and item_id only
-            cart_item = get_object_or_404(Cart, cart_id=cart_id, id=item_id)
+            cart_item = get_object_or_404(self.queryset, cart_id=cart_id, id=item_id)
         return cart_item
 
     def update(self, request, *args, **kwargs):
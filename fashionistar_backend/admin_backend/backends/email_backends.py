@@ -32,5 +32,12 @@ def __init__(self, *args, **kwargs):
             from django.core.mail.backends.smtp import EmailBackend
             self.email_backend = EmailBackend(*args, **kwargs)  # Fallback to SMTP.
 
+    def open(self):
+        # Forwarded so a pooled connection keeps the provider's session open between sends
+        return self.email_backend.open()
+
+    def close(self):
+        return self.email_backend.close()
+
     def send_messages(self, email_messages):
         return self.email_backend.send_messages(email_messages)
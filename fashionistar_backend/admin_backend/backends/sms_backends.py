@@ -1,15 +1,32 @@
 # admin_backend/backends/sms_backends.py
 
 import logging
+import os
 from django.apps import apps
 from django.conf import settings
 from django.utils.module_loading import import_string
 
+from apps.common.delivery import get_sms_executor, is_permanent_sms_error, throttle
+
 # -----------------------------------------------------------------------------
 # Logger Configuration
 # -----------------------------------------------------------------------------
 application_logger = logging.getLogger('application')
 
+# Provider instances per (process, class path); they hold the pooled HTTP clients
+_providers = {}
+
+
+def get_sms_provider(provider_path):
+    """
+    Returns the shared instance of a provider class, creating it on first use in this process.
+    """
+    key = (os.getpid(), provider_path)
+    provider = _providers.get(key)
+    if provider is None:
+        provider = _providers[key] = import_string(provider_path)()
+    return provider
+
 
 class DatabaseConfiguredSMSBackend:
     """
@@ -82,13 +99,10 @@ def __init__(self, *args, **kwargs):
             # -----------------------------------------------------------------
             # This is where the magic happens. 'import_string' turns the string
             # 'apps.common...TwilioSMSProvider' into the actual Class object.
-            provider_class = import_string(self.provider_path)
-            
-            # Instantiate the provider. The provider's __init__ will usually 
-            # load its own credentials from Settings.
-            self.sms_provider = provider_class()
+            # The instance is shared by the process, so its HTTP connections are reused.
+            self.sms_provider = get_sms_provider(self.provider_path)
             
-            application_logger.info(f"✅ SMS Backend successfully initialized with active provider: {provider_class.__name__}")
+            application_logger.info(f"✅ SMS Backend successfully initialized with active provider: {self.sms_provider.__class__.__name__}")
 
         except ImportError as ie:
             application_logger.error(f"❌ Import Error initializing SMS backend: {ie}. Path was: {getattr(self, 'provider_path', 'unknown')}", exc_info=True)
@@ -104,8 +118,7 @@ def _activate_fallback_backend(self):
         when the primary configuration fails.
         """
         try:
-            from apps.common.providers.SMS.twilio import TwilioSMSProvider
-            self.sms_provider = TwilioSMSProvider()
+            self.sms_provider = get_sms_provider('apps.common.providers.SMS.twilio.TwilioSMSProvider')
             application_logger.info("🔄 SYSTEM FALLBACK: SMS Backend initialized with Default Twilio provider due to previous error.")
         except Exception as fallback_error:
             # If even the fallback fails, we are in trouble.
@@ -116,24 +129,29 @@ def send_messages(self, sms_messages):
         """
         Sends a batch of SMS messages using the configured provider.
 
-        This method provides a generic interface for bulk sending. 
-        It iterates through the provided message list and delegates each one 
-        to the underlying provider's `.send()` method.
+        Messages that share the same text are sent together through the provider's
+        `send_bulk()` (up to its `bulk_size` recipients per request) when it has one;
+        otherwise each message is one `.send()` call. The requests run concurrently
+        (`SMS_SEND_CONCURRENCY`) and each waits for the provider's rate limit
+        (`DELIVERY_RATE_LIMITS`).
 
         Args:
-            sms_messages (list): A list of dictionaries or objects.
-                                 Each item MUST have 'to' and 'body' attributes/keys.
+            sms_messages (list): A list of dictionaries.
+                                 Each item MUST have 'to' and 'body' keys.
 
         Returns:
-            list: A list of results (IDs or Statuses) for each message processed.
+            list: A list of results (IDs or Statuses) for each message, in input order.
+                  A failed message gets `{'status': 'failed', 'reason': ..., 'retryable': ...}`.
 
         Raises:
             Exception: Propagates unhandled exceptions from the provider 
                        (after logging them).
         """
-        results = []
+        results = [None] * len(sms_messages)
         try:
-            for message in sms_messages:
+            # Group the valid messages by text, keeping their positions
+            groups = {}
+            for index, message in enumerate(sms_messages):
                 # Extract Data safely
                 to = message.get('to')
                 body = message.get('body')
@@ -141,21 +159,44 @@ def send_messages(self, sms_messages):
                 # Validation
                 if not to or not body:
                     application_logger.warning(f"⏩ Skipping invalid SMS message payload: {message}")
-                    results.append({'status': 'failed', 'reason': 'invalid_payload'})
+                    results[index] = {'status': 'failed', 'reason': 'invalid_payload', 'retryable': False}
                     continue
+                groups.setdefault(body, []).append(index)
+
+            provider = self.sms_provider
+            bulk_size = getattr(provider, 'bulk_size', 1) if hasattr(provider, 'send_bulk') else 1
+            rate_limit_key = getattr(provider, 'rate_limit_key', provider.__class__.__name__)
+
+            def send_chunk(body, chunk):
+                recipients = [sms_messages[index]['to'] for index in chunk]
 
                 # Delegate to concrete provider
+                throttle(rate_limit_key)
                 try:
-                    # The provider's send method returns the Message SID/ID
-                    result = self.sms_provider.send(to, body)
-                    results.append(result)
-                    application_logger.info(f"SMS explicitly sent to {to} via {self.sms_provider.__class__.__name__}")
-                    
+                    # The provider returns the Message SID/ID (one ID for a bulk request)
+                    if len(recipients) > 1:
+                        result = provider.send_bulk(recipients, body)
+                    else:
+                        result = provider.send(recipients[0], body)
+                    application_logger.info(f"SMS explicitly sent to {len(recipients)} recipient(s) via {provider.__class__.__name__}")
                 except Exception as inner_e:
-                    # We catch per-message errors so one bad number doesn't fail the whole batch
-                    error_msg = f"Error sending to {to}: {str(inner_e)}"
-                    application_logger.error(error_msg)
-                    results.append({'status': 'failed', 'reason': str(inner_e)})
+                    # We catch per-request errors so one bad number doesn't fail the whole batch
+                    application_logger.error(f"Error sending to {recipients}: {str(inner_e)}")
+                    result = {'status': 'failed', 'reason': str(inner_e), 'retryable': not is_permanent_sms_error(inner_e)}
+
+                for index in chunk:
+                    results[index] = result
+
+            requests = [
+                (body, indexes[start:start + bulk_size])
+                for body, indexes in groups.items()
+                for start in range(0, len(indexes), bulk_size)
+            ]
+            if len(requests) == 1:
+                send_chunk(*requests[0])
+            else:
+                # Requests run concurrently over the provider's pooled connections
+                list(get_sms_executor().map(lambda request: send_chunk(*request), requests))
 
             return results
 
@@ -51,7 +51,7 @@ def request_reset(email_or_phone: str):
                 uid = urlsafe_base64_encode(force_bytes(user.pk))
                 reset_link = f"{settings.FRONTEND_URL}/auth/reset-password?uid={uid}&token={token}"
                 
-                EmailManager.send_mail(
+                EmailManager.queue_mail(
                     subject="Password Reset Request",
                     recipients=[user.email],
                     template_name="accounts/email/password_reset.html",
@@ -63,7 +63,7 @@ def request_reset(email_or_phone: str):
                 # PHONE FLOW
                 otp = SyncOTPService.generate_otp(str(user.id), purpose='password_reset')
                 message = f"Your Password Reset Code is: {otp}. Valid for 5 minutes."
-                SMSManager.send_sms(to=str(user.phone), body=message)
+                SMSManager.queue_sms(to=str(user.phone), body=message)
                 logger.info(f"📱 Reset SMS sent to {user.phone}")
 
             return "If an account exists, a reset code has been sent."
@@ -108,7 +108,7 @@ def confirm_reset(data: dict):
             user.save()
             
             if user.email:
-                EmailManager.send_mail(
+                EmailManager.queue_mail(
                     subject="Password Changed",
                     recipients=[user.email],
                     template_name="accounts/email/password_changed.html",
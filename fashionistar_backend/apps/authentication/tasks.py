@@ -4,8 +4,8 @@
 import logging
 from django.conf import settings
 from django.template.exceptions import TemplateDoesNotExist
-from utilities.managers.email import EmailManager
-from utilities.managers.sms import SMSManager
+from apps.common.managers.email import EmailManager, EmailManagerError
+from apps.common.managers.sms import SMSManager
 
 # Get logger for application
 application_logger = logging.getLogger('application')
@@ -43,7 +43,7 @@ def send_email_task(self, subject: str, recipients: list[str], template_name: st
         application_logger.info(f"✅ Email sent successfully to {recipients}")
         return f"Email sent successfully to {recipients}"
 
-    except TemplateDoesNotExist as e:
+    except (TemplateDoesNotExist, EmailManagerError) as e:
         application_logger.error(f"🚨 Template missing / not found: {template_name} - {e}", exc_info=True)
         raise  # Re-raise to prevent retry for missing templates
 
@@ -1,3 +1,11 @@
 from django.contrib import admin
 
-# Register your models here.
+from apps.common.models import OutboundMessage
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ('channel', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('channel', 'status')
+    search_fields = ('subject',)
+    readonly_fields = ('channel', 'recipients', 'attempts', 'result', 'last_error', 'created_at', 'sent_at')
@@ -0,0 +1,544 @@
+# apps/common/delivery.py
+'''
+Outbound email and SMS delivery engine.
+
+*   Connection pools: SMTP sessions are opened once per worker process and reused for every
+    message until they sit idle for ``EMAIL_POOL_MAX_IDLE`` seconds; SMS providers share one
+    keep-alive ``httpx.Client`` per process. Both are re-created after a fork (Celery prefork).
+*   Rate limits: ``throttle`` enforces ``DELIVERY_RATE_LIMITS`` (sends per second per provider)
+    through a counter in the shared cache, so every worker process counts against the same limit.
+*   Queue: ``queue_email`` / ``queue_sms`` store an ``OutboundMessage`` and hand the channel to the
+    ``deliver_outbound_messages`` Celery task on commit. A burst of messages schedules one task,
+    which claims the queued rows ``DELIVERY_BATCH_SIZE`` at a time. Emails of a batch go over one
+    pooled SMTP session; SMS of a batch that share a text go out as provider bulk requests.
+*   Retries: failed messages are rescheduled with exponential backoff until
+    ``DELIVERY_MAX_ATTEMPTS``; permanent errors (refused recipient, 4xx from the SMS API) fail at
+    once. An SMS to several numbers is retried only for the numbers it has not reached yet. The
+    ``deliver_pending_messages`` beat task picks up retries and lost tasks.
+
+``EmailManager`` and ``SMSManager`` (apps/common/managers) are the public entry points.
+'''
+import base64
+import logging
+import os
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+import httpx
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.common.models import OutboundMessage, OutboundMessageChannel, OutboundMessageStatus
+
+# Get logger for application
+application_logger = logging.getLogger('application')
+
+
+# =============================================================================
+# Connection Pools
+# =============================================================================
+
+class SMTPConnectionPool:
+    """
+    Keeps open email backend connections for reuse.
+
+    At most ``size`` connections are in use at once per process; callers beyond that wait for a
+    free one. Connections idle for more than ``max_idle`` seconds are closed instead of reused,
+    since SMTP servers drop idle sessions (and an admin may have switched the email backend).
+    """
+
+    def __init__(self, size, max_idle):
+        self.pid = os.getpid()
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        connection = None
+        try:
+            connection = self._checkout()
+            yield connection
+        except Exception:
+            if connection is not None:
+                _close_quietly(connection)
+                connection = None
+            raise
+        finally:
+            if connection is not None:
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+            self._slots.release()
+
+    def _checkout(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                connection, released_at = self._idle.pop()
+                if now - released_at <= self.max_idle:
+                    return connection
+                _close_quietly(connection)
+
+        connection = get_connection(fail_silently=False)
+        connection.open()
+        return connection
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            _close_quietly(connection)
+
+
+def _close_quietly(connection):
+    try:
+        connection.close()
+    except Exception as e:
+        application_logger.warning(f"Error closing pooled email connection: {e}")
+
+
+_email_pool = None
+_http_client = None
+_http_client_pid = None
+_sms_executor = None
+_sms_executor_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_email_pool():
+    '''
+    The SMTP connection pool of this process.
+    '''
+    global _email_pool
+    with _pool_lock:
+        if _email_pool is None or _email_pool.pid != os.getpid():
+            _email_pool = SMTPConnectionPool(
+                size=getattr(settings, 'EMAIL_POOL_SIZE', 4),
+                max_idle=getattr(settings, 'EMAIL_POOL_MAX_IDLE', 60),
+            )
+        return _email_pool
+
+
+def email_connection():
+    '''
+    Borrows an open email backend connection: ``with email_connection() as connection: ...``
+    '''
+    return get_email_pool().connection()
+
+
+def get_http_client():
+    '''
+    The keep-alive HTTP client shared by the SMS providers of this process.
+    '''
+    global _http_client, _http_client_pid
+    with _pool_lock:
+        if _http_client is None or _http_client_pid != os.getpid():
+            size = getattr(settings, 'SMS_HTTP_POOL_SIZE', 20)
+            _http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+                timeout=getattr(settings, 'SMS_HTTP_TIMEOUT', 30),
+            )
+            _http_client_pid = os.getpid()
+        return _http_client
+
+
+def get_sms_executor():
+    '''
+    Threads that send the requests of an SMS batch concurrently over the shared HTTP client.
+    '''
+    global _sms_executor, _sms_executor_pid
+    with _pool_lock:
+        if _sms_executor is None or _sms_executor_pid != os.getpid():
+            _sms_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'SMS_SEND_CONCURRENCY', 8),
+                thread_name_prefix='sms-send',
+            )
+            _sms_executor_pid = os.getpid()
+        return _sms_executor
+
+
+def close_pools():
+    '''
+    Closes the pooled SMTP sessions and HTTP connections of this process.
+    '''
+    global _http_client
+    get_email_pool().close_all()
+    with _pool_lock:
+        if _http_client is not None:
+            _http_client.close()
+            _http_client = None
+
+
+# =============================================================================
+# Rate Limiting
+# =============================================================================
+
+def rate_limit_cache_key(provider, window):
+    return f"delivery_rate:{provider}:{window}"
+
+
+def throttle(provider):
+    '''
+    Blocks until ``provider`` may make another send under its ``DELIVERY_RATE_LIMITS`` entry.
+
+    Sends are counted in one-second windows in the shared cache. A provider without a limit
+    (or a limit of 0) is not throttled.
+
+    Returns:
+        float: Seconds spent waiting.
+    '''
+    limit = getattr(settings, 'DELIVERY_RATE_LIMITS', {}).get(provider)
+    if not limit:
+        return 0.0
+
+    waited = 0.0
+    while True:
+        now = time.time()
+        window = int(now)
+        key = rate_limit_cache_key(provider, window)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            count = 1 if cache.add(key, 1, timeout=2) else cache.incr(key)
+        if count <= limit:
+            return waited
+        pause = window + 1 - now
+        time.sleep(pause)
+        waited += pause
+
+
+# =============================================================================
+# Sending
+# =============================================================================
+
+def send_email_messages(messages, connection=None):
+    '''
+    Sends emails one by one over a single pooled connection, within the email rate limit.
+
+    One failed message does not stop the others. A session the server dropped while it was idle
+    in the pool is reopened once.
+
+    Args:
+        messages (list[EmailMessage]): The emails to send.
+        connection: An open email backend connection (borrowed from the pool by default).
+
+    Returns:
+        list[Exception | None]: The error of each message, None if it was sent.
+    '''
+    if connection is None:
+        with email_connection() as connection:
+            return send_email_messages(messages, connection)
+
+    errors = []
+    for message in messages:
+        throttle('email')
+        try:
+            try:
+                connection.send_messages([message])
+            except smtplib.SMTPServerDisconnected:
+                connection.close()
+                connection.open()
+                connection.send_messages([message])
+            errors.append(None)
+        except Exception as e:
+            application_logger.error(f"❌ Error sending email to {message.to}: {e}")
+            errors.append(e)
+    return errors
+
+
+def is_permanent_email_error(error):
+    '''
+    Errors that will not go away on a retry (refused recipients, 5xx replies).
+    '''
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+def is_permanent_sms_error(error):
+    '''
+    Client errors from the SMS API (bad number, bad credentials); 429 is worth a retry.
+    '''
+    return (
+        isinstance(error, httpx.HTTPStatusError)
+        and 400 <= error.response.status_code < 500
+        and error.response.status_code != 429
+    )
+
+
+# =============================================================================
+# Queue
+# =============================================================================
+
+def queue_email(recipients, subject, body, html_body=None, attachments=None, from_email=None, enqueue=True):
+    '''
+    Stores a rendered email for the delivery worker.
+
+    Args:
+        recipients (list[str]): Email addresses.
+        subject (str): Subject line.
+        body (str): Plain text body.
+        html_body (str, optional): HTML alternative.
+        attachments (list[tuple], optional): (filename, content, mimetype) tuples.
+        from_email (str, optional): Sender (``DEFAULT_FROM_EMAIL`` by default).
+        enqueue (bool): Schedule the delivery task on commit.
+
+    Returns:
+        OutboundMessage: The queued message.
+    '''
+    message = OutboundMessage(
+        channel=OutboundMessageChannel.EMAIL,
+        recipients=list(recipients),
+        subject=subject[:255],
+        body=body or '',
+        html_body=html_body,
+        from_email=from_email or '',
+        attachments=[_encode_attachment(*attachment) for attachment in attachments or []],
+    )
+    return queue_messages([message], enqueue=enqueue)[0]
+
+
+def queue_sms(recipients, body, enqueue=True):
+    '''
+    Stores an SMS for the delivery worker.
+
+    Args:
+        recipients (list[str]): Phone numbers (E.164).
+        body (str): Message text.
+        enqueue (bool): Schedule the delivery task on commit.
+
+    Returns:
+        OutboundMessage: The queued message.
+    '''
+    message = OutboundMessage(channel=OutboundMessageChannel.SMS, recipients=list(recipients), body=body)
+    return queue_messages([message], enqueue=enqueue)[0]
+
+
+def queue_messages(messages, enqueue=True):
+    '''
+    Stores unsaved ``OutboundMessage`` rows in one insert and schedules their channels.
+    '''
+    messages = OutboundMessage.objects.bulk_create(messages)
+    if enqueue:
+        for channel in {message.channel for message in messages}:
+            transaction.on_commit(lambda channel=channel: schedule_delivery(channel))
+    return messages
+
+
+def schedule_delivery(channel):
+    '''
+    Starts a delivery task for the channel unless one is already scheduled.
+
+    The flag is dropped by the task before it claims rows, so a message stored after that point
+    schedules a new task. If the broker is unreachable the rows stay queued for the sweep.
+    '''
+    from apps.common.tasks import deliver_outbound_messages
+
+    flag = delivery_scheduled_cache_key(channel)
+    if not cache.add(flag, 1, timeout=getattr(settings, 'DELIVERY_CLAIM_LEASE', 300)):
+        return
+    try:
+        deliver_outbound_messages.delay(channel)
+    except Exception as e:
+        cache.delete(flag)
+        application_logger.warning(f"Could not schedule {channel} delivery, the sweep will pick it up: {e}")
+
+
+def delivery_scheduled_cache_key(channel):
+    return f"delivery_scheduled:{channel}"
+
+
+def retry_delay(attempts):
+    '''
+    Delay before the next delivery attempt (exponential backoff, capped at one hour).
+    '''
+    base = getattr(settings, 'DELIVERY_RETRY_DELAY', 30)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), 3600))
+
+
+# =============================================================================
+# Worker
+# =============================================================================
+
+def claim_batch(channel, limit=None):
+    '''
+    Leases the next due messages of a channel to the caller.
+
+    Rows locked by another worker are skipped (on databases with ``SKIP LOCKED``), so parallel
+    workers take different batches. A row whose lease expired (the worker died mid-batch) is
+    due again.
+
+    Returns:
+        list[OutboundMessage]: The claimed rows, with their attempt counted.
+    '''
+    limit = limit or getattr(settings, 'DELIVERY_BATCH_SIZE', 100)
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'DELIVERY_CLAIM_LEASE', 300))
+    with transaction.atomic():
+        batch = list(
+            OutboundMessage.objects.select_for_update(skip_locked=True).filter(
+                channel=channel,
+                status__in=[OutboundMessageStatus.QUEUED, OutboundMessageStatus.SENDING],
+                next_attempt_at__lte=now,
+            ).order_by('next_attempt_at')[:limit]
+        )
+        OutboundMessage.objects.filter(pk__in=[message.pk for message in batch]).update(
+            status=OutboundMessageStatus.SENDING,
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + lease,
+        )
+    for message in batch:
+        message.attempts += 1
+    return batch
+
+
+def deliver_batch(batch):
+    '''
+    Sends a claimed batch and records every outcome in one bulk update.
+
+    Returns:
+        dict: Number of messages sent, retrying and failed.
+    '''
+    if not batch:
+        return {'sent': 0, 'retrying': 0, 'failed': 0}
+
+    if batch[0].channel == OutboundMessageChannel.EMAIL:
+        outcomes = _deliver_emails(batch)
+    else:
+        outcomes = _deliver_sms(batch)
+
+    now = timezone.now()
+    max_attempts = getattr(settings, 'DELIVERY_MAX_ATTEMPTS', 5)
+    stats = {'sent': 0, 'retrying': 0, 'failed': 0}
+    for message, (result, error, permanent) in zip(batch, outcomes):
+        if result is not None:
+            # Kept on failures too: an SMS retry skips the recipients recorded here
+            message.result = result
+        if error is None:
+            message.status = OutboundMessageStatus.SENT
+            message.sent_at = now
+            message.last_error = None
+            stats['sent'] += 1
+        elif permanent or message.attempts >= max_attempts:
+            message.status = OutboundMessageStatus.FAILED
+            message.last_error = error
+            stats['failed'] += 1
+            application_logger.error(f"❌ {message.channel} {message.pk} failed after {message.attempts} attempt(s): {error}")
+        else:
+            message.status = OutboundMessageStatus.QUEUED
+            message.next_attempt_at = now + retry_delay(message.attempts)
+            message.last_error = error
+            stats['retrying'] += 1
+            application_logger.warning(f"{message.channel} {message.pk} attempt {message.attempts} failed, retrying at {message.next_attempt_at}: {error}")
+
+    OutboundMessage.objects.bulk_update(batch, ['status', 'sent_at', 'result', 'last_error', 'next_attempt_at'])
+    return stats
+
+
+def deliver_due_messages(channel, time_limit=None):
+    '''
+    Claims and sends batches of a channel until nothing is due or ``time_limit`` seconds passed.
+
+    Returns:
+        dict: Number of batches and of messages sent, retrying and failed.
+    '''
+    time_limit = time_limit if time_limit is not None else getattr(settings, 'DELIVERY_WORKER_TIME_LIMIT', 240)
+    started = time.monotonic()
+    stats = {'batches': 0, 'sent': 0, 'retrying': 0, 'failed': 0}
+    while time.monotonic() - started < time_limit:
+        batch = claim_batch(channel)
+        if not batch:
+            break
+        stats['batches'] += 1
+        for key, count in deliver_batch(batch).items():
+            stats[key] += count
+    return stats
+
+
+def _deliver_emails(batch):
+    emails = [_email_from_row(message) for message in batch]
+    try:
+        errors = send_email_messages(emails)
+    except Exception as e:
+        # No connection could be opened; the whole batch is retried
+        application_logger.error(f"❌ Could not open an email connection: {e}")
+        errors = [e] * len(batch)
+    return [
+        (None, None if error is None else str(error), error is not None and is_permanent_email_error(error))
+        for error in errors
+    ]
+
+
+def _sms_delivered(message):
+    '''
+    Provider results of the recipients an SMS already reached, by phone number.
+    '''
+    return dict(message.result) if isinstance(message.result, dict) else {}
+
+
+def _deliver_sms(batch):
+    '''
+    Sends every SMS of the batch to the recipients it has not reached yet, so a retry after a
+    partial failure does not send the text again to the numbers that already received it.
+    '''
+    from admin_backend.backends.sms_backends import DatabaseConfiguredSMSBackend
+
+    pending = [
+        [to for to in message.recipients if to not in _sms_delivered(message)]
+        for message in batch
+    ]
+    sms_messages = [{'to': to, 'body': message.body} for message, recipients in zip(batch, pending) for to in recipients]
+    try:
+        results = DatabaseConfiguredSMSBackend().send_messages(sms_messages)
+    except Exception as e:
+        application_logger.error(f"❌ SMS backend error: {e}")
+        results = [{'status': 'failed', 'reason': str(e), 'retryable': True}] * len(sms_messages)
+
+    outcomes = []
+    position = 0
+    for message, recipients in zip(batch, pending):
+        message_results = results[position:position + len(recipients)]
+        position += len(recipients)
+        delivered = _sms_delivered(message)
+        failures = []
+        for to, result in zip(recipients, message_results):
+            if isinstance(result, dict) and result.get('status') == 'failed':
+                failures.append(result)
+            else:
+                delivered[to] = str(result)
+        if failures:
+            permanent = not any(failure.get('retryable', True) for failure in failures)
+            outcomes.append((delivered, '; '.join(str(failure.get('reason')) for failure in failures), permanent))
+        else:
+            outcomes.append((delivered, None, False))
+    return outcomes
+
+
+def _email_from_row(message):
+    email = EmailMultiAlternatives(
+        subject=message.subject,
+        body=message.body,
+        from_email=message.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=message.recipients,
+    )
+    if message.html_body:
+        email.attach_alternative(message.html_body, "text/html")
+    for filename, content, mimetype in message.attachments:
+        email.attach(filename, base64.b64decode(content), mimetype)
+    return email
+
+
+def _encode_attachment(filename, content, mimetype=None):
+    if isinstance(content, str):
+        content = content.encode()
+    return [filename, base64.b64encode(content).decode(), mimetype]
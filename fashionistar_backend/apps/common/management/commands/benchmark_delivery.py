@@ -0,0 +1,155 @@
+import json
+import time
+
+import httpx
+from django.conf import settings
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from admin_backend.backends import sms_backends
+from admin_backend.models import SMSBackendConfig
+from apps.common.delivery import close_pools, deliver_due_messages, queue_messages
+from apps.common.models import OutboundMessage, OutboundMessageChannel
+from apps.common.testing import FakeSMSServer, HandshakeLocmemEmailBackend
+
+TERMII = 'apps.common.providers.SMS.termii.TermiiSMSProvider'
+
+
+class Command(BaseCommand):
+    """
+    Measures email and SMS throughput (messages per second) of the previous per-message sends and
+    of the delivery engine.
+
+    Nothing leaves the machine: emails go to Django's locmem backend with a simulated connection
+    handshake, SMS go to a local Termii-compatible server with a simulated round-trip. Rate limits
+    are disabled so only the transport is measured.
+
+    *   email per_message: one ``EmailMessage.send()`` per message (one connection each).
+    *   email engine: queued, then sent by the delivery worker over one pooled connection.
+    *   sms per_message: one new HTTP request per recipient, as the providers did.
+    *   sms engine (otp): distinct texts, sent over pooled keep-alive connections.
+    *   sms engine (broadcast): one text, sent as bulk requests.
+
+    The SMS backend configuration is switched to Termii for the run and restored afterwards;
+    queued rows are deleted at the end.
+
+    Usage:
+        python manage.py benchmark_delivery
+        python manage.py benchmark_delivery --messages 1000 --handshake 150 --sms-latency 40 --json
+    """
+    help = "Benchmarks email and SMS messages per second of per-message sends and the delivery engine"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=200, help="Messages per scenario")
+        parser.add_argument('--handshake', type=float, default=100, help="Simulated SMTP connection setup in milliseconds")
+        parser.add_argument('--sms-latency', type=float, default=20, help="Simulated SMS API round-trip in milliseconds")
+        parser.add_argument('--json', action='store_true', help="Output the report as JSON")
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        HandshakeLocmemEmailBackend.handshake = options['handshake'] / 1000
+
+        config = SMSBackendConfig.objects.first()
+        configured_backend = config.sms_backend if config else None
+        if config is None:
+            config = SMSBackendConfig()
+        config.sms_backend = TERMII
+        config.save()
+        sms_backends._providers.clear()
+
+        queued_ids = []
+        try:
+            with FakeSMSServer(latency=options['sms_latency'] / 1000) as server, override_settings(
+                EMAIL_BACKEND='apps.common.testing.HandshakeLocmemEmailBackend',
+                DELIVERY_RATE_LIMITS={},
+                TERMII_API_URL=server.url,
+            ):
+                mail.outbox = []
+                close_pools()
+                report = {
+                    'messages': count,
+                    'handshake_ms': options['handshake'],
+                    'sms_latency_ms': options['sms_latency'],
+                    'email': {
+                        'per_message': self._measure(count, lambda: self._email_per_message(count)),
+                        'engine': self._measure(count, lambda: self._engine(OutboundMessageChannel.EMAIL, count, queued_ids)),
+                    },
+                    'sms': {
+                        'per_message': self._measure(count, lambda: self._sms_per_message(server.url, count)),
+                        'engine_otp': self._measure(count, lambda: self._engine(OutboundMessageChannel.SMS, count, queued_ids)),
+                        'engine_broadcast': self._measure(
+                            count, lambda: self._engine(OutboundMessageChannel.SMS, count, queued_ids, broadcast=True)
+                        ),
+                    },
+                }
+                close_pools()
+        finally:
+            OutboundMessage.objects.filter(pk__in=queued_ids).delete()
+            if configured_backend:
+                config.sms_backend = configured_backend
+                config.save()
+            sms_backends._providers.clear()
+            mail.outbox = []
+
+        for channel in ('email', 'sms'):
+            baseline = report[channel]['per_message']['messages_per_second']
+            for scenario in report[channel].values():
+                scenario['speedup'] = round(scenario['messages_per_second'] / baseline, 1) if baseline else None
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"messages={count} handshake={options['handshake']}ms sms_latency={options['sms_latency']}ms"
+        )
+        for channel in ('email', 'sms'):
+            for name, scenario in report[channel].items():
+                self.stdout.write(
+                    f"{channel:<6} {name:<17} {scenario['messages_per_second']:>10} msg/s  "
+                    f"{scenario['seconds']:>8}s  x{scenario['speedup']}"
+                )
+
+    def _measure(self, count, run):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        return {'seconds': round(elapsed, 3), 'messages_per_second': round(count / elapsed, 1)}
+
+    def _email_per_message(self, count):
+        for index in range(count):
+            EmailMultiAlternatives(
+                subject=f"Order {index} shipped", body="Your order is on its way.",
+                from_email=settings.DEFAULT_FROM_EMAIL, to=[f"bench{index}@example.com"],
+            ).send()
+
+    def _sms_per_message(self, url, count):
+        for index in range(count):
+            response = httpx.post(
+                f"{url}/api/sms/send", json={'to': f"+23480{index:08d}", 'sms': f"Your code is {index:06d}"}, timeout=30
+            )
+            response.raise_for_status()
+
+    def _engine(self, channel, count, queued_ids, broadcast=False):
+        if channel == OutboundMessageChannel.EMAIL:
+            messages = [
+                OutboundMessage(
+                    channel=channel, recipients=[f"bench{index}@example.com"],
+                    subject=f"Order {index} shipped", body="Your order is on its way.",
+                )
+                for index in range(count)
+            ]
+        else:
+            messages = [
+                OutboundMessage(
+                    channel=channel, recipients=[f"+23480{index:08d}"],
+                    body="Flash sale today" if broadcast else f"Your code is {index:06d}",
+                )
+                for index in range(count)
+            ]
+        queued_ids.extend(message.pk for message in queue_messages(messages, enqueue=False))
+        stats = deliver_due_messages(channel)
+        if stats['sent'] != count:
+            raise RuntimeError(f"Delivery engine sent {stats['sent']} of {count} {channel} messages: {stats}")
@@ -1,14 +1,17 @@
 # apps/common/managers/email.py
 
 import logging
-import asyncio
 from typing import Any, List, Optional, Tuple
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail import EmailMessage, EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.template import TemplateDoesNotExist
 
+from apps.common import delivery
+from apps.common.models import OutboundMessage, OutboundMessageChannel
+
 # -----------------------------------------------------------------------------
 # Logger Configuration
 # -----------------------------------------------------------------------------
@@ -46,54 +49,44 @@ class EmailManager:
     2.  **Dynamic Backend Selection**: It leans on the configured `EMAIL_BACKEND` 
         setting (which points to our `DatabaseConfiguredEmailBackend`), allowing
         administrators to switch providers (SMTP, Mailgun, SendGrid) without code changes.
-    3.  **Asynchronous Execution**: Provides native `async` methods (`asend_mail`) 
-        that leverage `asyncio.to_thread` to prevent blocking the Main Event Loop 
-        during I/O-heavy SMTP operations.
-    4.  **Bulk / Mass Sending**: Provides optimized methods for sending batch emails.
+    3.  **Connection Reuse**: Immediate sends borrow an open SMTP session from the 
+        delivery engine's pool (`apps.common.delivery`) instead of connecting per message.
+    4.  **Queued Delivery**: `queue_mail` (and the `async` methods) store the rendered 
+        email and return at once; the Celery delivery worker sends queued emails in 
+        batches, within the provider's rate limit, retrying failures with backoff.
+    5.  **Bulk / Mass Sending**: Provides optimized methods for sending batch emails.
     
     Attributes:
-        max_attempts (int): The number of retries for failed sends (future implementation).
+        max_attempts (int): Kept for compatibility; retries are `DELIVERY_MAX_ATTEMPTS`.
     """
     
     max_attempts = 3 
 
     # =========================================================================
-    # Synchronous Single Email Method
+    # Rendering
     # =========================================================================
 
     @classmethod
-    def send_mail(
+    def render(
         cls,
-        subject: str,
-        recipients: List[str],
         context: Optional[dict[str, Any]] = None,
         template_name: Optional[str] = None,
         message: Optional[str] = None,
-        attachments: Optional[List[tuple]] = None,
-        fail_silently: bool = False
-    ) -> None:
+    ) -> Tuple[str, Optional[str]]:
         """
-        Sends a single email immediately (Synchronous/Blocking).
-        
-        This method is the workhorse for standard email dispatch. It validates inputs,
-        renders templates (HTML + Text), handles attachments, and pushes the email 
-        connection.
-        
+        Validates the arguments and renders the plain text and HTML bodies.
+
         Args:
-            subject (str): The subject line of the email.
-            recipients (List[str]): A list of recipient email addresses.
             context (Optional[dict[str, Any]]): Dictionary of data to render in the template.
             template_name (Optional[str]): Path to the HTML template (e.g., 'emails/welcome.html').
             message (Optional[str]): Explicit plain text message (mutually exclusive with template/context).
-            attachments (Optional[List[tuple]]): List of (filename, content, mimetype) tuples.
-            fail_silently (bool): If True, suppresses exceptions (default: False).
-            
+
+        Returns:
+            Tuple[str, Optional[str]]: The plain text body and the HTML body (None without a template).
+
         Raises:
-            EmailManagerError: If invalid arguments are provided (e.g., context without template).
-            TemplateDoesNotExist: If the specified template path is invalid.
-            Exception: Any underlying error from the email backend provider (if fail_silently=False).
+            EmailManagerError: If the arguments are invalid or the template cannot be rendered.
         """
-        
         # ---------------------------------------------------------------------
         # 1. Argument Validation
         # ---------------------------------------------------------------------
@@ -143,8 +136,52 @@ def send_mail(
                 Logger.error(f"❌ Error rendering email template {template_name}: {e}")
                 raise EmailManagerError(f"Error rendering template: {e}") from e
 
+        return plain_message or '', html_message
+
+    # =========================================================================
+    # Synchronous Single Email Method
+    # =========================================================================
+
+    @classmethod
+    def send_mail(
+        cls,
+        subject: str,
+        recipients: List[str],
+        context: Optional[dict[str, Any]] = None,
+        template_name: Optional[str] = None,
+        message: Optional[str] = None,
+        attachments: Optional[List[tuple]] = None,
+        fail_silently: bool = False
+    ) -> None:
+        """
+        Sends a single email immediately (Synchronous/Blocking).
+        
+        This method is the workhorse for standard email dispatch. It validates inputs,
+        renders templates (HTML + Text), handles attachments, and pushes the email 
+        through a pooled connection (no SMTP handshake when a session is open).
+        
+        Args:
+            subject (str): The subject line of the email.
+            recipients (List[str]): A list of recipient email addresses.
+            context (Optional[dict[str, Any]]): Dictionary of data to render in the template.
+            template_name (Optional[str]): Path to the HTML template (e.g., 'emails/welcome.html').
+            message (Optional[str]): Explicit plain text message (mutually exclusive with template/context).
+            attachments (Optional[List[tuple]]): List of (filename, content, mimetype) tuples.
+            fail_silently (bool): If True, suppresses exceptions (default: False).
+            
+        Raises:
+            EmailManagerError: If invalid arguments are provided (e.g., context without template).
+            TemplateDoesNotExist: If the specified template path is invalid.
+            Exception: Any underlying error from the email backend provider (if fail_silently=False).
+        """
+        
+        # ---------------------------------------------------------------------
+        # 1. Validation & Template Rendering
+        # ---------------------------------------------------------------------
+        plain_message, html_message = cls.render(context, template_name, message)
+
         # ---------------------------------------------------------------------
-        # 3. Email Dispatch
+        # 2. Email Dispatch
         # ---------------------------------------------------------------------
         try:
             # Construct the EmailMultiAlternatives Object
@@ -165,9 +202,11 @@ def send_mail(
                 for filename, content, mimetype in attachments:
                     email.attach(filename, content, mimetype)
 
-            # Send via the configured Backend
+            # Send via a pooled connection of the configured Backend
             # backend logic handles the actual protocol (SMTP, API, etc.)
-            email.send(fail_silently=fail_silently)
+            error = delivery.send_email_messages([email])[0]
+            if error is not None:
+                raise error
             
             Logger.info(f"✅ Email sent successfully to {recipients}")
             
@@ -177,6 +216,51 @@ def send_mail(
                 # Re-raise the exception so the caller knows something went wrong
                 raise
 
+    # =========================================================================
+    # Queued Single Email Method
+    # =========================================================================
+
+    @classmethod
+    def queue_mail(
+        cls,
+        subject: str,
+        recipients: List[str],
+        context: Optional[dict[str, Any]] = None,
+        template_name: Optional[str] = None,
+        message: Optional[str] = None,
+        attachments: Optional[List[tuple]] = None,
+        fail_silently: bool = False
+    ) -> Optional[OutboundMessage]:
+        """
+        Renders an email and queues it for the delivery worker (Non-Blocking for the caller).
+
+        The email is stored as an `OutboundMessage`; the Celery delivery worker sends it 
+        on commit of the current transaction, batched with other queued emails over a 
+        pooled SMTP session, and retries it with backoff if the provider fails.
+        
+        Args:
+            Same arguments as `send_mail`.
+            
+        Returns:
+            Optional[OutboundMessage]: The queued message (None if queuing failed silently).
+        """
+        try:
+            plain_message, html_message = cls.render(context, template_name, message)
+            queued = delivery.queue_email(
+                recipients=recipients,
+                subject=subject,
+                body=plain_message,
+                html_body=html_message,
+                attachments=attachments,
+            )
+            Logger.info(f"📨 Email to {recipients} queued for delivery ({queued.pk})")
+            return queued
+        except Exception as error:
+            Logger.error(f"❌ Error queuing email to {recipients}: {error}", exc_info=True)
+            if not fail_silently:
+                raise
+            return None
+
     # =========================================================================
     # Asynchronous Single Email Method
     # =========================================================================
@@ -195,14 +279,9 @@ async def asend_mail(
         """
         Sends an email asynchronously (Non-Blocking).
         
-        This method is a wrapper around the synchronous `send_mail` method.
-        It utilizes `asyncio.to_thread` to offload the blocking I/O operation 
-        (network socket to SMTP server) to a separate worker thread.
-        
-        Why is this necessary?
-        Django's async views run on a single Event Loop. If we performed a blocking
-        SMTP call directly in the main thread, the entire server would freeze 
-        for all users until that email finished sending.
+        The email is rendered and queued (`queue_mail`); the SMTP work happens in the 
+        Celery delivery worker, so the event loop only waits for one database insert 
+        instead of a thread holding an SMTP session for the whole send.
         
         Args:
             Same arguments as `send_mail`.
@@ -211,9 +290,7 @@ async def asend_mail(
             None
         """
         try:
-            # Delegating the blocking call to a thread pool
-            return await asyncio.to_thread(
-                cls.send_mail,
+            await sync_to_async(cls.queue_mail)(
                 subject=subject,
                 recipients=recipients,
                 context=context,
@@ -223,7 +300,6 @@ async def asend_mail(
                 fail_silently=fail_silently
             )
         except Exception as e:
-            # Catching thread-boundary errors explicitly
             Logger.error(f"❌ Async Email Send Error to {recipients}: {e}", exc_info=True)
             if not fail_silently:
                 raise
@@ -235,32 +311,36 @@ async def asend_mail(
     @classmethod
     def send_mass_mail(cls, datatuple: Tuple[Tuple], fail_silently: bool = False) -> int:
         """
-        Sends multiple distinct emails in a single connection batch (Synchronous).
+        Sends multiple distinct emails over one pooled connection (Synchronous).
         
         This method corresponds to Django's native `send_mass_mail`. It is highly 
         optimized for sending many emails (like newsletters or notifications) 
-        because it opens a single connection to the mail server and pipelines 
-        the messages, rather than opening/closing a connection for each one.
+        because it reuses one open session to the mail server for every message, 
+        rather than opening/closing a connection for each one. Messages are paced 
+        by the email rate limit, and one failed message does not stop the rest.
         
         Args:
             datatuple: A tuple of message tuples. Each message tuple should contain:
                        (subject, message, sender, recipient_list).
-            fail_silently: If True, connection errors will be suppressed.
+            fail_silently: If True, errors are logged and not raised.
 
         Returns:
             int: The number of messages successfully delivered.
         """
-        from django.core.mail import send_mass_mail as django_mass_mail
-        
         try:
             Logger.info(f"🚀 Starting bulk email send. Batch size: {len(datatuple)} messages.")
             
-            # Note on Backend: This call will utilize our globally configured 
-            # EMAIL_BACKEND (DatabaseConfiguredEmailBackend).
-            # The backend is responsible for handling the connection reuse.
-            count = django_mass_mail(datatuple, fail_silently=fail_silently)
+            messages = [
+                EmailMessage(subject, message, sender or settings.DEFAULT_FROM_EMAIL, recipients)
+                for subject, message, sender, recipients in datatuple
+            ]
+            errors = delivery.send_email_messages(messages)
+            count = errors.count(None)
             
-            Logger.info(f"✅ Bulk email send completed successfully. Sent: {count}/{len(datatuple)}")
+            Logger.info(f"✅ Bulk email send completed. Sent: {count}/{len(datatuple)}")
+            first_error = next((error for error in errors if error is not None), None)
+            if first_error is not None:
+                raise first_error
             return count
             
         except Exception as e:
@@ -270,17 +350,41 @@ def send_mass_mail(cls, datatuple: Tuple[Tuple], fail_silently: bool = False) ->
             return 0
 
     # =========================================================================
-    # Asynchronous Bulk / Mass Email Method
+    # Queued / Asynchronous Bulk / Mass Email Methods
     # =========================================================================
 
+    @classmethod
+    def queue_mass_mail(cls, datatuple: Tuple[Tuple]) -> List[OutboundMessage]:
+        """
+        Queues multiple distinct emails for the delivery worker in one insert.
+
+        Args:
+            datatuple: Tuple of message tuples (see send_mass_mail).
+
+        Returns:
+            List[OutboundMessage]: The queued messages.
+        """
+        messages = [
+            OutboundMessage(
+                channel=OutboundMessageChannel.EMAIL,
+                recipients=list(recipients),
+                subject=subject[:255],
+                body=message or '',
+                from_email=sender or '',
+            )
+            for subject, message, sender, recipients in datatuple
+        ]
+        queued = delivery.queue_messages(messages)
+        Logger.info(f"📨 {len(queued)} emails queued for delivery.")
+        return queued
+
     @classmethod
     async def asend_mass_mail(cls, datatuple: Tuple[Tuple], fail_silently: bool = False) -> int:
         """
         Sends multiple distinct emails asynchronously (Non-Blocking).
         
-        This is the **Async** counterpart for bulk email sending.
-        It wraps `send_mass_mail` in `asyncio.to_thread` to ensure the 
-        blocking mass-send operation does not halt the async event loop.
+        This is the **Async** counterpart for bulk email sending. The emails are 
+        queued in one insert (`queue_mass_mail`) and sent by the delivery worker.
         
         Usage:
             await EmailManager.asend_mass_mail(messages_tuple)
@@ -290,17 +394,13 @@ async def asend_mass_mail(cls, datatuple: Tuple[Tuple], fail_silently: bool = Fa
             fail_silently: Boolean to suppress errors.
             
         Returns:
-            int: Number of messages sent.
+            int: Number of messages queued.
         """
         try:
-            # Offloading to worker thread
-            return await asyncio.to_thread(
-                cls.send_mass_mail, 
-                datatuple, 
-                fail_silently
-            )
+            queued = await sync_to_async(cls.queue_mass_mail)(datatuple)
+            return len(queued)
         except Exception as e:
             Logger.error(f"❌ Error in asend_mass_mail: {e}", exc_info=True)
             if not fail_silently:
                 raise
-            return 0
\ No newline at end of file
+            return 0
@@ -1,11 +1,14 @@
 # apps/common/managers/sms.py
 
 import logging
-import asyncio
 from typing import List, Dict, Any
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 
+from apps.common import delivery
+from apps.common.models import OutboundMessage, OutboundMessageChannel
+
 # -----------------------------------------------------------------------------
 # Logger Configuration
 # -----------------------------------------------------------------------------
@@ -41,20 +44,23 @@ class SMSManager:
         This enables admin-controlled switching of providers at runtime without 
         deploying new code.
         
-    2.  **Dual-Mode Execution (Sync & Async)**:
+    2.  **Immediate & Queued Execution**:
         - `send_sms`: Standard blocking implementation for Sync Views/Tasks.
-        - `asend_sms`: Non-blocking, thread-offloaded implementation for Async Views.
+        - `queue_sms` / `asend_sms`: Store the message for the Celery delivery 
+          worker (`apps.common.delivery`) and return at once; the worker sends 
+          queued messages in batches and retries failures with backoff.
         
     3.  **Bulk / Mass Messaging**:
-        - `send_mass_sms` / `asend_mass_sms`: Optimized flows for handling lists 
-          of messages, ensuring efficient iteration and batch logging.
+        - `send_mass_sms` / `asend_mass_sms`: Messages sharing a text go out as 
+          provider bulk requests; every request shares the provider's pooled HTTP 
+          connections and rate limit.
           
     4.  **Robust Error Handling**:
         Every method is wrapped in comprehensive try-except blocks to catch, log, 
         and re-raise errors contextually.
         
     Attributes:
-        max_attempts (int): configuration for future retry logic.
+        max_attempts (int): Kept for compatibility; retries are `DELIVERY_MAX_ATTEMPTS`.
     """
     
     max_attempts = 3 
@@ -108,6 +114,8 @@ def send_sms(cls, to: str, body: str) -> str:
             # -----------------------------------------------------------------
             # Retrieve the specific result for this single message
             result = results[0] if results else 'sent_with_no_id'
+            if isinstance(result, dict) and result.get('status') == 'failed':
+                raise SMSManagerError(result.get('reason'))
             
             logger.info(f"✅ SMS sent successfully to {to}. Provider Response: {result}")
             return result
@@ -121,31 +129,50 @@ def send_sms(cls, to: str, body: str) -> str:
             raise SMSManagerError(f"Failed to send SMS to {to}: {error}") from error
 
     # =========================================================================
-    # Asynchronous Single SMS Method
+    # Queued / Asynchronous Single SMS Methods
     # =========================================================================
 
+    @classmethod
+    def queue_sms(cls, to: str, body: str) -> OutboundMessage:
+        """
+        Queues a single SMS for the delivery worker (Non-Blocking for the caller).
+
+        The message is sent by the Celery delivery worker on commit of the current 
+        transaction, batched with other queued messages of the same text.
+
+        Args:
+            to (str): The recipient's phone number.
+            body (str): The SMS text body.
+
+        Returns:
+            OutboundMessage: The queued message.
+        """
+        try:
+            queued = delivery.queue_sms([to], body)
+            logger.info(f"📨 SMS to {to} queued for delivery ({queued.pk})")
+            return queued
+        except Exception as error:
+            logger.error(f"❌ Error queuing SMS to {to}: {error}", exc_info=True)
+            raise SMSManagerError(f"Failed to queue SMS to {to}: {error}") from error
+
     @classmethod
     async def asend_sms(cls, to: str, body: str) -> str:
         """
         Sends a single SMS message asynchronously (Non-Blocking).
 
-        This wrapper is essential for Async Django (ASGI). Calling the sync
-        `send_sms` directly would block the Event Loop while waiting for 
-        HTTP requests to complete (which can take 100ms - 2s).
-        
-        Solution:
-        We use `asyncio.to_thread` to push the execution of `send_sms` onto 
-        a separate thread, allowing the main loop to continue processing other requests.
+        The message is queued (`queue_sms`), so the event loop only waits for one 
+        database insert; the provider request is made by the delivery worker.
 
         Args:
             to (str): The recipient's phone number.
             body (str): The SMS text body.
 
         Returns:
-            str: The Message SID or Status String.
+            str: The id of the queued message.
         """
         try:
-            return await asyncio.to_thread(cls.send_sms, to, body)
+            queued = await sync_to_async(cls.queue_sms)(to, body)
+            return str(queued.pk)
         except Exception as e:
             logger.error(f"❌ Async SMS Send Error to {to}: {e}", exc_info=True)
             raise SMSManagerError(f"Async SMS Failed to {to}: {e}")
@@ -196,27 +223,44 @@ def send_mass_sms(cls, messages: List[Dict[str, str]]) -> List[Any]:
             raise SMSManagerError(f"Failed to send mass SMS batch: {error}")
 
     # =========================================================================
-    # Asynchronous Bulk / Mass SMS Method
+    # Queued / Asynchronous Bulk / Mass SMS Methods
     # =========================================================================
 
+    @classmethod
+    def queue_mass_sms(cls, messages: List[Dict[str, str]]) -> List[OutboundMessage]:
+        """
+        Queues a batch of SMS messages for the delivery worker in one insert.
+
+        Args:
+            messages (List[Dict[str, str]]): List of message dictionaries ('to', 'body').
+
+        Returns:
+            List[OutboundMessage]: The queued messages.
+        """
+        queued = delivery.queue_messages([
+            OutboundMessage(channel=OutboundMessageChannel.SMS, recipients=[message['to']], body=message['body'])
+            for message in messages
+        ])
+        logger.info(f"📨 {len(queued)} SMS messages queued for delivery.")
+        return queued
+
     @classmethod
     async def asend_mass_sms(cls, messages: List[Dict[str, str]]) -> List[Any]:
         """
         Sends a batch of SMS messages asynchronously (Non-Blocking).
 
-        This is the **Async** function for bulk SMS sending.
-        It wraps `send_mass_sms` in `asyncio.to_thread` to ensure that processing 
-        a large list of messages (which involves many network calls) does not 
-        freeze the asynchronous application server.
+        This is the **Async** function for bulk SMS sending. The messages are 
+        queued in one insert (`queue_mass_sms`) and sent by the delivery worker.
 
         Args:
             messages (List[Dict[str, str]]): List of message dictionaries.
 
         Returns:
-            List[Any]: List of results.
+            List[Any]: The ids of the queued messages.
         """
         try:
-            return await asyncio.to_thread(cls.send_mass_sms, messages)
+            queued = await sync_to_async(cls.queue_mass_sms)(messages)
+            return [str(message.pk) for message in queued]
         except Exception as e:
             logger.error(f"❌ Error in asend_mass_sms: {e}", exc_info=True)
-            raise SMSManagerError(f"Failed to send async mass SMS: {e}")
\ No newline at end of file
+            raise SMSManagerError(f"Failed to send async mass SMS: {e}")
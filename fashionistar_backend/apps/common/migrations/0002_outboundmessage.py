@@ -0,0 +1,39 @@
+# Generated by Django 5.2.5 on 2026-10-19 04:36
+
+import django.utils.timezone
+import uuid6
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundMessage',
+            fields=[
+                ('id', models.UUIDField(default=uuid6.uuid7, editable=False, primary_key=True, serialize=False)),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('sms', 'SMS')], max_length=10)),
+                ('recipients', models.JSONField(help_text='Email addresses or phone numbers.')),
+                ('subject', models.CharField(blank=True, max_length=255)),
+                ('body', models.TextField(blank=True, help_text='Plain text body (the SMS text for SMS).')),
+                ('html_body', models.TextField(blank=True, null=True)),
+                ('from_email', models.CharField(blank=True, max_length=255)),
+                ('attachments', models.JSONField(blank=True, default=list, help_text='[filename, base64 content, mimetype] triples.')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, help_text='Provider message ids (by phone number for SMS).', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['channel', 'status', 'next_attempt_at'], name='outbound_message_due_idx')],
+            },
+        ),
+    ]
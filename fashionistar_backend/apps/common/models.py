@@ -123,3 +123,51 @@ def is_owner(self, user):
         Override in subclasses.
         """
         return False  # Default implementation
+
+
+class OutboundMessageChannel(models.TextChoices):
+    EMAIL = 'email', 'Email'
+    SMS = 'sms', 'SMS'
+
+
+class OutboundMessageStatus(models.TextChoices):
+    QUEUED = 'queued', 'Queued'
+    SENDING = 'sending', 'Sending'
+    SENT = 'sent', 'Sent'
+    FAILED = 'failed', 'Failed'
+
+
+class OutboundMessage(models.Model):
+    """
+    An email or SMS waiting for the delivery worker (see apps/common/delivery.py).
+
+    Emails are stored fully rendered, so the worker never touches templates. The worker claims
+    queued rows in batches per channel, sends them over pooled provider connections and retries
+    failures with exponential backoff.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid6.uuid7, editable=False)
+    channel = models.CharField(max_length=10, choices=OutboundMessageChannel.choices)
+    recipients = models.JSONField(help_text="Email addresses or phone numbers.")
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True, help_text="Plain text body (the SMS text for SMS).")
+    html_body = models.TextField(blank=True, null=True)
+    from_email = models.CharField(max_length=255, blank=True)
+    attachments = models.JSONField(default=list, blank=True, help_text="[filename, base64 content, mimetype] triples.")
+
+    status = models.CharField(max_length=10, choices=OutboundMessageStatus.choices, default=OutboundMessageStatus.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    result = models.JSONField(blank=True, null=True, help_text="Provider message ids (by phone number for SMS).")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['channel', 'status', 'next_attempt_at'], name='outbound_message_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} to {', '.join(self.recipients)} - {self.get_status_display()}"
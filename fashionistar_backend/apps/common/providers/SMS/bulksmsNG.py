@@ -3,15 +3,20 @@
 import logging
 from django.conf import settings
 
+from apps.common.delivery import get_http_client
+
 logger = logging.getLogger('application')
 
 class BulksmsNGSMSProvider:
     """
     SMS provider using BulkSMS Nigeria API.
-    Uses httpx for non-blocking async HTTP calls.
+    Uses httpx for non-blocking async HTTP calls; sync calls go through the shared
+    keep-alive client of the delivery engine.
     """
 
-    BASE_URL = "https://www.bulksmsnigeria.com/api/v1/sms/create"
+    API_URL = "https://www.bulksmsnigeria.com"
+    bulk_size = 100  # Recipients per request ('to' takes comma separated numbers)
+    rate_limit_key = 'bulksmsng'
 
     def __init__(self):
         """
@@ -19,6 +24,7 @@ def __init__(self):
         """
         self.api_token = getattr(settings, 'BULKSMS_NG_API_TOKEN', '')
         self.sender_id = getattr(settings, 'BULKSMS_NG_SENDER_ID', 'Fashionistar')
+        self.base_url = f"{getattr(settings, 'BULKSMS_NG_API_URL', self.API_URL)}/api/v1/sms/create"
 
     def send(self, to: str, body: str) -> str:
         """
@@ -43,7 +49,7 @@ def send(self, to: str, body: str) -> str:
                 'dnd': 1  # Skip DND (Do Not Disturb) numbers
             }
             
-            response = httpx.post(self.BASE_URL, json=payload, timeout=30)
+            response = get_http_client().post(self.base_url, json=payload)
             # Raise error for bad status codes (4xx/5xx)
             response.raise_for_status()
             data = response.json()
@@ -59,6 +65,22 @@ def send(self, to: str, body: str) -> str:
             logger.error(f"Error sending SMS via BulkSMS NG to {to}: {str(e)}")
             raise
 
+    def send_bulk(self, recipients: list[str], body: str) -> str:
+        """
+        Send the same SMS to many recipients in one request.
+
+        Args:
+            recipients (list[str]): Recipient phone numbers (at most `bulk_size`).
+            body (str): Message body.
+
+        Returns:
+            str: Message ID of the request.
+
+        Raises:
+            Exception: If SMS sending fails.
+        """
+        return self.send(','.join(recipients), body)
+
     async def asend(self, to: str, body: str) -> str:
         """
         Send SMS asynchronously via BulkSMS Nigeria.
@@ -84,7 +106,7 @@ async def asend(self, to: str, body: str) -> str:
             }
             
             async with httpx.AsyncClient() as client:
-                response = await client.post(self.BASE_URL, json=payload, timeout=30)
+                response = await client.post(self.base_url, json=payload, timeout=30)
                 response.raise_for_status()
                 data = response.json()
                 
@@ -3,15 +3,20 @@
 import logging
 from django.conf import settings
 
+from apps.common.delivery import get_http_client
+
 logger = logging.getLogger('application')
 
 class TermiiSMSProvider:
     """
     SMS provider using Termii API.
-    Uses httpx for non-blocking async HTTP calls.
+    Uses httpx for non-blocking async HTTP calls; sync calls go through the shared
+    keep-alive client of the delivery engine.
     """
 
-    BASE_URL = "https://api.ng.termii.com/api/sms/send"
+    API_URL = "https://api.ng.termii.com"
+    bulk_size = 100  # Recipients per bulk request
+    rate_limit_key = 'termii'
 
     def __init__(self):
         """
@@ -19,6 +24,9 @@ def __init__(self):
         """
         self.api_key = getattr(settings, 'TERMII_API_KEY', '')
         self.sender_id = getattr(settings, 'TERMII_SENDER_ID', 'Fashionistar')
+        api_url = getattr(settings, 'TERMII_API_URL', self.API_URL)
+        self.base_url = f"{api_url}/api/sms/send"
+        self.bulk_url = f"{api_url}/api/sms/send/bulk"
 
     def send(self, to: str, body: str) -> str:
         """
@@ -44,7 +52,7 @@ def send(self, to: str, body: str) -> str:
                 'api_key': self.api_key
             }
             
-            response = httpx.post(self.BASE_URL, json=payload, timeout=30)
+            response = get_http_client().post(self.base_url, json=payload)
             response.raise_for_status()
             data = response.json()
             
@@ -58,6 +66,44 @@ def send(self, to: str, body: str) -> str:
             logger.error(f"Error sending SMS via Termii to {to}: {str(e)}")
             raise
 
+    def send_bulk(self, recipients: list[str], body: str) -> str:
+        """
+        Send the same SMS to many recipients in one request (Termii bulk endpoint).
+
+        Args:
+            recipients (list[str]): Recipient phone numbers (at most `bulk_size`).
+            body (str): Message body.
+
+        Returns:
+            str: Message ID of the bulk request.
+
+        Raises:
+            Exception: If SMS sending fails.
+        """
+        try:
+            payload = {
+                'to': recipients,
+                'from': self.sender_id,
+                'sms': body,
+                'type': 'plain',
+                'channel': 'generic',
+                'api_key': self.api_key
+            }
+
+            response = get_http_client().post(self.bulk_url, json=payload)
+            response.raise_for_status()
+            data = response.json()
+
+            if data.get('code') == 'ok' or data.get('status') == 'success':
+                message_id = data.get('message_id')
+                logger.info(f"Bulk SMS sent via Termii to {len(recipients)} recipients, Message ID: {message_id}")
+                return message_id
+            else:
+                raise Exception(f"Termii API error: {data.get('message', 'Unknown error')}")
+        except Exception as e:
+            logger.error(f"Error sending bulk SMS via Termii to {len(recipients)} recipients: {str(e)}")
+            raise
+
     async def asend(self, to: str, body: str) -> str:
         """
         Send SMS asynchronously via Termii.
@@ -84,7 +130,7 @@ async def asend(self, to: str, body: str) -> str:
             }
             
             async with httpx.AsyncClient() as client:
-                response = await client.post(self.BASE_URL, json=payload, timeout=30)
+                response = await client.post(self.base_url, json=payload, timeout=30)
                 response.raise_for_status()
                 data = response.json()
                 
@@ -10,8 +10,12 @@ class TwilioSMSProvider:
     """
     SMS provider using Twilio.
     Twilio SDK is synchronous, so we wrap it with asyncio.to_thread for async support.
+    Twilio has no bulk endpoint; the SMS backend keeps one instance per process, so the
+    client's HTTP session (and its keep-alive connections) is reused between messages.
     """
 
+    rate_limit_key = 'twilio'
+
     def __init__(self):
         """
         Initialize Twilio client.
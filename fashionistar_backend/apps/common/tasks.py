@@ -1,8 +1,12 @@
-# utilities/tasks.py
+# apps/common/tasks.py
 import requests
 import logging
 from celery import shared_task
 from django.conf import settings
+from django.core.cache import cache
+
+from apps.common.delivery import deliver_due_messages, delivery_scheduled_cache_key
+from apps.common.models import OutboundMessageChannel
 
 logger = logging.getLogger(__name__)
 
@@ -25,4 +29,36 @@ def keep_service_awake():
         else:
             logger.error(f"Failed to ping {site_url}. Status: {response.status_code}")
     except requests.exceptions.RequestException as e:
-        logger.error(f"An error occurred while pinging {site_url}: {e}")
\ No newline at end of file
+        logger.error(f"An error occurred while pinging {site_url}: {e}")
+
+@shared_task(name="deliver_outbound_messages")
+def deliver_outbound_messages(channel: str) -> dict:
+    """
+    Sends the queued emails or SMS of one channel in batches (see apps/common/delivery.py).
+
+    Scheduled by ``schedule_delivery`` when messages are queued; a burst of messages schedules
+    a single run, which keeps claiming batches until nothing is due.
+
+    Args:
+        channel (str): 'email' or 'sms'.
+
+    Returns:
+        dict: Number of batches and of messages sent, retrying and failed.
+    """
+    # Dropped before claiming, so messages queued from now on schedule a new run
+    cache.delete(delivery_scheduled_cache_key(channel))
+    stats = deliver_due_messages(channel)
+    logger.info(f"Delivered {channel} messages: {stats}")
+    return stats
+
+
+@shared_task(name="deliver_pending_messages")
+def deliver_pending_messages() -> dict:
+    """
+    Periodic sweep over the outbound message queue (see CELERY_BEAT_SCHEDULE): sends retries
+    that are due and messages whose delivery task was lost.
+
+    Returns:
+        dict: The delivery stats per channel.
+    """
+    return {channel: deliver_due_messages(channel) for channel in OutboundMessageChannel.values}
@@ -0,0 +1,128 @@
+# apps/common/testing.py
+'''
+Local stand-ins for the delivery providers, used by the tests and ``benchmark_delivery``.
+
+*   ``HandshakeLocmemEmailBackend``: Django's locmem backend with the connection semantics of the
+    SMTP backend (``send_messages`` connects and disconnects unless the connection is already
+    open) and a simulated handshake, so connection reuse can be counted and timed.
+*   ``FakeSMSServer``: a threaded HTTP server speaking the Termii send and bulk endpoints on
+    127.0.0.1, with a simulated round-trip and scripted error responses.
+'''
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.mail.backends import locmem
+
+
+class HandshakeLocmemEmailBackend(locmem.EmailBackend):
+    """
+    Locmem email backend that pays ``handshake`` seconds per connection it opens.
+    """
+    handshake = 0.0
+    connections_opened = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.connected = False
+
+    def open(self):
+        if self.connected:
+            return False
+        time.sleep(self.handshake)
+        type(self).connections_opened += 1
+        self.connected = True
+        return True
+
+    def close(self):
+        self.connected = False
+
+    def send_messages(self, messages):
+        new_connection = self.open()
+        try:
+            return super().send_messages(messages)
+        finally:
+            if new_connection:
+                self.close()
+
+
+class FakeSMSServer:
+    """
+    Termii-compatible SMS API on a free local port.
+
+    Usage:
+        with FakeSMSServer(latency=0.02) as server:
+            settings.TERMII_API_URL = server.url
+            ...
+            server.requests  # [(path, payload), ...]
+
+    ``fail_with`` queues HTTP status codes returned (in order) by the next requests.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = []
+        self.fail_with = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def recipients(self):
+        '''
+        Every phone number the server was asked to send to.
+        '''
+        numbers = []
+        for _, payload in self.requests:
+            to = payload['to']
+            numbers.extend(to if isinstance(to, list) else to.split(','))
+        return numbers
+
+    def _respond(self, path, payload):
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests.append((path, payload))
+            status = self.fail_with.popleft() if self.fail_with else 200
+        if status != 200:
+            return status, {'message': f'Fake error {status}'}
+        if path.endswith('/bulk'):
+            return 200, {'code': 'ok', 'message_id': uuid.uuid4().hex, 'message': 'Successfully Sent'}
+        return 200, {'code': '20', 'status': 'success', 'message_id': uuid.uuid4().hex}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                status, body = server._respond(self.path, payload)
+                content = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
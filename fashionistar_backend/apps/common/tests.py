@@ -1,3 +1,130 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from admin_backend.backends import sms_backends
+from admin_backend.models import SMSBackendConfig
+from apps.common.delivery import close_pools, deliver_due_messages, queue_sms, throttle
+from apps.common.managers.email import EmailManager
+from apps.common.managers.sms import SMSManager, SMSManagerError
+from apps.common.models import OutboundMessage, OutboundMessageStatus
+from apps.common.testing import FakeSMSServer, HandshakeLocmemEmailBackend
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+TERMII = 'apps.common.providers.SMS.termii.TermiiSMSProvider'
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHE,
+    EMAIL_BACKEND='apps.common.testing.HandshakeLocmemEmailBackend',
+    DELIVERY_RATE_LIMITS={},
+    DELIVERY_BATCH_SIZE=100,
+)
+class DeliveryEngineTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        close_pools()
+        sms_backends._providers.clear()
+        HandshakeLocmemEmailBackend.connections_opened = 0
+
+        config = SMSBackendConfig.objects.first() or SMSBackendConfig()
+        config.sms_backend = TERMII
+        config.save()
+
+    def test_queued_emails_are_sent_over_one_pooled_connection(self):
+        with mock.patch('apps.common.tasks.deliver_outbound_messages.delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                for index in range(20):
+                    EmailManager.queue_mail(subject=f'Order {index}', recipients=[f'user{index}@example.com'], message='Shipped')
+        # A burst schedules one delivery run, not one per message
+        delay.assert_called_once_with('email')
+
+        stats = deliver_due_messages('email')
+
+        self.assertEqual(stats['sent'], 20)
+        self.assertEqual(len(mail.outbox), 20)
+        self.assertEqual(HandshakeLocmemEmailBackend.connections_opened, 1)
+        self.assertFalse(OutboundMessage.objects.exclude(status=OutboundMessageStatus.SENT).exists())
+
+        # An immediate send reuses the idle session
+        EmailManager.send_mail(subject='Receipt', recipients=['user@example.com'], message='Paid')
+        self.assertEqual(HandshakeLocmemEmailBackend.connections_opened, 1)
+
+    def test_sms_sharing_a_text_are_sent_as_bulk_requests(self):
+        messages = [{'to': f'+234800000{index:04d}', 'body': 'Flash sale today'} for index in range(150)]
+        messages += [{'to': '+2348011111111', 'body': 'Your code is 1234'}, {'to': '+2348022222222', 'body': 'Your code is 5678'}]
+
+        with FakeSMSServer() as server, self.settings(TERMII_API_URL=server.url):
+            SMSManager.queue_mass_sms(messages)
+            stats = deliver_due_messages('sms')
+
+        self.assertEqual(stats['sent'], 152)
+        paths = sorted(path for path, _ in server.requests)
+        self.assertEqual(paths, ['/api/sms/send', '/api/sms/send', '/api/sms/send/bulk', '/api/sms/send/bulk'])
+        self.assertCountEqual(server.recipients(), [message['to'] for message in messages])
+        self.assertFalse(OutboundMessage.objects.filter(result__isnull=True).exists())
+
+    def test_failed_sms_is_retried_with_backoff(self):
+        with FakeSMSServer() as server, self.settings(TERMII_API_URL=server.url, DELIVERY_RETRY_DELAY=30):
+            server.fail_with.append(503)
+            queued = SMSManager.queue_sms('+2348011111111', 'Your code is 1234')
+
+            self.assertEqual(deliver_due_messages('sms')['retrying'], 1)
+            queued.refresh_from_db()
+            self.assertEqual(queued.status, OutboundMessageStatus.QUEUED)
+            self.assertEqual(queued.attempts, 1)
+            self.assertGreater(queued.next_attempt_at, timezone.now() + timedelta(seconds=25))
+
+            # Not due yet
+            self.assertEqual(deliver_due_messages('sms')['batches'], 0)
+
+            OutboundMessage.objects.filter(pk=queued.pk).update(next_attempt_at=timezone.now())
+            self.assertEqual(deliver_due_messages('sms')['sent'], 1)
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, OutboundMessageStatus.SENT)
+        self.assertEqual(queued.attempts, 2)
+
+    def test_sms_retry_skips_recipients_already_reached(self):
+        numbers = [f'+234800000{index:04d}' for index in range(150)]
+        with FakeSMSServer() as server, self.settings(TERMII_API_URL=server.url):
+            # One of the two bulk requests fails
+            server.fail_with.append(503)
+            queued = queue_sms(numbers, 'Flash sale today')
+            self.assertEqual(deliver_due_messages('sms')['retrying'], 1)
+            queued.refresh_from_db()
+            reached = set(queued.result)
+            self.assertIn(len(reached), (50, 100))
+
+            first_round = len(server.requests)
+            OutboundMessage.objects.filter(pk=queued.pk).update(next_attempt_at=timezone.now())
+            self.assertEqual(deliver_due_messages('sms')['sent'], 1)
+            retried = [number for _, payload in server.requests[first_round:] for number in payload['to']]
+
+        self.assertCountEqual(retried, set(numbers) - reached)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, sorted(queued.result)), (OutboundMessageStatus.SENT, sorted(numbers)))
+
+    def test_client_errors_fail_without_retry(self):
+        with FakeSMSServer() as server, self.settings(TERMII_API_URL=server.url):
+            server.fail_with.append(400)
+            queued = SMSManager.queue_sms('+2348011111111', 'Your code is 1234')
+            self.assertEqual(deliver_due_messages('sms')['failed'], 1)
+
+            server.fail_with.append(400)
+            with self.assertRaises(SMSManagerError):
+                SMSManager.send_sms('+2348011111111', 'Your code is 1234')
+
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, OutboundMessageStatus.FAILED)
+        self.assertIn('400', queued.last_error)
+
+    def test_rate_limit_holds_sends_beyond_the_limit_to_the_next_second(self):
+        with self.settings(DELIVERY_RATE_LIMITS={'email': 3}):
+            waits = [throttle('email') for _ in range(4)]
+        self.assertEqual(waits[:3], [0.0, 0.0, 0.0])
+        self.assertGreater(waits[3], 0)
@@ -71,6 +71,7 @@
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    'django.contrib.postgres',  # Full-text and trigram lookups of the product search (store/search.py)
     
     # =================================================================================
     # Whitenoise must be listed before 'django.contrib.staticfiles' if you're not using the middleware.
@@ -283,6 +284,10 @@
     "default": {
         "BACKEND": "cloudinary_storage.storage.MediaCloudinaryStorage",
     },
+    "chat_attachments": {
+        # Chat attachments are stored encrypted, so they go to Cloudinary as raw files, not images
+        "BACKEND": "cloudinary_storage.storage.RawMediaCloudinaryStorage",
+    },
     "staticfiles": {
         # Use whitenoise CompressedManifestStaticFilesStorage in production, Django's default for local DEBUG
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage" if not DEBUG else "django.contrib.staticfiles.storage.StaticFilesStorage",
@@ -309,9 +314,76 @@
 ]
 
 
+# Chat transport (see chat/consumer.py)
+CHAT_IO_WORKERS = env.int("CHAT_IO_WORKERS", default=8)  # Threads for chat file encryption, storage writes and queries
+CHAT_UPLOAD_CHUNK_SIZE = env.int("CHAT_UPLOAD_CHUNK_SIZE", default=256 * 1024)  # Largest chunk (binary frame payload) a client may send
+CHAT_UPLOAD_MAX_BYTES = env.int("CHAT_UPLOAD_MAX_BYTES", default=25 * 1024 * 1024)  # Largest file accepted through a chunked upload
+CHAT_UPLOAD_TTL = env.int("CHAT_UPLOAD_TTL", default=3600)  # Seconds an unfinished upload can be resumed
+CHAT_UPLOAD_TEMP_DIR = env("CHAT_UPLOAD_TEMP_DIR", default=None)  # Temp files of uploads in progress (system temp dir by default)
+CHAT_INLINE_FILE_MAX_BYTES = env.int("CHAT_INLINE_FILE_MAX_BYTES", default=1024 * 1024)  # Limit of the legacy base64 files sent in the message frame
+
+
+# Cart summaries (totals and rendered items per cart_id, dropped on every cart write)
+CART_SUMMARY_CACHE_TTL = env.int("CART_SUMMARY_CACHE_TTL", default=300)
+
+# Homepage catalog reads (payloads cached per resource version, see Homepage/catalog.py)
+CATALOG_CACHE_TTL = env.int("CATALOG_CACHE_TTL", default=300)  # Seconds a cached page lives; writes invalidate it immediately
+
+# Product search (see store/search.py)
+PRODUCT_SEARCH_INDEX_ASYNC = env.bool("PRODUCT_SEARCH_INDEX_ASYNC", default=True)  # Re-index on the Celery worker (False: inline after commit)
+PRODUCT_SEARCH_INDEX_BATCH_SIZE = env.int("PRODUCT_SEARCH_INDEX_BATCH_SIZE", default=1000)  # Products per indexer batch
+PRODUCT_SEARCH_CONFIG = env("PRODUCT_SEARCH_CONFIG", default="english")  # Postgres text search configuration
+PRODUCT_SEARCH_FACET_LIMIT = env.int("PRODUCT_SEARCH_FACET_LIMIT", default=20)  # Categories and vendors listed per facet
+PRODUCT_SEARCH_MAX_RESULTS = env.int("PRODUCT_SEARCH_MAX_RESULTS", default=1000)  # Best matches returned by the SQLite FTS5 backend
+PRODUCT_SEARCH_PRICE_BUCKETS = [5000, 10000, 25000, 50000, 100000]  # Upper bounds (NGN) of the price facet buckets
+
+# Order history and order detail (see store/orders.py)
+ORDER_SNAPSHOT_CACHE_TTL = env.int("ORDER_SNAPSHOT_CACHE_TTL", default=86400)  # Seconds a fulfilled order's cached snapshot lives
+
+# Notification inboxes (see notification/inbox.py)
+NOTIFICATION_COUNTER_TTL = env.int("NOTIFICATION_COUNTER_TTL", default=3600)  # Seconds a cached unseen/total counter lives before it is recounted
+
+
 # Paystack API Keys
 PAYSTACK_TEST_KEY = env("PAYSTACK_TEST_KEY", default="sk_test_f5995ad3b929498e963ca52a9a065dd5c3190e31")
 PAYSTACK_SECRET_KEY = env("PAYSTACK_SECRET_KEY", default="sk_test_f5995ad3b929498e963ca52a9a065dd5c3190e31")
+PAYSTACK_TIMEOUT = env.int("PAYSTACK_TIMEOUT", default=30)  # Seconds before an outbound Paystack call is abandoned
+
+# Vendor withdrawals (two-phase: reserve in a short transaction, transfer from the outbox worker)
+WITHDRAWAL_TRANSFER_PROVIDER = env("WITHDRAWAL_TRANSFER_PROVIDER", default="paystack")  # 'paystack' or 'fake' (local benchmarks)
+WITHDRAWAL_MAX_ATTEMPTS = env.int("WITHDRAWAL_MAX_ATTEMPTS", default=5)  # Dispatch attempts before the reserved amount is released
+WITHDRAWAL_RETRY_DELAY = env.int("WITHDRAWAL_RETRY_DELAY", default=60)  # Base retry delay in seconds (doubles per attempt)
+WITHDRAWAL_CLAIM_LEASE = env.int("WITHDRAWAL_CLAIM_LEASE", default=300)  # Seconds before a claimed but unfinished transfer is picked up again
+WITHDRAWAL_FAKE_TRANSFER_LATENCY = env.float("WITHDRAWAL_FAKE_TRANSFER_LATENCY", default=0.3)  # Simulated round-trip of the 'fake' provider
+
+# Paystack webhook events (stored by the view, applied by the Celery worker)
+PAYSTACK_WEBHOOK_MAX_ATTEMPTS = env.int("PAYSTACK_WEBHOOK_MAX_ATTEMPTS", default=5)  # Apply attempts before an event is marked failed
+PAYSTACK_WEBHOOK_RETRY_DELAY = env.int("PAYSTACK_WEBHOOK_RETRY_DELAY", default=60)  # Base retry delay in seconds (doubles per attempt)
+PAYSTACK_WEBHOOK_CLAIM_LEASE = env.int("PAYSTACK_WEBHOOK_CLAIM_LEASE", default=300)  # Seconds before a claimed but unfinished event is picked up again
+
+# Bank directory and account resolution (see Paystack_Webhoook_Prod/bank_directory.py)
+BANK_ACCOUNT_PROVIDER = env("BANK_ACCOUNT_PROVIDER", default="paystack")  # 'paystack' or 'fake' (local benchmarks)
+BANK_ACCOUNT_CACHE_TTL = env.int("BANK_ACCOUNT_CACHE_TTL", default=86400)  # Seconds a resolved account name is reused
+BANK_RECIPIENT_CACHE_TTL = env.int("BANK_RECIPIENT_CACHE_TTL", default=86400)  # Seconds a created transfer recipient is reused for the same account and name
+BANK_FAKE_RESOLVE_LATENCY = env.float("BANK_FAKE_RESOLVE_LATENCY", default=0.2)  # Simulated round-trip of the 'fake' provider
+
+# Outbound email and SMS (queued by EmailManager / SMSManager, sent in batches by the Celery delivery worker)
+EMAIL_POOL_SIZE = env.int("EMAIL_POOL_SIZE", default=4)  # Open SMTP sessions per process (callers beyond it wait)
+EMAIL_POOL_MAX_IDLE = env.int("EMAIL_POOL_MAX_IDLE", default=60)  # Seconds an idle SMTP session is kept for reuse
+SMS_HTTP_POOL_SIZE = env.int("SMS_HTTP_POOL_SIZE", default=20)  # Keep-alive connections to the SMS provider per process
+SMS_HTTP_TIMEOUT = env.float("SMS_HTTP_TIMEOUT", default=30)  # Seconds before an SMS provider request is abandoned
+SMS_SEND_CONCURRENCY = env.int("SMS_SEND_CONCURRENCY", default=8)  # Concurrent provider requests per SMS batch
+DELIVERY_BATCH_SIZE = env.int("DELIVERY_BATCH_SIZE", default=100)  # Messages claimed per batch by the delivery worker
+DELIVERY_MAX_ATTEMPTS = env.int("DELIVERY_MAX_ATTEMPTS", default=5)  # Send attempts before a message is marked failed
+DELIVERY_RETRY_DELAY = env.int("DELIVERY_RETRY_DELAY", default=30)  # Base retry delay in seconds (doubles per attempt)
+DELIVERY_CLAIM_LEASE = env.int("DELIVERY_CLAIM_LEASE", default=300)  # Seconds before a claimed but unsent batch is picked up again
+DELIVERY_WORKER_TIME_LIMIT = env.int("DELIVERY_WORKER_TIME_LIMIT", default=240)  # Seconds one delivery task keeps claiming batches
+DELIVERY_RATE_LIMITS = {  # Sends per second per provider, shared by all workers (0 disables the limit)
+    'email': env.int("EMAIL_RATE_LIMIT", default=10),  # One per message
+    'twilio': env.int("TWILIO_RATE_LIMIT", default=1),  # One per message (long code numbers send 1 per second)
+    'termii': env.int("TERMII_RATE_LIMIT", default=10),  # One per request; a bulk request carries up to 100 numbers
+    'bulksmsng': env.int("BULKSMS_NG_RATE_LIMIT", default=10),  # One per request; a bulk request carries up to 100 numbers
+}
 
 
 
@@ -685,6 +757,26 @@
         "task": "keep_service_awake",  # This must match the name in @shared_task
         "schedule": 300.0,  # Run every 600 seconds (10 minutes)
     },
+    "dispatch-pending-withdrawals": {
+        "task": "dispatch_pending_withdrawals",  # Retries and recovers vendor withdrawal transfers left in the outbox
+        "schedule": 60.0,
+    },
+    "purge-stale-chat-uploads": {
+        "task": "purge_stale_chat_uploads",  # Removes temp files of chat uploads that were never finished
+        "schedule": 3600.0,
+    },
+    "apply-pending-webhook-events": {
+        "task": "apply_pending_webhook_events",  # Applies Paystack webhook events whose task was lost or failed
+        "schedule": 60.0,
+    },
+    "deliver-pending-messages": {
+        "task": "deliver_pending_messages",  # Sends queued email/SMS retries and messages whose delivery task was lost
+        "schedule": 30.0,
+    },
+    "index-missing-product-search": {
+        "task": "index_missing_product_search",  # Indexes products created without signals (bulk inserts) for search
+        "schedule": 3600.0,
+    },
 }
 
 
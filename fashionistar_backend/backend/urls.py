@@ -49,6 +49,8 @@
    path("", include("measurements.urls")),
    path("", include("Blog.urls")),
    path("", include("Homepage.urls")),
+   path("", include("chat.urls")),
+   path("", include("notification.urls")),
 
 
    # path("", include('transaction.urls')),
@@ -13,12 +13,20 @@
 # chat/admin.py
 
 from django.contrib import admin
-from .models import Message
+from .models import ChatAttachment, Message
+
+class ChatAttachmentInline(admin.TabularInline):
+    model = ChatAttachment
+    extra = 0
+    fields = ['name', 'size', 'content_type', 'timestamp']
+    readonly_fields = fields
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
     list_display = ['sender', 'recipient', 'message', 'timestamp']
+    list_select_related = ['sender', 'recipient']
     readonly_fields = ['timestamp']
+    inlines = [ChatAttachmentInline]
 
     def has_change_permission(self, request, obj=None):
         return False
@@ -1,24 +1,56 @@
 # chat/consumers.py
-
+'''
+Private chat over WebSockets.
+
+Text frames are JSON with a ``type``:
+
+*   ``upload.start`` ``{name, size, content_type, chunk_size?}`` -> ``upload.ready`` with the
+    ``upload_id`` and the chunk size to use. Chunks are then sent as binary frames (see
+    chat/uploads.py); each one is acknowledged with ``upload.ack`` and the last with ``upload.complete``.
+*   ``upload.resume`` ``{upload_id}`` -> ``upload.ready`` listing the chunks already received.
+*   ``upload.cancel`` ``{upload_id}``.
+*   ``message`` (the default, so the previous frame format still works)
+    ``{recipient_id, message, client_id?, upload_ids?, files?}``. ``files`` is the legacy inline
+    base64 format and is limited to ``CHAT_INLINE_FILE_MAX_BYTES``.
+
+A message is fanned out to the recipient as soon as it is encrypted; persistence (file
+encryption, storage writes, the database insert) runs afterwards on the chat I/O pool. When it
+finishes, both sides receive ``message.stored`` with the message id and the attachment URLs.
+Messages of one connection are persisted in the order they were sent.
+'''
+import asyncio
 import json
-import base64
+import logging
+import uuid
+
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
-from .models import Message
-from django.contrib.auth.models import User
-from cryptography.fernet import Fernet
 from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from chat import uploads
+from chat.transport import decrypt_text, encrypt_text, run_io, store_message
+
+User = get_user_model()
+
+application_logger = logging.getLogger('application')
 
-# Generate a key for encryption and decryption
-base_key = settings.SECRET_KEY.encode().ljust(32, b'\0')[:32]
-cipher_suite = Fernet(base64.urlsafe_b64encode(base_key))
+
+def room_group_name(user_id):
+    return f'chat_private_{user_id}'
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.user = self.scope["user"]
+        if not self.user.is_authenticated:
+            await self.close()
+            return
+
         self.room_name = f'private_{self.user.id}'
-        self.room_group_name = f'chat_{self.room_name}'
+        self.room_group_name = room_group_name(self.user.id)
+        self.recipients = {}
+        self.persist_queue = asyncio.Queue()
+        self.persist_worker = None
 
         try:
             await self.channel_layer.group_add(
@@ -31,7 +63,13 @@ async def connect(self):
             print(f"Error during connection: {e}")
 
     async def disconnect(self, close_code):
+        if not getattr(self, 'room_group_name', None):
+            return
         try:
+            # Messages already fanned out must still be stored
+            if self.persist_worker is not None:
+                await self.persist_queue.join()
+                self.persist_worker.cancel()
             await self.channel_layer.group_discard(
                 self.room_group_name,
                 self.channel_name
@@ -39,49 +77,135 @@ async def disconnect(self, close_code):
         except Exception as e:
             print(f"Error during disconnection: {e}")
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         try:
-            data = json.loads(text_data)
-            message = data.get('message', '')
-            recipient_id = data['recipient_id']
-            files = data.get('files', None)
+            if bytes_data is not None:
+                await self.receive_chunk(bytes_data)
+                return
 
-            recipient = await database_sync_to_async(User.objects.get)(id=recipient_id)
-
-            # Encrypt the message
-            encrypted_message = cipher_suite.encrypt(message.encode()).decode()
-
-            # Save the message to the database
-            msg_instance = await database_sync_to_async(Message.objects.create)(
-                sender=self.user,
-                recipient=recipient,
-                message=encrypted_message
-            )
-
-            if files:
-                for file in files:
-                    # Assuming files are uploaded in base64 format
-                    msg_instance.files.save(file['name'], base64.b64decode(file['content']))
-
-            recipient_room_name = f'private_{recipient.id}'
-            await self.channel_layer.group_send(
-                f'chat_{recipient_room_name}',
-                {
-                    'type': 'chat_message',
-                    'message': encrypted_message,
-                    'sender': self.user.username,
-                    'recipient': recipient.username,
-                    'files': [{'name': file['name'], 'content': file['content']} for file in files] if files else None
-                }
-            )
+            data = json.loads(text_data)
+            frame_type = data.get('type', 'message')
+            if frame_type == 'upload.start':
+                await self.start_upload(data)
+            elif frame_type == 'upload.resume':
+                await self.resume_upload(data)
+            elif frame_type == 'upload.cancel':
+                await self.cancel_upload(data)
+            elif frame_type == 'message':
+                await self.send_chat_message(data)
+            else:
+                await self.send_json({'error': f'Unknown frame type {frame_type}.'})
         except User.DoesNotExist:
-            await self.send(text_data=json.dumps({
-                'error': 'Recipient does not exist.'
-            }))
+            await self.send_json({'error': 'Recipient does not exist.'})
+        except uploads.UploadError as e:
+            await self.send_json({'type': 'upload.error', 'error': str(e)})
         except Exception as e:
-            await self.send(text_data=json.dumps({
-                'error': str(e)
-            }))
+            await self.send_json({'error': str(e)})
+
+    async def send_json(self, content):
+        await self.send(text_data=json.dumps(content))
+
+    # Uploads
+
+    async def start_upload(self, data):
+        state = await run_io(
+            uploads.start_upload, self.user.id, data.get('name'), data.get('size', 0),
+            data.get('content_type', ''), data.get('chunk_size'),
+        )
+        await self.send_upload_state('upload.ready', state)
+
+    async def resume_upload(self, data):
+        state = await run_io(uploads.get_upload, data['upload_id'], self.user.id)
+        await self.send_upload_state('upload.ready', state)
+
+    async def cancel_upload(self, data):
+        state = await run_io(uploads.get_upload, data['upload_id'], self.user.id)
+        await run_io(uploads.discard_upload, state)
+        await self.send_json({'type': 'upload.cancelled', 'upload_id': state['upload_id']})
+
+    async def receive_chunk(self, frame):
+        upload_id, index, chunk = uploads.parse_chunk_frame(frame)
+        state = await run_io(uploads.write_chunk, upload_id, self.user.id, index, chunk)
+        if uploads.is_complete(state):
+            await self.send_upload_state('upload.complete', state)
+        else:
+            await self.send_json({'type': 'upload.ack', 'upload_id': upload_id, 'index': index})
+
+    async def send_upload_state(self, frame_type, state):
+        await self.send_json({
+            'type': frame_type,
+            'upload_id': state['upload_id'],
+            'chunk_size': state['chunk_size'],
+            'total_chunks': state['total_chunks'],
+            'received': sorted(state['received']),
+        })
+
+    # Messages
+
+    async def send_chat_message(self, data):
+        message = data.get('message', '')
+        recipient = await self.get_recipient(data['recipient_id'])
+        client_id = str(data.get('client_id') or uuid.uuid4())
+
+        upload_ids = data.get('upload_ids') or []
+        completed = await run_io(uploads.take_completed_uploads, upload_ids, self.user.id) if upload_ids else []
+        inline_files = data.get('files') or []
+        inline_limit = getattr(settings, 'CHAT_INLINE_FILE_MAX_BYTES', 1024 * 1024)
+        if any(len(file['content']) * 3 // 4 > inline_limit for file in inline_files):
+            await self.send_json({'error': f'Inline files are limited to {inline_limit} bytes, use a chunked upload.'})
+            return
+
+        # Encrypt the message
+        encrypted_message = encrypt_text(message)
+        files = [
+            {'name': state['name'], 'size': state['size'], 'content_type': state['content_type']}
+            for state in completed
+        ] + [{'name': file['name'], 'size': len(file['content']) * 3 // 4} for file in inline_files]
+
+        # Fan out first; the recipient does not wait for storage
+        await self.channel_layer.group_send(
+            room_group_name(recipient.id),
+            {
+                'type': 'chat_message',
+                'client_id': client_id,
+                'message': encrypted_message,
+                'sender': self.user.username,
+                'recipient': recipient.username,
+                'files': files or None,
+            }
+        )
+        await self.send_json({'type': 'message.sent', 'client_id': client_id})
+
+        await self.persist_queue.put((client_id, recipient.id, encrypted_message, completed, inline_files))
+        if self.persist_worker is None:
+            self.persist_worker = asyncio.create_task(self.persist_messages())
+
+    async def get_recipient(self, recipient_id):
+        recipient = self.recipients.get(recipient_id)
+        if recipient is None:
+            recipient = await run_io(User.objects.only('id', 'email', 'phone').get, id=recipient_id)
+            self.recipients[recipient_id] = recipient
+        return recipient
+
+    async def persist_messages(self):
+        while True:
+            job = await self.persist_queue.get()
+            try:
+                await self.persist_message(*job)
+            except Exception as e:
+                application_logger.exception(f"Error storing message: {e}")
+                client_id = job[0]
+                await self.send_json({'type': 'message.failed', 'client_id': client_id, 'error': str(e)})
+            finally:
+                self.persist_queue.task_done()
+
+    async def persist_message(self, client_id, recipient_id, encrypted_message, completed, inline_files):
+        stored = await run_io(store_message, self.user.id, recipient_id, encrypted_message, completed, inline_files)
+        event = {'type': 'chat_stored', 'client_id': client_id, **stored}
+        await self.channel_layer.group_send(room_group_name(recipient_id), event)
+        await self.send_json({'type': 'message.stored', 'client_id': client_id, **stored})
+
+    # Group events
 
     async def chat_message(self, event):
         try:
@@ -91,9 +215,11 @@ async def chat_message(self, event):
             files = event.get('files', None)
 
             # Decrypt the message
-            decrypted_message = cipher_suite.decrypt(message.encode()).decode()
+            decrypted_message = decrypt_text(message)
 
             response_data = {
+                'type': 'message',
+                'client_id': event.get('client_id'),
                 'message': decrypted_message,
                 'sender': sender,
                 'recipient': recipient
@@ -105,3 +231,12 @@ async def chat_message(self, event):
             await self.send(text_data=json.dumps(response_data))
         except Exception as e:
             print(f"Error sending message: {e}")
+
+    async def chat_stored(self, event):
+        await self.send_json({
+            'type': 'message.stored',
+            'client_id': event['client_id'],
+            'message_id': event['message_id'],
+            'timestamp': event['timestamp'],
+            'files': event['files'],
+        })
@@ -0,0 +1,235 @@
+import asyncio
+import base64
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from chat import uploads
+from chat.consumer import ChatConsumer, room_group_name
+from chat.models import ChatAttachment, Message
+from chat.transport import _encrypted_attachment, encrypt_text
+from userauths.models import User
+
+
+class SlowStorage(FileSystemStorage):
+    """Local storage that waits ``latency`` seconds per write, like a remote media service."""
+    latency = 0.05
+
+    def _save(self, name, content):
+        time.sleep(self.latency)
+        return super()._save(name, content)
+
+
+class BlockingChatConsumer(ChatConsumer):
+    """
+    The previous receive flow: files arrive inline as base64 and are encrypted and written to
+    storage on the event loop, and the message is fanned out only after it was stored.
+    """
+
+    async def send_chat_message(self, data):
+        recipient = await self.get_recipient(data['recipient_id'])
+        encrypted_message = encrypt_text(data.get('message', ''))
+        message = await database_sync_to_async(Message.objects.create)(
+            sender_id=self.user.id, recipient_id=recipient.id, message=encrypted_message
+        )
+        attachments = [
+            _encrypted_attachment(message, file['name'], base64.b64decode(file['content']), '')
+            for file in data.get('files') or []
+        ]
+        await database_sync_to_async(ChatAttachment.objects.bulk_create)(attachments)
+        await self.channel_layer.group_send(room_group_name(recipient.id), {
+            'type': 'chat_message',
+            'client_id': data['client_id'],
+            'message': encrypted_message,
+            'sender': self.user.username,
+            'recipient': recipient.username,
+            'files': [{'name': file['name']} for file in data.get('files') or []] or None,
+        })
+
+
+class BenchClient:
+    """A connected WebSocket client whose frames are read by one task and routed by type."""
+
+    def __init__(self, consumer_class, user):
+        self.communicator = WebsocketCommunicator(consumer_class.as_asgi(), f"/ws/chat/{user.id}/")
+        self.communicator.scope['user'] = user
+        self.user = user
+        self.frames = {}
+        self.reader = None
+
+    def queue(self, frame_type):
+        return self.frames.setdefault(frame_type, asyncio.Queue())
+
+    async def connect(self):
+        connected, _ = await self.communicator.connect()
+        assert connected, "WebSocket connection refused"
+        self.reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        while True:
+            frame = json.loads(await self.communicator.receive_from(timeout=600))
+            frame['received_at'] = time.perf_counter()
+            await self.queue(frame.get('type', 'error')).put(frame)
+
+    async def wait(self, frame_type):
+        return await asyncio.wait_for(self.queue(frame_type).get(), timeout=120)
+
+    async def close(self):
+        self.reader.cancel()
+        await self.communicator.disconnect()
+
+
+class Command(BaseCommand):
+    """
+    Measures chat delivery latency with many concurrent WebSocket clients.
+
+    Every client sends messages with a file attachment to the next client. Two flows run against
+    the same in-memory channel layer and a local storage that simulates a remote write latency:
+
+    *   blocking: the previous flow (inline base64 file, storage write on the event loop, fan-out
+        after the write).
+    *   transport: chunked binary upload, fan-out first, encryption and storage on the chat I/O pool.
+
+    Latency is measured from the send to the recipient receiving the message. Temporary users and
+    files are removed at the end.
+
+    Usage:
+        python manage.py benchmark_chat_latency
+        python manage.py benchmark_chat_latency --clients 50 --messages 10 --file-kb 512 --storage-latency 100 --json
+    """
+    help = "Benchmarks chat delivery latency of the blocking and off-loop chat transports"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=20, help="Concurrent WebSocket clients")
+        parser.add_argument('--messages', type=int, default=5, help="Messages sent by each client")
+        parser.add_argument('--file-kb', type=int, default=256, help="Attachment size per message in KB (0 for text only)")
+        parser.add_argument('--chunk-kb', type=int, default=64, help="Chunk size of the transport upload in KB")
+        parser.add_argument('--storage-latency', type=float, default=50, help="Simulated storage write latency in milliseconds")
+        parser.add_argument('--json', action='store_true', help="Output the report as JSON")
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp(prefix='chat-bench-')
+        SlowStorage.latency = options['storage_latency'] / 1000
+        run_id = uuid.uuid4().hex[:8]
+        users = [
+            User.objects.create_user(email=f"bench-chat-{run_id}-{index}@example.com", password=uuid.uuid4().hex)
+            for index in range(options['clients'])
+        ]
+        payload = os.urandom(options['file_kb'] * 1024)
+
+        test_settings = {
+            'CHANNEL_LAYERS': {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer', 'CONFIG': {'capacity': 10000}}},
+            'STORAGES': {
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': media_root}},
+                'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+            },
+            'CHAT_UPLOAD_TEMP_DIR': os.path.join(media_root, 'uploads'),
+        }
+        # The field resolves its storage once at import, so the slow storage is swapped in directly
+        file_field = ChatAttachment._meta.get_field('file')
+        configured_storage, file_field.storage = file_field.storage, SlowStorage(location=media_root)
+        try:
+            with override_settings(**test_settings):
+                report = {
+                    'clients': options['clients'],
+                    'messages_per_client': options['messages'],
+                    'file_kb': options['file_kb'],
+                    'storage_latency_ms': options['storage_latency'],
+                    'blocking': asyncio.run(self._run(BlockingChatConsumer, users, payload, options, chunked=False)),
+                    'transport': asyncio.run(self._run(ChatConsumer, users, payload, options, chunked=True)),
+                }
+        finally:
+            file_field.storage = configured_storage
+            Message.objects.filter(sender__in=users).delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        blocking_p95 = report['blocking']['delivery_ms']['p95']
+        transport_p95 = report['transport']['delivery_ms']['p95']
+        report['p95_speedup'] = round(blocking_p95 / transport_p95, 1) if transport_p95 else None
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"clients={options['clients']} messages={options['messages']} file={options['file_kb']}KB "
+            f"storage_latency={options['storage_latency']}ms"
+        )
+        for flow in ('blocking', 'transport'):
+            delivery = report[flow]['delivery_ms']
+            self.stdout.write(
+                f"{flow:<10} delivery p50 {delivery['p50']:>8}ms  p95 {delivery['p95']:>8}ms  max {delivery['max']:>8}ms  "
+                f"total {report[flow]['seconds']}s"
+            )
+        self.stdout.write(self.style.SUCCESS(f"p95 delivery latency improved {report['p95_speedup']}x"))
+
+    async def _run(self, consumer_class, users, payload, options, chunked):
+        clients = [BenchClient(consumer_class, user) for user in users]
+        for client in clients:
+            await client.connect()
+
+        sent_at = {}
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            self._send_messages(client, clients[(index + 1) % len(clients)], payload, options, chunked, sent_at)
+            for index, client in enumerate(clients)
+        ])
+        delivered = [await client.wait('message') for client in clients for _ in range(options['messages'])]
+        elapsed = time.perf_counter() - started
+
+        if chunked:
+            # Let the persistence queues drain before the connections close
+            for client in clients:
+                for _ in range(options['messages']):
+                    await client.wait('message.stored')
+        for client in clients:
+            await client.close()
+
+        latencies = sorted((frame['received_at'] - sent_at[frame['client_id']]) * 1000 for frame in delivered)
+        return {
+            'seconds': round(elapsed, 3),
+            'delivery_ms': {
+                'p50': round(statistics.median(latencies), 2),
+                'p95': round(latencies[max(int(len(latencies) * 0.95) - 1, 0)], 2),
+                'max': round(latencies[-1], 2),
+            },
+        }
+
+    async def _send_messages(self, client, recipient, payload, options, chunked, sent_at):
+        for index in range(options['messages']):
+            client_id = uuid.uuid4().hex
+            frame = {'recipient_id': recipient.user.id, 'message': f"bench message {index}", 'client_id': client_id}
+
+            if payload and chunked:
+                frame['upload_ids'] = [await self._upload(client, payload, options['chunk_kb'] * 1024)]
+            elif payload:
+                frame['files'] = [{'name': 'bench.bin', 'content': base64.b64encode(payload).decode()}]
+
+            sent_at[client_id] = time.perf_counter()
+            await client.communicator.send_to(text_data=json.dumps(frame))
+
+    async def _upload(self, client, payload, chunk_size):
+        await client.communicator.send_to(text_data=json.dumps({
+            'type': 'upload.start', 'name': 'bench.bin', 'size': len(payload), 'chunk_size': chunk_size,
+        }))
+        ready = await client.wait('upload.ready')
+        raw_id = uuid.UUID(ready['upload_id']).bytes
+        chunk_size = ready['chunk_size']
+        for index in range(ready['total_chunks']):
+            chunk = payload[index * chunk_size:(index + 1) * chunk_size]
+            await client.communicator.send_to(bytes_data=uploads.CHUNK_HEADER.pack(raw_id, index) + chunk)
+            if index < ready['total_chunks'] - 1:
+                await client.wait('upload.ack')
+        await client.wait('upload.complete')
+        return ready['upload_id']
@@ -1,4 +1,7 @@
+import uuid
+
 from django.conf import settings
+from django.core.files.storage import default_storage, storages
 from django.db import models
 from userauths.models import user_directory_path
 
@@ -11,5 +14,45 @@ class Message(models.Model):
     files = models.FileField(upload_to=user_directory_path, blank=True, null=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Conversation history is read per (sender, recipient) pair, newest first
+            models.Index(fields=['sender', 'recipient', '-id'], name='chat_message_pair_idx'),
+        ]
+
     def __str__(self):
         return f'{self.sender} to {self.recipient}: {self.message}'
+
+
+
+def chat_attachment_path(instance, filename):
+    """
+    Attachments are stored encrypted, so the original name and extension are kept on the row only.
+    """
+    return f'chat/user_{instance.message.sender_id}/{uuid.uuid4().hex}.bin'
+
+
+def chat_attachment_storage():
+    """
+    Uses the 'chat_attachments' storage when configured (encrypted blobs are not images, so
+    Cloudinary needs its raw storage for them), otherwise the default storage.
+    """
+    if 'chat_attachments' in getattr(settings, 'STORAGES', {}):
+        return storages['chat_attachments']
+    return default_storage
+
+
+class ChatAttachment(models.Model):
+    """
+    A file sent with a chat message. The stored file is Fernet-encrypted; the attachment download
+    view decrypts it for the sender and the recipient.
+    """
+    message = models.ForeignKey(Message, related_name='attachments', on_delete=models.CASCADE)
+    file = models.FileField(upload_to=chat_attachment_path, storage=chat_attachment_storage)
+    name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(default=0)
+    content_type = models.CharField(max_length=100, blank=True)
+    timestamp = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} ({self.size} bytes) on message {self.message_id}'
@@ -0,0 +1,16 @@
+# chat/pagination.py
+
+from rest_framework.pagination import CursorPagination
+
+class MessageHistoryPagination(CursorPagination):
+    """
+    Cursor pagination for a conversation, newest messages first.
+
+    The cursor is keyed on the message id, so a page is an index range scan and messages
+    arriving while the client scrolls back never shift or repeat items between pages.
+    Use the 'next' link to load older messages, e.g. ?cursor=...&page_size=50.
+    """
+    ordering = '-id'
+    page_size = 30  # Default number of messages per page
+    page_size_query_param = 'page_size'
+    max_page_size = 100
@@ -1,9 +1,40 @@
 # chat/serializers.py
 
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
 from .models import Message
+from .transport import attachment_payload, decrypt_text
 
 class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = '__all__'
+
+
+class ChatParticipantSerializer(serializers.ModelSerializer):
+    username = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = get_user_model()
+        fields = ['id', 'username']
+
+
+class MessageHistorySerializer(serializers.ModelSerializer):
+    """
+    A message of the conversation history, decrypted, with its participants and attachments.
+    Expects the queryset to select_related('sender', 'recipient') and prefetch 'attachments'.
+    """
+    sender = ChatParticipantSerializer(read_only=True)
+    recipient = ChatParticipantSerializer(read_only=True)
+    message = serializers.SerializerMethodField()
+    attachments = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Message
+        fields = ['id', 'sender', 'recipient', 'message', 'attachments', 'timestamp']
+
+    def get_message(self, obj):
+        return decrypt_text(obj.message)
+
+    def get_attachments(self, obj):
+        return [attachment_payload(attachment) for attachment in obj.attachments.all()]
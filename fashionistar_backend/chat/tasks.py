@@ -0,0 +1,23 @@
+# chat/tasks.py
+
+from celery import shared_task
+import logging
+
+from chat.uploads import purge_stale_uploads
+
+# Get logger for application
+application_logger = logging.getLogger('application')
+
+
+@shared_task(name="purge_stale_chat_uploads")
+def purge_stale_chat_uploads() -> int:
+    """
+    Removes temp files of chunked chat uploads that were abandoned (see CELERY_BEAT_SCHEDULE).
+
+    Returns:
+        int: Number of temp files removed.
+    """
+    removed = purge_stale_uploads()
+    if removed:
+        application_logger.info(f"Removed {removed} stale chat upload(s)")
+    return removed
@@ -1,3 +1,174 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from chat import uploads
+from chat.consumer import ChatConsumer
+from chat.models import ChatAttachment, Message
+from chat.transport import cipher_suite, encrypt_text, store_message
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+INMEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def chunk_frame(upload_id, index, data):
+    return uploads.CHUNK_HEADER.pack(uuid.UUID(upload_id).bytes, index) + data
+
+
+class ChatTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        settings_override = override_settings(
+            CACHES=LOCMEM_CACHE, CHANNEL_LAYERS=INMEMORY_CHANNEL_LAYERS,
+            CHAT_UPLOAD_TEMP_DIR=os.path.join(self.temp_dir, 'uploads'), MEDIA_ROOT=os.path.join(self.temp_dir, 'media'),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.sender = User.objects.create_user(email='chatsender@example.com', password='password123')
+        self.recipient = User.objects.create_user(email='chatrecipient@example.com', password='password123')
+
+
+class ChunkedUploadTest(ChatTestCase):
+    def test_chunks_are_assembled_in_any_order(self):
+        content = b'0123456789'
+        state = uploads.start_upload(self.sender.id, 'notes.txt', len(content), 'text/plain', chunk_size=4)
+        self.assertEqual(state['total_chunks'], 3)
+
+        for index in (2, 0, 0, 1):
+            offset = index * 4
+            state = uploads.write_chunk(state['upload_id'], self.sender.id, index, content[offset:offset + 4])
+        self.assertTrue(uploads.is_complete(state))
+        self.assertEqual(sorted(state['received']), [0, 1, 2])
+        with open(state['path'], 'rb') as f:
+            self.assertEqual(f.read(), content)
+
+        stored = store_message(self.sender.id, self.recipient.id, encrypt_text('see attached'), [state])
+        attachment = ChatAttachment.objects.get(message_id=stored['message_id'])
+        self.assertEqual((attachment.name, attachment.size, attachment.content_type), ('notes.txt', 10, 'text/plain'))
+        with attachment.file.open('rb') as f:
+            self.assertEqual(cipher_suite.decrypt(f.read()), content)
+        self.assertFalse(os.path.exists(state['path']))
+        with self.assertRaises(uploads.UploadError):
+            uploads.get_upload(state['upload_id'], self.sender.id)
+
+    def test_concurrent_chunks_are_all_recorded(self):
+        content = os.urandom(64)
+        state = uploads.start_upload(self.sender.id, 'photo.bin', len(content), chunk_size=1)
+
+        def write(index):
+            return uploads.write_chunk(state['upload_id'], self.sender.id, index, content[index:index + 1])
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(write, list(range(64)) * 2))
+
+        self.assertEqual(max(result['received_count'] for result in results), 64)
+        state = uploads.get_upload(state['upload_id'], self.sender.id)
+        self.assertEqual(state['received'], list(range(64)))
+        self.assertTrue(uploads.is_complete(state))
+        with open(state['path'], 'rb') as f:
+            self.assertEqual(f.read(), content)
+
+    def test_invalid_chunks_and_foreign_uploads_are_rejected(self):
+        state = uploads.start_upload(self.sender.id, 'notes.txt', 10, chunk_size=4)
+        with self.assertRaises(uploads.UploadError):
+            uploads.write_chunk(state['upload_id'], self.sender.id, 3, b'89')
+        with self.assertRaises(uploads.UploadError):
+            uploads.write_chunk(state['upload_id'], self.sender.id, 2, b'789')
+        with self.assertRaises(uploads.UploadError):
+            uploads.write_chunk(state['upload_id'], self.recipient.id, 0, b'0123')
+        with self.assertRaises(uploads.UploadError):
+            uploads.take_completed_uploads([state['upload_id']], self.sender.id)
+
+    def test_upload_resumes_after_reconnect(self):
+        content = b'abcdefghij'
+
+        async def connect():
+            communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), '/ws/chat/')
+            communicator.scope['user'] = self.sender
+            connected, _ = await communicator.connect(timeout=5)
+            self.assertTrue(connected)
+            return communicator
+
+        async def session():
+            communicator = await connect()
+            await communicator.send_json_to({'type': 'upload.start', 'name': 'notes.txt', 'size': len(content), 'chunk_size': 4})
+            ready = await communicator.receive_json_from(timeout=5)
+            upload_id = ready['upload_id']
+            await communicator.send_to(bytes_data=chunk_frame(upload_id, 1, content[4:8]))
+            ack = await communicator.receive_json_from(timeout=5)
+            await communicator.disconnect()
+
+            communicator = await connect()
+            await communicator.send_json_to({'type': 'upload.resume', 'upload_id': upload_id})
+            resumed = await communicator.receive_json_from(timeout=5)
+            frames = []
+            for index in (0, 2):
+                await communicator.send_to(bytes_data=chunk_frame(upload_id, index, content[index * 4:index * 4 + 4]))
+                frames.append(await communicator.receive_json_from(timeout=5))
+            await communicator.disconnect()
+            return ready, ack, resumed, frames
+
+        ready, ack, resumed, frames = async_to_sync(session)()
+        self.assertEqual((ready['type'], ready['chunk_size'], ready['total_chunks'], ready['received']), ('upload.ready', 4, 3, []))
+        self.assertEqual((ack['type'], ack['index']), ('upload.ack', 1))
+        self.assertEqual((resumed['type'], resumed['received']), ('upload.ready', [1]))
+        self.assertEqual([frame['type'] for frame in frames], ['upload.ack', 'upload.complete'])
+        self.assertEqual(frames[-1]['received'], [0, 1, 2])
+
+        state = uploads.get_upload(ready['upload_id'], self.sender.id)
+        with open(state['path'], 'rb') as f:
+            self.assertEqual(f.read(), content)
+
+
+class MessageHistoryTest(ChatTestCase):
+    client_class = APIClient
+
+    def test_history_pages_are_cursor_paginated_newest_first(self):
+        other = User.objects.create_user(email='chatother@example.com', password='password123')
+        created = []
+        for index in range(7):
+            sender, recipient = (self.sender, self.recipient) if index % 2 == 0 else (self.recipient, self.sender)
+            created.append(Message.objects.create(sender=sender, recipient=recipient, message=encrypt_text(f'message {index}')))
+        Message.objects.create(sender=self.sender, recipient=other, message='elsewhere')
+
+        self.client.force_authenticate(self.sender)
+        url = f"{reverse('message-list', args=[self.recipient.id])}?page_size=3"
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        history = [message for page in pages for message in page]
+        self.assertEqual([message['id'] for message in history], [message.id for message in reversed(created)])
+        self.assertEqual(history[0]['message'], 'message 6')
+        self.assertEqual(history[-1]['sender']['id'], self.sender.id)
+
+    def test_history_page_queries_do_not_grow_with_page_size(self):
+        for index in range(10):
+            message = Message.objects.create(sender=self.sender, recipient=self.recipient, message=f'message {index}')
+            ChatAttachment.objects.create(message=message, file=f'chat/{index}.bin', name=f'{index}.txt', size=1)
+
+        self.client.force_authenticate(self.sender)
+        url = reverse('message-list', args=[self.recipient.id])
+        # the page (senders and recipients joined), then its attachments
+        with self.assertNumQueries(2):
+            response = self.client.get(f'{url}?page_size=10')
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(len(response.data['results'][0]['attachments']), 1)
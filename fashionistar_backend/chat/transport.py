@@ -0,0 +1,134 @@
+# chat/transport.py
+'''
+Chat transport helpers shared by the WebSocket consumer and the chat API.
+
+Everything that blocks (Fernet encryption of files, storage writes, temp file I/O and the ORM)
+runs on a dedicated thread pool through ``run_io``, so the Daphne event loop only parses frames
+and fans out messages. ``database_sync_to_async`` is not used for these jobs: it runs every call
+on a single shared thread, so one slow storage upload would queue every other client's query
+behind it.
+'''
+import asyncio
+import base64
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptography.fernet import Fernet, InvalidToken
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.urls import reverse
+
+from chat.models import ChatAttachment, Message
+from chat.uploads import discard_upload
+
+# Generate a key for encryption and decryption
+base_key = settings.SECRET_KEY.encode().ljust(32, b'\0')[:32]
+cipher_suite = Fernet(base64.urlsafe_b64encode(base_key))
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'CHAT_IO_WORKERS', 8),
+            thread_name_prefix='chat-io',
+        )
+    return _executor
+
+
+def _run_with_fresh_connections(func, *args, **kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_io(func, *args, **kwargs):
+    '''
+    Runs a blocking call on the chat I/O pool and awaits its result.
+    '''
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(_run_with_fresh_connections, func, *args, **kwargs)
+    )
+
+
+def encrypt_text(text):
+    return cipher_suite.encrypt((text or '').encode()).decode()
+
+
+def decrypt_text(token):
+    '''
+    Decrypts a stored message. Messages created through the REST endpoint are stored in clear,
+    so they are returned as they are.
+    '''
+    if not token:
+        return token
+    try:
+        return cipher_suite.decrypt(token.encode()).decode()
+    except (InvalidToken, ValueError):
+        return token
+
+
+def attachment_payload(attachment):
+    return {
+        'id': attachment.id,
+        'name': attachment.name,
+        'size': attachment.size,
+        'content_type': attachment.content_type,
+        'url': reverse('chat-attachment', args=[attachment.id]),
+    }
+
+
+def store_message(sender_id, recipient_id, encrypted_message, uploads=(), inline_files=()):
+    '''
+    Persists a message and its attachments (runs on the chat I/O pool).
+
+    Files are encrypted and written to storage before the rows are inserted, so no database
+    transaction stays open during a storage upload.
+
+    Args:
+        sender_id, recipient_id: User ids.
+        encrypted_message (str): The Fernet token of the text.
+        uploads (list[dict]): Completed chunked uploads (see chat/uploads.py); their temp files are removed.
+        inline_files (list[dict]): Legacy ``{'name', 'content'}`` base64 files sent in the message frame.
+
+    Returns:
+        dict: ``message_id``, ``timestamp`` and the ``files`` with their download URLs.
+    '''
+    message = Message(sender_id=sender_id, recipient_id=recipient_id, message=encrypted_message)
+    attachments = []
+
+    for state in uploads:
+        with open(state['path'], 'rb') as f:
+            content = f.read()
+        attachments.append(_encrypted_attachment(message, state['name'], content, state['content_type']))
+
+    for inline in inline_files:
+        content = base64.b64decode(inline['content'])
+        attachments.append(_encrypted_attachment(message, inline['name'], content, inline.get('content_type', '')))
+
+    with transaction.atomic():
+        message.save()
+        for attachment in attachments:
+            attachment.message = message
+        ChatAttachment.objects.bulk_create(attachments)
+
+    for state in uploads:
+        discard_upload(state)
+
+    return {
+        'message_id': message.id,
+        'timestamp': message.timestamp.isoformat(),
+        'files': [attachment_payload(attachment) for attachment in attachments],
+    }
+
+
+def _encrypted_attachment(message, name, content, content_type):
+    attachment = ChatAttachment(message=message, name=name[:255], size=len(content), content_type=content_type or '')
+    attachment.file.save(name, ContentFile(cipher_suite.encrypt(content)), save=False)
+    return attachment
@@ -0,0 +1,213 @@
+# chat/uploads.py
+'''
+Chunked, resumable chat file uploads.
+
+A client announces a file with an ``upload.start`` frame and then sends it as binary WebSocket
+frames, each one ``CHUNK_HEADER`` (the 16-byte upload id and the big-endian chunk index)
+followed by the chunk bytes. Every chunk is written at its own offset of a temp file, so chunks
+can arrive out of order or twice. The upload state lives in the cache for ``CHAT_UPLOAD_TTL``
+seconds from ``upload.start``. Every received chunk gets its own key (set with ``cache.add``) and
+a counter (``cache.incr``) tracks how many distinct chunks arrived, so concurrent chunk writes
+never overwrite each other. After a reconnect the client sends ``upload.resume`` and only
+re-sends the missing chunks.
+
+Temp files live on the local disk of the Daphne host (``CHAT_UPLOAD_TEMP_DIR``); a resumed upload
+must reach the same host, which sticky WebSocket routing gives. Stale temp files are removed by
+the ``purge_stale_chat_uploads`` task.
+
+All functions here do blocking file and cache I/O and are meant to run through
+``chat.transport.run_io``.
+'''
+import os
+import struct
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+CHUNK_HEADER = struct.Struct('>16sI')
+
+
+class UploadError(Exception):
+    '''
+    Raised for an invalid, unknown or foreign upload.
+    '''
+
+
+def upload_temp_dir():
+    path = getattr(settings, 'CHAT_UPLOAD_TEMP_DIR', None) or os.path.join(tempfile.gettempdir(), 'fashionistar_chat_uploads')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def upload_cache_key(upload_id):
+    return f"chat_upload:{upload_id}"
+
+
+def upload_chunk_key(upload_id, index):
+    return f"chat_upload:{upload_id}:chunk:{index}"
+
+
+def upload_count_key(upload_id):
+    return f"chat_upload:{upload_id}:received"
+
+
+def upload_ttl():
+    return getattr(settings, 'CHAT_UPLOAD_TTL', 3600)
+
+
+def start_upload(user_id, name, size, content_type='', chunk_size=None):
+    '''
+    Registers a new upload and reserves its temp file.
+
+    Returns:
+        dict: The upload state sent back to the client (``upload_id``, ``chunk_size``, ``total_chunks``, ...).
+    '''
+    max_bytes = getattr(settings, 'CHAT_UPLOAD_MAX_BYTES', 25 * 1024 * 1024)
+    max_chunk = getattr(settings, 'CHAT_UPLOAD_CHUNK_SIZE', 256 * 1024)
+    size = int(size)
+    if not name or size <= 0:
+        raise UploadError("An upload needs a file name and a positive size.")
+    if size > max_bytes:
+        raise UploadError(f"File is larger than the {max_bytes} byte limit.")
+
+    chunk_size = min(int(chunk_size or max_chunk), max_chunk)
+    upload_id = uuid.uuid4().hex
+    path = os.path.join(upload_temp_dir(), f"{upload_id}.part")
+    with open(path, 'wb') as f:
+        f.truncate(size)
+
+    state = {
+        'upload_id': upload_id,
+        'user_id': user_id,
+        'name': os.path.basename(str(name))[:255],
+        'size': size,
+        'content_type': str(content_type or '')[:100],
+        'chunk_size': chunk_size,
+        'total_chunks': -(-size // chunk_size),
+        'path': path,
+        'expires_at': time.time() + upload_ttl(),
+    }
+    cache.set_many({upload_cache_key(upload_id): state, upload_count_key(upload_id): 0}, timeout=upload_ttl())
+    return dict(state, received=[], received_count=0)
+
+
+def get_upload(upload_id, user_id):
+    '''
+    Returns the state of one of the user's uploads, with the indexes of the chunks received so far.
+
+    Raises:
+        UploadError: If the upload is unknown, expired or belongs to another user.
+    '''
+    state = _load_upload(upload_id, user_id)
+    keys = {upload_chunk_key(upload_id, index): index for index in range(state['total_chunks'])}
+    state['received'] = sorted(keys[key] for key in cache.get_many(list(keys)))
+    state['received_count'] = len(state['received'])
+    return state
+
+
+def _load_upload(upload_id, user_id):
+    state = cache.get(upload_cache_key(upload_id))
+    if state is None or state['user_id'] != user_id:
+        raise UploadError(f"Unknown or expired upload {upload_id}.")
+    return state
+
+
+def parse_chunk_frame(frame):
+    '''
+    Splits a binary frame into (upload_id, chunk index, chunk bytes).
+    '''
+    if len(frame) <= CHUNK_HEADER.size:
+        raise UploadError("Binary frame is too short to carry a chunk.")
+    raw_id, index = CHUNK_HEADER.unpack_from(frame)
+    return uuid.UUID(bytes=raw_id).hex, index, memoryview(frame)[CHUNK_HEADER.size:]
+
+
+def write_chunk(upload_id, user_id, index, data):
+    '''
+    Writes one chunk at its offset in the temp file and records it.
+
+    Returns:
+        dict: The upload state with ``received_count``; ``received`` is only filled in once the
+        upload is complete (``get_upload`` lists the chunks of a partial upload).
+    '''
+    state = _load_upload(upload_id, user_id)
+    if index >= state['total_chunks']:
+        raise UploadError(f"Chunk {index} is out of range for upload {upload_id}.")
+
+    offset = index * state['chunk_size']
+    expected = min(state['chunk_size'], state['size'] - offset)
+    if len(data) != expected:
+        raise UploadError(f"Chunk {index} of upload {upload_id} must be {expected} bytes, got {len(data)}.")
+
+    with open(state['path'], 'r+b') as f:
+        f.seek(offset)
+        f.write(data)
+
+    # The chunk keys expire together with the upload state and the counter
+    ttl = max(int(state['expires_at'] - time.time()), 1)
+    count_key = upload_count_key(upload_id)
+    try:
+        if cache.add(upload_chunk_key(upload_id, index), True, timeout=ttl):
+            received_count = cache.incr(count_key)
+        else:
+            received_count = cache.get(count_key)
+    except ValueError:
+        received_count = None
+    if received_count is None:
+        raise UploadError(f"Unknown or expired upload {upload_id}.")
+
+    state['received_count'] = received_count
+    if is_complete(state):
+        state['received'] = list(range(state['total_chunks']))
+    return state
+
+
+def is_complete(state):
+    return state['received_count'] == state['total_chunks']
+
+
+def take_completed_uploads(upload_ids, user_id):
+    '''
+    Validates that every upload is complete and returns their states, in the given order.
+    '''
+    states = [get_upload(upload_id, user_id) for upload_id in upload_ids]
+    incomplete = [state['upload_id'] for state in states if not is_complete(state)]
+    if incomplete:
+        raise UploadError(f"Uploads are not complete: {', '.join(incomplete)}")
+    return states
+
+
+def discard_upload(state):
+    '''
+    Removes the temp file and the cached state of an upload.
+    '''
+    upload_id = state['upload_id']
+    cache.delete_many(
+        [upload_cache_key(upload_id), upload_count_key(upload_id)]
+        + [upload_chunk_key(upload_id, index) for index in range(state['total_chunks'])]
+    )
+    try:
+        os.remove(state['path'])
+    except FileNotFoundError:
+        pass
+
+
+def purge_stale_uploads(max_age=None):
+    '''
+    Deletes temp files older than the upload TTL (abandoned uploads).
+
+    Returns:
+        int: Number of files removed.
+    '''
+    max_age = max_age if max_age is not None else upload_ttl()
+    cutoff = time.time() - max_age
+    removed = 0
+    directory = upload_temp_dir()
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.part') and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            removed += 1
+    return removed
@@ -1,9 +1,10 @@
 # chat/urls.py
 
 from django.urls import path
-from .views import MessageListView, MessageCreateView
+from .views import ChatAttachmentDownloadView, MessageListView, MessageCreateView
 
 urlpatterns = [
     path('chat/messages/<int:recipient_id>/', MessageListView.as_view(), name='message-list'),
     path('chat/create-message/', MessageCreateView.as_view(), name='message-create'),
+    path('chat/attachments/<int:pk>/', ChatAttachmentDownloadView.as_view(), name='chat-attachment'),
 ]
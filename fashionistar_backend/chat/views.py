@@ -1,21 +1,37 @@
 # chat/views.py
 
+from cryptography.fernet import InvalidToken
+from django.db.models import Q
+from django.http import Http404, HttpResponse
 from rest_framework import generics
-from chat.models import Message
-from chat.serializers import MessageSerializer
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from chat.models import ChatAttachment, Message
+from chat.pagination import MessageHistoryPagination
+from chat.serializers import MessageHistorySerializer, MessageSerializer
+from chat.transport import cipher_suite
 
 class MessageListView(generics.ListAPIView):
-    serializer_class = MessageSerializer
+    """
+    Conversation history between the logged-in user and `recipient_id`, newest first.
+
+    Cursor paginated (see MessageHistoryPagination): follow the `next` link to load older
+    messages. Senders, recipients and attachments are loaded with the page, not per message.
+    """
+    serializer_class = MessageHistorySerializer
+    pagination_class = MessageHistoryPagination
+    permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        try:
-            sender = self.request.user
-            recipient_id = self.kwargs['recipient_id']
-            return Message.objects.filter(sender=sender, recipient_id=recipient_id) | \
-                   Message.objects.filter(sender_id=recipient_id, recipient=sender)
-        except Exception as e:
-            print(f"Error retrieving messages: {e}")
-            return Message.objects.none()
+        user = self.request.user
+        recipient_id = self.kwargs['recipient_id']
+        return (
+            Message.objects.filter(
+                Q(sender=user, recipient_id=recipient_id) | Q(sender_id=recipient_id, recipient=user)
+            )
+            .select_related('sender', 'recipient')
+            .prefetch_related('attachments')
+        )
 
 class MessageCreateView(generics.CreateAPIView):
     serializer_class = MessageSerializer
@@ -26,3 +42,30 @@ def perform_create(self, serializer):
         except Exception as e:
             print(f"Error creating message: {e}")
             raise e
+
+
+class ChatAttachmentDownloadView(APIView):
+    """
+    Decrypts and returns a chat attachment to the sender or the recipient of its message.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, pk):
+        attachment = (
+            ChatAttachment.objects.select_related('message')
+            .filter(Q(message__sender=request.user) | Q(message__recipient=request.user), pk=pk)
+            .first()
+        )
+        if attachment is None:
+            raise Http404("Attachment not found")
+
+        with attachment.file.open('rb') as f:
+            encrypted = f.read()
+        try:
+            content = cipher_suite.decrypt(encrypted)
+        except InvalidToken:
+            return HttpResponse(status=500)
+
+        response = HttpResponse(content, content_type=attachment.content_type or 'application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="{attachment.name}"'
+        return response
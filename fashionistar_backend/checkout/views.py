@@ -12,13 +12,11 @@
 # Serializers
 from store.serializers import  CartOrderSerializer
 from customer.serializers import DeliveryContactSerializer, ShippingAddressSerializer
-from ShopCart.serializers import CartSerializer
+from ShopCart.summary import get_cart_summary
 from .utils import calculate_shipping_amount, calculate_service_fee
-from decimal import Decimal
 
 # Models
 from store.models import CartOrderItem,  Product, CartOrder,Coupon
-from ShopCart.models import Cart
 from customer.models import DeliveryContact, ShippingAddress
 
 # Others Packages
@@ -36,23 +34,22 @@ class CheckoutView(generics.RetrieveAPIView):
     lookup_field = 'cart_id'
 
     def get_object(self):
-        cart_id = self.kwargs['cart_id']
-        cart_items = Cart.objects.filter(cart_id=cart_id)
-        if not cart_items.exists():
+        summary = get_cart_summary(self.kwargs['cart_id'])
+        if not summary['item_count']:
             raise ValidationError("Cart not found")
-        return cart_items
+        return summary
 
     def get(self, request, *args, **kwargs):
         """
         Get the cart details and calculate the subtotal, service fee, shipping amount, and total.
         """
-        cart_items = self.get_object()
-        subtotal = sum(item.sub_total for item in cart_items)
+        summary = self.get_object()
+        subtotal = summary['sub_total']
         service_fee = calculate_service_fee(subtotal)
         shipping_amount = Decimal('0.00')  # Initial value, to be updated based on shipping address
 
         data = {
-            'cart_items': CartSerializer(cart_items, many=True).data,
+            'cart_items': summary['cart_items'],
             'subtotal': subtotal,
             'service_fee': service_fee,
             'shipping_amount': shipping_amount,
@@ -5,123 +5,9 @@
 from rest_framework.exceptions import NotFound, PermissionDenied
 import logging
 
-from store.models import Product, CartOrder, CartOrderItem, Coupon
-from store.serializers import CartOrderSerializer, CartOrderItemSerializer
-from userauths.models import User
-from vendor.utils import fetch_user_and_vendor, client_is_owner
-
-# Get logger for application
-application_logger = logging.getLogger('application')
-
-class OrdersAPIView(generics.ListAPIView):
-    """
-    API endpoint for retrieving a list of paid orders for the authenticated client.
-        *   *URL:* /api/client/orders/<int:user_id>/
-        *   *Method:* GET
-        *   *Authentication:* Requires a valid authentication token in the Authorization header.
-        *   *Request Body:* None
-          *   *Response (JSON):*
-                *   On success (HTTP 200 OK):
-                        json
-                        [
-                            {
-                            "id": "d14b26e4-4250-4824-9643-5262b0109521",
-                            "vendor": [
-                                 "ee82962d-6116-49eb-ac26-c76723e87d85"
-                            ],
-                            "buyer": "b8b873bb-22b9-47f5-b0be-68668d077d60",
-                             "sub_total": 3000.00,
-                             "shipping_amount": 1000.00,
-                              "service_fee": 50.00,
-                            "total": 4050.00,
-                             ...
-                            },
-                                 ....
-                         ]
-                       
-                *   On failure (HTTP 400, 404 or 500):
-                    json
-                        {
-                             "error": "Error message" // Message if the profile could not be found or the user is not a client.
-                         }
-                   
-                   Possible Error Messages:
-                   * "You do not have permission to perform this action.": If the user is not a client
-                   * "An error occurred, please check your input or contact support. {e}": if any error occurs during the request process.
-    """
-    serializer_class = CartOrderSerializer
-    permission_classes = (IsAuthenticated,)  # Ensure the user is authenticated
-    
-
-    def list(self, request, *args, **kwargs):
-        """
-        Retrieves the list of all the orders of a certain client that are paid.
-        """
-        user = self.request.user
-        try:
-            user_obj, vendor_obj, error_response = fetch_user_and_vendor(user)
-            if error_response:
-                application_logger.error(f"Error fetching user or profile: {error_response}")
-                return Response({'error': error_response}, status=status.HTTP_404_NOT_FOUND)
-            
-            
-            # if user_obj.role != 'client':
-            #     application_logger.error(f"User with id {user.pk} is not a client. Cant retrieve cart objects for {user.email}")
-            #     return Response(
-            #         {'error': f'You do not have permission to perform this action.',
-            #         'Reason' : f"User with id {user.pk} is not a client. Cant retrieve cart objects for {user.email}"
-            #         }, status=status.HTTP_400_BAD_REQUEST)
-            
-
-            try:
-                orders = CartOrder.objects.filter(buyer=user_obj, payment_status="paid")
-                serializer = self.get_serializer(orders, many=True)
-                application_logger.info(f"Successfully retrieved orders for client {user.email}")
-                return Response(serializer.data, status=status.HTTP_200_OK)
-            except Exception as e:
-                application_logger.error(f"An unexpected error occurred while retrieving orders for client {user.email}: {e}")
-                return Response({'error': f'An error occurred while fetching orders: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
-        except PermissionDenied as e:
-            application_logger.error(f"Permission denied: {e} for user {user.email}")
-            return Response({'error': f'You do not have permission to perform this action.'}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception as e:
-            application_logger.error(f"An unexpected error occurred while retrieving orders for a client, {e}")
-            return Response({'error': f'An error occurred: {e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-from rest_framework import generics
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.response import Response
-from rest_framework import status
-from rest_framework.exceptions import NotFound, PermissionDenied
-import logging
-
-from store.models import Product, CartOrder, CartOrderItem, Coupon
-from store.serializers import CartOrderSerializer, CartOrderItemSerializer
+from store.orders import customer_order_detail, customer_orders
+from store.pagination import OrderHistoryPagination
+from store.serializers import OrderReadSerializer
 from userauths.models import User
 from vendor.utils import fetch_user_and_vendor, client_is_owner
 
@@ -131,29 +17,36 @@ def list(self, request, *args, **kwargs):
 
 class OrdersAPIView(generics.ListAPIView):
     """
-    API endpoint for retrieving a list of paid orders for the authenticated client.
-        *   *URL:* /api/client/orders/<int:user_id>/
+    API endpoint for retrieving a list of paid orders for the authenticated client, newest first.
+        *   *URL:* /api/client/orders/
+        *   *Query Parameters:* `cursor` (the `next`/`previous` link of a page), `page_size` (default 10, max 100)
         *   *Method:* GET
         *   *Authentication:* Requires a valid authentication token in the Authorization header.
         *   *Request Body:* None
           *   *Response (JSON):*
                 *   On success (HTTP 200 OK):
                         json
-                        [
-                            {
-                            "id": "d14b26e4-4250-4824-9643-5262b0109521",
-                            "vendor": [
-                                 "ee82962d-6116-49eb-ac26-c76723e87d85"
-                            ],
-                            "buyer": "b8b873bb-22b9-47f5-b0be-68668d077d60",
-                             "sub_total": 3000.00,
-                             "shipping_amount": 1000.00,
-                              "service_fee": 50.00,
-                            "total": 4050.00,
-                             ...
-                            },
-                                 ....
-                         ]
+                        {
+                            "next": "https://.../api/client/orders/?cursor=cD0yMDI1LTA...",
+                            "previous": null,
+                            "results": [
+                                {
+                                "id": "d14b26e4-4250-4824-9643-5262b0109521",
+                                "oid": "CO1a2b3c4d5e",
+                                "vendor": [
+                                    {"id": "ee82962d-6116-49eb-ac26-c76723e87d85", "name": "Lagos Looms", ...}
+                                ],
+                                "buyer": 12,
+                                "sub_total": "3000.00",
+                                "shipping_amount": "1000.00",
+                                "service_fee": "50.00",
+                                "total": "4050.00",
+                                "orderitem": [{"product": {"title": "Ankara gown", ...}, "qty": 1, ...}],
+                                ...
+                                },
+                                ....
+                            ]
+                        }
                        
                 *   On failure (HTTP 400, 404 or 500):
                     json
@@ -165,8 +58,9 @@ class OrdersAPIView(generics.ListAPIView):
                    * "You do not have permission to perform this action.": If the user is not a client
                    * "An error occurred, please check your input or contact support. {e}": if any error occurs during the request process.
     """
-    serializer_class = CartOrderSerializer
+    serializer_class = OrderReadSerializer
     permission_classes = (IsAuthenticated,)  # Ensure the user is authenticated
+    pagination_class = OrderHistoryPagination
 
 
     def list(self, request, *args, **kwargs):
@@ -182,10 +76,10 @@ def list(self, request, *args, **kwargs):
             
             if user_obj.role == 'client':
                 try:
-                    orders = CartOrder.objects.filter(buyer=user_obj, payment_status="paid")
+                    orders = self.paginate_queryset(customer_orders(user_obj))
                     serializer = self.get_serializer(orders, many=True)
                     application_logger.info(f"Successfully retrieved orders for client {user.email}")
-                    return Response(serializer.data, status=status.HTTP_200_OK)
+                    return self.get_paginated_response(serializer.data)
                 except Exception as e:
                   application_logger.error(f"An unexpected error occurred while retrieving orders for client {user.email}: {e}")
                   return Response({'error': f'An error occurred while fetching orders: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -203,7 +97,7 @@ def list(self, request, *args, **kwargs):
 class OrdersDetailAPIView(generics.RetrieveAPIView):
     """
     API endpoint for retrieving a specific paid order by its oid for the authenticated client.
-      *   *URL:* /api/client/order/detail/<str:user_id>/<str:order_oid>/
+      *   *URL:* /api/client/order/detail/<str:order_oid>/
         *   *Method:* GET
         *   *Authentication:* Requires a valid authentication token in the Authorization header.
         *   *Request Body:* None
@@ -212,15 +106,17 @@ class OrdersDetailAPIView(generics.RetrieveAPIView):
                             json
                             {
                             "id": "d14b26e4-4250-4824-9643-5262b0109521",
+                            "oid": "CO1a2b3c4d5e",
                             "vendor": [
-                                    "ee82962d-6116-49eb-ac26-c76723e87d85"
+                                    {"id": "ee82962d-6116-49eb-ac26-c76723e87d85", "name": "Lagos Looms", ...}
                                 ],
-                            "buyer": "b8b873bb-22b9-47f5-b0be-68668d077d60",
-                            "sub_total": 3000.00,
-                            "shipping_amount": 1000.00,
-                            "service_fee": 50.00,
-                            "total": 4050.00,
-                            "payment_status": "initiated",
+                            "buyer": 12,
+                            "sub_total": "3000.00",
+                            "shipping_amount": "1000.00",
+                            "service_fee": "50.00",
+                            "total": "4050.00",
+                            "payment_status": "paid",
+                            "orderitem": [...],
                             ...
                            }
                         
@@ -236,12 +132,12 @@ class OrdersDetailAPIView(generics.RetrieveAPIView):
                         *   "An error occurred, please check your input or contact support. {e}": if any error occurs during the request process.
 
     """
-    serializer_class = CartOrderSerializer
+    serializer_class = OrderReadSerializer
     permission_classes = (IsAuthenticated,)
 
     def retrieve(self, request, *args, **kwargs):
         """
-        Retrieves the serialized order data.
+        Retrieves the serialized order data. Fulfilled orders are served from their cached snapshot.
         """
         user = self.request.user
         try:
@@ -254,21 +150,18 @@ def retrieve(self, request, *args, **kwargs):
                 application_logger.error(f"User: {user.email} is not a client")
                 return Response({'error': "You do not have permission to perform this action."}, status=status.HTTP_400_BAD_REQUEST)
             
-            user_id = self.kwargs['user_id']
             order_oid = self.kwargs['order_oid']
 
-            try:
-                 order = CartOrder.objects.get(buyer=user_obj, payment_status="paid", oid=order_oid)
-            except CartOrder.DoesNotExist:
+            order = customer_order_detail(user_obj, order_oid)
+            if order is None:
                  application_logger.error(f"Order with oid {order_oid} not found for user {user.email}")
                  return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
 
-            serializer = self.get_serializer(order)
             application_logger.info(f"Successfully retrieved details for order {order_oid} for user {user.email}")
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return Response(order, status=status.HTTP_200_OK)
         except PermissionDenied as e:
             application_logger.error(f"Permission denied: {e} for user {user.email}")
             return Response({'error': f'You do not have permission to perform this action.'}, status=status.HTTP_403_FORBIDDEN)
         except Exception as e:
             application_logger.error(f"An unexpected error occurred while retrieving order details for user {user.email}, oid {self.kwargs['order_oid']}, {e}")
-            return Response({'error': f'An error occurred: {e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)            
\ No newline at end of file
+            return Response({'error': f'An error occurred: {e}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
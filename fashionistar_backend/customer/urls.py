@@ -6,6 +6,7 @@
 from customer import reviews as client_reviews
 from customer import orders as client_orders
 from customer.wallet_balance import UserTransferView, UserWalletBalanceView
+from notification import client_views as client_notifications
 
 
 
@@ -52,10 +53,11 @@
 
     
     # Client Notifications API Endpoints
-    path('client/notifications-unseen/<user_id>/', customer_views.ClientNotificationUnSeenListAPIView.as_view(), name='client-notifications-unseen'),
-    path('client/notifications-seen/<user_id>/', customer_views.ClientNotificationSeenListAPIView.as_view(), name='client-notifications-seen'),
-    path('client/notifications-summary/<user_id>/', customer_views.ClientNotificationSummaryAPIView.as_view(), name='client-notifications-summary'),
-    path('client/notifications-mark-as-seen/<user_id>/<noti_id>/', customer_views.ClientNotificationMarkAsSeen.as_view(), name='client-notifications-mark-as-seen'),
+    path('client/notifications-unseen/<user_id>/', client_notifications.ClientNotificationUnSeenListAPIView.as_view(), name='client-notifications-unseen'),
+    path('client/notifications-seen/<user_id>/', client_notifications.ClientNotificationSeenListAPIView.as_view(), name='client-notifications-seen'),
+    path('client/notifications-summary/<user_id>/', client_notifications.ClientNotificationSummaryAPIView.as_view(), name='client-notifications-summary'),
+    path('client/notifications-mark-as-seen/<user_id>/<noti_id>/', client_notifications.ClientNotificationMarkAsSeen.as_view(), name='client-notifications-mark-as-seen'),
+    path('client/notifications-mark-all-as-seen/<user_id>/', client_notifications.ClientNotificationMarkAllAsSeen.as_view(), name='client-notifications-mark-all-as-seen'),
 
 
     # delivery and order tracking to be paid attention to later
@@ -4,3 +4,7 @@
 class NotificationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notification'
+
+    def ready(self):
+        super().ready()
+        import notification.signals  # Keeps the inbox counters in step with created and deleted notifications
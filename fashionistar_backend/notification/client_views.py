@@ -1,8 +1,9 @@
 from rest_framework.views import APIView
 from rest_framework import generics, status
 from rest_framework.response import Response
-from django.core.exceptions import PermissionDenied
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import NotFound
+from django.core.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
 
 from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404
@@ -15,12 +16,15 @@
 
 # Models 
 from store.models import CartOrder, CartOrderItem
-from userauths.models import User 
 from vendor.models import Vendor
 from notification.models import Notification, CancelledOrder
 
 # Serializers
-from notification.serializer import NotificationSerializer, NotificationSummarySerializer
+from notification.serializer import NotificationInboxSerializer, NotificationMarkSeenSerializer, NotificationSummarySerializer
+
+# Inbox
+from notification.inbox import USER, inbox_counts, inbox_queryset, mark_seen, recipient_pk
+from notification.pagination import NotificationInboxPagination
 
 # Ensure to add logger setup at the beginning of your module
 import logging
@@ -125,83 +129,75 @@ def send_cancellation_email(self, email, reason):
 
 
 # Client Notification Endpoints
-class ClientNotificationUnSeenListAPIView(generics.ListAPIView):
+class ClientInboxMixin:
+    """
+    Resolves the client inbox named by the `user_id` URL kwarg; a malformed id is a 404 and
+    another user's inbox is a 403.
+    """
+    permission_classes = (IsAuthenticated, )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.get_user_id() != request.user.pk:
+            raise PermissionDenied("You do not have permission to access this inbox.")
+
+    def get_user_id(self):
+        try:
+            return recipient_pk(USER, self.kwargs['user_id'])
+        except ValidationError:
+            raise NotFound("User not found")
+
+
+class ClientNotificationUnSeenListAPIView(ClientInboxMixin, generics.ListAPIView):
     """
     Retrieve a list of unseen notifications for a specific user.
     Steps:
-    1. Retrieve the user by ID.
+    1. Get the user ID from the URL.
     2. Filter notifications by user and unseen status.
-    3. Serialize and return the notifications.
+    3. Serialize and return one page, newest first (`?cursor=`, `?page_size=`).
     Payload: None
     """
-    serializer_class = NotificationSerializer
-    permission_classes = (AllowAny, )
+    serializer_class = NotificationInboxSerializer
+    pagination_class = NotificationInboxPagination
 
     def get_queryset(self):
-        user_id = self.kwargs['user_id']
-        try:
-            user = User.objects.get(id=user_id)
-            notifications = Notification.objects.filter(user=user, seen=False).order_by('date')
-            return notifications
-        except User.DoesNotExist:
-            return Response({"message": "User not found"}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            logger.error(f"Error in ClientNotificationUnSeenListAPIView: {e}")
-            return Response({"message": "An error occurred while retrieving notifications"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return NotificationInboxSerializer.setup_eager_loading(inbox_queryset(USER, self.get_user_id(), seen=False))
+
 
-class ClientNotificationSeenListAPIView(generics.ListAPIView):
+class ClientNotificationSeenListAPIView(ClientInboxMixin, generics.ListAPIView):
     """
     Retrieve a list of seen notifications for a specific user.
     Steps:
-    1. Retrieve the user by ID.
+    1. Get the user ID from the URL.
     2. Filter notifications by user and seen status.
-    3. Serialize and return the notifications.
+    3. Serialize and return one page, newest first (`?cursor=`, `?page_size=`).
     Payload: None
     """
-    serializer_class = NotificationSerializer
-    permission_classes = (AllowAny, )
+    serializer_class = NotificationInboxSerializer
+    pagination_class = NotificationInboxPagination
 
     def get_queryset(self):
-        user_id = self.kwargs['user_id']
-        try:
-            user = User.objects.get(id=user_id)
-            notifications = Notification.objects.filter(user=user, seen=True).order_by('date')
-            return notifications
-        except User.DoesNotExist:
-            return Response({"message": "User not found"}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            logger.error(f"Error in ClientNotificationSeenListAPIView: {e}")
-            return Response({"message": "An error occurred while retrieving notifications"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return NotificationInboxSerializer.setup_eager_loading(inbox_queryset(USER, self.get_user_id(), seen=True))
 
 
-class ClientNotificationSummaryAPIView(generics.ListAPIView):
+class ClientNotificationSummaryAPIView(ClientInboxMixin, generics.ListAPIView):
     """
     Retrieve a summary of notifications for a specific user, including counts of unseen, seen, and all notifications.
     Steps:
-    1. Retrieve the user by ID.
-    2. Count unseen, seen, and total notifications.
+    1. Get the user ID from the URL.
+    2. Read the unseen and total counters of the user's inbox (cached, see notification/inbox.py).
     3. Return the summary data.
     Payload: None
     """
     serializer_class = NotificationSummarySerializer
 
     def get_queryset(self):
-        user_id = self.kwargs['user_id']
-        try:
-            user = User.objects.get(id=user_id)
-            un_read_noti = Notification.objects.filter(user=user, seen=False).count()
-            read_noti = Notification.objects.filter(user=user, seen=True).count()
-            all_noti = Notification.objects.filter(user=user).count()
-            return [{
-                'un_read_noti': un_read_noti,
-                'read_noti': read_noti,
-                'all_noti': all_noti,
-            }]
-        except User.DoesNotExist:
-            return Response({"message": "User not found"}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            logger.error(f"Error in ClientNotificationSummaryAPIView: {e}")
-            return Response({"message": "An error occurred while retrieving notification summary"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        counts = inbox_counts(USER, self.get_user_id())
+        return [{
+            'un_read_noti': counts['unseen'],
+            'read_noti': counts['seen'],
+            'all_noti': counts['total'],
+        }]
 
     def list(self, request, *args, **kwargs):
         """
@@ -217,32 +213,41 @@ def list(self, request, *args, **kwargs):
 
 
 
-class ClientNotificationMarkAsSeen(generics.RetrieveUpdateAPIView):
+class ClientNotificationMarkAsSeen(ClientInboxMixin, generics.RetrieveUpdateAPIView):
     """
     Mark a specific notification as seen for a specific user.
     Steps:
-    1. Retrieve the user and notification by their IDs.
-    2. Update the seen status of the notification to True.
-    3. Save the changes.
+    1. Mark the notification as seen with a single update, scoped to the user's inbox.
+    2. Return the notification.
     Payload: None
     """
-    serializer_class = NotificationSerializer
-    permission_classes = (AllowAny, )
+    serializer_class = NotificationInboxSerializer
 
     def get_object(self):
-        user_id = self.kwargs['user_id']
-        noti_id = self.kwargs['noti_id']
+        user_pk = self.get_user_id()
         try:
-            user = User.objects.get(id=user_id)
-            notification = Notification.objects.get(user=user, id=noti_id)
-            notification.seen = True
-            notification.save()
-            return notification
-        except User.DoesNotExist:
-            return Response({"message": "User not found"}, status=status.HTTP_404_NOT_FOUND)
-        except Notification.DoesNotExist:
-            return Response({"message": "Notification not found"}, status=status.HTTP_404_NOT_FOUND)
-        except Exception as e:
-            logger.error(f"Error in ClientNotificationMarkAsSeen: {e}")
-            return Response({"message": "An error occurred while marking the notification as seen"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+            noti_id = int(self.kwargs['noti_id'])
+        except ValueError:
+            raise NotFound("Notification not found")
+        mark_seen(USER, user_pk, ids=[noti_id])
+        notification = NotificationInboxSerializer.setup_eager_loading(inbox_queryset(USER, user_pk)).filter(id=noti_id).first()
+        if notification is None:
+            raise NotFound("Notification not found")
+        return notification
+
+
+class ClientNotificationMarkAllAsSeen(ClientInboxMixin, APIView):
+    """
+    Mark notifications of a specific user as seen in bulk.
+    Steps:
+    1. Validate the optional list of notification ids.
+    2. Mark those (or every unseen notification) as seen with a single update.
+    3. Return how many changed.
+    Payload: {"ids": [int, ...]} (optional)
+    """
+
+    def post(self, request, user_id, *args, **kwargs):
+        serializer = NotificationMarkSeenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        updated = mark_seen(USER, self.get_user_id(), ids=serializer.validated_data.get('ids'))
+        return Response({"message": f"{updated} notifications marked as seen", "marked": updated}, status=status.HTTP_200_OK)
@@ -0,0 +1,37 @@
+# notification/consumer.py
+'''
+Live notification counters over WebSockets (``ws/notifications/``).
+
+On connect the signed-in user joins the group of their own inbox and, for a vendor, of their
+shop's inbox, and receives the current counts of each. Every later change is pushed by
+notification/inbox.py as ``{"type": "notification.counts", "inbox": "user" | "vendor",
+"unseen": n, "seen": n, "total": n}``. The socket is receive-only.
+'''
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from notification.inbox import inbox_counts, inbox_group_name, user_inboxes
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        user = self.scope["user"]
+        if not user.is_authenticated:
+            await self.close()
+            return
+
+        self.inboxes = await database_sync_to_async(user_inboxes)(user)
+        for kind, recipient_id in self.inboxes:
+            await self.channel_layer.group_add(inbox_group_name(kind, recipient_id), self.channel_name)
+        await self.accept()
+
+        for kind, recipient_id in self.inboxes:
+            counts = await database_sync_to_async(inbox_counts)(kind, recipient_id)
+            await self.send_json({'type': 'notification.counts', 'inbox': kind, **counts})
+
+    async def disconnect(self, close_code):
+        for kind, recipient_id in getattr(self, 'inboxes', []):
+            await self.channel_layer.group_discard(inbox_group_name(kind, recipient_id), self.channel_name)
+
+    async def notification_counts(self, event):
+        await self.send_json(event)
@@ -0,0 +1,191 @@
+'''
+Notification inbox for vendors and clients: listings, unseen counters and live counter pushes.
+
+* A notification belongs to the inbox of its ``vendor`` and to the inbox of its ``user``; the
+  vendor endpoints read the first, the client endpoints the second.
+* Every inbox keeps its unseen and total counts in the cache (Redis in production). A missing
+  counter is rebuilt with one indexed aggregate; after that, creates and mark-seen adjust it with
+  atomic INCR/DECR once their transaction commits, so summaries are served without a query.
+  Counters expire after ``NOTIFICATION_COUNTER_TTL`` seconds, which bounds the drift left by
+  writes that bypass this module (admin edits, raw updates).
+* Mark-seen is a single UPDATE for any number of notifications.
+* Each counter change is pushed to the inbox's Channels group (notification/consumer.py), so
+  clients connected to ``ws/notifications/`` do not have to poll the summary endpoints.
+'''
+import logging
+from collections import Counter
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from notification.models import Notification
+from vendor.models import Vendor
+
+# Get logger for application
+application_logger = logging.getLogger('application')
+
+VENDOR = 'vendor'
+USER = 'user'
+RECIPIENT_FIELDS = {VENDOR: 'vendor_id', USER: 'user_id'}
+
+
+def recipient_pk(kind, value):
+    '''
+    Normalizes a recipient id taken from a URL, so that counter keys match the ids read from the
+    database. Raises ValidationError for a malformed id.
+    '''
+    return Notification._meta.get_field(kind).target_field.to_python(value)
+
+
+def inbox_group_name(kind, recipient_id):
+    return f"notifications_{kind}_{recipient_id}"
+
+
+def counter_cache_key(kind, recipient_id, counter):
+    return f"notification_{counter}:{kind}:{recipient_id}"
+
+
+def inbox_queryset(kind, recipient_id, seen=None):
+    queryset = Notification.objects.filter(**{RECIPIENT_FIELDS[kind]: recipient_id})
+    if seen is not None:
+        queryset = queryset.filter(seen=seen)
+    return queryset
+
+
+def notification_recipients(notification):
+    return [
+        (kind, getattr(notification, field))
+        for kind, field in RECIPIENT_FIELDS.items()
+        if getattr(notification, field) is not None
+    ]
+
+
+def user_inboxes(user):
+    '''
+    The inboxes a signed-in user reads: their own and, for a vendor, their shop's.
+    '''
+    inboxes = [(USER, user.pk)]
+    vendor_id = Vendor.objects.filter(user=user).values_list('pk', flat=True).first()
+    if vendor_id is not None:
+        inboxes.append((VENDOR, vendor_id))
+    return inboxes
+
+
+def inbox_counts(kind, recipient_id, store=True):
+    '''
+    Unseen, seen and total notifications of an inbox, from the cached counters when present.
+    Missing counters are recounted and, with ``store``, cached.
+    '''
+    keys = {counter: counter_cache_key(kind, recipient_id, counter) for counter in ('unseen', 'total')}
+    cached = cache.get_many(keys.values())
+    if len(cached) == len(keys):
+        unseen, total = cached[keys['unseen']], cached[keys['total']]
+    else:
+        counts = inbox_queryset(kind, recipient_id).aggregate(
+            total=Count('pk'), unseen=Count('pk', filter=Q(seen=False))
+        )
+        unseen, total = counts['unseen'], counts['total']
+        if store:
+            timeout = getattr(settings, 'NOTIFICATION_COUNTER_TTL', 3600)
+            # add() keeps a counter that a concurrent write has just created
+            cache.add(keys['unseen'], unseen, timeout)
+            cache.add(keys['total'], total, timeout)
+    return {'unseen': unseen, 'seen': total - unseen, 'total': total}
+
+
+def _adjust_counter(kind, recipient_id, counter, delta):
+    try:
+        cache.incr(counter_cache_key(kind, recipient_id, counter), delta)
+    except ValueError:
+        pass  # Not cached: the next read recounts
+
+
+def push_counts(recipients):
+    '''
+    Sends the current counts of each inbox to its Channels group. Delivery is best effort: a
+    missing or unreachable channel layer never fails the write that triggered it.
+
+    A push never caches a recount: later commit callbacks of the same transaction may still have
+    deltas to apply, and would count their rows twice.
+    '''
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for kind, recipient_id in recipients:
+        try:
+            async_to_sync(channel_layer.group_send)(
+                inbox_group_name(kind, recipient_id),
+                {'type': 'notification.counts', 'inbox': kind, **inbox_counts(kind, recipient_id, store=False)},
+            )
+        except Exception as e:
+            application_logger.error(f"Failed to push notification counts to {kind} {recipient_id}: {e}")
+
+
+def schedule_counter_changes(changes, drop=False):
+    '''
+    Moves the counters of the given inboxes by ``{(kind, recipient_id): (unseen, total)}`` once
+    the current transaction commits, then pushes the new counts. With ``drop`` the counters are
+    deleted instead, so the next read recounts them.
+
+    The changes travel in their own commit callback, so a rolled back transaction or savepoint
+    discards them along with its callbacks.
+    '''
+    if not changes:
+        return
+    changes = dict(changes)
+    transaction.on_commit(lambda: apply_counter_changes(changes, drop))
+
+
+def apply_counter_changes(changes, drop=False):
+    for (kind, recipient_id), (unseen, total) in changes.items():
+        if drop:
+            cache.delete_many([counter_cache_key(kind, recipient_id, counter) for counter in ('unseen', 'total')])
+            continue
+        if unseen:
+            _adjust_counter(kind, recipient_id, 'unseen', unseen)
+        if total:
+            _adjust_counter(kind, recipient_id, 'total', total)
+    push_counts(list(changes))
+
+
+def record_created(notification):
+    unseen = 0 if notification.seen else 1
+    schedule_counter_changes({recipient: (unseen, 1) for recipient in notification_recipients(notification)})
+
+
+def record_deleted(notification):
+    unseen = 0 if notification.seen else 1
+    schedule_counter_changes({recipient: (-unseen, -1) for recipient in notification_recipients(notification)})
+
+
+def mark_seen(kind, recipient_id, ids=None):
+    '''
+    Marks the unseen notifications of an inbox, or only ``ids`` among them, as seen with a single
+    UPDATE, and moves the counters of every inbox those notifications appear in.
+
+    Returns:
+        int: The number of notifications that changed.
+    '''
+    queryset = inbox_queryset(kind, recipient_id, seen=False)
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+
+    rows = list(queryset.values_list('vendor_id', 'user_id').annotate(count=Count('pk')).order_by())
+    changes = Counter()
+    for vendor_id, user_id, count in rows:
+        if vendor_id is not None:
+            changes[(VENDOR, vendor_id)] += count
+        if user_id is not None:
+            changes[(USER, user_id)] += count
+    expected = sum(count for vendor_id, user_id, count in rows)
+    if not expected:
+        return 0
+
+    updated = queryset.update(seen=True)
+    # A different count means a concurrent write touched the same rows: recount those inboxes
+    schedule_counter_changes({recipient: (-count, 0) for recipient, count in changes.items()}, drop=updated != expected)
+    return updated
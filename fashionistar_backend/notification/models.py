@@ -47,6 +47,11 @@ class Notification(models.Model):
     
     class Meta:
         verbose_name_plural = "Notifications"
+        indexes = [
+            # Inbox pages: one recipient, seen or unseen, newest first (see notification/inbox.py)
+            models.Index(fields=['vendor', 'seen', 'date'], name='notification_vendor_inbox_idx'),
+            models.Index(fields=['user', 'seen', 'date'], name='notification_user_inbox_idx'),
+        ]
     
     def __str__(self):
         if self.order:
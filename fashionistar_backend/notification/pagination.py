@@ -0,0 +1,16 @@
+# notification/pagination.py
+
+from rest_framework.pagination import CursorPagination
+
+
+class NotificationInboxPagination(CursorPagination):
+    """
+    Keyset pagination for notification inboxes, newest first.
+
+    Pages continue from an opaque `?cursor=` on `date`, which the (recipient, seen, date) indexes
+    serve directly, so polling deep pages costs the same as the first one.
+    """
+    page_size = 20  # Default number of notifications per page
+    page_size_query_param = 'page_size'  # Allows client to override page size, e.g., ?page_size=50
+    max_page_size = 100  # Sets a maximum limit for the page size
+    ordering = '-date'
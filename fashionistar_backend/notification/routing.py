@@ -0,0 +1,8 @@
+# notification/routing.py
+
+from django.urls import re_path
+from . import consumer
+
+websocket_urlpatterns = [
+    re_path(r'ws/notifications/$', consumer.NotificationConsumer.as_asgi()),
+]
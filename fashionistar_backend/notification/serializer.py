@@ -1,6 +1,7 @@
 from rest_framework import serializers
 
 from notification.models import CancelledOrder, Notification
+from store.serializers import EagerLoadingMixin
 
 
 
@@ -44,6 +45,28 @@ def __init__(self, *args, **kwargs):
             self.Meta.depth = 3
 
 
+class NotificationInboxSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    """
+    A flat notification for inbox listings: ids of the related rows plus the order reference and
+    product title shown in the dropdown, joined in the page query.
+    """
+    order_oid = serializers.CharField(source='order.oid', read_only=True, default=None)
+    order_item_oid = serializers.CharField(source='order_item.oid', read_only=True, default=None)
+    product_title = serializers.CharField(source='order_item.product.title', read_only=True, default=None)
+
+    class Meta:
+        model = Notification
+        fields = [
+            'id', 'notification_type', 'seen', 'date', 'user', 'vendor', 'order', 'order_oid',
+            'order_item', 'order_item_oid', 'product_title',
+        ]
+
+
+class NotificationMarkSeenSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False,
+                                help_text="Notifications to mark as seen; all unseen notifications when omitted.")
+
+
 class NotificationSummarySerializer(serializers.Serializer):
     un_read_noti = serializers.IntegerField(default=0)
     read_noti = serializers.IntegerField(default=0)
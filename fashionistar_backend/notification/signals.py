@@ -0,0 +1,17 @@
+# notification/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from notification.inbox import record_created, record_deleted
+from notification.models import Notification
+
+
+@receiver(post_save, sender=Notification)
+def count_created_notification(sender, instance, created, **kwargs):
+    if created:
+        record_created(instance)
+
+
+@receiver(post_delete, sender=Notification)
+def count_deleted_notification(sender, instance, **kwargs):
+    record_deleted(instance)
@@ -1,3 +1,168 @@
-from django.test import TestCase
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from notification.consumer import NotificationConsumer
+from notification.inbox import USER, VENDOR, inbox_counts, inbox_group_name, mark_seen
+from notification.models import Notification
+from vendor.models import Vendor
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+INMEMORY_CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, CHANNEL_LAYERS=INMEMORY_CHANNEL_LAYERS)
+class NotificationInboxTest(TestCase):
+    client_class = APIClient
+
+    def setUp(self):
+        cache.clear()
+        self.vendor_user = User.objects.create_user(email='inboxvendor@example.com', password='password123', role=User.VENDOR)
+        self.vendor = Vendor.objects.create(user=self.vendor_user, name='Inbox Vendor')
+        self.buyer = User.objects.create_user(email='inboxbuyer@example.com', password='password123')
+        self.client.force_authenticate(self.vendor_user)
+
+    def _notify(self, count, **fields):
+        fields.setdefault('vendor', self.vendor)
+        with self.captureOnCommitCallbacks(execute=True):
+            return [Notification.objects.create(notification_type='new_order', **fields) for _ in range(count)]
+
+    def test_summary_is_served_from_counters_kept_in_step_with_writes(self):
+        url = reverse('notification:vendor-notifications-summary', kwargs={'vendor_id': self.vendor.pk})
+        self._notify(3)
+        self.assertEqual(self.client.get(url).data, {'unseen': 3, 'seen': 0, 'total': 3})
+
+        self._notify(2)
+        # the inbox ownership check; the counts come from the cache
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.data, {'unseen': 5, 'seen': 0, 'total': 5})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.filter(vendor=self.vendor).first().delete()
+        self.assertEqual(inbox_counts(VENDOR, self.vendor.pk), {'unseen': 4, 'seen': 0, 'total': 4})
+        self.assertEqual(self.client.get(reverse('notification:vendor-notifications-summary', kwargs={'vendor_id': 'nope'})).status_code, 404)
+
+    def test_rolled_back_notifications_never_move_the_counters(self):
+        self._notify(1)
+        self.assertEqual(inbox_counts(VENDOR, self.vendor.pk)['unseen'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Notification.objects.create(notification_type='new_order', vendor=self.vendor)
+                raise RuntimeError
+            Notification.objects.create(notification_type='new_order', vendor=self.vendor)
+        self.assertEqual(inbox_counts(VENDOR, self.vendor.pk), {'unseen': 2, 'seen': 0, 'total': 2})
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            Notification.objects.create(notification_type='new_order', vendor=self.vendor)
+            raise RuntimeError
+        self._notify(1)
+        self.assertEqual(inbox_counts(VENDOR, self.vendor.pk), {'unseen': 3, 'seen': 0, 'total': 3})
+
+    def test_bulk_mark_seen_is_one_update_and_moves_every_inbox(self):
+        self._notify(40, user=self.buyer)
+        self._notify(10)
+        self.assertEqual(inbox_counts(VENDOR, self.vendor.pk)['unseen'], 50)
+        self.assertEqual(inbox_counts(USER, self.buyer.pk)['unseen'], 40)
+
+        # the per-recipient breakdown, then the UPDATE
+        with self.assertNumQueries(2), self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(mark_seen(VENDOR, self.vendor.pk), 50)
+        self.assertEqual(inbox_counts(VENDOR, self.vendor.pk), {'unseen': 0, 'seen': 50, 'total': 50})
+        self.assertEqual(inbox_counts(USER, self.buyer.pk), {'unseen': 0, 'seen': 40, 'total': 40})
+        self.assertFalse(Notification.objects.filter(seen=False).exists())
+
+        notification = self._notify(1, user=self.buyer)[0]
+        url = reverse('customer:client-notifications-mark-all-as-seen', kwargs={'user_id': self.buyer.pk})
+        self.client.force_authenticate(self.buyer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(url, {'ids': [notification.pk]}, format='json')
+        self.assertEqual(response.data['marked'], 1)
+        self.client.force_authenticate(self.vendor_user)
+        self.assertEqual(inbox_counts(VENDOR, self.vendor.pk)['unseen'], 0)
+
+        single = reverse('notification:vendor-notifications-mark-as-seen', kwargs={'vendor_id': self.vendor.pk, 'noti_id': notification.pk})
+        self.assertEqual(self.client.post(single).status_code, 200)  # already seen
+        missing = reverse('notification:vendor-notifications-mark-as-seen', kwargs={'vendor_id': self.vendor.pk, 'noti_id': 999999})
+        self.assertEqual(self.client.post(missing).status_code, 404)
+
+    def test_inbox_pages_are_keyset_paginated_newest_first(self):
+        created = self._notify(25)
+        mark_seen(VENDOR, self.vendor.pk, ids=[notification.pk for notification in created[:5]])
+        url = reverse('notification:vendor-notifications-unseen', kwargs={'vendor_id': self.vendor.pk})
+
+        ids = []
+        response = self.client.get(url, {'page_size': 8})
+        while True:
+            ids += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                break
+            # the inbox ownership check, then the page with the order and product joined in
+            with self.assertNumQueries(2):
+                response = self.client.get(response.data['next'])
+        self.assertEqual(ids, [notification.pk for notification in reversed(created[5:])])
+
+    def test_inboxes_are_only_open_to_their_owner(self):
+        notification = self._notify(1, user=self.buyer)[0]
+        other_user = User.objects.create_user(email='inboxother@example.com', password='password123', role=User.VENDOR)
+        Vendor.objects.create(user=other_user, name='Other Vendor')
+        vendor_urls = [
+            reverse('notification:vendor-notifications-unseen', kwargs={'vendor_id': self.vendor.pk}),
+            reverse('notification:vendor-notifications-summary', kwargs={'vendor_id': self.vendor.pk}),
+        ]
+        client_urls = [
+            reverse('customer:client-notifications-unseen', kwargs={'user_id': self.buyer.pk}),
+            reverse('customer:client-notifications-summary', kwargs={'user_id': self.buyer.pk}),
+        ]
+        mark_all_urls = [
+            reverse('notification:vendor-notifications-mark-all-as-seen', kwargs={'vendor_id': self.vendor.pk}),
+            reverse('customer:client-notifications-mark-all-as-seen', kwargs={'user_id': self.buyer.pk}),
+            reverse('notification:vendor-notifications-mark-as-seen', kwargs={'vendor_id': self.vendor.pk, 'noti_id': notification.pk}),
+        ]
+
+        self.client.force_authenticate(None)
+        for url in vendor_urls + client_urls:
+            self.assertIn(self.client.get(url).status_code, (401, 403), url)
+        for url in mark_all_urls:
+            self.assertIn(self.client.post(url).status_code, (401, 403), url)
+
+        self.client.force_authenticate(other_user)
+        for url in vendor_urls + client_urls:
+            self.assertEqual(self.client.get(url).status_code, 403, url)
+        for url in mark_all_urls:
+            self.assertEqual(self.client.post(url).status_code, 403, url)
+        self.assertFalse(Notification.objects.filter(seen=True).exists())
+
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.get(client_urls[0]).status_code, 200)
+        self.assertEqual(self.client.get(vendor_urls[0]).status_code, 403)
+
+    def test_counter_changes_are_pushed_to_connected_clients(self):
+        async def session():
+            communicator = WebsocketCommunicator(NotificationConsumer.as_asgi(), '/ws/notifications/')
+            communicator.scope['user'] = self.vendor.user
+            connected, _ = await communicator.connect(timeout=5)
+            self.assertTrue(connected)
+            initial = [await communicator.receive_json_from(timeout=5) for _ in range(2)]
+
+            await sync_to_async(self._notify)(2)
+            # one push per committed notification, the last one carries both
+            pushed = [await communicator.receive_json_from(timeout=5) for _ in range(2)][-1]
+            await communicator.disconnect()
+            return initial, pushed
+
+        initial, pushed = async_to_sync(session)()
+        self.assertEqual([(counts['inbox'], counts['unseen']) for counts in initial], [(USER, 0), (VENDOR, 0)])
+        self.assertEqual((pushed['inbox'], pushed['unseen'], pushed['total']), (VENDOR, 2, 2))
+
+        channel_layer = get_channel_layer()
+        self.assertFalse(channel_layer.groups.get(inbox_group_name(VENDOR, self.vendor.pk)))
@@ -21,6 +21,7 @@
     path('vendor/notifications-seen/<vendor_id>/', vendor_notification_views.NotificationSeenListAPIView.as_view(), name='vendor-notifications-seen'),
     path('vendor/notifications-summary/<vendor_id>/', vendor_notification_views.NotificationSummaryAPIView.as_view(), name='vendor-notifications-summary'),
     path('vendor/notifications-mark-as-seen/<vendor_id>/<noti_id>/', vendor_notification_views.NotificationMarkAsSeen.as_view(), name='vendor-notifications-mark-as-seen'),
+    path('vendor/notifications-mark-all-as-seen/<vendor_id>/', vendor_notification_views.NotificationMarkAllAsSeen.as_view(), name='vendor-notifications-mark-all-as-seen'),
 
 
 ]
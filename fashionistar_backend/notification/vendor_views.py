@@ -8,8 +8,9 @@
 from rest_framework.views import APIView
 from rest_framework import generics, status
 from rest_framework.response import Response
-from django.core.exceptions import PermissionDenied
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.exceptions import NotFound
+from django.core.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
 
 from django.core.mail import send_mail
 from django.shortcuts import get_object_or_404
@@ -26,7 +27,11 @@
 from notification.models import Notification, CancelledOrder
 
 # Serializers
-from notification.serializer import NotificationSerializer
+from notification.serializer import NotificationInboxSerializer, NotificationMarkSeenSerializer
+
+# Inbox
+from notification.inbox import VENDOR, inbox_counts, inbox_queryset, mark_seen, recipient_pk
+from notification.pagination import NotificationInboxPagination
 
 # Ensure to add logger setup at the beginning of your module
 import logging
@@ -181,18 +186,24 @@ def post(self, request, order_item_id, *args, **kwargs):
 
 
 class VendorCompleteOrderView(APIView):
+    permission_classes = (IsAuthenticated, )
+
     def post(self, request, order_item_id, *args, **kwargs):
         """
         Vendor marks an order item as completed.
         Steps:
         1. Retrieve the order item.
-        2. Check if the production status is 'Accepted'.
-        3. If yes, change status to 'Completed' and save.
-        4. Create a notification for the completed order.
+        2. Verify the vendor owns the order item.
+        3. Check if the production status is 'Accepted'.
+        4. If yes, change status to 'Completed' and save.
+        5. Create a notification for the completed order.
         Payload: None
         """
+        order_item = get_object_or_404(CartOrderItem.objects.select_related('vendor'), id=order_item_id)
+        if order_item.vendor is None or order_item.vendor.user_id != request.user.pk:
+            raise PermissionDenied("You do not have permission to update this order.")
+
         try:
-            order_item = get_object_or_404(CartOrderItem, id=order_item_id)
             if order_item.production_status == 'Accepted':
                 order_item.production_status = 'Completed'
                 order_item.save()
@@ -209,106 +220,134 @@ def post(self, request, order_item_id, *args, **kwargs):
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class VendorOrderNotificationView(APIView):
-    def get(self, request, vendor_id, *args, **kwargs):
-        """
-        Retrieve notifications for a specific vendor.
-        Steps:
-        1. Filter notifications based on vendor_id.
-        2. Serialize the notifications.
-        3. Return the serialized data.
-        Payload: None
-        """
-        try:
-            notifications = Notification.objects.filter(vendor_id=vendor_id)
-            serializer = NotificationSerializer(notifications, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
+class VendorInboxMixin:
+    """
+    Resolves the vendor inbox named by the `vendor_id` URL kwarg; a malformed id is a 404 and an
+    inbox of a vendor the caller does not own is a 403.
+    """
+    permission_classes = (IsAuthenticated, )
 
-class NotificationUnSeenListAPIView(generics.ListAPIView):
-    serializer_class = NotificationSerializer
-    permission_classes = (AllowAny, )
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not Vendor.objects.filter(pk=self.get_vendor_id(), user_id=request.user.pk).exists():
+            raise PermissionDenied("You do not have permission to access this inbox.")
 
-    def get_queryset(self):
-        """
-        Retrieve unseen notifications for a specific vendor.
-        Steps:
-        1. Get the vendor ID from the URL.
-        2. Filter notifications by vendor and unseen status.
-        3. Order the notifications.
-        Payload: None
-        """
+    def get_vendor_id(self):
         try:
-            vendor_id = self.kwargs['vendor_id']
-            vendor = Vendor.objects.get(id=vendor_id)
-            return Notification.objects.filter(vendor=vendor, seen=False).order_by('date')
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return recipient_pk(VENDOR, self.kwargs['vendor_id'])
+        except ValidationError:
+            raise NotFound("Vendor not found")
 
 
-class NotificationSeenListAPIView(generics.ListAPIView):
-    serializer_class = NotificationSerializer
-    permission_classes = (AllowAny, )
+class VendorInboxListMixin(VendorInboxMixin):
+    """
+    Keyset-paginated inbox listing, newest first. `seen` selects unseen (False), seen (True) or
+    all (None) notifications.
+    """
+    serializer_class = NotificationInboxSerializer
+    pagination_class = NotificationInboxPagination
+    seen = None
 
     def get_queryset(self):
-        """
-        Retrieve seen notifications for a specific vendor.
-        Steps:
-        1. Get the vendor ID from the URL.
-        2. Filter notifications by vendor and seen status.
-        3. Order the notifications.
-        Payload: None
-        """
-        try:
-            vendor_id = self.kwargs['vendor_id']
-            vendor = Vendor.objects.get(id=vendor_id)
-            return Notification.objects.filter(vendor=vendor, seen=True).order_by('date')
-        except Exception as e:
-            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-
-class NotificationSummaryAPIView(APIView):
+        return NotificationInboxSerializer.setup_eager_loading(inbox_queryset(VENDOR, self.get_vendor_id(), seen=self.seen))
+
+
+class VendorOrderNotificationView(VendorInboxListMixin, generics.ListAPIView):
+    """
+    Retrieve notifications for a specific vendor.
+    Steps:
+    1. Filter notifications based on vendor_id.
+    2. Serialize one page of the notifications, newest first (`?cursor=`, `?page_size=`).
+    3. Return the serialized page.
+    Payload: None
+    """
+
+
+class NotificationUnSeenListAPIView(VendorInboxListMixin, generics.ListAPIView):
+    """
+    Retrieve unseen notifications for a specific vendor.
+    Steps:
+    1. Get the vendor ID from the URL.
+    2. Filter notifications by vendor and unseen status.
+    3. Return one page, newest first (`?cursor=`, `?page_size=`).
+    Payload: None
+    """
+    seen = False
+
+
+class NotificationSeenListAPIView(VendorInboxListMixin, generics.ListAPIView):
+    """
+    Retrieve seen notifications for a specific vendor.
+    Steps:
+    1. Get the vendor ID from the URL.
+    2. Filter notifications by vendor and seen status.
+    3. Return one page, newest first (`?cursor=`, `?page_size=`).
+    Payload: None
+    """
+    seen = True
+
+
+class NotificationSummaryAPIView(VendorInboxMixin, APIView):
     def get(self, request, vendor_id, *args, **kwargs):
         """
         Retrieve a summary of notifications for a specific vendor.
         Steps:
         1. Get the vendor ID from the URL.
-        2. Count unseen, seen, and total notifications.
+        2. Read the unseen and total counters of the vendor's inbox (cached, see notification/inbox.py).
         3. Return the summary data.
         Payload: None
         """
         try:
-            vendor = get_object_or_404(Vendor, id=vendor_id)
-            unseen_count = Notification.objects.filter(vendor=vendor, seen=False).count()
-            seen_count = Notification.objects.filter(vendor=vendor, seen=True).count()
-            total_count = unseen_count + seen_count
+            counts = inbox_counts(VENDOR, self.get_vendor_id())
             summary = {
-                "unseen": unseen_count,
-                "seen": seen_count,
-                "total": total_count
+                "unseen": counts['unseen'],
+                "seen": counts['seen'],
+                "total": counts['total']
             }
             return Response(summary, status=status.HTTP_200_OK)
+        except NotFound as e:
+            return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-class NotificationMarkAsSeen(APIView):
+class NotificationMarkAsSeen(VendorInboxMixin, APIView):
     def post(self, request, vendor_id, noti_id, *args, **kwargs):
         """
         Mark a specific notification as seen for a specific vendor.
         Steps:
-        1. Retrieve the vendor and notification by their IDs.
-        2. Update the seen status of the notification to True.
-        3. Save the changes.
+        1. Mark the notification as seen with a single update, scoped to the vendor's inbox.
+        2. If nothing changed, tell an already seen notification apart from a missing one.
         Payload: None
         """
         try:
-            vendor = get_object_or_404(Vendor, id=vendor_id)
-            notification = get_object_or_404(Notification, id=noti_id, vendor=vendor)
-            notification.seen = True
-            notification.save()
+            vendor_pk = self.get_vendor_id()
+            if not mark_seen(VENDOR, vendor_pk, ids=[int(noti_id)]) and not inbox_queryset(VENDOR, vendor_pk).filter(id=noti_id).exists():
+                raise NotFound("Notification not found")
             return Response({"message": "Notification marked as seen"}, status=status.HTTP_200_OK)
+        except (NotFound, ValueError):
+            return Response({"error": "Notification not found"}, status=status.HTTP_404_NOT_FOUND)
+        except Exception as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class NotificationMarkAllAsSeen(VendorInboxMixin, APIView):
+    def post(self, request, vendor_id, *args, **kwargs):
+        """
+        Mark notifications of a specific vendor as seen in bulk.
+        Steps:
+        1. Validate the optional list of notification ids.
+        2. Mark those (or every unseen notification) as seen with a single update.
+        3. Return how many changed and the new counters.
+        Payload: {"ids": [int, ...]} (optional)
+        """
+        serializer = NotificationMarkSeenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            vendor_pk = self.get_vendor_id()
+            updated = mark_seen(VENDOR, vendor_pk, ids=serializer.validated_data.get('ids'))
+            return Response({"message": f"{updated} notifications marked as seen", "marked": updated}, status=status.HTTP_200_OK)
+        except NotFound as e:
+            return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
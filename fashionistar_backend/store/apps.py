@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self):
+        super().ready()
+        import store.signals  # Re-indexes product search documents and drops cached order snapshots on writes
+        from store.search import ensure_search_index
+
+        post_migrate.connect(ensure_search_index, sender=self)  # Creates the GIN/trigram indexes or the FTS5 table
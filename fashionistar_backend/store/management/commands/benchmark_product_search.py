@@ -0,0 +1,173 @@
+import json
+import random
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import override_settings
+
+from admin_backend.models import Category
+from store.models import Product
+from store.search import index_products, product_facets, search_products
+from vendor.models import Vendor
+
+User = get_user_model()
+
+MATERIALS = [
+    'ankara', 'lace', 'silk', 'leather', 'denim', 'linen', 'velvet', 'cotton', 'chiffon', 'satin',
+    'adire', 'kente', 'suede', 'wool', 'crepe', 'organza', 'tulle', 'jersey', 'tweed', 'sequin',
+]
+ITEMS = [
+    'gown', 'dress', 'boots', 'sandals', 'blouse', 'agbada', 'kaftan', 'skirt', 'jacket', 'handbag',
+    'trousers', 'shirt', 'jumpsuit', 'headwrap', 'sneakers', 'heels', 'clutch', 'scarf', 'blazer', 'romper',
+]
+STYLES = [
+    'handmade', 'tailored', 'vintage', 'bridal', 'casual', 'evening', 'summer', 'classic', 'print', 'embroidered',
+    'beaded', 'pleated', 'oversized', 'fitted', 'wrap', 'cropped', 'maxi', 'midi', 'ruffled', 'layered',
+]
+FILLER = [f"fabric{index}" for index in range(400)]
+QUERIES = ['ankara gown', 'leather boots', 'embroidered kaftan', 'silk', 'bridal lace dress']
+TYPO_QUERY = 'leathr bots'
+
+
+class Command(BaseCommand):
+    """
+    Measures product search latency of the previous ``SearchFilter`` lookup and of the search index.
+
+    Creates ``--products`` published products (random titles and descriptions, 3 vendors, 5
+    categories, prices up to 150k) with bulk inserts, builds their search documents, then runs
+    every query ``--repeat`` times per scenario and reports p50/p95 latency of the first page
+    (10 products) plus the total count, as the listing does:
+
+    *   search_filter: ``title``/``description`` ``icontains`` per term, unranked (previous behaviour).
+    *   search_index: ranked full-text search over the search documents.
+    *   search_index_facets: the same plus the category, price and vendor facets.
+
+    The match counts of both lookups and of a misspelled query are reported as well. The benchmark
+    products are deleted at the end.
+
+    Usage:
+        python manage.py benchmark_product_search
+        python manage.py benchmark_product_search --products 50000 --repeat 10 --json
+    """
+    help = "Benchmarks product search latency of the icontains SearchFilter and the search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=50000, help="Published products to create")
+        parser.add_argument('--repeat', type=int, default=10, help="Runs per query and scenario")
+        parser.add_argument('--json', action='store_true', help="Output the report as JSON")
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:6]
+        count = options['products']
+        vendors = []
+        for index in range(3):
+            user = User.objects.create_user(email=f"bench-search-{run_id}-{index}@example.com", password=uuid.uuid4().hex)
+            vendors.append(Vendor.objects.create(user=user, name=f"Bench Vendor {index} {run_id}"))
+        categories = [
+            Category.objects.create(name=f"Bench category {index} {run_id}", slug=f"bench-{index}-{run_id}")
+            for index in range(5)
+        ]
+
+        try:
+            started = time.perf_counter()
+            self._create_catalog(run_id, count, vendors, categories)
+            seed_seconds = round(time.perf_counter() - started, 1)
+
+            started = time.perf_counter()
+            index_products(list(Product.objects.filter(vendor__in=vendors).values_list('pk', flat=True)))
+            index_seconds = round(time.perf_counter() - started, 1)
+
+            published = Product.objects.filter(status="published", vendor__in=vendors)
+            report = {
+                'products': count,
+                'database': connection.vendor,
+                'seed_seconds': seed_seconds,
+                'index_seconds': index_seconds,
+                'search_filter': self._measure(options['repeat'], lambda query: self._search_filter(published, query)),
+                'search_index': self._measure(options['repeat'], lambda query: search_products(published, query)),
+                'search_index_facets': self._measure(
+                    options['repeat'], lambda query: search_products(published, query), facets=True
+                ),
+                'matches': {
+                    query: {
+                        'search_filter': self._search_filter(published, query).count(),
+                        'search_index': search_products(published, query).count(),
+                    }
+                    for query in QUERIES + [TYPO_QUERY]
+                },
+            }
+        finally:
+            with override_settings(PRODUCT_SEARCH_INDEX_ASYNC=False), transaction.atomic():
+                Product.objects.filter(vendor__in=vendors).delete()
+                Category.objects.filter(pk__in=[category.pk for category in categories]).delete()
+                for vendor in vendors:
+                    vendor.user.delete()
+                    vendor.delete()
+
+        for name in ('search_filter', 'search_index', 'search_index_facets'):
+            baseline = report['search_filter']['p50_ms']
+            report[name]['speedup'] = round(baseline / report[name]['p50_ms'], 1) if report[name]['p50_ms'] else None
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"products={count} database={report['database']} seeded in {seed_seconds}s, indexed in {index_seconds}s"
+        )
+        for name in ('search_filter', 'search_index', 'search_index_facets'):
+            scenario = report[name]
+            self.stdout.write(
+                f"{name:<20} p50 {scenario['p50_ms']:>9}ms  p95 {scenario['p95_ms']:>9}ms  x{scenario['speedup']}"
+            )
+        for query, matches in report['matches'].items():
+            self.stdout.write(f"{query!r:<22} matches: search_filter {matches['search_filter']:>6}  search_index {matches['search_index']:>6}")
+
+    def _create_catalog(self, run_id, count, vendors, categories):
+        rng = random.Random(count)
+        batch_size = 2000
+        for offset in range(0, count, batch_size):
+            products = Product.objects.bulk_create([
+                Product(
+                    pid=f"s{run_id}{index:08d}", sku=f"SEARCH{run_id}{index}", slug=f"search-{run_id}-{index}",
+                    vendor=vendors[index % len(vendors)],
+                    title=f"{rng.choice(MATERIALS).title()} {rng.choice(STYLES)} {rng.choice(ITEMS)}",
+                    description=' '.join(rng.sample(FILLER, 30) + [rng.choice(STYLES), rng.choice(MATERIALS)]),
+                    tags=','.join(rng.sample(STYLES, 2)),
+                    price=Decimal(rng.randrange(1000, 150000)), status="published",
+                )
+                for index in range(offset, min(offset + batch_size, count))
+            ])
+            Product.category.through.objects.bulk_create([
+                Product.category.through(product_id=product.pk, category_id=categories[product.pk % len(categories)].pk)
+                for product in products
+            ])
+
+    def _search_filter(self, queryset, query):
+        # DRF SearchFilter with search_fields = ['title', 'description']
+        for term in query.split():
+            queryset = queryset.filter(Q(title__icontains=term) | Q(description__icontains=term))
+        return queryset.order_by('-id')
+
+    def _measure(self, repeat, search, facets=False):
+        timings = []
+        for _ in range(repeat):
+            for query in QUERIES:
+                started = time.perf_counter()
+                results = search(query)
+                results.count()
+                list(results[:10])
+                if facets:
+                    product_facets(results)
+                timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return {
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(timings[max(int(len(timings) * 0.95) - 1, 0)], 2),
+        }
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.search import ensure_search_index, index_products
+
+
+class Command(BaseCommand):
+    """
+    Creates the product search index structures if needed and rebuilds every search document.
+
+    Run it once after deploying the search (existing products have no documents yet) and after
+    bulk imports that bypass the model signals.
+
+    Usage:
+        python manage.py rebuild_product_search
+    """
+    help = "Rebuilds the product search documents and index"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        ensure_search_index()
+        indexed = index_products()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed} products in {round(time.perf_counter() - started, 1)}s"
+        ))
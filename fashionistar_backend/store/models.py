@@ -13,6 +13,7 @@
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.contrib.postgres.search import SearchVectorField
 
 
 from userauths.models import User, user_directory_path, Profile
@@ -206,28 +207,27 @@ def order_count(self):
         order_count = CartOrderItem.objects.filter(product=self, order__payment_status="paid").count()
         return order_count or 0
 
-    # Returns the gallery images linked to this product
+    # Returns the gallery images linked to this product (served from prefetch_related when prefetched)
     def gallery(self):
-        gallery = Gallery.objects.filter(product=self)
-        return gallery
+        return self.product_gallery.all()
     
     
     def specification(self):
-        return Specification.objects.filter(product=self)
+        return self.product_specification.all()
 
 
     def color(self):
-        return Color.objects.filter(product=self)
+        return self.product_color.all()
     
     def size(self):
-        return Size.objects.filter(product=self)
+        return self.product_size.all()
 
-    # Returns a list of products frequently bought together with this product
+    # Returns the ids of the products most often ordered together with this product
     def frequently_bought_together(self):
         frequently_bought_together_products = Product.objects.filter(
-            order_item__order__in=CartOrder.objects.filter(orderitem__product=self)
+            order_item_product__order__in=CartOrder.objects.filter(cart_order__product=self)
         ).exclude(id=self.id).annotate(count=models.Count('id')).order_by('-count')[:3]
-        return frequently_bought_together_products or []
+        return list(frequently_bought_together_products.values_list('id', flat=True))
     
     # Custom save method to generate a slug if it's empty, update in_stock, and calculate the product rating
     def save(self, *args, **kwargs):
@@ -327,6 +327,46 @@ def __str__(self):
         return f"{self.name} for {self.product.title if self.product else 'N/A'}"
 
 
+# Model for the product search index (see store/search.py)
+class ProductSearchDocument(models.Model):
+    """
+    Denormalized search text of a product, rebuilt by the search indexer.
+
+    ``title`` is the strongly weighted part; ``body`` holds the description, category names,
+    brand, tags and vendor name. On Postgres ``search_vector`` holds the weighted tsvector (GIN
+    indexed); on SQLite the text is mirrored into an FTS5 table instead and the column stays empty.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="search_document")
+    title = models.CharField(max_length=100, help_text="Product title")
+    body = models.TextField(blank=True, default="", help_text="Description, categories, brand, tags and vendor name")
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Product Search Documents"
+
+    def __str__(self):
+        return self.title
+
+
+class ProductSearchIndex(models.Model):
+    """
+    The SQLite FTS5 table mirroring the search documents (local development and tests).
+
+    Unmanaged: the virtual table is created by ``store.search.ensure_search_index``. ``document``
+    is FTS5's hidden table-named column that ``MATCH`` applies to, ``rank`` its bm25 score.
+    """
+    product = models.OneToOneField(Product, on_delete=models.DO_NOTHING, primary_key=True, db_column="rowid", db_constraint=False, related_name="search_index")
+    title = models.TextField()
+    body = models.TextField()
+    document = models.TextField(db_column="store_productsearch_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "store_productsearch_fts"
+
+
 class ProductFaq(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
     pid = ShortUUIDField(unique=True, length=10, max_length=20, alphabet="abcdefghijklmnopqrstuvxyz")
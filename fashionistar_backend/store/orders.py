@@ -0,0 +1,92 @@
+'''
+Order read model for order history and order detail, shared by the customer and vendor views.
+
+* The querysets are planned by the read serializers (``EagerLoadingMixin`` in
+  store/serializers.py): orders, their vendors, their items and the items' products and shops
+  are loaded with a fixed number of queries per page, however long the history is.
+* History is paged with a cursor on ``date`` (store/pagination.py).
+* Paid orders that are fulfilled no longer change, so their detail payload is cached as an
+  immutable snapshot keyed by ``oid``, together with the buyer and vendor ids needed to check
+  access without touching the database. Any write to the order or its items drops the snapshot
+  (store/signals.py); product edits made after fulfilment are intentionally not reflected.
+'''
+from django.conf import settings
+from django.core.cache import cache
+
+from store.models import CartOrder, CartOrderItem
+from store.serializers import OrderReadSerializer
+
+SNAPSHOT_ORDER_STATUSES = ('Fulfilled',)
+
+
+def order_snapshot_cache_key(oid):
+    return f"order_snapshot:{oid}"
+
+
+def order_read_queryset(vendor=None, serializer_class=OrderReadSerializer):
+    '''
+    Orders planned for ``serializer_class``, items in the order they were added. With a
+    ``vendor``, each order only carries the items that vendor sells.
+    '''
+    items = CartOrderItem.objects.order_by('id')
+    if vendor is not None:
+        items = items.filter(vendor=vendor)
+    return serializer_class.setup_eager_loading(CartOrder.objects.all(), querysets={'cart_order': items})
+
+
+def customer_orders(user):
+    return order_read_queryset().filter(buyer=user, payment_status="paid")
+
+
+def vendor_orders(vendor, serializer_class=OrderReadSerializer):
+    return order_read_queryset(vendor, serializer_class).filter(vendor=vendor)
+
+
+def is_snapshot_order(order):
+    return order.payment_status == "paid" and order.order_status in SNAPSHOT_ORDER_STATUSES
+
+
+def serialize_order(order):
+    '''
+    Serializes a fully loaded order and caches the snapshot once the order is settled.
+    '''
+    data = OrderReadSerializer(order).data
+    if is_snapshot_order(order):
+        snapshot = {
+            'buyer': order.buyer_id,
+            'vendors': [vendor.pk for vendor in order.vendor.all()],
+            'data': data,
+        }
+        cache.set(order_snapshot_cache_key(order.oid), snapshot, getattr(settings, 'ORDER_SNAPSHOT_CACHE_TTL', 86400))
+    return data
+
+
+def invalidate_order_snapshot(oid):
+    if oid:
+        cache.delete(order_snapshot_cache_key(oid))
+
+
+def customer_order_detail(user, oid):
+    '''
+    The buyer's paid order ``oid``, or None when it does not exist or belongs to someone else.
+    '''
+    snapshot = cache.get(order_snapshot_cache_key(oid))
+    if snapshot is not None and snapshot['buyer'] == user.pk:
+        return snapshot['data']
+    order = customer_orders(user).filter(oid=oid).first()
+    return serialize_order(order) if order is not None else None
+
+
+def vendor_order_detail(vendor, oid):
+    '''
+    The order ``oid`` as seen by one of its vendors: the order with that vendor's items only.
+    '''
+    snapshot = cache.get(order_snapshot_cache_key(oid))
+    if snapshot is None or vendor.pk not in snapshot['vendors']:
+        order = order_read_queryset().filter(vendor=vendor, oid=oid).first()
+        if order is None:
+            return None
+        data = serialize_order(order)
+    else:
+        data = snapshot['data']
+    return {**data, 'orderitem': [item for item in data['orderitem'] if item['vendor'] == vendor.pk]}
@@ -0,0 +1,16 @@
+# store/pagination.py
+
+from rest_framework.pagination import CursorPagination
+
+
+class OrderHistoryPagination(CursorPagination):
+    """
+    Cursor pagination for order history, newest orders first.
+
+    Each page is an indexed range read on `date` that continues from an opaque `?cursor=`,
+    so deep pages cost the same as the first one and no COUNT(*) runs over the whole history.
+    """
+    page_size = 10  # Default number of orders per page
+    page_size_query_param = 'page_size'  # Allows client to override page size, e.g., ?page_size=20
+    max_page_size = 100  # Sets a maximum limit for the page size
+    ordering = '-date'
@@ -0,0 +1,387 @@
+'''
+Product search.
+
+Every product has a denormalized search document (``ProductSearchDocument``): its title, plus a
+body made of the description, category names, brand, tags and vendor name. The documents are
+rebuilt by the indexer below, scheduled from the signals in store/signals.py (through the
+``index_product_search`` Celery task) and by the ``rebuild_product_search`` command.
+
+The index and the query depend on the database:
+
+*   Postgres: a weighted tsvector (title A, body B) in ``search_vector`` with a GIN index,
+    matched with ``websearch_to_tsquery`` and ranked with ``ts_rank``. A pg_trgm GIN index on the
+    title adds typo tolerance: titles whose words are similar to the query match too, and the
+    similarity is added to the rank. Without the pg_trgm extension, matching and ranking are
+    tsvector only.
+*   SQLite (local development and tests): an FTS5 table mirroring the documents (porter
+    stemming, every term matched as a prefix), queried through the unmanaged
+    ``ProductSearchIndex`` model and ranked with bm25. Only the best
+    ``PRODUCT_SEARCH_MAX_RESULTS`` matches are returned.
+*   Other databases: every term must appear in the document (``icontains``), unranked.
+
+The backend structures (GIN and trigram indexes, FTS5 table) are created after ``migrate``
+(see StoreConfig.ready), so the model stays portable across databases.
+'''
+import logging
+import re
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count, Exists, F, FloatField, Lookup, OuterRef, Q, Value
+from django.db.models.expressions import RawSQL
+from django.dispatch import Signal
+from rest_framework.filters import BaseFilterBackend
+
+from store.models import Product, ProductSearchDocument, ProductSearchIndex
+
+# Get logger for application
+application_logger = logging.getLogger('application')
+
+# Sent with ``product_ids`` once their documents were rebuilt (cached listings can refresh then)
+product_search_indexed = Signal()
+
+FTS_TABLE = ProductSearchIndex._meta.db_table
+_pending_index = threading.local()
+_trigram_support = {}
+TERM_RE = re.compile(r'\w+')
+MAX_TERMS = 10
+
+
+class FTSMatch(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+ProductSearchIndex._meta.get_field('document').register_lookup(FTSMatch)
+
+
+def search_terms(query):
+    return TERM_RE.findall((query or '').lower())[:MAX_TERMS]
+
+
+class PostgresSearchBackend:
+    """tsvector + GIN for full-text matching and ranking, pg_trgm for misspelled titles."""
+
+    def __init__(self):
+        self.config = getattr(settings, 'PRODUCT_SEARCH_CONFIG', 'english')
+
+    @staticmethod
+    def trigram_available():
+        '''
+        Whether the pg_trgm extension is installed, looked up once per process (and recorded by
+        ``ensure_index``).
+        '''
+        if connection.alias not in _trigram_support:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                _trigram_support[connection.alias] = cursor.fetchone() is not None
+        return _trigram_support[connection.alias]
+
+    def ensure_index(self):
+        table = ProductSearchDocument._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS store_productsearch_vector_idx ON {table} USING GIN (search_vector)')
+            try:
+                with transaction.atomic():
+                    cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            except DatabaseError as e:
+                application_logger.warning(f"pg_trgm is not available, product search runs without typo tolerance: {e}")
+                _trigram_support[connection.alias] = False
+                return
+            _trigram_support[connection.alias] = True
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS store_productsearch_title_trgm_idx ON {table} USING GIN (title gin_trgm_ops)')
+
+    def refresh(self, product_ids):
+        ProductSearchDocument.objects.filter(pk__in=product_ids).update(
+            search_vector=SearchVector('title', weight='A', config=self.config)
+            + SearchVector('body', weight='B', config=self.config)
+        )
+
+    def remove(self, product_ids):
+        pass  # the documents are deleted with their products
+
+    def clear(self):
+        pass
+
+    def search(self, queryset, query):
+        search_query = SearchQuery(query, search_type='websearch', config=self.config)
+        condition = Q(search_document__search_vector=search_query)
+        rank = SearchRank(F('search_document__search_vector'), search_query)
+        if self.trigram_available():
+            condition |= Q(search_document__title__trigram_word_similar=query)
+            rank += TrigramWordSimilarity(query, 'search_document__title')
+        return queryset.filter(condition).annotate(search_rank=rank).order_by('-search_rank', '-pk')
+
+
+class SQLiteSearchBackend:
+    """FTS5 mirror of the documents, keyed by product id, ranked with bm25 (title weighted 10x)."""
+
+    def ensure_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                f"USING fts5(title, body, tokenize='porter unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+
+    def refresh(self, product_ids):
+        table = ProductSearchDocument._meta.db_table
+        product_ids = list(product_ids)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, len(product_ids), 500):
+                chunk = product_ids[start:start + 500]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", chunk)
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, body) "
+                    f"SELECT product_id, title, body FROM {table} WHERE product_id IN ({placeholders})",
+                    chunk,
+                )
+
+    def remove(self, product_ids):
+        self.refresh(product_ids)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+        expression = ' '.join(f'"{term}"*' for term in terms)
+        # The FTS table has to drive the query: joined to a selectively filtered product queryset,
+        # SQLite would probe it per product and evaluate the MATCH again for every probe. So the
+        # best matches within the queryset (Exists cannot be pushed into the FTS lookup) are
+        # ranked first, then mapped back onto the queryset by their position in that ranking.
+        limit = getattr(settings, 'PRODUCT_SEARCH_MAX_RESULTS', 1000)
+        ranked = list(
+            ProductSearchIndex.objects.filter(document__match=expression)
+            .filter(Exists(queryset.order_by().filter(pk=OuterRef('product_id'))))
+            .order_by('rank').values_list('product_id', flat=True)[:limit]
+        )
+        if not ranked:
+            return queryset.none()
+        positions = ',' + ','.join(str(pk) for pk in ranked) + ','
+        return queryset.filter(pk__in=ranked).annotate(
+            search_rank=RawSQL(
+                f"-instr(%s, ',' || {Product._meta.db_table}.id || ',')", [positions], output_field=FloatField()
+            ),
+        ).order_by('-search_rank', '-pk')
+
+
+class ContainsSearchBackend:
+    """Fallback for databases without a supported full-text index."""
+
+    def ensure_index(self):
+        pass
+
+    def refresh(self, product_ids):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return queryset.none()
+        for term in terms:
+            queryset = queryset.filter(
+                Q(search_document__title__icontains=term) | Q(search_document__body__icontains=term)
+            )
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    return ContainsSearchBackend()
+
+
+def ensure_search_index(**kwargs):
+    '''
+    Creates the backend index structures if they are missing (connected to ``post_migrate``).
+    '''
+    if ProductSearchDocument._meta.db_table not in connection.introspection.table_names():
+        return
+    get_search_backend().ensure_index()
+
+
+def search_products(queryset, query):
+    '''
+    Restricts a product queryset to the products matching ``query``, annotated with
+    ``search_rank`` and ordered best match first.
+    '''
+    return get_search_backend().search(queryset, query)
+
+
+def build_search_document(product):
+    '''
+    The search document of a product; expects ``vendor`` selected and ``category`` prefetched.
+    '''
+    body = [
+        product.description,
+        ' '.join(category.name for category in product.category.all()),
+        product.brand,
+        (product.tags or '').replace(',', ' '),
+        product.vendor.name if product.vendor else None,
+    ]
+    return ProductSearchDocument(product=product, title=product.title, body=' '.join(filter(None, body)))
+
+
+def index_products(product_ids=None):
+    '''
+    Rebuilds the search documents of the given products, or of every product when
+    ``product_ids`` is None. Ids of deleted products are removed from the index.
+
+    Returns:
+        int: Number of documents written.
+    '''
+    backend = get_search_backend()
+    batch_size = getattr(settings, 'PRODUCT_SEARCH_INDEX_BATCH_SIZE', 1000)
+    products = Product.objects.select_related('vendor').prefetch_related('category').order_by('pk')
+    if product_ids is None:
+        backend.clear()
+    else:
+        products = products.filter(pk__in=product_ids)
+
+    indexed = []
+    last_pk = 0
+    while True:
+        batch = list(products.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        ProductSearchDocument.objects.bulk_create(
+            [build_search_document(product) for product in batch],
+            update_conflicts=True, unique_fields=['product'], update_fields=['title', 'body', 'updated'],
+        )
+        batch_ids = [product.pk for product in batch]
+        backend.refresh(batch_ids)
+        indexed.extend(batch_ids)
+        last_pk = batch_ids[-1]
+
+    removed = set(product_ids or ()) - set(indexed)
+    if removed:
+        backend.remove(removed)
+    if indexed or removed:
+        product_search_indexed.send(sender=ProductSearchDocument, product_ids=indexed + sorted(removed))
+    return len(indexed)
+
+
+def schedule_product_index(product_ids):
+    '''
+    Rebuilds the documents of the given products once the current transaction commits: on the
+    Celery worker, or inline when ``PRODUCT_SEARCH_INDEX_ASYNC`` is off or the broker is
+    unreachable (so the index never silently falls behind).
+
+    Ids scheduled within one transaction are indexed together: the first commit callback takes
+    every pending id, the later ones find nothing left. A callback is registered on every call,
+    so ids left pending by a rolled back transaction (whose callbacks were discarded) are indexed
+    with the next commit instead of blocking later writes to the same products.
+    '''
+    pending = getattr(_pending_index, 'product_ids', None)
+    if pending is None:
+        pending = _pending_index.product_ids = set()
+    pending.update(product_ids)
+    transaction.on_commit(flush_product_index)
+
+
+def flush_product_index():
+    product_ids = sorted(getattr(_pending_index, 'product_ids', None) or ())
+    _pending_index.product_ids = set()
+    if not product_ids:
+        return
+
+    if getattr(settings, 'PRODUCT_SEARCH_INDEX_ASYNC', True):
+        from store.tasks import index_product_search
+
+        try:
+            index_product_search.delay(product_ids)
+            return
+        except Exception as e:
+            application_logger.warning(f"Could not enqueue product search indexing, indexing inline: {e}")
+    index_products(product_ids)
+
+
+def product_facets(queryset):
+    '''
+    Counts of the products in ``queryset`` per category, price bucket and vendor.
+
+    Price buckets are bounded by ``PRODUCT_SEARCH_PRICE_BUCKETS``; empty buckets are omitted.
+    '''
+    limit = getattr(settings, 'PRODUCT_SEARCH_FACET_LIMIT', 20)
+    matches = Product.objects.filter(pk__in=queryset.order_by().values('pk')).order_by()
+
+    categories = (
+        matches.exclude(category=None).values('category__slug', 'category__name')
+        .annotate(count=Count('pk', distinct=True)).order_by('-count', 'category__name')[:limit]
+    )
+    vendors = (
+        matches.values('vendor__vid', 'vendor__name')
+        .annotate(count=Count('pk', distinct=True)).order_by('-count', 'vendor__name')[:limit]
+    )
+
+    bounds = [Decimal(str(bound)) for bound in getattr(settings, 'PRODUCT_SEARCH_PRICE_BUCKETS', [5000, 10000, 25000, 50000, 100000])]
+    ranges = list(zip([None] + bounds, bounds + [None]))
+    buckets = {}
+    for index, (low, high) in enumerate(ranges):
+        condition = Q()
+        if low is not None:
+            condition &= Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        buckets[f'bucket_{index}'] = Count('pk', filter=condition)
+    counts = matches.aggregate(**buckets)
+
+    return {
+        'category': [
+            {'slug': row['category__slug'], 'name': row['category__name'], 'count': row['count']} for row in categories
+        ],
+        'price': [
+            {'min': low, 'max': high, 'count': counts[f'bucket_{index}']}
+            for index, (low, high) in enumerate(ranges) if counts[f'bucket_{index}']
+        ],
+        'vendor': [
+            {'vid': row['vendor__vid'], 'name': row['vendor__name'], 'count': row['count']} for row in vendors
+        ],
+    }
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    """
+    Ranked full-text search for product listings, a drop-in replacement for ``SearchFilter``: the
+    same ``search`` query parameter, results ordered best match first (an explicit ``ordering``
+    from ``OrderingFilter`` still wins).
+    """
+    search_param = 'search'
+
+    def get_search_query(self, request):
+        return request.query_params.get(self.search_param, '').strip()
+
+    def filter_queryset(self, request, queryset, view):
+        query = self.get_search_query(request)
+        if not query:
+            return queryset
+        return search_products(queryset, query)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Full-text product search (title, description, category, brand, tags, vendor).',
+            'schema': {'type': 'string'},
+        }]
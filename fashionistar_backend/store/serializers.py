@@ -1,9 +1,10 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
 from rest_framework import serializers
 
 from admin_backend.models import Category
 from store.models import CartOrderItem, CouponUsers, Product, Tag , DeliveryCouriers, CartOrder, Gallery, ProductFaq, Review,  Specification, Coupon, Color, Size,  Wishlist, Vendor
 from addon.models import ConfigSettings
-from store.models import Gallery
 from userauths.serializer import *
 from admin_backend.serializers import CategorySerializer
 
@@ -188,6 +189,108 @@ def __init__(self, *args, **kwargs):
             self.Meta.depth = 3
 
 
+class EagerLoadingMixin:
+    """
+    Plans the queryset a read serializer needs from its own field declarations.
+
+    Nested objects and dotted sources over foreign keys (``buyer.profile.full_name``) are joined
+    with ``select_related``; nested lists get one ``Prefetch`` each, whose queryset is planned the
+    same way by the child serializer. A page therefore costs one query per nested list, whatever
+    its size. ``querysets`` maps a prefetch lookup to the base queryset to use for it (e.g. only
+    one vendor's order items).
+    """
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, querysets=None, prefix=''):
+        querysets = querysets or {}
+        for name, field in cls._declared_fields.items():
+            source = field.source or name
+            if isinstance(field, serializers.ListSerializer) and isinstance(field.child, EagerLoadingMixin):
+                child = type(field.child)
+                lookup = f"{prefix}{source}"
+                base = querysets.get(lookup, child.Meta.model._default_manager.all())
+                queryset = queryset.prefetch_related(
+                    Prefetch(lookup, queryset=child.setup_eager_loading(base, querysets))
+                )
+            elif isinstance(field, EagerLoadingMixin):
+                queryset = queryset.select_related(f"{prefix}{source}")
+                queryset = type(field).setup_eager_loading(queryset, querysets, prefix=f"{prefix}{source}__")
+            elif '.' in source:
+                path = cls._relation_path(cls.Meta.model, source)
+                if path:
+                    queryset = queryset.select_related(f"{prefix}{path}")
+        return queryset
+
+    @staticmethod
+    def _relation_path(model, source):
+        path = []
+        for attr in source.split('.')[:-1]:
+            try:
+                field = model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not (field.many_to_one or field.one_to_one):
+                break
+            path.append(attr)
+            model = field.related_model
+        return '__'.join(path)
+
+
+class StorageUrlField(serializers.ReadOnlyField):
+    """URL of a stored file, independent of the request so the payload can be cached."""
+
+    def to_representation(self, value):
+        return value.url if value else None
+
+
+class OrderVendorSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    """Shop summary shown on order history and order detail."""
+    image = StorageUrlField()
+
+    class Meta:
+        model = Vendor
+        fields = ['id', 'name', 'slug', 'image']
+
+
+class OrderProductSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    """Product summary of an ordered item."""
+    image = StorageUrlField()
+    vendor = OrderVendorSerializer(read_only=True)
+
+    class Meta:
+        model = Product
+        fields = ['id', 'pid', 'title', 'slug', 'image', 'price', 'vendor']
+
+
+class OrderItemReadSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    """Read-only order item for order history and order detail."""
+    product = OrderProductSerializer(read_only=True)
+
+    class Meta:
+        model = CartOrderItem
+        fields = [
+            'id', 'oid', 'product', 'vendor', 'qty', 'color', 'size', 'price', 'sub_total',
+            'shipping_amount', 'service_fee', 'total', 'initial_total', 'saved', 'delivery_status',
+            'tracking_id', 'product_delivered', 'date',
+        ]
+
+
+class OrderReadSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    """Read-only order for order history and order detail (see store/orders.py).
+    """
+    vendor = OrderVendorSerializer(many=True, read_only=True, help_text="Vendors associated with the order.")
+    orderitem = OrderItemReadSerializer(source='cart_order', many=True, read_only=True, help_text="A list of items included in this cart order.")
+
+    class Meta:
+        model = CartOrder
+        fields = [
+            'id', 'oid', 'vendor', 'buyer', 'sub_total', 'shipping_amount', 'service_fee', 'total',
+            'initial_total', 'saved', 'payment_status', 'order_status', 'delivery_status', 'tracking_id',
+            'expected_delivery_date_from', 'expected_delivery_date_to', 'full_name', 'email', 'mobile',
+            'address', 'city', 'state', 'country', 'date', 'orderitem',
+        ]
+
+
 class VendorSerializer(serializers.ModelSerializer):
     """Serializer for the Vendor model.
      """
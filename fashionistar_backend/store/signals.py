@@ -0,0 +1,70 @@
+# store/signals.py
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from admin_backend.models import Category
+from store.models import CartOrder, CartOrderItem, Product
+from store.orders import invalidate_order_snapshot
+from store.search import schedule_product_index
+from vendor.models import Vendor
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def index_product(sender, instance, update_fields=None, **kwargs):
+    """
+    Re-indexes a written or deleted product. The rating-only save that follows the creation of a
+    product (Product.save) does not touch the search document and is skipped.
+    """
+    if update_fields is not None and set(update_fields) <= {'rating', 'views', 'orders', 'saved'}:
+        return
+    schedule_product_index([instance.pk])
+
+
+@receiver(m2m_changed, sender=Product.category.through)
+def index_product_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        schedule_product_index([instance.pk])
+    elif pk_set:
+        schedule_product_index(pk_set)
+
+
+@receiver(post_save, sender=Category)
+def index_category_products(sender, instance, created, **kwargs):
+    if not created:
+        schedule_product_index(instance.product_category.values_list('pk', flat=True))
+
+
+@receiver(pre_save, sender=Vendor)
+def remember_vendor_name(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding or (update_fields is not None and 'name' not in update_fields):
+        instance._indexed_name = instance.name
+        return
+    instance._indexed_name = Vendor.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Vendor)
+def index_vendor_products(sender, instance, created, **kwargs):
+    """
+    Vendor names are part of the product documents; wallet and profile saves that keep the name
+    do not re-index the catalog.
+    """
+    if not created and getattr(instance, '_indexed_name', instance.name) != instance.name:
+        schedule_product_index(instance.vendor_product_set.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=CartOrder)
+@receiver(post_delete, sender=CartOrder)
+def drop_order_snapshot(sender, instance, **kwargs):
+    invalidate_order_snapshot(instance.oid)
+
+
+@receiver(post_save, sender=CartOrderItem)
+@receiver(post_delete, sender=CartOrderItem)
+def drop_order_item_snapshot(sender, instance, **kwargs):
+    if CartOrderItem.order.is_cached(instance):
+        invalidate_order_snapshot(instance.order.oid)
+    else:
+        invalidate_order_snapshot(CartOrder.objects.filter(pk=instance.order_id).values_list('oid', flat=True).first())
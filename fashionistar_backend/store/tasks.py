@@ -0,0 +1,41 @@
+# store/tasks.py
+
+from celery import shared_task
+import logging
+
+from store.models import Product
+from store.search import index_products
+
+# Get logger for application
+application_logger = logging.getLogger('application')
+
+
+@shared_task(name="index_product_search")
+def index_product_search(product_ids: list[int]) -> int:
+    """
+    Rebuilds the search documents of the given products (scheduled by store/signals.py).
+
+    Args:
+        product_ids (list[int]): Product ids; ids of deleted products are removed from the index.
+
+    Returns:
+        int: Number of documents written.
+    """
+    return index_products(product_ids)
+
+
+@shared_task(name="index_missing_product_search")
+def index_missing_product_search() -> int:
+    """
+    Periodic sweep (see CELERY_BEAT_SCHEDULE) for products written without signals, e.g. by
+    ``bulk_create``, that have no search document yet.
+
+    Returns:
+        int: Number of documents written.
+    """
+    product_ids = list(Product.objects.filter(search_document__isnull=True).values_list('pk', flat=True)[:10000])
+    if not product_ids:
+        return 0
+    indexed = index_products(product_ids)
+    application_logger.info(f"Indexed {indexed} products missing from the search index")
+    return indexed
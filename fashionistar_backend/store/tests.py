@@ -1,3 +1,253 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from admin_backend.models import Category
+from store.models import CartOrder, CartOrderItem, Product, ProductSearchDocument
+from store.orders import order_snapshot_cache_key, vendor_order_detail, vendor_orders
+from store.search import PostgresSearchBackend, _trigram_support, index_products, product_facets, search_products
+from store.serializers import OrderReadSerializer
+from vendor.models import Vendor
+from vendor.serializerss.order import VendorOrderListSerializer
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PRODUCT_SEARCH_INDEX_ASYNC=False)
+class ProductSearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lagos = self._vendor('lagos', 'Lagos Looms')
+        self.abuja = self._vendor('abuja', 'Abuja Atelier')
+        self.dresses = Category.objects.create(name='Dresses', slug='dresses')
+        self.shoes = Category.objects.create(name='Shoes', slug='shoes')
+
+        self.gown = self._product(self.lagos, 'Ankara evening gown', self.dresses, '45000.00', description='Hand-sewn wax print')
+        self.boots = self._product(self.abuja, 'Leather boots', self.shoes, '30000.00', tags='ankara,leather')
+        self.sandals = self._product(self.abuja, 'Beach sandals', self.shoes, '8000.00', brand='Ankara House')
+        self._product(self.lagos, 'Lace blouse', self.dresses, '12000.00')
+
+    def _vendor(self, name, shop_name):
+        user = User.objects.create_user(email=f'{name}@example.com', password='password123', role=User.VENDOR)
+        return Vendor.objects.create(user=user, name=shop_name)
+
+    def _product(self, vendor, title, category, price, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(vendor=vendor, title=title, price=Decimal(price), **fields)
+            product.category.add(category)
+        return product
+
+    def _search(self, query):
+        return list(search_products(Product.objects.filter(status='published'), query))
+
+    def test_rolled_back_write_does_not_block_later_indexing(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.boots.title = 'Suede boots'
+            self.boots.save()
+            raise RuntimeError
+        self.assertEqual(ProductSearchDocument.objects.get(product=self.boots).title, 'Leather boots')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.boots.title = 'Suede boots'
+            self.boots.save()
+        self.assertEqual(ProductSearchDocument.objects.get(product=self.boots).title, 'Suede boots')
+
+    def test_documents_follow_product_writes(self):
+        document = ProductSearchDocument.objects.get(product=self.boots)
+        self.assertEqual(document.title, 'Leather boots')
+        self.assertIn('Shoes', document.body)
+        self.assertIn('Abuja Atelier', document.body)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.abuja.name = 'Abuja Studio'
+            self.abuja.save()
+        self.assertIn('Abuja Studio', ProductSearchDocument.objects.get(product=self.boots).body)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.boots.delete()
+        self.assertEqual(self._search('boots'), [])
+
+    def test_matches_every_document_field_ranked_title_first(self):
+        # title, tags and brand all mention ankara; the title match ranks first
+        results = self._search('ankara')
+        self.assertEqual(results[0], self.gown)
+        self.assertCountEqual(results[1:], [self.boots, self.sandals])
+        self.assertCountEqual(self._search('atelier'), [self.sandals, self.boots])  # vendor name
+        self.assertEqual(self._search('gowns'), [self.gown])  # stemming
+        self.assertEqual(self._search('sand'), [self.sandals])  # prefix while typing
+        self.assertEqual(self._search('%'), [])
+
+    def test_facets_count_all_matches(self):
+        facets = product_facets(search_products(Product.objects.all(), 'ankara'))
+
+        self.assertEqual(
+            [(row['slug'], row['count']) for row in facets['category']], [('shoes', 2), ('dresses', 1)]
+        )
+        self.assertEqual(
+            [(row['min'], row['max'], row['count']) for row in facets['price']],
+            [(Decimal('5000'), Decimal('10000'), 1), (Decimal('25000'), Decimal('50000'), 2)],
+        )
+        self.assertEqual([(row['name'], row['count']) for row in facets['vendor']], [('Abuja Atelier', 2), ('Lagos Looms', 1)])
+
+    def test_listing_search_is_ranked_and_faceted(self):
+        response = self.client.get(reverse('home:product-list'), {'search': 'ankara', 'page_size': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(response.data['results'][0]['title'], 'Ankara evening gown')
+        self.assertEqual(response.data['facets']['vendor'][0]['count'], 2)
+
+    def test_full_rebuild_indexes_bulk_inserted_products(self):
+        Product.objects.bulk_create([
+            Product(vendor=self.lagos, title='Agbada set', pid='bulkagbada01', sku='SKU900001', slug='agbada-set')
+        ])
+        self.assertEqual(self._search('agbada'), [])
+
+        self.assertEqual(index_products(), 5)
+        self.assertEqual([product.title for product in self._search('agbada')], ['Agbada set'])
+
+
+class PostgresSearchBackendTest(TestCase):
+    def setUp(self):
+        self.addCleanup(_trigram_support.clear)
+
+    def _search(self):
+        queryset = PostgresSearchBackend().search(Product.objects.all(), 'ankra')
+        return str(queryset.query.where) + repr(queryset.query.annotations['search_rank'])
+
+    def test_search_without_pg_trgm_is_tsvector_only(self):
+        def execute(sql, *args):
+            if 'pg_trgm' in sql:
+                raise DatabaseError('permission denied to create extension "pg_trgm"')
+
+        with patch.object(connection, 'cursor') as cursor:
+            cursor.return_value.__enter__.return_value.execute.side_effect = execute
+            PostgresSearchBackend().ensure_index()
+
+        self.assertFalse(PostgresSearchBackend.trigram_available())
+        self.assertNotIn('Trigram', self._search())
+
+    def test_search_with_pg_trgm_matches_similar_titles(self):
+        with patch.object(connection, 'cursor'):
+            PostgresSearchBackend().ensure_index()
+
+        self.assertTrue(PostgresSearchBackend.trigram_available())
+        self.assertIn('TrigramWordSimilar', self._search())
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PRODUCT_SEARCH_INDEX_ASYNC=False)
+class OrderReadModelTest(TestCase):
+    """Order history and detail for a buyer with 500 paid orders, each with an item from two vendors."""
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create_user(email='buyer@example.com', password='password123')
+        cls.lagos = cls._vendor('lagos', 'Lagos Looms')
+        cls.abuja = cls._vendor('abuja', 'Abuja Atelier')
+        cls.gown = Product.objects.create(vendor=cls.lagos, title='Ankara gown', price=Decimal('45000.00'))
+        cls.boots = Product.objects.create(vendor=cls.abuja, title='Leather boots', price=Decimal('30000.00'))
+
+        now = timezone.now()
+        orders = CartOrder.objects.bulk_create([
+            CartOrder(
+                oid=f'CO{index:08d}', buyer=cls.buyer, payment_status='paid', total=Decimal('75000.00'),
+                date=now - timedelta(minutes=index),
+            )
+            for index in range(500)
+        ])
+        CartOrder.vendor.through.objects.bulk_create([
+            CartOrder.vendor.through(cartorder_id=order.pk, vendor_id=vendor.pk)
+            for order in orders for vendor in (cls.lagos, cls.abuja)
+        ])
+        CartOrderItem.objects.bulk_create([
+            CartOrderItem(order=order, product=product, vendor=product.vendor, qty=1, price=product.price, total=product.price)
+            for order in orders for product in (cls.gown, cls.boots)
+        ])
+        cls.newest = orders[0]
+
+    @classmethod
+    def _vendor(cls, name, shop_name):
+        user = User.objects.create_user(email=f'{name}@example.com', password='password123', role=User.VENDOR)
+        return Vendor.objects.create(user=user, name=shop_name)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.buyer)
+
+    def _fulfil(self, order):
+        order.order_status = 'Fulfilled'
+        order.save()
+
+    def test_history_pages_cost_the_same_fixed_queries_to_the_end(self):
+        url = reverse('customer:client-orders')
+        # fetch_user_and_vendor, the page, then one prefetch each for vendors and items
+        with self.assertNumQueries(4):
+            response = self.client.get(url, {'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        first = response.data['results'][0]
+        self.assertEqual(first['oid'], self.newest.oid)
+        self.assertEqual([item['product']['title'] for item in first['orderitem']], ['Ankara gown', 'Leather boots'])
+        self.assertEqual(first['orderitem'][0]['product']['vendor']['name'], 'Lagos Looms')
+        self.assertEqual(len(first['vendor']), 2)
+
+        oids = [order['oid'] for order in response.data['results']]
+        while response.data['next']:
+            with self.assertNumQueries(4):
+                response = self.client.get(response.data['next'])
+            oids += [order['oid'] for order in response.data['results']]
+        self.assertEqual(oids, [f'CO{index:08d}' for index in range(500)])
+
+    def test_fulfilled_order_detail_is_an_immutable_snapshot(self):
+        url = reverse('customer:client-order-detail', kwargs={'order_oid': self.newest.oid})
+        self.assertEqual(self.client.get(url).data['order_status'], 'Pending')
+        self.assertIsNone(cache.get(order_snapshot_cache_key(self.newest.oid)))
+
+        self._fulfil(self.newest)
+        self.assertEqual(self.client.get(url).data['order_status'], 'Fulfilled')
+        # only fetch_user_and_vendor; the order comes from the snapshot
+        with self.assertNumQueries(1):
+            cached = self.client.get(url)
+        self.assertEqual(len(cached.data['orderitem']), 2)
+
+        other = User.objects.create_user(email='other@example.com', password='password123')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        self.newest.delivery_status = 'Returned'
+        self.newest.save()
+        self.assertIsNone(cache.get(order_snapshot_cache_key(self.newest.oid)))
+
+    def test_vendors_read_their_own_items_with_fixed_queries(self):
+        with self.assertNumQueries(3):
+            data = OrderReadSerializer(vendor_orders(self.lagos)[:100], many=True).data
+        self.assertEqual(len(data), 100)
+        self.assertEqual({item['product']['title'] for order in data for item in order['orderitem']}, {'Ankara gown'})
+
+        with self.assertNumQueries(1):
+            rows = VendorOrderListSerializer(
+                vendor_orders(self.abuja, VendorOrderListSerializer).annotate(items_count=Count('cart_order'))[:100],
+                many=True,
+            ).data
+        self.assertEqual(rows[0]['items_count'], 2)
+
+        self._fulfil(self.newest)
+        self.assertEqual([item['product']['title'] for item in vendor_order_detail(self.abuja, self.newest.oid)['orderitem']], ['Leather boots'])
+        with self.assertNumQueries(0):
+            detail = vendor_order_detail(self.lagos, self.newest.oid)
+        self.assertEqual([item['product']['title'] for item in detail['orderitem']], ['Ankara gown'])
+
+        outsider = self._vendor('kano', 'Kano Knits')
+        self.assertIsNone(vendor_order_detail(outsider, self.newest.oid))
@@ -14,6 +14,7 @@
 from addon.models import ConfigSettings
 
 # Others Packages
+from store.search import search_products
 
 
 
@@ -25,11 +26,8 @@ class SearchProductsAPIView(generics.ListAPIView):
     permission_classes = (AllowAny,)
 
     def get_queryset(self):
-        query = self.request.GET.get('query')
-        print("query =======", query)
-
-        products = Product.objects.filter(status="published", title__icontains=query)
-        return products
+        query = self.request.GET.get('query', '')
+        return search_products(Product.objects.filter(status="published"), query)
        
 
 
@@ -4,10 +4,14 @@
 import logging
 import asyncio
 import json
+import threading
 from typing import Dict, List, Tuple, Any, Optional, Callable
 from datetime import datetime, timedelta
 from django.conf import settings
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .workflow_engine import (
+    WorkflowEngine, WorkflowStep, WorkflowValidationError, get_shared_executor, run_to_completion,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -20,13 +24,18 @@ class OrchestratorCore:
     این کلاس مسئول هماهنگی بین سرویس‌های مختلف، مدیریت workflow و monitoring است
     """
     
+    # انواع مرحله I/O-bound که روی event loop اجرا می‌شوند
+    ASYNC_STEP_TYPES = ('api_call', 'delay')
+    
     def __init__(self):
         """مقداردهی اولیه هسته Orchestrator"""
         self.logger = logging.getLogger(__name__)
         self.max_concurrent_tasks = getattr(settings, 'MAX_CONCURRENT_TASKS', 10)
         self.task_timeout = getattr(settings, 'TASK_TIMEOUT', 300)  # 5 minutes
         self.active_workflows = {}
-        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent_tasks)
+        # pool مشترک در سطح پردازه؛ برای هر نمونه یا فراخوانی pool جدید ساخته نمی‌شود
+        self.executor = get_shared_executor()
+        self.engine = WorkflowEngine()
         
     def execute_workflow(self, workflow_config: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -57,7 +66,9 @@ class OrchestratorCore:
                 'status': 'running',
                 'start_time': datetime.now(),
                 'steps_completed': [],
-                'current_step': None
+                'current_step': None,
+                'running_steps': set(),
+                'cancel_event': threading.Event()
             }
             
             self.logger.info(
@@ -118,39 +129,36 @@ class OrchestratorCore:
                 }
             )
             
+            # هر تسک یک مرحله مستقل در DAG است و روی pool مشترک اجرا می‌شود
+            task_ids = [task.get('id', index) for index, task in enumerate(tasks)]
+            steps = [
+                WorkflowStep(
+                    name=f"task_{index}",
+                    func=lambda context, inputs, task=task: self._execute_single_task(task),
+                    timeout=self.task_timeout,
+                    continue_on_error=True
+                )
+                for index, task in enumerate(tasks)
+            ]
+            
+            run = self.engine.run(steps, max_parallel=max_workers)
+            
             results = []
             failed_tasks = []
-            
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # ارسال همه تسک‌ها برای اجرا
-                future_to_task = {
-                    executor.submit(self._execute_single_task, task): task 
-                    for task in tasks
-                }
-                
-                # جمع‌آوری نتایج
-                for future in as_completed(future_to_task, timeout=self.task_timeout):
-                    task = future_to_task[future]
-                    try:
-                        success, result = future.result()
-                        if success:
-                            results.append({
-                                'task_id': task.get('id', len(results)),
-                                'status': 'success',
-                                'result': result
-                            })
-                        else:
-                            failed_tasks.append({
-                                'task_id': task.get('id', len(results)),
-                                'status': 'failed',
-                                'error': result
-                            })
-                    except Exception as e:
-                        failed_tasks.append({
-                            'task_id': task.get('id', len(results)),
-                            'status': 'error',
-                            'error': str(e)
-                        })
+            for index, step in enumerate(steps):
+                step_report = run['steps'][step.name]
+                if step_report['status'] == 'completed':
+                    results.append({
+                        'task_id': task_ids[index],
+                        'status': 'success',
+                        'result': run['results'][step.name]
+                    })
+                else:
+                    failed_tasks.append({
+                        'task_id': task_ids[index],
+                        'status': 'failed' if step_report['status'] == 'failed' else 'error',
+                        'error': step_report['result'] or step_report['error']
+                    })
             
             success = len(failed_tasks) == 0
             
@@ -164,6 +172,8 @@ class OrchestratorCore:
             if failed_tasks:
                 final_result['failures'] = failed_tasks
             
+            final_result['timing'] = run['timing']
+            
             self.logger.info(
                 'Parallel execution completed',
                 extra={
@@ -213,7 +223,8 @@ class OrchestratorCore:
                 'start_time': start_time.isoformat(),
                 'duration_seconds': duration,
                 'steps_completed': len(workflow['steps_completed']),
-                'current_step': workflow['current_step']
+                'current_step': workflow['current_step'],
+                'running_steps': sorted(workflow.get('running_steps', ()))
             }
             
             if 'end_time' in workflow:
@@ -259,9 +270,10 @@ class OrchestratorCore:
                     'current_status': workflow['status']
                 }
             
-            # تغییر وضعیت به cancelled
+            # تغییر وضعیت به cancelled و توقف زمان‌بندی مراحل باقیمانده
             workflow['status'] = 'cancelled'
             workflow['end_time'] = datetime.now()
+            workflow['cancel_event'].set()
             
             self.logger.info(
                 'Workflow cancelled',
@@ -335,6 +347,13 @@ class OrchestratorCore:
                 for field in required_step_fields:
                     if field not in step:
                         return False
+                
+                depends_on = step.get('depends_on', [])
+                if not isinstance(depends_on, (list, tuple)):
+                    return False
+            
+            # بررسی نام‌های تکراری، وابستگی‌های ناشناخته و چرخه
+            self.engine.validate(self._build_workflow_steps(config))
             
             return True
             
@@ -344,72 +363,142 @@ class OrchestratorCore:
     def _run_workflow_steps(self, workflow_id: str, config: Dict[str, Any], context: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
         """
         اجرای مراحل workflow
+        
+        مراحل بر اساس یال‌های depends_on به صورت توپولوژیک زمان‌بندی می‌شوند و
+        مراحل مستقل همزمان اجرا می‌شوند. اگر هیچ مرحله‌ای depends_on نداشته باشد،
+        ترتیب تعریف به عنوان زنجیره وابستگی در نظر گرفته می‌شود (رفتار قبلی).
         """
         try:
-            steps = config['steps']
             workflow = self.active_workflows[workflow_id]
-            results = []
             
-            for i, step in enumerate(steps):
-                if workflow['status'] == 'cancelled':
-                    break
-                
-                workflow['current_step'] = step['name']
-                
+            def on_step_start(step_name: str):
+                workflow['running_steps'].add(step_name)
+                workflow['current_step'] = step_name
                 self.logger.info(
                     'Executing workflow step',
-                    extra={
-                        'workflow_id': workflow_id,
-                        'step_name': step['name'],
-                        'step_index': i
-                    }
+                    extra={'workflow_id': workflow_id, 'step_name': step_name}
                 )
-                
-                # اجرای مرحله
-                step_success, step_result = self._execute_workflow_step(step, context, results)
-                
-                results.append({
-                    'step_name': step['name'],
-                    'success': step_success,
-                    'result': step_result
-                })
-                
-                workflow['steps_completed'].append(step['name'])
-                
-                if not step_success:
-                    # در صورت خطا، بررسی کنید که آیا workflow باید ادامه یابد یا نه
-                    if step.get('continue_on_error', False):
-                        self.logger.warning(
-                            'Step failed but continuing workflow',
-                            extra={
-                                'workflow_id': workflow_id,
-                                'step_name': step['name'],
-                                'error': step_result
-                            }
-                        )
-                        continue
-                    else:
-                        return False, {
-                            'error': 'Workflow step failed',
-                            'step_name': step['name'],
-                            'step_error': step_result,
-                            'completed_steps': results
+            
+            def on_step_finish(step_run):
+                workflow['running_steps'].discard(step_run.step.name)
+                workflow['steps_completed'].append(step_run.step.name)
+                if step_run.status != 'completed' and step_run.step.continue_on_error:
+                    self.logger.warning(
+                        'Step failed but continuing workflow',
+                        extra={
+                            'workflow_id': workflow_id,
+                            'step_name': step_run.step.name,
+                            'error': step_run.error
                         }
+                    )
+            
+            run = self.engine.run(
+                self._build_workflow_steps(config),
+                context=context,
+                cancel_event=workflow['cancel_event'],
+                max_parallel=self.max_concurrent_tasks,
+                on_step_start=on_step_start,
+                on_step_finish=on_step_finish
+            )
             
-            # workflow با موفقیت تکمیل شد
+            results = [
+                {
+                    'step_name': step['name'],
+                    'success': run['steps'][step['name']]['status'] == 'completed',
+                    'result': run['steps'][step['name']]['result'] or {'error': run['steps'][step['name']]['error']}
+                }
+                for step in config['steps']
+                if run['steps'][step['name']]['status'] in ('completed', 'failed', 'timeout')
+            ]
+            
+            self.logger.info(
+                'Workflow timing',
+                extra={'workflow_id': workflow_id, **run['timing']}
+            )
+            
+            if run['status'] == 'failed':
+                failed_step = run['failed_step']
+                return False, {
+                    'error': 'Workflow step failed',
+                    'step_name': failed_step,
+                    'step_error': run['steps'][failed_step]['result'] or {'error': run['steps'][failed_step]['error']},
+                    'completed_steps': results,
+                    'timing': run['timing']
+                }
+            
+            # workflow با موفقیت تکمیل شد (یا لغو شد)
             return True, {
                 'workflow_id': workflow_id,
-                'status': 'completed',
+                'status': run['status'],
                 'steps_executed': len(results),
-                'results': results
+                'results': results,
+                'timing': run['timing']
             }
             
+        except WorkflowValidationError as e:
+            return False, {
+                'error': 'Invalid workflow config',
+                'details': str(e)
+            }
         except Exception as e:
             return False, {
                 'error': 'Workflow execution error',
                 'details': str(e)
             }
     
+    def _build_workflow_steps(self, config: Dict[str, Any]) -> List[WorkflowStep]:
+        """
+        تبدیل تنظیمات workflow به مراحل DAG
+        
+        مراحل I/O-bound (api_call و delay) به صورت async روی event loop مشترک
+        و بقیه روی thread pool مشترک اجرا می‌شوند.
+        """
+        step_configs = config['steps']
+        has_edges = any('depends_on' in step for step in step_configs)
+        steps = []
+        
+        for index, step in enumerate(step_configs):
+            if has_edges:
+                depends_on = tuple(step.get('depends_on', ()))
+            else:
+                depends_on = (step_configs[index - 1]['name'],) if index > 0 else ()
+            
+            if step['type'] in self.ASYNC_STEP_TYPES:
+                func = self._make_async_step(step)
+            else:
+                func = self._make_sync_step(step)
+            
+            steps.append(WorkflowStep(
+                name=step['name'],
+                func=func,
+                depends_on=depends_on,
+                timeout=step.get('timeout', self.task_timeout),
+                retries=step.get('retries', 0),
+                retry_delay=step.get('retry_delay', 0.0),
+                continue_on_error=step.get('continue_on_error', False)
+            ))
+        
+        return steps
+    
+    def _make_sync_step(self, step: Dict[str, Any]) -> Callable:
+        """ساخت تابع مرحله sync"""
+        def run_step(context: Dict[str, Any], inputs) -> Tuple[bool, Dict[str, Any]]:
+            previous_results = [
+                {'step_name': name, 'success': True, 'result': result}
+                for name, result in inputs.items()
+            ]
+            return self._execute_workflow_step(step, context, previous_results)
+        return run_step
+    
+    def _make_async_step(self, step: Dict[str, Any]) -> Callable:
+        """ساخت تابع مرحله async برای مراحل I/O-bound"""
+        async def run_step(context: Dict[str, Any], inputs) -> Tuple[bool, Dict[str, Any]]:
+            params = step.get('params', {})
+            if step['type'] == 'delay':
+                return await self._execute_delay_step_async(params)
+            return await self._execute_api_call_step_async(params, context)
+        return run_step
+    
     def _execute_workflow_step(self, step: Dict[str, Any], context: Dict[str, Any], previous_results: List[Dict]) -> Tuple[bool, Dict[str, Any]]:
         """
         اجرای یک مرحله از workflow
@@ -485,6 +574,18 @@ class OrchestratorCore:
         time.sleep(delay_seconds)
         return True, {'delayed_seconds': delay_seconds}
     
+    async def _execute_api_call_step_async(self, params: Dict, context: Dict) -> Tuple[bool, Dict[str, Any]]:
+        """اجرای مرحله فراخوانی API در thread تا event loop مشترک مسدود نشود"""
+        return await run_to_completion(
+            asyncio.to_thread(self._execute_api_call_step, params, context)
+        )
+    
+    async def _execute_delay_step_async(self, params: Dict) -> Tuple[bool, Dict[str, Any]]:
+        """اجرای مرحله تاخیر بدون اشغال thread"""
+        delay_seconds = params.get('seconds', 1)
+        await asyncio.sleep(delay_seconds)
+        return True, {'delayed_seconds': delay_seconds}
+    
     def _generate_workflow_id(self) -> str:
         """تولید شناسه یکتا برای workflow"""
         import uuid
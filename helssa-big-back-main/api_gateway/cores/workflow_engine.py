@@ -0,0 +1,447 @@
+"""
+موتور اجرای workflow مبتنی بر DAG
+
+مراحل با یال‌های ``depends_on`` تعریف می‌شوند و هر مرحله‌ای که همه
+وابستگی‌هایش تمام شده باشد بلافاصله روی یک pool مشترک و ماندگار اجرا
+می‌شود. مراحل async (I/O-bound) روی یک event loop مشترک در thread جداگانه
+اجرا می‌شوند. timeout، تلاش مجدد و لغو برای هر مرحله پشتیبانی می‌شود و
+زمان‌بندی مسیر بحرانی (critical path) هر اجرا گزارش می‌شود.
+"""
+import asyncio
+import heapq
+import inspect
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkflowStep:
+    """
+    تعریف یک مرحله از workflow
+
+    Attributes:
+        name: نام یکتای مرحله
+        func: تابع sync یا async با امضای ``func(context, inputs) -> (success, result)``
+        depends_on: نام مراحلی که باید پیش از این مرحله تمام شوند
+        timeout: حداکثر زمان هر تلاش به ثانیه (None یعنی بدون محدودیت)
+        retries: تعداد تلاش مجدد پس از شکست
+        retry_delay: تاخیر پایه بین تلاش‌ها (به صورت نمایی افزایش می‌یابد)
+        continue_on_error: ادامه اجرای مراحل وابسته حتی در صورت شکست
+    """
+
+    name: str
+    func: Callable[..., Any]
+    depends_on: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    retries: int = 0
+    retry_delay: float = 0.0
+    continue_on_error: bool = False
+
+    @property
+    def is_async(self) -> bool:
+        """آیا مرحله I/O-bound و async است"""
+        return inspect.iscoroutinefunction(self.func)
+
+
+@dataclass
+class StepRun:
+    """
+    وضعیت اجرای یک مرحله
+
+    Attributes:
+        step: تعریف مرحله
+        status: pending, running, retrying, completed, failed, timeout, cancelled یا skipped
+        attempts: تعداد تلاش‌های انجام شده
+        result: نتیجه مرحله
+        error: پیام خطای آخرین تلاش
+        started_at: زمان شروع اولین تلاش (perf_counter)
+        finished_at: زمان پایان مرحله (perf_counter)
+        future: future تلاش جاری
+        deadline: مهلت تلاش جاری مرحله sync (perf_counter)؛ مراحل async با
+            ``asyncio.wait_for`` محدود می‌شوند و deadline ندارند
+    """
+
+    step: WorkflowStep
+    status: str = 'pending'
+    attempts: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    future: Optional[Future] = None
+    deadline: Optional[float] = None
+
+    @property
+    def duration(self) -> float:
+        """مدت اجرای مرحله (شامل تلاش‌های مجدد)"""
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+
+class WorkflowValidationError(ValueError):
+    """خطای تعریف DAG (وابستگی ناشناخته، نام تکراری یا چرخه)"""
+
+
+class WorkflowEngine:
+    """
+    زمان‌بند DAG روی pool مشترک
+
+    یک ``ThreadPoolExecutor`` و یک event loop در سطح پردازه بین همه
+    اجراها به اشتراک گذاشته می‌شوند تا هزینه ساخت pool در هر فراخوانی
+    حذف شود. نتایج مراحل بدون کپی و به صورت فقط‌خواندنی به مراحل وابسته
+    داده می‌شوند.
+    """
+
+    def __init__(self, executor: Optional[ThreadPoolExecutor] = None, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.logger = logging.getLogger(__name__)
+        self._executor = executor
+        self._loop = loop
+        self.cancel_poll_interval = getattr(settings, 'API_GATEWAY_WORKFLOW_CANCEL_POLL_INTERVAL', 0.1)
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        return self._executor or get_shared_executor()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop or get_shared_loop()
+
+    def run(
+        self,
+        steps: List[WorkflowStep],
+        context: Optional[Dict[str, Any]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        max_parallel: Optional[int] = None,
+        on_step_start: Optional[Callable[[str], None]] = None,
+        on_step_finish: Optional[Callable[[StepRun], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        اجرای یک DAG
+
+        Args:
+            steps: مراحل workflow
+            context: context مشترک (بدون کپی به مراحل داده می‌شود)
+            cancel_event: رویداد لغو؛ با set شدن، مراحل جدید زمان‌بندی نمی‌شوند
+            max_parallel: حداکثر مراحل همزمان در این اجرا
+            on_step_start: callback شروع مرحله
+            on_step_finish: callback پایان مرحله
+
+        Returns:
+            Dict[str, Any]: وضعیت نهایی، نتایج مراحل و گزارش زمان‌بندی
+        """
+        self.validate(steps)
+        context = context if context is not None else {}
+        cancel_event = cancel_event or threading.Event()
+        max_parallel = max_parallel or len(steps)
+
+        runs: Dict[str, StepRun] = {step.name: StepRun(step=step) for step in steps}
+        dependents: Dict[str, List[str]] = {step.name: [] for step in steps}
+        waiting: Dict[str, int] = {}
+        for step in steps:
+            waiting[step.name] = len(step.depends_on)
+            for dependency in step.depends_on:
+                dependents[dependency].append(step.name)
+
+        # صف مراحل آماده به ترتیب تعریف
+        order = {step.name: index for index, step in enumerate(steps)}
+        ready: List[Tuple[int, str]] = [(order[name], name) for name, count in waiting.items() if count == 0]
+        heapq.heapify(ready)
+        retry_heap: List[Tuple[float, str]] = []
+        in_flight: Dict[Future, str] = {}
+        # تلاش‌های sync که از deadline گذشته‌اند ولی thread آن‌ها هنوز در حال اجراست
+        abandoned: Dict[Future, str] = {}
+        results: Dict[str, Dict[str, Any]] = {}
+        failed: Optional[str] = None
+        started = time.perf_counter()
+
+        def release_dependents(name: str):
+            for dependent in dependents[name]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0 and runs[dependent].status == 'pending':
+                    heapq.heappush(ready, (order[dependent], dependent))
+
+        def finish(run: StepRun, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+            nonlocal failed
+            run.status = status
+            run.result = result
+            run.error = error
+            run.finished_at = time.perf_counter()
+            run.future = None
+            if status == 'completed':
+                results[run.step.name] = result
+            if on_step_finish:
+                on_step_finish(run)
+
+            if status == 'completed' or run.step.continue_on_error:
+                release_dependents(run.step.name)
+            elif failed is None:
+                failed = run.step.name
+
+        def schedule_retry(run: StepRun):
+            delay = run.step.retry_delay * (2 ** (run.attempts - 1))
+            heapq.heappush(retry_heap, (time.perf_counter() + delay, run.step.name))
+
+        def retry_or_fail(run: StepRun, status: str, error: str, running: Optional[Future] = None):
+            if run.attempts <= run.step.retries and not cancel_event.is_set():
+                run.status = 'retrying'
+                run.future = None
+                if running is not None and not running.done():
+                    # thread قابل قطع نیست؛ تلاش بعدی پس از بازگشت تلاش قبلی زمان‌بندی می‌شود
+                    abandoned[running] = run.step.name
+                else:
+                    schedule_retry(run)
+                self.logger.warning(
+                    'Workflow step retry scheduled',
+                    extra={'step_name': run.step.name, 'attempt': run.attempts, 'error': error}
+                )
+            else:
+                finish(run, status, error=error)
+
+        def submit(name: str):
+            run = runs[name]
+            step = run.step
+            inputs = MappingProxyType({dependency: results.get(dependency) for dependency in step.depends_on})
+
+            run.attempts += 1
+            run.status = 'running'
+            if run.started_at is None:
+                run.started_at = time.perf_counter()
+                if on_step_start:
+                    on_step_start(name)
+
+            if step.is_async:
+                coroutine = step.func(context, inputs)
+                if step.timeout:
+                    coroutine = asyncio.wait_for(coroutine, step.timeout)
+                future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+            else:
+                future = self.executor.submit(step.func, context, inputs)
+
+            run.future = future
+            run.deadline = time.perf_counter() + step.timeout if step.timeout and not step.is_async else None
+            in_flight[future] = name
+
+        while True:
+            if cancel_event.is_set() or failed is not None:
+                for future, name in list(in_flight.items()):
+                    future.cancel()
+                    runs[name].status = 'cancelled'
+                    runs[name].finished_at = time.perf_counter()
+                in_flight.clear()
+                abandoned.clear()
+                break
+
+            now = time.perf_counter()
+            while retry_heap and retry_heap[0][0] <= now:
+                _, name = heapq.heappop(retry_heap)
+                heapq.heappush(ready, (order[name], name))
+
+            while ready and len(in_flight) < max_parallel:
+                _, name = heapq.heappop(ready)
+                submit(name)
+
+            if not in_flight and not abandoned:
+                if retry_heap:
+                    cancel_event.wait(max(retry_heap[0][0] - time.perf_counter(), 0))
+                    continue
+                break
+
+            # انتظار در بازه‌های کوتاه تا لغو بدون منتظر ماندن برای مراحل در حال اجرا دیده شود
+            wake_times = [runs[name].deadline for name in in_flight.values() if runs[name].deadline]
+            if retry_heap:
+                wake_times.append(retry_heap[0][0])
+            timeout = self.cancel_poll_interval
+            if wake_times:
+                timeout = min(max(min(wake_times) - time.perf_counter(), 0), timeout)
+
+            done, _ = wait(list(in_flight) + list(abandoned), timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                if future in abandoned:
+                    # نتیجه تلاش منقضی شده نادیده گرفته می‌شود
+                    schedule_retry(runs[abandoned.pop(future)])
+                    continue
+
+                name = in_flight.pop(future)
+                run = runs[name]
+                try:
+                    success, result = future.result()
+                except (asyncio.TimeoutError, TimeoutError):
+                    retry_or_fail(run, 'timeout', f"Step timed out after {run.step.timeout}s")
+                    continue
+                except Exception as e:
+                    retry_or_fail(run, 'failed', str(e))
+                    continue
+
+                if success:
+                    finish(run, 'completed', result=result)
+                    continue
+
+                error = result.get('error') if isinstance(result, dict) else str(result)
+                if run.attempts <= run.step.retries and not cancel_event.is_set():
+                    retry_or_fail(run, 'failed', error)
+                else:
+                    finish(run, 'failed', result=result, error=error)
+
+            # مراحل sync که از deadline گذشته‌اند (thread قابل قطع نیست؛ نتیجه نادیده گرفته می‌شود)
+            now = time.perf_counter()
+            for future, name in list(in_flight.items()):
+                run = runs[name]
+                if run.deadline and now >= run.deadline:
+                    future.cancel()
+                    del in_flight[future]
+                    retry_or_fail(run, 'timeout', f"Step timed out after {run.step.timeout}s", running=future)
+
+        wall_clock = time.perf_counter() - started
+
+        for run in runs.values():
+            if run.status in ('pending', 'retrying'):
+                run.status = 'cancelled' if cancel_event.is_set() else 'skipped'
+
+        if cancel_event.is_set():
+            status = 'cancelled'
+        elif failed is not None:
+            status = 'failed'
+        else:
+            status = 'completed'
+
+        return {
+            'status': status,
+            'failed_step': failed,
+            'results': results,
+            'steps': {
+                name: {
+                    'status': run.status,
+                    'attempts': run.attempts,
+                    'duration': round(run.duration, 6),
+                    'result': run.result,
+                    'error': run.error,
+                }
+                for name, run in runs.items()
+            },
+            'timing': self.critical_path(runs, started, wall_clock),
+        }
+
+    def validate(self, steps: List[WorkflowStep]):
+        """
+        اعتبارسنجی DAG با مرتب‌سازی توپولوژیک (Kahn)
+
+        Raises:
+            WorkflowValidationError: نام تکراری، وابستگی ناشناخته یا چرخه
+        """
+        names = [step.name for step in steps]
+        if len(names) != len(set(names)):
+            raise WorkflowValidationError('Duplicate step names in workflow')
+
+        known = set(names)
+        indegree = {}
+        children: Dict[str, List[str]] = {name: [] for name in names}
+        for step in steps:
+            for dependency in step.depends_on:
+                if dependency not in known:
+                    raise WorkflowValidationError(f"Step '{step.name}' depends on unknown step '{dependency}'")
+                children[dependency].append(step.name)
+            indegree[step.name] = len(step.depends_on)
+
+        queue = [name for name, count in indegree.items() if count == 0]
+        visited = 0
+        while queue:
+            name = queue.pop()
+            visited += 1
+            for child in children[name]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    queue.append(child)
+
+        if visited != len(steps):
+            raise WorkflowValidationError('Workflow contains a dependency cycle')
+
+    def critical_path(self, runs: Dict[str, StepRun], started: float, wall_clock: float) -> Dict[str, Any]:
+        """
+        محاسبه مسیر بحرانی اجرا
+
+        از مرحله‌ای که دیرتر از همه تمام شده شروع می‌کند و در هر گام به
+        وابستگی‌ای برمی‌گردد که دیرتر از بقیه تمام شده است.
+        """
+        finished = [run for run in runs.values() if run.finished_at is not None]
+        serial_time = sum(run.duration for run in finished)
+
+        path: List[str] = []
+        current = max(finished, key=lambda run: run.finished_at, default=None)
+        while current is not None:
+            path.append(current.step.name)
+            predecessors = [
+                runs[dependency] for dependency in current.step.depends_on
+                if runs[dependency].finished_at is not None
+            ]
+            current = max(predecessors, key=lambda run: run.finished_at, default=None)
+        path.reverse()
+
+        return {
+            'wall_clock': round(wall_clock, 6),
+            'serial_time': round(serial_time, 6),
+            'critical_path': path,
+            'critical_path_time': round(sum(runs[name].duration for name in path), 6),
+            'speedup': round(serial_time / wall_clock, 2) if wall_clock > 0 else None,
+        }
+
+
+_shared_executor: Optional[ThreadPoolExecutor] = None
+_shared_loop: Optional[asyncio.AbstractEventLoop] = None
+_shared_lock = threading.Lock()
+
+
+async def run_to_completion(awaitable: Awaitable[Any]) -> Any:
+    """
+    انتظار برای awaitable حتی پس از لغو مرحله async
+
+    کاری که با ``asyncio.to_thread`` به thread سپرده شده با لغو coroutine
+    (مثلاً timeout در ``asyncio.wait_for``) متوقف نمی‌شود؛ این تابع لغو را
+    تا پایان آن کار به تعویق می‌اندازد تا تلاش مجدد مرحله همزمان با تلاش
+    قبلی اجرا نشود.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        await asyncio.wait([task])
+        raise
+
+
+def get_shared_executor() -> ThreadPoolExecutor:
+    """pool مشترک و ماندگار برای مراحل sync"""
+    global _shared_executor
+    if _shared_executor is None:
+        with _shared_lock:
+            if _shared_executor is None:
+                _shared_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'API_GATEWAY_WORKFLOW_POOL_SIZE', 32),
+                    thread_name_prefix='workflow-step'
+                )
+    return _shared_executor
+
+
+def get_shared_loop() -> asyncio.AbstractEventLoop:
+    """event loop مشترک در یک thread پس‌زمینه برای مراحل async"""
+    global _shared_loop
+    if _shared_loop is None:
+        with _shared_lock:
+            if _shared_loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name='workflow-io-loop', daemon=True
+                )
+                thread.start()
+                _shared_loop = loop
+    return _shared_loop
@@ -185,8 +185,9 @@ class APIRequest(models.Model):
         verbose_name='پیام خطا'
     )
     
+    # زمان دریافت در خط لوله لاگ تعیین می‌شود (نه زمان نوشتن batch)
     created_at = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
         verbose_name='زمان دریافت'
     )
     
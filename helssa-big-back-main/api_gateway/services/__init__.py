@@ -6,8 +6,12 @@
 
 from .core_service import APIGatewayService
 from .helpers import GatewayHelpers
+from .rate_limiter import RateLimiter, RateLimitPolicy, get_rate_limiter
 
 __all__ = [
     'APIGatewayService',
-    'GatewayHelpers'
+    'GatewayHelpers',
+    'RateLimiter',
+    'RateLimitPolicy',
+    'get_rate_limiter'
 ]
\ No newline at end of file
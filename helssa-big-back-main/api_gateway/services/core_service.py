@@ -9,8 +9,9 @@ from django.contrib.auth import get_user_model
 from rest_framework.request import Request
 
 from ..cores import APIIngressCore, TextProcessorCore, SpeechProcessorCore, OrchestratorCore
-from ..models import APIRequest, Workflow, RateLimitTracker
+from ..models import Workflow, RateLimitTracker
 from .helpers import GatewayHelpers
+from .request_log import RequestLogEntry, RequestStats
 
 
 User = get_user_model()
@@ -32,10 +33,10 @@ class APIGatewayService:
         self.speech_processor = SpeechProcessorCore()
         self.orchestrator = OrchestratorCore()
         self.helpers = GatewayHelpers()
+        self.request_stats = RequestStats()
         
         # تنظیمات rate limiting
         self.rate_limit_enabled = getattr(settings, 'API_GATEWAY_RATE_LIMIT_ENABLED', True)
-        self.default_rate_limit = getattr(settings, 'API_GATEWAY_DEFAULT_RATE_LIMIT', 100)  # per hour
         
     def process_request(self, request: Request) -> Tuple[bool, Dict[str, Any]]:
         """
@@ -50,7 +51,7 @@ class APIGatewayService:
         api_request = None
         
         try:
-            # ایجاد لاگ درخواست
+            # ایجاد لاگ درخواست (در حافظه؛ فقط یک رکورد در پایان نوشته می‌شود)
             api_request = self._create_api_request_log(request)
             
             # مرحله 1: API Ingress - اعتبارسنجی اولیه
@@ -77,9 +78,7 @@ class APIGatewayService:
             
             # مرحله 4: تشخیص نوع پردازش مورد نیاز
             processor_type, routing_config = self.ingress_core.route_request(request, metadata)
-            api_request.processor_type = processor_type
-            api_request.status = 'processing'
-            api_request.save()
+            api_request.mark_processing(processor_type)
             
             # مرحله 5: انجام پردازش اصلی
             processing_result = self._execute_processing(
@@ -93,14 +92,14 @@ class APIGatewayService:
                     response_body=processing_result[1]
                 )
                 
-                self.logger.info(
-                    'Request processed successfully',
-                    extra={
-                        'request_id': str(api_request.id),
-                        'processor_type': processor_type,
-                        'processing_time': api_request.processing_time
-                    }
-                )
+                log_extra = {
+                    'processor_type': processor_type,
+                    'processing_time': api_request.processing_time
+                }
+                if api_request.queued:
+                    # شناسه فقط برای رکوردهایی که ذخیره می‌شوند قابل پیگیری است
+                    log_extra['request_id'] = str(api_request.id)
+                self.logger.info('Request processed successfully', extra=log_extra)
                 
                 return True, processing_result[1]
             else:
@@ -428,46 +427,44 @@ class APIGatewayService:
                 'timestamp': timezone.now().isoformat()
             }
     
-    def _create_api_request_log(self, request: Request) -> APIRequest:
-        """ایجاد لاگ درخواست API"""
+    def _create_api_request_log(self, request: Request) -> RequestLogEntry:
+        """
+        ایجاد لاگ درخواست API
+        
+        رکورد در حافظه ساخته می‌شود و در mark_completed/mark_failed یک‌بار
+        به خط لوله لاگ (bulk_create پس‌زمینه) ارسال می‌شود.
+        """
         try:
-            # استخراج IP
-            ip_address = self.helpers.get_client_ip(request)
-            
-            # ایجاد رکورد
-            api_request = APIRequest.objects.create(
+            return RequestLogEntry(
                 user=request.user if request.user.is_authenticated else None,
                 method=request.method,
                 path=request.path,
-                ip_address=ip_address,
+                ip_address=self.helpers.get_client_ip(request),
                 user_agent=request.META.get('HTTP_USER_AGENT', ''),
                 request_headers=self._extract_safe_headers(request),
                 request_body=self._extract_safe_body(request)
             )
             
-            return api_request
-            
         except Exception as e:
             self.logger.error(f"Failed to create API request log: {str(e)}")
-            # در صورت خطا، یک instance ساختگی برمی‌گردانیم
-            return APIRequest(
+            return RequestLogEntry(
                 method=request.method,
                 path=request.path,
                 ip_address='unknown'
             )
     
-    def _check_rate_limit(self, request: Request, api_request: APIRequest) -> Tuple[bool, Dict[str, Any]]:
+    def _check_rate_limit(self, request: Request, api_request: RequestLogEntry) -> Tuple[bool, Dict[str, Any]]:
         """بررسی محدودیت نرخ درخواست"""
         try:
             user = request.user if request.user.is_authenticated else None
             ip_address = self.helpers.get_client_ip(request)
             endpoint = request.path
             
+            # حد مجاز از سیاست‌های RATE_LIMIT_POLICIES تعیین می‌شود
             return self.helpers.check_rate_limit(
                 user=user,
                 ip_address=ip_address,
-                endpoint=endpoint,
-                limit=self.default_rate_limit
+                endpoint=endpoint
             )
             
         except Exception as e:
@@ -584,22 +581,15 @@ class APIGatewayService:
         return {}
     
     def _get_requests_count_today(self) -> int:
-        """دریافت تعداد درخواست‌های امروز"""
-        from datetime import date
+        """دریافت تعداد درخواست‌های امروز (از شمارنده‌های cache)"""
         try:
-            return APIRequest.objects.filter(
-                created_at__date=date.today()
-            ).count()
+            return self.request_stats.requests_today()
         except Exception:
             return 0
     
     def _get_average_response_time(self) -> float:
-        """دریافت میانگین زمان پاسخ"""
+        """دریافت میانگین زمان پاسخ امروز (از شمارنده‌های cache)"""
         try:
-            from django.db.models import Avg
-            result = APIRequest.objects.filter(
-                processing_time__isnull=False
-            ).aggregate(avg_time=Avg('processing_time'))
-            return result['avg_time'] or 0
+            return self.request_stats.average_response_time()
         except Exception:
             return 0
\ No newline at end of file
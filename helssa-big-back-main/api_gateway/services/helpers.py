@@ -2,14 +2,15 @@
 Helper functions برای API Gateway
 """
 import logging
+from dataclasses import replace
 from typing import Dict, Tuple, Any, Optional
 from datetime import datetime, timedelta
 from django.utils import timezone
-from django.core.cache import cache
 from django.conf import settings
 from rest_framework.request import Request
 
 from ..models import RateLimitTracker
+from .rate_limiter import get_rate_limiter
 
 
 logger = logging.getLogger(__name__)
@@ -60,16 +61,19 @@ class GatewayHelpers:
             self.logger.error(f"Error extracting client IP: {str(e)}")
             return 'unknown'
     
-    def check_rate_limit(self, user, ip_address: str, endpoint: str, limit: int = 100, window_minutes: int = 60) -> Tuple[bool, Dict[str, Any]]:
+    def check_rate_limit(self, user, ip_address: str, endpoint: str, limit: Optional[int] = None, window_minutes: Optional[int] = None) -> Tuple[bool, Dict[str, Any]]:
         """
         بررسی محدودیت نرخ درخواست
         
+        سیاست از تعاریف اعلانی RATE_LIMIT_POLICIES (گروه gateway) انتخاب
+        و با محدودکننده مشترک (سطل توکن محلی + پنجره لغزان اتمیک) بررسی می‌شود.
+        
         Args:
             user: کاربر (می‌تواند None باشد)
             ip_address: آدرس IP
             endpoint: نقطه پایانی
-            limit: حد مجاز درخواست در بازه زمانی
-            window_minutes: بازه زمانی به دقیقه
+            limit: بازنویسی حد مجاز سیاست (اختیاری)
+            window_minutes: بازنویسی بازه زمانی سیاست به دقیقه (اختیاری)
             
         Returns:
             Tuple[bool, Dict[str, Any]]: (مجاز بودن، اطلاعات)
@@ -78,75 +82,36 @@ class GatewayHelpers:
             if not getattr(settings, 'API_GATEWAY_RATE_LIMIT_ENABLED', True):
                 return True, {'rate_limit': 'disabled'}
             
-            window_start = timezone.now() - timedelta(minutes=window_minutes)
+            limiter = get_rate_limiter()
+            policy = limiter.resolve_policy('gateway', endpoint, user)
+            if policy is None:
+                return True, {'rate_limit': 'no_policy'}
             
-            # کلید cache برای سرعت بیشتر
-            cache_key = f"rate_limit:{user.id if user else 'anon'}:{ip_address}:{endpoint}"
+            if limit is not None or window_minutes is not None:
+                policy = replace(
+                    policy,
+                    limit=limit if limit is not None else policy.limit,
+                    window=window_minutes * 60 if window_minutes is not None else policy.window
+                )
             
-            # بررسی cache
-            cached_count = cache.get(cache_key)
-            if cached_count is not None:
-                if cached_count >= limit:
-                    return False, {
-                        'error': 'Rate limit exceeded',
-                        'message': 'تعداد درخواست‌ها بیش از حد مجاز است',
-                        'limit': limit,
-                        'window_minutes': window_minutes,
-                        'retry_after': window_minutes * 60
-                    }
-                
-                # افزایش شمارنده
-                cache.set(cache_key, cached_count + 1, window_minutes * 60)
-                
-                return True, {
-                    'requests_count': cached_count + 1,
-                    'limit': limit,
-                    'remaining': limit - (cached_count + 1)
-                }
+            decision = limiter.check_request(
+                'gateway', endpoint, user=user, ip_address=ip_address, policy=policy
+            )
             
-            # اگر در cache نبود، از دیتابیس بررسی کن
-            if user:
-                tracker, created = RateLimitTracker.objects.get_or_create(
-                    user=user,
-                    ip_address=ip_address,
-                    endpoint=endpoint,
-                    window_start__gte=window_start,
-                    defaults={
-                        'request_count': 1,
-                        'window_start': timezone.now()
-                    }
-                )
-                
-                if not created:
-                    if tracker.request_count >= limit:
-                        return False, {
-                            'error': 'Rate limit exceeded',
-                            'message': 'تعداد درخواست‌ها بیش از حد مجاز است',
-                            'limit': limit,
-                            'window_minutes': window_minutes,
-                            'retry_after': window_minutes * 60
-                        }
-                    
-                    tracker.request_count += 1
-                    tracker.save()
-                
-                # ذخیره در cache
-                cache.set(cache_key, tracker.request_count, window_minutes * 60)
-                
-                return True, {
-                    'requests_count': tracker.request_count,
-                    'limit': limit,
-                    'remaining': limit - tracker.request_count
-                }
-            else:
-                # برای کاربران ناشناس از cache استفاده کن
-                cache.set(cache_key, 1, window_minutes * 60)
-                
-                return True, {
-                    'requests_count': 1,
-                    'limit': limit,
-                    'remaining': limit - 1
+            if not decision.allowed:
+                return False, {
+                    'error': 'Rate limit exceeded',
+                    'message': 'تعداد درخواست‌ها بیش از حد مجاز است',
+                    'limit': decision.limit,
+                    'window_minutes': policy.window // 60,
+                    'retry_after': decision.retry_after
                 }
+            
+            return True, {
+                'requests_count': decision.limit - decision.remaining,
+                'limit': decision.limit,
+                'remaining': decision.remaining
+            }
                 
         except Exception as e:
             self.logger.error(f"Rate limit check error: {str(e)}")
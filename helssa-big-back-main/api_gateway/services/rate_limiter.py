@@ -0,0 +1,442 @@
+"""
+محدودسازی نرخ درخواست مشترک (Shared Rate Limiter)
+
+این ماژول محدودسازی نرخ را در دو لایه انجام می‌دهد:
+
+1. سطل توکن محلی (in-process token bucket) که انفجار درخواست‌ها را
+   پیش از رسیدن به Redis جذب می‌کند.
+2. پنجره لغزان مبتنی بر لاگ در Redis که با یک اسکریپت Lua به صورت
+   اتمیک و در یک رفت‌وبرگشت بررسی و ثبت می‌شود.
+
+سیاست‌ها به صورت اعلانی در ``api_gateway.settings.RATE_LIMIT_POLICIES``
+(یا ``settings.API_GATEWAY_RATE_LIMIT_POLICIES``) تعریف می‌شوند و هم
+API Gateway و هم middleware چت‌بات از همین ماژول استفاده می‌کنند.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from helssa.shared_backends import ProcessSingleton, get_shared_redis_connection
+
+
+logger = logging.getLogger(__name__)
+
+
+# اسکریپت پنجره لغزان: حذف ورودی‌های قدیمی، شمارش، ثبت و تعیین TTL
+# در یک فراخوانی اتمیک. زمان از ساعت خود Redis خوانده می‌شود تا
+# اختلاف ساعت بین سرورها روی دقت اثر نگذارد.
+SLIDING_WINDOW_LUA = """
+local key = KEYS[1]
+local window = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local member = ARGV[3]
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', key, 0, now - window)
+local count = redis.call('ZCARD', key)
+if count < limit then
+    redis.call('ZADD', key, now, member)
+    redis.call('PEXPIRE', key, window)
+    return {1, count + 1, 0}
+end
+local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+local retry_after = window
+if oldest[2] then
+    retry_after = tonumber(oldest[2]) + window - now
+end
+return {0, count, retry_after}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """
+    سیاست محدودسازی نرخ
+
+    Attributes:
+        name: نام یکتای سیاست
+        limit: حداکثر درخواست مجاز در پنجره
+        window: طول پنجره به ثانیه
+        group: گروه مصرف‌کننده (مثلا gateway یا chatbot)
+        scope: کلید شمارش (user، ip یا user_ip)
+        paths: الگوهای مسیر؛ خالی یعنی همه مسیرها
+        roles: نوع کاربرانی که سیاست برایشان اعمال می‌شود
+        authenticated: محدود به کاربران احراز هویت شده/نشده (None یعنی هر دو)
+        per_endpoint: شمارش جداگانه برای هر مسیر
+        burst: ظرفیت سطل توکن محلی (پیش‌فرض برابر limit)
+        description: توضیح فارسی برای پیام خطا
+    """
+
+    name: str
+    limit: int
+    window: int
+    group: str = 'gateway'
+    scope: str = 'user'
+    paths: Tuple[str, ...] = ()
+    roles: Tuple[str, ...] = ()
+    authenticated: Optional[bool] = None
+    per_endpoint: bool = False
+    burst: Optional[int] = None
+    description: str = ''
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RateLimitPolicy':
+        """ساخت سیاست از تعریف اعلانی"""
+        return cls(
+            name=data['name'],
+            limit=int(data['limit']),
+            window=int(data['window']),
+            group=data.get('group', 'gateway'),
+            scope=data.get('scope', 'user'),
+            paths=tuple(data.get('paths', ())),
+            roles=tuple(data.get('roles', ())),
+            authenticated=data.get('authenticated'),
+            per_endpoint=bool(data.get('per_endpoint', False)),
+            burst=data.get('burst'),
+            description=data.get('description', ''),
+        )
+
+    def matches(self, group: str, path: str, user=None) -> bool:
+        """بررسی انطباق سیاست با درخواست"""
+        if self.group != group:
+            return False
+
+        is_authenticated = bool(user is not None and getattr(user, 'is_authenticated', False))
+        if self.authenticated is not None and self.authenticated != is_authenticated:
+            return False
+
+        if self.roles:
+            if not is_authenticated or getattr(user, 'user_type', None) not in self.roles:
+                return False
+
+        if self.paths and not any(pattern in path for pattern in self.paths):
+            return False
+
+        return True
+
+    def build_key(self, path: str, user=None, ip_address: str = 'unknown') -> str:
+        """ساخت کلید شمارنده بر اساس scope سیاست"""
+        user_part = str(user.id) if user is not None and getattr(user, 'is_authenticated', False) else 'anon'
+
+        if self.scope == 'ip':
+            identity = f"ip:{ip_address}"
+        elif self.scope == 'user_ip':
+            identity = f"user:{user_part}:ip:{ip_address}"
+        else:
+            identity = f"user:{user_part}"
+
+        key = f"ratelimit:{self.group}:{self.name}:{identity}"
+        if self.per_endpoint:
+            key = f"{key}:{path}"
+        return key
+
+
+@dataclass
+class RateLimitDecision:
+    """نتیجه بررسی محدودیت نرخ"""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: int = 0
+    policy: Optional[RateLimitPolicy] = None
+    source: str = 'backend'
+
+    def to_dict(self) -> Dict[str, Any]:
+        """تبدیل به dictionary برای پاسخ API"""
+        data = {
+            'limit': self.limit,
+            'remaining': self.remaining,
+            'window_seconds': self.policy.window if self.policy else None,
+            'policy': self.policy.name if self.policy else None,
+        }
+        if not self.allowed:
+            data['retry_after'] = self.retry_after
+        return data
+
+
+class LocalTokenBucket:
+    """
+    سطل توکن محلی (درون پردازه)
+
+    هر کلید یک سطل با ظرفیت ``capacity`` دارد که با نرخ
+    ``capacity / window`` پر می‌شود. وقتی سطل خالی است درخواست بدون
+    رفتن به Redis رد می‌شود؛ در غیر این صورت تصمیم نهایی با backend است.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._max_keys = max_keys
+
+    def consume(self, key: str, capacity: int, window: int) -> Tuple[bool, float]:
+        """
+        برداشتن یک توکن از سطل
+
+        Returns:
+            Tuple[bool, float]: (موفقیت، ثانیه تا توکن بعدی)
+        """
+        rate = capacity / float(window)
+        now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self._max_keys:
+                    self._evict(now)
+                bucket = [float(capacity), now]
+                self._buckets[key] = bucket
+
+            tokens = min(float(capacity), bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+            if tokens >= 1.0:
+                bucket[0] = tokens - 1.0
+                return True, 0.0
+
+            bucket[0] = tokens
+            return False, (1.0 - tokens) / rate
+
+    def _evict(self, now: float):
+        """حذف سطل‌هایی که به مدت طولانی استفاده نشده‌اند"""
+        oldest = sorted(self._buckets.items(), key=lambda item: item[1][1])
+        for key, _ in oldest[: max(1, len(oldest) // 10)]:
+            del self._buckets[key]
+
+    def clear(self):
+        """پاکسازی همه سطل‌ها"""
+        with self._lock:
+            self._buckets.clear()
+
+
+class InProcessSlidingWindowBackend:
+    """
+    پنجره لغزان درون پردازه
+
+    برای محیط‌هایی که Redis پیکربندی نشده است (توسعه و تست).
+    بررسی و ثبت زیر یک lock انجام می‌شود و بنابراین در یک پردازه دقیق است.
+    """
+
+    name = 'memory'
+
+    def __init__(self):
+        self._logs: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window: int) -> Tuple[bool, int, int]:
+        """
+        ثبت یک درخواست
+
+        Returns:
+            Tuple[bool, int, int]: (مجاز بودن، تعداد در پنجره، میلی‌ثانیه تا تلاش مجدد)
+        """
+        now = time.monotonic()
+        window_start = now - window
+
+        with self._lock:
+            log = self._logs.setdefault(key, deque())
+            while log and log[0] <= window_start:
+                log.popleft()
+
+            if len(log) < limit:
+                log.append(now)
+                return True, len(log), 0
+
+            retry_after_ms = int((log[0] + window - now) * 1000)
+            return False, len(log), max(retry_after_ms, 0)
+
+    def clear(self):
+        """پاکسازی همه شمارنده‌ها"""
+        with self._lock:
+            self._logs.clear()
+
+
+class RedisSlidingWindowBackend:
+    """
+    پنجره لغزان مبتنی بر Redis
+
+    هر بررسی یک فراخوانی EVALSHA است که حذف ورودی‌های منقضی، شمارش،
+    ثبت و تعیین TTL را به صورت اتمیک انجام می‌دهد.
+    """
+
+    name = 'redis'
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._script = connection.register_script(SLIDING_WINDOW_LUA)
+
+    def hit(self, key: str, limit: int, window: int) -> Tuple[bool, int, int]:
+        """
+        ثبت یک درخواست
+
+        Returns:
+            Tuple[bool, int, int]: (مجاز بودن، تعداد در پنجره، میلی‌ثانیه تا تلاش مجدد)
+        """
+        allowed, count, retry_after_ms = self._script(
+            keys=[key],
+            args=[window * 1000, limit, uuid.uuid4().hex],
+        )
+        return bool(allowed), int(count), int(retry_after_ms)
+
+
+class RateLimiter:
+    """
+    محدودکننده نرخ دولایه
+
+    ابتدا سطل توکن محلی بررسی می‌شود و در صورت عبور، پنجره لغزان
+    backend (Redis یا درون پردازه) تصمیم نهایی را می‌گیرد.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[List[RateLimitPolicy]] = None,
+        backend=None,
+        local_bucket: Optional[LocalTokenBucket] = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.policies = policies if policies is not None else load_policies()
+        self.backend = backend if backend is not None else build_backend()
+        self.local_bucket = local_bucket if local_bucket is not None else LocalTokenBucket()
+
+    def resolve_policy(self, group: str, path: str, user=None) -> Optional[RateLimitPolicy]:
+        """
+        انتخاب اولین سیاست منطبق با درخواست
+
+        Args:
+            group: گروه مصرف‌کننده
+            path: مسیر درخواست
+            user: کاربر (می‌تواند None باشد)
+
+        Returns:
+            Optional[RateLimitPolicy]: سیاست منطبق یا None
+        """
+        for policy in self.policies:
+            if policy.matches(group, path, user):
+                return policy
+        return None
+
+    def check(self, key: str, policy: RateLimitPolicy) -> RateLimitDecision:
+        """
+        بررسی و ثبت یک درخواست برای کلید مشخص
+
+        Args:
+            key: کلید شمارنده
+            policy: سیاست محدودسازی
+
+        Returns:
+            RateLimitDecision: نتیجه بررسی
+        """
+        capacity = policy.burst or policy.limit
+        allowed, wait_seconds = self.local_bucket.consume(key, capacity, policy.window)
+        if not allowed:
+            return RateLimitDecision(
+                allowed=False,
+                limit=policy.limit,
+                remaining=0,
+                retry_after=max(int(wait_seconds) + 1, 1),
+                policy=policy,
+                source='local',
+            )
+
+        try:
+            allowed, count, retry_after_ms = self.backend.hit(key, policy.limit, policy.window)
+        except Exception as e:
+            # در صورت خطای backend، اجازه ادامه می‌دهیم
+            self.logger.error(f"Rate limit backend error: {str(e)}")
+            return RateLimitDecision(
+                allowed=True,
+                limit=policy.limit,
+                remaining=policy.limit,
+                policy=policy,
+                source='fail_open',
+            )
+
+        return RateLimitDecision(
+            allowed=allowed,
+            limit=policy.limit,
+            remaining=max(policy.limit - count, 0),
+            retry_after=0 if allowed else max((retry_after_ms + 999) // 1000, 1),
+            policy=policy,
+            source=self.backend.name,
+        )
+
+    def check_request(
+        self,
+        group: str,
+        path: str,
+        user=None,
+        ip_address: str = 'unknown',
+        policy: Optional[RateLimitPolicy] = None,
+    ) -> Optional[RateLimitDecision]:
+        """
+        بررسی محدودیت برای یک درخواست
+
+        Args:
+            group: گروه مصرف‌کننده
+            path: مسیر درخواست
+            user: کاربر (می‌تواند None باشد)
+            ip_address: آدرس IP کلاینت
+            policy: سیاست صریح (در غیر این صورت از تعاریف انتخاب می‌شود)
+
+        Returns:
+            Optional[RateLimitDecision]: نتیجه یا None اگر سیاستی منطبق نباشد
+        """
+        policy = policy or self.resolve_policy(group, path, user)
+        if policy is None:
+            return None
+
+        key = policy.build_key(path, user, ip_address)
+        return self.check(key, policy)
+
+    def reset(self):
+        """پاکسازی شمارنده‌های محلی (برای تست)"""
+        self.local_bucket.clear()
+        if hasattr(self.backend, 'clear'):
+            self.backend.clear()
+
+
+def load_policies() -> List[RateLimitPolicy]:
+    """
+    بارگذاری سیاست‌ها از تنظیمات
+
+    ``settings.API_GATEWAY_RATE_LIMIT_POLICIES`` در صورت وجود بر
+    تعاریف پیش‌فرض ``api_gateway.settings.RATE_LIMIT_POLICIES`` مقدم است.
+    """
+    definitions = getattr(settings, 'API_GATEWAY_RATE_LIMIT_POLICIES', None)
+    if definitions is None:
+        from ..settings import RATE_LIMIT_POLICIES
+        definitions = RATE_LIMIT_POLICIES
+
+    return [RateLimitPolicy.from_dict(definition) for definition in definitions]
+
+
+def build_backend():
+    """
+    انتخاب backend شمارش
+
+    اگر cache پیش‌فرض Redis باشد از اسکریپت Lua استفاده می‌شود و در غیر
+    این صورت پنجره لغزان درون پردازه.
+    """
+    connection = get_shared_redis_connection('rate limiter')
+    if connection is not None:
+        return RedisSlidingWindowBackend(connection)
+    return InProcessSlidingWindowBackend()
+
+
+_rate_limiter: ProcessSingleton[RateLimiter] = ProcessSingleton(RateLimiter)
+
+
+def get_rate_limiter() -> RateLimiter:
+    """دریافت نمونه مشترک محدودکننده نرخ در پردازه"""
+    return _rate_limiter.get()
+
+
+def reset_rate_limiter():
+    """حذف نمونه مشترک (مثلا پس از تغییر تنظیمات در تست)"""
+    _rate_limiter.reset()
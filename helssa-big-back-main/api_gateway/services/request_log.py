@@ -0,0 +1,391 @@
+"""
+خط لوله لاگ درخواست‌های API (Request Log Pipeline)
+
+چرخه عمر هر درخواست در حافظه جمع‌آوری می‌شود و در پایان فقط یک رکورد
+در یک صف محدود قرار می‌گیرد. یک نویسنده پس‌زمینه رکوردها را هر N
+رکورد یا هر T میلی‌ثانیه با ``bulk_create`` ذخیره می‌کند. درخواست‌های
+موفق نمونه‌برداری می‌شوند و درخواست‌های ناموفق همیشه ثبت می‌شوند.
+آمار سلامت (تعداد درخواست‌های امروز و میانگین زمان پاسخ) از
+شمارنده‌های مشترک Redis (یا در نبود آن، cache) خوانده می‌شود و نیازی به
+اسکن جدول نیست.
+"""
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.utils import timezone
+
+from helssa.shared_backends import get_shared_redis_connection
+
+from ..models import APIRequest
+
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLogEntry:
+    """
+    چرخه عمر یک درخواست API در حافظه
+
+    این کلاس همان رابط ``APIRequest`` (mark_completed / mark_failed) را
+    ارائه می‌دهد اما تا پایان درخواست هیچ نوشتنی در دیتابیس انجام نمی‌دهد.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        path: str,
+        ip_address: str,
+        user=None,
+        user_agent: str = '',
+        request_headers: Optional[Dict[str, Any]] = None,
+        request_body: Optional[Dict[str, Any]] = None,
+        pipeline: Optional['RequestLogPipeline'] = None,
+    ):
+        self.id = uuid.uuid4()
+        self.user = user
+        self.method = method
+        self.path = path
+        self.ip_address = ip_address
+        self.user_agent = user_agent
+        self.request_headers = request_headers or {}
+        self.request_body = request_body or {}
+        self.response_status = None
+        self.response_body = {}
+        self.status = 'pending'
+        self.processor_type = ''
+        self.error_message = ''
+        self.processing_time = None
+        self.created_at = timezone.now()
+        self.completed_at = None
+        self._started = time.perf_counter()
+        self._pipeline = pipeline
+        self._emitted = False
+        # آیا رکورد برای ذخیره در صف قرار گرفت (درخواست‌های موفق نمونه‌برداری می‌شوند)
+        self.queued = False
+
+    def mark_processing(self, processor_type: str):
+        """ثبت شروع پردازش (فقط در حافظه)"""
+        self.processor_type = processor_type
+        self.status = 'processing'
+
+    def mark_completed(self, response_status: int, response_body: dict = None):
+        """نشان‌گذاری درخواست به عنوان تکمیل شده و ارسال به خط لوله"""
+        if self._emitted:
+            return
+        self.status = 'completed'
+        self.response_status = response_status
+        self.response_body = response_body or {}
+        self._finish()
+
+    def mark_failed(self, error_message: str, response_status: int = 500):
+        """نشان‌گذاری درخواست به عنوان ناموفق و ارسال به خط لوله"""
+        if self._emitted:
+            return
+        self.status = 'failed'
+        self.error_message = error_message
+        self.response_status = response_status
+        self._finish()
+
+    @property
+    def is_failure(self) -> bool:
+        """آیا درخواست ناموفق بوده است"""
+        return self.status == 'failed' or (self.response_status or 0) >= 400
+
+    def _finish(self):
+        """محاسبه زمان پردازش و ارسال یک‌باره به خط لوله"""
+        self._emitted = True
+        self.completed_at = timezone.now()
+        self.processing_time = time.perf_counter() - self._started
+
+        pipeline = self._pipeline or get_request_log_pipeline()
+        pipeline.emit(self)
+
+    def to_model(self) -> APIRequest:
+        """ساخت نمونه ذخیره نشده APIRequest برای bulk_create"""
+        return APIRequest(
+            id=self.id,
+            user=self.user,
+            method=self.method,
+            path=self.path[:500],
+            ip_address=self.ip_address if self.ip_address != 'unknown' else '0.0.0.0',
+            user_agent=self.user_agent,
+            request_headers=self.request_headers,
+            request_body=self.request_body,
+            response_status=self.response_status,
+            response_body=self.response_body,
+            status=self.status,
+            processing_time=self.processing_time,
+            processor_type=self.processor_type,
+            error_message=self.error_message,
+            created_at=self.created_at,
+            completed_at=self.completed_at,
+        )
+
+
+class RequestStats:
+    """
+    شمارنده‌های سلامت درخواست‌ها
+
+    برای هر روز سه کلید نگهداری می‌شود: تعداد درخواست‌ها، تعداد
+    درخواست‌های دارای زمان پاسخ و مجموع زمان پاسخ به میلی‌ثانیه.
+    اگر cache پیش‌فرض Redis باشد شمارنده‌ها مستقیماً در Redis مشترک
+    (INCRBY در یک pipeline) نگهداری می‌شوند تا همه پردازه‌ها یک آمار را
+    ببینند؛ در غیر این صورت از cache پیش‌فرض استفاده می‌شود (توسعه و تست).
+
+    Args:
+        connection: اتصال Redis (پیش‌فرض: اتصال cache پیش‌فرض در صورت وجود)
+    """
+
+    KEY_PREFIX = 'api_gateway:request_stats'
+    TTL = 2 * 24 * 3600
+
+    def __init__(self, connection=None):
+        self.connection = (
+            connection if connection is not None
+            else get_shared_redis_connection('request stats')
+        )
+
+    def _key(self, name: str, day: Optional[str] = None) -> str:
+        day = day or timezone.localdate().isoformat()
+        return f"{self.KEY_PREFIX}:{day}:{name}"
+
+    def _incr(self, key: str, delta: int):
+        """افزایش اتمیک شمارنده (ایجاد در صورت نبود)"""
+        if cache.add(key, delta, self.TTL):
+            return
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # کلید بین add و incr منقضی شده است
+            cache.add(key, delta, self.TTL)
+
+    def record(self, processing_time: Optional[float]):
+        """ثبت یک درخواست تکمیل شده"""
+        deltas = {self._key('count'): 1}
+        if processing_time is not None:
+            deltas[self._key('timed')] = 1
+            deltas[self._key('time_ms')] = int(processing_time * 1000)
+
+        try:
+            if self.connection is not None:
+                # یک رفت‌وبرگشت برای همه شمارنده‌ها
+                pipe = self.connection.pipeline(transaction=False)
+                for key, delta in deltas.items():
+                    pipe.incrby(key, delta)
+                    pipe.expire(key, self.TTL)
+                pipe.execute()
+            else:
+                for key, delta in deltas.items():
+                    self._incr(key, delta)
+        except Exception as e:
+            logger.error(f"Request stats update error: {str(e)}")
+
+    def requests_today(self) -> int:
+        """تعداد درخواست‌های امروز"""
+        return self._read('count')['count']
+
+    def average_response_time(self) -> float:
+        """میانگین زمان پاسخ امروز به ثانیه"""
+        values = self._read('timed', 'time_ms')
+        if not values['timed']:
+            return 0
+        return values['time_ms'] / values['timed'] / 1000.0
+
+    def _read(self, *names: str) -> Dict[str, int]:
+        """خواندن شمارنده‌های امروز (صفر برای شمارنده‌های ناموجود)"""
+        keys = [self._key(name) for name in names]
+        if self.connection is not None:
+            values = self.connection.mget(keys)
+        else:
+            cached = cache.get_many(keys)
+            values = [cached.get(key) for key in keys]
+        return {name: int(value or 0) for name, value in zip(names, values)}
+
+
+class RequestLogPipeline:
+    """
+    صف محدود و نویسنده پس‌زمینه لاگ درخواست‌ها
+
+    رکوردها هر ``batch_size`` عدد یا هر ``flush_interval_ms`` میلی‌ثانیه
+    (هر کدام زودتر) با یک ``bulk_create`` ذخیره می‌شوند. اگر صف پر باشد
+    رکوردهای موفق دور ریخته می‌شوند تا مسیر درخواست هرگز مسدود نشود.
+    """
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        success_sample_rate: Optional[float] = None,
+        run_in_background: Optional[bool] = None,
+        stats: Optional[RequestStats] = None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.batch_size = batch_size or getattr(settings, 'API_GATEWAY_REQUEST_LOG_BATCH_SIZE', 100)
+        self.flush_interval = (
+            flush_interval_ms or getattr(settings, 'API_GATEWAY_REQUEST_LOG_FLUSH_INTERVAL_MS', 500)
+        ) / 1000.0
+        self.success_sample_rate = (
+            success_sample_rate if success_sample_rate is not None
+            else getattr(settings, 'API_GATEWAY_REQUEST_LOG_SUCCESS_SAMPLE_RATE', 0.1)
+        )
+        self.run_in_background = (
+            run_in_background if run_in_background is not None
+            else getattr(settings, 'API_GATEWAY_REQUEST_LOG_ASYNC', True)
+        )
+        self.enabled = getattr(settings, 'API_GATEWAY_LOG_REQUESTS', True)
+        self.stats = stats or RequestStats()
+
+        self._queue: queue.Queue = queue.Queue(
+            maxsize=queue_size or getattr(settings, 'API_GATEWAY_REQUEST_LOG_QUEUE_SIZE', 10000)
+        )
+        self._flush_lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+
+    def emit(self, entry: RequestLogEntry):
+        """
+        ثبت رکورد تکمیل شده یک درخواست
+
+        Args:
+            entry: چرخه عمر درخواست
+        """
+        self.stats.record(entry.processing_time)
+
+        if not self.enabled:
+            return
+
+        if not entry.is_failure and random.random() >= self.success_sample_rate:
+            self.sampled_out += 1
+            return
+
+        try:
+            if entry.is_failure:
+                # خطاها کامل ثبت می‌شوند؛ در صورت پر بودن صف کمی صبر می‌کنیم
+                self._queue.put(entry, timeout=0.05)
+            else:
+                self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            return
+        entry.queued = True
+
+        if self.run_in_background:
+            self._ensure_worker()
+        elif self._queue.qsize() >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        ذخیره همه رکوردهای موجود در صف در thread فراخواننده
+
+        Returns:
+            int: تعداد رکوردهای ذخیره شده
+        """
+        total = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    break
+                total += self._write(batch)
+        return total
+
+    def pending(self) -> int:
+        """تعداد رکوردهای در انتظار نوشتن"""
+        return self._queue.qsize()
+
+    def stop(self, timeout: float = 5.0):
+        """توقف نویسنده پس‌زمینه و ذخیره رکوردهای باقیمانده"""
+        self._stopped.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+        self.flush()
+
+    def _ensure_worker(self):
+        """راه‌اندازی تنبل نویسنده پس‌زمینه"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopped.clear()
+            self._worker = threading.Thread(
+                target=self._run, name='api-gateway-request-log', daemon=True
+            )
+            self._worker.start()
+
+    def _run(self):
+        """حلقه نویسنده: انتظار برای batch کامل یا پایان بازه زمانی"""
+        while not self._stopped.is_set():
+            batch: List[RequestLogEntry] = []
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            if batch:
+                with self._flush_lock:
+                    self._write(batch)
+
+    def _drain(self, limit: int) -> List[RequestLogEntry]:
+        """برداشتن حداکثر limit رکورد از صف بدون انتظار"""
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: List[RequestLogEntry]) -> int:
+        """ذخیره یک batch با bulk_create"""
+        try:
+            APIRequest.objects.bulk_create(
+                [entry.to_model() for entry in batch],
+                batch_size=self.batch_size
+            )
+            self.written += len(batch)
+            return len(batch)
+        except Exception as e:
+            self.logger.error(f"Request log batch write failed ({len(batch)} records): {str(e)}")
+            self.dropped += len(batch)
+            return 0
+        finally:
+            if threading.current_thread() is self._worker:
+                close_old_connections()
+
+
+_pipeline: Optional[RequestLogPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_request_log_pipeline() -> RequestLogPipeline:
+    """دریافت خط لوله مشترک لاگ درخواست‌ها در پردازه"""
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = RequestLogPipeline()
+                atexit.register(_pipeline.stop)
+    return _pipeline
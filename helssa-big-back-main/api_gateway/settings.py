@@ -11,7 +11,7 @@ API_GATEWAY_SETTINGS = {
     
     # Rate Limiting
     'RATE_LIMIT_ENABLED': True,
-    'DEFAULT_RATE_LIMIT': 100,  # درخواست در ساعت
+    'DEFAULT_RATE_LIMIT': getattr(settings, 'API_GATEWAY_DEFAULT_RATE_LIMIT', 100),  # درخواست در پنجره برای هر endpoint
     'RATE_LIMIT_WINDOW_MINUTES': 60,
     
     # حداکثر اندازه درخواست‌ها
@@ -41,6 +41,11 @@ API_GATEWAY_SETTINGS = {
     'LOG_RESPONSES': True,
     'LOG_SENSITIVE_DATA': False,
     'LOG_RETENTION_DAYS': 30,
+    'REQUEST_LOG_ASYNC': True,  # نوشتن لاگ در thread پس‌زمینه
+    'REQUEST_LOG_BATCH_SIZE': 100,  # تعداد رکورد در هر bulk_create
+    'REQUEST_LOG_FLUSH_INTERVAL_MS': 500,  # حداکثر تأخیر نوشتن
+    'REQUEST_LOG_QUEUE_SIZE': 10000,  # ظرفیت صف در حافظه
+    'REQUEST_LOG_SUCCESS_SAMPLE_RATE': 0.1,  # درخواست‌های ناموفق همیشه ثبت می‌شوند
     
     # تنظیمات امنیتی
     'ENABLE_REQUEST_VALIDATION': True,
@@ -59,6 +64,90 @@ API_GATEWAY_SETTINGS = {
     'WORKFLOW_RETENTION_DAYS': 30,
 }
 
+# سیاست‌های محدودسازی نرخ (اعلانی)
+# هر سیاست بر اساس گروه، مسیر، نقش کاربر و وضعیت احراز هویت انتخاب می‌شود.
+# اولین سیاست منطبق (به ترتیب لیست) اعمال می‌شود.
+RATE_LIMIT_POLICIES = [
+    # چت‌بات - کاربران ناشناس بر اساس IP
+    {
+        'name': 'chatbot_anonymous',
+        'group': 'chatbot',
+        'authenticated': False,
+        'scope': 'ip',
+        'limit': 10,
+        'window': 300,
+        'description': 'درخواست بدون احراز هویت',
+    },
+    # چت‌بات - کاربران احراز هویت شده بر اساس نوع endpoint
+    {
+        'name': 'chatbot_message',
+        'group': 'chatbot',
+        'paths': ['send-message'],
+        'scope': 'user',
+        'limit': 30,
+        'window': 60,
+        'description': 'ارسال پیام چت‌بات',
+    },
+    {
+        'name': 'chatbot_session',
+        'group': 'chatbot',
+        'paths': ['start-session'],
+        'scope': 'user',
+        'limit': 5,
+        'window': 300,
+        'description': 'ایجاد جلسه چت‌بات',
+    },
+    {
+        'name': 'diagnosis_support',
+        'group': 'chatbot',
+        'paths': ['diagnosis-support'],
+        'scope': 'user',
+        'limit': 10,
+        'window': 600,
+        'description': 'پشتیبانی تشخیصی',
+    },
+    {
+        'name': 'medication_info',
+        'group': 'chatbot',
+        'paths': ['medication-info'],
+        'scope': 'user',
+        'limit': 20,
+        'window': 300,
+        'description': 'اطلاعات دارویی',
+    },
+    # API Gateway - شمارش جداگانه برای هر کاربر (یا ناشناس) + IP و هر endpoint؛
+    # حد پیش‌فرض از DEFAULT_RATE_LIMIT و بازه از RATE_LIMIT_WINDOW_MINUTES
+    {
+        'name': 'gateway_staff',
+        'group': 'gateway',
+        'roles': ['admin', 'staff'],
+        'scope': 'user_ip',
+        'per_endpoint': True,
+        'limit': API_GATEWAY_SETTINGS['DEFAULT_RATE_LIMIT'] * 10,
+        'window': API_GATEWAY_SETTINGS['RATE_LIMIT_WINDOW_MINUTES'] * 60,
+        'description': 'درخواست‌های کارکنان',
+    },
+    {
+        'name': 'gateway_doctor',
+        'group': 'gateway',
+        'roles': ['doctor'],
+        'scope': 'user_ip',
+        'per_endpoint': True,
+        'limit': API_GATEWAY_SETTINGS['DEFAULT_RATE_LIMIT'] * 5,
+        'window': API_GATEWAY_SETTINGS['RATE_LIMIT_WINDOW_MINUTES'] * 60,
+        'description': 'درخواست‌های پزشک',
+    },
+    {
+        'name': 'gateway_default',
+        'group': 'gateway',
+        'scope': 'user_ip',
+        'per_endpoint': True,
+        'limit': API_GATEWAY_SETTINGS['DEFAULT_RATE_LIMIT'],
+        'window': API_GATEWAY_SETTINGS['RATE_LIMIT_WINDOW_MINUTES'] * 60,
+        'description': 'درخواست API',
+    },
+]
+
 # تنظیمات cores
 CORE_SETTINGS = {
     'API_INGRESS': {
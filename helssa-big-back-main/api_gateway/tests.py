@@ -1,3 +1,576 @@
-from django.test import TestCase
+"""
+تست‌های API Gateway
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .cores import OrchestratorCore
+from .cores.workflow_engine import WorkflowEngine, WorkflowStep, WorkflowValidationError, run_to_completion
+from .models import APIRequest
+from .settings import API_GATEWAY_SETTINGS
+from .services.request_log import RequestLogEntry, RequestLogPipeline, RequestStats
+from .services.rate_limiter import (
+    InProcessSlidingWindowBackend,
+    LocalTokenBucket,
+    RateLimiter,
+    RateLimitPolicy,
+    RedisSlidingWindowBackend,
+    load_policies,
+)
+
+
+def _run_concurrently(limiter, key, policy, threads=50, hits_per_thread=4):
+    """اجرای همزمان درخواست‌ها و بازگرداندن تعداد درخواست‌های مجاز"""
+    barrier = threading.Barrier(threads)
+    allowed = []
+    allowed_lock = threading.Lock()
+
+    def worker():
+        barrier.wait()
+        local_allowed = 0
+        for _ in range(hits_per_thread):
+            if limiter.check(key, policy).allowed:
+                local_allowed += 1
+        with allowed_lock:
+            allowed.append(local_allowed)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    return sum(allowed)
+
+
+class RateLimitPolicyTest(SimpleTestCase):
+    """
+    تست‌های انتخاب سیاست محدودسازی
+    """
+
+    def setUp(self):
+        self.limiter = RateLimiter(
+            policies=load_policies(),
+            backend=InProcessSlidingWindowBackend(),
+            local_bucket=LocalTokenBucket()
+        )
+        self.patient = SimpleNamespace(id=uuid.uuid4(), is_authenticated=True, user_type='patient')
+        self.doctor = SimpleNamespace(id=uuid.uuid4(), is_authenticated=True, user_type='doctor')
+
+    def test_anonymous_chatbot_request_uses_ip_policy(self):
+        policy = self.limiter.resolve_policy('chatbot', '/chatbot/api/patient/send-message/', None)
+        self.assertEqual(policy.name, 'chatbot_anonymous')
+        self.assertEqual(policy.build_key('/x/', None, '10.0.0.1'), 'ratelimit:chatbot:chatbot_anonymous:ip:10.0.0.1')
+
+    def test_authenticated_chatbot_request_uses_endpoint_policy(self):
+        policy = self.limiter.resolve_policy('chatbot', '/chatbot/api/patient/start-session/', self.patient)
+        self.assertEqual(policy.name, 'chatbot_session')
+
+    def test_unknown_chatbot_endpoint_has_no_policy(self):
+        self.assertIsNone(
+            self.limiter.check_request('chatbot', '/chatbot/api/sessions/', self.patient, '10.0.0.1')
+        )
+
+    def test_gateway_role_policy(self):
+        self.assertEqual(self.limiter.resolve_policy('gateway', '/api/text/', self.doctor).name, 'gateway_doctor')
+        self.assertEqual(self.limiter.resolve_policy('gateway', '/api/text/', self.patient).name, 'gateway_default')
+
+    def test_gateway_default_counts_each_endpoint_separately(self):
+        policy = self.limiter.resolve_policy('gateway', '/api/text/', None)
+
+        self.assertEqual(policy.name, 'gateway_default')
+        self.assertEqual((policy.limit, policy.window), (API_GATEWAY_SETTINGS['DEFAULT_RATE_LIMIT'], 3600))
+        self.assertNotEqual(
+            policy.build_key('/api/text/', None, '10.0.0.1'),
+            policy.build_key('/api/speech/', None, '10.0.0.1'),
+        )
+
+    @override_settings(API_GATEWAY_RATE_LIMIT_POLICIES=[
+        {'name': 'custom', 'group': 'gateway', 'scope': 'ip', 'limit': 1, 'window': 60},
+    ])
+    def test_settings_override_policies(self):
+        policies = load_policies()
+        self.assertEqual([policy.name for policy in policies], ['custom'])
+
+
+class RateLimiterTest(SimpleTestCase):
+    """
+    تست‌های محدودکننده نرخ دولایه
+    """
+
+    def test_sliding_window_expires(self):
+        limiter = RateLimiter(policies=[], backend=InProcessSlidingWindowBackend())
+        policy = RateLimitPolicy(name='short', limit=2, window=1, burst=100)
+
+        self.assertTrue(limiter.check('k', policy).allowed)
+        self.assertTrue(limiter.check('k', policy).allowed)
+        decision = limiter.check('k', policy)
+        self.assertFalse(decision.allowed)
+        self.assertEqual(decision.source, 'memory')
+        self.assertGreaterEqual(decision.retry_after, 1)
+
+        time.sleep(1.1)
+        self.assertTrue(limiter.check('k', policy).allowed)
+
+    def test_local_bucket_absorbs_burst_before_backend(self):
+        backend = InProcessSlidingWindowBackend()
+        limiter = RateLimiter(policies=[], backend=backend)
+        policy = RateLimitPolicy(name='burst', limit=1000, window=3600, burst=3)
+
+        results = [limiter.check('k', policy) for _ in range(10)]
+
+        self.assertEqual(sum(1 for r in results if r.allowed), 3)
+        self.assertTrue(all(r.source == 'local' for r in results[3:]))
+        # فقط درخواست‌های عبوری از سطل محلی به backend رسیده‌اند
+        self.assertEqual(len(backend._logs['k']), 3)
+
+    def test_backend_error_fails_open(self):
+        class BrokenBackend:
+            name = 'broken'
+
+            def hit(self, key, limit, window):
+                raise ConnectionError('down')
+
+        limiter = RateLimiter(policies=[], backend=BrokenBackend())
+        decision = limiter.check('k', RateLimitPolicy(name='p', limit=1, window=60))
+        self.assertTrue(decision.allowed)
+        self.assertEqual(decision.source, 'fail_open')
+
+    def test_concurrent_requests_admit_exact_limit(self):
+        limiter = RateLimiter(policies=[], backend=InProcessSlidingWindowBackend())
+        # سطل محلی بزرگ تا دقت backend به تنهایی سنجیده شود
+        policy = RateLimitPolicy(name='exact', limit=37, window=60, burst=10000)
+
+        self.assertEqual(_run_concurrently(limiter, 'exact-key', policy), 37)
+
+    def test_concurrent_requests_admit_exact_limit_with_local_bucket(self):
+        limiter = RateLimiter(policies=[], backend=InProcessSlidingWindowBackend())
+        policy = RateLimitPolicy(name='exact', limit=37, window=3600)
+
+        self.assertEqual(_run_concurrently(limiter, 'exact-key', policy), 37)
+
+
+class RedisRateLimiterTest(SimpleTestCase):
+    """
+    تست همزمانی اسکریپت Lua روی Redis واقعی (نیازمند RATE_LIMIT_TEST_REDIS_URL)
+    """
+
+    def setUp(self):
+        redis_url = os.getenv('RATE_LIMIT_TEST_REDIS_URL')
+        if not redis_url:
+            self.skipTest('RATE_LIMIT_TEST_REDIS_URL not set')
+
+        import redis
+        self.connection = redis.Redis.from_url(redis_url)
+        self.key = f"ratelimit:test:{uuid.uuid4().hex}"
+
+    def tearDown(self):
+        self.connection.delete(self.key)
+
+    def test_concurrent_requests_admit_exact_limit(self):
+        limiter = RateLimiter(policies=[], backend=RedisSlidingWindowBackend(self.connection))
+        policy = RateLimitPolicy(name='exact', limit=37, window=60, burst=10000)
+
+        self.assertEqual(_run_concurrently(limiter, self.key, policy), 37)
+        self.assertEqual(self.connection.zcard(self.key), 37)
+        self.assertGreater(self.connection.pttl(self.key), 0)
+
+
+class _RecordingPipeline(RequestLogPipeline):
+    """خط لوله‌ای که batch ها را به جای دیتابیس در حافظه نگه می‌دارد"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def _write(self, batch):
+        self.batches.append(list(batch))
+        self.written += len(batch)
+        return len(batch)
+
+
+def _entry(pipeline, path='/api/text/'):
+    return RequestLogEntry(method='POST', path=path, ip_address='10.0.0.1', pipeline=pipeline)
+
+
+class RequestLogPipelineTest(TestCase):
+    """
+    تست‌های خط لوله لاگ درخواست‌ها
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_single_bulk_insert_per_batch(self):
+        pipeline = RequestLogPipeline(batch_size=3, success_sample_rate=1.0, run_in_background=False)
+
+        for _ in range(2):
+            _entry(pipeline).mark_completed(response_status=200, response_body={'ok': True})
+        self.assertEqual(APIRequest.objects.count(), 0)
+
+        with self.assertNumQueries(1):
+            _entry(pipeline).mark_completed(response_status=200)
+
+        self.assertEqual(APIRequest.objects.filter(status='completed').count(), 3)
+
+    def test_lifecycle_is_written_once(self):
+        pipeline = RequestLogPipeline(batch_size=10, success_sample_rate=1.0, run_in_background=False)
+        entry = _entry(pipeline)
+        entry.mark_processing('text_processor')
+        entry.mark_completed(response_status=200)
+        entry.mark_failed('late error')
+        pipeline.flush()
+
+        record = APIRequest.objects.get(id=entry.id)
+        self.assertEqual(record.status, 'completed')
+        self.assertEqual(record.processor_type, 'text_processor')
+        self.assertIsNotNone(record.processing_time)
+
+    def test_failures_always_captured_successes_sampled(self):
+        pipeline = RequestLogPipeline(batch_size=100, success_sample_rate=0.0, run_in_background=False)
+
+        successes = [_entry(pipeline) for _ in range(5)]
+        for entry in successes:
+            entry.mark_completed(response_status=200)
+        failure = _entry(pipeline)
+        failure.mark_failed('Rate limit exceeded', response_status=429)
+        pipeline.flush()
+
+        self.assertEqual(APIRequest.objects.count(), 1)
+        self.assertEqual(APIRequest.objects.get().response_status, 429)
+        self.assertEqual(pipeline.sampled_out, 5)
+        self.assertFalse(any(entry.queued for entry in successes))
+        self.assertTrue(failure.queued)
+
+    def test_stats_come_from_counters(self):
+        pipeline = RequestLogPipeline(batch_size=100, success_sample_rate=0.0, run_in_background=False)
+        stats = RequestStats()
+
+        for _ in range(4):
+            _entry(pipeline).mark_completed(response_status=200)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(stats.requests_today(), 4)
+            self.assertGreaterEqual(stats.average_response_time(), 0)
+
+    def test_full_queue_drops_successes_without_blocking(self):
+        pipeline = _RecordingPipeline(
+            batch_size=100, queue_size=2, success_sample_rate=1.0, run_in_background=False
+        )
+        for _ in range(5):
+            _entry(pipeline).mark_completed(response_status=200)
+
+        self.assertEqual(pipeline.pending(), 2)
+        self.assertEqual(pipeline.dropped, 3)
+
+
+class RedisRequestStatsTest(SimpleTestCase):
+    """
+    تست شمارنده‌های مشترک آمار درخواست روی Redis واقعی (نیازمند RATE_LIMIT_TEST_REDIS_URL)
+    """
+
+    def setUp(self):
+        redis_url = os.getenv('RATE_LIMIT_TEST_REDIS_URL')
+        if not redis_url:
+            self.skipTest('RATE_LIMIT_TEST_REDIS_URL not set')
+
+        import redis
+        self.connection = redis.Redis.from_url(redis_url)
+        self.prefix = f"api_gateway:request_stats:test:{uuid.uuid4().hex}"
+
+    def tearDown(self):
+        keys = list(self.connection.scan_iter(f"{self.prefix}:*"))
+        if keys:
+            self.connection.delete(*keys)
+
+    def _stats(self):
+        stats = RequestStats(connection=self.connection)
+        stats.KEY_PREFIX = self.prefix
+        return stats
+
+    def test_counters_are_shared_between_instances(self):
+        # هر نمونه نماینده یک پردازه جداگانه است
+        writers = [self._stats() for _ in range(4)]
+        threads = [
+            threading.Thread(target=lambda stats=stats: [stats.record(0.25) for _ in range(50)])
+            for stats in writers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        reader = self._stats()
+        self.assertEqual(reader.requests_today(), 200)
+        self.assertAlmostEqual(reader.average_response_time(), 0.25)
+        self.assertGreater(self.connection.ttl(reader._key('count')), 0)
+
+
+class RequestLogBackgroundWriterTest(SimpleTestCase):
+    """
+    تست نویسنده پس‌زمینه (بدون دیتابیس)
+    """
+
+    def test_flushes_on_batch_size(self):
+        pipeline = _RecordingPipeline(batch_size=5, flush_interval_ms=10000, success_sample_rate=1.0)
+        for _ in range(5):
+            _entry(pipeline).mark_completed(response_status=200)
+
+        deadline = time.monotonic() + 2
+        while not pipeline.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        pipeline.stop()
+
+        self.assertEqual(len(pipeline.batches[0]), 5)
+
+    def test_flushes_on_interval(self):
+        pipeline = _RecordingPipeline(batch_size=100, flush_interval_ms=50, success_sample_rate=1.0)
+        _entry(pipeline).mark_failed('boom')
+
+        deadline = time.monotonic() + 2
+        while not pipeline.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+        pipeline.stop()
+
+        self.assertEqual(pipeline.written, 1)
+
+
+def _sleep_step(seconds, value=None):
+    def run(context, inputs):
+        time.sleep(seconds)
+        return True, {'value': value}
+    return run
+
+
+class WorkflowEngineTest(SimpleTestCase):
+    """
+    تست‌های موتور workflow مبتنی بر DAG
+    """
+
+    def setUp(self):
+        self.engine = WorkflowEngine()
+
+    def test_independent_steps_run_in_parallel(self):
+        steps = [WorkflowStep(name=f's{i}', func=_sleep_step(0.2)) for i in range(4)]
+
+        run = self.engine.run(steps)
+
+        self.assertEqual(run['status'], 'completed')
+        self.assertLess(run['timing']['wall_clock'], 0.5)
+        self.assertGreater(run['timing']['speedup'], 2)
+
+    def test_dependencies_receive_results_by_reference(self):
+        payload = {'large': list(range(1000))}
+        seen = {}
+
+        def produce(context, inputs):
+            return True, payload
+
+        def consume(context, inputs):
+            seen['payload'] = inputs['produce']
+            return True, {}
+
+        run = self.engine.run([
+            WorkflowStep(name='consume', func=consume, depends_on=('produce',)),
+            WorkflowStep(name='produce', func=produce),
+        ])
+
+        self.assertEqual(run['status'], 'completed')
+        self.assertIs(seen['payload'], payload)
+
+    def test_async_steps_run_on_shared_loop(self):
+        async def io_step(context, inputs):
+            await asyncio.sleep(0.2)
+            return True, {}
+
+        steps = [WorkflowStep(name=f'io{i}', func=io_step) for i in range(5)]
+        run = self.engine.run(steps)
+
+        self.assertEqual(run['status'], 'completed')
+        self.assertLess(run['timing']['wall_clock'], 0.5)
+
+    def test_critical_path(self):
+        run = self.engine.run([
+            WorkflowStep(name='fast', func=_sleep_step(0.01)),
+            WorkflowStep(name='slow', func=_sleep_step(0.2)),
+            WorkflowStep(name='join', func=_sleep_step(0.01), depends_on=('fast', 'slow')),
+        ])
+
+        self.assertEqual(run['timing']['critical_path'], ['slow', 'join'])
+
+    def test_retries_then_succeeds(self):
+        attempts = []
+
+        def flaky(context, inputs):
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError('temporary')
+            return True, {'ok': True}
+
+        run = self.engine.run([WorkflowStep(name='flaky', func=flaky, retries=2, retry_delay=0.01)])
+
+        self.assertEqual(run['status'], 'completed')
+        self.assertEqual(run['steps']['flaky']['attempts'], 3)
+
+    def test_timeout_fails_workflow_and_skips_dependents(self):
+        async def hang(context, inputs):
+            await asyncio.sleep(5)
+            return True, {}
+
+        run = self.engine.run([
+            WorkflowStep(name='hang', func=hang, timeout=0.1),
+            WorkflowStep(name='after', func=_sleep_step(0), depends_on=('hang',)),
+        ])
+
+        self.assertEqual(run['status'], 'failed')
+        self.assertEqual(run['steps']['hang']['status'], 'timeout')
+        self.assertEqual(run['steps']['after']['status'], 'skipped')
+
+    def test_timed_out_sync_attempt_finishes_before_retry(self):
+        active = []
+        overlaps = []
+        lock = threading.Lock()
+
+        def slow_once(context, inputs):
+            with lock:
+                overlaps.append(len(active))
+                active.append(1)
+                first = len(overlaps) == 1
+            time.sleep(0.3 if first else 0)
+            with lock:
+                active.pop()
+            return True, {}
+
+        run = self.engine.run([WorkflowStep(name='slow', func=slow_once, timeout=0.1, retries=1)])
+
+        self.assertEqual(run['status'], 'completed')
+        self.assertEqual(run['steps']['slow']['attempts'], 2)
+        self.assertEqual(overlaps, [0, 0])
+
+    def test_timed_out_async_thread_finishes_before_retry(self):
+        active = []
+        overlaps = []
+        lock = threading.Lock()
+
+        def blocking(context):
+            with lock:
+                overlaps.append(len(active))
+                active.append(1)
+                first = len(overlaps) == 1
+            time.sleep(0.3 if first else 0)
+            with lock:
+                active.pop()
+            return True, {}
+
+        async def io_step(context, inputs):
+            return await run_to_completion(asyncio.to_thread(blocking, context))
+
+        run = self.engine.run([WorkflowStep(name='io', func=io_step, timeout=0.1, retries=1)])
+
+        self.assertEqual(run['status'], 'completed')
+        self.assertEqual(run['steps']['io']['attempts'], 2)
+        self.assertEqual(overlaps, [0, 0])
+
+    def test_continue_on_error_releases_dependents(self):
+        run = self.engine.run([
+            WorkflowStep(name='bad', func=lambda c, i: (False, {'error': 'x'}), continue_on_error=True),
+            WorkflowStep(name='after', func=_sleep_step(0), depends_on=('bad',)),
+        ])
+
+        self.assertEqual(run['status'], 'completed')
+        self.assertEqual(run['steps']['after']['status'], 'completed')
+
+    def test_cancellation_stops_scheduling(self):
+        cancel_event = threading.Event()
+
+        def first(context, inputs):
+            cancel_event.set()
+            return True, {}
+
+        run = self.engine.run([
+            WorkflowStep(name='first', func=first),
+            WorkflowStep(name='second', func=_sleep_step(0), depends_on=('first',)),
+        ], cancel_event=cancel_event)
+
+        self.assertEqual(run['status'], 'cancelled')
+        self.assertEqual(run['steps']['second']['status'], 'cancelled')
+
+    def test_cancellation_does_not_wait_for_running_steps(self):
+        cancel_event = threading.Event()
+        threading.Timer(0.1, cancel_event.set).start()
+
+        run = self.engine.run([
+            WorkflowStep(name='slow', func=_sleep_step(1)),
+            WorkflowStep(name='flaky', func=lambda c, i: (False, {'error': 'x'}), retries=1, retry_delay=5),
+        ], cancel_event=cancel_event)
+
+        self.assertEqual(run['status'], 'cancelled')
+        self.assertLess(run['timing']['wall_clock'], 0.5)
+        self.assertEqual(run['steps']['slow']['status'], 'cancelled')
+
+    def test_cycle_is_rejected(self):
+        with self.assertRaises(WorkflowValidationError):
+            self.engine.run([
+                WorkflowStep(name='a', func=_sleep_step(0), depends_on=('b',)),
+                WorkflowStep(name='b', func=_sleep_step(0), depends_on=('a',)),
+            ])
+
+
+class OrchestratorWorkflowTest(SimpleTestCase):
+    """
+    تست اجرای workflow در OrchestratorCore
+    """
+
+    def test_declared_edges_run_independent_steps_concurrently(self):
+        orchestrator = OrchestratorCore()
+        config = {
+            'steps': [
+                {'name': 'a', 'type': 'delay', 'params': {'seconds': 0.2}},
+                {'name': 'b', 'type': 'delay', 'params': {'seconds': 0.2}},
+                {'name': 'c', 'type': 'data_validation', 'depends_on': ['a', 'b']},
+            ]
+        }
+
+        success, result = orchestrator.execute_workflow(config)
+
+        self.assertTrue(success)
+        self.assertEqual([r['step_name'] for r in result['results']], ['a', 'b', 'c'])
+        self.assertLess(result['timing']['wall_clock'], 0.35)
+
+    def test_legacy_config_runs_in_declared_order(self):
+        orchestrator = OrchestratorCore()
+        config = {
+            'steps': [
+                {'name': 'a', 'type': 'delay', 'params': {'seconds': 0.05}},
+                {'name': 'b', 'type': 'delay', 'params': {'seconds': 0.05}},
+            ]
+        }
+
+        success, result = orchestrator.execute_workflow(config)
+
+        self.assertTrue(success)
+        self.assertEqual(result['timing']['critical_path'], ['a', 'b'])
+
+    def test_unknown_dependency_is_invalid(self):
+        success, result = OrchestratorCore().execute_workflow({
+            'steps': [{'name': 'a', 'type': 'delay', 'depends_on': ['missing']}]
+        })
+        self.assertFalse(success)
+        self.assertEqual(result['error'], 'Invalid workflow config')
+
+    def test_parallel_execute_uses_shared_pool(self):
+        orchestrator = OrchestratorCore()
+        success, result = orchestrator.parallel_execute(
+            [{'id': i, 'type': 'compute', 'params': {'duration': 0.1}} for i in range(4)]
+        )
+
+        self.assertTrue(success)
+        self.assertEqual(result['successful_tasks'], 4)
+        self.assertIs(orchestrator.executor, OrchestratorCore().executor)
@@ -0,0 +1,163 @@
+"""
+Management command برای بنچمارک درج همزمان فاکتور با تخصیص شماره
+"""
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.utils import timezone
+
+from billing.models import Invoice, InvoiceType, NumberSequence
+from billing.services.number_allocator import NumberAllocator
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """
+    بنچمارک تخصیص شماره فاکتور
+
+    چند thread به صورت همزمان فاکتور درج می‌کنند؛ یک بار با روش قبلی
+    (یافتن آخرین شماره با پیشوند و تلاش مجدد در صورت تکرار) و یک بار با
+    NumberAllocator. فاکتورها و شمارنده‌های بنچمارک در پایان حذف می‌شوند.
+
+    استفاده:
+    python manage.py benchmark_number_allocation
+    python manage.py benchmark_number_allocation --threads 16 --per-thread 500 --block-size 100 --json
+    """
+
+    help = 'مقایسه درج همزمان فاکتور با شماره‌گذاری قبلی و NumberAllocator'
+
+    def add_arguments(self, parser):
+        """تعریف آرگومان‌های command"""
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='تعداد thread های همزمان'
+        )
+
+        parser.add_argument(
+            '--per-thread',
+            type=int,
+            default=200,
+            help='تعداد فاکتور هر thread'
+        )
+
+        parser.add_argument(
+            '--block-size',
+            type=int,
+            default=100,
+            help='اندازه بلوک رزرو NumberAllocator'
+        )
+
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='خروجی در فرمت JSON'
+        )
+
+    def handle(self, *args, **options):
+        """اجرای بنچمارک"""
+        run_id = uuid.uuid4().hex[:6].upper()
+        user = User._default_manager.create(**{User.USERNAME_FIELD: f"bench-{run_id}"})
+        allocator = NumberAllocator(block_size=options['block_size'])
+
+        prefixes = {'legacy': f"BL{run_id}", 'allocator': f"BS{run_id}"}
+        try:
+            report = {
+                'threads': options['threads'],
+                'per_thread': options['per_thread'],
+                'block_size': options['block_size'],
+                'legacy': self._run(
+                    lambda: self._insert_legacy(user, prefixes['legacy']), options
+                ),
+                'allocator': self._run(
+                    lambda: self._insert_allocated(user, prefixes['allocator'], allocator), options
+                ),
+            }
+        finally:
+            Invoice.objects.filter(user=user).delete()
+            NumberSequence.objects.filter(prefix__in=prefixes.values()).delete()
+            user.delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"threads={report['threads']} per_thread={report['per_thread']} "
+            f"block_size={report['block_size']}"
+        )
+        for mode in ('legacy', 'allocator'):
+            result = report[mode]
+            self.stdout.write(
+                f"{mode:<10} {result['inserts_per_second']:>9} inserts/s  "
+                f"retries={result['retries']}"
+            )
+
+    def _run(self, insert, options):
+        """اجرای همزمان درج‌ها و جمع‌آوری نتایج"""
+        def worker(_):
+            retries = 0
+            try:
+                for _ in range(options['per_thread']):
+                    retries += insert()
+            finally:
+                connection.close()
+            return retries
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            retries = sum(executor.map(worker, range(options['threads'])))
+        elapsed = time.perf_counter() - started
+
+        total = options['threads'] * options['per_thread']
+        return {
+            'inserts': total,
+            'seconds': round(elapsed, 3),
+            'inserts_per_second': round(total / elapsed, 1),
+            'retries': retries,
+        }
+
+    def _insert_legacy(self, user, prefix):
+        """روش قبلی: آخرین شماره + ۱ و تلاش مجدد در صورت تکرار"""
+        retries = 0
+        while True:
+            last_invoice = Invoice.objects.filter(
+                invoice_number__startswith=prefix
+            ).order_by('-invoice_number').first()
+            number = int(last_invoice.invoice_number[len(prefix):]) + 1 if last_invoice else 1
+            if self._create(user, f"{prefix}{number:06d}"):
+                return retries
+            retries += 1
+
+    def _insert_allocated(self, user, prefix, allocator):
+        """تخصیص شماره از بلوک رزرو شده"""
+        retries = 0
+        while not self._create(user, allocator.format(prefix, width=6)):
+            retries += 1
+        return retries
+
+    def _create(self, user, invoice_number) -> bool:
+        """درج یک فاکتور؛ False در صورت تکرار شماره یا قفل دیتابیس"""
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                Invoice.objects.create(
+                    invoice_number=invoice_number,
+                    user=user,
+                    type=InvoiceType.choices[0][0],
+                    subtotal=Decimal('100000'),
+                    issue_date=now,
+                    due_date=now + timedelta(days=7),
+                )
+            return True
+        except (IntegrityError, OperationalError):
+            return False
@@ -5,11 +5,12 @@ Financial System Models
 
 from .base import BaseModel
 from .wallet import Wallet
-from .transaction import Transaction, TransactionType, TransactionStatus
+from .transaction import Transaction, TransactionType, TransactionStatus, PaymentGateway
 from .plan import SubscriptionPlan
-from .subscription import Subscription
-from .invoice import Invoice
-from .commission import Commission
+from .subscription import Subscription, SubscriptionStatus, BillingCycle, PaymentMethod
+from .invoice import Invoice, InvoiceItem, InvoiceType, InvoiceStatus
+from .sequence import NumberSequence
+from .commission import Commission, CommissionType, CommissionStatus, Settlement
 
 __all__ = [
     'BaseModel',
@@ -17,8 +18,19 @@ __all__ = [
     'Transaction',
     'TransactionType',
     'TransactionStatus',
+    'PaymentGateway',
     'SubscriptionPlan',
     'Subscription',
+    'SubscriptionStatus',
+    'BillingCycle',
+    'PaymentMethod',
     'Invoice',
+    'InvoiceItem',
+    'InvoiceType',
+    'InvoiceStatus',
     'Commission',
+    'CommissionType',
+    'CommissionStatus',
+    'Settlement',
+    'NumberSequence',
 ]
\ No newline at end of file
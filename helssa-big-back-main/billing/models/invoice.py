@@ -283,25 +283,36 @@ class Invoice(BaseModel):
         
     def generate_invoice_number(self):
         """تولید شماره فاکتور"""
+        self.invoice_number = Invoice.next_invoice_number()
+        
+    @classmethod
+    def next_invoice_number(cls) -> str:
+        """
+        تخصیص شماره فاکتور بعدی (قابل استفاده برای bulk_create)
+        
+        شماره‌ها از شمارنده ماهانه (NumberAllocator) تخصیص داده می‌شوند؛
+        در اولین تخصیص هر ماه، شمارنده از آخرین شماره موجود ادامه می‌یابد.
+        """
         from django.utils import timezone
+        from ..services.number_allocator import get_number_allocator
         
         now = timezone.now()
-        year = now.strftime('%Y')
-        month = now.strftime('%m')
+        prefix = f"INV{now.strftime('%Y')}{now.strftime('%m')}"
+        
+        return get_number_allocator().format(
+            prefix, initial=lambda: cls._last_invoice_sequence(prefix) + 1
+        )
         
-        # یافتن آخرین شماره فاکتور در ماه جاری
-        prefix = f"INV{year}{month}"
+    @staticmethod
+    def _last_invoice_sequence(prefix: str) -> int:
+        """آخرین شماره فاکتور موجود با پیشوند (فقط هنگام ایجاد شمارنده)"""
         last_invoice = Invoice.objects.filter(
             invoice_number__startswith=prefix
         ).order_by('-invoice_number').first()
         
         if last_invoice:
-            last_number = int(last_invoice.invoice_number[-4:])
-            new_number = last_number + 1
-        else:
-            new_number = 1
-            
-        self.invoice_number = f"{prefix}{new_number:04d}"
+            return int(last_invoice.invoice_number[len(prefix):])
+        return 0
         
     def save(self, *args, **kwargs):
         """ذخیره با تولید شماره فاکتور"""
@@ -0,0 +1,39 @@
+"""
+مدل شمارنده شماره‌های تولیدی
+Number Sequence Model
+"""
+
+from django.db import models
+
+
+class NumberSequence(models.Model):
+    """
+    شمارنده هر پیشوند (مثلاً INV202601 یا TXN20260115)
+
+    مقدار بعدی قابل تخصیص نگهداری می‌شود و NumberAllocator بلوک‌هایی از
+    آن را با قفل سطری رزرو می‌کند.
+    """
+
+    prefix = models.CharField(
+        max_length=50,
+        primary_key=True,
+        verbose_name='پیشوند'
+    )
+
+    next_value = models.BigIntegerField(
+        default=1,
+        verbose_name='مقدار بعدی'
+    )
+
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='زمان آخرین به‌روزرسانی'
+    )
+
+    class Meta:
+        db_table = 'billing_number_sequences'
+        verbose_name = 'شمارنده شماره'
+        verbose_name_plural = 'شمارنده‌های شماره'
+
+    def __str__(self):
+        return f"{self.prefix} - {self.next_value}"
@@ -120,6 +120,12 @@ class Subscription(BaseModel):
         help_text='آمار استفاده از ویژگی‌های پلن'
     )
     
+    usage_period = models.PositiveIntegerField(
+        default=0,
+        verbose_name='دوره استفاده',
+        help_text='با هر ریست آمار استفاده افزایش می‌یابد (کلید شمارنده‌های Redis)'
+    )
+    
     # تخفیفات
     discount_percent = models.DecimalField(
         max_digits=5,
@@ -252,18 +258,26 @@ class Subscription(BaseModel):
         return current_usage + amount <= limit
         
     def use_feature(self, feature: str, amount: int = 1) -> bool:
-        """استفاده از ویژگی و به‌روزرسانی آمار"""
-        if not self.can_use_feature(feature, amount):
+        """
+        استفاده از ویژگی و به‌روزرسانی آمار
+        
+        شمارش به صورت اتمیک در شمارنده دوره جاری (UsageMeter) انجام
+        می‌شود و usage_data به صورت دوره‌ای توسط reconciler به‌روز می‌شود.
+        """
+        if not self.is_active:
             return False
             
-        current_usage = self.get_usage(feature)
-        self.usage_data[feature] = current_usage + amount
-        self.save()
-        return True
+        from ..services.usage_meter import get_usage_meter
+        return get_usage_meter().consume_for_subscription(self, feature, amount).allowed
         
     def reset_usage(self):
-        """ریست کردن آمار استفاده (معمولاً در شروع دوره جدید)"""
+        """
+        ریست کردن آمار استفاده (معمولاً در شروع دوره جدید)
+        
+        افزایش usage_period همه شمارنده‌های دوره قبل را یکجا کنار می‌گذارد.
+        """
         self.usage_data = {}
+        self.usage_period += 1
         self.save()
         
     def extend_subscription(self, days: int):
@@ -12,6 +12,9 @@ from .commission_service import CommissionService
 from .invoice_service import InvoiceService
 from .notification_service import NotificationService
 from .security_service import SecurityService
+from .number_allocator import NumberAllocator, get_number_allocator
+from .renewal_engine import RenewalEngine
+from .usage_meter import UsageMeter, get_usage_meter
 
 __all__ = [
     'BaseService',
@@ -23,4 +26,9 @@ __all__ = [
     'InvoiceService',
     'NotificationService',
     'SecurityService',
+    'NumberAllocator',
+    'get_number_allocator',
+    'RenewalEngine',
+    'UsageMeter',
+    'get_usage_meter',
 ]
\ No newline at end of file
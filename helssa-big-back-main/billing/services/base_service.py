@@ -298,20 +298,24 @@ class BaseService:
         """
         تولید شماره مرجع یکتا
         
+        شماره ترتیبی از شمارنده روزانه پیشوند (NumberAllocator) تخصیص داده
+        می‌شود و یک بخش تصادفی شش رقمی به آن اضافه می‌شود تا شماره مرجع‌های
+        بعدی از روی یک شماره قابل حدس نباشند.
+        
         Args:
             prefix: پیشوند (پیش‌فرض: REF)
             
         Returns:
             str: شماره مرجع
         """
-        import random
-        import string
-        from datetime import datetime
-        
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        random_part = ''.join(random.choices(string.digits, k=6))
+        import secrets
+        from django.utils import timezone
+        from .number_allocator import get_number_allocator
         
-        return f"{prefix}{timestamp}{random_part}"
+        sequence = get_number_allocator().format(
+            f"{prefix}{timezone.now().strftime('%Y%m%d')}", width=8
+        )
+        return f"{sequence}{secrets.randbelow(10 ** 6):06d}"
     
     def sanitize_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
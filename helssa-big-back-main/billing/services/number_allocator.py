@@ -0,0 +1,216 @@
+"""
+تخصیص شماره‌های ترتیبی (فاکتور، مرجع تراکنش و ...)
+Sequential Number Allocation
+
+برای هر پیشوند یک ردیف در ``NumberSequence`` نگهداری می‌شود. هر thread
+بلوکی از شماره‌ها (پیش‌فرض ۱۰۰ عدد) را در یک تراکنش کوتاه با قفل سطری
+رزرو می‌کند و شماره‌های بعدی بدون مراجعه به دیتابیس از همان بلوک داده
+می‌شوند. شماره‌ها یکتا هستند ولی ممکن است بین بلوک‌ها فاصله ایجاد شود.
+
+اگر فراخواننده داخل یک تراکنش باز باشد، بلوک روی یک اتصال جداگانه
+(autocommit) رزرو و بلافاصله commit می‌شود تا قفل شمارنده تا پایان
+تراکنش فراخواننده نگه داشته نشود و rollback آن بلوک را دوباره آزاد نکند.
+SQLite در هر لحظه فقط یک نویسنده می‌پذیرد و اتصال دوم پشت قفل نوشتن
+همان تراکنش می‌ماند؛ در آن حالت فقط یک شماره داخل تراکنش فراخواننده
+رزرو و بلوکی نگه داشته نمی‌شود.
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import NumberSequence
+
+
+logger = logging.getLogger(__name__)
+
+
+class NumberBlock:
+    """بلوک رزرو و commit شده [next_value, end) از یک پیشوند"""
+
+    def __init__(self, start: int, end: int):
+        self.next_value = start
+        self.end = end
+
+    def is_usable(self) -> bool:
+        """آیا شماره‌ای در بلوک باقی مانده است؟"""
+        return self.next_value < self.end
+
+    def take(self) -> int:
+        """برداشتن شماره بعدی"""
+        value = self.next_value
+        self.next_value += 1
+        return value
+
+
+class NumberAllocator:
+    """
+    تخصیص‌دهنده شماره‌های ترتیبی با رزرو بلوکی
+
+    Args:
+        block_size: تعداد شماره‌های رزرو شده در هر مراجعه به دیتابیس
+            (``BILLING_NUMBER_BLOCK_SIZE``، پیش‌فرض ۱۰۰)
+    """
+
+    def __init__(self, block_size: Optional[int] = None):
+        self.logger = logging.getLogger(__name__)
+        self.block_size = block_size or getattr(settings, 'BILLING_NUMBER_BLOCK_SIZE', 100)
+        self._local = threading.local()
+
+    def allocate(
+        self,
+        prefix: str,
+        block_size: Optional[int] = None,
+        initial: Optional[Callable[[], int]] = None,
+    ) -> int:
+        """
+        تخصیص شماره بعدی یک پیشوند
+
+        Args:
+            prefix: پیشوند شمارنده
+            block_size: اندازه بلوک برای این پیشوند (۱ برای شماره‌های بدون فاصله)
+            initial: تابع محاسبه اولین مقدار هنگام ایجاد شمارنده
+                (مثلاً ادامه شماره‌های موجود پیش از این سرویس)
+
+        Returns:
+            int: شماره یکتا
+        """
+        blocks = self._blocks()
+        block = blocks.get(prefix)
+        if block is not None and block.is_usable():
+            return block.take()
+
+        connection = transaction.get_connection()
+        if connection.in_atomic_block and connection.vendor == 'sqlite':
+            # شماره همراه تراکنش فراخواننده commit یا rollback می‌شود و نگه داشته نمی‌شود
+            return self._reserve_in_transaction(prefix, 1, initial)
+
+        size = block_size or self.block_size
+        if connection.in_atomic_block:
+            start = self._reserve_detached(connection.alias, prefix, size, initial)
+        else:
+            start = self._reserve_in_transaction(prefix, size, initial)
+        block = blocks[prefix] = NumberBlock(start, start + size)
+        return block.take()
+
+    def format(self, prefix: str, width: int = 4, **kwargs) -> str:
+        """تخصیص شماره و ساخت رشته ``{prefix}{number}`` با حداقل عرض"""
+        return f"{prefix}{self.allocate(prefix, **kwargs):0{width}d}"
+
+    def discard(self, prefix: Optional[str] = None):
+        """کنار گذاشتن بلوک‌های رزرو شده این thread"""
+        if prefix is None:
+            self._blocks().clear()
+        else:
+            self._blocks().pop(prefix, None)
+
+    def _blocks(self) -> Dict[str, NumberBlock]:
+        """بلوک‌های thread جاری"""
+        blocks = getattr(self._local, 'blocks', None)
+        if blocks is None:
+            blocks = self._local.blocks = {}
+        return blocks
+
+    def _reserve_in_transaction(self, prefix: str, size: int,
+                                initial: Optional[Callable[[], int]]) -> int:
+        """رزرو بلوک با قفل سطری روی اتصال جاری و بازگرداندن ابتدای آن"""
+        with transaction.atomic():
+            start = self._advance(prefix, size)
+            if start is None:
+                start = self._create_sequence(prefix, size, initial)
+        return start
+
+    def _advance(self, prefix: str, size: int) -> Optional[int]:
+        """
+        جلو بردن شمارنده به اندازه یک بلوک و بازگرداندن ابتدای بلوک
+
+        UPDATE پیش از خواندن اجرا می‌شود تا قفل سطر از ابتدا گرفته شود
+        (معادل SELECT ... FOR UPDATE بدون رفت‌وبرگشت اضافه).
+        """
+        sequences = NumberSequence.objects.filter(prefix=prefix)
+        if not sequences.update(next_value=F('next_value') + size):
+            return None
+        return sequences.values_list('next_value', flat=True).get() - size
+
+    def _create_sequence(self, prefix: str, size: int,
+                         initial: Optional[Callable[[], int]]) -> int:
+        """ایجاد شمارنده جدید (یا رزرو از شمارنده‌ای که همزمان ایجاد شده)"""
+        start = max(int(initial()), 1) if initial else 1
+        try:
+            with transaction.atomic():
+                NumberSequence.objects.create(prefix=prefix, next_value=start + size)
+            return start
+        except IntegrityError:
+            return self._advance(prefix, size)
+
+
+    def _reserve_detached(self, alias: str, prefix: str, size: int,
+                          initial: Optional[Callable[[], int]]) -> int:
+        """
+        رزرو بلوک روی اتصال جداگانه thread، مستقل از تراکنش فراخواننده
+
+        اگر شمارنده همزمان توسط اتصال دیگری ایجاد شود، رزرو یک بار دیگر
+        با UPDATE تکرار می‌شود.
+        """
+        connection = self._detached_connection(alias)
+        table = connection.ops.quote_name(NumberSequence._meta.db_table)
+
+        for attempt in range(2):
+            connection.set_autocommit(False)
+            try:
+                with connection.cursor() as cursor:
+                    now = connection.ops.adapt_datetimefield_value(timezone.now())
+                    cursor.execute(
+                        f"UPDATE {table} SET next_value = next_value + %s, updated_at = %s WHERE prefix = %s",
+                        [size, now, prefix]
+                    )
+                    if cursor.rowcount:
+                        cursor.execute(f"SELECT next_value FROM {table} WHERE prefix = %s", [prefix])
+                        start = cursor.fetchone()[0] - size
+                    else:
+                        start = max(int(initial()), 1) if initial else 1
+                        cursor.execute(
+                            f"INSERT INTO {table} (prefix, next_value, updated_at) VALUES (%s, %s, %s)",
+                            [prefix, start + size, now]
+                        )
+                connection.commit()
+                return start
+            except IntegrityError:
+                connection.rollback()
+                if attempt:
+                    raise
+            except Exception:
+                connection.rollback()
+                raise
+            finally:
+                connection.set_autocommit(True)
+
+    def _detached_connection(self, alias: str):
+        """اتصال جداگانه thread جاری به پایگاه داده ``alias``"""
+        detached = getattr(self._local, 'connections', None)
+        if detached is None:
+            detached = self._local.connections = {}
+        if alias not in detached:
+            detached[alias] = connections.create_connection(alias)
+        # مانند اتصال‌های Django: بستن پس از CONN_MAX_AGE یا خطا (اتصال بعدی خودکار باز می‌شود)
+        detached[alias].close_if_unusable_or_obsolete()
+        return detached[alias]
+
+
+_number_allocator: Optional[NumberAllocator] = None
+_number_allocator_lock = threading.Lock()
+
+
+def get_number_allocator() -> NumberAllocator:
+    """دریافت نمونه مشترک NumberAllocator در پردازه"""
+    global _number_allocator
+    if _number_allocator is None:
+        with _number_allocator_lock:
+            if _number_allocator is None:
+                _number_allocator = NumberAllocator()
+    return _number_allocator
@@ -0,0 +1,366 @@
+"""
+موتور تمدید دسته‌ای اشتراک‌ها
+Batch Subscription Renewal Engine
+
+اشتراک‌های سررسید شده به صورت دسته‌ای با ``select_for_update(skip_locked=True)``
+برداشته می‌شوند تا چند worker به صورت موازی روی دسته‌های جدا کار کنند.
+در هر دسته:
+
+- قیمت‌ها از پلن‌های cache شده محاسبه می‌شوند
+- کیف پول و محدودیت‌های برداشت با همان اعتبارسنجی WalletService بررسی می‌شوند
+- برداشت از کیف پول‌ها با یک UPDATE برای هر مبلغ یکسان انجام می‌شود
+- تراکنش‌ها و فاکتورها با ``bulk_create`` و اشتراک‌ها با ``bulk_update`` نوشته می‌شوند؛
+  شماره فاکتورها پیش از شروع تراکنش دسته رزرو می‌شوند (شماره‌های استفاده نشده
+  فاصله ایجاد می‌کنند)
+- شماره مرجع هر تراکنش از (اشتراک، تاریخ صورت‌حساب) ساخته می‌شود و کلید
+  یکتایی تمدید هر دوره است؛ بنابراین هر دوره حداکثر یک بار پرداخت می‌شود
+"""
+
+import time
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction as db_transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .base_service import BaseService
+from .usage_meter import invalidate_usage_state
+from .wallet_service import WalletService
+from ..models import (
+    Invoice, InvoiceStatus, InvoiceType, PaymentGateway, Subscription,
+    SubscriptionPlan, SubscriptionStatus, BillingCycle, Transaction,
+    TransactionStatus, TransactionType, Wallet
+)
+
+User = get_user_model()
+
+PLAN_CACHE_PREFIX = 'billing:plan'
+
+
+def renewal_reference(subscription: Subscription) -> str:
+    """کلید یکتایی تمدید یک دوره (شماره مرجع تراکنش)"""
+    return f"RNW{subscription.id.hex}{subscription.next_billing_date.strftime('%Y%m%d%H%M')}"
+
+
+def plan_cache_key(plan_id) -> str:
+    """کلید cache پلن"""
+    return f"{PLAN_CACHE_PREFIX}:{plan_id}"
+
+
+def invalidate_plan_cache(plan_id):
+    """حذف پلن از cache (پس از تغییر قیمت یا محدودیت‌ها)"""
+    cache.delete(plan_cache_key(plan_id))
+
+
+class RenewalEngine(BaseService):
+    """
+    موتور تمدید دسته‌ای اشتراک‌های سررسید شده
+
+    Args:
+        chunk_size: تعداد اشتراک‌های هر دسته (``BILLING_RENEWAL_CHUNK_SIZE``، پیش‌فرض ۲۰۰)
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None):
+        super().__init__()
+        self.chunk_size = chunk_size or getattr(settings, 'BILLING_RENEWAL_CHUNK_SIZE', 200)
+        self.plan_cache_ttl = getattr(settings, 'BILLING_PLAN_CACHE_TTL', 300)
+
+    def due_queryset(self, now=None):
+        """اشتراک‌های فعال با تمدید خودکار که سررسید شده‌اند"""
+        return Subscription.objects.filter(
+            status=SubscriptionStatus.ACTIVE,
+            auto_renew=True,
+            next_billing_date__lte=now or timezone.now()
+        )
+
+    def count_due(self) -> int:
+        """تعداد اشتراک‌های سررسید شده"""
+        return self.due_queryset().count()
+
+    def run(self, max_chunks: Optional[int] = None) -> Dict[str, Any]:
+        """
+        پردازش دسته‌ها تا اتمام اشتراک‌های سررسید شده (در همین پردازه)
+
+        Args:
+            max_chunks: حداکثر تعداد دسته
+
+        Returns:
+            Dict: مجموع آمار همه دسته‌ها
+        """
+        started = time.perf_counter()
+        totals = {'chunks': 0, 'processed': 0, 'renewed': 0, 'failed': 0, 'skipped': 0}
+
+        while max_chunks is None or totals['chunks'] < max_chunks:
+            stats = self.process_chunk()
+            if not stats['processed']:
+                break
+            totals['chunks'] += 1
+            for key in ('processed', 'renewed', 'failed', 'skipped'):
+                totals[key] += stats[key]
+
+        return self._with_rate(totals, time.perf_counter() - started)
+
+    def process_chunk(self, chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        برداشتن و تمدید یک دسته از اشتراک‌های سررسید شده
+
+        همه تغییرات یک دسته در یک تراکنش انجام می‌شود؛ ردیف‌های قفل شده توسط
+        worker های دیگر رد می‌شوند.
+
+        Args:
+            chunk_size: تعداد اشتراک‌های دسته
+
+        Returns:
+            Dict: آمار دسته (processed, renewed, failed, skipped, renewals_per_second)
+        """
+        started = time.perf_counter()
+        now = timezone.now()
+
+        # رزرو شماره فاکتورها خارج از تراکنش دسته تا قفل شمارنده تا پایان دسته نگه داشته نشود
+        due = self.due_queryset(now).values('id')[:chunk_size or self.chunk_size].count()
+        if not due:
+            return self._with_rate({'processed': 0, 'renewed': 0, 'failed': 0, 'skipped': 0}, 0)
+        invoice_numbers = [Invoice.next_invoice_number() for _ in range(due)]
+
+        with db_transaction.atomic():
+            subscriptions = list(
+                self.due_queryset(now)
+                .select_for_update(skip_locked=True)
+                .order_by('next_billing_date')[:due]
+            )
+            if not subscriptions:
+                return self._with_rate(
+                    {'processed': 0, 'renewed': 0, 'failed': 0, 'skipped': 0}, 0
+                )
+
+            plans = self.get_plans({subscription.plan_id for subscription in subscriptions})
+            for subscription in subscriptions:
+                subscription.plan = plans[subscription.plan_id]
+
+            references = {subscription.id: renewal_reference(subscription) for subscription in subscriptions}
+            already_paid = set(
+                Transaction.objects.filter(
+                    reference_number__in=references.values()
+                ).values_list('reference_number', flat=True)
+            )
+
+            wallets = {
+                wallet.user_id: wallet
+                for wallet in Wallet.objects.select_for_update(of=('self',)).select_related('user').filter(
+                    user_id__in={subscription.user_id for subscription in subscriptions}
+                ).order_by('id')
+            }
+            wallet_service = WalletService()
+            withdrawal_totals = wallet_service.get_withdrawal_totals(wallets.values())
+
+            renewed, failed, skipped = [], [], []
+            charges = defaultdict(Decimal)
+            for subscription in subscriptions:
+                if references[subscription.id] in already_paid:
+                    # این دوره قبلاً پرداخت شده است؛ فقط تاریخ‌ها جلو می‌روند
+                    skipped.append(subscription)
+                    continue
+
+                price = subscription.effective_price
+                wallet = wallets.get(subscription.user_id)
+                if price > 0:
+                    success, result = self._validate_payment(
+                        wallet_service, wallet, price, charges, withdrawal_totals
+                    )
+                    if not success:
+                        failed.append((subscription, result['message']))
+                        continue
+                    charges[wallet.id] += price
+
+                renewed.append((subscription, wallet, price))
+
+            self._debit_wallets(charges, now)
+            self._write_payments(renewed, references, invoice_numbers, now)
+            self._extend([subscription for subscription, _, _ in renewed] + skipped, now)
+
+            if failed:
+                Subscription.objects.filter(
+                    id__in=[subscription.id for subscription, _ in failed]
+                ).update(status=SubscriptionStatus.PAST_DUE, updated_at=now)
+
+            user_ids = [subscription.user_id for subscription in subscriptions]
+            db_transaction.on_commit(lambda: invalidate_usage_state(*user_ids))
+            if failed:
+                db_transaction.on_commit(lambda: self._notify_failures(failed))
+
+        stats = self._with_rate({
+            'processed': len(subscriptions),
+            'renewed': len(renewed),
+            'failed': len(failed),
+            'skipped': len(skipped),
+        }, time.perf_counter() - started)
+
+        self.logger.info(
+            f"Renewal chunk: {stats['renewed']} renewed, {stats['failed']} failed, "
+            f"{stats['skipped']} skipped ({stats['renewals_per_second']}/s)"
+        )
+        return stats
+
+    def get_plans(self, plan_ids: Iterable) -> Dict[Any, SubscriptionPlan]:
+        """
+        دریافت پلن‌ها از cache (و بارگذاری پلن‌های موجود نبودن در cache با یک پرس‌وجو)
+        """
+        plan_ids = list(plan_ids)
+        cached = cache.get_many([plan_cache_key(plan_id) for plan_id in plan_ids])
+        plans = {plan.id: plan for plan in cached.values()}
+
+        missing = [plan_id for plan_id in plan_ids if plan_id not in plans]
+        if missing:
+            loaded = SubscriptionPlan.objects.in_bulk(missing)
+            cache.set_many(
+                {plan_cache_key(plan_id): plan for plan_id, plan in loaded.items()},
+                self.plan_cache_ttl
+            )
+            plans.update(loaded)
+
+        return plans
+
+    def _validate_payment(self, wallet_service: WalletService, wallet: Optional[Wallet],
+                          price: Decimal, charges: Dict[Any, Decimal],
+                          withdrawal_totals: Dict) -> tuple:
+        """
+        اعتبارسنجی برداشت مبلغ تمدید (مانند WalletService.withdraw)
+
+        Args:
+            wallet_service: سرویس کیف پول
+            wallet: کیف پول قفل شده کاربر
+            price: مبلغ تمدید
+            charges: مبالغ برداشت شده از هر کیف پول در همین دسته
+            withdrawal_totals: خروجی WalletService.get_withdrawal_totals
+
+        Returns:
+            Tuple[bool, Dict]: نتیجه اعتبارسنجی
+        """
+        if wallet is None:
+            return self.error_response('wallet_not_found', 'کیف پول یافت نشد')
+
+        success, result = wallet_service.validate_wallet(wallet.user)
+        if not success:
+            return success, result
+
+        charged = charges[wallet.id]
+        if wallet.available_balance - charged < price:
+            return self.error_response('insufficient_balance', 'موجودی کیف پول کافی نیست')
+
+        daily_total, monthly_total = withdrawal_totals.get(wallet.id, (Decimal('0'), Decimal('0')))
+        return wallet_service._validate_withdrawal(
+            wallet, price, (daily_total + charged, monthly_total + charged)
+        )
+
+    def _debit_wallets(self, charges: Dict[Any, Decimal], now):
+        """برداشت از کیف پول‌ها؛ یک UPDATE برای هر مبلغ یکسان"""
+        by_amount = defaultdict(list)
+        for wallet_id, amount in charges.items():
+            by_amount[amount].append(wallet_id)
+
+        for amount, wallet_ids in by_amount.items():
+            updated = Wallet.objects.filter(
+                id__in=wallet_ids,
+                balance__gte=F('blocked_balance') + amount
+            ).update(
+                balance=F('balance') - amount,
+                last_transaction_at=now,
+                updated_at=now
+            )
+            if updated != len(wallet_ids):
+                # کیف پول‌ها قفل شده‌اند؛ عدم تطابق یعنی تغییر خارج از قفل
+                raise RuntimeError('wallet balance changed during renewal')
+
+    def _write_payments(self, renewed: List, references: Dict, invoice_numbers: List[str], now):
+        """ثبت تراکنش‌ها و فاکتورهای پرداخت شده با bulk_create (با شماره‌های از پیش رزرو شده)"""
+        transactions, invoices = [], []
+        for (subscription, wallet, price), invoice_number in zip(renewed, invoice_numbers):
+            reference = references[subscription.id]
+            period = {
+                'payment_type': 'subscription_renewal',
+                'subscription_id': str(subscription.id),
+                'billing_date': subscription.next_billing_date.isoformat(),
+            }
+
+            if price > 0:
+                transactions.append(Transaction(
+                    wallet=wallet,
+                    amount=-price,
+                    type=TransactionType.SUBSCRIPTION,
+                    status=TransactionStatus.COMPLETED,
+                    reference_number=reference,
+                    gateway=PaymentGateway.WALLET,
+                    description=f"تمدید اشتراک {subscription.plan.name}",
+                    completed_at=now,
+                    metadata=period,
+                ))
+
+            invoices.append(Invoice(
+                invoice_number=invoice_number,
+                user_id=subscription.user_id,
+                type=InvoiceType.SUBSCRIPTION,
+                status=InvoiceStatus.PAID,
+                subtotal=price,
+                total_amount=price,
+                paid_amount=price,
+                issue_date=now,
+                due_date=now,
+                paid_at=now,
+                subscription=subscription,
+                description=f"تمدید اشتراک {subscription.plan.name}",
+                payment_method=PaymentGateway.WALLET,
+                payment_reference=reference,
+                metadata=period,
+            ))
+
+        Transaction.objects.bulk_create(transactions)
+        Invoice.objects.bulk_create(invoices)
+
+    def _extend(self, subscriptions: List[Subscription], now):
+        """جلو بردن دوره اشتراک‌ها و شروع دوره استفاده جدید با bulk_update"""
+        for subscription in subscriptions:
+            days = 30 if subscription.billing_cycle == BillingCycle.MONTHLY else 365
+            subscription.end_date += timedelta(days=days)
+            subscription.next_billing_date += timedelta(days=days)
+            subscription.status = SubscriptionStatus.ACTIVE
+            subscription.usage_data = {}
+            subscription.usage_period += 1
+            subscription.updated_at = now
+
+        Subscription.objects.bulk_update(
+            subscriptions,
+            ['end_date', 'next_billing_date', 'status', 'usage_data', 'usage_period', 'updated_at']
+        )
+
+    def _notify_failures(self, failed: List):
+        """ارسال اعلان و ثبت لاگ شکست پرداخت (پس از commit)"""
+        from .notification_service import NotificationService
+        notification_service = NotificationService()
+
+        users = User.objects.in_bulk([subscription.user_id for subscription, _ in failed])
+        for subscription, error_message in failed:
+            subscription.user = users.get(subscription.user_id)
+            try:
+                notification_service.send_payment_failure_notification(
+                    subscription, error_message
+                )
+            except Exception as e:
+                self.logger.error(f"خطا در ارسال اعلان شکست پرداخت: {str(e)}")
+
+            self.log_operation('payment_failure', subscription.user, {
+                'subscription_id': str(subscription.id),
+                'error': error_message
+            })
+
+    @staticmethod
+    def _with_rate(stats: Dict[str, Any], seconds: float) -> Dict[str, Any]:
+        """افزودن مدت و نرخ تمدید در ثانیه به آمار"""
+        stats['seconds'] = round(seconds, 3)
+        stats['renewals_per_second'] = round(stats['renewed'] / seconds, 1) if seconds else 0
+        return stats
@@ -12,6 +12,7 @@ from django.contrib.auth import get_user_model
 from celery import shared_task
 
 from .base_service import BaseService
+from .usage_meter import MeterState, get_usage_meter
 from ..models import (
     Subscription, SubscriptionPlan, SubscriptionStatus,
     BillingCycle, PaymentMethod
@@ -316,45 +317,39 @@ class SubscriptionService(BaseService):
             Tuple[bool, Dict]: نتیجه بررسی
         """
         try:
-            user = User.objects.get(id=user_id)
-            subscription = self._get_active_subscription(user)
+            # وضعیت اشتراک از cache خوانده می‌شود و مصرف در شمارنده اتمیک ثبت می‌شود
+            meter = get_usage_meter()
+            state = meter.get_state(user_id)
             
-            if not subscription:
+            if state is None:
+                if not User.objects.filter(id=user_id).exists():
+                    return self.error_response('user_not_found', 'کاربر یافت نشد')
                 return self.error_response(
                     'no_active_subscription',
                     'اشتراک فعالی یافت نشد'
                 )
             
-            # بررسی محدودیت
-            can_use = subscription.can_use_feature(resource, amount)
+            decision = meter.consume(state, resource, amount)
             
-            if can_use:
-                # استفاده از منبع
-                subscription.use_feature(resource, amount)
-                
+            if decision.allowed:
                 return self.success_response({
                     'allowed': True,
-                    'current_usage': subscription.get_usage(resource),
-                    'limit': subscription.get_limit(resource),
-                    'remaining': subscription.get_limit(resource) - subscription.get_usage(resource)
+                    'current_usage': decision.current_usage,
+                    'limit': decision.limit,
+                    'remaining': decision.remaining
                 }, 'استفاده مجاز است')
             else:
-                limit = subscription.get_limit(resource)
-                current_usage = subscription.get_usage(resource)
-                
                 return self.error_response(
                     'usage_limit_exceeded',
-                    f'از محدودیت {resource} تجاوز کرده‌اید. محدودیت: {limit}, استفاده فعلی: {current_usage}',
+                    f'از محدودیت {resource} تجاوز کرده‌اید. محدودیت: {decision.limit}, استفاده فعلی: {decision.current_usage}',
                     {
                         'resource': resource,
-                        'limit': limit,
-                        'current_usage': current_usage,
+                        'limit': decision.limit,
+                        'current_usage': decision.current_usage,
                         'requested_amount': amount
                     }
                 )
                 
-        except User.DoesNotExist:
-            return self.error_response('user_not_found', 'کاربر یافت نشد')
         except Exception as e:
             self.logger.error(f"خطا در بررسی محدودیت: {str(e)}")
             return self.error_response(
@@ -409,10 +404,14 @@ class SubscriptionService(BaseService):
                 'coupon_code': subscription.coupon_code
             }
             
-            # محاسبه آمار استفاده
+            # محاسبه آمار استفاده (شمارنده‌های دوره جاری بر usage_data مقدم‌اند)
             usage_stats = {}
+            current_usages = get_usage_meter().get_usage(
+                MeterState.from_subscription(subscription),
+                list(subscription.plan.limits)
+            )
             for feature, limit in subscription.plan.limits.items():
-                current_usage = subscription.get_usage(feature)
+                current_usage = current_usages[feature]
                 usage_stats[feature] = {
                     'current': current_usage,
                     'limit': limit,
@@ -611,65 +610,25 @@ class SubscriptionService(BaseService):
     
     @shared_task
     def process_recurring_payments(self):
-        """پردازش پرداخت‌های دوره‌ای"""
+        """
+        پردازش پرداخت‌های دوره‌ای
+        
+        تمدید به صورت دسته‌ای توسط RenewalEngine انجام می‌شود؛ برای اجرای
+        موازی دسته‌ها در چند worker از billing.tasks.process_recurring_payments
+        استفاده کنید.
+        """
         
         try:
-            # اشتراک‌هایی که باید تمدید شوند
-            due_subscriptions = Subscription.objects.filter(
-                status=SubscriptionStatus.ACTIVE,
-                auto_renew=True,
-                next_billing_date__lte=timezone.now()
-            ).select_related('user', 'plan')
-            
-            renewed_count = 0
-            failed_count = 0
-            
-            for subscription in due_subscriptions:
-                try:
-                    service = SubscriptionService()
-                    success, result = service.renew_subscription(str(subscription.id))
-                    
-                    if success:
-                        renewed_count += 1
-                    else:
-                        failed_count += 1
-                        self._handle_payment_failure(subscription, result.get('message', ''))
-                        
-                except Exception as e:
-                    failed_count += 1
-                    self.logger.error(f"خطا در تمدید اشتراک {subscription.id}: {str(e)}")
-                    self._handle_payment_failure(subscription, str(e))
+            from .renewal_engine import RenewalEngine
+            stats = RenewalEngine().run()
             
-            self.logger.info(f"Recurring payments processed: {renewed_count} renewed, {failed_count} failed")
+            self.logger.info(
+                f"Recurring payments processed: {stats['renewed']} renewed, "
+                f"{stats['failed']} failed ({stats['renewals_per_second']}/s)"
+            )
             
-            return {
-                'processed': len(due_subscriptions),
-                'renewed': renewed_count,
-                'failed': failed_count
-            }
+            return stats
             
         except Exception as e:
             self.logger.error(f"خطا در پردازش پرداخت‌های دوره‌ای: {str(e)}")
             return {'error': str(e)}
-    
-    def _handle_payment_failure(self, subscription: Subscription, error_message: str):
-        """مدیریت شکست پرداخت"""
-        try:
-            # تغییر وضعیت به معوق
-            subscription.mark_past_due()
-            
-            # ارسال اعلان
-            from .notification_service import NotificationService
-            notification_service = NotificationService()
-            
-            notification_service.send_payment_failure_notification(
-                subscription, error_message
-            )
-            
-            self.log_operation('payment_failure', subscription.user, {
-                'subscription_id': str(subscription.id),
-                'error': error_message
-            })
-            
-        except Exception as e:
-            self.logger.error(f"خطا در مدیریت شکست پرداخت: {str(e)}")
\ No newline at end of file
@@ -3,6 +3,7 @@
 Transaction Management Service
 """
 
+import datetime
 from decimal import Decimal
 from typing import Dict, Any, Optional, Tuple, List
 from django.db import transaction as db_transaction
@@ -468,7 +469,7 @@ class TransactionService(BaseService):
                 'خطا در بازگشت تراکنش'
             )
     
-    def get_daily_summary(self, wallet_id: str, date: timezone.date = None) -> Tuple[bool, Dict[str, Any]]:
+    def get_daily_summary(self, wallet_id: str, date: Optional[datetime.date] = None) -> Tuple[bool, Dict[str, Any]]:
         """
         خلاصه تراکنش‌های روزانه
         
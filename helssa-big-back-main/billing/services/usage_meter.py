@@ -0,0 +1,457 @@
+"""
+سنجش اتمیک استفاده از ویژگی‌های اشتراک
+Atomic Subscription Usage Metering
+
+شمارنده هر ویژگی در Redis با کلید (اشتراک، دوره استفاده، ویژگی)
+نگهداری می‌شود و بررسی محدودیت و افزایش آن در یک اسکریپت Lua انجام
+می‌شود؛ بنابراین درخواست‌های همزمان هرگز بیش از محدودیت پذیرفته نمی‌شوند.
+
+- محدودیت‌های پلن و اشتراک هر کاربر در cache نگهداری می‌شوند تا بررسی
+  استفاده بدون پرس‌وجوی دیتابیس انجام شود.
+- کلیدهای تغییر کرده در یک مجموعه dirty ثبت و به صورت دوره‌ای توسط
+  ``UsageMeter.flush`` به صورت دسته‌ای در ``Subscription.usage_data`` نوشته
+  می‌شوند.
+- با ``Subscription.reset_usage`` مقدار ``usage_period`` افزایش می‌یابد و
+  همه درخواست‌های بعدی یکجا به شمارنده‌های دوره جدید می‌روند.
+- اگر cache پیش‌فرض Redis نباشد شمارنده مشترکی بین پردازه‌ها (وب و
+  worker) وجود ندارد؛ در این حالت هر مصرف با قفل سطری مستقیماً در
+  ``usage_data`` ثبت می‌شود و flush کاری انجام نمی‌دهد.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from helssa.shared_backends import ProcessSingleton, get_shared_redis_connection
+
+from ..models import Subscription, SubscriptionStatus
+
+
+logger = logging.getLogger(__name__)
+
+
+COUNTER_PREFIX = 'billing:usage'
+DIRTY_KEY = 'billing:usage:dirty'
+STATE_CACHE_PREFIX = 'billing:usage:state'
+
+# اسکریپت مصرف: اگر شمارنده وجود نداشته باشد از مقدار ذخیره شده در
+# دیتابیس (seed) شروع می‌شود؛ بررسی محدودیت، افزایش، تمدید TTL و ثبت
+# کلید در مجموعه dirty در یک فراخوانی اتمیک انجام می‌شود.
+CONSUME_LUA = """
+local key = KEYS[1]
+local dirty = KEYS[2]
+local amount = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local seed = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+local value = redis.call('GET', key)
+local current = seed
+if value then
+    current = tonumber(value)
+end
+if limit >= 0 and current + amount > limit then
+    return {0, current}
+end
+if value then
+    current = redis.call('INCRBY', key, amount)
+    redis.call('EXPIRE', key, ttl)
+else
+    current = current + amount
+    redis.call('SET', key, current, 'EX', ttl)
+end
+redis.call('SADD', dirty, key)
+return {1, current}
+"""
+
+
+@dataclass
+class MeterState:
+    """
+    وضعیت اشتراک فعال یک کاربر برای سنجش استفاده
+
+    Attributes:
+        subscription_id: شناسه اشتراک
+        usage_period: شماره دوره استفاده
+        limits: محدودیت‌ها (محدودیت‌های سفارشی بر محدودیت‌های پلن مقدم‌اند)
+        usage: آمار ذخیره شده در دیتابیس (مقدار اولیه شمارنده‌ها)
+        expires_at: زمان پایان اشتراک (timestamp)
+    """
+
+    subscription_id: str
+    usage_period: int
+    limits: Dict[str, int] = field(default_factory=dict)
+    usage: Dict[str, int] = field(default_factory=dict)
+    expires_at: float = 0.0
+
+    @classmethod
+    def from_subscription(cls, subscription: Subscription) -> 'MeterState':
+        """ساخت وضعیت از روی اشتراک"""
+        limits = dict(subscription.plan.limits or {})
+        limits.update(subscription.custom_limits or {})
+        return cls(
+            subscription_id=str(subscription.id),
+            usage_period=subscription.usage_period,
+            limits=limits,
+            usage=dict(subscription.usage_data or {}),
+            expires_at=subscription.end_date.timestamp(),
+        )
+
+    def get_limit(self, feature: str) -> int:
+        """محدودیت ویژگی (-1 یعنی نامحدود)"""
+        return self.limits.get(feature, -1)
+
+    def counter_key(self, feature: str) -> str:
+        """کلید شمارنده ویژگی در دوره جاری"""
+        return f"{COUNTER_PREFIX}:{self.subscription_id}:{self.usage_period}:{feature}"
+
+
+@dataclass(frozen=True)
+class UsageDecision:
+    """نتیجه مصرف یک ویژگی"""
+
+    allowed: bool
+    current_usage: int
+    limit: int
+    source: str = 'redis'
+
+    @property
+    def remaining(self) -> int:
+        """باقی‌مانده (-1 برای نامحدود)"""
+        if self.limit == -1:
+            return -1
+        return max(self.limit - self.current_usage, 0)
+
+
+def parse_counter_key(key: str) -> Tuple[str, int, str]:
+    """
+    تجزیه کلید شمارنده
+
+    Returns:
+        Tuple[str, int, str]: (شناسه اشتراک، دوره استفاده، ویژگی)
+    """
+    subscription_id, usage_period, feature = key[len(COUNTER_PREFIX) + 1:].split(':', 2)
+    return subscription_id, int(usage_period), feature
+
+
+class InProcessUsageBackend:
+    """
+    شمارنده‌های درون پردازه با همان معنای اسکریپت Lua
+
+    فقط برای تست‌ها: شمارنده‌ها بین پردازه‌ها مشترک نیستند، بنابراین
+    build_backend هرگز آن را انتخاب نمی‌کند.
+    """
+
+    name = 'local'
+
+    def __init__(self):
+        self._counters: Dict[str, Tuple[int, float]] = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, amount: int, limit: int, seed: int, ttl: int) -> Tuple[bool, int]:
+        """بررسی محدودیت و افزایش شمارنده"""
+        now = time.monotonic()
+        with self._lock:
+            value, expires = self._counters.get(key, (None, 0))
+            current = value if value is not None and expires > now else seed
+            if limit >= 0 and current + amount > limit:
+                return False, current
+            current += amount
+            self._counters[key] = (current, now + ttl)
+            self._dirty.add(key)
+            return True, current
+
+    def get_many(self, keys: List[str]) -> Dict[str, int]:
+        """مقدار شمارنده‌های موجود"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: self._counters[key][0]
+                for key in keys
+                if key in self._counters and self._counters[key][1] > now
+            }
+
+    def pop_dirty(self, count: int) -> List[str]:
+        """برداشتن حداکثر count کلید تغییر کرده"""
+        with self._lock:
+            keys = [self._dirty.pop() for _ in range(min(count, len(self._dirty)))]
+        return keys
+
+    def mark_dirty(self, keys: List[str]):
+        """بازگرداندن کلیدها به مجموعه dirty (پس از خطای flush)"""
+        with self._lock:
+            self._dirty.update(keys)
+
+    def clear(self):
+        """پاکسازی همه شمارنده‌ها"""
+        with self._lock:
+            self._counters.clear()
+            self._dirty.clear()
+
+
+class RedisUsageBackend:
+    """
+    شمارنده‌های Redis
+
+    هر مصرف یک فراخوانی EVALSHA است؛ flush با SPOP و MGET دسته‌ای انجام می‌شود.
+    """
+
+    name = 'redis'
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._script = connection.register_script(CONSUME_LUA)
+
+    def consume(self, key: str, amount: int, limit: int, seed: int, ttl: int) -> Tuple[bool, int]:
+        """بررسی محدودیت و افزایش شمارنده"""
+        allowed, current = self._script(
+            keys=[key, DIRTY_KEY],
+            args=[amount, limit, seed, ttl],
+        )
+        return bool(allowed), int(current)
+
+    def get_many(self, keys: List[str]) -> Dict[str, int]:
+        """مقدار شمارنده‌های موجود"""
+        if not keys:
+            return {}
+        values = self.connection.mget(keys)
+        return {key: int(value) for key, value in zip(keys, values) if value is not None}
+
+    def pop_dirty(self, count: int) -> List[str]:
+        """برداشتن حداکثر count کلید تغییر کرده"""
+        keys = self.connection.spop(DIRTY_KEY, count) or []
+        return [key.decode() if isinstance(key, bytes) else key for key in keys]
+
+    def mark_dirty(self, keys: List[str]):
+        """بازگرداندن کلیدها به مجموعه dirty (پس از خطای flush)"""
+        if keys:
+            self.connection.sadd(DIRTY_KEY, *keys)
+
+
+class UsageMeter:
+    """
+    سنجش استفاده از ویژگی‌های اشتراک
+
+    بررسی و ثبت استفاده با یک فراخوانی backend و بدون پرس‌وجوی دیتابیس
+    (در صورت وجود وضعیت در cache) انجام می‌شود. اگر backend وجود نداشته
+    باشد (cache پیش‌فرض Redis نیست) یا در دسترس نباشد، استفاده با قفل
+    سطری در دیتابیس ثبت می‌شود.
+    """
+
+    def __init__(self, backend=None, state_ttl: Optional[int] = None,
+                 counter_grace: Optional[int] = None):
+        self.logger = logging.getLogger(__name__)
+        self.backend = backend if backend is not None else build_backend()
+        self.state_ttl = state_ttl if state_ttl is not None else getattr(
+            settings, 'BILLING_USAGE_STATE_CACHE_TTL', 300
+        )
+        self.counter_grace = counter_grace if counter_grace is not None else getattr(
+            settings, 'BILLING_USAGE_COUNTER_GRACE', 7 * 24 * 3600
+        )
+
+    def get_state(self, user_id) -> Optional[MeterState]:
+        """
+        دریافت وضعیت اشتراک فعال کاربر (از cache یا دیتابیس)
+
+        Args:
+            user_id: شناسه کاربر
+
+        Returns:
+            Optional[MeterState]: وضعیت یا None اگر اشتراک فعالی نباشد
+        """
+        cache_key = state_cache_key(user_id)
+        state = cache.get(cache_key)
+        if state is not None:
+            return state
+
+        subscription = Subscription.objects.filter(
+            user_id=user_id,
+            status__in=[SubscriptionStatus.TRIAL, SubscriptionStatus.ACTIVE]
+        ).select_related('plan').first()
+        if subscription is None:
+            return None
+
+        state = MeterState.from_subscription(subscription)
+        if not transaction.get_connection().in_atomic_block:
+            cache.set(cache_key, state, self.state_ttl)
+        return state
+
+    def consume(self, state: MeterState, feature: str, amount: int = 1) -> UsageDecision:
+        """
+        مصرف اتمیک یک ویژگی
+
+        Args:
+            state: وضعیت اشتراک
+            feature: نام ویژگی
+            amount: مقدار استفاده
+
+        Returns:
+            UsageDecision: نتیجه مصرف
+        """
+        limit = state.get_limit(feature)
+        if self.backend is None:
+            return self._consume_in_database(state, feature, amount, limit)
+        try:
+            allowed, current = self.backend.consume(
+                state.counter_key(feature),
+                amount,
+                limit,
+                int(state.usage.get(feature, 0)),
+                self._counter_ttl(state),
+            )
+            return UsageDecision(allowed, current, limit, self.backend.name)
+        except Exception as e:
+            self.logger.error(f"Usage meter backend error: {str(e)}")
+            return self._consume_in_database(state, feature, amount, limit)
+
+    def consume_for_subscription(self, subscription: Subscription, feature: str,
+                                 amount: int = 1) -> UsageDecision:
+        """مصرف ویژگی برای یک نمونه اشتراک بارگذاری شده"""
+        return self.consume(MeterState.from_subscription(subscription), feature, amount)
+
+    def get_usage(self, state: MeterState, features: List[str]) -> Dict[str, int]:
+        """
+        میزان استفاده جاری ویژگی‌ها
+
+        مقدار شمارنده‌های دوره جاری بر آمار ذخیره شده مقدم است.
+        """
+        if self.backend is None:
+            usage_data = Subscription.objects.filter(
+                id=state.subscription_id
+            ).values_list('usage_data', flat=True).first() or {}
+            return {feature: int(usage_data.get(feature, 0)) for feature in features}
+
+        usage = {feature: int(state.usage.get(feature, 0)) for feature in features}
+        keys = {state.counter_key(feature): feature for feature in features}
+        try:
+            for key, value in self.backend.get_many(list(keys)).items():
+                usage[keys[key]] = value
+        except Exception as e:
+            self.logger.warning(f"Usage meter read failed: {str(e)}")
+        return usage
+
+    def flush(self, batch_size: int = 500) -> int:
+        """
+        نوشتن شمارنده‌های تغییر کرده در usage_data
+
+        مقدار مطلق شمارنده نوشته می‌شود و شمارنده‌های دوره‌های قبلی نادیده
+        گرفته می‌شوند، بنابراین اجرای تکراری یا همزمان بی‌خطر است.
+
+        Args:
+            batch_size: حداکثر کلیدها در هر دسته
+
+        Returns:
+            int: تعداد اشتراک‌های به‌روز شده
+        """
+        if self.backend is None:
+            return 0
+
+        updated = 0
+        while True:
+            keys = self.backend.pop_dirty(batch_size)
+            if not keys:
+                return updated
+            try:
+                updated += self._flush_keys(keys)
+            except Exception:
+                self.backend.mark_dirty(keys)
+                raise
+            if len(keys) < batch_size:
+                return updated
+
+    def _flush_keys(self, keys: List[str]) -> int:
+        """نوشتن یک دسته کلید در دیتابیس"""
+        values = self.backend.get_many(keys)
+        pending = defaultdict(dict)
+        for key, value in values.items():
+            subscription_id, usage_period, feature = parse_counter_key(key)
+            pending[(subscription_id, usage_period)][feature] = value
+
+        if not pending:
+            return 0
+
+        with transaction.atomic():
+            subscriptions = Subscription.objects.select_for_update().filter(
+                id__in={subscription_id for subscription_id, _ in pending}
+            ).only('id', 'usage_data', 'usage_period')
+
+            changed = []
+            for subscription in subscriptions:
+                counters = pending.get((str(subscription.id), subscription.usage_period))
+                if not counters:
+                    continue
+                usage_data = dict(subscription.usage_data or {})
+                usage_data.update(counters)
+                if usage_data != subscription.usage_data:
+                    subscription.usage_data = usage_data
+                    subscription.updated_at = timezone.now()
+                    changed.append(subscription)
+
+            Subscription.objects.bulk_update(changed, ['usage_data', 'updated_at'])
+
+        return len(changed)
+
+    def _consume_in_database(self, state: MeterState, feature: str, amount: int,
+                             limit: int) -> UsageDecision:
+        """مصرف ویژگی با قفل سطری (بدون Redis، یا در صورت خطای backend)"""
+        with transaction.atomic():
+            subscription = Subscription.objects.select_for_update().only(
+                'id', 'usage_data', 'usage_period'
+            ).get(id=state.subscription_id)
+            current = int(subscription.usage_data.get(feature, 0))
+            if limit >= 0 and current + amount > limit:
+                return UsageDecision(False, current, limit, 'database')
+
+            subscription.usage_data[feature] = current + amount
+            Subscription.objects.filter(id=subscription.id).update(
+                usage_data=subscription.usage_data, updated_at=timezone.now()
+            )
+            return UsageDecision(True, current + amount, limit, 'database')
+
+    def _counter_ttl(self, state: MeterState) -> int:
+        """TTL شمارنده: تا پایان اشتراک به اضافه مهلت"""
+        return max(int(state.expires_at - time.time()), 0) + self.counter_grace
+
+
+def state_cache_key(user_id) -> str:
+    """کلید cache وضعیت اشتراک کاربر"""
+    return f"{STATE_CACHE_PREFIX}:{user_id}"
+
+
+def invalidate_usage_state(*user_ids):
+    """حذف وضعیت cache شده کاربران (پس از تغییر اشتراک یا پلن)"""
+    cache.delete_many([state_cache_key(user_id) for user_id in user_ids])
+
+
+def build_backend() -> Optional[RedisUsageBackend]:
+    """
+    انتخاب backend شمارنده‌ها
+
+    اگر cache پیش‌فرض Redis باشد از اسکریپت Lua استفاده می‌شود و در غیر
+    این صورت None (ثبت مستقیم در دیتابیس با قفل سطری).
+    """
+    connection = get_shared_redis_connection('usage meter')
+    if connection is not None:
+        return RedisUsageBackend(connection)
+    return None
+
+
+_usage_meter: ProcessSingleton[UsageMeter] = ProcessSingleton(UsageMeter)
+
+
+def get_usage_meter() -> UsageMeter:
+    """دریافت نمونه مشترک UsageMeter در پردازه"""
+    return _usage_meter.get()
+
+
+def reset_usage_meter():
+    """حذف نمونه مشترک (مثلا پس از تغییر تنظیمات در تست)"""
+    _usage_meter.reset()
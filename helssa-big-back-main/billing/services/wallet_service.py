@@ -4,8 +4,8 @@ Wallet Management Service
 """
 
 from decimal import Decimal
-from typing import Dict, Any, Optional, Tuple
-from django.db import transaction as db_transaction
+from typing import Dict, Any, Iterable, Optional, Tuple
+from django.db import models, transaction as db_transaction
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 
@@ -616,12 +616,21 @@ class WalletService(BaseService):
     def _validate_withdrawal(
         self,
         wallet: Wallet,
-        amount: Decimal
+        amount: Decimal,
+        totals: Optional[Tuple[Decimal, Decimal]] = None
     ) -> Tuple[bool, Dict[str, Any]]:
-        """بررسی محدودیت‌های برداشت"""
+        """
+        بررسی محدودیت‌های برداشت
+        
+        Args:
+            wallet: کیف پول
+            amount: مبلغ برداشت
+            totals: (برداشت روزانه، برداشت ماهانه) از پیش محاسبه شده با
+                get_withdrawal_totals برای بررسی دسته‌ای
+        """
         
         # بررسی محدودیت روزانه
-        daily_total = self._get_daily_withdrawal_total(wallet)
+        daily_total = totals[0] if totals else self._get_daily_withdrawal_total(wallet)
         if daily_total + amount > wallet.daily_withdrawal_limit:
             return self.error_response(
                 'daily_limit_exceeded',
@@ -629,7 +638,7 @@ class WalletService(BaseService):
             )
         
         # بررسی محدودیت ماهانه
-        monthly_total = self._get_monthly_withdrawal_total(wallet)
+        monthly_total = totals[1] if totals else self._get_monthly_withdrawal_total(wallet)
         if monthly_total + amount > wallet.monthly_withdrawal_limit:
             return self.error_response(
                 'monthly_limit_exceeded',
@@ -645,6 +654,32 @@ class WalletService(BaseService):
         
         return self.success_response()
     
+    def get_withdrawal_totals(self, wallets: Iterable[Wallet]) -> Dict[Any, Tuple[Decimal, Decimal]]:
+        """
+        محاسبه کل برداشت روزانه و ماهانه چند کیف پول با یک پرس‌وجو
+        
+        Returns:
+            Dict: شناسه کیف پول -> (برداشت روزانه، برداشت ماهانه)
+        """
+        from datetime import date
+        
+        today = date.today()
+        
+        rows = Transaction.objects.filter(
+            wallet__in=list(wallets),
+            type=TransactionType.WITHDRAWAL,
+            status=TransactionStatus.COMPLETED,
+            created_at__date__gte=today.replace(day=1)
+        ).values('wallet_id').annotate(
+            daily=models.Sum('amount', filter=models.Q(created_at__date=today)),
+            monthly=models.Sum('amount')
+        )
+        
+        return {
+            row['wallet_id']: (abs(row['daily'] or Decimal('0')), abs(row['monthly'] or Decimal('0')))
+            for row in rows
+        }
+    
     def _get_daily_withdrawal_total(self, wallet: Wallet) -> Decimal:
         """محاسبه کل برداشت روزانه"""
         from datetime import date
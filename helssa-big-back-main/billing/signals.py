@@ -0,0 +1,36 @@
+"""
+سیگنال‌های سیستم مالی
+Financial System Signals
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Subscription, SubscriptionPlan
+from .services.renewal_engine import invalidate_plan_cache
+from .services.usage_meter import invalidate_usage_state
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscription_usage_state(sender, instance, **kwargs):
+    """حذف وضعیت سنجش استفاده کاربر پس از تغییر اشتراک"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_usage_state(user_id))
+
+
+@receiver(post_save, sender=SubscriptionPlan)
+def invalidate_plan_caches(sender, instance, created, **kwargs):
+    """حذف پلن cache شده و وضعیت سنجش استفاده مشترکین پس از تغییر پلن"""
+    if created:
+        return
+
+    plan_id = instance.id
+    transaction.on_commit(lambda: invalidate_plan_cache(plan_id))
+
+    user_ids = list(
+        Subscription.objects.filter(plan=instance).values_list('user_id', flat=True)
+    )
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_usage_state(*user_ids))
@@ -0,0 +1,69 @@
+"""
+تسک‌های Celery سیستم مالی
+Financial System Celery Tasks
+"""
+
+import logging
+import math
+
+from celery import shared_task
+
+from .services.renewal_engine import RenewalEngine
+from .services.usage_meter import get_usage_meter
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_usage_counters(batch_size: int = 500):
+    """
+    نوشتن شمارنده‌های استفاده در Subscription.usage_data
+
+    هر دقیقه از CELERY_BEAT_SCHEDULE (helssa/settings.py) اجرا می‌شود. بدون
+    Redis شمارنده‌ای برای flush وجود ندارد (استفاده مستقیماً در دیتابیس ثبت
+    می‌شود).
+    """
+    try:
+        updated = get_usage_meter().flush(batch_size=batch_size)
+        if updated:
+            logger.info(f"Usage counters flushed for {updated} subscriptions")
+        return updated
+
+    except Exception as e:
+        logger.error(f"Error flushing usage counters: {str(e)}")
+        raise
+
+
+@shared_task
+def process_recurring_payments(chunk_size: int = None):
+    """
+    توزیع تمدید اشتراک‌های سررسید شده بین worker ها
+
+    به ازای هر دسته یک تسک renew_subscription_chunk صف می‌شود؛ هر تسک
+    دسته خود را با skip_locked برمی‌دارد، بنابراین تسک‌ها همپوشانی ندارند.
+    """
+    try:
+        engine = RenewalEngine(chunk_size)
+        due = engine.count_due()
+        chunks = math.ceil(due / engine.chunk_size)
+
+        for _ in range(chunks):
+            renew_subscription_chunk.delay(engine.chunk_size)
+
+        logger.info(f"Dispatched {chunks} renewal chunks for {due} due subscriptions")
+        return {'due': due, 'chunks': chunks}
+
+    except Exception as e:
+        logger.error(f"Error dispatching subscription renewals: {str(e)}")
+        raise
+
+
+@shared_task
+def renew_subscription_chunk(chunk_size: int = None):
+    """تمدید یک دسته از اشتراک‌های سررسید شده"""
+    try:
+        return RenewalEngine(chunk_size).process_chunk()
+
+    except Exception as e:
+        logger.error(f"Error renewing subscription chunk: {str(e)}")
+        raise
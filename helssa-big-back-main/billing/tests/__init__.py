@@ -4,13 +4,15 @@ Financial System Tests
 """
 
 from .test_models import *
-from .test_services import *
 from .test_views import *
-from .test_gateways import *
+from .test_usage_meter import *
+from .test_number_allocator import *
+from .test_renewal_engine import *
 
 __all__ = [
     'test_models',
-    'test_services', 
     'test_views',
-    'test_gateways'
-]
\ No newline at end of file
+    'test_usage_meter',
+    'test_number_allocator',
+    'test_renewal_engine'
+]
@@ -0,0 +1,112 @@
+"""
+تست‌های تخصیص شماره ترتیبی
+Number Allocation Tests
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from unittest.mock import patch
+
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from ..models import Invoice, InvoiceType, NumberSequence
+from ..services.base_service import BaseService
+from ..services.number_allocator import NumberAllocator, get_number_allocator
+
+User = get_user_model()
+
+
+class NumberAllocatorTest(TransactionTestCase):
+    """تست رزرو بلوکی و یکتایی شماره‌ها (خارج از تراکنش تست)"""
+
+    def setUp(self):
+        get_number_allocator().discard()
+
+    def test_block_is_reserved_once(self):
+        allocator = NumberAllocator(block_size=100)
+        NumberSequence.objects.create(prefix='TST', next_value=1)
+
+        # هر بلوک: BEGIN، UPDATE، SELECT و COMMIT
+        with self.assertNumQueries(8):
+            numbers = [allocator.allocate('TST') for _ in range(200)]
+
+        self.assertEqual(numbers, list(range(1, 201)))
+        self.assertEqual(NumberSequence.objects.get(prefix='TST').next_value, 201)
+
+    def test_workers_get_disjoint_blocks(self):
+        first, second = NumberAllocator(block_size=10), NumberAllocator(block_size=10)
+
+        numbers = [first.allocate('TST'), second.allocate('TST'), first.allocate('TST')]
+
+        self.assertEqual(numbers, [1, 11, 2])
+        self.assertEqual(NumberSequence.objects.get(prefix='TST').next_value, 21)
+
+    def test_block_is_reserved_outside_caller_transaction(self):
+        allocator, other = NumberAllocator(block_size=10), NumberAllocator(block_size=10)
+        NumberSequence.objects.create(prefix='TST', next_value=1)
+
+        # پایگاه داده‌ای با قفل سطری: رزرو روی اتصال جداگانه commit می‌شود
+        with patch.object(connection, 'vendor', 'postgresql'):
+            try:
+                with transaction.atomic():
+                    self.assertEqual(allocator.allocate('TST'), 1)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+
+        self.assertEqual(NumberSequence.objects.get(prefix='TST').next_value, 11)
+        self.assertEqual(other.allocate('TST'), 11)
+        self.assertEqual(allocator.allocate('TST'), 2)
+
+    def test_sqlite_rolls_back_numbers_with_caller_transaction(self):
+        allocator, other = NumberAllocator(block_size=10), NumberAllocator(block_size=10)
+        NumberSequence.objects.create(prefix='TST', next_value=1)
+
+        try:
+            with transaction.atomic():
+                self.assertEqual([allocator.allocate('TST') for _ in range(2)], [1, 2])
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+        # شمارنده برگشت خورده است و بلوکی از تراکنش برگشت خورده نگه داشته نشده
+        self.assertEqual(other.allocate('TST'), 1)
+        self.assertEqual(allocator.allocate('TST'), 11)
+
+    def test_format_and_reference_numbers(self):
+        allocator = NumberAllocator(block_size=5)
+
+        self.assertEqual(allocator.format('DOC', width=6), 'DOC000001')
+
+        reference = BaseService().generate_reference_number('TXN')
+        self.assertRegex(reference, rf"^TXN{timezone.now():%Y%m%d}\d{{14}}$")
+
+
+class InvoiceNumberTest(TestCase):
+    """تست شماره‌گذاری فاکتورها"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='09123456789', user_type='patient')
+
+    def _create_invoice(self, **kwargs):
+        now = timezone.now()
+        return Invoice.objects.create(
+            user=self.user,
+            type=InvoiceType.choices[0][0],
+            subtotal=Decimal('100000'),
+            issue_date=now,
+            due_date=now + timedelta(days=7),
+            **kwargs
+        )
+
+    def test_invoice_numbers_continue_existing_sequence(self):
+        prefix = f"INV{timezone.now():%Y%m}"
+        self._create_invoice(invoice_number=f"{prefix}0041")
+
+        numbers = [self._create_invoice().invoice_number for _ in range(3)]
+
+        self.assertEqual(numbers, [f"{prefix}0042", f"{prefix}0043", f"{prefix}0044"])
@@ -0,0 +1,148 @@
+"""
+تست‌های موتور تمدید دسته‌ای اشتراک‌ها
+Batch Renewal Engine Tests
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from ..models import (
+    Invoice, NumberSequence, Subscription, SubscriptionPlan, SubscriptionStatus,
+    Transaction, TransactionType, Wallet
+)
+from ..services.number_allocator import get_number_allocator
+from ..services.renewal_engine import RenewalEngine, renewal_reference
+
+User = get_user_model()
+
+
+class RenewalFixtures:
+    """پلن و اشتراک‌های سررسید شده"""
+
+    def setUp(self):
+        cache.clear()
+        self.plan = SubscriptionPlan.objects.create(
+            name='پلن پایه',
+            type='patient_basic',
+            monthly_price=Decimal('100000'),
+            yearly_price=Decimal('1000000'),
+        )
+        self.now = timezone.now()
+
+    def _subscription(self, name, balance=None):
+        user = User.objects.create_user(username=name, user_type='patient')
+        if balance is not None:
+            Wallet.objects.create(user=user, balance=Decimal(balance))
+        return Subscription.objects.create(
+            user=user,
+            plan=self.plan,
+            status=SubscriptionStatus.ACTIVE,
+            start_date=self.now - timedelta(days=30),
+            end_date=self.now,
+            next_billing_date=self.now - timedelta(minutes=1),
+        )
+
+
+class RenewalEngineTest(RenewalFixtures, TestCase):
+    """تست تمدید دسته‌ای، برداشت گروهی و یکتایی پرداخت هر دوره"""
+
+    def test_chunk_renews_and_marks_failures(self):
+        paid = [self._subscription(f'paid{i}', 250000) for i in range(3)]
+        poor = self._subscription('poor', 50000)
+        no_wallet = self._subscription('nowallet')
+
+        stats = RenewalEngine(chunk_size=10).process_chunk()
+
+        self.assertEqual((stats['processed'], stats['renewed'], stats['failed']), (5, 3, 2))
+        for subscription in paid:
+            old_billing_date = subscription.next_billing_date
+            subscription.refresh_from_db()
+            self.assertEqual(subscription.next_billing_date, old_billing_date + timedelta(days=30))
+            self.assertEqual(subscription.usage_period, 1)
+            self.assertEqual(subscription.user.wallet.balance, Decimal('150000'))
+
+        for subscription in (poor, no_wallet):
+            subscription.refresh_from_db()
+            self.assertEqual(subscription.status, SubscriptionStatus.PAST_DUE)
+
+        self.assertEqual(Transaction.objects.filter(type=TransactionType.SUBSCRIPTION).count(), 3)
+        self.assertEqual(Invoice.objects.filter(subscription__in=paid).count(), 3)
+        self.assertEqual(RenewalEngine().count_due(), 0)
+
+    def test_withdrawal_limits_and_inactive_wallets_fail_renewal(self):
+        limited = self._subscription('limited', 250000)
+        Wallet.objects.filter(user=limited.user).update(daily_withdrawal_limit=Decimal('50000'))
+        inactive = self._subscription('inactive', 250000)
+        Wallet.objects.filter(user=inactive.user).update(is_active=False)
+
+        with self.assertLogs('billing.services.base_service.RenewalEngine', 'INFO') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                stats = RenewalEngine().process_chunk()
+
+        self.assertEqual((stats['renewed'], stats['failed']), (0, 2))
+        for subscription in (limited, inactive):
+            subscription.refresh_from_db()
+            self.assertEqual(subscription.status, SubscriptionStatus.PAST_DUE)
+            self.assertEqual(subscription.user.wallet.balance, Decimal('250000'))
+        failures = [record for record in logs.records if record.getMessage() == 'Operation success: payment_failure']
+        self.assertEqual(
+            {record.data['error'] for record in failures},
+            {'کیف پول غیرفعال است', 'از محدودیت برداشت روزانه (50,000 ریال) تجاوز می‌کند'}
+        )
+
+    def test_period_is_charged_once(self):
+        subscription = self._subscription('paid', 250000)
+        Transaction.objects.create(
+            wallet=subscription.user.wallet,
+            amount=Decimal('-100000'),
+            type=TransactionType.SUBSCRIPTION,
+            reference_number=renewal_reference(subscription),
+        )
+
+        stats = RenewalEngine().process_chunk()
+
+        self.assertEqual((stats['renewed'], stats['skipped']), (0, 1))
+        subscription.refresh_from_db()
+        self.assertGreater(subscription.next_billing_date, self.now)
+        self.assertEqual(subscription.user.wallet.balance, Decimal('250000'))
+
+    def test_run_loops_until_no_due_subscriptions(self):
+        for i in range(5):
+            self._subscription(f'paid{i}', 250000)
+
+        stats = RenewalEngine(chunk_size=2).run()
+
+        self.assertEqual((stats['chunks'], stats['renewed']), (3, 5))
+
+
+class RenewalEngineQueryTest(RenewalFixtures, TransactionTestCase):
+    """
+    تعداد کوئری‌های یک دسته خارج از تراکنش تست
+
+    شماره فاکتورها مانند محیط واقعی پیش از تراکنش دسته و در تراکنش کوتاه
+    خود رزرو می‌شوند.
+    """
+
+    def setUp(self):
+        super().setUp()
+        get_number_allocator().discard()
+
+    def test_run_processes_all_chunks_with_constant_queries(self):
+        for i in range(12):
+            self._subscription(f'paid{i}', 250000)
+        NumberSequence.objects.create(prefix=f"INV{self.now:%Y%m}", next_value=1)
+        self.assertEqual(RenewalEngine().get_plans([self.plan.id])[self.plan.id], self.plan)
+
+        # شمارش سررسیدها، رزرو بلوک شماره فاکتور در تراکنش خود (BEGIN، UPDATE، SELECT، COMMIT)،
+        # برداشتن، مرجع‌ها، کیف پول‌ها، مجموع برداشت‌ها، برداشت، تراکنش‌ها، فاکتورها،
+        # bulk_update و تراکنش دسته (BEGIN، COMMIT)
+        with self.assertNumQueries(15):
+            stats = RenewalEngine(chunk_size=12).process_chunk()
+
+        self.assertEqual(stats['renewed'], 12)
+        self.assertGreater(stats['renewals_per_second'], 0)
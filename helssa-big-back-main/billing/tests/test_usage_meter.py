@@ -0,0 +1,262 @@
+"""
+تست‌های سنجش اتمیک استفاده از اشتراک
+Subscription Usage Metering Tests
+"""
+
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from ..models import Subscription, SubscriptionPlan, SubscriptionStatus
+from ..services.subscription_service import SubscriptionService
+from ..services.usage_meter import (
+    DIRTY_KEY, InProcessUsageBackend, MeterState, RedisUsageBackend, UsageMeter,
+    get_usage_meter, reset_usage_meter, state_cache_key,
+)
+
+User = get_user_model()
+
+
+def _run_concurrently(meter, state, feature, requests=400, workers=32):
+    """اجرای همزمان درخواست‌ها و بازگرداندن تعداد پذیرفته شده"""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        decisions = list(executor.map(
+            lambda _: meter.consume(state, feature), range(requests)
+        ))
+    return sum(1 for decision in decisions if decision.allowed)
+
+
+class UsageMeterConcurrencyTest(SimpleTestCase):
+    """تست عدم پذیرش بیش از محدودیت در درخواست‌های همزمان"""
+
+    def setUp(self):
+        self.state = MeterState(
+            subscription_id=str(uuid.uuid4()),
+            usage_period=0,
+            limits={'chat_with_ai': 37},
+            usage={'chat_with_ai': 5},
+            expires_at=(timezone.now() + timedelta(days=30)).timestamp(),
+        )
+
+    def test_concurrent_consumers_admit_exact_limit(self):
+        meter = UsageMeter(backend=InProcessUsageBackend())
+
+        self.assertEqual(_run_concurrently(meter, self.state, 'chat_with_ai'), 32)
+
+        decision = meter.consume(self.state, 'chat_with_ai')
+        self.assertFalse(decision.allowed)
+        self.assertEqual(decision.current_usage, 37)
+        self.assertEqual(decision.remaining, 0)
+
+    def test_unlimited_feature(self):
+        meter = UsageMeter(backend=InProcessUsageBackend())
+
+        self.assertEqual(_run_concurrently(meter, self.state, 'voice_to_text', requests=50), 50)
+        self.assertEqual(meter.consume(self.state, 'voice_to_text').remaining, -1)
+
+    def test_new_period_starts_from_zero(self):
+        meter = UsageMeter(backend=InProcessUsageBackend())
+        _run_concurrently(meter, self.state, 'chat_with_ai')
+
+        self.state.usage_period += 1
+        self.state.usage = {}
+        decision = meter.consume(self.state, 'chat_with_ai', 3)
+
+        self.assertTrue(decision.allowed)
+        self.assertEqual(decision.current_usage, 3)
+
+
+class DatabaseUsageMeterConcurrencyTest(TransactionTestCase):
+    """
+    تست همزمانی مسیر دیتابیس (بدون Redis) با قفل سطری
+
+    هر thread اتصال و تراکنش خود را دارد؛ نیازمند دیتابیسی با
+    SELECT ... FOR UPDATE (مثلاً PostgreSQL).
+    """
+
+    def setUp(self):
+        if not connection.features.has_select_for_update:
+            self.skipTest('database has no row locks (SELECT ... FOR UPDATE)')
+
+        cache.clear()
+        user = User.objects.create_user(username='09123456789', user_type='patient')
+        plan = SubscriptionPlan.objects.create(
+            name='پلن پایه',
+            type='patient_basic',
+            monthly_price=Decimal('100000'),
+            yearly_price=Decimal('1000000'),
+            limits={'chat_with_ai': 37},
+        )
+        now = timezone.now()
+        self.subscription = Subscription.objects.create(
+            user=user,
+            plan=plan,
+            status=SubscriptionStatus.ACTIVE,
+            start_date=now,
+            end_date=now + timedelta(days=30),
+            next_billing_date=now + timedelta(days=30),
+            usage_data={'chat_with_ai': 5},
+        )
+
+    def test_concurrent_consumers_admit_exact_limit(self):
+        meter = UsageMeter()
+        self.assertIsNone(meter.backend)
+        state = MeterState.from_subscription(self.subscription)
+
+        def consume(_):
+            try:
+                return meter.consume(state, 'chat_with_ai')
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            decisions = list(executor.map(consume, range(100)))
+
+        self.assertEqual(sum(1 for decision in decisions if decision.allowed), 32)
+        self.assertTrue(all(decision.source == 'database' for decision in decisions))
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.usage_data, {'chat_with_ai': 37})
+
+
+class RedisUsageMeterTest(SimpleTestCase):
+    """
+    تست همزمانی اسکریپت Lua روی Redis واقعی (نیازمند USAGE_METER_TEST_REDIS_URL)
+    """
+
+    def setUp(self):
+        redis_url = os.getenv('USAGE_METER_TEST_REDIS_URL')
+        if not redis_url:
+            self.skipTest('USAGE_METER_TEST_REDIS_URL not set')
+
+        import redis
+        self.connection = redis.Redis.from_url(redis_url)
+        self.state = MeterState(
+            subscription_id=f"test-{uuid.uuid4().hex}",
+            usage_period=0,
+            limits={'chat_with_ai': 37},
+            expires_at=(timezone.now() + timedelta(days=30)).timestamp(),
+        )
+        self.key = self.state.counter_key('chat_with_ai')
+
+    def tearDown(self):
+        self.connection.delete(self.key)
+        self.connection.srem(DIRTY_KEY, self.key)
+
+    def test_concurrent_consumers_admit_exact_limit(self):
+        meter = UsageMeter(backend=RedisUsageBackend(self.connection))
+
+        self.assertEqual(_run_concurrently(meter, self.state, 'chat_with_ai'), 37)
+        self.assertEqual(int(self.connection.get(self.key)), 37)
+        self.assertTrue(self.connection.sismember(DIRTY_KEY, self.key))
+        self.assertGreater(self.connection.ttl(self.key), 30 * 24 * 3600)
+
+
+class UsageMeterIntegrationTest(TestCase):
+    """تست سنجش استفاده همراه با دیتابیس و reconciler"""
+
+    def setUp(self):
+        cache.clear()
+        reset_usage_meter()
+        self.user = User.objects.create_user(
+            username='09123456789',
+            user_type='patient',
+        )
+        self.plan = SubscriptionPlan.objects.create(
+            name='پلن پایه',
+            type='patient_basic',
+            monthly_price=Decimal('100000'),
+            yearly_price=Decimal('1000000'),
+            limits={'chat_with_ai': 3},
+        )
+        now = timezone.now()
+        self.subscription = Subscription.objects.create(
+            user=self.user,
+            plan=self.plan,
+            status=SubscriptionStatus.ACTIVE,
+            start_date=now,
+            end_date=now + timedelta(days=30),
+            next_billing_date=now + timedelta(days=30),
+        )
+        self.meter = UsageMeter(backend=InProcessUsageBackend())
+        self.service = SubscriptionService()
+
+    def _check(self, amount=1):
+        with patch('billing.services.subscription_service.get_usage_meter', return_value=self.meter):
+            return self.service.check_usage_limit(str(self.user.id), 'chat_with_ai', amount)
+
+    def test_cached_state_needs_no_queries(self):
+        cache.set(state_cache_key(self.user.id), MeterState.from_subscription(self.subscription))
+
+        with self.assertNumQueries(0):
+            success, result = self._check()
+
+        self.assertTrue(success)
+        self.assertEqual(result['data']['current_usage'], 1)
+        self.assertEqual(result['data']['remaining'], 2)
+
+    def test_limit_exceeded_and_flush(self):
+        for _ in range(3):
+            self.assertTrue(self._check()[0])
+
+        success, result = self._check()
+        self.assertFalse(success)
+        self.assertEqual(result['error'], 'usage_limit_exceeded')
+
+        self.assertEqual(self.meter.flush(), 1)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.usage_data, {'chat_with_ai': 3})
+        self.assertEqual(self.meter.flush(), 0)
+
+    def test_reset_usage_rolls_over_period(self):
+        for _ in range(3):
+            self._check()
+
+        self.subscription.reset_usage()
+        cache.clear()
+
+        success, result = self._check(2)
+        self.assertTrue(success)
+        self.assertEqual(result['data']['current_usage'], 2)
+
+        self.meter.flush()
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.usage_period, 1)
+        self.assertEqual(self.subscription.usage_data, {'chat_with_ai': 2})
+
+    def test_no_active_subscription(self):
+        self.subscription.cancel()
+        cache.clear()
+
+        success, result = self._check()
+
+        self.assertFalse(success)
+        self.assertEqual(result['error'], 'no_active_subscription')
+
+    def test_without_redis_usage_is_recorded_in_database(self):
+        reset_usage_meter()
+        meter = get_usage_meter()
+        self.assertIsNone(meter.backend)
+        self.meter = meter
+
+        for _ in range(3):
+            self.assertTrue(self._check()[0])
+        success, result = self._check()
+        self.assertFalse(success)
+        self.assertEqual(result['error'], 'usage_limit_exceeded')
+
+        # بدون شمارنده مشترک، هر مصرف بلافاصله در دیتابیس است
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.usage_data, {'chat_with_ai': 3})
+        state = meter.get_state(self.user.id)
+        self.assertEqual(meter.get_usage(state, ['chat_with_ai']), {'chat_with_ai': 3})
+        self.assertEqual(meter.flush(), 0)
+        self.assertIs(get_usage_meter(), meter)
@@ -0,0 +1,158 @@
+"""
+دستور مدیریت برای بنچمارک تطبیق پاسخ‌های از پیش تعریف شده
+Management command to benchmark predefined response matching
+"""
+
+import json
+import random
+import re
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from chatbot.models import ChatbotResponse
+from chatbot.services.response_index import CompiledResponseIndex
+
+
+WORDS = [
+    'سلام', 'درود', 'سردرد', 'تب', 'سرفه', 'گلودرد', 'دارو', 'قرص', 'کپسول', 'شربت',
+    'نوبت', 'رزرو', 'فوری', 'اورژانس', 'خداحافظ', 'فشار', 'قند', 'حساسیت', 'آلرژی',
+    'معده', 'کمردرد', 'زانو', 'چشم', 'گوش', 'پوست', 'خارش', 'تهوع', 'سرگیجه', 'خستگی',
+    'بیخوابی', 'اضطراب', 'آزمایش', 'سونوگرافی', 'واکسن', 'رژیم', 'ورزش', 'وزن', 'hello',
+]
+
+# واژه‌های پیام‌هایی که به هیچ پاسخ از پیش تعریف شده‌ای نمی‌رسند (مسیر AI)
+FILLER = [
+    'من', 'از', 'دیروز', 'چند', 'روز', 'است', 'که', 'لطفا', 'راهنمایی', 'کنید', 'خیلی',
+    'زیاد', 'شده', 'بعد', 'غذا', 'شب', 'صبح', 'همیشه', 'گاهی', 'دکتر', 'گفت', 'باید',
+]
+
+
+class Command(BaseCommand):
+    """
+    مقایسه پیمایش خطی پاسخ‌ها با ایندکس از پیش کامپایل شده
+
+    پاسخ‌های مصنوعی (بدون ذخیره در دیتابیس) ساخته و هر پیام یک بار با
+    پیاده‌سازی خطی قبلی (بررسی زیررشته و regex هر کلیدواژه برای هر پاسخ)
+    و یک بار با CompiledResponseIndex تطبیق داده می‌شود.
+
+    استفاده:
+    python manage.py benchmark_response_matcher
+    python manage.py benchmark_response_matcher --entries 5000 --messages 2000 --json
+    """
+    help = 'بنچمارک تطبیق پاسخ‌های چت‌بات (پیمایش خطی در برابر ایندکس کامپایل شده)'
+
+    def add_arguments(self, parser):
+        """
+        افزودن آرگومان‌های خط فرمان: تعداد پاسخ‌ها، تعداد پیام‌ها و قالب خروجی.
+        """
+        parser.add_argument('--entries', type=int, default=5000, help='تعداد پاسخ‌های مصنوعی')
+        parser.add_argument('--messages', type=int, default=1000, help='تعداد پیام‌های آزمون')
+        parser.add_argument('--hit-ratio', type=float, default=0.3,
+                            help='سهم پیام‌هایی که حاوی کلیدواژه هستند')
+        parser.add_argument('--json', action='store_true', help='خروجی در فرمت JSON')
+
+    def handle(self, *args, **options):
+        """
+        ساخت داده مصنوعی، اجرای هر دو روش و گزارش زمان هر پیام و زمان ساخت ایندکس.
+        """
+        rng = random.Random(42)
+        responses = self._build_responses(rng, options['entries'])
+        messages = [
+            self._build_message(rng, rng.random() < options['hit_ratio'])
+            for _ in range(options['messages'])
+        ]
+
+        started = time.perf_counter()
+        index = CompiledResponseIndex(responses)
+        build_seconds = time.perf_counter() - started
+
+        ordered = index.responses
+        started = time.perf_counter()
+        linear_results = [self._linear_match(ordered, message, 'patient') for message in messages]
+        linear_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        index_results = [index.match(message, 'patient') for message in messages]
+        index_seconds = time.perf_counter() - started
+
+        mismatches = sum(1 for a, b in zip(linear_results, index_results) if a is not b)
+        report = {
+            'entries': len(responses),
+            'messages': len(messages),
+            'index_build_ms': round(build_seconds * 1000, 1),
+            'automaton_states': len(index.automaton),
+            'linear_ms_per_message': round(linear_seconds * 1000 / len(messages), 3),
+            'index_ms_per_message': round(index_seconds * 1000 / len(messages), 3),
+            'speedup': round(linear_seconds / index_seconds, 1) if index_seconds else None,
+            'mismatches': mismatches,
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(
+            f"entries={report['entries']} messages={report['messages']} "
+            f"build={report['index_build_ms']}ms states={report['automaton_states']}"
+        )
+        self.stdout.write(f"linear: {report['linear_ms_per_message']} ms/message")
+        self.stdout.write(f"index:  {report['index_ms_per_message']} ms/message")
+        style = self.style.SUCCESS if not mismatches else self.style.ERROR
+        self.stdout.write(style(f"speedup: {report['speedup']}x, mismatches: {mismatches}"))
+
+    def _build_responses(self, rng, count):
+        """
+        ساخت پاسخ‌های ذخیره نشده با کلیدواژه‌های ترکیبی و درصد کمی regex.
+        """
+        now = timezone.now()
+        responses = []
+        for i in range(count):
+            keywords = [
+                f"{rng.choice(WORDS)} {rng.choice(WORDS)}" if rng.random() < 0.7 else rng.choice(WORDS)
+                for _ in range(rng.randint(1, 4))
+            ]
+            if rng.random() < 0.05:
+                keywords.append(f"{rng.choice(WORDS)}\\s+(و|یا)\\s+{rng.choice(WORDS)}")
+            responses.append(ChatbotResponse(
+                category=rng.choice(ChatbotResponse.RESPONSE_CATEGORIES)[0],
+                target_user=rng.choice(['patient', 'doctor', 'both']),
+                trigger_keywords=keywords,
+                response_text=f'پاسخ {i}',
+                priority=rng.randint(1, 10),
+                created_at=now - timedelta(seconds=i),
+            ))
+        return responses
+
+    def _build_message(self, rng, hit):
+        """
+        ساخت پیام مصنوعی؛ در حالت hit یک یا دو واژه کلیدی در میان واژه‌های عادی قرار می‌گیرد.
+        """
+        words = [rng.choice(FILLER) for _ in range(rng.randint(4, 14))]
+        if hit:
+            for _ in range(rng.randint(1, 2)):
+                words.insert(rng.randrange(len(words) + 1), rng.choice(WORDS))
+        return ' '.join(words)
+
+    def _linear_match(self, ordered, message, target_user):
+        """
+        پیاده‌سازی خطی قبلی ResponseMatcherService (بدون هزینه پرس‌وجوی دیتابیس).
+        """
+        for response in ordered:
+            if response.target_user not in (target_user, 'both'):
+                continue
+            for keyword in response.trigger_keywords:
+                keyword = keyword.lower().strip()
+                if keyword in message:
+                    return response
+                try:
+                    if any(char in keyword for char in r'.*+?[]{}()|^$\\'):
+                        if re.search(keyword, message):
+                            return response
+                    elif re.search(r'\b' + re.escape(keyword) + r'\b', message):
+                        return response
+                except re.error:
+                    continue
+        return None
@@ -0,0 +1,279 @@
+"""
+ایندکس از پیش کامپایل شده پاسخ‌های چت‌بات
+Precompiled Chatbot Response Index
+
+همه پاسخ‌های فعال یک بار خوانده می‌شوند؛ کلیدواژه‌های ساده در یک
+automaton از نوع Aho-Corasick و کلیدواژه‌های regex به صورت کامپایل شده
+نگهداری می‌شوند. تطبیق یک پیام با یک پیمایش متن انجام می‌شود و فقط
+regex پاسخ‌هایی بررسی می‌شوند که اولویتشان از بهترین تطبیق کلیدواژه‌ای
+بالاتر است. ایندکس در حافظه پردازه نگهداری و با سیگنال‌های ذخیره/حذف
+ChatbotResponse و یک شماره نسخه در cache باطل می‌شود.
+"""
+
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ..models import ChatbotResponse
+
+
+REGEX_CHARS = set(r'.*+?[]{}()|^$\\')
+VERSION_CACHE_KEY = 'chatbot:response_index:version'
+
+
+class KeywordAutomaton:
+    """
+    automaton از نوع Aho-Corasick برای یافتن همه کلیدواژه‌ها در یک پیمایش
+
+    هر کلیدواژه به فهرستی از شناسه‌ها (مثلاً رتبه پاسخ‌ها) نگاشت می‌شود و
+    ``search`` مجموعه شناسه‌های همه کلیدواژه‌های موجود در متن را برمی‌گرداند.
+    """
+
+    def __init__(self, patterns: Iterable[Tuple[str, int]] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[int]] = [set()]
+        self._built = False
+        for pattern, value in patterns:
+            self.add(pattern, value)
+        self.build()
+
+    def add(self, pattern: str, value: int):
+        """افزودن کلیدواژه (پیش از build)"""
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(value)
+        self._built = False
+
+    def build(self):
+        """محاسبه پیوندهای شکست به روش BFS"""
+        pending = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            pending.append(state)
+
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self._goto[state].items():
+                pending.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+        self._ranked = [tuple(sorted(values)) for values in self._output]
+        self._built = True
+
+    def search(self, text: str) -> Set[int]:
+        """شناسه همه کلیدواژه‌های موجود در متن"""
+        found = set(self._output[0])
+        state = 0
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+
+        return found
+
+    def iter_outputs(self, text: str) -> Iterator[Tuple[int, ...]]:
+        """شناسه‌های مرتب (صعودی) هر حالت خروجی که در پیمایش متن دیده می‌شود"""
+        state = 0
+        goto = self._goto
+        fail = self._fail
+        ranked = self._ranked
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if ranked[state]:
+                yield ranked[state]
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+
+class CompiledResponseIndex:
+    """
+    ایندکس پاسخ‌های فعال، تقسیم شده بر اساس target_user و category
+
+    رتبه هر پاسخ جایگاه آن در ترتیب (اولویت نزولی، زمان ایجاد نزولی) است؛
+    بنابراین کمترین رتبه تطبیق یافته همان پاسخی است که پیاده‌سازی خطی
+    قبلی برمی‌گرداند.
+    """
+
+    def __init__(self, responses: List[ChatbotResponse], version=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.responses = sorted(
+            responses, key=lambda r: (-r.priority, -r.created_at.timestamp())
+        )
+
+        keyword_patterns = []
+        self._regexes: Dict[int, List[re.Pattern]] = {}
+        self._always: Set[int] = set()
+        self._partitions: Dict[Tuple[str, Optional[str]], List[int]] = {}
+        self._regex_partitions: Dict[Tuple[str, Optional[str]], List[int]] = {}
+
+        for rank, response in enumerate(self.responses):
+            for keyword in response.trigger_keywords or []:
+                keyword = str(keyword).lower().strip()
+                if not keyword:
+                    # رشته خالی زیررشته هر پیامی است
+                    self._always.add(rank)
+                    continue
+                keyword_patterns.append((keyword, rank))
+                if REGEX_CHARS & set(keyword):
+                    try:
+                        self._regexes.setdefault(rank, []).append(re.compile(keyword))
+                    except re.error:
+                        pass
+
+        self.automaton = KeywordAutomaton(keyword_patterns)
+
+        for target_user in ('patient', 'doctor', 'both'):
+            for rank, response in enumerate(self.responses):
+                if response.target_user not in (target_user, 'both'):
+                    continue
+                for key in ((target_user, None), (target_user, response.category)):
+                    self._partitions.setdefault(key, []).append(rank)
+                    if rank in self._regexes:
+                        self._regex_partitions.setdefault(key, []).append(rank)
+
+        self._members = {key: set(ranks) for key, ranks in self._partitions.items()}
+
+    def match(self, message: str, target_user: str,
+              category: Optional[str] = None) -> Optional[ChatbotResponse]:
+        """
+        یافتن پاسخ با بالاترین اولویت که با پیام منطبق است
+
+        Args:
+            message: متن پیام (نرمال شده با lower/strip)
+            target_user: نوع کاربر سرویس
+            category: محدود کردن به یک دسته‌بندی
+
+        Returns:
+            Optional[ChatbotResponse]: پاسخ منطبق یا None
+        """
+        key = (self._scope(target_user), category or None)
+        members = self._members.get(key)
+        if not members:
+            return None
+
+        best = len(self.responses)
+        for rank in self._always:
+            if rank < best and rank in members:
+                best = rank
+
+        # هر حالت خروجی رتبه‌ها را صعودی دارد؛ اولین عضو پارتیشن کافی است
+        for ranks in self.automaton.iter_outputs(message):
+            for rank in ranks:
+                if rank >= best:
+                    break
+                if rank in members:
+                    best = rank
+                    break
+
+        for rank in self._regex_partitions.get(key, []):
+            if rank >= best:
+                break
+            if any(pattern.search(message) for pattern in self._regexes[rank]):
+                best = rank
+                break
+
+        return self.responses[best] if best < len(self.responses) else None
+
+    def by_category(self, target_user: str, category: str) -> List[ChatbotResponse]:
+        """پاسخ‌های یک دسته‌بندی به ترتیب اولویت"""
+        key = (self._scope(target_user), category)
+        return [self.responses[rank] for rank in self._partitions.get(key, [])]
+
+    @staticmethod
+    def _scope(target_user: str) -> str:
+        # نوع کاربر ناشناخته فقط پاسخ‌های 'both' را می‌بیند
+        return target_user if target_user in ('patient', 'doctor') else 'both'
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+
+_index: Optional[CompiledResponseIndex] = None
+_index_lock = threading.Lock()
+_last_version_check = 0.0
+
+
+def get_response_index() -> CompiledResponseIndex:
+    """
+    دریافت ایندکس پاسخ‌ها از حافظه پردازه
+
+    نسخه cache حداکثر هر ``CHATBOT_RESPONSE_INDEX_CHECK_INTERVAL`` ثانیه بررسی
+    می‌شود تا تغییرات سایر پردازه‌ها دیده شود و ایندکس پس از
+    ``CHATBOT_RESPONSE_INDEX_MAX_AGE`` ثانیه (برای تغییرات بدون سیگنال مثل
+    ``QuerySet.update``) دوباره ساخته می‌شود. ایندکسی که داخل یک تراکنش
+    ساخته شود در حافظه نگهداری نمی‌شود.
+    """
+    global _index, _last_version_check
+
+    index = _index
+    now = time.monotonic()
+    check_interval = getattr(settings, 'CHATBOT_RESPONSE_INDEX_CHECK_INTERVAL', 1)
+    max_age = getattr(settings, 'CHATBOT_RESPONSE_INDEX_MAX_AGE', 300)
+
+    if index is not None and now - index.built_at < max_age:
+        if now - _last_version_check < check_interval:
+            return index
+        _last_version_check = now
+        if cache.get(VERSION_CACHE_KEY) == index.version:
+            return index
+
+    if transaction.get_connection().in_atomic_block:
+        # داخل تراکنش ممکن است ردیف‌های commit نشده دیده شوند؛ ایندکس منتشر نمی‌شود
+        return CompiledResponseIndex(list(ChatbotResponse.objects.filter(is_active=True)))
+
+    with _index_lock:
+        version = cache.get(VERSION_CACHE_KEY)
+        if version is None:
+            version = time.time_ns()
+            cache.add(VERSION_CACHE_KEY, version, None)
+            version = cache.get(VERSION_CACHE_KEY, version)
+
+        if _index is None or _index is index:
+            _index = CompiledResponseIndex(
+                list(ChatbotResponse.objects.filter(is_active=True)), version
+            )
+            _last_version_check = time.monotonic()
+        return _index
+
+
+def discard_local_response_index():
+    """حذف ایندکس این پردازه (بازسازی در فراخوانی بعدی)"""
+    global _index
+    _index = None
+
+
+def invalidate_response_index():
+    """باطل کردن ایندکس در این پردازه و همه پردازه‌ها"""
+    cache.set(VERSION_CACHE_KEY, time.time_ns(), None)
+    discard_local_response_index()
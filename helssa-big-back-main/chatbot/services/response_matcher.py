@@ -3,10 +3,30 @@
 Response Matcher Service
 """
 
-import re
 from typing import List, Optional, Dict, Any
-from django.db.models import Q
 from ..models import ChatbotResponse
+from .response_index import KeywordAutomaton, get_response_index
+
+
+# کلمات کلیدی برای دسته‌بندی‌های مختلف
+INTENT_KEYWORDS = {
+    'greeting': ['سلام', 'درود', 'صبح بخیر', 'عصر بخیر', 'hello', 'hi'],
+    'symptom_inquiry': ['علائم', 'درد', 'تب', 'سردرد', 'مشکل', 'بیماری'],
+    'medication_info': ['دارو', 'قرص', 'کپسول', 'شربت', 'مصرف', 'دوز'],
+    'appointment': ['نوبت', 'وقت', 'رزرو', 'appointment'],
+    'emergency': ['اورژانس', 'فوری', 'emergency', 'urgent'],
+    'farewell': ['خداحافظ', 'خدانگهدار', 'bye', 'goodbye']
+}
+
+# هر کلیدواژه با شناسه (نیت، کلیدواژه) در automaton ثبت می‌شود
+_INTENT_ENTRIES = [
+    (intent, keyword)
+    for intent, keywords in INTENT_KEYWORDS.items()
+    for keyword in keywords
+]
+_INTENT_AUTOMATON = KeywordAutomaton(
+    (keyword, entry_id) for entry_id, (_, keyword) in enumerate(_INTENT_ENTRIES)
+)
 
 
 class ResponseMatcherService:
@@ -30,7 +50,7 @@ class ResponseMatcherService:
         """
         پاسخ اولین ردیف ChatbotResponse که با پیام ورودی منطبق است را برمی‌گرداند.
         
-        این متد مجموعه‌ای از پاسخ‌های فعال (is_active=True) را می‌گیرد و آن‌ها را بر اساس محدوده هدف (target_user برابر با مقدار سرویس یا 'both') فیلتر می‌کند. در صورت ارسال پارامتر category، مجموعه نتایج به آن دسته محدود می‌شود. نتایج بر اساس اولویت (نزولی) و سپس زمان ایجاد (جدیدترین اول) مرتب می‌شوند. پیام ورودی پیش از بررسی نرمال‌سازی شده (تبدیل به حروف کوچک و حذف فاصله‌های اضافی) و سپس برای هر پاسخ، کلیدواژه‌های تریگر با پیام با استفاده از _matches_keywords (که شامل تطبیق ساده متن و بررسی الگوهای منطبق با regex است) مقایسه می‌شوند. اولین پاسخ مطابق بازگردانده می‌شود؛ در غیر این صورت None بازگردانده می‌شود.
+        این متد در میان پاسخ‌های فعال (is_active=True) با محدوده هدف (target_user برابر با مقدار سرویس یا 'both') و در صورت ارسال category فقط در همان دسته جستجو می‌کند. پاسخ‌ها بر اساس اولویت (نزولی) و سپس زمان ایجاد (جدیدترین اول) رتبه‌بندی می‌شوند. پیام ورودی پیش از بررسی نرمال‌سازی می‌شود (حروف کوچک و حذف فاصله‌های اضافی). یک کلیدواژه وقتی منطبق است که به‌صورت زیررشته در پیام باشد یا (اگر شامل کاراکترهای ویژه regex باشد) الگوی آن با پیام تطبیق کند. تطبیق با ایندکس از پیش کامپایل شده (response_index) و بدون پرس‌وجوی دیتابیس انجام می‌شود؛ پاسخ منطبق با بالاترین رتبه بازگردانده می‌شود و در غیر این صورت None.
         
         Parameters:
             message (str): متن پیام کاربر؛ این مقدار پیش از تطبیق به‌صورت lowercase و با trim شده استفاده می‌شود.
@@ -39,28 +59,9 @@ class ResponseMatcherService:
         Returns:
             Optional[ChatbotResponse]: اولین شیء ChatbotResponse که با پیام مطابقت دارد یا None اگر مطابقتی یافت نشود.
         """
-        # فیلتر کردن پاسخ‌های فعال
-        queryset = ChatbotResponse.objects.filter(
-            is_active=True
-        ).filter(
-            Q(target_user=self.target_user) | Q(target_user='both')
-        )
-        
-        # فیلتر بر اساس دسته‌بندی
-        if category:
-            queryset = queryset.filter(category=category)
-        
-        # مرتب‌سازی بر اساس اولویت
-        responses = queryset.order_by('-priority', '-created_at')
-        
+        # تطبیق با ایندکس از پیش کامپایل شده (automaton کلیدواژه‌ها + regex ها)
         message_lower = message.lower().strip()
-        
-        # جستجو برای تطبیق کلمات کلیدی
-        for response in responses:
-            if self._matches_keywords(message_lower, response.trigger_keywords):
-                return response
-        
-        return None
+        return get_response_index().match(message_lower, self.target_user, category)
     
     def get_responses_by_category(self, category: str) -> List[ChatbotResponse]:
         """
@@ -78,14 +79,7 @@ class ResponseMatcherService:
         Returns:
             List[ChatbotResponse]: لیستی از نمونه‌های ChatbotResponse منطبق، یا لیست خالی در صورت عدم وجود پاسخ.
         """
-        return list(
-            ChatbotResponse.objects.filter(
-                category=category,
-                is_active=True
-            ).filter(
-                Q(target_user=self.target_user) | Q(target_user='both')
-            ).order_by('-priority', '-created_at')
-        )
+        return get_response_index().by_category(self.target_user, category)
     
     def get_greeting_response(self) -> Optional[ChatbotResponse]:
         """
@@ -123,69 +117,13 @@ class ResponseMatcherService:
         responses = self.get_responses_by_category('unknown')
         return responses[0] if responses else None
     
-    def _matches_keywords(self, message: str, keywords: List[str]) -> bool:
-        """
-        بررسی می‌کند که آیا پیام وارد شده با هر یک از کلمات‌کلیدی مشخص شده مطابقت دارد.
-        
-        جزئیات:
-        - پیام و هر کلمه‌کلیدی پیش از مقایسه به حروف کوچک تبدیل و پیرایش می‌شوند.
-        - در صورتی که هر کلمه‌کلیدی به‌صورت زیررشته در پیام ظاهر شود، مطابقت مثبت در نظر گرفته می‌شود.
-        - اگر تطبیق زیررشته‌ای پیدا نشود، تابع به‌عنوان مسیر دوم الگوهای پیچیده‌تر (regex) را برای هر کلیدواژه بررسی می‌کند و در صورت تطابق regex نیز مثبت برمی‌گردد.
-        - اگر فهرست کلیدواژه‌ها خالی باشد، همیشه False بازگردانده می‌شود.
-        
-        Parameters:
-            message (str): متن پیام کاربر (انتظار می‌رود از قبل به صورت کلیترشده یا نرمال شده باشد).
-            keywords (List[str]): فهرستی از کلمات‌کلیدی یا الگوها که باید با پیام بررسی شوند.
-        
-        Returns:
-            bool: True اگر حداقل یکی از کلیدواژه‌ها (به‌صورت زیررشته یا مطابق regex) در پیام یافت شود، در غیر این صورت False.
-        """
-        if not keywords:
-            return False
-        
-        for keyword in keywords:
-            keyword_lower = keyword.lower().strip()
-            
-            # تطبیق دقیق
-            if keyword_lower in message:
-                return True
-            
-            # تطبیق با regex (برای کلمات کلیدی پیچیده)
-            if self._regex_match(keyword_lower, message):
-                return True
-        
-        return False
-    
-    def _regex_match(self, pattern: str, message: str) -> bool:
-        """
-        بررسی می‌کند آیا یک الگو (که می‌تواند رشته عادی یا عبارت‌نگاره/regex باشد) در متن پیام یافت می‌شود.
-        
-        این تابع اول تلاش می‌کند تشخیص دهد که پارامتر `pattern` حاوی کاراکترهای ویژهٔ regex هست یا خیر. اگر شامل کاراکترهای ویژه باشد، از جستجوی مستقیم با `re.search(pattern, message)` استفاده می‌کند (الگوی ارائه‌شده به‌عنوان یک regex تفسیر می‌شود). در غیر این صورت، جستجو به‌صورت تطبیق دقیق کلمه انجام می‌شود که از مرز کلمه (`\b`) و `re.escape` برای فرار امن الگو استفاده می‌کند تا فقط کلمات کامل تطبیق داده شوند. در صورت بروز خطای مرتبط با regex (re.error) تابع False برمی‌گرداند.
-        
-        Parameters:
-            pattern (str): الگوی جستجو؛ می‌تواند یک رشته ساده یا یک عبارت‌نگارهٔ regex باشد.
-            message (str): متن پیام که در آن جستجو انجام می‌شود.
-        
-        Returns:
-            bool: True اگر الگو در پیام مطابق باشد، در غیر این صورت False.
-        """
-        try:
-            # بررسی اینکه آیا pattern یک regex است
-            if any(char in pattern for char in r'.*+?[]{}()|^$\\'):
-                return bool(re.search(pattern, message))
-            else:
-                # تطبیق ساده کلمه
-                return bool(re.search(r'\b' + re.escape(pattern) + r'\b', message))
-        except re.error:
-            return False
-    
     def analyze_message_intent(self, message: str) -> Dict[str, Any]:
         """
         تحلیل و تشخیص نیت‌های احتمالی یک پیام متنی کاربر.
         
         توضیحات:
             این تابع پیام ورودی را نرمال‌سازی (حروف کوچک و حذف فاصلهٔ سر و ته) می‌کند و بر اساس نگاشت از پیش‌تعریف‌شده‌ای از نیت‌ها به لیست کلمات کلیدی، نیت‌های مربوطه را تشخیص می‌دهد. برای هر نیت:
-            - تعداد کلمات کلیدیِ پیدا‌شده در پیام شمرده می‌شود (با مقایسهٔ سادهٔ درون‌رشته‌ای).
+            - تعداد کلمات کلیدیِ پیدا‌شده در پیام شمرده می‌شود (همه کلیدواژه‌ها با یک پیمایش automaton از پیش ساخته شده یافت می‌شوند).
             - امتیاز اطمینان (confidence) به‌صورت نسبت تعداد مطابقت‌ها به مجموع کلمات کلیدی آن نیت محاسبه می‌شود (مقدار بین 0 و 1).
             اگر حداقل یک نیت تشخیص داده شود، نیت اصلی (primary_intent) به‌عنوان نیت با بیشترین امتیاز انتخاب می‌شود.
             تابع خروجی را به‌صورت دیکشنری شامل اطلاعات زیر برمی‌گرداند.
@@ -202,30 +140,24 @@ class ResponseMatcherService:
                 - word_count (int): تعداد واژه‌ها براساس جداشدن با فاصلهٔ سفید.
         
         نکات پیاده‌سازی (مختصر و مهم):
-            - تشخیص بر پایهٔ مقایسهٔ سادهٔ زیررشته‌ای است و از تطابق‌های پیچیدهٔ رگِکس یا پردازش زبان طبیعی استفاده نمی‌کند.
+            - تشخیص بر پایهٔ تطبیق زیررشته‌ای (automaton کلیدواژه‌های INTENT_KEYWORDS) است و از تطابق‌های پیچیدهٔ رگِکس یا پردازش زبان طبیعی استفاده نمی‌کند.
             - امتیازها نسبی به تعداد کلمات کلیدی هر نیت هستند؛ نیتی با کلیدواژهٔ بیشتر ممکن است امتیاز کلی متفاوتی نسبت به نیتی با کلیدواژهٔ کمتر کسب کند.
             - تابع هیچ استثنایی را به‌طور صریح پرتاب نمی‌کند و هیچ اثر جانبی (مانند تغییر پایگاه‌داده یا لاگ‌نویسی) ندارد.
         """
         message_lower = message.lower().strip()
         
-        # کلمات کلیدی برای دسته‌بندی‌های مختلف
-        intent_keywords = {
-            'greeting': ['سلام', 'درود', 'صبح بخیر', 'عصر بخیر', 'hello', 'hi'],
-            'symptom_inquiry': ['علائم', 'درد', 'تب', 'سردرد', 'مشکل', 'بیماری'],
-            'medication_info': ['دارو', 'قرص', 'کپسول', 'شربت', 'مصرف', 'دوز'],
-            'appointment': ['نوبت', 'وقت', 'رزرو', 'appointment'],
-            'emergency': ['اورژانس', 'فوری', 'emergency', 'urgent'],
-            'farewell': ['خداحافظ', 'خدانگهدار', 'bye', 'goodbye']
-        }
+        matches = {}
+        for entry_id in _INTENT_AUTOMATON.search(message_lower):
+            intent = _INTENT_ENTRIES[entry_id][0]
+            matches[intent] = matches.get(intent, 0) + 1
         
         detected_intents = []
         confidence_scores = {}
         
-        for intent, keywords in intent_keywords.items():
-            matches = sum(1 for keyword in keywords if keyword in message_lower)
-            if matches > 0:
+        for intent, keywords in INTENT_KEYWORDS.items():
+            if intent in matches:
                 detected_intents.append(intent)
-                confidence_scores[intent] = matches / len(keywords)
+                confidence_scores[intent] = matches[intent] / len(keywords)
         
         # تعیین هدف اصلی
         primary_intent = None
@@ -0,0 +1,25 @@
+"""
+سیگنال‌های اپ چت‌بات
+Chatbot Signals
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ChatbotResponse
+from .services.response_index import discard_local_response_index, invalidate_response_index
+
+
+@receiver(post_save, sender=ChatbotResponse)
+@receiver(post_delete, sender=ChatbotResponse)
+def handle_chatbot_response_change(sender, instance, **kwargs):
+    """
+    باطل کردن ایندکس پاسخ‌ها پس از commit تغییر یک ChatbotResponse
+    
+    ایندکس همین پردازه بلافاصله کنار گذاشته می‌شود و نسخه مشترک cache پس از
+    commit تغییر می‌کند تا پردازه‌های دیگر ایندکس را با داده commit نشده
+    بازسازی نکنند.
+    """
+    discard_local_response_index()
+    transaction.on_commit(invalidate_response_index)
@@ -3,7 +3,9 @@
 Chatbot Tests
 """
 
-from django.test import TestCase, TransactionTestCase
+import re
+
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
@@ -12,8 +14,15 @@ from rest_framework import status
 from unittest.mock import patch, MagicMock
 from datetime import timedelta
 
+from api_gateway.services.rate_limiter import reset_rate_limiter
+
 from .models import ChatbotSession, Conversation, Message, ChatbotResponse
-from .services import PatientChatbotService, DoctorChatbotService, AIIntegrationService
+from .services import (
+    PatientChatbotService, DoctorChatbotService, AIIntegrationService, ResponseMatcherService
+)
+from .services.response_index import (
+    CompiledResponseIndex, KeywordAutomaton, discard_local_response_index, get_response_index
+)
 from .serializers import (
     ChatbotSessionSerializer, ConversationSerializer, MessageSerializer,
     SendMessageRequestSerializer
@@ -468,24 +477,32 @@ class ChatbotMiddlewareTest(TestCase):
         )
         self.client = APIClient()
     
-    @patch('django.core.cache.cache.get')
-    @patch('django.core.cache.cache.set')
-    def test_rate_limiting_middleware(self, mock_cache_set, mock_cache_get):
+    @override_settings(API_GATEWAY_RATE_LIMIT_POLICIES=[
+        {'name': 'chatbot_message', 'group': 'chatbot', 'paths': ['send-message'],
+         'scope': 'user', 'limit': 2, 'window': 60, 'description': 'ارسال پیام چت‌بات'},
+    ])
+    def test_rate_limiting_middleware(self):
         """
         تست middleware محدودسازی نرخ
         """
-        # شبیه‌سازی درخواست‌های زیاد
-        mock_cache_get.return_value = [int(timezone.now().timestamp())] * 35
+        reset_rate_limiter()
+        self.addCleanup(reset_rate_limiter)
         
         self.client.force_authenticate(user=self.user)
         
         url = reverse('chatbot:patient-send-message')
         data = {'message': 'تست'}
         
+        # درخواست‌های داخل سقف مجاز
+        for _ in range(2):
+            response = self.client.post(url, data, format='json')
+            self.assertNotEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        
         response = self.client.post(url, data, format='json')
         
         # باید محدودیت اعمال شود
         self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
     
     def test_security_middleware_sensitive_content(self):
         """
@@ -515,4 +532,163 @@ class ChatbotMiddlewareTest(TestCase):
         
         # باید خطای امنیتی بازگرداند
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
-        self.assertIn('محتوای حساس', response.data['message'])
\ No newline at end of file
+        self.assertIn('محتوای حساس', response.data['message'])
+
+
+class ResponseIndexTest(TestCase):
+    """
+    تست‌های ایندکس از پیش کامپایل شده پاسخ‌ها
+    """
+    
+    def setUp(self):
+        discard_local_response_index()
+        self.addCleanup(discard_local_response_index)
+    
+    def _create(self, category, target_user, keywords, priority=1):
+        return ChatbotResponse.objects.create(
+            category=category,
+            target_user=target_user,
+            trigger_keywords=keywords,
+            response_text=f'{category}-{target_user}-{priority}',
+            priority=priority
+        )
+    
+    def test_keyword_automaton_finds_overlapping_keywords(self):
+        """
+        همه کلیدواژه‌های هم‌پوشان در یک پیمایش پیدا می‌شوند
+        """
+        automaton = KeywordAutomaton([('سر', 1), ('سردرد', 2), ('درد', 3), ('تب', 4)])
+        
+        self.assertEqual(automaton.search('من سردرد دارم'), {1, 2, 3})
+        self.assertEqual(automaton.search('حالم خوب است'), set())
+    
+    def test_intent_analysis_matches_substring_scan(self):
+        """
+        تحلیل نیت با automaton همان نتیجه بررسی زیررشته‌ای را می‌دهد
+        """
+        from .services.response_matcher import INTENT_KEYWORDS
+        
+        matcher = ResponseMatcherService('patient')
+        messages = ['سلام، سردرد و تب دارم', 'دوز قرص را بگویید', 'Hi, urgent!', 'ممنون', 'bye']
+        
+        for message in messages:
+            message_lower = message.lower().strip()
+            expected = {
+                intent: sum(1 for keyword in keywords if keyword in message_lower) / len(keywords)
+                for intent, keywords in INTENT_KEYWORDS.items()
+                if any(keyword in message_lower for keyword in keywords)
+            }
+            result = matcher.analyze_message_intent(message)
+            self.assertEqual(result['confidence_scores'], expected, message)
+            self.assertEqual(result['detected_intents'], list(expected), message)
+        
+        result = matcher.analyze_message_intent('سلام، سردرد و تب دارم')
+        self.assertEqual(result['primary_intent'], 'symptom_inquiry')
+        self.assertIsNone(matcher.analyze_message_intent('ممنون')['primary_intent'])
+    
+    def test_highest_priority_match_wins(self):
+        """
+        پاسخ منطبق با بالاترین اولویت بازگردانده می‌شود
+        """
+        self._create('general_health', 'both', ['درد'], priority=1)
+        high = self._create('symptom_inquiry', 'patient', ['سردرد'], priority=5)
+        
+        matcher = ResponseMatcherService(target_user='patient')
+        
+        self.assertEqual(matcher.find_matching_response('سردرد شدید دارم'), high)
+        self.assertEqual(
+            matcher.find_matching_response('درد دارم').category, 'general_health'
+        )
+        self.assertIsNone(matcher.find_matching_response('ممنون'))
+    
+    def test_partitions_by_target_user_and_category(self):
+        """
+        پاسخ‌ها بر اساس کاربر هدف و دسته‌بندی جدا می‌شوند
+        """
+        self._create('medication_info', 'doctor', ['دوز'], priority=3)
+        both = self._create('medication_info', 'both', ['دوز'], priority=1)
+        
+        self.assertEqual(
+            ResponseMatcherService('patient').find_matching_response('دوز مصرف'), both
+        )
+        self.assertEqual(
+            ResponseMatcherService('doctor').find_matching_response('دوز مصرف').target_user, 'doctor'
+        )
+        self.assertIsNone(
+            ResponseMatcherService('doctor').find_matching_response('دوز مصرف', category='greeting')
+        )
+        self.assertEqual(
+            [r.priority for r in ResponseMatcherService('doctor').get_responses_by_category('medication_info')],
+            [3, 1]
+        )
+    
+    def test_regex_keywords_only_checked_above_best_match(self):
+        """
+        کلیدواژه‌های regex کامپایل شده و با اولویت درست تطبیق داده می‌شوند
+        """
+        regex = self._create('appointment_booking', 'both', [r'نوبت\s+(فردا|امروز)'], priority=4)
+        self._create('general_health', 'both', ['فردا'], priority=2)
+        
+        matcher = ResponseMatcherService('patient')
+        
+        self.assertEqual(matcher.find_matching_response('نوبت   فردا می‌خواهم'), regex)
+        self.assertEqual(
+            matcher.find_matching_response('فردا تماس می‌گیرم').category, 'general_health'
+        )
+    
+    def test_inactive_responses_are_excluded(self):
+        """
+        پاسخ‌های غیرفعال در ایندکس نیستند
+        """
+        response = self._create('greeting', 'both', ['سلام'])
+        response.is_active = False
+        response.save()
+        
+        self.assertIsNone(ResponseMatcherService('patient').find_matching_response('سلام'))
+    
+    def test_index_is_cached_and_invalidated_on_save(self):
+        """
+        ایندکس بیرون از تراکنش نگهداری و با ذخیره پاسخ باطل می‌شود
+        """
+        self._create('greeting', 'both', ['سلام'])
+        
+        with patch('chatbot.services.response_index.transaction.get_connection') as connection:
+            connection.return_value.in_atomic_block = False
+            first = get_response_index()
+            self.assertIs(get_response_index(), first)
+            
+            with self.captureOnCommitCallbacks(execute=True):
+                self._create('farewell', 'both', ['خداحافظ'])
+            
+            second = get_response_index()
+        
+        self.assertIsNot(second, first)
+        self.assertEqual(len(second), 2)
+    
+    def test_matches_linear_scan(self):
+        """
+        نتیجه ایندکس با پیمایش خطی پاسخ‌ها یکسان است
+        """
+        keywords = ['تب', 'سرفه', 'درد', 'قرص', 'نوبت', r'دوز\s*\d+', 'hello', 'دارو']
+        for i in range(40):
+            self._create(
+                ['symptom_inquiry', 'medication_info', 'greeting'][i % 3],
+                ['patient', 'doctor', 'both'][i % 3],
+                [keywords[i % len(keywords)], keywords[(i * 3) % len(keywords)]],
+                priority=i % 7
+            )
+        responses = list(ChatbotResponse.objects.filter(is_active=True))
+        index = CompiledResponseIndex(responses)
+        messages = ['تب و سرفه دارم', 'دوز 20 قرص', 'hello there', 'ممنون', 'نوبت دارو']
+        
+        for target_user in ('patient', 'doctor'):
+            for message in messages:
+                expected = next(
+                    (
+                        r for r in index.responses
+                        if r.target_user in (target_user, 'both')
+                        and any(k in message or re.search(k, message) for k in r.trigger_keywords)
+                    ),
+                    None
+                )
+                self.assertEqual(index.match(message, target_user), expected)
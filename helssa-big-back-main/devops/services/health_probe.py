@@ -0,0 +1,122 @@
+"""
+اجرای همزمان health check سرویس‌های خارجی
+Concurrent Health Probe Runner
+
+همه سرویس‌ها با یک ``httpx.AsyncClient`` مشترک و به صورت همزمان بررسی
+می‌شوند. تعداد درخواست‌های همزمان با semaphore محدود است و هر probe یک
+مهلت مستقل دارد؛ بنابراین زمان کل بررسی تقریباً برابر کندترین سرویس است
+نه مجموع زمان همه سرویس‌ها.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def classify_response(status_code: int, response_time: float) -> str:
+    """تعیین وضعیت بر اساس کد پاسخ و زمان پاسخ (میلی‌ثانیه)"""
+    if status_code != 200:
+        return 'critical'
+    if response_time < 1000:
+        return 'healthy'
+    if response_time < 5000:
+        return 'warning'
+    return 'critical'
+
+
+@dataclass(frozen=True)
+class ProbeTarget:
+    """یک endpoint برای بررسی"""
+
+    name: str
+    url: str
+    timeout: float
+
+
+class HealthProbeRunner:
+    """
+    اجرای همزمان probe ها با همزمانی محدود و مهلت برای هر probe
+
+    Args:
+        concurrency: حداکثر درخواست همزمان (``HEALTH_PROBE_CONCURRENCY``، پیش‌فرض ۲۰)
+        max_timeout: سقف مهلت هر probe به ثانیه (``HEALTH_PROBE_MAX_TIMEOUT``، پیش‌فرض ۱۰)
+        transport: transport اختیاری httpx (برای تست)
+    """
+
+    def __init__(self, concurrency: Optional[int] = None,
+                 max_timeout: Optional[float] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.concurrency = concurrency or getattr(settings, 'HEALTH_PROBE_CONCURRENCY', 20)
+        self.max_timeout = max_timeout or getattr(settings, 'HEALTH_PROBE_MAX_TIMEOUT', 10)
+        self.transport = transport
+
+    def run(self, targets: Iterable[ProbeTarget]) -> List[Dict[str, Any]]:
+        """
+        اجرای probe ها از کد همگام
+
+        Returns:
+            List[Dict]: نتیجه هر probe به ترتیب targets
+        """
+        targets = list(targets)
+        if not targets:
+            return []
+        return asyncio.run(self.probe_all(targets))
+
+    async def probe_all(self, targets: List[ProbeTarget]) -> List[Dict[str, Any]]:
+        """اجرای همزمان همه probe ها با یک client مشترک"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limits = httpx.Limits(
+            max_connections=self.concurrency,
+            max_keepalive_connections=self.concurrency
+        )
+
+        async with httpx.AsyncClient(
+            timeout=self.max_timeout,
+            limits=limits,
+            transport=self.transport
+        ) as client:
+            return await asyncio.gather(
+                *(self.probe(client, semaphore, target) for target in targets)
+            )
+
+    async def probe(self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore,
+                    target: ProbeTarget) -> Dict[str, Any]:
+        """بررسی یک endpoint؛ خطاها به نتیجه critical تبدیل می‌شوند"""
+        timeout = min(target.timeout or self.max_timeout, self.max_timeout)
+
+        async with semaphore:
+            start_time = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    client.get(target.url, timeout=timeout), timeout
+                )
+            except (asyncio.TimeoutError, httpx.TimeoutException):
+                return {
+                    'status': 'critical',
+                    'error': 'Timeout',
+                    'response_time': timeout * 1000,
+                    'url': target.url,
+                }
+            except Exception as e:
+                logger.error(f"خطا در بررسی سرویس {target.url}: {str(e)}")
+                return {
+                    'status': 'critical',
+                    'error': str(e),
+                    'response_time': round((time.perf_counter() - start_time) * 1000, 2),
+                    'url': target.url,
+                }
+
+        response_time = (time.perf_counter() - start_time) * 1000
+        return {
+            'status': classify_response(response.status_code, response_time),
+            'status_code': response.status_code,
+            'response_time': round(response_time, 2),
+            'url': target.url,
+        }
@@ -5,8 +5,10 @@ import requests
 import time
 import psutil
 import subprocess
-from typing import Dict, List, Optional, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple, Any
 from django.db import connection
+from django.db.models import OuterRef, Subquery
 from django.core.cache import cache
 from django.utils import timezone
 from django.conf import settings
@@ -14,9 +16,17 @@ import logging
 import json
 
 from ..models import HealthCheck, ServiceMonitoring, EnvironmentConfig
+from .health_probe import HealthProbeRunner, ProbeTarget, classify_response
 
 logger = logging.getLogger(__name__)
 
+HEALTH_SNAPSHOT_PREFIX = 'devops:health:snapshot'
+
+
+def health_snapshot_key(environment_name: Optional[str] = None) -> str:
+    """کلید cache آخرین نتیجه بررسی جامع یک محیط"""
+    return f"{HEALTH_SNAPSHOT_PREFIX}:{environment_name or 'default'}"
+
 
 class HealthService:
     """سرویس بررسی سلامت سیستم"""
@@ -218,19 +228,8 @@ class HealthService:
             response = requests.get(url, timeout=timeout)
             response_time = (time.time() - start_time) * 1000
             
-            # تعیین وضعیت بر اساس کد پاسخ و زمان
-            if response.status_code == 200:
-                if response_time < 1000:
-                    status = 'healthy'
-                elif response_time < 5000:
-                    status = 'warning'
-                else:
-                    status = 'critical'
-            else:
-                status = 'critical'
-            
             return {
-                'status': status,
+                'status': classify_response(response.status_code, response_time),
                 'status_code': response.status_code,
                 'response_time': round(response_time, 2),
                 'url': url,
@@ -252,8 +251,82 @@ class HealthService:
                 'url': url,
             }
     
-    def comprehensive_health_check(self) -> Dict[str, Any]:
-        """بررسی جامع سلامت سیستم"""
+    def check_external_services(self, services: Iterable[ServiceMonitoring]) -> List[Dict[str, Any]]:
+        """
+        بررسی همزمان چند سرویس مانیتور شده
+        
+        Args:
+            services: سرویس‌های مانیتور شده
+            
+        Returns:
+            List[Dict]: نتیجه هر سرویس به ترتیب ورودی
+        """
+        targets = [
+            ProbeTarget(service.service_name, service.health_check_url, service.timeout)
+            for service in services
+        ]
+        return HealthProbeRunner().run(targets)
+    
+    def latest_service_results(self, services: Iterable[ServiceMonitoring]) -> List[Dict[str, Any]]:
+        """
+        آخرین نتیجه ذخیره شده هر سرویس مانیتور شده (بدون بررسی مجدد)
+        
+        Args:
+            services: سرویس‌های مانیتور شده
+            
+        Returns:
+            List[Dict]: نتیجه هر سرویس به ترتیب ورودی؛ برای سرویس بدون
+            سابقه وضعیت unknown
+        """
+        services = list(services)
+        latest_checks = HealthCheck.objects.filter(
+            environment_id=OuterRef('environment_id'),
+            service_name=OuterRef('service_name')
+        ).order_by('-checked_at').values('id')[:1]
+        
+        check_ids = dict(
+            ServiceMonitoring.objects.filter(
+                id__in=[service.id for service in services]
+            ).annotate(
+                latest_check_id=Subquery(latest_checks)
+            ).values_list('id', 'latest_check_id')
+        )
+        checks = HealthCheck.objects.in_bulk(
+            [check_id for check_id in check_ids.values() if check_id]
+        )
+        
+        results = []
+        for service in services:
+            check = checks.get(check_ids.get(service.id))
+            if check is None:
+                results.append({'status': 'unknown', 'error': 'نتیجه‌ای ثبت نشده است'})
+                continue
+            results.append({
+                **(check.response_data or {}),
+                'status': check.status,
+                'checked_at': check.checked_at.isoformat(),
+            })
+        return results
+    
+    def comprehensive_health_check(self, use_snapshot: bool = False,
+                                   probe_services: bool = True) -> Dict[str, Any]:
+        """
+        بررسی جامع سلامت سیستم
+        
+        سرویس‌های مانیتور شده به صورت همزمان و در پس‌زمینه بررسی می‌شوند
+        و همزمان بررسی‌های محلی (پایگاه داده، کش و منابع سیستم) اجرا می‌شود.
+        نتیجه در cache ذخیره می‌شود.
+        
+        Args:
+            use_snapshot: در صورت وجود، آخرین نتیجه cache شده بازگردانده شود
+            probe_services: اگر False باشد سرویس‌های مانیتور شده بررسی نمی‌شوند
+                و آخرین نتیجه ذخیره شده آن‌ها (run_health_checks) استفاده می‌شود
+        """
+        if use_snapshot:
+            snapshot = self.get_snapshot()
+            if snapshot is not None:
+                return snapshot
+        
         start_time = time.time()
         
         results = {
@@ -262,35 +335,44 @@ class HealthService:
             'services': {}
         }
         
-        # بررسی پایگاه داده
-        db_result = self.check_database()
-        results['services']['database'] = db_result
-        
-        # بررسی کش
-        cache_result = self.check_cache()
-        results['services']['cache'] = cache_result
-        
-        # بررسی منابع سیستم
-        results['services']['disk'] = self.check_disk_space()
-        results['services']['memory'] = self.check_memory()
-        results['services']['cpu'] = self.check_cpu()
-        
-        # بررسی سرویس‌های مانیتور شده
+        monitored_services = []
         if self.environment:
-            monitored_services = ServiceMonitoring.objects.filter(
+            monitored_services = list(ServiceMonitoring.objects.filter(
                 environment=self.environment,
                 is_active=True
-            )
+            ))
+        
+        stored_results = None
+        if not probe_services:
+            stored_results = self.latest_service_results(monitored_services)
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # بررسی سرویس‌های مانیتور شده در پس‌زمینه
+            probes = None
+            if stored_results is None:
+                probes = executor.submit(self.check_external_services, monitored_services)
             
-            for service in monitored_services:
-                service_result = self.check_external_service(
-                    service.health_check_url,
-                    service.timeout
-                )
-                results['services'][service.service_name] = service_result
-                
-                # ذخیره نتیجه در پایگاه داده
-                self._save_health_check_result(service, service_result)
+            # بررسی پایگاه داده
+            db_result = self.check_database()
+            results['services']['database'] = db_result
+            
+            # بررسی کش
+            cache_result = self.check_cache()
+            results['services']['cache'] = cache_result
+            
+            # بررسی منابع سیستم
+            results['services']['disk'] = self.check_disk_space()
+            results['services']['memory'] = self.check_memory()
+            results['services']['cpu'] = self.check_cpu()
+            
+            service_results = probes.result() if probes else stored_results
+        
+        for service, service_result in zip(monitored_services, service_results):
+            results['services'][service.service_name] = service_result
+        
+        # ذخیره نتایج در پایگاه داده (فقط برای بررسی‌های جدید)
+        if probes:
+            self._save_health_check_results(zip(monitored_services, service_results))
         
         # تعیین وضعیت کلی
         critical_count = sum(1 for s in results['services'].values() 
@@ -306,21 +388,42 @@ class HealthService:
         # زمان کل بررسی
         results['total_check_time'] = round((time.time() - start_time) * 1000, 2)
         
+        self.store_snapshot(results)
         return results
     
+    def get_snapshot(self) -> Optional[Dict[str, Any]]:
+        """آخرین نتیجه بررسی جامع cache شده برای این محیط"""
+        return cache.get(health_snapshot_key(self._environment_name()))
+    
+    def store_snapshot(self, results: Dict[str, Any]):
+        """ذخیره نتیجه بررسی جامع در cache"""
+        ttl = getattr(settings, 'HEALTH_SNAPSHOT_TTL', 600)
+        cache.set(health_snapshot_key(self._environment_name()), results, ttl)
+    
+    def _environment_name(self) -> Optional[str]:
+        """نام محیط جاری"""
+        return self.environment.name if self.environment else None
+    
     def _save_health_check_result(self, service: ServiceMonitoring, result: Dict[str, Any]):
         """ذخیره نتیجه health check در پایگاه داده"""
+        self._save_health_check_results([(service, result)])
+    
+    def _save_health_check_results(self, results: Iterable[Tuple[ServiceMonitoring, Dict[str, Any]]]):
+        """ذخیره نتایج health check با یک bulk_create"""
         try:
-            HealthCheck.objects.create(
-                environment=service.environment,
-                service_name=service.service_name,
-                endpoint_url=service.health_check_url,
-                status=result.get('status', 'unknown'),
-                response_time=result.get('response_time'),
-                status_code=result.get('status_code'),
-                response_data=result,
-                error_message=result.get('error', '')
-            )
+            HealthCheck.objects.bulk_create([
+                HealthCheck(
+                    environment_id=service.environment_id,
+                    service_name=service.service_name,
+                    endpoint_url=service.health_check_url,
+                    status=result.get('status', 'unknown'),
+                    response_time=result.get('response_time'),
+                    status_code=result.get('status_code'),
+                    response_data=result,
+                    error_message=result.get('error', '')
+                )
+                for service, result in results
+            ])
         except Exception as e:
             logger.error(f"خطا در ذخیره نتیجه health check: {str(e)}")
     
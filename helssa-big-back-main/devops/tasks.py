@@ -2,6 +2,7 @@
 تسک‌های Celery برای اپلیکیشن DevOps
 """
 from celery import shared_task
+from django.db.models import Max
 from django.utils import timezone
 from datetime import timedelta
 import logging
@@ -16,66 +17,46 @@ logger = logging.getLogger(__name__)
 def run_health_checks():
     """
     اجرای health check های دوره‌ای برای تمام سرویس‌های فعال
+    
+    سرویس‌هایی که زمان بررسی آن‌ها رسیده به صورت همزمان بررسی و نتایج
+    با یک bulk_create ذخیره می‌شوند.
     """
     logger.info("شروع health check های دوره‌ای")
     
     current_time = timezone.now()
-    total_checks = 0
-    successful_checks = 0
     
     # دریافت تمام سرویس‌های فعال
-    active_services = ServiceMonitoring.objects.filter(is_active=True)
+    active_services = list(
+        ServiceMonitoring.objects.filter(is_active=True).select_related('environment')
+    )
+    
+    # آخرین زمان بررسی هر سرویس با یک پرس‌وجو
+    last_checks = {
+        (row['environment_id'], row['service_name']): row['last_checked_at']
+        for row in HealthCheck.objects.values('environment_id', 'service_name').annotate(
+            last_checked_at=Max('checked_at')
+        ).order_by()
+    }
     
+    due_services = []
     for service in active_services:
-        try:
-            # بررسی آیا زمان check کردن رسیده یا نه
-            last_check = HealthCheck.objects.filter(
-                environment=service.environment,
-                service_name=service.service_name
-            ).order_by('-checked_at').first()
-            
-            should_check = True
-            if last_check:
-                time_since_last_check = (current_time - last_check.checked_at).total_seconds()
-                should_check = time_since_last_check >= service.check_interval
-            
-            if should_check:
-                logger.debug(f"اجرای health check برای {service.service_name}")
-                
-                # ایجاد health service
-                health_service = HealthService(service.environment.name)
-                
-                # بررسی سرویس
-                result = health_service.check_external_service(
-                    service.health_check_url,
-                    service.timeout
-                )
-                
-                # ذخیره نتیجه
-                health_service._save_health_check_result(service, result)
-                
-                total_checks += 1
-                if result.get('status') == 'healthy':
-                    successful_checks += 1
-                    
-        except Exception as e:
-            logger.error(f"خطا در health check سرویس {service.service_name}: {str(e)}")
-            
-            # ذخیره خطا به عنوان health check ناموفق
-            try:
-                HealthCheck.objects.create(
-                    environment=service.environment,
-                    service_name=service.service_name,
-                    endpoint_url=service.health_check_url,
-                    status='critical',
-                    error_message=str(e)
-                )
-            except Exception as save_error:
-                logger.error(f"خطا در ذخیره health check: {str(save_error)}")
+        last_checked_at = last_checks.get((service.environment_id, service.service_name))
+        if last_checked_at is None or (
+            (current_time - last_checked_at).total_seconds() >= service.check_interval
+        ):
+            due_services.append(service)
+    
+    health_service = HealthService()
+    results = health_service.check_external_services(due_services)
+    health_service._save_health_check_results(zip(due_services, results))
+    
+    total_checks = len(results)
+    successful_checks = sum(1 for result in results if result.get('status') == 'healthy')
     
     logger.info(
         f"health check های دوره‌ای تکمیل شد. "
-        f"کل: {total_checks}, موفق: {successful_checks}"
+        f"کل: {total_checks}, موفق: {successful_checks}, "
+        f"زمان: {(timezone.now() - current_time).total_seconds():.2f}s"
     )
     
     return {
@@ -85,6 +66,38 @@ def run_health_checks():
     }
 
 
+@shared_task
+def refresh_health_snapshots():
+    """
+    به‌روزرسانی نتیجه cache شده بررسی جامع سلامت
+    
+    endpoint های health آخرین نتیجه cache شده را بدون اجرای بررسی برمی‌گردانند؛
+    این task باید با فاصله‌ای کمتر از HEALTH_SNAPSHOT_TTL زمان‌بندی شود.
+    سرویس‌های مانیتور شده اینجا بررسی نمی‌شوند: آخرین نتیجه ذخیره شده
+    run_health_checks (که check_interval هر سرویس را رعایت می‌کند) استفاده
+    می‌شود و فقط بررسی‌های محلی دوباره اجرا می‌شوند.
+    """
+    environment_names = [None] + list(
+        EnvironmentConfig.objects.filter(is_active=True).values_list('name', flat=True)
+    )
+    
+    statuses = {}
+    for environment_name in environment_names:
+        try:
+            result = HealthService(environment_name).comprehensive_health_check(
+                probe_services=False
+            )
+            statuses[environment_name or 'default'] = result['overall_status']
+        except Exception as e:
+            logger.error(f"خطا در به‌روزرسانی وضعیت سلامت محیط {environment_name}: {str(e)}")
+            statuses[environment_name or 'default'] = 'unknown'
+    
+    return {
+        'environments': statuses,
+        'timestamp': timezone.now().isoformat()
+    }
+
+
 @shared_task
 def cleanup_old_health_checks(days_to_keep=30):
     """
@@ -3,14 +3,19 @@
 """
 from django.test import TestCase, TransactionTestCase
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.urls import reverse
 from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from unittest.mock import patch, MagicMock
+import asyncio
 import json
+import time
 from datetime import timedelta
 
+import httpx
+
 from .models import (
     EnvironmentConfig,
     SecretConfig,
@@ -21,6 +26,8 @@ from .models import (
 from .services.docker_service import DockerService, DockerComposeService
 from .services.deployment_service import DeploymentService
 from .services.health_service import HealthService
+from .services.health_probe import HealthProbeRunner, ProbeTarget
+from .tasks import refresh_health_snapshots, run_health_checks
 
 
 class EnvironmentConfigTestCase(TestCase):
@@ -237,6 +244,174 @@ class HealthServiceTestCase(TestCase):
         self.assertEqual(result['total_gb'], 100.0)
 
 
+class HealthProbeRunnerTestCase(TestCase):
+    """تست‌های اجرای همزمان probe ها"""
+    
+    def _transport(self, delay=0.0, status_code=200, tracker=None):
+        """transport ساختگی httpx با تأخیر مشخص"""
+        async def handler(request):
+            if tracker is not None:
+                tracker['in_flight'] += 1
+                tracker['max'] = max(tracker['max'], tracker['in_flight'])
+            await asyncio.sleep(delay)
+            if tracker is not None:
+                tracker['in_flight'] -= 1
+            return httpx.Response(status_code)
+        return httpx.MockTransport(handler)
+    
+    def _targets(self, count, timeout=5):
+        return [
+            ProbeTarget(f'service_{i}', f'http://service-{i}.local/health/', timeout)
+            for i in range(count)
+        ]
+    
+    def test_probes_run_concurrently(self):
+        """تست اجرای همزمان probe ها"""
+        runner = HealthProbeRunner(concurrency=20, transport=self._transport(delay=0.2))
+        
+        started = time.perf_counter()
+        results = runner.run(self._targets(20))
+        elapsed = time.perf_counter() - started
+        
+        self.assertLess(elapsed, 1.0)  # ترتیبی حداقل ۴ ثانیه
+        self.assertEqual([r['status'] for r in results], ['healthy'] * 20)
+        self.assertEqual(results[3]['url'], 'http://service-3.local/health/')
+    
+    def test_concurrency_is_bounded(self):
+        """تست محدودیت تعداد درخواست‌های همزمان"""
+        tracker = {'in_flight': 0, 'max': 0}
+        runner = HealthProbeRunner(
+            concurrency=3,
+            transport=self._transport(delay=0.01, tracker=tracker)
+        )
+        
+        runner.run(self._targets(12))
+        
+        self.assertEqual(tracker['max'], 3)
+    
+    def test_probe_deadline(self):
+        """تست مهلت هر probe"""
+        runner = HealthProbeRunner(max_timeout=0.1, transport=self._transport(delay=2))
+        
+        started = time.perf_counter()
+        result = runner.run(self._targets(1, timeout=30))[0]
+        
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(result['status'], 'critical')
+        self.assertEqual(result['error'], 'Timeout')
+    
+    def test_error_status_code(self):
+        """تست وضعیت بحرانی برای کد خطا"""
+        runner = HealthProbeRunner(transport=self._transport(status_code=503))
+        
+        result = runner.run(self._targets(1))[0]
+        
+        self.assertEqual(result['status'], 'critical')
+        self.assertEqual(result['status_code'], 503)
+
+
+@patch.object(HealthService, 'check_cpu', return_value={'status': 'healthy'})
+@patch.object(HealthService, 'check_memory', return_value={'status': 'healthy'})
+@patch.object(HealthService, 'check_disk_space', return_value={'status': 'healthy'})
+@patch.object(HealthService, 'check_cache', return_value={'status': 'healthy'})
+@patch.object(HealthService, 'check_database', return_value={'status': 'healthy'})
+class ComprehensiveHealthCheckTestCase(TestCase):
+    """تست‌های بررسی جامع، ذخیره گروهی و cache نتیجه"""
+    
+    def setUp(self):
+        """راه‌اندازی اولیه"""
+        cache.clear()
+        self.environment = EnvironmentConfig.objects.create(
+            name='probe_env',
+            environment_type='development'
+        )
+        for i in range(5):
+            ServiceMonitoring.objects.create(
+                environment=self.environment,
+                service_name=f'service_{i}',
+                service_type='web',
+                health_check_url=f'http://service-{i}.local/health/'
+            )
+    
+    def _probe_results(self, services):
+        return [{'status': 'healthy', 'status_code': 200, 'response_time': 12.5} for _ in services]
+    
+    def test_results_are_saved_in_bulk_and_cached(self, *mocks):
+        """تست ذخیره نتایج با یک درج و cache شدن نتیجه"""
+        health_service = HealthService('probe_env')
+        
+        with patch.object(HealthService, 'check_external_services', side_effect=self._probe_results):
+            with self.assertNumQueries(2):  # سرویس‌های مانیتور شده + bulk_create
+                result = health_service.comprehensive_health_check()
+        
+        self.assertEqual(result['overall_status'], 'healthy')
+        self.assertEqual(len(result['services']), 10)
+        self.assertEqual(HealthCheck.objects.filter(environment=self.environment).count(), 5)
+        self.assertEqual(health_service.get_snapshot(), result)
+    
+    def test_snapshot_is_returned_without_checks(self, mock_database, *mocks):
+        """تست بازگرداندن نتیجه cache شده بدون اجرای بررسی‌ها"""
+        health_service = HealthService('probe_env')
+        with patch.object(HealthService, 'check_external_services', side_effect=self._probe_results):
+            result = health_service.comprehensive_health_check()
+        mock_database.reset_mock()
+        
+        with self.assertNumQueries(0):
+            cached = health_service.comprehensive_health_check(use_snapshot=True)
+        
+        self.assertEqual(cached, result)
+        mock_database.assert_not_called()
+    
+    def test_periodic_checks_probe_only_due_services(self, *mocks):
+        """تست بررسی دوره‌ای فقط برای سرویس‌های سررسید شده"""
+        HealthCheck.objects.create(
+            environment=self.environment,
+            service_name='service_0',
+            endpoint_url='http://service-0.local/health/',
+            status='healthy'
+        )
+        
+        with patch.object(HealthService, 'check_external_services',
+                          side_effect=self._probe_results) as mock_probe:
+            result = run_health_checks()
+        
+        probed = [service.service_name for service in mock_probe.call_args[0][0]]
+        self.assertEqual(probed, ['service_1', 'service_2', 'service_3', 'service_4'])
+        self.assertEqual(result['total_checks'], 4)
+        self.assertEqual(HealthCheck.objects.count(), 5)
+    
+    def test_snapshot_refresh_uses_stored_results(self, *mocks):
+        """تست به‌روزرسانی snapshot از آخرین نتایج ذخیره شده بدون بررسی سرویس‌ها"""
+        earlier = HealthCheck.objects.create(
+            environment=self.environment,
+            service_name='service_0',
+            endpoint_url='http://service-0.local/health/',
+            status='healthy',
+            response_data={'status': 'healthy', 'response_time': 40.0}
+        )
+        HealthCheck.objects.filter(id=earlier.id).update(
+            checked_at=timezone.now() - timedelta(minutes=1)
+        )
+        HealthCheck.objects.create(
+            environment=self.environment,
+            service_name='service_0',
+            endpoint_url='http://service-0.local/health/',
+            status='critical',
+            response_data={'status': 'critical', 'error': 'Timeout'}
+        )
+        
+        with patch.object(HealthService, 'check_external_services') as mock_probe:
+            result = refresh_health_snapshots()
+        
+        mock_probe.assert_not_called()
+        self.assertEqual(HealthCheck.objects.count(), 2)
+        self.assertEqual(result['environments']['probe_env'], 'critical')
+        
+        services = HealthService('probe_env').get_snapshot()['services']
+        self.assertEqual(services['service_0']['error'], 'Timeout')
+        self.assertEqual(services['service_1']['status'], 'unknown')
+
+
 class DockerServiceTestCase(TestCase):
     """تست‌های سرویس Docker"""
     
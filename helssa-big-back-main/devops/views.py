@@ -45,7 +45,7 @@ class HealthCheckView(APIView):
         """بررسی سلامت کلی سیستم"""
         try:
             health_service = HealthService()
-            result = health_service.comprehensive_health_check()
+            result = health_service.comprehensive_health_check(use_snapshot=True)
             
             # تعیین HTTP status code بر اساس وضعیت
             http_status = status.HTTP_200_OK
@@ -75,7 +75,7 @@ class EnvironmentHealthView(APIView):
         """بررسی سلامت محیط مشخص"""
         try:
             health_service = HealthService(environment_name)
-            result = health_service.comprehensive_health_check()
+            result = health_service.comprehensive_health_check(use_snapshot=True)
             
             return Response(result, status=status.HTTP_200_OK)
             
@@ -0,0 +1,204 @@
+"""
+Management command برای بنچمارک ادغام قطعات صوتی ملاقات
+"""
+import asyncio
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from pydub import AudioSegment
+
+from encounters.models import AudioChunk, Encounter
+from encounters.services.audio_processor import AudioProcessingService
+from encounters.utils.encryption import (
+    decrypt_data, decrypt_stream, encrypt_data, generate_encryption_key
+)
+
+
+class InMemoryAudioService(AudioProcessingService):
+    """AudioProcessingService با ذخیره‌سازی در حافظه و تأخیر ثابت دانلود"""
+    
+    def __init__(self, objects, latency: float):
+        super().__init__()
+        self.objects = objects
+        self.latency = latency
+        # فایل آپلود شده روی دیسک نگه داشته می‌شود تا در اوج حافظه حساب نشود
+        self.uploaded = tempfile.TemporaryFile()
+        
+    async def _download_from_storage(self, file_url):
+        await asyncio.sleep(self.latency)
+        return self.objects[file_url]
+        
+    async def _upload_to_storage(self, file_path, data, content_type, length=None):
+        self.uploaded.seek(0)
+        self.uploaded.truncate()
+        if isinstance(data, bytes):
+            self.uploaded.write(data)
+        else:
+            # خواندن بلوکی مانند put_object
+            shutil.copyfileobj(data, self.uploaded, 1024 * 1024)
+        self.uploaded.seek(0)
+        return f"https://storage.helssa.ir/{file_path}"
+
+
+class Command(BaseCommand):
+    """
+    بنچمارک ادغام قطعات صوتی
+    
+    قطعات رمزنگاری شده یک بار با حلقه قبلی (دانلود و رمزگشایی ترتیبی،
+    الحاق ``merged +=`` و رمزنگاری کل فایل در حافظه) و یک بار با
+    stream_merge ادغام می‌شوند. ذخیره‌سازی در حافظه شبیه‌سازی می‌شود و
+    رکوردی در پایگاه داده ایجاد نمی‌شود. اوج حافظه با tracemalloc اندازه‌گیری
+    می‌شود؛ قطعات رمزنگاری شده ورودی پیش از اندازه‌گیری ساخته می‌شوند و
+    فایل آپلود شده روی دیسک نوشته می‌شود.
+    
+    استفاده:
+    python manage.py benchmark_audio_merge
+    python manage.py benchmark_audio_merge --chunks 120 --chunk-kb 1024 --latency 20 --json
+    """
+    
+    help = 'مقایسه ادغام ترتیبی قطعات صوتی با ادغام جریانی همزمان'
+    
+    def add_arguments(self, parser):
+        """تعریف آرگومان‌های command"""
+        parser.add_argument(
+            '--chunks',
+            type=int,
+            default=120,
+            help='تعداد قطعات صوتی'
+        )
+        
+        parser.add_argument(
+            '--chunk-kb',
+            type=int,
+            default=512,
+            help='حجم هر قطعه (کیلوبایت)'
+        )
+        
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=20,
+            help='تأخیر شبیه‌سازی شده دانلود هر قطعه (میلی‌ثانیه)'
+        )
+        
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='خروجی در فرمت JSON'
+        )
+    
+    def handle(self, *args, **options):
+        """اجرای بنچمارک"""
+        encounter = Encounter(encryption_key=generate_encryption_key())
+        chunks, objects = self._build_chunks(encounter, options)
+        service = InMemoryAudioService(objects, options['latency'] / 1000)
+        
+        report = {
+            'chunks': options['chunks'],
+            'chunk_kb': options['chunk_kb'],
+            'latency_ms': options['latency'],
+            'concurrency': service.merge_concurrency,
+            'legacy': self._measure(
+                len(chunks), lambda: self._merge_legacy(service, encounter, chunks)
+            ),
+            'streaming': self._measure(
+                len(chunks), lambda: service.stream_merge(encounter, chunks)
+            ),
+        }
+        
+        # بررسی قابل خواندن بودن خروجی جریانی
+        report['streaming']['merged_bytes'] = sum(
+            len(frame) for frame in decrypt_stream(service.uploaded, encounter.encryption_key)
+        )
+        service.uploaded.close()
+        report['speedup'] = round(report['legacy']['seconds'] / report['streaming']['seconds'], 1)
+        
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        
+        self.stdout.write(
+            f"chunks={report['chunks']} chunk_kb={report['chunk_kb']} "
+            f"latency={report['latency_ms']}ms concurrency={report['concurrency']}"
+        )
+        for mode in ('legacy', 'streaming'):
+            result = report[mode]
+            self.stdout.write(
+                f"{mode:<10} {result['chunks_per_second']:>8} chunks/s  "
+                f"{result['seconds']:>7}s  peak {result['peak_mb']:>8} MB"
+            )
+        self.stdout.write(f"speedup    {report['speedup']}x")
+    
+    def _build_chunks(self, encounter, options):
+        """ساخت قطعات WAV (PCM تک کاناله 16 کیلوهرتز) رمزنگاری شده با دو ثانیه همپوشانی
+        
+        WAV بدون ffmpeg رمزگشایی و کدگذاری می‌شود، بنابراین حذف همپوشانی
+        در stream_merge واقعاً انجام و اندازه‌گیری می‌شود.
+        """
+        sample_rate = 16000
+        pcm_bytes = options['chunk_kb'] * 1024 // 2 * 2
+        duration = pcm_bytes / (2 * sample_rate)
+        started = timezone.now()
+        loop = asyncio.new_event_loop()
+        objects = {}
+        chunks = []
+        
+        try:
+            for index in range(options['chunks']):
+                file_url = f"https://storage.helssa.ir/benchmark/chunk_{index:04d}.wav"
+                wav = io.BytesIO()
+                AudioSegment(
+                    data=os.urandom(pcm_bytes), sample_width=2, frame_rate=sample_rate, channels=1
+                ).export(wav, format='wav')
+                objects[file_url] = loop.run_until_complete(encrypt_data(
+                    wav.getvalue(), encounter.encryption_key
+                )).encode()
+                chunks.append(AudioChunk(
+                    chunk_index=index,
+                    file_url=file_url,
+                    duration_seconds=duration,
+                    format='wav',
+                    is_encrypted=True,
+                    recorded_at=started + timedelta(seconds=(duration - 2) * index + duration),
+                ))
+        finally:
+            loop.close()
+        
+        return chunks, objects
+    
+    def _measure(self, chunk_count, merge):
+        """اندازه‌گیری زمان و اوج حافظه یک روش ادغام"""
+        tracemalloc.start()
+        started = time.perf_counter()
+        asyncio.run(merge())
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        return {
+            'seconds': round(elapsed, 3),
+            'chunks_per_second': round(chunk_count / elapsed, 1),
+            'peak_mb': round(peak / (1024 * 1024), 1),
+        }
+    
+    async def _merge_legacy(self, service, encounter, chunks):
+        """حلقه قبلی: دانلود ترتیبی، الحاق و رمزنگاری کل فایل در حافظه"""
+        merged = b''
+        for chunk in chunks:
+            encrypted_data = await service._download_from_storage(chunk.file_url)
+            merged += await decrypt_data(encrypted_data, encounter.encryption_key)
+            
+        encrypted_final = await encrypt_data(merged, encounter.encryption_key)
+        return await service._upload_to_storage(
+            f"encounters/{encounter.id}/full_recording.mp3",
+            encrypted_final.encode(),
+            content_type='audio/mp3'
+        )
@@ -5,6 +5,7 @@ from .soap_generator import SOAPGenerationService
 from .video_service import VideoConferenceService
 from .security_service import EncounterSecurityService
 from .file_manager import EncounterFileManager
+from .pipeline_tracker import EncounterPipelineTracker
 
 __all__ = [
     'VisitSchedulingService',
@@ -13,4 +14,5 @@ __all__ = [
     'VideoConferenceService',
     'EncounterSecurityService',
     'EncounterFileManager',
+    'EncounterPipelineTracker',
 ]
\ No newline at end of file
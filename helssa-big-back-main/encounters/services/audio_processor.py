@@ -1,19 +1,82 @@
-from typing import List, Dict, Optional
+from typing import AsyncIterator, BinaryIO, List, Dict, Optional, Sequence, Tuple, Union
 import io
 import asyncio
+import logging
+import tempfile
+from collections import deque
+from datetime import timedelta
 from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.utils import timezone
+from pydub import AudioSegment
 
 from ..models import Encounter, AudioChunk
-from ..utils.encryption import encrypt_data, decrypt_data
+from ..utils.encryption import STREAM_FORMAT, encrypt_data, decrypt_data, encrypt_frame, decrypt_frame
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_overlaps(
+    chunks: Sequence[AudioChunk],
+    max_overlap: float
+) -> List[float]:
+    """همپوشانی ابتدای هر قطعه با قطعه قبلی (ثانیه) بر اساس زمان ضبط
+    
+    پایان هر قطعه زمان ثبت آن (recorded_at) و شروع آن recorded_at منهای
+    مدت قطعه در نظر گرفته می‌شود. همپوشانی هیچ‌گاه بیشتر از همپوشانی ضبط
+    (max_overlap) نیست تا قطعاتی که با تأخیر یا پشت سر هم آپلود شده‌اند
+    بریده نشوند؛ فاصله بین قطعات (توقف ضبط) همپوشانی صفر می‌دهد.
+    """
+    if not chunks:
+        return []
+        
+    overlaps = [0.0]
+    
+    for previous, current in zip(chunks, chunks[1:]):
+        if previous.recorded_at and current.recorded_at:
+            current_start = current.recorded_at - timedelta(seconds=current.duration_seconds)
+            overlap = (previous.recorded_at - current_start).total_seconds()
+        else:
+            overlap = max_overlap
+            
+        overlaps.append(
+            min(max(overlap, 0.0), max_overlap, current.duration_seconds, previous.duration_seconds)
+        )
+        
+    return overlaps
+
+
+def trim_overlap(audio: bytes, audio_format: str, overlap: float) -> bytes:
+    """حذف ``overlap`` ثانیه ابتدای یک قطعه صوتی
+    
+    قطعه با pydub رمزگشایی (decode)، برش داده و دوباره با همان فرمت
+    کدگذاری می‌شود؛ برش مستقیم بایت‌ها سرآیند webm و همگامی فریم‌های mp3
+    را خراب می‌کند. اگر رمزگشایی ممکن نباشد قطعه کامل برگردانده می‌شود
+    (همپوشانی تکرار می‌شود ولی صوت سالم می‌ماند).
+    """
+    if overlap <= 0:
+        return audio
+        
+    try:
+        segment = AudioSegment.from_file(io.BytesIO(audio), format=audio_format)
+        output = io.BytesIO()
+        segment[int(overlap * 1000):].export(output, format=audio_format)
+        return output.getvalue()
+    except Exception as e:
+        logger.warning(f"Could not trim {overlap}s overlap of {audio_format} chunk, keeping it whole: {str(e)}")
+        return audio
 
 
 class AudioProcessingService:
     """سرویس پردازش صوت ویزیت‌ها"""
     
     def __init__(self):
-        self.chunk_size_mb = 10  # حجم هر قطعه
-        self.overlap_seconds = 2  # همپوشانی بین قطعات
+        self.chunk_size_mb = getattr(settings, 'AUDIO_CHUNK_SIZE_MB', 10)  # حجم هر قطعه
+        self.overlap_seconds = getattr(settings, 'AUDIO_OVERLAP_SECONDS', 2)  # همپوشانی بین قطعات
+        # دانلود و رمزگشایی همزمان قطعات هنگام ادغام
+        self.merge_concurrency = getattr(settings, 'AUDIO_MERGE_CONCURRENCY', 8)
+        # فایل ادغام شده تا این حجم در حافظه و پس از آن روی دیسک نگه داشته می‌شود
+        self.merge_spool_bytes = getattr(settings, 'AUDIO_MERGE_SPOOL_MB', 32) * 1024 * 1024
         
     async def process_visit_audio(
         self,
@@ -70,56 +133,125 @@ class AudioProcessingService:
         self,
         encounter_id: str
     ) -> str:
-        """ادغام قطعات صوتی"""
+        """ادغام قطعات صوتی
+        
+        فایل نهایی با قالب ``STREAM_FORMAT`` (هر قطعه یک فایل صوتی کامل با
+        فرمت خود قطعه، رمزنگاری شده در یک خط) ذخیره می‌شود و با
+        decrypt_stream قابل خواندن است.
+        """
         
-        # بازیابی همه قطعات
+        # ملاقات و قطعات هر کدام با یک کوئری
+        encounter = await sync_to_async(
+            Encounter.objects.only('id', 'encryption_key').get
+        )(id=encounter_id)
         chunks = await sync_to_async(list)(
             AudioChunk.objects.filter(
                 encounter_id=encounter_id
+            ).only(
+                'id', 'chunk_index', 'file_url', 'duration_seconds', 'format',
+                'is_encrypted', 'recorded_at'
             ).order_by('chunk_index')
         )
         
         if not chunks:
             raise ValueError("هیچ قطعه صوتی یافت نشد")
             
-        # دانلود و رمزگشایی
-        audio_segments = []
-        for chunk in chunks:
-            encrypted_data = await self._download_from_storage(
-                chunk.file_url
-            )
+        return await self.stream_merge(encounter, chunks)
+        
+    async def stream_merge(
+        self,
+        encounter: Encounter,
+        chunks: List[AudioChunk]
+    ) -> str:
+        """ادغام جریانی قطعات مرتب شده و آپلود فایل رمزنگاری شده
+        
+        قطعات با همزمانی محدود دانلود و رمزگشایی و به ترتیب نوشته می‌شوند؛
+        همپوشانی هر قطعه حذف (trim_overlap) و قطعه جداگانه رمزنگاری و در یک
+        فایل موقت (spooled) نوشته می‌شود. بنابراین حافظه مصرفی متناسب با
+        ``merge_concurrency`` قطعه است نه کل فایل.
+        """
+        overlaps = chunk_overlaps(chunks, self.overlap_seconds)
+        
+        with tempfile.SpooledTemporaryFile(max_size=self.merge_spool_bytes) as merged:
+            position = 0
+            async for chunk, audio in self._iter_chunk_audio(chunks, encounter.encryption_key):
+                frame = await asyncio.to_thread(
+                    self._merge_frame, audio, chunk.format, overlaps[position], encounter.encryption_key
+                )
+                merged.writelines((frame, b'\n'))
+                position += 1
+                
+            length = merged.tell()
+            merged.seek(0)
             
-            decrypted_data = await decrypt_data(
-                encrypted_data,
-                chunk.encounter.encryption_key
+            return await self._upload_to_storage(
+                f"encounters/{encounter.id}/full_recording.{STREAM_FORMAT}",
+                merged,
+                content_type='application/octet-stream',
+                length=length
             )
             
-            audio_segments.append({
-                'data': decrypted_data,
-                'index': chunk.chunk_index,
-                'duration': chunk.duration_seconds
-            })
+    def _merge_frame(self, audio: bytes, audio_format: str, overlap: float, encryption_key: str) -> bytes:
+        """حذف همپوشانی و رمزنگاری یک قطعه (خارج از event loop)"""
+        return encrypt_frame(trim_overlap(audio, audio_format, overlap), encryption_key)
+        
+    async def _iter_chunk_audio(
+        self,
+        chunks: List[AudioChunk],
+        encryption_key: str
+    ) -> AsyncIterator[Tuple[AudioChunk, bytes]]:
+        """دانلود و رمزگشایی همزمان قطعات با حفظ ترتیب
+        
+        حداکثر ``merge_concurrency`` قطعه همزمان در حال دریافت است و با
+        مصرف هر قطعه، دریافت قطعه بعدی شروع می‌شود.
+        """
+        remaining = iter(chunks)
+        pending = deque()
+        
+        def schedule_next():
+            chunk = next(remaining, None)
+            if chunk is not None:
+                pending.append((
+                    chunk,
+                    asyncio.ensure_future(self._fetch_decrypted(chunk, encryption_key))
+                ))
+                
+        for _ in range(max(self.merge_concurrency, 1)):
+            schedule_next()
+            
+        try:
+            while pending:
+                chunk, task = pending.popleft()
+                audio = await task
+                schedule_next()
+                yield chunk, audio
+        finally:
+            for _, task in pending:
+                task.cancel()
+                
+    async def _fetch_decrypted(self, chunk: AudioChunk, encryption_key: str) -> bytes:
+        """دانلود یک قطعه و رمزگشایی آن خارج از event loop"""
+        
+        encrypted_data = await self._download_from_storage(chunk.file_url)
+        
+        if not chunk.is_encrypted:
+            return encrypted_data
             
-        # ادغام با حذف همپوشانی‌ها
-        merged_audio = await self._merge_with_overlap_removal(
-            audio_segments,
-            self.overlap_seconds
-        )
+        return await asyncio.to_thread(decrypt_frame, encrypted_data, encryption_key)
         
-        # رمزنگاری و آپلود فایل نهایی
-        encounter = await sync_to_async(Encounter.objects.get)(id=encounter_id)
-        encrypted_final = await encrypt_data(
-            merged_audio,
-            encounter.encryption_key
-        )
+    async def fetch_chunk_audio(self, chunk: AudioChunk) -> bytes:
+        """دانلود و رمزگشایی صوت یک قطعه"""
         
-        final_url = await self._upload_to_storage(
-            f"encounters/{encounter_id}/full_recording.mp3",
-            encrypted_final,
-            content_type='audio/mp3'
-        )
+        if AudioChunk.encounter.is_cached(chunk):
+            encounter = chunk.encounter
+        else:
+            encounter = await sync_to_async(Encounter.objects.get)(id=chunk.encounter_id)
+        encrypted_data = await self._download_from_storage(chunk.file_url)
         
-        return final_url
+        if not chunk.is_encrypted:
+            return encrypted_data
+            
+        return await decrypt_data(encrypted_data, encounter.encryption_key)
         
     async def extract_audio_segment(
         self,
@@ -171,21 +303,6 @@ class AudioProcessingService:
             'format': 'webm'
         }
         
-    async def _merge_with_overlap_removal(
-        self,
-        segments: List[Dict],
-        overlap_seconds: float
-    ) -> bytes:
-        """ادغام با حذف همپوشانی"""
-        
-        # TODO: پیاده‌سازی الگوریتم ادغام با pydub
-        # فعلاً فقط قطعات را به هم می‌چسبانیم
-        merged = b''
-        for segment in segments:
-            merged += segment['data']
-            
-        return merged
-        
     async def _extract_segment_from_chunks(
         self,
         chunks: List[AudioChunk],
@@ -200,10 +317,15 @@ class AudioProcessingService:
     async def _upload_to_storage(
         self,
         file_path: str,
-        data: bytes,
-        content_type: str
+        data: Union[bytes, BinaryIO],
+        content_type: str,
+        length: Optional[int] = None
     ) -> str:
-        """آپلود به MinIO"""
+        """آپلود به MinIO
+        
+        data می‌تواند فایل باشد تا با put_object به صورت جریانی (با length)
+        آپلود شود.
+        """
         
         # TODO: اتصال به MinIO service
         # فعلاً URL ساختگی
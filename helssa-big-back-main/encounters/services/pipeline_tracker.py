@@ -0,0 +1,138 @@
+"""
+پیگیری پیشرفت و زمان‌بندی مراحل پردازش صوت ملاقات
+
+وضعیت هر اجرای pipeline در cache نگه داشته می‌شود؛ شمارنده قطعات تمام
+شده با ``cache.incr`` (اتمیک) به‌روز می‌شود چون taskهای قطعات همزمان
+اجرا می‌شوند. سایر مراحل ترتیبی هستند و کل وضعیت را بازنویسی می‌کنند.
+گزارش نهایی در ``encounter.metadata['processing_pipeline']`` ذخیره می‌شود.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import Encounter
+
+
+class EncounterPipelineTracker:
+    """وضعیت، پیشرفت و زمان هر مرحله pipeline یک ملاقات"""
+
+    def __init__(self, encounter_id: str):
+        self.encounter_id = str(encounter_id)
+        self.ttl = getattr(settings, 'ENCOUNTER_PIPELINE_TTL', 86400)
+        self.key = f"encounter_pipeline:{self.encounter_id}"
+
+    def _counter_key(self, run_id: str, name: str) -> str:
+        return f"{self.key}:{run_id}:{name}"
+
+    def start(self, run_id: str, total_chunks: int, pending_chunk_ids) -> Dict:
+        """ثبت شروع یک اجرای جدید"""
+        state = {
+            'run_id': run_id,
+            'status': 'transcribing' if pending_chunk_ids else 'merging',
+            'total_chunks': total_chunks,
+            'pending_chunks': len(pending_chunk_ids),
+            'failed_chunk_ids': [],
+            'started_at': timezone.now().isoformat(),
+            'started_ts': time.time(),
+            'stages': {},
+        }
+        cache.set(self.key, state, timeout=self.ttl)
+        for name in ('done', 'failed'):
+            cache.set(self._counter_key(run_id, name), 0, timeout=self.ttl)
+        return state
+
+    def chunk_finished(self, run_id: str, success: bool):
+        """افزایش شمارنده قطعات تمام شده (از task هر قطعه)"""
+        names = ['done'] if success else ['done', 'failed']
+        for name in names:
+            try:
+                cache.incr(self._counter_key(run_id, name))
+            except ValueError:
+                # کلید منقضی شده؛ پیشرفت تقریبی از دست می‌رود نه خود پردازش
+                pass
+
+    def claim(self, run_id: str, name: str) -> bool:
+        """ثبت یک‌باره یک رویداد اجرا؛ فقط اولین فراخوانی True برمی‌گرداند"""
+        return cache.add(self._counter_key(run_id, name), 1, timeout=self.ttl)
+
+    def record_stage(self, run_id: str, name: str, seconds: float, **extra):
+        """ثبت مدت یک مرحله"""
+        state = self._state(run_id)
+        if state is None:
+            return
+        state['stages'][name] = {'seconds': round(seconds, 3), **extra}
+        cache.set(self.key, state, timeout=self.ttl)
+
+    @contextmanager
+    def stage(self, run_id: str, name: str, status: Optional[str] = None):
+        """اندازه‌گیری مدت یک مرحله"""
+        if status:
+            self.update(run_id, status=status)
+        started = time.perf_counter()
+        yield
+        self.record_stage(run_id, name, time.perf_counter() - started)
+
+    def elapsed(self, run_id: str) -> float:
+        """زمان سپری شده از شروع اجرا"""
+        state = self._state(run_id)
+        return time.time() - state['started_ts'] if state else 0.0
+
+    def update(self, run_id: str, **fields):
+        """به‌روزرسانی فیلدهای وضعیت"""
+        state = self._state(run_id)
+        if state is None:
+            return
+        state.update(fields)
+        cache.set(self.key, state, timeout=self.ttl)
+
+    def finish(self, run_id: str, status: str, **fields) -> Optional[Dict]:
+        """ثبت پایان اجرا و ذخیره گزارش زمان‌بندی در metadata ملاقات"""
+        state = self._state(run_id)
+        if state is None:
+            return None
+        state.update(fields)
+        state['status'] = status
+        state['finished_at'] = timezone.now().isoformat()
+        state['total_seconds'] = round(time.time() - state['started_ts'], 3)
+        cache.set(self.key, state, timeout=self.ttl)
+
+        report = {k: v for k, v in state.items() if k != 'started_ts'}
+        encounter = Encounter.objects.only('metadata').get(id=self.encounter_id)
+        encounter.metadata['processing_pipeline'] = report
+        # update به جای save تا سیگنال‌های ملاقات دوباره pipeline را شروع نکنند
+        Encounter.objects.filter(id=self.encounter_id).update(metadata=encounter.metadata)
+        return report
+
+    def get_progress(self) -> Optional[Dict]:
+        """وضعیت آخرین اجرا همراه شمارنده‌های قطعات"""
+        state = cache.get(self.key)
+        if state is None:
+            return None
+
+        run_id = state['run_id']
+        counters = cache.get_many([
+            self._counter_key(run_id, 'done'),
+            self._counter_key(run_id, 'failed'),
+        ])
+        done = counters.get(self._counter_key(run_id, 'done'), 0)
+        pending = state['pending_chunks']
+
+        progress = {k: v for k, v in state.items() if k != 'started_ts'}
+        progress.update({
+            'finished_chunks': done,
+            'failed_chunks': counters.get(self._counter_key(run_id, 'failed'), 0),
+            'percent': round(done * 100 / pending, 1) if pending else 100.0,
+        })
+        return progress
+
+    def _state(self, run_id: str) -> Optional[Dict]:
+        """وضعیت اجرای run_id (اجرای قدیمی‌تر نادیده گرفته می‌شود)"""
+        state = cache.get(self.key)
+        if state is None or state['run_id'] != run_id:
+            return None
+        return state
@@ -1,9 +1,23 @@
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import asyncio
+import logging
+import time
+from contextlib import contextmanager
 from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.utils import timezone
 
-from ..models import Encounter, SOAPReport, Transcript
+from ..models import AudioChunk, Encounter, SOAPReport
+
+logger = logging.getLogger(__name__)
+
+
+def soap_context_cache_key(encounter_id: str, transcript_version: str) -> str:
+    """کلید cache داده‌های context تولید SOAP"""
+    return f"soap_context:{encounter_id}:{transcript_version}"
 
 
 class SOAPGenerationService:
@@ -11,40 +25,51 @@ class SOAPGenerationService:
     
     def __init__(self):
         self.ai_service = None  # TODO: اتصال به UnifiedAIService
+        self.context_cache_ttl = getattr(settings, 'SOAP_CONTEXT_CACHE_TTL', 3600)
         
     async def generate_soap_report(
         self,
         encounter_id: str,
-        regenerate: bool = False
+        regenerate: bool = False,
+        render_outputs: bool = True
     ) -> SOAPReport:
-        """تولید گزارش SOAP از ملاقات"""
-        
-        encounter = await sync_to_async(
-            Encounter.objects.select_related('patient', 'doctor').get
-        )(id=encounter_id)
+        """تولید گزارش SOAP از ملاقات
+        
+        گزارش پس از اعتبارسنجی و ذخیره برگردانده می‌شود؛ PDF و خلاصه بیمار
+        در task پس‌زمینه ``render_soap_outputs`` تولید می‌شوند. زمان هر مرحله
+        در ``report.generation_stats`` قرار می‌گیرد.
+        
+        Args:
+            encounter_id: شناسه ملاقات
+            regenerate: تولید دوباره حتی با وجود گزارش تایید شده
+            render_outputs: زمان‌بندی تولید خروجی‌ها پس از ذخیره
+                (pipeline ملاقات خروجی‌ها را خودش تولید می‌کند)
+        """
+        timings = {}
+        started = time.perf_counter()
+        
+        # ملاقات، گزارش قبلی و در صورت نیاز رونویسی قطعات در یک مرحله
+        with self._stage(timings, 'load'):
+            encounter = await sync_to_async(self._load_encounter)(encounter_id)
+        existing_report = getattr(encounter, 'soap_report', None)
         
         # بررسی وجود گزارش قبلی
-        if not regenerate:
-            existing_report = await sync_to_async(
-                SOAPReport.objects.filter(
-                    encounter=encounter,
-                    doctor_approved=True
-                ).first
-            )()
-            
-            if existing_report:
-                return existing_report
+        if not regenerate and existing_report and existing_report.doctor_approved:
+            existing_report.generation_stats = self._stats(timings, started, context_cache=None)
+            return existing_report
                 
         # جمع‌آوری داده‌ها
-        context = await self._prepare_context(encounter)
+        with self._stage(timings, 'context'):
+            context, cache_hit = await self._prepare_context(encounter)
         
         # تولید بخش‌های SOAP
-        soap_sections = await asyncio.gather(
-            self._generate_subjective(context),
-            self._generate_objective(context),
-            self._generate_assessment(context),
-            self._generate_plan(context)
-        )
+        with self._stage(timings, 'sections'):
+            soap_sections = await asyncio.gather(
+                self._generate_subjective(context),
+                self._generate_objective(context),
+                self._generate_assessment(context),
+                self._generate_plan(context)
+            )
         
         # ترکیب و اعتبارسنجی
         soap_data = {
@@ -55,81 +80,178 @@ class SOAPGenerationService:
         }
         
         # اعتبارسنجی
-        validation_result = await self._validate_soap(soap_data)
-        if not validation_result['is_valid']:
-            # تلاش برای اصلاح خودکار
-            soap_data = await self._auto_correct_soap(
-                soap_data,
-                validation_result['issues']
-            )
+        with self._stage(timings, 'validation'):
+            validation_result = await self._validate_soap(soap_data)
+            if not validation_result['is_valid']:
+                # تلاش برای اصلاح خودکار
+                soap_data = await self._auto_correct_soap(
+                    soap_data,
+                    validation_result['issues']
+                )
             
-        # استخراج داده‌های ساختاریافته
-        structured_data = await self._extract_structured_data(soap_data)
+            # استخراج داده‌های ساختاریافته
+            structured_data = await self._extract_structured_data(soap_data)
         
         # ایجاد یا به‌روزرسانی گزارش
-        report, created = await sync_to_async(
-            SOAPReport.objects.update_or_create
-        )(
-            encounter=encounter,
-            defaults={
-                **soap_data,
-                **structured_data,
-                'generation_method': 'ai',
-                'ai_confidence': validation_result.get('confidence', 0.85)
-            }
-        )
+        with self._stage(timings, 'save'):
+            report = await sync_to_async(self._save_report)(
+                encounter,
+                {
+                    **soap_data,
+                    **structured_data,
+                    'generation_method': 'ai',
+                    'ai_confidence': validation_result.get('confidence', 0.85)
+                },
+                render_outputs
+            )
         
-        # تولید خروجی‌ها
-        await self._generate_outputs(report)
+        report.generation_stats = self._stats(timings, started, context_cache=cache_hit)
+        logger.info(
+            f"SOAP report generated for encounter {encounter_id} in "
+            f"{report.generation_stats['seconds']}s "
+            f"(context cache {'hit' if cache_hit else 'miss'}): {timings}"
+        )
         
         return report
         
-    async def _prepare_context(self, encounter: Encounter) -> Dict:
-        """آماده‌سازی context برای تولید SOAP"""
-        
-        # رونویسی کامل
-        full_transcript = encounter.metadata.get('full_transcript', '')
-        
-        # اگر رونویسی کامل موجود نیست، از قطعات بسازیم
-        if not full_transcript:
-            transcripts = await sync_to_async(list)(
-                Transcript.objects.filter(
-                    audio_chunk__encounter=encounter
-                ).order_by('audio_chunk__chunk_index').values_list('text', flat=True)
-            )
-            full_transcript = ' '.join(transcripts)
+    def _load_encounter(self, encounter_id: str) -> Encounter:
+        """دریافت ملاقات همراه بیمار، پزشک و گزارش قبلی
+        
+        اگر رونویسی کامل در metadata نباشد، رونویسی قطعات به ترتیب با
+        prefetch در ``encounter.transcribed_chunks`` بارگذاری می‌شود.
+        """
+        encounter = Encounter.objects.select_related(
+            'patient', 'doctor', 'soap_report'
+        ).get(id=encounter_id)
+        
+        if not encounter.metadata.get('full_transcript'):
+            prefetch_related_objects([encounter], Prefetch(
+                'audio_chunks',
+                queryset=AudioChunk.objects.filter(
+                    transcript__isnull=False
+                ).select_related('transcript').only(
+                    'id', 'encounter_id', 'chunk_index',
+                    'transcript__id', 'transcript__audio_chunk_id',
+                    'transcript__text', 'transcript__updated_at'
+                ).order_by('chunk_index'),
+                to_attr='transcribed_chunks'
+            ))
             
-        # تاریخچه پزشکی بیمار
-        patient_history = await self._get_patient_history(
-            encounter.patient_id
-        )
-        
-        # داروهای فعلی
-        current_medications = await self._get_current_medications(
-            encounter.patient_id
-        )
-        
-        # نتایج آزمایشات اخیر
-        recent_labs = await self._get_recent_lab_results(
-            encounter.patient_id
-        )
+        return encounter
+        
+    def _save_report(self, encounter: Encounter, fields: Dict,
+                     render_outputs: bool) -> SOAPReport:
+        """ذخیره گزارش با یک query و زمان‌بندی تولید خروجی‌ها"""
+        report = getattr(encounter, 'soap_report', None)
+        created = report is None
+        if created:
+            report = SOAPReport(encounter=encounter)
+            
+        for field, value in fields.items():
+            setattr(report, field, value)
+        report.markdown_content = self._generate_markdown(report)
+        
+        if created:
+            try:
+                with transaction.atomic():
+                    report.save(force_insert=True)
+            except IntegrityError:
+                # گزارش همزمان توسط درخواست دیگری ساخته شده
+                report.pk = SOAPReport.objects.values_list('pk', flat=True).get(
+                    encounter=encounter
+                )
+                report._state.adding = False
+                created = False
+                
+        if not created:
+            report.save(update_fields=[*fields, 'markdown_content', 'updated_at'])
+            
+        if render_outputs:
+            from ..tasks import render_soap_outputs
+            report_id = str(report.id)
+            transaction.on_commit(lambda: render_soap_outputs.delay(report_id))
+            
+        return report
         
-        # محاسبه سن بیمار
-        patient_age = await self._calculate_patient_age(encounter.patient_id)
+    async def _prepare_context(self, encounter: Encounter) -> Tuple[Dict, bool]:
+        """آماده‌سازی context برای تولید SOAP
+        
+        رونویسی و داده‌های بیمار با کلید ملاقات و نسخه رونویسی cache می‌شوند؛
+        فیلدهای خود ملاقات هر بار از نمونه تازه خوانده می‌شوند.
+        
+        Returns:
+            Tuple[Dict, bool]: context و اینکه از cache خوانده شده یا نه
+        """
+        full_transcript, transcript_version = self._transcript_with_version(encounter)
+        cache_key = soap_context_cache_key(encounter.id, transcript_version)
+        
+        data = await cache.aget(cache_key)
+        cache_hit = data is not None
+        
+        if not cache_hit:
+            # داده‌های بیمار همزمان دریافت می‌شوند
+            patient_history, current_medications, recent_labs, patient_age, patient_gender = (
+                await asyncio.gather(
+                    self._get_patient_history(encounter.patient_id),
+                    self._get_current_medications(encounter.patient_id),
+                    self._get_recent_lab_results(encounter.patient_id),
+                    self._calculate_patient_age(encounter.patient_id),
+                    self._get_patient_gender(encounter.patient_id)
+                )
+            )
+            data = {
+                'transcript': full_transcript,
+                'patient': {
+                    'age': patient_age,
+                    'gender': patient_gender,
+                    'history': patient_history,
+                    'medications': current_medications,
+                    'labs': recent_labs
+                }
+            }
+            await cache.aset(cache_key, data, timeout=self.context_cache_ttl)
         
         return {
+            **data,
             'encounter': encounter,
-            'transcript': full_transcript,
             'chief_complaint': encounter.chief_complaint,
-            'patient': {
-                'age': patient_age,
-                'gender': await self._get_patient_gender(encounter.patient_id),
-                'history': patient_history,
-                'medications': current_medications,
-                'labs': recent_labs
-            },
             'visit_type': encounter.type,
             'duration': encounter.actual_duration.total_seconds() / 60 if encounter.actual_duration else encounter.duration_minutes
+        }, cache_hit
+        
+    def _transcript_with_version(self, encounter: Encounter) -> Tuple[str, str]:
+        """متن رونویسی و نسخه آن
+        
+        نسخه رونویسی ادغام شده زمان ادغام است؛ در غیر این صورت از تعداد
+        قطعات رونویسی شده و آخرین زمان به‌روزرسانی آن‌ها ساخته می‌شود.
+        """
+        full_transcript = encounter.metadata.get('full_transcript', '')
+        if full_transcript:
+            merged_at = encounter.metadata.get('transcript_merged_at', '')
+            return full_transcript, f"merged-{merged_at}-{len(full_transcript)}"
+            
+        # اگر رونویسی کامل موجود نیست، از قطعات بسازیم
+        transcripts = [chunk.transcript for chunk in encounter.transcribed_chunks]
+        last_update = max((t.updated_at for t in transcripts), default=None)
+        version = f"chunks-{len(transcripts)}-{last_update.timestamp() if last_update else 0}"
+        return ' '.join(t.text for t in transcripts), version
+        
+    @contextmanager
+    def _stage(self, timings: Dict, name: str):
+        """ثبت مدت یک مرحله تولید گزارش"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[name] = round(time.perf_counter() - started, 3)
+            
+    @staticmethod
+    def _stats(timings: Dict, started: float, context_cache: Optional[bool]) -> Dict:
+        """آمار زمان‌بندی تولید گزارش"""
+        return {
+            'seconds': round(time.perf_counter() - started, 3),
+            'stages': timings,
+            'context_cache': context_cache,
         }
         
     async def _generate_subjective(self, context: Dict) -> str:
@@ -255,20 +377,7 @@ class SOAPGenerationService:
         # TODO: پیاده‌سازی منطق اصلاح خودکار
         return soap_data
         
-    async def _generate_outputs(self, report: SOAPReport):
-        """تولید خروجی‌های گزارش"""
-        
-        # تولید محتوای Markdown
-        markdown_content = await self._generate_markdown(report)
-        report.markdown_content = markdown_content
-        
-        # TODO: تولید PDF
-        # pdf_url = await self._generate_pdf(report)
-        # report.pdf_url = pdf_url
-        
-        await sync_to_async(report.save)()
-        
-    async def _generate_markdown(self, report: SOAPReport) -> str:
+    def _generate_markdown(self, report: SOAPReport) -> str:
         """تولید Markdown از گزارش SOAP"""
         
         encounter = report.encounter
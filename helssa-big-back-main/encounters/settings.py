@@ -50,6 +50,11 @@ AI_MAX_TOKENS = 2000
 # تنظیمات پردازش صوت
 AUDIO_CHUNK_SIZE_MB = 10
 AUDIO_OVERLAP_SECONDS = 2
+AUDIO_MERGE_CONCURRENCY = 8  # دانلود و رمزگشایی همزمان قطعات هنگام ادغام
+AUDIO_MERGE_SPOOL_MB = 32  # حجم فایل ادغام شده در حافظه پیش از انتقال به دیسک
+ENCOUNTER_PIPELINE_TTL = 86400  # مدت نگهداری پیشرفت pipeline در cache (ثانیه)
+ENCOUNTER_CHUNK_STT_TIMEOUT = 600  # مهلت قطعات در حال رونویسی پیش از ناموفق شمردن (ثانیه)
+SOAP_CONTEXT_CACHE_TTL = 3600  # مدت نگهداری context تولید SOAP در cache (ثانیه)
 AUDIO_MAX_FILE_SIZE_MB = 500
 AUDIO_ALLOWED_FORMATS = ['webm', 'mp3', 'wav', 'ogg']
 
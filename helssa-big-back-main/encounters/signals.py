@@ -3,8 +3,8 @@ from django.dispatch import receiver
 from django.utils import timezone
 
 from .models import (
-    Encounter, AudioChunk, Transcript,
-    SOAPReport, Prescription
+    Encounter, AudioChunk, SOAPReport,
+    Prescription, EncounterFile
 )
 from .tasks import (
     process_audio_chunk_stt,
@@ -44,24 +44,6 @@ def handle_audio_chunk_post_save(sender, instance, created, **kwargs):
         process_audio_chunk_stt.delay(str(instance.id))
 
 
-@receiver(post_save, sender=Transcript)
-def handle_transcript_post_save(sender, instance, created, **kwargs):
-    """پس از ذخیره رونویسی"""
-    
-    if created:
-        # بررسی تکمیل بودن همه رونویسی‌ها
-        encounter = instance.audio_chunk.encounter
-        total_chunks = encounter.audio_chunks.count()
-        transcribed_chunks = Transcript.objects.filter(
-            audio_chunk__encounter=encounter
-        ).count()
-        
-        if total_chunks > 0 and total_chunks == transcribed_chunks:
-            # همه قطعات رونویسی شده‌اند
-            from .tasks import merge_encounter_transcripts
-            merge_encounter_transcripts.delay(str(encounter.id))
-
-
 @receiver(post_save, sender=SOAPReport)
 def handle_soap_report_post_save(sender, instance, created, **kwargs):
     """پس از ذخیره گزارش SOAP"""
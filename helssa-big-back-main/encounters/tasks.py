@@ -1,18 +1,213 @@
-from celery import shared_task, chain, group
+from celery import shared_task, chain, chord, group
 from typing import List, Dict, Optional
+from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 import asyncio
 import logging
+import time
+import uuid
 
-from .models import AudioChunk, Transcript, Encounter, SOAPReport
-from .services import AudioProcessingService, SOAPGenerationService
+from .models import AudioChunk, Transcript, Encounter, SOAPReport, Prescription
+from .services import AudioProcessingService, SOAPGenerationService, EncounterPipelineTracker
+from .utils.encryption import STREAM_FORMAT
 
 logger = logging.getLogger(__name__)
 
 
+# Pipeline پردازش صوت ملاقات
+#
+# start_encounter_pipeline
+#   -> chord(group(transcribe_audio_chunk × قطعات), finalize_encounter_transcription)
+#   -> complete_encounter_transcription (پس از اتمام قطعات زنده در حال رونویسی)
+#   -> extract_encounter_entities -> generate_soap_report_async -> generate_post_visit_report
+#
+# taskهای قطعات فقط نتیجه STT را برمی‌گردانند؛ ثبت رونویسی‌ها و وضعیت قطعات
+# به صورت دسته‌ای در callback انجام می‌شود. chord به result backend نیاز دارد.
+
+def start_encounter_pipeline(encounter_id: str, only_failed: bool = False) -> Optional[str]:
+    """شروع pipeline پردازش صوت یک ملاقات
+    
+    Args:
+        encounter_id: شناسه ملاقات
+        only_failed: فقط قطعات ناموفق دوباره رونویسی شوند
+        
+    Returns:
+        شناسه اجرا یا None اگر قطعه‌ای برای پردازش نباشد
+    """
+    chunks = list(
+        AudioChunk.objects.filter(encounter_id=encounter_id)
+        .values_list('id', 'transcription_status')
+    )
+    if not chunks:
+        logger.warning(f"No audio chunks for encounter {encounter_id}")
+        return None
+        
+    # قطعات 'processing' در حال رونویسی توسط process_audio_chunk_stt هستند و دوباره ارسال نمی‌شوند
+    statuses = {'failed'} if only_failed else {'pending', 'failed'}
+    pending_ids = [str(chunk_id) for chunk_id, status in chunks if status in statuses]
+    in_flight = sum(1 for _, status in chunks if status == 'processing')
+    if only_failed and not pending_ids and in_flight:
+        logger.info(
+            f"No failed chunks to rerun for encounter {encounter_id}; "
+            f"{in_flight} chunks are still being transcribed"
+        )
+        return None
+        
+    run_id = uuid.uuid4().hex[:12]
+    EncounterPipelineTracker(encounter_id).start(run_id, len(chunks), pending_ids)
+    
+    if not pending_ids:
+        # قطعه‌ای برای ارسال نیست؛ قطعات در حال رونویسی در نتیجه به عنوان ناقص گزارش می‌شوند
+        finalize_encounter_transcription.delay([], encounter_id, run_id)
+        return run_id
+        
+    # یک کوئری برای وضعیت همه قطعات
+    AudioChunk.objects.filter(id__in=pending_ids).update(transcription_status='processing')
+    
+    chord(
+        group(transcribe_audio_chunk.s(chunk_id, encounter_id, run_id) for chunk_id in pending_ids),
+        finalize_encounter_transcription.s(encounter_id, run_id)
+    ).apply_async()
+    
+    logger.info(
+        f"Encounter pipeline {run_id} started for {encounter_id}: "
+        f"{len(pending_ids)}/{len(chunks)} chunks to transcribe"
+    )
+    return run_id
+
+
+def get_encounter_pipeline_progress(encounter_id: str) -> Optional[Dict]:
+    """پیشرفت و زمان‌بندی آخرین اجرای pipeline یک ملاقات"""
+    return EncounterPipelineTracker(encounter_id).get_progress()
+
+
+@shared_task(queue='stt')
+def transcribe_audio_chunk(chunk_id: str, encounter_id: str, run_id: str) -> Dict:
+    """رونویسی یک قطعه در pipeline (عضو group)
+    
+    خطا به جای raise در نتیجه برمی‌گردد تا callback chord همیشه اجرا شود.
+    """
+    result = _transcribe_chunk(chunk_id)
+    EncounterPipelineTracker(encounter_id).chunk_finished(run_id, result['success'])
+    return result
+
+
+@shared_task
+def finalize_encounter_transcription(results: List[Dict], encounter_id: str, run_id: str) -> Dict:
+    """callback chord: ثبت دسته‌ای نتایج و ادغام رونویسی‌ها پس از اتمام همه قطعات
+    
+    Args:
+        results: نتایج transcribe_audio_chunk
+        encounter_id: شناسه ملاقات
+        run_id: شناسه اجرا
+        
+    Returns:
+        خلاصه مرحله رونویسی
+    """
+    tracker = EncounterPipelineTracker(encounter_id)
+    chunk_seconds = [r['seconds'] for r in results]
+    tracker.record_stage(
+        run_id, 'transcription', tracker.elapsed(run_id),
+        chunks=len(results),
+        chunk_seconds_avg=round(sum(chunk_seconds) / len(chunk_seconds), 3) if chunk_seconds else 0,
+        chunk_seconds_max=max(chunk_seconds, default=0)
+    )
+    
+    with tracker.stage(run_id, 'storage', status='storing'):
+        _store_transcription_results(results)
+        
+    return complete_encounter_transcription(encounter_id, run_id, chunks=len(results))
+
+
+@shared_task
+def complete_encounter_transcription(encounter_id: str, run_id: str, timed_out: bool = False,
+                                     chunks: int = 0) -> Optional[Dict]:
+    """ادغام رونویسی‌ها وقتی هیچ قطعه‌ای در حال رونویسی نیست
+    
+    قطعات زنده (process_audio_chunk_stt) ممکن است هنگام اجرای callback chord
+    هنوز در حال رونویسی باشند؛ در این حالت اجرا در وضعیت 'waiting_for_chunks'
+    می‌ماند و آخرین قطعه زنده پس از ثبت نتیجه این تابع را دوباره اجرا می‌کند.
+    اگر قطعه‌ای تا ``ENCOUNTER_CHUNK_STT_TIMEOUT`` تمام نشود، ناموفق علامت
+    می‌خورد تا rerun_failed_chunks آن را دوباره رونویسی کند.
+    
+    Args:
+        encounter_id: شناسه ملاقات
+        run_id: شناسه اجرا
+        timed_out: فراخوانی پس از پایان مهلت قطعات در حال رونویسی
+        chunks: تعداد قطعات رونویسی شده در این اجرا
+        
+    Returns:
+        خلاصه مرحله رونویسی یا None اگر اجرا قبلاً نهایی شده باشد
+    """
+    tracker = EncounterPipelineTracker(encounter_id)
+    statuses = dict(
+        AudioChunk.objects.filter(encounter_id=encounter_id)
+        .exclude(transcription_status='completed').values_list('id', 'transcription_status')
+    )
+    in_flight_ids = [str(chunk_id) for chunk_id, status in statuses.items() if status == 'processing']
+    
+    if in_flight_ids and not timed_out:
+        if tracker.claim(run_id, 'waiting'):
+            tracker.update(run_id, status='waiting_for_chunks', waiting_chunk_ids=in_flight_ids)
+            complete_encounter_transcription.apply_async(
+                args=[encounter_id, run_id],
+                kwargs={'timed_out': True},
+                countdown=getattr(settings, 'ENCOUNTER_CHUNK_STT_TIMEOUT', 600)
+            )
+        logger.info(
+            f"Encounter pipeline {run_id}: waiting for {len(in_flight_ids)} chunks "
+            f"still being transcribed for {encounter_id}"
+        )
+        return {'encounter_id': encounter_id, 'status': 'waiting', 'chunk_ids': in_flight_ids}
+        
+    # فقط یک فراخوانی (callback، آخرین قطعه زنده یا پایان مهلت) اجرا را نهایی می‌کند
+    if not tracker.claim(run_id, 'finalized'):
+        return None
+        
+    if in_flight_ids:
+        stuck = AudioChunk.objects.filter(
+            id__in=in_flight_ids, transcription_status='processing'
+        ).update(transcription_status='failed')
+        logger.warning(f"Encounter pipeline {run_id}: {stuck} chunks timed out for {encounter_id}")
+        
+    # قطعات ناموفق این اجرا یا اجراهای قبلی
+    failed_ids = [
+        str(chunk_id) for chunk_id in
+        AudioChunk.objects.filter(encounter_id=encounter_id)
+        .exclude(transcription_status='completed').values_list('id', flat=True)
+    ]
+    if failed_ids:
+        tracker.finish(run_id, 'partial', failed_chunk_ids=failed_ids)
+        logger.warning(
+            f"Encounter pipeline {run_id}: {len(failed_ids)} chunks failed for "
+            f"{encounter_id}; use rerun_failed_chunks to retry them"
+        )
+        return {'encounter_id': encounter_id, 'status': 'partial', 'failed_chunk_ids': failed_ids}
+        
+    with tracker.stage(run_id, 'merge', status='merging'):
+        full_text = _merge_transcripts(encounter_id)
+        
+    chain(
+        extract_encounter_entities.si(encounter_id, run_id),
+        generate_soap_report_async.si(encounter_id, run_id),
+        generate_post_visit_report.si(full_text, encounter_id)
+    ).apply_async()
+    
+    return {'encounter_id': encounter_id, 'status': 'merged', 'chunks': chunks}
+
+
+@shared_task
+def rerun_failed_chunks(encounter_id: str) -> Optional[str]:
+    """اجرای دوباره pipeline فقط برای قطعات ناموفق"""
+    return start_encounter_pipeline(encounter_id, only_failed=True)
+
+
 @shared_task(queue='stt')
 def process_audio_chunk_stt(chunk_id: str) -> Dict:
-    """پردازش STT یک قطعه صوتی
+    """پردازش STT یک قطعه صوتی (بلافاصله پس از آپلود قطعه)
+    
+    استخراج موجودیت‌ها و ادغام در pipeline پایان ملاقات انجام می‌شود.
     
     Args:
         chunk_id: شناسه قطعه صوتی
@@ -20,62 +215,169 @@ def process_audio_chunk_stt(chunk_id: str) -> Dict:
     Returns:
         اطلاعات پردازش
     """
+    AudioChunk.objects.filter(id=chunk_id).update(transcription_status='processing')
+    
+    result = _transcribe_chunk(chunk_id)
+    transcripts = _store_transcription_results([result])
+    
+    # اگر pipeline ملاقات منتظر این قطعه است، ادغام از اینجا ادامه می‌یابد
+    encounter_id = AudioChunk.objects.values_list('encounter_id', flat=True).get(id=chunk_id)
+    progress = get_encounter_pipeline_progress(str(encounter_id))
+    if progress and progress['status'] == 'waiting_for_chunks':
+        complete_encounter_transcription(str(encounter_id), progress['run_id'])
+    
+    if not result['success']:
+        raise ValueError(result['error'])
+        
+    logger.info(f"STT completed for chunk {chunk_id}")
+    
+    transcript = transcripts[0]
+    return {
+        'chunk_id': chunk_id,
+        'transcript_id': str(transcript.id),
+        'text_length': len(transcript.text),
+        'confidence': transcript.confidence_score
+    }
+
+
+def _transcribe_chunk(chunk_id: str) -> Dict:
+    """دریافت صوت و رونویسی یک قطعه بدون نوشتن در پایگاه داده
+    
+    Returns:
+        نتیجه شامل success، فیلدهای رونویسی یا error و مدت پردازش
+    """
+    started = time.perf_counter()
     try:
-        chunk = AudioChunk.objects.get(id=chunk_id)
-        
-        # به‌روزرسانی وضعیت
-        chunk.transcription_status = 'processing'
-        chunk.save()
-        
-        # TODO: اتصال به سرویس STT (Whisper)
-        # فعلاً داده ساختگی
-        transcript_text = f"رونویسی قطعه {chunk.chunk_index} از ملاقات"
-        confidence = 0.85
-        
-        # ایجاد رونویسی
-        transcript = Transcript.objects.create(
-            audio_chunk=chunk,
-            text=transcript_text,
-            language='fa',
-            confidence_score=confidence,
-            word_timestamps=[],  # TODO: دریافت از Whisper
-            stt_model='whisper-1',
-            processing_time=5.2  # ثانیه
-        )
+        chunk = AudioChunk.objects.select_related('encounter').only(
+            'id', 'file_url', 'format', 'is_encrypted', 'encounter__encryption_key'
+        ).get(id=chunk_id)
         
-        # به‌روزرسانی وضعیت
-        chunk.transcription_status = 'completed'
-        chunk.is_processed = True
-        chunk.processed_at = timezone.now()
-        chunk.save()
+        # دریافت و رمزگشایی صوت قطعه
+        audio_data = asyncio.run(AudioProcessingService().fetch_chunk_audio(chunk))
         
-        # شروع استخراج موجودیت‌های پزشکی
-        extract_medical_entities.delay(str(transcript.id))
+        if not audio_data:
+            raise ValueError(f"Audio data for chunk {chunk_id} is empty")
         
-        logger.info(f"STT completed for chunk {chunk_id}")
+        # تبدیل در سرور استنتاج STT (مدل گرم، دسته‌بندی کلیپ‌های کوتاه)
+        result, processing_time = _transcribe_chunk_audio(audio_data, chunk.format)
         
         return {
-            'chunk_id': str(chunk.id),
-            'transcript_id': str(transcript.id),
-            'text_length': len(transcript_text),
-            'confidence': confidence
+            'chunk_id': chunk_id,
+            'success': True,
+            'transcript': {
+                'text': result['transcription'],
+                'language': result.get('language') or 'fa',
+                'confidence_score': result['confidence_score'],
+                'word_timestamps': [
+                    {'start': s['start'], 'end': s['end'], 'text': s['text']}
+                    for s in result.get('segments', [])
+                ],
+                'stt_model': result.get('model_size', 'whisper'),
+                'processing_time': processing_time,
+            },
+            'seconds': round(time.perf_counter() - started, 3),
         }
         
-    except AudioChunk.DoesNotExist:
-        logger.error(f"AudioChunk {chunk_id} not found")
-        raise
     except Exception as e:
         logger.error(f"Error processing STT for chunk {chunk_id}: {str(e)}")
-        
-        # به‌روزرسانی وضعیت خطا
-        try:
-            chunk = AudioChunk.objects.get(id=chunk_id)
-            chunk.transcription_status = 'failed'
-            chunk.save()
-        except:
-            pass
+        return {
+            'chunk_id': chunk_id,
+            'success': False,
+            'error': str(e),
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+
+
+def _store_transcription_results(results: List[Dict]) -> List[Transcript]:
+    """ثبت دسته‌ای رونویسی‌ها و وضعیت قطعات
+    
+    رونویسی قبلی قطعات (اجرای دوباره) جایگزین می‌شود. bulk_create سیگنال
+    post_save رونویسی را اجرا نمی‌کند.
+    
+    Returns:
+        رونویسی‌های ایجاد شده
+    """
+    succeeded = [r for r in results if r['success']]
+    failed_ids = [r['chunk_id'] for r in results if not r['success']]
+    succeeded_ids = [r['chunk_id'] for r in succeeded]
+    
+    with transaction.atomic():
+        transcripts = []
+        if succeeded:
+            Transcript.objects.filter(audio_chunk_id__in=succeeded_ids).delete()
+            transcripts = Transcript.objects.bulk_create([
+                Transcript(audio_chunk_id=r['chunk_id'], **r['transcript'])
+                for r in succeeded
+            ])
+            AudioChunk.objects.filter(id__in=succeeded_ids).update(
+                transcription_status='completed',
+                is_processed=True,
+                processed_at=timezone.now()
+            )
             
-        raise
+        if failed_ids:
+            AudioChunk.objects.filter(id__in=failed_ids).update(transcription_status='failed')
+            
+    return transcripts
+
+
+def _transcribe_chunk_audio(audio_data: bytes, audio_format: str):
+    """تبدیل صوت یک قطعه با هسته پردازش گفتار STT
+    
+    Args:
+        audio_data: صوت رمزگشایی شده
+        audio_format: فرمت فایل (پسوند)
+        
+    Returns:
+        (نتیجه تبدیل، زمان پردازش به ثانیه)
+    """
+    import os
+    import tempfile
+    from stt.cores.speech_processor import get_speech_processor
+    from stt.settings import WHISPER_SETTINGS
+    
+    model_size = WHISPER_SETTINGS['DEFAULT_MODEL']
+    started = time.perf_counter()
+    
+    with tempfile.NamedTemporaryFile(suffix=f'.{audio_format}', delete=False) as temp_file:
+        temp_file.write(audio_data)
+        temp_path = temp_file.name
+    
+    try:
+        result = get_speech_processor().process_audio_file(
+            temp_path, 'fa', model_size, chunked=False
+        )
+    finally:
+        os.remove(temp_path)
+    
+    result['model_size'] = f'whisper-{model_size}'
+    return result, round(time.perf_counter() - started, 2)
+
+
+def _extract_entities(text: str) -> Dict:
+    """استخراج موجودیت‌های پزشکی یک متن"""
+    
+    # TODO: اتصال به سرویس NLP پزشکی
+    # فعلاً داده ساختگی
+    return {
+        'entities': [
+            {
+                'type': 'symptom',
+                'text': 'سردرد',
+                'start': 10,
+                'end': 15,
+                'confidence': 0.9
+            },
+            {
+                'type': 'medication',
+                'text': 'استامینوفن',
+                'start': 45,
+                'end': 55,
+                'confidence': 0.85
+            }
+        ],
+        'extracted_at': timezone.now().isoformat()
+    }
 
 
 @shared_task(queue='nlp')
@@ -91,31 +393,11 @@ def extract_medical_entities(transcript_id: str) -> Dict:
     try:
         transcript = Transcript.objects.get(id=transcript_id)
         
-        # TODO: اتصال به سرویس NLP پزشکی
-        # فعلاً داده ساختگی
-        entities = {
-            'entities': [
-                {
-                    'type': 'symptom',
-                    'text': 'سردرد',
-                    'start': 10,
-                    'end': 15,
-                    'confidence': 0.9
-                },
-                {
-                    'type': 'medication',
-                    'text': 'استامینوفن',
-                    'start': 45,
-                    'end': 55,
-                    'confidence': 0.85
-                }
-            ],
-            'extracted_at': timezone.now().isoformat()
-        }
+        entities = _extract_entities(transcript.text)
         
         # به‌روزرسانی transcript
         transcript.medical_entities = entities
-        transcript.save()
+        transcript.save(update_fields=['medical_entities', 'updated_at'])
         
         logger.info(f"Medical entities extracted for transcript {transcript_id}")
         
@@ -129,6 +411,59 @@ def extract_medical_entities(transcript_id: str) -> Dict:
         raise
 
 
+@shared_task(queue='nlp')
+def extract_encounter_entities(encounter_id: str, run_id: Optional[str] = None) -> int:
+    """استخراج موجودیت‌های همه رونویسی‌های یک ملاقات با یک bulk_update
+    
+    Returns:
+        تعداد رونویسی‌های به‌روز شده
+    """
+    tracker = EncounterPipelineTracker(encounter_id)
+    with tracker.stage(run_id, 'entities', status='extracting_entities'):
+        transcripts = list(
+            Transcript.objects.filter(audio_chunk__encounter_id=encounter_id)
+            .only('id', 'text', 'medical_entities')
+        )
+        for transcript in transcripts:
+            transcript.medical_entities = _extract_entities(transcript.text)
+        Transcript.objects.bulk_update(transcripts, ['medical_entities'])
+        
+    logger.info(f"Medical entities extracted for {len(transcripts)} transcripts of encounter {encounter_id}")
+    return len(transcripts)
+
+
+def _merge_transcripts(encounter_id: str) -> str:
+    """ادغام و ذخیره متن کامل رونویسی‌های یک ملاقات"""
+    
+    transcripts = list(
+        Transcript.objects.filter(
+            audio_chunk__encounter_id=encounter_id
+        ).order_by('audio_chunk__chunk_index').values_list('text', flat=True)
+    )
+    
+    if not transcripts:
+        logger.warning(f"No transcripts found for encounter {encounter_id}")
+        return ""
+        
+    # ادغام متن‌ها
+    full_text = " ".join(transcripts)
+    
+    # حذف تکرارها در نقاط اتصال
+    # TODO: پیاده‌سازی الگوریتم حذف تکرار
+    cleaned_text = full_text
+    
+    # ذخیره متن کامل (update تا سیگنال‌های ملاقات اجرا نشوند)
+    encounter = Encounter.objects.only('metadata').get(id=encounter_id)
+    encounter.metadata['full_transcript'] = cleaned_text
+    encounter.metadata['transcript_word_count'] = len(cleaned_text.split())
+    encounter.metadata['transcript_merged_at'] = timezone.now().isoformat()
+    Encounter.objects.filter(id=encounter_id).update(metadata=encounter.metadata)
+    
+    logger.info(f"Transcripts merged for encounter {encounter_id}")
+    
+    return cleaned_text
+
+
 @shared_task
 def merge_encounter_transcripts(encounter_id: str) -> str:
     """ادغام رونویسی‌های یک ملاقات
@@ -140,35 +475,7 @@ def merge_encounter_transcripts(encounter_id: str) -> str:
         متن کامل رونویسی
     """
     try:
-        # بازیابی تمام رونویسی‌ها
-        transcripts = Transcript.objects.filter(
-            audio_chunk__encounter_id=encounter_id
-        ).order_by('audio_chunk__chunk_index').values_list('text', flat=True)
-        
-        if not transcripts:
-            logger.warning(f"No transcripts found for encounter {encounter_id}")
-            return ""
-            
-        # ادغام متن‌ها
-        full_text = " ".join(transcripts)
-        
-        # حذف تکرارها در نقاط اتصال
-        # TODO: پیاده‌سازی الگوریتم حذف تکرار
-        cleaned_text = full_text
-        
-        # ذخیره متن کامل
-        encounter = Encounter.objects.get(id=encounter_id)
-        encounter.metadata['full_transcript'] = cleaned_text
-        encounter.metadata['transcript_word_count'] = len(cleaned_text.split())
-        encounter.metadata['transcript_merged_at'] = timezone.now().isoformat()
-        encounter.save()
-        
-        logger.info(f"Transcripts merged for encounter {encounter_id}")
-        
-        # شروع تولید SOAP
-        generate_soap_report_async.delay(encounter_id)
-        
-        return cleaned_text
+        return _merge_transcripts(encounter_id)
         
     except Encounter.DoesNotExist:
         logger.error(f"Encounter {encounter_id} not found")
@@ -179,29 +486,37 @@ def merge_encounter_transcripts(encounter_id: str) -> str:
 
 
 @shared_task(queue='nlp')
-def generate_soap_report_async(encounter_id: str) -> Dict:
+def generate_soap_report_async(encounter_id: str, run_id: Optional[str] = None) -> Dict:
     """تولید گزارش SOAP به صورت async
     
     Args:
         encounter_id: شناسه ملاقات
+        run_id: شناسه اجرای pipeline (برای ثبت زمان مرحله)
         
     Returns:
         اطلاعات گزارش تولید شده
     """
+    tracker = EncounterPipelineTracker(encounter_id)
     try:
         logger.info(f"Starting SOAP generation for encounter {encounter_id}")
         
-        # استفاده از asyncio برای فراخوانی سرویس async
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
         soap_service = SOAPGenerationService()
-        report = loop.run_until_complete(
-            soap_service.generate_soap_report(encounter_id)
+        tracker.update(run_id, status='generating_soap')
+        # خروجی‌ها در generate_post_visit_report تولید می‌شوند
+        report = asyncio.run(
+            soap_service.generate_soap_report(encounter_id, render_outputs=False)
+        )
+        stats = report.generation_stats
+        tracker.record_stage(
+            run_id, 'soap', stats['seconds'],
+            steps=stats['stages'], context_cache=stats['context_cache']
         )
         
         logger.info(f"SOAP report generated for encounter {encounter_id}")
         
+        if run_id:
+            tracker.finish(run_id, 'completed')
+        
         # ارسال نوتیفیکیشن به پزشک
         notify_doctor_soap_ready.delay(encounter_id, str(report.id))
         
@@ -214,6 +529,8 @@ def generate_soap_report_async(encounter_id: str) -> Dict:
         
     except Exception as e:
         logger.error(f"Error generating SOAP for encounter {encounter_id}: {str(e)}")
+        if run_id:
+            tracker.finish(run_id, 'failed', error=str(e))
         raise
 
 
@@ -221,39 +538,22 @@ def generate_soap_report_async(encounter_id: str) -> Dict:
 def process_encounter_audio_complete(encounter_id: str):
     """پردازش کامل صوت یک ملاقات
     
-    این task زنجیره‌ای از taskها را اجرا می‌کند:
     1. ادغام قطعات صوتی
-    2. ادغام رونویسی‌ها
-    3. تولید گزارش SOAP
+    2. رونویسی قطعات باقی‌مانده به صورت موازی و ادغام رونویسی‌ها (chord)
+    3. استخراج موجودیت‌ها، تولید گزارش SOAP و گزارش‌های پس از ویزیت
     """
     try:
-        encounter = Encounter.objects.get(id=encounter_id)
-        
-        # بررسی تکمیل بودن همه قطعات
-        total_chunks = encounter.audio_chunks.count()
-        processed_chunks = encounter.audio_chunks.filter(is_processed=True).count()
-        
-        if total_chunks == 0:
+        if not AudioChunk.objects.filter(encounter_id=encounter_id).exists():
             logger.warning(f"No audio chunks for encounter {encounter_id}")
             return
             
-        if processed_chunks < total_chunks:
-            logger.info(f"Not all chunks processed for encounter {encounter_id}: {processed_chunks}/{total_chunks}")
-            return
-            
         # ادغام صوت
         merge_audio_files.delay(encounter_id)
         
-        # ادغام رونویسی‌ها و تولید SOAP
-        chain(
-            merge_encounter_transcripts.s(encounter_id),
-            generate_post_visit_report.s(encounter_id)
-        ).apply_async()
+        run_id = start_encounter_pipeline(encounter_id)
         
-        logger.info(f"Post-visit processing started for encounter {encounter_id}")
+        logger.info(f"Post-visit processing started for encounter {encounter_id} (run {run_id})")
         
-    except Encounter.DoesNotExist:
-        logger.error(f"Encounter {encounter_id} not found")
     except Exception as e:
         logger.error(f"Error in post-visit processing for encounter {encounter_id}: {str(e)}")
 
@@ -280,11 +580,11 @@ def merge_audio_files(encounter_id: str) -> Optional[str]:
             audio_service.merge_audio_chunks(encounter_id)
         )
         
-        # به‌روزرسانی encounter
-        encounter = Encounter.objects.get(id=encounter_id)
-        encounter.recording_url = merged_url
-        encounter.metadata['audio_merged_at'] = timezone.now().isoformat()
-        encounter.save()
+        # به‌روزرسانی encounter با update تا post_save (و پردازش پس از ویزیت) دوباره اجرا نشود
+        metadata = Encounter.objects.values_list('metadata', flat=True).get(id=encounter_id) or {}
+        metadata['audio_merged_at'] = timezone.now().isoformat()
+        metadata['audio_encryption_format'] = STREAM_FORMAT
+        Encounter.objects.filter(id=encounter_id).update(recording_url=merged_url, metadata=metadata)
         
         logger.info(f"Audio merged for encounter {encounter_id}: {merged_url}")
         
@@ -300,22 +600,21 @@ def generate_post_visit_report(transcript_text: str, encounter_id: str):
     """تولید گزارش‌های پس از ویزیت
     
     شامل:
-    - گزارش SOAP
-    - خلاصه ویزیت برای بیمار
+    - خروجی‌های گزارش SOAP (PDF و خلاصه ویزیت برای بیمار)
     - یادآوری‌های پیگیری
     """
     try:
-        encounter = Encounter.objects.get(id=encounter_id)
-        
-        # تولید PDF گزارش SOAP
-        if hasattr(encounter, 'soap_report'):
-            generate_soap_pdf.delay(str(encounter.soap_report.id))
+        encounter = Encounter.objects.select_related('soap_report').get(id=encounter_id)
+        report = getattr(encounter, 'soap_report', None)
+        
+        if report:
+            # تولید PDF و خلاصه بیمار
+            render_soap_outputs.delay(str(report.id))
+        else:
+            generate_patient_summary.delay(encounter_id)
             
-        # تولید خلاصه برای بیمار
-        generate_patient_summary.delay(encounter_id)
-        
         # تنظیم یادآوری‌های پیگیری
-        if hasattr(encounter, 'soap_report') and encounter.soap_report.follow_up:
+        if report and report.follow_up:
             schedule_follow_up_reminders.delay(encounter_id)
             
         logger.info(f"Post-visit reports queued for encounter {encounter_id}")
@@ -326,6 +625,77 @@ def generate_post_visit_report(transcript_text: str, encounter_id: str):
         logger.error(f"Error generating post-visit reports for encounter {encounter_id}: {str(e)}")
 
 
+@shared_task
+def render_soap_outputs(report_id: str) -> Dict:
+    """تولید خروجی‌های گزارش SOAP در پس‌زمینه
+    
+    گزارش پیش از این مرحله به درخواست‌کننده برگردانده شده است.
+    
+    Args:
+        report_id: شناسه گزارش
+        
+    Returns:
+        آدرس PDF و زمان هر مرحله
+    """
+    try:
+        report = SOAPReport.objects.select_related('encounter').get(id=report_id)
+        timings = {}
+        
+        started = time.perf_counter()
+        pdf_url = _render_soap_pdf(report)
+        timings['pdf'] = round(time.perf_counter() - started, 3)
+        
+        started = time.perf_counter()
+        _store_patient_summary(report.encounter)
+        timings['patient_summary'] = round(time.perf_counter() - started, 3)
+        
+        notify_patient_summary_ready.delay(str(report.encounter_id))
+        
+        logger.info(f"Outputs rendered for SOAP report {report_id}: {timings}")
+        
+        return {
+            'report_id': report_id,
+            'pdf_url': pdf_url,
+            'stages': timings
+        }
+        
+    except SOAPReport.DoesNotExist:
+        logger.error(f"SOAP report {report_id} not found")
+        raise
+    except Exception as e:
+        logger.error(f"Error rendering outputs for report {report_id}: {str(e)}")
+        raise
+
+
+def _render_soap_pdf(report: SOAPReport) -> str:
+    """تولید PDF گزارش و ثبت آدرس آن"""
+    # TODO: اتصال به سرویس تولید PDF
+    # فعلاً URL ساختگی
+    pdf_url = f"https://storage.helssa.ir/reports/{report.id}/soap.pdf"
+    
+    report.pdf_url = pdf_url
+    report.save(update_fields=['pdf_url', 'updated_at'])
+    return pdf_url
+
+
+def _store_patient_summary(encounter: Encounter) -> Dict:
+    """تولید خلاصه ویزیت بیمار و ذخیره در metadata ملاقات"""
+    # TODO: تولید خلاصه ساده برای بیمار
+    summary = {
+        'visit_date': encounter.scheduled_at.isoformat(),
+        'doctor': 'دکتر ...',  # TODO: از UnifiedUser
+        'chief_complaint': encounter.chief_complaint,
+        'key_points': [],
+        'medications': [],
+        'next_steps': []
+    }
+    
+    # ذخیره در metadata (update تا سیگنال‌های ملاقات اجرا نشوند)
+    encounter.metadata['patient_summary'] = summary
+    Encounter.objects.filter(id=encounter.id).update(metadata=encounter.metadata)
+    return summary
+
+
 @shared_task
 def generate_soap_pdf(report_id: str) -> Optional[str]:
     """تولید PDF از گزارش SOAP
@@ -338,13 +708,7 @@ def generate_soap_pdf(report_id: str) -> Optional[str]:
     """
     try:
         report = SOAPReport.objects.select_related('encounter').get(id=report_id)
-        
-        # TODO: اتصال به سرویس تولید PDF
-        # فعلاً URL ساختگی
-        pdf_url = f"https://storage.helssa.ir/reports/{report_id}/soap.pdf"
-        
-        report.pdf_url = pdf_url
-        report.save()
+        pdf_url = _render_soap_pdf(report)
         
         logger.info(f"PDF generated for SOAP report {report_id}")
         
@@ -363,20 +727,7 @@ def generate_patient_summary(encounter_id: str):
     """تولید خلاصه ویزیت برای بیمار"""
     try:
         encounter = Encounter.objects.get(id=encounter_id)
-        
-        # TODO: تولید خلاصه ساده برای بیمار
-        summary = {
-            'visit_date': encounter.scheduled_at.isoformat(),
-            'doctor': 'دکتر ...',  # TODO: از UnifiedUser
-            'chief_complaint': encounter.chief_complaint,
-            'key_points': [],
-            'medications': [],
-            'next_steps': []
-        }
-        
-        # ذخیره در metadata
-        encounter.metadata['patient_summary'] = summary
-        encounter.save()
+        _store_patient_summary(encounter)
         
         # ارسال به بیمار
         notify_patient_summary_ready.delay(encounter_id)
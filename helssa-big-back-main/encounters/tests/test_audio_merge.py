@@ -0,0 +1,106 @@
+"""
+تست‌های ادغام قطعات صوتی و حذف همپوشانی
+"""
+import asyncio
+import io
+import os
+from datetime import timedelta
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from pydub import AudioSegment
+
+from ..models import AudioChunk, Encounter
+from ..services.audio_processor import AudioProcessingService, trim_overlap
+from ..utils.encryption import (
+    STREAM_FORMAT, decrypt_stream, encrypt_data, generate_encryption_key
+)
+
+
+def _wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    """فایل WAV تک کاناله با نمونه‌های تصادفی"""
+    output = io.BytesIO()
+    AudioSegment(
+        data=os.urandom(int(seconds * sample_rate) * 2),
+        sample_width=2,
+        frame_rate=sample_rate,
+        channels=1
+    ).export(output, format='wav')
+    return output.getvalue()
+
+
+def _decode(audio: bytes) -> AudioSegment:
+    return AudioSegment.from_file(io.BytesIO(audio), format='wav')
+
+
+class InMemoryAudioService(AudioProcessingService):
+    """AudioProcessingService با ذخیره‌سازی در حافظه"""
+
+    def __init__(self, objects):
+        super().__init__()
+        self.objects = objects
+        self.uploads = {}
+
+    async def _download_from_storage(self, file_url):
+        return self.objects[file_url]
+
+    async def _upload_to_storage(self, file_path, data, content_type, length=None):
+        self.uploads[file_path] = (data.read(), content_type, length)
+        return f"https://storage.helssa.ir/{file_path}"
+
+
+class TrimOverlapTest(SimpleTestCase):
+    """تست حذف همپوشانی ابتدای قطعه"""
+
+    def test_trimmed_chunk_is_a_valid_file_without_the_overlap(self):
+        audio = _wav(3)
+
+        trimmed = _decode(trim_overlap(audio, 'wav', 1.0))
+
+        original = _decode(audio)
+        self.assertEqual(len(trimmed), 2000)
+        self.assertEqual(trimmed.frame_rate, original.frame_rate)
+        self.assertEqual(trimmed.raw_data, original[1000:].raw_data)
+
+    def test_chunk_without_overlap_is_not_decoded(self):
+        data = b'not audio'
+        self.assertIs(trim_overlap(data, 'webm', 0), data)
+
+    def test_undecodable_chunk_is_kept_whole(self):
+        data = b'\x1aE\xdf\xa3 truncated webm'
+        with self.assertLogs('encounters.services.audio_processor', 'WARNING'):
+            self.assertEqual(trim_overlap(data, 'wav', 2.0), data)
+
+
+class StreamMergeTest(SimpleTestCase):
+    """تست ادغام جریانی قطعات"""
+
+    def test_merged_file_holds_each_chunk_without_its_overlap(self):
+        encounter = Encounter(encryption_key=generate_encryption_key())
+        started = timezone.now()
+        objects = {}
+        chunks = []
+        for index in range(3):
+            url = f"https://storage.helssa.ir/chunk_{index}.wav"
+            objects[url] = asyncio.run(encrypt_data(_wav(3), encounter.encryption_key)).encode()
+            chunks.append(AudioChunk(
+                chunk_index=index,
+                file_url=url,
+                duration_seconds=3,
+                format='wav',
+                is_encrypted=True,
+                # هر قطعه یک ثانیه با قطعه قبلی همپوشانی دارد
+                recorded_at=started + timedelta(seconds=2 * index + 3)
+            ))
+        service = InMemoryAudioService(objects)
+
+        url = asyncio.run(service.stream_merge(encounter, chunks))
+
+        path = f"encounters/{encounter.id}/full_recording.{STREAM_FORMAT}"
+        self.assertTrue(url.endswith(path))
+        data, content_type, length = service.uploads[path]
+        self.assertEqual(content_type, 'application/octet-stream')
+        self.assertEqual(length, len(data))
+
+        frames = list(decrypt_stream(io.BytesIO(data), encounter.encryption_key))
+        self.assertEqual([len(_decode(frame)) for frame in frames], [3000, 2000, 2000])
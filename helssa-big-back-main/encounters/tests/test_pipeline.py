@@ -0,0 +1,202 @@
+"""
+تست‌های pipeline پردازش صوت ملاقات
+"""
+from unittest.mock import patch
+
+from celery import current_app
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import tasks
+from ..models import AudioChunk, Encounter, Transcript
+from ..utils.encryption import STREAM_FORMAT
+
+User = get_user_model()
+
+
+class EncounterPipelineTest(TestCase):
+    """تست fan-in قطعات در chord و اجرای دوباره قطعات ناموفق"""
+
+    def setUp(self):
+        cache.clear()
+        eager = {'task_always_eager': True, 'task_eager_propagates': True}
+        previous = {name: current_app.conf[name] for name in eager}
+        current_app.conf.update(eager)
+        self.addCleanup(current_app.conf.update, previous)
+
+        self.doctor = User.objects.create_user(username='doctor', password='testpass123')
+        self.patient = User.objects.create_user(username='patient', password='testpass123')
+        self.encounter = Encounter.objects.create(
+            patient=self.patient,
+            doctor=self.doctor,
+            type='video',
+            chief_complaint='سردرد',
+            scheduled_at=timezone.now(),
+            fee_amount=0
+        )
+        self.chunks = [
+            AudioChunk.objects.create(
+                encounter=self.encounter,
+                chunk_index=index,
+                file_url=f'https://storage.example.com/chunk-{index}',
+                file_size=6,
+                duration_seconds=30,
+                is_encrypted=False
+            )
+            for index in range(4)
+        ]
+        self.failing = set()
+        self.transcribed = []
+
+        patches = [
+            patch(
+                'encounters.services.audio_processor.AudioProcessingService._download_from_storage',
+                self._download
+            ),
+            patch.object(tasks, '_transcribe_chunk_audio', self._transcribe),
+            patch.object(tasks, 'chain'),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def _download(self, url):
+        return url.rsplit('/', 1)[1].encode()
+
+    def _transcribe(self, audio_data, audio_format):
+        self.transcribed.append(audio_data.decode())
+        if audio_data.decode() in self.failing:
+            raise RuntimeError('STT unavailable')
+        return {'transcription': audio_data.decode(), 'confidence_score': 0.9, 'segments': []}, 0.01
+
+    def _statuses(self):
+        return dict(
+            AudioChunk.objects.filter(encounter=self.encounter)
+            .values_list('chunk_index', 'transcription_status')
+        )
+
+    def test_chord_stores_every_chunk_before_merging(self):
+        run_id = tasks.start_encounter_pipeline(str(self.encounter.id))
+
+        self.assertEqual(sorted(self.transcribed), ['chunk-0', 'chunk-1', 'chunk-2', 'chunk-3'])
+        self.assertEqual(set(self._statuses().values()), {'completed'})
+        self.assertEqual(Transcript.objects.filter(audio_chunk__encounter=self.encounter).count(), 4)
+        tasks.chain.return_value.apply_async.assert_called_once()
+
+        progress = tasks.get_encounter_pipeline_progress(str(self.encounter.id))
+        self.assertEqual(progress['run_id'], run_id)
+        self.assertEqual(progress['finished_chunks'], 4)
+        self.assertIn('merge', progress['stages'])
+
+    def test_rerun_failed_chunks_transcribes_only_the_failed_ones(self):
+        self.failing = {'chunk-2'}
+        tasks.start_encounter_pipeline(str(self.encounter.id))
+
+        self.assertEqual(self._statuses()[2], 'failed')
+        progress = tasks.get_encounter_pipeline_progress(str(self.encounter.id))
+        self.assertEqual(progress['status'], 'partial')
+        self.assertEqual(progress['failed_chunk_ids'], [str(self.chunks[2].id)])
+        tasks.chain.assert_not_called()
+
+        self.failing = set()
+        self.transcribed = []
+        tasks.rerun_failed_chunks(str(self.encounter.id))
+
+        self.assertEqual(self.transcribed, ['chunk-2'])
+        self.assertEqual(set(self._statuses().values()), {'completed'})
+        self.assertEqual(Transcript.objects.filter(audio_chunk__encounter=self.encounter).count(), 4)
+        tasks.chain.return_value.apply_async.assert_called_once()
+
+    def _start_with_live_chunk(self):
+        """قطعه 1 هنگام اجرای callback chord هنوز توسط process_audio_chunk_stt رونویسی می‌شود"""
+        AudioChunk.objects.filter(id=self.chunks[1].id).update(transcription_status='processing')
+        with patch.object(tasks.complete_encounter_transcription, 'apply_async') as watchdog:
+            run_id = tasks.start_encounter_pipeline(str(self.encounter.id))
+        watchdog.assert_called_once_with(
+            args=[str(self.encounter.id), run_id], kwargs={'timed_out': True}, countdown=600
+        )
+        return run_id
+
+    def test_chunks_being_transcribed_are_not_submitted_again(self):
+        self._start_with_live_chunk()
+
+        self.assertEqual(sorted(self.transcribed), ['chunk-0', 'chunk-2', 'chunk-3'])
+        self.assertEqual(self._statuses()[1], 'processing')
+        self.assertIsNone(tasks.rerun_failed_chunks(str(self.encounter.id)))
+        tasks.chain.assert_not_called()
+
+    def test_last_live_chunk_finalizes_the_waiting_run(self):
+        run_id = self._start_with_live_chunk()
+
+        progress = tasks.get_encounter_pipeline_progress(str(self.encounter.id))
+        self.assertEqual(progress['status'], 'waiting_for_chunks')
+        self.assertEqual(progress['waiting_chunk_ids'], [str(self.chunks[1].id)])
+        tasks.chain.assert_not_called()
+
+        # process_audio_chunk_stt رونویسی قطعه را تمام می‌کند و ادغام را ادامه می‌دهد
+        tasks.process_audio_chunk_stt(str(self.chunks[1].id))
+
+        self.assertEqual(set(self._statuses().values()), {'completed'})
+        tasks.chain.return_value.apply_async.assert_called_once()
+        self.assertIn('merge', tasks.get_encounter_pipeline_progress(str(self.encounter.id))['stages'])
+
+        # پایان مهلت پس از نهایی شدن اجرا کاری انجام نمی‌دهد
+        self.assertIsNone(
+            tasks.complete_encounter_transcription(str(self.encounter.id), run_id, timed_out=True)
+        )
+        tasks.chain.return_value.apply_async.assert_called_once()
+
+    def test_stuck_chunk_is_failed_after_timeout_and_rerun(self):
+        run_id = self._start_with_live_chunk()
+
+        tasks.complete_encounter_transcription(str(self.encounter.id), run_id, timed_out=True)
+
+        self.assertEqual(self._statuses()[1], 'failed')
+        progress = tasks.get_encounter_pipeline_progress(str(self.encounter.id))
+        self.assertEqual(progress['status'], 'partial')
+        self.assertEqual(progress['failed_chunk_ids'], [str(self.chunks[1].id)])
+        tasks.chain.assert_not_called()
+
+        self.transcribed = []
+        tasks.rerun_failed_chunks(str(self.encounter.id))
+
+        self.assertEqual(self.transcribed, ['chunk-1'])
+        tasks.chain.return_value.apply_async.assert_called_once()
+
+
+class MergeAudioFilesTest(TestCase):
+    """تست ذخیره نتیجه ادغام صوت"""
+
+    def setUp(self):
+        patcher = patch.object(tasks.process_encounter_audio_complete, 'apply_async')
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        user = User.objects.create_user(username='doctor', password='testpass123')
+        self.encounter = Encounter.objects.create(
+            patient=user,
+            doctor=user,
+            type='video',
+            chief_complaint='سردرد',
+            scheduled_at=timezone.now(),
+            fee_amount=0,
+            status='completed',
+            ended_at=timezone.now(),
+            metadata={'source': 'web'}
+        )
+
+    @patch('encounters.services.audio_processor.AudioProcessingService.merge_audio_chunks')
+    def test_merge_does_not_restart_post_visit_processing(self, merge_audio_chunks):
+        merge_audio_chunks.return_value = 'https://storage.example.com/full_recording'
+        self.apply_async.reset_mock()
+
+        self.assertEqual(tasks.merge_audio_files(str(self.encounter.id)), merge_audio_chunks.return_value)
+
+        self.apply_async.assert_not_called()
+        self.encounter.refresh_from_db()
+        self.assertEqual(self.encounter.recording_url, merge_audio_chunks.return_value)
+        self.assertEqual(self.encounter.metadata['source'], 'web')
+        self.assertEqual(self.encounter.metadata['audio_encryption_format'], STREAM_FORMAT)
+        self.assertIn('audio_merged_at', self.encounter.metadata)
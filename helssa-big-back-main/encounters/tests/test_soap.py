@@ -0,0 +1,210 @@
+"""
+تست‌های تولید گزارش SOAP، cache داده‌های context و تولید خروجی‌ها در پس‌زمینه
+"""
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import tasks
+from ..models import AudioChunk, Encounter, SOAPReport, Transcript
+from ..services import SOAPGenerationService
+
+User = get_user_model()
+
+
+class SOAPTestCase(TestCase):
+    """ملاقات تکمیل شده با رونویسی قطعات؛ task های Celery جایگزین می‌شوند"""
+
+    def setUp(self):
+        cache.clear()
+
+        self.delayed = {}
+        for task in (
+            tasks.render_soap_outputs,
+            tasks.generate_patient_summary,
+            tasks.schedule_follow_up_reminders,
+            tasks.notify_doctor_soap_ready,
+            tasks.notify_patient_summary_ready,
+            tasks.process_audio_chunk_stt,
+        ):
+            patcher = patch.object(task, 'delay')
+            self.delayed[task.name.rsplit('.', 1)[-1]] = patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch.object(tasks.process_encounter_audio_complete, 'apply_async')
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        user = User.objects.create_user(username='doctor', password='testpass123')
+        self.encounter = Encounter.objects.create(
+            patient=user,
+            doctor=user,
+            type='video',
+            chief_complaint='سردرد',
+            scheduled_at=timezone.now(),
+            fee_amount=0,
+            status='completed',
+            ended_at=timezone.now(),
+            metadata={'source': 'web'}
+        )
+        for index in range(3):
+            chunk = AudioChunk.objects.create(
+                encounter=self.encounter,
+                chunk_index=index,
+                file_url=f'https://storage.example.com/chunk-{index}',
+                file_size=6,
+                duration_seconds=30,
+                is_encrypted=False
+            )
+            Transcript.objects.create(audio_chunk=chunk, text=f'متن {index}')
+        self.apply_async.reset_mock()
+
+    def generate(self, **kwargs):
+        return async_to_sync(SOAPGenerationService().generate_soap_report)(
+            str(self.encounter.id), **kwargs
+        )
+
+
+class SOAPContextCacheTest(SOAPTestCase):
+    """تست cache داده‌های context و باطل شدن آن با تغییر رونویسی"""
+
+    def generate(self, **kwargs):
+        with patch.object(
+            SOAPGenerationService, '_get_patient_history', return_value=[]
+        ) as history:
+            report = super().generate(regenerate=True, **kwargs)
+        self.patient_lookups = history.call_count
+        return report
+
+    def test_regeneration_reuses_cached_context(self):
+        first = self.generate()
+        second = self.generate()
+
+        self.assertFalse(first.generation_stats['context_cache'])
+        self.assertTrue(second.generation_stats['context_cache'])
+        self.assertEqual(self.patient_lookups, 0)
+        self.assertEqual(second.id, first.id)
+        self.assertEqual(SOAPReport.objects.filter(encounter=self.encounter).count(), 1)
+        self.assertEqual(
+            set(second.generation_stats['stages']),
+            {'load', 'context', 'sections', 'validation', 'save'}
+        )
+
+    def test_transcript_edit_invalidates_context(self):
+        self.generate()
+        Transcript.objects.filter(audio_chunk__chunk_index=0).update(
+            text='متن اصلاح شده', updated_at=timezone.now()
+        )
+
+        report = self.generate()
+
+        self.assertFalse(report.generation_stats['context_cache'])
+        self.assertEqual(self.patient_lookups, 1)
+
+    def test_new_transcribed_chunk_invalidates_context(self):
+        self.generate()
+        chunk = AudioChunk.objects.create(
+            encounter=self.encounter,
+            chunk_index=3,
+            file_url='https://storage.example.com/chunk-3',
+            file_size=6,
+            duration_seconds=30,
+            is_encrypted=False
+        )
+        Transcript.objects.create(audio_chunk=chunk, text='متن 3')
+
+        self.assertFalse(self.generate().generation_stats['context_cache'])
+
+    def test_merged_transcript_replaces_chunk_context(self):
+        self.generate()
+        Encounter.objects.filter(id=self.encounter.id).update(metadata={
+            'full_transcript': 'رونویسی کامل ادغام شده',
+            'transcript_merged_at': timezone.now().isoformat()
+        })
+
+        report = self.generate()
+
+        self.assertFalse(report.generation_stats['context_cache'])
+        encounter = SOAPGenerationService()._load_encounter(str(self.encounter.id))
+        self.assertFalse(hasattr(encounter, 'transcribed_chunks'))
+        self.assertTrue(self.generate().generation_stats['context_cache'])
+
+    def test_encounter_fields_are_not_cached(self):
+        self.generate()
+        Encounter.objects.filter(id=self.encounter.id).update(chief_complaint='تب')
+
+        report = self.generate()
+
+        self.assertTrue(report.generation_stats['context_cache'])
+        self.assertIn('تب', report.subjective)
+
+
+class SOAPBackgroundRenderTest(SOAPTestCase):
+    """تست تولید PDF و خلاصه بیمار پس از ذخیره گزارش"""
+
+    def test_outputs_are_scheduled_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            report = self.generate()
+
+        self.assertFalse(report.pdf_url)
+        self.delayed['render_soap_outputs'].assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        self.delayed['render_soap_outputs'].assert_called_once_with(str(report.id))
+
+    def test_pipeline_generation_does_not_schedule_outputs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.generate(render_outputs=False)
+
+        self.delayed['render_soap_outputs'].assert_not_called()
+
+    def test_render_stores_pdf_and_patient_summary(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            report = self.generate()
+
+        result = tasks.render_soap_outputs(str(report.id))
+
+        report.refresh_from_db()
+        self.encounter.refresh_from_db()
+        self.assertEqual(result['pdf_url'], report.pdf_url)
+        self.assertTrue(report.pdf_url.endswith(f'/reports/{report.id}/soap.pdf'))
+        self.assertEqual(set(result['stages']), {'pdf', 'patient_summary'})
+        self.assertEqual(self.encounter.metadata['source'], 'web')
+        self.assertEqual(self.encounter.metadata['patient_summary']['chief_complaint'], 'سردرد')
+        self.delayed['notify_patient_summary_ready'].assert_called_once_with(str(self.encounter.id))
+        # ذخیره خلاصه نباید پردازش پس از ویزیت را دوباره شروع کند
+        self.apply_async.assert_not_called()
+
+    def test_render_of_missing_report_raises(self):
+        with self.assertLogs('encounters.tasks', 'ERROR'), self.assertRaises(SOAPReport.DoesNotExist):
+            tasks.render_soap_outputs('00000000-0000-0000-0000-000000000000')
+
+    def test_generate_soap_pdf_saves_only_the_pdf_url(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            report = self.generate()
+        SOAPReport.objects.filter(id=report.id).update(plan='برنامه ویرایش شده')
+
+        pdf_url = tasks.generate_soap_pdf(str(report.id))
+
+        report.refresh_from_db()
+        self.assertEqual(report.pdf_url, pdf_url)
+        self.assertEqual(report.plan, 'برنامه ویرایش شده')
+
+    def test_post_visit_report_queues_render_for_existing_report(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            report = self.generate(render_outputs=False)
+
+        tasks.generate_post_visit_report('', str(self.encounter.id))
+
+        self.delayed['render_soap_outputs'].assert_called_once_with(str(report.id))
+        self.delayed['generate_patient_summary'].assert_not_called()
+
+    def test_post_visit_report_without_report_queues_patient_summary(self):
+        tasks.generate_post_visit_report('', str(self.encounter.id))
+
+        self.delayed['generate_patient_summary'].assert_called_once_with(str(self.encounter.id))
+        self.delayed['render_soap_outputs'].assert_not_called()
@@ -1,9 +1,15 @@
 import base64
 import secrets
+from functools import lru_cache
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-from typing import Union
+from typing import BinaryIO, Iterator, Union
+
+
+# قالب فایل‌های رمزنگاری شده به صورت جریانی: هر قطعه یک توکن Fernet
+# (base64) در یک خط جداگانه
+STREAM_FORMAT = 'fernet-frames'
 
 
 def generate_encryption_key() -> str:
@@ -12,8 +18,12 @@ def generate_encryption_key() -> str:
     return base64.urlsafe_b64encode(key).decode()
 
 
+@lru_cache(maxsize=256)
 def _get_fernet_instance(key: str) -> Fernet:
-    """ایجاد instance از Fernet با کلید داده شده"""
+    """ایجاد instance از Fernet با کلید داده شده
+
+    نتیجه cache می‌شود تا PBKDF2 (۱۰۰هزار تکرار) برای هر قطعه تکرار نشود.
+    """
     try:
         # اگر کلید در فرمت base64 است
         key_bytes = base64.urlsafe_b64decode(key.encode())
@@ -42,20 +52,33 @@ async def encrypt_data(data: Union[str, bytes], key: str) -> str:
     if isinstance(data, str):
         data = data.encode()
         
-    fernet = _get_fernet_instance(key)
-    encrypted = fernet.encrypt(data)
-    
-    return base64.urlsafe_b64encode(encrypted).decode()
+    return encrypt_frame(data, key).decode()
 
 
-async def decrypt_data(encrypted_data: str, key: str) -> bytes:
+async def decrypt_data(encrypted_data: Union[str, bytes], key: str) -> bytes:
     """رمزگشایی داده با کلید داده شده"""
     
-    encrypted_bytes = base64.urlsafe_b64decode(encrypted_data.encode())
-    fernet = _get_fernet_instance(key)
-    decrypted = fernet.decrypt(encrypted_bytes)
-    
-    return decrypted
+    return decrypt_frame(encrypted_data, key)
+
+
+def encrypt_frame(data: bytes, key: str) -> bytes:
+    """رمزنگاری همگام یک قطعه؛ خروجی base64 بدون خط جدید است"""
+    return base64.urlsafe_b64encode(_get_fernet_instance(key).encrypt(data))
+
+
+def decrypt_frame(frame: Union[str, bytes], key: str) -> bytes:
+    """رمزگشایی همگام یک قطعه رمزنگاری شده با encrypt_frame یا encrypt_data"""
+    if isinstance(frame, str):
+        frame = frame.encode()
+    return _get_fernet_instance(key).decrypt(base64.urlsafe_b64decode(frame))
+
+
+def decrypt_stream(stream: BinaryIO, key: str) -> Iterator[bytes]:
+    """رمزگشایی قطعه به قطعه فایل با قالب ``STREAM_FORMAT``"""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield decrypt_frame(line, key)
 
 
 def generate_secure_token(length: int = 32) -> str:
@@ -480,6 +480,31 @@ CHATBOT_SETTINGS = {
 
 
 
+# Celery Beat
+CELERY_BEAT_SCHEDULE = {
+    # نوشتن شمارنده‌های استفاده اشتراک در دیتابیس - هر دقیقه
+    'flush-billing-usage-counters': {
+        'task': 'billing.tasks.flush_usage_counters',
+        'schedule': 60.0,
+    },
+    # بررسی سرویس‌های مانیتور شده سررسید (طبق check_interval هر سرویس) - هر دقیقه
+    'run-devops-health-checks': {
+        'task': 'devops.tasks.run_health_checks',
+        'schedule': 60.0,
+    },
+    # به‌روزرسانی نتیجه cache شده بررسی سلامت از آخرین نتایج ذخیره شده - هر ۲ دقیقه
+    # (کمتر از HEALTH_SNAPSHOT_TTL)
+    'refresh-devops-health-snapshots': {
+        'task': 'devops.tasks.refresh_health_snapshots',
+        'schedule': 120.0,
+    },
+    # پردازش تلاش‌های مجدد و رویدادهای با مهلت منقضی شده Webhook - هر ۳۰ ثانیه
+    'process-webhook-events': {
+        'task': 'integrations.tasks.process_webhook_events',
+        'schedule': 30.0,
+    },
+}
+
 # Patient App Specific Settings
 PATIENT_SETTINGS = {
     'AUTO_GENERATE_MEDICAL_RECORD_NUMBER': True,
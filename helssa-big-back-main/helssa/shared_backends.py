@@ -0,0 +1,70 @@
+"""
+ابزارهای مشترک سرویس‌های شمارنده در سطح پروژه
+(محدودکننده نرخ api_gateway و سنجش استفاده billing)
+
+- ``get_shared_redis_connection``: اتصال Redis مشترک بین پردازه‌ها، اگر
+  cache پیش‌فرض Redis باشد.
+- ``ProcessSingleton``: نمونه مشترک یک سرویس در هر پردازه.
+"""
+import logging
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+def get_shared_redis_connection(component: str):
+    """
+    اتصال Redis مربوط به cache پیش‌فرض
+
+    Args:
+        component: نام سرویس درخواست کننده (برای لاگ)
+
+    Returns:
+        اتصال Redis یا None اگر cache پیش‌فرض Redis نباشد یا django_redis
+        در دسترس نباشد
+    """
+    cache_backend = getattr(settings, 'CACHES', {}).get('default', {}).get('BACKEND', '')
+    if 'redis' not in cache_backend.lower():
+        return None
+
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection('default')
+    except Exception as e:
+        logger.warning(f"Redis connection for {component} unavailable: {str(e)}")
+        return None
+
+
+class ProcessSingleton(Generic[T]):
+    """
+    نمونه مشترک یک سرویس در پردازه
+
+    نمونه در اولین ``get`` ساخته می‌شود (thread-safe) و ``reset`` آن را حذف
+    می‌کند تا فراخوانی بعدی با تنظیمات جاری نمونه جدید بسازد.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        """دریافت (یا ساخت) نمونه مشترک"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+
+    def reset(self):
+        """حذف نمونه مشترک"""
+        with self._lock:
+            self._instance = None
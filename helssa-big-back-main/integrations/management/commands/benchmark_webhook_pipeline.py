@@ -0,0 +1,160 @@
+"""
+Management command برای بنچمارک پردازش رویدادهای Webhook
+"""
+import json
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from integrations.models import IntegrationProvider, WebhookEndpoint, WebhookEvent
+from integrations.services.webhook_pipeline import WebhookPipeline
+from integrations.services.webhook_service import WebhookService
+
+
+class SlowWebhookService(WebhookService):
+    """WebhookService با پردازش ساختگی و تأخیر ثابت (شبیه‌سازی سرویس پایین‌دستی)"""
+    
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+    
+    def _process_event(self, webhook, event):
+        time.sleep(self.latency)
+        return {'success': True, 'message': 'Benchmark event processed'}
+
+
+class Command(BaseCommand):
+    """
+    بنچمارک پردازش رویدادهای Webhook
+    
+    رویدادهای صف شده یک بار با حلقه قبلی (دو save برای هر رویداد و پردازش
+    ترتیبی) و یک بار با WebhookPipeline پردازش می‌شوند. داده‌های بنچمارک
+    در پایان حذف می‌شوند.
+    
+    استفاده:
+    python manage.py benchmark_webhook_pipeline
+    python manage.py benchmark_webhook_pipeline --events 2000 --providers 4 --latency 20 --json
+    """
+    
+    help = 'مقایسه پردازش ترتیبی رویدادهای Webhook با WebhookPipeline'
+    
+    def add_arguments(self, parser):
+        """تعریف آرگومان‌های command"""
+        parser.add_argument(
+            '--events',
+            type=int,
+            default=500,
+            help='تعداد رویدادها'
+        )
+        
+        parser.add_argument(
+            '--providers',
+            type=int,
+            default=2,
+            help='تعداد ارائه‌دهنده‌ها (رویدادها بین آن‌ها تقسیم می‌شوند)'
+        )
+        
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=10,
+            help='تأخیر شبیه‌سازی شده پردازش هر رویداد (میلی‌ثانیه)'
+        )
+        
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='خروجی در فرمت JSON'
+        )
+    
+    def handle(self, *args, **options):
+        """اجرای بنچمارک"""
+        run_id = uuid.uuid4().hex[:8]
+        service = SlowWebhookService(options['latency'] / 1000)
+        
+        providers = [
+            IntegrationProvider.objects.create(
+                name=f'Benchmark {run_id} {i}',
+                slug=f'bench-{run_id}-{i}',
+                provider_type='other',
+                status='active'
+            )
+            for i in range(options['providers'])
+        ]
+        webhooks = [
+            WebhookEndpoint.objects.create(
+                provider=provider,
+                name='benchmark',
+                endpoint_url=f'bench-{run_id}-{i}',
+                secret_key=run_id,
+                events=['benchmark.event']
+            )
+            for i, provider in enumerate(providers)
+        ]
+        
+        try:
+            report = {
+                'events': options['events'],
+                'providers': options['providers'],
+                'latency_ms': options['latency'],
+                'legacy': self._run(webhooks, options, lambda: self._process_legacy(service, webhooks)),
+                'pipeline': self._run(webhooks, options, lambda: WebhookPipeline(service=service).run()),
+            }
+        finally:
+            IntegrationProvider.objects.filter(id__in=[p.id for p in providers]).delete()
+        
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        
+        self.stdout.write(
+            f"events={report['events']} providers={report['providers']} "
+            f"latency={report['latency_ms']}ms"
+        )
+        for mode in ('legacy', 'pipeline'):
+            result = report[mode]
+            self.stdout.write(
+                f"{mode:<10} {result['events_per_second']:>9} events/s  "
+                f"{result['seconds']:>8}s"
+            )
+    
+    def _run(self, webhooks, options, process):
+        """ایجاد رویدادهای صف شده و اندازه‌گیری زمان پردازش آن‌ها"""
+        now = timezone.now()
+        WebhookEvent.objects.bulk_create([
+            WebhookEvent(
+                webhook=webhooks[i % len(webhooks)],
+                event_type='benchmark.event',
+                payload={'sequence': i},
+                next_attempt_at=now
+            )
+            for i in range(options['events'])
+        ])
+        
+        started = time.perf_counter()
+        process()
+        elapsed = time.perf_counter() - started
+        
+        processed = WebhookEvent.objects.filter(webhook__in=webhooks, is_processed=True).count()
+        WebhookEvent.objects.filter(webhook__in=webhooks).delete()
+        return {
+            'processed': processed,
+            'seconds': round(elapsed, 3),
+            'events_per_second': round(processed / elapsed, 1),
+        }
+    
+    def _process_legacy(self, service, webhooks):
+        """حلقه قبلی: شمارنده و نتیجه هر رویداد جداگانه ذخیره می‌شود"""
+        for event in WebhookEvent.objects.filter(webhook__in=webhooks, is_processed=False):
+            event.retry_count += 1
+            event.save()
+            
+            result = service._process_event(event.webhook, event)
+            if result['success']:
+                event.is_processed = True
+                event.processed_at = timezone.now()
+            else:
+                event.error_message = result.get('error', '')
+            event.save()
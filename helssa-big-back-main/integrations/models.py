@@ -346,6 +346,12 @@ class WebhookEvent(models.Model):
         default=0,
         verbose_name='تعداد تلاش'
     )
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='زمان تلاش بعدی',
+        help_text='خالی برای رویدادهای پردازش شده یا کنار گذاشته شده'
+    )
     received_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name='زمان دریافت'
@@ -358,6 +364,7 @@ class WebhookEvent(models.Model):
         indexes = [
             models.Index(fields=['webhook', 'received_at']),
             models.Index(fields=['is_processed', 'received_at']),
+            models.Index(fields=['is_processed', 'next_attempt_at']),
         ]
     
     def __str__(self):
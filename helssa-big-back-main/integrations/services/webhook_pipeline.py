@@ -0,0 +1,249 @@
+"""
+صف پردازش رویدادهای Webhook
+Webhook Event Pipeline
+
+endpoint دریافت فقط امضا را بررسی و رویداد را با ``next_attempt_at=now``
+ثبت می‌کند. worker ها رویدادهای سررسید شده را به صورت دسته‌ای برمی‌دارند:
+
+- برداشتن با ``select_for_update(skip_locked=True)`` و جلو بردن
+  ``next_attempt_at`` به اندازه مهلت پردازش (lease)؛ اگر worker از کار
+  بیفتد، رویدادها پس از پایان مهلت دوباره برداشته می‌شوند
+- هر برداشتن یک تلاش حساب می‌شود (``retry_count`` هنگام برداشتن افزایش
+  می‌یابد و پس از پردازش موفق برگردانده می‌شود)؛ بنابراین پایان مهلت یک
+  تلاش ناموفق است و رویدادی که تلاش‌هایش تمام شده دوباره پردازش نمی‌شود
+- پردازش همزمان با محدودیت جداگانه برای هر ارائه‌دهنده
+- زمان‌بندی تلاش مجدد با backoff نمایی روی ستون ایندکس شده
+  ``next_attempt_at`` (به جای پیمایش بازه زمانی)
+- ثبت نتایج با یک ``bulk_update``
+"""
+
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from integrations.models import WebhookEvent
+from integrations.settings import get_integration_setting
+
+logger = logging.getLogger(__name__)
+
+LEASE_EXPIRED_ERROR = 'مهلت پردازش رویداد به پایان رسید'
+
+RESULT_FIELDS = ['is_processed', 'processed_at', 'error_message', 'retry_count', 'next_attempt_at']
+
+
+def retry_delay(retry_count: int) -> timedelta:
+    """
+    فاصله تا تلاش بعدی (backoff نمایی)
+
+    Args:
+        retry_count: تعداد تلاش‌های ناموفق تا کنون
+    """
+    base = get_integration_setting('WEBHOOK_RETRY_DELAY')
+    cap = get_integration_setting('WEBHOOK_MAX_RETRY_DELAY')
+    return timedelta(seconds=min(base * 2 ** max(retry_count - 1, 0), cap))
+
+
+class WebhookPipeline:
+    """
+    برداشتن و پردازش دسته‌ای رویدادهای سررسید شده Webhook
+
+    Args:
+        service: سرویس پردازش رویداد (پیش‌فرض WebhookService)
+        batch_size: تعداد رویدادهای هر دسته
+        lease_seconds: مهلت پردازش رویدادهای برداشته شده
+    """
+
+    def __init__(self, service=None, batch_size: Optional[int] = None,
+                 lease_seconds: Optional[int] = None):
+        if service is None:
+            from integrations.services.webhook_service import WebhookService
+            service = WebhookService()
+
+        self.service = service
+        self.batch_size = batch_size or get_integration_setting('WEBHOOK_BATCH_SIZE')
+        self.lease = timedelta(
+            seconds=lease_seconds or get_integration_setting('WEBHOOK_CLAIM_LEASE')
+        )
+
+    def concurrency_for(self, provider_slug: str) -> int:
+        """حداکثر پردازش همزمان رویدادهای یک ارائه‌دهنده"""
+        limits = get_integration_setting('WEBHOOK_PROVIDER_CONCURRENCY')
+        return max(int(limits.get(provider_slug, limits.get('default', 1))), 1)
+
+    def due_queryset(self, now=None):
+        """
+        رویدادهای معتبر پردازش نشده‌ای که زمان تلاش آن‌ها رسیده
+
+        رویدادهای ثبت شده پیش از افزودن ``next_attempt_at`` مقدار NULL دارند؛
+        این رویدادها تا وقتی تلاش‌هایشان تمام نشده سررسید شده حساب می‌شوند.
+        """
+        return WebhookEvent.objects.filter(
+            Q(next_attempt_at__lte=now or timezone.now()) |
+            Q(next_attempt_at__isnull=True, retry_count__lt=F('webhook__retry_count')),
+            is_processed=False,
+            is_valid=True
+        )
+
+    def claim_batch(self, received_after=None) -> List[WebhookEvent]:
+        """
+        برداشتن یک دسته از رویدادهای سررسید شده
+
+        Args:
+            received_after: فقط رویدادهای دریافت شده پس از این زمان
+
+        Returns:
+            List[WebhookEvent]: رویدادهای برداشته شده همراه webhook و provider
+        """
+        now = timezone.now()
+
+        with transaction.atomic():
+            events = self.due_queryset(now)
+            if received_after is not None:
+                events = events.filter(received_at__gte=received_after)
+
+            event_ids = list(
+                events.select_for_update(skip_locked=True, of=('self',))
+                .order_by(F('next_attempt_at').asc(nulls_first=True))
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            if not event_ids:
+                return []
+
+            WebhookEvent.objects.filter(id__in=event_ids).update(
+                next_attempt_at=now + self.lease,
+                retry_count=F('retry_count') + 1
+            )
+
+        return list(
+            WebhookEvent.objects.filter(id__in=event_ids)
+            .select_related('webhook__provider')
+            .order_by('next_attempt_at')
+        )
+
+    def process_batch(self, received_after=None) -> Dict[str, Any]:
+        """
+        برداشتن، پردازش و ثبت نتایج یک دسته
+
+        Returns:
+            Dict: آمار دسته (claimed, processed, failed, dead, seconds, events_per_second)
+        """
+        started = time.perf_counter()
+        events = self.claim_batch(received_after)
+        if not events:
+            return self._with_rate({'claimed': 0, 'processed': 0, 'failed': 0, 'dead': 0}, 0)
+
+        # رویدادهایی که آخرین تلاششان با پایان مهلت از دست رفته پردازش نمی‌شوند
+        expired = [event for event in events if event.retry_count > event.webhook.retry_count]
+        results = self._process_concurrently([event for event in events if event not in expired])
+        for event in expired:
+            event.retry_count -= 1
+            results[event.id] = {'success': False, 'error': LEASE_EXPIRED_ERROR}
+        stats = self._apply_results(events, results)
+
+        stats = self._with_rate(stats, time.perf_counter() - started)
+        logger.info(
+            f"Webhook batch: {stats['processed']} processed, {stats['failed']} failed, "
+            f"{stats['dead']} dead ({stats['events_per_second']}/s)"
+        )
+        return stats
+
+    def run(self, max_batches: Optional[int] = None, received_after=None) -> Dict[str, Any]:
+        """
+        پردازش دسته‌ها تا اتمام رویدادهای سررسید شده
+
+        Returns:
+            Dict: مجموع آمار همه دسته‌ها
+        """
+        started = time.perf_counter()
+        totals = {'batches': 0, 'claimed': 0, 'processed': 0, 'failed': 0, 'dead': 0}
+
+        while max_batches is None or totals['batches'] < max_batches:
+            stats = self.process_batch(received_after)
+            if not stats['claimed']:
+                break
+            totals['batches'] += 1
+            for key in ('claimed', 'processed', 'failed', 'dead'):
+                totals[key] += stats[key]
+
+        return self._with_rate(totals, time.perf_counter() - started)
+
+    def _process_concurrently(self, events: List[WebhookEvent]) -> Dict[Any, Dict[str, Any]]:
+        """پردازش همزمان رویدادها؛ هر ارائه‌دهنده thread pool محدود خود را دارد"""
+        by_provider = defaultdict(list)
+        for event in events:
+            by_provider[event.webhook.provider.slug].append(event)
+
+        executors = []
+        futures = {}
+        try:
+            for provider_slug, provider_events in by_provider.items():
+                executor = ThreadPoolExecutor(
+                    max_workers=min(self.concurrency_for(provider_slug), len(provider_events)),
+                    thread_name_prefix=f'webhook-{provider_slug}'
+                )
+                executors.append(executor)
+                for event in provider_events:
+                    futures[event.id] = executor.submit(self._process_one, event)
+
+            return {event_id: future.result() for event_id, future in futures.items()}
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=True)
+
+    def _process_one(self, event: WebhookEvent) -> Dict[str, Any]:
+        """پردازش یک رویداد در thread پردازش"""
+        try:
+            return self.service._process_event(event.webhook, event)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+        finally:
+            # اتصال‌های باز شده در thread پردازش بسته می‌شوند
+            connections.close_all()
+
+    def _apply_results(self, events: List[WebhookEvent],
+                       results: Dict[Any, Dict[str, Any]]) -> Dict[str, int]:
+        """
+        به‌روزرسانی وضعیت رویدادها و زمان‌بندی تلاش مجدد با bulk_update
+
+        ``retry_count`` رویدادها هنگام برداشتن افزایش یافته است.
+        """
+        now = timezone.now()
+        stats = {'claimed': len(events), 'processed': 0, 'failed': 0, 'dead': 0}
+
+        for event in events:
+            result = results[event.id]
+            if result['success']:
+                event.is_processed = True
+                event.processed_at = now
+                event.error_message = ''
+                event.next_attempt_at = None
+                # تلاش موفق جزو تلاش‌های ناموفق شمرده نمی‌شود
+                event.retry_count -= 1
+                stats['processed'] += 1
+                continue
+
+            event.error_message = result.get('error', '')
+            if event.retry_count < event.webhook.retry_count:
+                event.next_attempt_at = now + retry_delay(event.retry_count)
+                stats['failed'] += 1
+            else:
+                # تلاش‌ها تمام شده؛ رویداد از صف خارج می‌شود
+                event.next_attempt_at = None
+                stats['dead'] += 1
+
+        WebhookEvent.objects.bulk_update(events, RESULT_FIELDS)
+        return stats
+
+    @staticmethod
+    def _with_rate(stats: Dict[str, Any], seconds: float) -> Dict[str, Any]:
+        """افزودن مدت و نرخ پردازش در ثانیه به آمار"""
+        stats['seconds'] = round(seconds, 3)
+        stats['events_per_second'] = round(stats['claimed'] / seconds, 1) if seconds else 0
+        return stats
@@ -8,6 +8,7 @@ import json
 import logging
 from datetime import datetime, timedelta
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from integrations.models import WebhookEndpoint, WebhookEvent
 from integrations.services.base_service import BaseIntegrationService
@@ -154,14 +155,15 @@ class WebhookService(BaseIntegrationService):
             # استخراج نوع رویداد
             event_type = payload.get('event', payload.get('type', 'unknown'))
             
-            # ثبت رویداد
+            # ثبت رویداد؛ رویدادهای معتبر بلافاصله در صف پردازش قرار می‌گیرند
             event = WebhookEvent.objects.create(
                 webhook=webhook,
                 event_type=event_type,
                 payload=payload,
                 headers=dict(headers),
                 signature=headers.get('X-Signature', ''),
-                is_valid=is_valid
+                is_valid=is_valid,
+                next_attempt_at=timezone.now() if is_valid else None
             )
             
             if not is_valid:
@@ -182,22 +184,13 @@ class WebhookService(BaseIntegrationService):
                     'event_id': str(event.id)
                 }
             
-            # پردازش رویداد
-            result = self._process_event(webhook, event)
-            
-            # به‌روزرسانی وضعیت
-            if result['success']:
-                event.is_processed = True
-                event.processed_at = timezone.now()
-            else:
-                event.error_message = result.get('error', '')
-            
-            event.save()
+            # پردازش توسط worker ها پس از commit
+            transaction.on_commit(self._enqueue_processing)
             
             return {
-                'success': result['success'],
+                'success': True,
                 'event_id': str(event.id),
-                'message': result.get('message', 'Event processed')
+                'message': 'Event queued'
             }
             
         except WebhookEndpoint.DoesNotExist:
@@ -244,49 +237,30 @@ class WebhookService(BaseIntegrationService):
     
     def retry_failed_events(self, hours: int = 24) -> Dict[str, Any]:
         """
-        تلاش مجدد برای پردازش رویدادهای ناموفق
+        پردازش رویدادهایی که زمان تلاش مجدد آن‌ها رسیده است
+        
+        رویدادها توسط WebhookPipeline به صورت دسته‌ای برداشته و پردازش می‌شوند؛
+        رویدادهای ناموفق با backoff نمایی دوباره زمان‌بندی می‌شوند.
         
         Args:
-            hours: بازه زمانی (ساعت)
+            hours: فقط رویدادهای دریافت شده در این بازه (ساعت)
             
         Returns:
             نتیجه پردازش مجدد
         """
         try:
-            # یافتن رویدادهای ناموفق
-            failed_events = WebhookEvent.objects.filter(
-                is_processed=False,
-                is_valid=True,
-                received_at__gte=timezone.now() - timedelta(hours=hours),
-                retry_count__lt=3  # حداکثر 3 بار تلاش
-            )
+            from integrations.services.webhook_pipeline import WebhookPipeline
             
-            processed = 0
-            failed = 0
-            
-            for event in failed_events:
-                # افزایش شمارنده تلاش
-                event.retry_count += 1
-                event.save()
-                
-                # تلاش برای پردازش
-                result = self._process_event(event.webhook, event)
-                
-                if result['success']:
-                    event.is_processed = True
-                    event.processed_at = timezone.now()
-                    event.save()
-                    processed += 1
-                else:
-                    event.error_message = result.get('error', '')
-                    event.save()
-                    failed += 1
+            stats = WebhookPipeline(service=self).run(
+                received_after=timezone.now() - timedelta(hours=hours)
+            )
             
             return {
                 'success': True,
-                'total_events': failed_events.count(),
-                'processed': processed,
-                'failed': failed
+                'total_events': stats['claimed'],
+                'processed': stats['processed'],
+                'failed': stats['failed'] + stats['dead'],
+                'events_per_second': stats['events_per_second']
             }
             
         except Exception as e:
@@ -429,6 +403,15 @@ class WebhookService(BaseIntegrationService):
         
         return {'success': True, 'message': 'Event logged successfully'}
     
+    def _enqueue_processing(self):
+        """ارسال task پردازش صف رویدادها به Celery"""
+        try:
+            from integrations.tasks import process_webhook_events
+            process_webhook_events.delay()
+        except Exception as e:
+            # رویداد در صف می‌ماند و در اجرای دوره‌ای بعدی پردازش می‌شود
+            logger.warning(f"Failed to enqueue webhook processing: {str(e)}")
+    
     def _get_oldest_pending_event(self) -> Optional[str]:
         """دریافت قدیمی‌ترین رویداد پردازش نشده"""
         try:
@@ -28,7 +28,13 @@ INTEGRATIONS_DEFAULTS = {
     'WEBHOOK_SECRET': '',
     'WEBHOOK_TIMEOUT': 30,
     'WEBHOOK_MAX_RETRIES': 3,
-    'WEBHOOK_RETRY_DELAY': 60,  # ثانیه
+    'WEBHOOK_RETRY_DELAY': 60,  # ثانیه (پایه backoff نمایی)
+    'WEBHOOK_MAX_RETRY_DELAY': 3600,  # سقف backoff (ثانیه)
+    'WEBHOOK_BATCH_SIZE': 100,  # تعداد رویدادهای هر دسته
+    'WEBHOOK_CLAIM_LEASE': 300,  # مهلت پردازش دسته برداشته شده (ثانیه)
+    'WEBHOOK_PROVIDER_CONCURRENCY': {
+        'default': 4,  # پردازش همزمان رویدادهای هر ارائه‌دهنده
+    },
     
     # تنظیمات Rate Limiting
     'RATE_LIMIT_CACHE_PREFIX': 'rate_limit',
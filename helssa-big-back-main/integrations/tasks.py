@@ -0,0 +1,30 @@
+"""
+تسک‌های Celery اپلیکیشن integrations
+"""
+import logging
+
+from celery import shared_task
+
+from integrations.services.webhook_pipeline import WebhookPipeline
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(queue='integrations.webhooks')
+def process_webhook_events(max_batches=None):
+    """
+    پردازش دسته‌ای رویدادهای سررسید شده Webhook
+    
+    پس از دریافت هر رویداد فراخوانی می‌شود و به صورت دوره‌ای نیز
+    (CELERY_BEAT_SCHEDULE['process-webhook-events']) اجرا می‌شود تا
+    تلاش‌های مجدد زمان‌بندی شده و رویدادهای با مهلت منقضی شده پردازش شوند.
+    
+    چند worker می‌توانند همزمان اجرا شوند؛ هر کدام دسته‌های جداگانه برمی‌دارند.
+    """
+    stats = WebhookPipeline().run(max_batches=max_batches)
+    if stats['claimed']:
+        logger.info(
+            f"Webhook events: {stats['processed']} processed, {stats['failed']} rescheduled, "
+            f"{stats['dead']} dead in {stats['seconds']}s ({stats['events_per_second']}/s)"
+        )
+    return stats
@@ -332,4 +332,211 @@ class WebhookServiceTest(TestCase):
         
         self.assertEqual(result['status'], 'healthy')
         self.assertEqual(result['active_webhooks'], 1)
-        self.assertEqual(result['pending_events'], 1)
\ No newline at end of file
+        self.assertEqual(result['pending_events'], 1)
+
+class WebhookPipelineTest(TestCase):
+    """تست صف پردازش دسته‌ای رویدادهای Webhook"""
+    
+    def setUp(self):
+        """آماده‌سازی داده‌های تست"""
+        from integrations.models import WebhookEndpoint
+        
+        self.payment_provider = IntegrationProvider.objects.create(
+            name='Payment Gateway',
+            slug='payment_gateway',
+            provider_type='payment',
+            status='active'
+        )
+        self.sms_provider = IntegrationProvider.objects.create(
+            name='SMS Provider',
+            slug='sms_provider',
+            provider_type='sms',
+            status='active'
+        )
+        self.payment_webhook = WebhookEndpoint.objects.create(
+            provider=self.payment_provider,
+            name='Payments',
+            endpoint_url='payments',
+            secret_key='secret123',
+            events=['payment.success', 'payment.failed'],
+            retry_count=2
+        )
+        self.sms_webhook = WebhookEndpoint.objects.create(
+            provider=self.sms_provider,
+            name='SMS',
+            endpoint_url='sms',
+            secret_key='secret123',
+            events=['sms.delivered']
+        )
+    
+    def _events(self, webhook, event_type, count):
+        from django.utils import timezone
+        from integrations.models import WebhookEvent
+        
+        return [
+            WebhookEvent.objects.create(
+                webhook=webhook,
+                event_type=event_type,
+                payload={'payment_id': str(i)},
+                next_attempt_at=timezone.now()
+            )
+            for i in range(count)
+        ]
+    
+    def test_process_webhook_only_enqueues(self):
+        """تست ثبت و صف‌بندی رویداد بدون پردازش در درخواست"""
+        import hashlib
+        import hmac
+        
+        raw_body = b'{"event": "payment.success"}'
+        signature = hmac.new(b'secret123', raw_body, hashlib.sha256).hexdigest()
+        
+        with patch('integrations.tasks.process_webhook_events.delay') as mock_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                result = WebhookService().process_webhook(
+                    'payments', {'X-Signature': signature},
+                    {'event': 'payment.success'}, raw_body
+                )
+        
+        self.assertTrue(result['success'])
+        mock_delay.assert_called_once_with()
+        
+        from integrations.models import WebhookEvent
+        event = WebhookEvent.objects.get(id=result['event_id'])
+        self.assertFalse(event.is_processed)
+        self.assertIsNotNone(event.next_attempt_at)
+    
+    def test_batch_is_processed_and_saved_in_bulk(self):
+        """تست پردازش دسته و ثبت نتایج با bulk_update"""
+        from integrations.models import WebhookEvent
+        from integrations.services.webhook_pipeline import WebhookPipeline
+        
+        self._events(self.payment_webhook, 'payment.success', 6)
+        self._events(self.sms_webhook, 'sms.delivered', 4)
+        
+        # برداشتن (savepoint، انتخاب، lease، release)، بارگذاری و bulk_update
+        with self.assertNumQueries(6):
+            stats = WebhookPipeline().process_batch()
+        
+        self.assertEqual((stats['claimed'], stats['processed']), (10, 10))
+        self.assertGreater(stats['events_per_second'], 0)
+        self.assertEqual(WebhookEvent.objects.filter(is_processed=True, next_attempt_at=None).count(), 10)
+        self.assertEqual(WebhookPipeline().process_batch()['claimed'], 0)
+    
+    def test_failed_events_are_rescheduled_with_backoff(self):
+        """تست زمان‌بندی تلاش مجدد و کنار گذاشتن پس از اتمام تلاش‌ها"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from integrations.services.webhook_pipeline import WebhookPipeline, retry_delay
+        
+        event, = self._events(self.payment_webhook, 'payment.unknown', 1)
+        
+        WebhookPipeline().process_batch()
+        event.refresh_from_db()
+        self.assertEqual(event.retry_count, 1)
+        self.assertAlmostEqual(
+            (event.next_attempt_at - timezone.now()).total_seconds(), 60, delta=5
+        )
+        self.assertEqual(WebhookPipeline().process_batch()['claimed'], 0)
+        
+        event.next_attempt_at = timezone.now()
+        event.save()
+        stats = WebhookPipeline().process_batch()
+        event.refresh_from_db()
+        self.assertEqual(stats['dead'], 1)
+        self.assertEqual(event.retry_count, 2)
+        self.assertIsNone(event.next_attempt_at)
+        
+        self.assertEqual(retry_delay(3), timedelta(seconds=240))
+        self.assertEqual(retry_delay(20), timedelta(seconds=3600))
+    
+    def test_lease_expiry_counts_as_an_attempt(self):
+        """تست شمردن پایان مهلت پردازش به عنوان تلاش ناموفق"""
+        from django.utils import timezone
+        from integrations.models import WebhookEvent
+        from integrations.services.webhook_pipeline import LEASE_EXPIRED_ERROR, WebhookPipeline
+        
+        event, = self._events(self.payment_webhook, 'payment.success', 1)
+        
+        # worker پس از برداشتن از کار می‌افتد و مهلت‌ها تمام می‌شوند
+        for attempt in (1, 2):
+            self.assertEqual(len(WebhookPipeline().claim_batch()), 1)
+            WebhookEvent.objects.filter(id=event.id).update(next_attempt_at=timezone.now())
+        
+        stats = WebhookPipeline().process_batch()
+        
+        event.refresh_from_db()
+        self.assertEqual((stats['claimed'], stats['processed'], stats['dead']), (1, 0, 1))
+        self.assertEqual(event.retry_count, 2)
+        self.assertFalse(event.is_processed)
+        self.assertIsNone(event.next_attempt_at)
+        self.assertEqual(event.error_message, LEASE_EXPIRED_ERROR)
+        self.assertEqual(WebhookPipeline().process_batch()['claimed'], 0)
+    
+    def test_successful_attempt_is_not_counted_as_retry(self):
+        """تست حفظ تعداد تلاش‌های ناموفق پس از پایان مهلت و پردازش موفق"""
+        from django.utils import timezone
+        from integrations.models import WebhookEvent
+        from integrations.services.webhook_pipeline import WebhookPipeline
+        
+        event, = self._events(self.payment_webhook, 'payment.success', 1)
+        WebhookPipeline().claim_batch()
+        WebhookEvent.objects.filter(id=event.id).update(next_attempt_at=timezone.now())
+        
+        stats = WebhookPipeline().process_batch()
+        
+        event.refresh_from_db()
+        self.assertEqual(stats['processed'], 1)
+        self.assertTrue(event.is_processed)
+        self.assertEqual(event.retry_count, 1)
+    
+    def test_events_without_next_attempt_are_claimed_until_retries_run_out(self):
+        """تست برداشتن رویدادهای قدیمی بدون next_attempt_at"""
+        from integrations.models import WebhookEvent
+        from integrations.services.webhook_pipeline import WebhookPipeline
+        
+        legacy, exhausted = self._events(self.payment_webhook, 'payment.success', 2)
+        WebhookEvent.objects.filter(id=legacy.id).update(next_attempt_at=None, retry_count=1)
+        WebhookEvent.objects.filter(id=exhausted.id).update(next_attempt_at=None, retry_count=2)
+        
+        claimed = WebhookPipeline().claim_batch()
+        
+        self.assertEqual([event.id for event in claimed], [legacy.id])
+        self.assertIsNotNone(claimed[0].next_attempt_at)
+        self.assertEqual(WebhookPipeline().claim_batch(), [])
+    
+    def test_provider_concurrency_is_bounded(self):
+        """تست محدودیت همزمانی جداگانه برای هر ارائه‌دهنده"""
+        import threading
+        import time
+        from django.test import override_settings
+        from integrations.services.webhook_pipeline import WebhookPipeline
+        
+        self._events(self.payment_webhook, 'payment.success', 8)
+        self._events(self.sms_webhook, 'sms.delivered', 8)
+        
+        lock = threading.Lock()
+        in_flight = {'payment_gateway': 0, 'sms_provider': 0}
+        peaks = {'payment_gateway': 0, 'sms_provider': 0, 'total': 0}
+        
+        def slow_process(webhook, event):
+            slug = webhook.provider.slug
+            with lock:
+                in_flight[slug] += 1
+                peaks[slug] = max(peaks[slug], in_flight[slug])
+                peaks['total'] = max(peaks['total'], sum(in_flight.values()))
+            time.sleep(0.02)
+            with lock:
+                in_flight[slug] -= 1
+            return {'success': True}
+        
+        service = WebhookService()
+        service._process_event = slow_process
+        
+        with override_settings(WEBHOOK_PROVIDER_CONCURRENCY={'default': 3, 'payment_gateway': 2}):
+            stats = WebhookPipeline(service=service).run()
+        
+        self.assertEqual(stats['processed'], 16)
+        self.assertEqual(peaks['payment_gateway'], 2)
+        self.assertEqual(peaks['sms_provider'], 3)
+        self.assertGreater(peaks['total'], 3)
@@ -7,10 +7,12 @@ from .api_ingress import PatientAPIIngress
 from .text_processor import PatientTextProcessor
 from .speech_processor import PatientSpeechProcessor
 from .orchestrator import PatientOrchestrator
+from .bulk_processor import PatientBulkProcessor
 
 __all__ = [
     'PatientAPIIngress',
     'PatientTextProcessor',
     'PatientSpeechProcessor',
-    'PatientOrchestrator'
+    'PatientOrchestrator',
+    'PatientBulkProcessor'
 ]
\ No newline at end of file
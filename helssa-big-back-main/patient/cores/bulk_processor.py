@@ -0,0 +1,422 @@
+"""
+پردازش انبوه سوابق پزشکی و نسخه‌ها
+Patient Bulk Processor
+
+آیتم‌ها به دسته‌های ``PATIENT_BULK_CHUNK_SIZE`` تقسیم می‌شوند:
+
+- مراحل I/O محور (پردازش متن) با همزمانی محدود (``PATIENT_BULK_CONCURRENCY``)
+  اجرا می‌شوند؛ آماده‌سازی دسته بعدی همزمان با ذخیره دسته فعلی انجام می‌شود
+- اعتبارسنجی با همان serializer ها انجام می‌شود اما فیلدهای کلید خارجی از
+  یک ``in_bulk`` برای هر دسته خوانده می‌شوند نه یک کوئری برای هر آیتم
+- هر دسته با یک ``bulk_create`` در تراکنش جداگانه ذخیره می‌شود و checkpoint
+  (``PatientBulkJob``) در همان تراکنش به‌روز می‌شود تا اجرای مجدد با همان
+  ``job_id`` دقیقاً از دسته بعد از آخرین دسته commit شده شروع شود
+- نتیجه هر دسته بلافاصله پس از ذخیره برگردانده (stream) می‌شود
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+BULK_OPERATIONS = ('medical_records', 'prescriptions')
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    فیلد کلید خارجی که نمونه‌ها را از نگاشت از پیش خوانده شده برمی‌دارد
+    (به جای یک کوئری برای هر آیتم)
+    """
+
+    def __init__(self, instances: Dict[str, Any], **kwargs):
+        self.instances = instances
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+        instance = self.instances.get(str(data))
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+
+class PatientBulkProcessor:
+    """
+    پردازش انبوه آیتم‌های workflow ``bulk_processing``
+
+    Args:
+        orchestrator: PatientOrchestrator برای پردازش متن آیتم‌ها
+        concurrency: حداکثر پردازش متن همزمان (``PATIENT_BULK_CONCURRENCY``، پیش‌فرض ۲۰)
+        chunk_size: تعداد آیتم‌های هر دسته (``PATIENT_BULK_CHUNK_SIZE``، پیش‌فرض ۵۰۰)
+    """
+
+    def __init__(self, orchestrator, concurrency: Optional[int] = None,
+                 chunk_size: Optional[int] = None):
+        self.orchestrator = orchestrator
+        self.concurrency = concurrency or getattr(settings, 'PATIENT_BULK_CONCURRENCY', 20)
+        self.chunk_size = chunk_size or getattr(settings, 'PATIENT_BULK_CHUNK_SIZE', 500)
+
+    @staticmethod
+    def new_job_id() -> str:
+        """تولید شناسه کار انبوه"""
+        return f"bulk_{uuid.uuid4().hex[:16]}"
+
+    def get_checkpoint(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """خواندن checkpoint و پیشرفت یک کار انبوه"""
+        from ..models import PatientBulkJob
+
+        job = PatientBulkJob.objects.filter(job_id=job_id).first()
+        return job.as_checkpoint() if job else None
+
+    async def stream(
+        self,
+        operation_type: str,
+        items: List[Dict[str, Any]],
+        context: Optional[Dict[str, Any]] = None,
+        job_id: Optional[str] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        پردازش دسته‌ای آیتم‌ها و برگرداندن نتیجه هر دسته پس از commit
+
+        Args:
+            operation_type: medical_records یا prescriptions
+            items: آیتم‌های ورودی
+            context: اطلاعات محیطی (کاربر)
+            job_id: شناسه کار برای ادامه از checkpoint
+            on_progress: تابع اختیاری که پس از هر دسته با پیشرفت فراخوانی می‌شود
+
+        Yields:
+            Dict: نتیجه دسته (offset, results, errors, progress)
+        """
+        if operation_type not in BULK_OPERATIONS:
+            raise ValueError(f'نوع عملیات {operation_type} پشتیبانی نمی‌شود')
+
+        job_id = job_id or self.new_job_id()
+        checkpoint = await sync_to_async(self.get_checkpoint)(job_id) or {
+            'job_id': job_id,
+            'operation_type': operation_type,
+            'total': len(items),
+            'next_index': 0,
+            'chunks': 0,
+            'successful': 0,
+            'failed': 0,
+            'status': 'running',
+        }
+        if checkpoint['total'] != len(items) or checkpoint['operation_type'] != operation_type:
+            raise ValueError(f'ورودی با checkpoint کار {job_id} مطابقت ندارد')
+
+        offsets = list(range(checkpoint['next_index'], len(items), self.chunk_size))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+        processed = 0
+
+        def prepare(offset):
+            return asyncio.ensure_future(self._prepare_chunk(
+                operation_type, items[offset:offset + self.chunk_size], context, semaphore
+            ))
+
+        pending = prepare(offsets[0]) if offsets else None
+        try:
+            for position, offset in enumerate(offsets):
+                prepared = await pending
+                # آماده‌سازی دسته بعدی همزمان با ذخیره دسته فعلی
+                pending = prepare(offsets[position + 1]) if position + 1 < len(offsets) else None
+
+                chunk, checkpoint = await sync_to_async(self._write_chunk)(
+                    operation_type, offset, items[offset:offset + len(prepared)], prepared, checkpoint
+                )
+                processed += len(prepared)
+
+                chunk['progress'] = self._progress(checkpoint, processed, time.perf_counter() - started)
+                logger.info(
+                    f"Bulk {operation_type} {job_id}: chunk {checkpoint['chunks']}, "
+                    f"{checkpoint['next_index']}/{checkpoint['total']} "
+                    f"({chunk['progress']['items_per_second']}/s)"
+                )
+                if on_progress:
+                    on_progress(chunk['progress'])
+
+                yield chunk
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def run(
+        self,
+        operation_type: str,
+        items: List[Dict[str, Any]],
+        context: Optional[Dict[str, Any]] = None,
+        job_id: Optional[str] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        پردازش همه دسته‌ها و تجمیع نتایج در قالب خروجی ``bulk_processing``
+
+        Returns:
+            Dict: نتیجه کل (شمارنده‌ها شامل دسته‌های commit شده در اجراهای قبلی)
+        """
+        job_id = job_id or self.new_job_id()
+        checkpoint = await sync_to_async(self.get_checkpoint)(job_id)
+        resumed_from = checkpoint['next_index'] if checkpoint else 0
+        started = time.perf_counter()
+
+        results = []
+        errors = []
+        async for chunk in self.stream(operation_type, items, context, job_id, on_progress):
+            results.extend(chunk['results'])
+            errors.extend(chunk['errors'])
+            checkpoint = chunk['progress']
+
+        checkpoint = checkpoint or {'successful': 0, 'failed': 0, 'chunks': 0}
+        seconds = time.perf_counter() - started
+        processed = len(items) - resumed_from
+
+        return {
+            'success': True,
+            'job_id': job_id,
+            'total_items': len(items),
+            'resumed_from': resumed_from,
+            'successful': checkpoint['successful'],
+            'failed': checkpoint['failed'],
+            'results': results,
+            'errors': errors,
+            'chunks': checkpoint['chunks'],
+            'seconds': round(seconds, 3),
+            'items_per_second': round(processed / seconds, 1) if seconds else 0,
+            'message': f"{checkpoint['successful']} از {len(items)} آیتم با موفقیت پردازش شد"
+        }
+
+    async def _prepare_chunk(
+        self,
+        operation_type: str,
+        items: List[Dict[str, Any]],
+        context: Optional[Dict[str, Any]],
+        semaphore: asyncio.Semaphore
+    ) -> List[Any]:
+        """پردازش متن همزمان آیتم‌های یک دسته؛ خطای هر آیتم در جای خود برمی‌گردد"""
+        if operation_type == 'medical_records':
+            enrich = self.orchestrator._enrich_medical_record_data
+            user_field = 'created_by'
+        else:
+            enrich = self.orchestrator._enrich_prescription_data
+            user_field = 'prescribed_by'
+
+        async def prepare_item(item):
+            data = dict(item)
+            if context and 'user' in context:
+                data[user_field] = context['user'].id
+            async with semaphore:
+                return await enrich(data)
+
+        return await asyncio.gather(
+            *(prepare_item(item) for item in items),
+            return_exceptions=True
+        )
+
+    def _write_chunk(
+        self,
+        operation_type: str,
+        offset: int,
+        items: List[Dict[str, Any]],
+        prepared: List[Any],
+        checkpoint: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        اعتبارسنجی و ذخیره یک دسته با bulk_create و checkpoint آن در یک تراکنش
+
+        Returns:
+            Tuple: نتیجه دسته و checkpoint پس از آن
+        """
+        from ..models import MedicalRecord, PrescriptionHistory
+        from ..serializers import MedicalRecordSerializer, PrescriptionHistorySerializer
+
+        if operation_type == 'medical_records':
+            model, serializer_class, user_field = MedicalRecord, MedicalRecordSerializer, 'created_by'
+        else:
+            model, serializer_class, user_field = (
+                PrescriptionHistory, PrescriptionHistorySerializer, 'prescribed_by'
+            )
+
+        results = []
+        errors = []
+        valid = []
+
+        serializer = self._bulk_serializer(
+            serializer_class, ['patient', user_field],
+            [data for data in prepared if isinstance(data, dict)]
+        )
+        for position, data in enumerate(prepared):
+            index = offset + position
+            if isinstance(data, Exception):
+                errors.append({'index': index, 'error': str(data), 'item': items[position]})
+                continue
+
+            try:
+                validated = serializer.run_validation(data)
+            except serializers.ValidationError as e:
+                results.append({
+                    'index': index,
+                    'result': {
+                        'success': False,
+                        'errors': serializers.as_serializer_error(e),
+                        'message': self._invalid_message(operation_type)
+                    }
+                })
+                continue
+
+            valid.append((index, position, data, model(**validated)))
+
+        next_index = offset + len(prepared)
+        instances = [instance for _, _, _, instance in valid]
+        try:
+            with transaction.atomic():
+                if instances:
+                    self._bulk_create(model, instances)
+                checkpoint = self._save_checkpoint(checkpoint, next_index, len(instances), len(errors))
+        except Exception as e:
+            logger.error(f"Bulk {operation_type} chunk at {offset} failed: {str(e)}")
+            errors.extend(
+                {'index': index, 'error': str(e), 'item': items[position]}
+                for index, position, _, _ in valid
+            )
+            with transaction.atomic():
+                checkpoint = self._save_checkpoint(checkpoint, next_index, 0, len(errors))
+            return self._chunk_result(offset, results, errors), checkpoint
+
+        for index, _, data, instance in valid:
+            results.append({'index': index, 'result': self._item_result(operation_type, data, instance)})
+
+        return self._chunk_result(offset, results, errors), checkpoint
+
+    @staticmethod
+    def _bulk_create(model, instances: List[Any]):
+        """ذخیره دسته؛ شماره نسخه‌ها از شمارنده مشترک (NumberAllocator) تخصیص می‌یابد"""
+        if hasattr(model, 'next_prescription_numbers'):
+            numbers = model.next_prescription_numbers(len(instances))
+            for instance, number in zip(instances, numbers):
+                instance.prescription_number = number
+        model.objects.bulk_create(instances)
+
+    @staticmethod
+    def _bulk_serializer(serializer_class, relation_fields: List[str],
+                         payloads: List[Dict[str, Any]]):
+        """serializer مشترک دسته با فیلدهای کلید خارجی از پیش خوانده شده"""
+        serializer = serializer_class()
+
+        for name in relation_fields:
+            field = serializer.fields[name]
+            model = field.queryset.model
+
+            pks = set()
+            for data in payloads:
+                value = data.get(name)
+                if value is None or isinstance(value, bool):
+                    continue
+                try:
+                    pks.add(model._meta.pk.to_python(value))
+                except DjangoValidationError:
+                    continue
+
+            instances = {str(pk): obj for pk, obj in model.objects.in_bulk(list(pks)).items()}
+            serializer.fields[name] = PreloadedPrimaryKeyRelatedField(
+                instances,
+                queryset=field.queryset,
+                required=field.required,
+                allow_null=field.allow_null
+            )
+
+        return serializer
+
+    @staticmethod
+    def _item_result(operation_type: str, data: Dict[str, Any], instance) -> Dict[str, Any]:
+        """نتیجه هر آیتم در قالب handler های تکی"""
+        if operation_type == 'medical_records':
+            return {
+                'success': True,
+                'medical_record_id': str(instance.id),
+                'extracted_entities': data.get('analysis_metadata', {}).get('medical_entities', {}),
+                'message': 'سابقه پزشکی با موفقیت ایجاد شد'
+            }
+
+        return {
+            'success': True,
+            'prescription_id': str(instance.id),
+            'prescription_number': instance.prescription_number,
+            'can_repeat': instance.can_repeat(),
+            'extracted_medications': data.get('processing_metadata', {}).get('all_medications', []),
+            'message': 'نسخه با موفقیت ثبت شد'
+        }
+
+    @staticmethod
+    def _invalid_message(operation_type: str) -> str:
+        if operation_type == 'medical_records':
+            return 'خطا در اعتبارسنجی اطلاعات سابقه پزشکی'
+        return 'خطا در اعتبارسنجی اطلاعات نسخه'
+
+    @staticmethod
+    def _chunk_result(offset: int, results: List[Dict[str, Any]],
+                      errors: List[Dict[str, Any]]) -> Dict[str, Any]:
+        results.sort(key=lambda r: r['index'])
+        return {'offset': offset, 'results': results, 'errors': errors}
+
+    @staticmethod
+    def _save_checkpoint(checkpoint: Dict[str, Any], next_index: int,
+                         successful: int, failed: int) -> Dict[str, Any]:
+        """
+        ثبت checkpoint پس از یک دسته؛ داخل تراکنش ذخیره همان دسته فراخوانی
+        می‌شود تا هر دو با هم commit یا rollback شوند
+        """
+        from ..models import PatientBulkJob
+
+        checkpoint = dict(
+            checkpoint,
+            next_index=next_index,
+            chunks=checkpoint['chunks'] + 1,
+            successful=checkpoint['successful'] + successful,
+            failed=checkpoint['failed'] + failed,
+            status='completed' if next_index >= checkpoint['total'] else 'running',
+            updated_at=time.time(),
+        )
+        fields = {
+            name: checkpoint[name]
+            for name in ('next_index', 'chunks', 'successful', 'failed', 'status')
+        }
+        if not PatientBulkJob.objects.filter(job_id=checkpoint['job_id']).update(
+            updated_at=timezone.now(), **fields
+        ):
+            PatientBulkJob.objects.create(
+                job_id=checkpoint['job_id'],
+                operation_type=checkpoint['operation_type'],
+                total=checkpoint['total'],
+                **fields
+            )
+        return checkpoint
+
+    @staticmethod
+    def _progress(checkpoint: Dict[str, Any], processed: int, seconds: float) -> Dict[str, Any]:
+        """پیشرفت کار پس از هر دسته"""
+        total = checkpoint['total']
+        return {
+            'job_id': checkpoint['job_id'],
+            'chunks': checkpoint['chunks'],
+            'processed': checkpoint['next_index'],
+            'total': total,
+            'percent': round(checkpoint['next_index'] * 100 / total, 1) if total else 100.0,
+            'successful': checkpoint['successful'],
+            'failed': checkpoint['failed'],
+            'status': checkpoint['status'],
+            'items_per_second': round(processed / seconds, 1) if seconds else 0,
+        }
@@ -5,7 +5,8 @@ Patient Management Orchestrator Core
 
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional, Tuple, Callable
+from typing import Dict, Any, List, Optional, Tuple, Callable, AsyncIterator
+from asgiref.sync import sync_to_async
 from django.utils import timezone
 from django.core.cache import cache
 from django.db import transaction
@@ -14,6 +15,7 @@ from datetime import datetime, timedelta
 from .api_ingress import PatientAPIIngress
 from .text_processor import PatientTextProcessor
 from .speech_processor import PatientSpeechProcessor
+from .bulk_processor import BULK_OPERATIONS, PatientBulkProcessor
 
 logger = logging.getLogger(__name__)
 
@@ -143,6 +145,40 @@ class PatientOrchestrator:
                 'error': str(e)
             }
     
+    async def stream_bulk_processing(
+        self,
+        operation_type: str,
+        items: List[Dict[str, Any]],
+        context: Optional[Dict[str, Any]] = None,
+        job_id: Optional[str] = None,
+        chunk_size: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        پردازش انبوه با برگرداندن نتیجه هر دسته پس از ذخیره
+        Stream bulk processing results chunk by chunk
+        """
+        processor = PatientBulkProcessor(self, chunk_size=chunk_size)
+        async for chunk in processor.stream(operation_type, items, context, job_id):
+            yield chunk
+    
+    async def get_bulk_progress(self, job_id: str) -> Dict[str, Any]:
+        """
+        دریافت پیشرفت و checkpoint کار انبوه
+        Get bulk job progress
+        """
+        checkpoint = await sync_to_async(PatientBulkProcessor(self).get_checkpoint)(job_id)
+        
+        if not checkpoint:
+            return {
+                'success': False,
+                'message': 'کار انبوه یافت نشد'
+            }
+        
+        return {
+            'success': True,
+            'progress': checkpoint
+        }
+    
     async def cancel_workflow(self, workflow_id: str) -> Dict[str, Any]:
         """
         لغو workflow
@@ -305,25 +341,7 @@ class PatientOrchestrator:
         """
         try:
             # پردازش متن سابقه پزشکی
-            text_data = data.get('description', '')
-            if text_data:
-                text_analysis = await self.text_processor.process_patient_text(
-                    text_data, 'medical_record'
-                )
-                
-                # استخراج اطلاعات ساختاریافته
-                extracted_info = text_analysis.get('specific_processing', {})
-                
-                # بروزرسانی داده‌ها با اطلاعات استخراج شده
-                if extracted_info.get('record_type') and extracted_info['record_type'] != 'other':
-                    data['record_type'] = extracted_info['record_type']
-                
-                # افزودن اطلاعات تحلیل به metadata
-                data['analysis_metadata'] = {
-                    'text_analysis': text_analysis,
-                    'medical_entities': text_analysis.get('medical_analysis', {}).get('entities', {}),
-                    'confidence_score': text_analysis.get('processing_metadata', {}).get('confidence_score', 0)
-                }
+            await self._enrich_medical_record_data(data)
             
             # ایجاد رکورد
             from ..models import MedicalRecord
@@ -365,32 +383,7 @@ class PatientOrchestrator:
         """
         try:
             # پردازش متن نسخه
-            prescription_text = data.get('prescription_text', '')
-            if prescription_text:
-                standardized_prescription = await self.text_processor.standardize_prescription_text(
-                    prescription_text
-                )
-                
-                # استخراج اطلاعات نسخه
-                prescription_data = standardized_prescription.get('prescription_data', {})
-                
-                # بروزرسانی داده‌های نسخه
-                if prescription_data.get('medications'):
-                    # اگر چندین دارو شناسایی شد، از اولی استفاده کن
-                    first_medication = prescription_data['medications'][0]
-                    data.update({
-                        'medication_name': first_medication.get('name', data.get('medication_name', '')),
-                        'dosage': first_medication.get('dosage', data.get('dosage', '')),
-                        'frequency': first_medication.get('frequency', data.get('frequency', '')),
-                        'duration': first_medication.get('duration', data.get('duration', ''))
-                    })
-                
-                # افزودن metadata
-                data['processing_metadata'] = {
-                    'standardized_text': standardized_prescription.get('standardized_text', ''),
-                    'confidence_score': standardized_prescription.get('confidence_score', 0),
-                    'all_medications': prescription_data.get('medications', [])
-                }
+            await self._enrich_prescription_data(data)
             
             # ایجاد نسخه
             from ..models import PrescriptionHistory
@@ -600,6 +593,10 @@ class PatientOrchestrator:
         """
         مدیریت فرآیند پردازش انبوه
         Handle bulk processing workflow
+        
+        با ``execution_mode='bulk'`` آیتم‌ها با PatientBulkProcessor به صورت
+        دسته‌ای (پردازش متن همزمان و bulk_create در تراکنش هر دسته) ذخیره
+        می‌شوند؛ ``job_id`` برای ادامه از checkpoint قابل ارسال است.
         """
         try:
             operation_type = data.get('operation_type')
@@ -611,6 +608,21 @@ class PatientOrchestrator:
                     'message': 'هیچ آیتمی برای پردازش ارائه نشده'
                 }
             
+            if data.get('execution_mode') == 'bulk':
+                if operation_type not in BULK_OPERATIONS:
+                    return {
+                        'success': False,
+                        'message': f'نوع عملیات {operation_type} پشتیبانی نمی‌شود'
+                    }
+                
+                # شناسه ثابت تا تلاش مجدد workflow از checkpoint ادامه دهد
+                job_id = data.setdefault('job_id', PatientBulkProcessor.new_job_id())
+                return await PatientBulkProcessor(
+                    self,
+                    concurrency=data.get('concurrency'),
+                    chunk_size=data.get('chunk_size')
+                ).run(operation_type, items, context, job_id)
+            
             results = []
             errors = []
             
@@ -796,6 +808,61 @@ class PatientOrchestrator:
     
     # Additional helper methods for specific workflows
     
+    async def _enrich_medical_record_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """پردازش متن شرح سابقه پزشکی و افزودن اطلاعات استخراج شده به داده‌ها"""
+        text_data = data.get('description', '')
+        if text_data:
+            text_analysis = await self.text_processor.process_patient_text(
+                text_data, 'medical_record'
+            )
+            
+            # استخراج اطلاعات ساختاریافته
+            extracted_info = text_analysis.get('specific_processing', {})
+            
+            # بروزرسانی داده‌ها با اطلاعات استخراج شده
+            if extracted_info.get('record_type') and extracted_info['record_type'] != 'other':
+                data['record_type'] = extracted_info['record_type']
+            
+            # افزودن اطلاعات تحلیل به metadata
+            data['analysis_metadata'] = {
+                'text_analysis': text_analysis,
+                'medical_entities': text_analysis.get('medical_analysis', {}).get('entities', {}),
+                'confidence_score': text_analysis.get('processing_metadata', {}).get('confidence_score', 0)
+            }
+        
+        return data
+    
+    async def _enrich_prescription_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """استانداردسازی متن نسخه و بروزرسانی داده‌های دارو"""
+        prescription_text = data.get('prescription_text', '')
+        if prescription_text:
+            standardized_prescription = await self.text_processor.standardize_prescription_text(
+                prescription_text
+            )
+            
+            # استخراج اطلاعات نسخه
+            prescription_data = standardized_prescription.get('prescription_data', {})
+            
+            # بروزرسانی داده‌های نسخه
+            if prescription_data.get('medications'):
+                # اگر چندین دارو شناسایی شد، از اولی استفاده کن
+                first_medication = prescription_data['medications'][0]
+                data.update({
+                    'medication_name': first_medication.get('name', data.get('medication_name', '')),
+                    'dosage': first_medication.get('dosage', data.get('dosage', '')),
+                    'frequency': first_medication.get('frequency', data.get('frequency', '')),
+                    'duration': first_medication.get('duration', data.get('duration', ''))
+                })
+            
+            # افزودن metadata
+            data['processing_metadata'] = {
+                'standardized_text': standardized_prescription.get('standardized_text', ''),
+                'confidence_score': standardized_prescription.get('confidence_score', 0),
+                'all_medications': prescription_data.get('medications', [])
+            }
+        
+        return data
+    
     async def _process_personal_information(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """پردازش اطلاعات شخصی"""
         # تمیز کردن و استانداردسازی
@@ -501,21 +501,19 @@ class PatientSpeechProcessor:
             # اتصال به سرویس STT محلی (Whisper self-hosted)
             local_stt_url = getattr(settings, 'LOCAL_STT_URL', 'http://localhost:8000')
             
-            files = {
-                'audio': ('audio.wav', audio_data, 'audio/wav')
-            }
-            
-            data = {
+            data = aiohttp.FormData({
                 'language': config.get('language', 'fa'),
                 'model': config.get('model', 'base'),
                 'task': 'transcribe'
-            }
+            })
+            data.add_field(
+                'audio', audio_data, filename='audio.wav', content_type='audio/wav'
+            )
             
             async with aiohttp.ClientSession() as session:
                 async with session.post(
                     f"{local_stt_url}/transcribe",
-                    data=data,
-                    data=files
+                    data=data
                 ) as response:
                     if response.status == 200:
                         result = await response.json()
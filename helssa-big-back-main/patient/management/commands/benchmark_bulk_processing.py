@@ -0,0 +1,205 @@
+"""
+Management command برای بنچمارک پردازش انبوه سوابق پزشکی
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from datetime import date
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from patient.cores import PatientBulkProcessor, PatientOrchestrator, PatientTextProcessor
+from patient.models import MedicalRecord, PatientProfile
+
+User = get_user_model()
+
+
+class SlowTextProcessor(PatientTextProcessor):
+    """PatientTextProcessor با تأخیر ثابت (شبیه‌سازی سرویس پردازش متن راه دور)"""
+
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    async def process_patient_text(self, text, processing_type='general'):
+        await asyncio.sleep(self.latency)
+        return await super().process_patient_text(text, processing_type)
+
+
+class Command(BaseCommand):
+    """
+    بنچمارک پردازش انبوه سوابق پزشکی
+
+    سوابق یک بار با حلقه قبلی ``bulk_processing`` (پردازش متن و save ترتیبی
+    هر آیتم) و یک بار با PatientBulkProcessor ذخیره می‌شوند. حلقه قبلی روی
+    ``--legacy-items`` آیتم اجرا می‌شود تا زمان بنچمارک معقول بماند.
+    داده‌های بنچمارک در پایان حذف می‌شوند.
+
+    استفاده:
+    python manage.py benchmark_bulk_processing
+    python manage.py benchmark_bulk_processing --items 10000 --latency 20 --chunk-size 1000 --json
+    """
+
+    help = 'مقایسه پردازش ترتیبی bulk_processing با PatientBulkProcessor'
+
+    def add_arguments(self, parser):
+        """تعریف آرگومان‌های command"""
+        parser.add_argument(
+            '--items',
+            type=int,
+            default=10000,
+            help='تعداد سوابق برای حالت دسته‌ای'
+        )
+
+        parser.add_argument(
+            '--legacy-items',
+            type=int,
+            default=500,
+            help='تعداد سوابق برای حلقه قبلی'
+        )
+
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=10,
+            help='تأخیر شبیه‌سازی شده پردازش متن هر سابقه (میلی‌ثانیه)'
+        )
+
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='تعداد سوابق هر دسته (پیش‌فرض PATIENT_BULK_CHUNK_SIZE)'
+        )
+
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=None,
+            help='حداکثر پردازش متن همزمان (پیش‌فرض PATIENT_BULK_CONCURRENCY)'
+        )
+
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='خروجی در فرمت JSON'
+        )
+
+    def handle(self, *args, **options):
+        """اجرای بنچمارک"""
+        run_id = uuid.uuid4().hex[:8]
+        orchestrator = PatientOrchestrator()
+        orchestrator.text_processor = SlowTextProcessor(options['latency'] / 1000)
+        processor = PatientBulkProcessor(
+            orchestrator,
+            concurrency=options['concurrency'],
+            chunk_size=options['chunk_size']
+        )
+
+        doctor = User.objects.create_user(username=f'bench-doctor-{run_id}', user_type='doctor')
+        patient_user = User.objects.create_user(username=f'bench-patient-{run_id}', user_type='patient')
+        patient = PatientProfile.objects.create(
+            user=patient_user,
+            national_code=f'{random.randint(0, 10 ** 10 - 1):010d}',
+            first_name='بنچمارک',
+            last_name=run_id,
+            birth_date=date(1990, 1, 1),
+            gender='male',
+            emergency_contact_name='بنچمارک',
+            emergency_contact_phone='09123456788',
+            emergency_contact_relation='همسر',
+            address='تهران',
+            city='تهران',
+            province='تهران',
+            postal_code='1234567890',
+        )
+        context = {'user': doctor}
+
+        try:
+            report = {
+                'items': options['items'],
+                'legacy_items': options['legacy_items'],
+                'latency_ms': options['latency'],
+                'chunk_size': processor.chunk_size,
+                'concurrency': processor.concurrency,
+                'legacy': self._run(
+                    patient, options['legacy_items'],
+                    lambda items: self._process_legacy(orchestrator, items, context)
+                ),
+                'bulk': self._run(
+                    patient, options['items'],
+                    lambda items: async_to_sync(processor.run)('medical_records', items, context)
+                ),
+            }
+        finally:
+            patient.delete()
+            User.objects.filter(id__in=[doctor.id, patient_user.id]).delete()
+
+        report['speedup'] = (
+            round(report['bulk']['items_per_second'] / report['legacy']['items_per_second'], 1)
+            if report['legacy']['items_per_second'] else None
+        )
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        self.stdout.write(
+            f"items={report['items']} legacy_items={report['legacy_items']} "
+            f"latency={report['latency_ms']}ms chunk_size={report['chunk_size']} "
+            f"concurrency={report['concurrency']}"
+        )
+        for mode in ('legacy', 'bulk'):
+            result = report[mode]
+            self.stdout.write(
+                f"{mode:<8} {result['items_per_second']:>9} items/s  "
+                f"{result['seconds']:>8}s  ({result['created']} created)"
+            )
+        self.stdout.write(f"speedup  {report['speedup']}x")
+
+    def _run(self, patient, count, process):
+        """ساخت ورودی و اندازه‌گیری زمان ذخیره سوابق"""
+        items = [
+            {
+                'patient': str(patient.id),
+                'record_type': 'allergy',
+                'title': f'سابقه {i}',
+                'description': 'بیمار سابقه حساسیت به پنی‌سیلین و آسم دارد',
+                'severity': 'mild',
+                'start_date': date.today().isoformat(),
+                'is_ongoing': True,
+            }
+            for i in range(count)
+        ]
+
+        started = time.perf_counter()
+        process(items)
+        elapsed = time.perf_counter() - started
+
+        created = MedicalRecord.objects.filter(patient=patient).count()
+        MedicalRecord.objects.filter(patient=patient).delete()
+        return {
+            'created': created,
+            'seconds': round(elapsed, 3),
+            'items_per_second': round(created / elapsed, 1) if elapsed else 0,
+        }
+
+    def _process_legacy(self, orchestrator, items, context):
+        """حلقه قبلی: هر آیتم جداگانه پردازش و با serializer.save ذخیره می‌شود"""
+        # handler قبلی ORM را مستقیماً داخل event loop فراخوانی می‌کند
+        previous = os.environ.get('DJANGO_ALLOW_ASYNC_UNSAFE')
+        os.environ['DJANGO_ALLOW_ASYNC_UNSAFE'] = 'true'
+        try:
+            asyncio.run(orchestrator._handle_bulk_processing(
+                {'operation_type': 'medical_records', 'items': items}, context
+            ))
+        finally:
+            if previous is None:
+                os.environ.pop('DJANGO_ALLOW_ASYNC_UNSAFE', None)
+            else:
+                os.environ['DJANGO_ALLOW_ASYNC_UNSAFE'] = previous
@@ -586,22 +586,43 @@ class PrescriptionHistory(models.Model):
         تولید شماره نسخه منحصر به فرد
         Generate unique prescription number
         """
-        from datetime import datetime
-        year = datetime.now().year
-        month = datetime.now().month
+        return self.next_prescription_numbers(1)[0]
+    
+    @classmethod
+    def next_prescription_numbers(cls, count: int) -> list:
+        """
+        تخصیص شماره‌های نسخه از شمارنده ماهانه (NumberAllocator، قابل استفاده برای bulk_create)
+        Allocate prescription numbers from the shared monthly sequence
         
-        # گرفتن آخرین شماره نسخه در ماه جاری
-        last_prescription = PrescriptionHistory.objects.filter(
-            prescription_number__startswith=f"RX{year}{month:02d}"
-        ).order_by('-prescription_number').first()
+        در اولین تخصیص هر ماه، شمارنده از آخرین شماره موجود ادامه می‌یابد.
+        """
+        from billing.services.number_allocator import get_number_allocator
         
-        if last_prescription:
-            last_number = int(last_prescription.prescription_number.split('-')[-1])
-            new_number = last_number + 1
-        else:
-            new_number = 1
+        now = timezone.now()
+        prefix = f"RX{now.year}{now.month:02d}-"
+        allocator = get_number_allocator()
         
-        return f"RX{year}{month:02d}-{new_number:05d}"
+        # یک بلوک برای کل دسته تا شماره‌ها با یک رزرو تخصیص یابند
+        return [
+            allocator.format(
+                prefix,
+                width=5,
+                block_size=max(count, allocator.block_size),
+                initial=lambda: cls._last_prescription_sequence(prefix) + 1
+            )
+            for _ in range(count)
+        ]
+    
+    @classmethod
+    def _last_prescription_sequence(cls, prefix: str) -> int:
+        """آخرین شماره نسخه موجود با پیشوند (فقط هنگام ایجاد شمارنده)"""
+        last_number = cls.objects.filter(
+            prescription_number__startswith=prefix
+        ).order_by('-prescription_number').values_list(
+            'prescription_number', flat=True
+        ).first()
+        
+        return int(last_number[len(prefix):]) if last_number else 0
 
 
 class MedicalConsent(models.Model):
@@ -804,4 +825,96 @@ class MedicalConsent(models.Model):
         Revoke consent
         """
         self.status = 'revoked'
-        self.save()
\ No newline at end of file
+        self.save()
+
+
+class PatientBulkJob(models.Model):
+    """
+    checkpoint کار پردازش انبوه
+    Patient Bulk Job Checkpoint
+    
+    همراه هر دسته در همان تراکنش ذخیره می‌شود تا اجرای مجدد با همان
+    ``job_id`` دقیقاً از دسته بعد از آخرین دسته commit شده ادامه یابد.
+    """
+    
+    STATUS_CHOICES = [
+        ('running', 'در حال اجرا'),
+        ('completed', 'تکمیل شده'),
+    ]
+    
+    job_id = models.CharField(
+        max_length=64,
+        primary_key=True,
+        verbose_name='شناسه کار'
+    )
+    
+    operation_type = models.CharField(
+        max_length=20,
+        verbose_name='نوع عملیات'
+    )
+    
+    total = models.PositiveIntegerField(
+        verbose_name='تعداد کل آیتم‌ها'
+    )
+    
+    next_index = models.PositiveIntegerField(
+        default=0,
+        verbose_name='اندیس آیتم بعدی'
+    )
+    
+    chunks = models.PositiveIntegerField(
+        default=0,
+        verbose_name='تعداد دسته‌های ذخیره شده'
+    )
+    
+    successful = models.PositiveIntegerField(
+        default=0,
+        verbose_name='تعداد موفق'
+    )
+    
+    failed = models.PositiveIntegerField(
+        default=0,
+        verbose_name='تعداد ناموفق'
+    )
+    
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='running',
+        verbose_name='وضعیت'
+    )
+    
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='تاریخ ایجاد'
+    )
+    
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='تاریخ آخرین بروزرسانی'
+    )
+    
+    class Meta:
+        verbose_name = 'کار پردازش انبوه'
+        verbose_name_plural = 'کارهای پردازش انبوه'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.job_id} - {self.next_index}/{self.total}"
+    
+    def as_checkpoint(self) -> dict:
+        """
+        checkpoint در قالب دیکشنری پیشرفت
+        Checkpoint as a progress dictionary
+        """
+        return {
+            'job_id': self.job_id,
+            'operation_type': self.operation_type,
+            'total': self.total,
+            'next_index': self.next_index,
+            'chunks': self.chunks,
+            'successful': self.successful,
+            'failed': self.failed,
+            'status': self.status,
+            'updated_at': self.updated_at.timestamp(),
+        }
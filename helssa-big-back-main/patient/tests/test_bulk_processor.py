@@ -0,0 +1,181 @@
+"""
+تست‌های پردازش انبوه سوابق پزشکی و نسخه‌ها
+Patient Bulk Processor Tests
+"""
+
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..cores import PatientOrchestrator
+from ..cores.bulk_processor import PatientBulkProcessor
+from ..models import MedicalRecord, PatientBulkJob, PatientProfile, PrescriptionHistory
+
+User = get_user_model()
+
+
+class PatientBulkProcessorTest(TestCase):
+    """تست ذخیره دسته‌ای، گزارش پیشرفت و ادامه از checkpoint"""
+
+    def setUp(self):
+        cache.clear()
+
+        self.doctor = User.objects.create_user(
+            username='09123456700',
+            user_type='doctor'
+        )
+        self.patient_profile = PatientProfile.objects.create(
+            user=User.objects.create_user(username='09123456789', user_type='patient'),
+            national_code='1234567890',
+            first_name='احمد',
+            last_name='احمدی',
+            birth_date=date(1990, 1, 1),
+            gender='male',
+            emergency_contact_name='مریم احمدی',
+            emergency_contact_phone='09123456788',
+            emergency_contact_relation='همسر',
+            address='تهران، خیابان آزادی',
+            city='تهران',
+            province='تهران',
+            postal_code='1234567890',
+        )
+        self.context = {'user': self.doctor}
+        self.orchestrator = PatientOrchestrator()
+
+    def _records(self, count):
+        return [
+            {
+                'patient': str(self.patient_profile.id),
+                'record_type': 'allergy',
+                'title': f'سابقه {i}',
+                'description': 'حساسیت به پنی‌سیلین',
+                'severity': 'mild',
+                'start_date': date.today().isoformat(),
+                'is_ongoing': True,
+            }
+            for i in range(count)
+        ]
+
+    def _prescriptions(self, count):
+        return [
+            {
+                'patient': str(self.patient_profile.id),
+                'medication_name': 'آموکسی‌سیلین',
+                'dosage': '500 میلی‌گرم',
+                'frequency': 'روزی 3 بار',
+                'duration': '7 روز',
+                'diagnosis': 'عفونت تنفسی',
+                'start_date': date.today().isoformat(),
+                'end_date': (date.today() + timedelta(days=7)).isoformat(),
+            }
+            for _ in range(count)
+        ]
+
+    def test_bulk_mode_creates_records_per_chunk(self):
+        items = self._records(7)
+        items[4]['start_date'] = (date.today() + timedelta(days=3)).isoformat()
+        progress = []
+        processor = PatientBulkProcessor(self.orchestrator, chunk_size=3)
+
+        result = async_to_sync(processor.run)(
+            'medical_records', items, self.context, on_progress=progress.append
+        )
+
+        self.assertEqual((result['successful'], result['failed'], result['chunks']), (6, 0, 3))
+        self.assertEqual([r['index'] for r in result['results']], list(range(7)))
+        self.assertFalse(result['results'][4]['result']['success'])
+        self.assertIn('start_date', result['results'][4]['result']['errors'])
+        self.assertEqual([p['processed'] for p in progress], [3, 6, 7])
+        self.assertEqual(progress[-1]['status'], 'completed')
+        self.assertEqual(
+            MedicalRecord.objects.filter(patient=self.patient_profile, created_by=self.doctor).count(),
+            6
+        )
+
+    def test_prescription_numbers_continue_existing_sequence(self):
+        existing = PrescriptionHistory.objects.create(
+            patient=self.patient_profile,
+            prescribed_by=self.doctor,
+            **{k: v for k, v in self._prescriptions(1)[0].items() if k != 'patient'}
+        )
+        last_number = int(existing.prescription_number.split('-')[-1])
+
+        result = async_to_sync(self.orchestrator._handle_bulk_processing)(
+            {
+                'operation_type': 'prescriptions',
+                'items': self._prescriptions(5),
+                'execution_mode': 'bulk',
+                'chunk_size': 2,
+            },
+            self.context
+        )
+
+        numbers = [r['result']['prescription_number'] for r in result['results']]
+        self.assertEqual(
+            [int(number.split('-')[-1]) for number in numbers],
+            list(range(last_number + 1, last_number + 6))
+        )
+        self.assertEqual(PrescriptionHistory.objects.filter(prescribed_by=self.doctor).count(), 6)
+
+    def test_resume_from_checkpoint(self):
+        items = self._records(5)
+        processor = PatientBulkProcessor(self.orchestrator, chunk_size=2)
+
+        async def interrupted():
+            chunks = processor.stream('medical_records', items, self.context, job_id='job-1')
+            await chunks.__anext__()
+            await chunks.aclose()
+
+        async_to_sync(interrupted)()
+        # checkpoint در دیتابیس است و با پاک شدن cache از دست نمی‌رود
+        cache.clear()
+        self.assertEqual(processor.get_checkpoint('job-1')['next_index'], 2)
+
+        result = async_to_sync(processor.run)('medical_records', items, self.context, job_id='job-1')
+
+        self.assertEqual((result['resumed_from'], result['successful']), (2, 5))
+        self.assertEqual([r['index'] for r in result['results']], [2, 3, 4])
+        self.assertEqual(MedicalRecord.objects.count(), 5)
+
+        # اجرای دوباره کار تکمیل شده چیزی ثبت نمی‌کند
+        result = async_to_sync(processor.run)('medical_records', items, self.context, job_id='job-1')
+        self.assertEqual((result['results'], result['successful']), ([], 5))
+        self.assertEqual(MedicalRecord.objects.count(), 5)
+
+    def test_checkpoint_is_saved_with_chunk(self):
+        items = self._records(5)
+        processor = PatientBulkProcessor(self.orchestrator, chunk_size=2)
+        save_checkpoint = PatientBulkProcessor._save_checkpoint
+        calls = []
+
+        def fail_second_chunk(*args):
+            calls.append(args)
+            if len(calls) == 2:
+                raise RuntimeError('checkpoint write failed')
+            return save_checkpoint(*args)
+
+        with patch.object(PatientBulkProcessor, '_save_checkpoint', side_effect=fail_second_chunk):
+            result = async_to_sync(processor.run)('medical_records', items, self.context, job_id='job-2')
+
+        # سوابق دسته دوم همراه checkpoint آن rollback می‌شوند
+        self.assertEqual([e['index'] for e in result['errors']], [2, 3])
+        self.assertEqual(MedicalRecord.objects.count(), 3)
+        job = PatientBulkJob.objects.get(job_id='job-2')
+        self.assertEqual(
+            (job.next_index, job.chunks, job.successful, job.failed, job.status),
+            (5, 3, 3, 2, 'completed')
+        )
+
+    def test_chunk_write_uses_constant_queries(self):
+        processor = PatientBulkProcessor(self.orchestrator, chunk_size=50)
+
+        # checkpoint (۲ خواندن)، بیماران، کاربران، savepoint (۲)، bulk_create
+        # و ثبت checkpoint (UPDATE و INSERT اولین دسته)
+        with self.assertNumQueries(9):
+            result = async_to_sync(processor.run)('medical_records', self._records(50), self.context)
+
+        self.assertEqual(result['successful'], 50)
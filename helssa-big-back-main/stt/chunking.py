@@ -0,0 +1,463 @@
+"""
+تبدیل گفتار به متن قطعه‌ای (Chunked Transcription)
+
+فایل‌های صوتی طولانی با یک تقسیم‌کننده مبتنی بر انرژی (VAD ساده) به
+پنجره‌های هم‌پوشان تقسیم می‌شوند، پنجره‌ها به صورت همزمان به سرور
+استنتاج مشترک (``stt.inference``) فرستاده می‌شوند تا با همان مدل‌های گرم
+سرور تبدیل شوند و نتایج به ترتیب زمانی با حذف کلمات تکراری ناحیه
+هم‌پوشانی به هم دوخته می‌شوند.
+
+این ماژول به Django وابسته نیست.
+"""
+import atexit
+import logging
+import re
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from .inference import InferenceClient, InferenceUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AudioWindow:
+    """
+    یک پنجره صوتی برای تبدیل مستقل
+
+    ``core_start``/``core_end`` بازه‌ای است که این پنجره مالک آن است و
+    ``start``/``end`` همان بازه به اضافه هم‌پوشانی دو طرف است.
+    """
+
+    index: int
+    start: float
+    end: float
+    core_start: float
+    core_end: float
+    has_speech: bool = True
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class ChunkingConfig:
+    """پیکربندی تقسیم صوت و تعداد پنجره‌های همزمان"""
+
+    window_seconds: float = 30.0
+    min_window_seconds: float = 15.0
+    max_window_seconds: float = 45.0
+    overlap_seconds: float = 1.0
+    frame_ms: int = 30
+    energy_ratio: float = 2.5
+    min_energy: float = 0.005
+    min_speech_ratio: float = 0.02
+    workers: int = 2
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ChunkingConfig':
+        """ساخت از دیکشنری تنظیمات (کلیدهای بزرگ یا کوچک)"""
+        known = cls.__dataclass_fields__
+        values = {}
+        for key, value in (data or {}).items():
+            name = key.lower()
+            if name in known:
+                values[name] = value
+        return cls(**values)
+
+
+class EnergyVADSplitter:
+    """
+    تقسیم صوت به پنجره‌های هم‌پوشان در نقاط سکوت
+
+    انرژی RMS هر فریم محاسبه و کف نویز از صدک دهم و سطح گفتار از صدک
+    نودم انرژی‌ها تخمین زده می‌شود. برای هر پنجره نزدیک‌ترین فریم سکوت به طول هدف به عنوان نقطه
+    برش انتخاب می‌شود؛ اگر در بازه مجاز سکوتی نباشد کم‌انرژی‌ترین فریم
+    انتخاب می‌شود تا کلمه‌ای از وسط بریده نشود.
+    """
+
+    def __init__(self, config: Optional[ChunkingConfig] = None, sample_rate: int = 16000):
+        self.config = config or ChunkingConfig()
+        self.sample_rate = sample_rate
+
+    def frame_energies(self, audio: np.ndarray) -> np.ndarray:
+        """انرژی RMS فریم‌های متوالی"""
+        frame_length = max(1, int(self.sample_rate * self.config.frame_ms / 1000))
+        frame_count = len(audio) // frame_length
+        if frame_count == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        frames = audio[:frame_count * frame_length].reshape(frame_count, frame_length)
+        return np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+
+    def speech_mask(self, energies: np.ndarray) -> np.ndarray:
+        """فریم‌های دارای گفتار"""
+        if len(energies) == 0:
+            return np.zeros(0, dtype=bool)
+        noise_floor = float(np.percentile(energies, 10))
+        speech_level = float(np.percentile(energies, 90))
+        # در صوت بدون سکوت کف نویز و سطح گفتار یکی است؛ آستانه از نصف سطح گفتار بیشتر نمی‌شود
+        threshold = max(
+            self.config.min_energy,
+            min(noise_floor * self.config.energy_ratio, speech_level * 0.5)
+        )
+        return energies > threshold
+
+    def split(self, audio: np.ndarray) -> List[AudioWindow]:
+        """
+        تقسیم صوت به پنجره‌ها
+
+        Args:
+            audio: نمونه‌های float32 مونو با نرخ ``sample_rate``
+
+        Returns:
+            list: پنجره‌ها به ترتیب زمانی
+        """
+        total = len(audio) / self.sample_rate
+        if total == 0:
+            return []
+
+        energies = self.frame_energies(audio)
+        speech = self.speech_mask(energies)
+        frame_seconds = self.config.frame_ms / 1000
+
+        cuts = [0.0]
+        while total - cuts[-1] > self.config.max_window_seconds:
+            cuts.append(self._next_cut(cuts[-1], energies, speech, frame_seconds))
+        cuts.append(total)
+
+        windows = []
+        overlap = self.config.overlap_seconds
+        for index, (core_start, core_end) in enumerate(zip(cuts, cuts[1:])):
+            first = int(core_start / frame_seconds)
+            last = max(first + 1, int(core_end / frame_seconds))
+            frames = speech[first:last]
+            speech_ratio = float(frames.mean()) if len(frames) else 0.0
+
+            windows.append(AudioWindow(
+                index=index,
+                start=max(0.0, core_start - overlap),
+                end=min(total, core_end + overlap),
+                core_start=core_start,
+                core_end=core_end,
+                has_speech=speech_ratio >= self.config.min_speech_ratio,
+            ))
+
+        return windows
+
+    def _next_cut(self, position: float, energies: np.ndarray,
+                  speech: np.ndarray, frame_seconds: float) -> float:
+        """انتخاب نقطه برش بعدی در بازه [min_window, max_window]"""
+        low = int((position + self.config.min_window_seconds) / frame_seconds)
+        high = min(len(energies), int((position + self.config.max_window_seconds) / frame_seconds))
+        target = int((position + self.config.window_seconds) / frame_seconds)
+
+        if low >= high:
+            return position + self.config.max_window_seconds
+
+        candidates = np.arange(low, high)
+        quiet = candidates[~speech[low:high]]
+        if not len(quiet):
+            # بدون سکوت: کم‌انرژی‌ترین فریم‌ها (با کمی تلورانس) نامزد برش هستند
+            window = energies[low:high]
+            quiet = candidates[window <= window.min() * 1.1 + 1e-6]
+        best = int(quiet[np.argmin(np.abs(quiet - target))])
+
+        return (best + 0.5) * frame_seconds
+
+
+def _normalize_word(word: str) -> str:
+    """نرمال‌سازی کلمه برای مقایسه در ناحیه هم‌پوشانی"""
+    return re.sub(r'[^\w]', '', word.strip().lower())
+
+
+class TranscriptStitcher:
+    """
+    دوختن نتایج پنجره‌ها به ترتیب زمانی
+
+    از هر پنجره فقط کلماتی نگه داشته می‌شوند که نقطه میانی آن‌ها در بازه
+    مالکیت پنجره است. سپس اگر ابتدای پنجره جدید با انتهای متن قبلی
+    (در محدوده هم‌پوشانی) یکسان باشد آن کلمات حذف می‌شوند و زمان‌ها طوری
+    اصلاح می‌شوند که هرگز به عقب برنگردند.
+    """
+
+    MAX_MATCH_WORDS = 6
+
+    def __init__(self, overlap_seconds: float = 1.0):
+        self.overlap_seconds = overlap_seconds
+        self.words: List[Dict[str, Any]] = []
+        self.segments: List[Dict[str, Any]] = []
+        self.last_end = 0.0
+
+    def add(self, window: AudioWindow, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        افزودن نتیجه یک پنجره (با زمان‌های مطلق)
+
+        Args:
+            window: پنجره
+            result: خروجی ``transcribe_fn`` با زمان‌های مطلق
+
+        Returns:
+            dict: بخش‌ها و کلمات جدید اضافه شده
+        """
+        new_segments = []
+        new_words = []
+        deduplicated = False
+
+        for segment in result.get('segments', []):
+            words = segment.get('words')
+            if words:
+                kept = [w for w in words if self._owns(window, w['start'], w['end'])]
+                if not deduplicated:
+                    kept = self._drop_repeated_prefix(kept, window)
+                if not kept:
+                    continue
+                deduplicated = True
+                kept = [self._clamp(w) for w in kept]
+                segment = dict(segment)
+                segment['words'] = kept
+                segment['start'] = kept[0]['start']
+                segment['end'] = kept[-1]['end']
+                segment['text'] = ''.join(w['word'] for w in kept).strip()
+                new_words.extend(kept)
+                self.words.extend(kept)
+            else:
+                if not self._owns(window, segment['start'], segment['end']):
+                    continue
+                segment = self._clamp(dict(segment))
+
+            new_segments.append(segment)
+            self.segments.append(segment)
+
+        return {'segments': new_segments, 'words': new_words}
+
+    @property
+    def text(self) -> str:
+        return ' '.join(segment['text'].strip() for segment in self.segments).strip()
+
+    def _owns(self, window: AudioWindow, start: float, end: float) -> bool:
+        midpoint = (start + end) / 2
+        return window.core_start <= midpoint < window.core_end or (
+            window.core_end == window.end and midpoint >= window.core_end
+        )
+
+    def _drop_repeated_prefix(self, words: List[Dict[str, Any]],
+                              window: AudioWindow) -> List[Dict[str, Any]]:
+        """حذف کلمات ابتدایی که در انتهای متن قبلی هم آمده‌اند"""
+        if not self.words or not words:
+            return words
+
+        boundary = window.core_start + self.overlap_seconds
+        head = [w for w in words[:self.MAX_MATCH_WORDS] if w['start'] < boundary]
+        tail = [
+            w for w in self.words[-self.MAX_MATCH_WORDS:]
+            if w['end'] > window.core_start - self.overlap_seconds
+        ]
+
+        for size in range(min(len(head), len(tail)), 0, -1):
+            tail_text = [_normalize_word(w['word']) for w in tail[-size:]]
+            head_text = [_normalize_word(w['word']) for w in head[:size]]
+            if tail_text == head_text:
+                return words[size:]
+
+        return words
+
+    def _clamp(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """اصلاح زمان‌ها برای یکنوا بودن"""
+        item = dict(item)
+        item['start'] = round(max(item['start'], self.last_end), 3)
+        item['end'] = round(max(item['end'], item['start']), 3)
+        self.last_end = item['end']
+        return item
+
+
+def shift_result(result: Dict[str, Any], offset: float) -> Dict[str, Any]:
+    """انتقال زمان‌های نتیجه Whisper به زمان مطلق فایل"""
+    segments = []
+    for segment in result.get('segments', []):
+        shifted = {
+            'start': segment['start'] + offset,
+            'end': segment['end'] + offset,
+            'text': segment.get('text', ''),
+            'avg_logprob': segment.get('avg_logprob', 0),
+            'no_speech_prob': segment.get('no_speech_prob', 0),
+        }
+        if segment.get('words'):
+            shifted['words'] = [
+                {
+                    'word': word['word'],
+                    'start': word['start'] + offset,
+                    'end': word['end'] + offset,
+                    'probability': word.get('probability', 1.0),
+                }
+                for word in segment['words']
+            ]
+        segments.append(shifted)
+
+    return {'language': result.get('language'), 'segments': segments}
+
+
+class InferenceWindowTranscriber:
+    """
+    تبدیل یک پنجره در سرور استنتاج مشترک
+
+    نمونه‌های پنجره به مدل گرم سرور فرستاده می‌شوند و پنجره‌های کوتاه‌تر از
+    ``batch_seconds`` اجازه تبدیل دسته‌ای (با حفظ timestamp کلمات) دارند.
+    اگر سرور غیرفعال یا در دسترس نباشد ``fallback`` (مدل محلی) استفاده می‌شود.
+    """
+
+    def __init__(self, client: Optional[InferenceClient], model_size: str,
+                 fallback: Optional[Callable[[np.ndarray, Dict[str, Any]], Dict[str, Any]]] = None,
+                 batch_seconds: float = 0.0):
+        self.client = client
+        self.model_size = model_size
+        self.fallback = fallback
+        self.batch_seconds = batch_seconds
+
+    def __call__(self, window: AudioWindow, audio: np.ndarray,
+                 options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        تبدیل پنجره (امضای ``transcribe_fn`` در ChunkedTranscriber)
+
+        Returns:
+            dict: بخش‌ها و کلمات با زمان مطلق در فایل اصلی
+        """
+        result = None
+        if self.client is not None:
+            try:
+                result = self.client.transcribe(
+                    self.model_size,
+                    options,
+                    audio=audio,
+                    batchable=0 < window.duration <= self.batch_seconds,
+                )
+            except InferenceUnavailable as e:
+                if self.fallback is None:
+                    raise
+                logger.warning(f"Inference server unavailable for window {window.index}: {str(e)}")
+
+        if result is None:
+            result = self.fallback(audio, options)
+        return shift_result(result, window.start)
+
+
+_request_pools: Dict[int, ThreadPoolExecutor] = {}
+_request_pools_lock = threading.Lock()
+
+
+def get_request_pool(workers: int) -> ThreadPoolExecutor:
+    """
+    دریافت thread pool مشترک ارسال پنجره‌ها
+
+    thread ها فقط منتظر پاسخ سرور استنتاج می‌مانند؛ مدل در سرور یک بار
+    بارگذاری شده است و در این پردازه نسخه‌ای از آن ساخته نمی‌شود.
+    """
+    workers = max(1, workers)
+    with _request_pools_lock:
+        pool = _request_pools.get(workers)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='stt-chunk')
+            _request_pools[workers] = pool
+    return pool
+
+
+def shutdown_request_pools():
+    """بستن همه thread pool های ارسال پنجره‌ها"""
+    with _request_pools_lock:
+        for pool in _request_pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _request_pools.clear()
+
+
+atexit.register(shutdown_request_pools)
+
+
+class ChunkedTranscriber:
+    """
+    تبدیل موازی پنجره‌ها و بازگرداندن جریانی نتایج
+
+    پنجره‌ها همزمان به executor سپرده می‌شوند، اما نتایج همیشه به ترتیب
+    زمانی (و به محض آماده شدن پنجره بعدی) yield می‌شوند.
+    """
+
+    def __init__(self, executor: Executor, config: Optional[ChunkingConfig],
+                 sample_rate: int, transcribe_fn: Callable[..., Dict[str, Any]]):
+        self.executor = executor
+        self.config = config or ChunkingConfig()
+        self.sample_rate = sample_rate
+        self.transcribe_fn = transcribe_fn
+        self.splitter = EnergyVADSplitter(self.config, sample_rate)
+
+    def iter_transcribe(self, audio: np.ndarray,
+                        options: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        تبدیل قطعه‌ای با خروجی جریانی
+
+        Args:
+            audio: نمونه‌های float32 مونو
+            options: تنظیمات ``model.transcribe``
+
+        Yields:
+            dict: نتیجه جزئی هر پنجره شامل متن تجمعی و درصد پیشرفت
+        """
+        windows = self.splitter.split(audio)
+        stitcher = TranscriptStitcher(self.config.overlap_seconds)
+        futures: Dict[int, Future] = {}
+
+        try:
+            for window in windows:
+                if window.has_speech:
+                    samples = audio[int(window.start * self.sample_rate):int(window.end * self.sample_rate)]
+                    futures[window.index] = self.executor.submit(
+                        self.transcribe_fn, window, samples, options
+                    )
+
+            language = None
+            for window in windows:
+                future = futures.get(window.index)
+                result = future.result() if future is not None else {'segments': []}
+                language = language or result.get('language')
+                added = stitcher.add(window, result)
+
+                yield {
+                    'index': window.index,
+                    'total': len(windows),
+                    'start': window.core_start,
+                    'end': window.core_end,
+                    'language': language,
+                    'segments': added['segments'],
+                    'words': added['words'],
+                    'text': stitcher.text,
+                    'progress': round((window.index + 1) / len(windows) * 100, 1),
+                }
+        finally:
+            for future in futures.values():
+                future.cancel()
+
+    def transcribe(self, audio: np.ndarray, options: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        تبدیل کامل با خروجی هم‌شکل ``model.transcribe``
+
+        Returns:
+            dict: text، segments، words، language و تعداد پنجره‌ها
+        """
+        segments: List[Dict[str, Any]] = []
+        words: List[Dict[str, Any]] = []
+        partial: Dict[str, Any] = {'text': '', 'language': None, 'total': 0}
+
+        for partial in self.iter_transcribe(audio, options):
+            segments.extend(partial['segments'])
+            words.extend(partial['words'])
+
+        return {
+            'text': partial['text'],
+            'language': partial['language'] or options.get('language') or 'unknown',
+            'segments': segments,
+            'words': words,
+            'windows': partial['total'],
+        }
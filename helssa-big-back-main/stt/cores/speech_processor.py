@@ -4,7 +4,8 @@
 import logging
 import os
 import tempfile
-from typing import Dict, Tuple, Optional, Any
+import threading
+from typing import Dict, Tuple, Optional, Any, Iterator
 import whisper
 import numpy as np
 import ffmpeg
@@ -13,6 +14,10 @@ import json
 from pathlib import Path
 import torch
 
+from ..chunking import ChunkedTranscriber, ChunkingConfig, InferenceWindowTranscriber, get_request_pool
+from ..inference import InferenceUnavailable, get_inference_client
+from ..settings import CHUNKING_SETTINGS, INFERENCE_SETTINGS
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,20 +32,24 @@ class SpeechProcessorCore:
     - تحلیل کیفیت صوت
     """
     
+    # پیکربندی Whisper
+    MODEL_CONFIGS = {
+        'tiny': {'name': 'tiny', 'vram': 1, 'relative_speed': 39},
+        'base': {'name': 'base', 'vram': 1, 'relative_speed': 16},
+        'small': {'name': 'small', 'vram': 2, 'relative_speed': 6},
+        'medium': {'name': 'medium', 'vram': 5, 'relative_speed': 2},
+        'large': {'name': 'large-v3', 'vram': 10, 'relative_speed': 1},
+    }
+    
     def __init__(self):
         self.logger = logger
         self.models = {}
+        # مدل Whisper از چند thread همزمان قابل استفاده نیست
+        self._model_lock = threading.Lock()
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.logger.info(f"Using device: {self.device}")
         
-        # پیکربندی Whisper
-        self.model_configs = {
-            'tiny': {'name': 'tiny', 'vram': 1, 'relative_speed': 39},
-            'base': {'name': 'base', 'vram': 1, 'relative_speed': 16},
-            'small': {'name': 'small', 'vram': 2, 'relative_speed': 6},
-            'medium': {'name': 'medium', 'vram': 5, 'relative_speed': 2},
-            'large': {'name': 'large-v3', 'vram': 10, 'relative_speed': 1},
-        }
+        self.model_configs = self.MODEL_CONFIGS
         
         # تنظیمات پیش‌فرض
         self.default_model = 'base'
@@ -77,7 +86,8 @@ class SpeechProcessorCore:
         return self.models[model_size]
     
     def process_audio_file(self, audio_file_path: str, language: str = 'fa',
-                          model_size: str = 'base') -> Dict[str, Any]:
+                          model_size: str = 'base',
+                          chunked: Optional[bool] = None) -> Dict[str, Any]:
         """
         پردازش فایل صوتی و تبدیل به متن
         
@@ -85,6 +95,8 @@ class SpeechProcessorCore:
             audio_file_path: مسیر فایل صوتی
             language: زبان گفتار
             model_size: اندازه مدل
+            chunked: استفاده از حالت قطعه‌ای موازی؛ None یعنی انتخاب خودکار
+                بر اساس مدت فایل (CHUNKING_SETTINGS['MIN_DURATION'])
             
         Returns:
             dict: نتیجه تبدیل شامل متن و اطلاعات اضافی
@@ -93,32 +105,39 @@ class SpeechProcessorCore:
             # تحلیل کیفیت صوت
             audio_quality = self._analyze_audio_quality(audio_file_path)
             
+            if chunked is None:
+                chunked = self._should_chunk(audio_quality)
+            
+            if chunked:
+                result = None
+                for partial in self.iter_transcription(
+                    audio_file_path, language, model_size, audio_quality
+                ):
+                    if partial.get('final'):
+                        result = partial['result']
+                return result
+            
             # پیش‌پردازش صوت
             processed_audio_path = self._preprocess_audio(audio_file_path)
             
-            # بارگذاری مدل
-            model = self.load_model(model_size)
-            
             # تنظیمات تبدیل
-            options = {
-                'language': language if language != 'auto' else None,
-                'task': 'transcribe',
-                'temperature': 0.0,  # برای نتایج قطعی‌تر
-                'compression_ratio_threshold': 2.4,
-                'logprob_threshold': -1.0,
-                'no_speech_threshold': 0.6,
-                'condition_on_previous_text': True,
-                'initial_prompt': self._get_initial_prompt(language),
-                'word_timestamps': True,
-            }
+            options = self._get_transcribe_options(language)
             
-            # تبدیل گفتار به متن
-            self.logger.info(f"Starting transcription with model {model_size}")
-            result = model.transcribe(processed_audio_path, **options)
-            
-            # پاکسازی فایل موقت
-            if processed_audio_path != audio_file_path:
-                os.remove(processed_audio_path)
+            try:
+                # تبدیل گفتار به متن (ترجیحاً در سرور استنتاج با مدل گرم)
+                result = self._transcribe_with_server(
+                    processed_audio_path, model_size, options,
+                    audio_quality.get('duration', 0)
+                )
+                if result is None:
+                    # بارگذاری مدل
+                    model = self.load_model(model_size)
+                    self.logger.info(f"Starting transcription with model {model_size}")
+                    result = model.transcribe(processed_audio_path, **options)
+            finally:
+                # پاکسازی فایل موقت
+                if processed_audio_path != audio_file_path:
+                    os.remove(processed_audio_path)
             
             # پردازش نتیجه
             processed_result = self._process_transcription_result(result, audio_quality)
@@ -129,6 +148,134 @@ class SpeechProcessorCore:
             self.logger.error(f"Error in process_audio_file: {str(e)}")
             raise
     
+    def iter_transcription(self, audio_file_path: str, language: str = 'fa',
+                           model_size: str = 'base',
+                           audio_quality: Optional[Dict[str, Any]] = None
+                           ) -> Iterator[Dict[str, Any]]:
+        """
+        تبدیل قطعه‌ای موازی با بازگرداندن نتایج جزئی
+        
+        صوت در نقاط سکوت به پنجره‌های هم‌پوشان تقسیم و پنجره‌ها همزمان
+        در سرور استنتاج مشترک (یا در صورت در دسترس نبودن آن با مدل محلی
+        همین پردازه) تبدیل می‌شوند. هر
+        پنجره به محض آماده شدن (به ترتیب زمانی) yield می‌شود و آخرین
+        خروجی شامل ``final=True`` و نتیجه کامل هم‌شکل process_audio_file است.
+        
+        Args:
+            audio_file_path: مسیر فایل صوتی
+            language: زبان گفتار
+            model_size: اندازه مدل
+            audio_quality: نتیجه تحلیل کیفیت (در صورت محاسبه قبلی)
+            
+        Yields:
+            dict: نتیجه جزئی (index، total، text، segments، progress)
+        """
+        if audio_quality is None:
+            audio_quality = self._analyze_audio_quality(audio_file_path)
+        
+        processed_audio_path = self._preprocess_audio(audio_file_path)
+        try:
+            audio, _ = self._load_audio(processed_audio_path)
+        finally:
+            if processed_audio_path != audio_file_path:
+                os.remove(processed_audio_path)
+        
+        config = ChunkingConfig.from_dict(CHUNKING_SETTINGS)
+        client = get_inference_client()
+        transcriber = ChunkedTranscriber(
+            get_request_pool(config.workers),
+            config,
+            self.sample_rate,
+            InferenceWindowTranscriber(
+                client,
+                model_size,
+                fallback=lambda samples, options: self._transcribe_locally(model_size, samples, options),
+                batch_seconds=INFERENCE_SETTINGS['SHORT_CLIP_SECONDS'],
+            ),
+        )
+        
+        self.logger.info(
+            f"Starting chunked transcription with model {model_size} "
+            f"({len(audio) / self.sample_rate:.0f}s, {config.workers} concurrent windows, "
+            f"{'inference server' if client is not None else 'local model'})"
+        )
+        
+        segments = []
+        words = []
+        partial = {'text': '', 'language': None}
+        for partial in transcriber.iter_transcribe(audio, self._get_transcribe_options(language)):
+            segments.extend(partial['segments'])
+            words.extend(partial['words'])
+            yield partial
+        
+        result = {
+            'text': partial['text'],
+            'language': partial['language'] or language,
+            'segments': segments,
+            'words': words,
+        }
+        yield {
+            'final': True,
+            'result': self._process_transcription_result(result, audio_quality),
+        }
+    
+    def _transcribe_with_server(self, audio_path: str, model_size: str,
+                                options: Dict[str, Any],
+                                duration: float) -> Optional[Dict[str, Any]]:
+        """
+        ارسال وظیفه به سرور استنتاج مشترک
+        
+        کلیپ‌های کوتاه اجازه تبدیل دسته‌ای دارند (timestamp کلمات حفظ می‌شود).
+        
+        Returns:
+            dict یا None: نتیجه Whisper یا None اگر سرور در دسترس نباشد
+        """
+        client = get_inference_client()
+        if client is None:
+            return None
+        
+        try:
+            result = client.transcribe(
+                model_size,
+                options,
+                audio_path=audio_path,
+                batchable=0 < duration <= INFERENCE_SETTINGS['SHORT_CLIP_SECONDS'],
+            )
+            self.logger.info(
+                f"Transcribed on inference server with model {model_size}: "
+                f"{result.get('inference_timing', {})}"
+            )
+            return result
+        except InferenceUnavailable as e:
+            self.logger.warning(f"Inference server unavailable, using local model: {str(e)}")
+            return None
+    
+    def _transcribe_locally(self, model_size: str, audio: np.ndarray,
+                            options: Dict[str, Any]) -> Dict[str, Any]:
+        """تبدیل یک پنجره با مدل محلی (وقتی سرور استنتاج در دسترس نیست)"""
+        with self._model_lock:
+            return self.load_model(model_size).transcribe(audio, **options)
+    
+    def _should_chunk(self, audio_quality: Dict[str, Any]) -> bool:
+        """آیا فایل به اندازه کافی طولانی است که قطعه‌ای پردازش شود"""
+        if not CHUNKING_SETTINGS.get('ENABLED', True):
+            return False
+        return audio_quality.get('duration', 0) >= CHUNKING_SETTINGS.get('MIN_DURATION', 120)
+    
+    def _get_transcribe_options(self, language: str) -> Dict[str, Any]:
+        """تنظیمات model.transcribe"""
+        return {
+            'language': language if language != 'auto' else None,
+            'task': 'transcribe',
+            'temperature': 0.0,  # برای نتایج قطعی‌تر
+            'compression_ratio_threshold': 2.4,
+            'logprob_threshold': -1.0,
+            'no_speech_threshold': 0.6,
+            'condition_on_previous_text': True,
+            'initial_prompt': self._get_initial_prompt(language),
+            'word_timestamps': True,
+        }
+    
     def _analyze_audio_quality(self, audio_path: str) -> Dict[str, Any]:
         """
         تحلیل کیفیت فایل صوتی
@@ -452,4 +599,23 @@ class SpeechProcessorCore:
         if model_size not in self.models:
             estimated_time += 5  # 5 ثانیه برای بارگذاری
         
-        return estimated_time
\ No newline at end of file
+        return estimated_time
+
+
+_shared_core: Optional[SpeechProcessorCore] = None
+_shared_core_lock = threading.Lock()
+
+
+def get_speech_processor() -> SpeechProcessorCore:
+    """
+    هسته پردازش گفتار مشترک پردازه
+
+    مدل‌های Whisper بارگذاری شده در ``models`` بین فراخوانی‌ها حفظ می‌شوند و
+    هر قطعه صوتی مدل را دوباره بارگذاری نمی‌کند.
+    """
+    global _shared_core
+    if _shared_core is None:
+        with _shared_core_lock:
+            if _shared_core is None:
+                _shared_core = SpeechProcessorCore()
+    return _shared_core
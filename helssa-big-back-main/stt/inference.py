@@ -0,0 +1,650 @@
+"""
+سرور استنتاج STT با مدل‌های گرم (Warm Model Pool)
+
+یک پردازه بلندمدت مدل‌های Whisper پیکربندی شده را هنگام راه‌اندازی یک
+بار بارگذاری می‌کند و وظایف را از طریق سوکت محلی
+(``multiprocessing.connection``) می‌پذیرد. برای هر اندازه مدل یک صف و
+یک thread اجرا وجود دارد؛ کلیپ‌های کوتاه در یک بازه زمانی کوتاه جمع و با
+یک فراخوانی ``whisper.decode`` به صورت دسته‌ای تبدیل می‌شوند.
+
+عمق صف، حافظه مدل‌ها و تأخیر هر وظیفه از طریق درخواست ``stats`` در
+دسترس است. این ماژول به Django وابسته نیست؛ فقط ``get_inference_client``
+تنظیمات را از Django می‌خواند.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from multiprocessing.connection import AuthenticationError, Client, Listener
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+Address = Union[str, Tuple[str, int]]
+
+
+class InferenceUnavailable(Exception):
+    """سرور استنتاج در دسترس نیست (فراخواننده باید به مدل محلی برگردد)"""
+
+
+class InferenceError(Exception):
+    """خطای اجرای وظیفه در سرور استنتاج"""
+
+
+def parse_address(address: str) -> Address:
+    """تبدیل آدرس تنظیمات (مسیر سوکت یا host:port) به آدرس Listener"""
+    if ':' in address and not address.startswith('/'):
+        host, port = address.rsplit(':', 1)
+        return host, int(port)
+    return address
+
+
+class WhisperBackend:
+    """عملیات Whisper مورد استفاده سرور (قابل جایگزینی در تست‌ها)"""
+
+    def load_model(self, model_name: str, device: str):
+        import whisper
+        return whisper.load_model(model_name, device=device)
+
+    def load_audio(self, path: str):
+        import whisper
+        return whisper.load_audio(path)
+
+    def model_bytes(self, model) -> int:
+        return sum(p.numel() * p.element_size() for p in model.parameters())
+
+    def transcribe(self, model, audio, options: Dict[str, Any]) -> Dict[str, Any]:
+        return model.transcribe(audio, **options)
+
+    def decode_batch(self, model, audios: List[Any], options: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        تبدیل دسته‌ای کلیپ‌های حداکثر ۳۰ ثانیه‌ای در یک forward
+
+        با ``word_timestamps`` زمان کلمات هر کلیپ مانند ``model.transcribe``
+        با هم‌ترازی cross-attention روی همان mel محاسبه می‌شود.
+        """
+        import torch
+        import whisper
+
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(audio), n_mels=model.dims.n_mels
+            )
+            for audio in audios
+        ]).to(model.device)
+
+        decode_options = whisper.DecodingOptions(
+            task='transcribe',
+            language=options.get('language'),
+            temperature=0.0,
+            prompt=options.get('initial_prompt') or None,
+            without_timestamps=True,
+            fp16=model.device.type == 'cuda',
+        )
+        results = whisper.decode(model, mels, decode_options)
+
+        outputs = []
+        for audio, mel, result in zip(audios, mels, results):
+            output = {
+                'text': result.text,
+                'language': result.language,
+                'avg_logprob': result.avg_logprob,
+                'no_speech_prob': result.no_speech_prob,
+            }
+            if options.get('word_timestamps'):
+                output['words'] = self._word_timestamps(model, audio, mel, result)
+            outputs.append(output)
+        return outputs
+
+    def _word_timestamps(self, model, audio, mel, result) -> List[Dict[str, Any]]:
+        """زمان کلمات یک کلیپ دسته‌ای"""
+        from whisper.audio import HOP_LENGTH, N_FRAMES
+        from whisper.timing import add_word_timestamps
+        from whisper.tokenizer import get_tokenizer
+
+        tokenizer = get_tokenizer(
+            model.is_multilingual,
+            num_languages=model.num_languages,
+            language=result.language,
+            task='transcribe',
+        )
+        segment = {
+            'seek': 0,
+            'start': 0.0,
+            'end': len(audio) / SAMPLE_RATE,
+            'text': result.text,
+            'tokens': result.tokens,
+        }
+        add_word_timestamps(
+            segments=[segment],
+            model=model,
+            tokenizer=tokenizer,
+            mel=mel,
+            num_frames=min(len(audio) // HOP_LENGTH, N_FRAMES),
+            last_speech_timestamp=0.0,
+        )
+        return [
+            {
+                'word': word['word'],
+                'start': word['start'],
+                'end': word['end'],
+                'probability': word['probability'],
+            }
+            for word in segment.get('words', [])
+        ]
+
+
+@dataclass
+class InferenceJob:
+    """یک وظیفه تبدیل در صف سرور"""
+
+    model_size: str
+    audio: Any
+    options: Dict[str, Any]
+    batchable: bool = False
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    submitted_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    batch_size: int = 1
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def duration(self) -> float:
+        return len(self.audio) / SAMPLE_RATE
+
+    def timing(self) -> Dict[str, Any]:
+        return {
+            'queue_ms': round(((self.started_at or self.submitted_at) - self.submitted_at) * 1000, 1),
+            'inference_ms': round(((self.finished_at or 0) - (self.started_at or 0)) * 1000, 1),
+            'total_ms': round(((self.finished_at or self.submitted_at) - self.submitted_at) * 1000, 1),
+            'batch_size': self.batch_size,
+        }
+
+
+class ModelWorker:
+    """
+    صف و thread اجرای یک مدل
+
+    مدل Whisper در حین اجرا hook های kv-cache خود را نصب می‌کند و از چند
+    thread همزمان قابل استفاده نیست؛ بنابراین هر مدل دقیقاً یک thread اجرا
+    دارد و موازی‌سازی بین مدل‌ها و در داخل torch انجام می‌شود.
+    """
+
+    LATENCY_SAMPLES = 500
+
+    def __init__(self, model_size: str, model_name: str, device: str = 'cpu',
+                 backend: Optional[WhisperBackend] = None,
+                 short_clip_seconds: float = 30.0, max_batch_size: int = 8,
+                 batch_window_ms: int = 50):
+        self.model_size = model_size
+        self.model_name = model_name
+        self.device = device
+        self.backend = backend or WhisperBackend()
+        self.short_clip_seconds = short_clip_seconds
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000.0
+
+        self.model = None
+        self.model_bytes = 0
+        self.load_seconds = 0.0
+
+        self._queue: 'queue.Queue[Optional[InferenceJob]]' = queue.Queue()
+        self._deferred: List[InferenceJob] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._latencies: deque = deque(maxlen=self.LATENCY_SAMPLES)
+        self._queue_waits: deque = deque(maxlen=self.LATENCY_SAMPLES)
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.batched_jobs = 0
+
+    def start(self):
+        """بارگذاری مدل (همزمان) و شروع thread اجرا"""
+        started = time.perf_counter()
+        self.model = self.backend.load_model(self.model_name, self.device)
+        self.load_seconds = round(time.perf_counter() - started, 2)
+        try:
+            self.model_bytes = int(self.backend.model_bytes(self.model))
+        except Exception:
+            self.model_bytes = 0
+
+        logger.info(
+            f"Preloaded Whisper model {self.model_name} in {self.load_seconds}s "
+            f"({self.model_bytes / 1024 / 1024:.0f} MB)"
+        )
+
+        self._thread = threading.Thread(
+            target=self._run, name=f'stt-inference-{self.model_size}', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """توقف thread اجرا پس از وظایف موجود"""
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def submit(self, job: InferenceJob) -> InferenceJob:
+        """افزودن وظیفه به صف"""
+        self._queue.put(job)
+        return job
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() + len(self._deferred)
+
+    def stats(self) -> Dict[str, Any]:
+        """آمار این مدل"""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            waits = sorted(self._queue_waits)
+            return {
+                'model': self.model_name,
+                'device': self.device,
+                'loaded': self.model is not None,
+                'model_bytes': self.model_bytes,
+                'load_seconds': self.load_seconds,
+                'queue_depth': self.queue_depth(),
+                'in_flight': self.in_flight,
+                'processed': self.processed,
+                'failed': self.failed,
+                'batches': self.batches,
+                'avg_batch_size': round(self.batched_jobs / self.batches, 2) if self.batches else 0,
+                'latency_ms': _percentiles(latencies),
+                'queue_wait_ms': _percentiles(waits),
+            }
+
+    def _run(self):
+        while True:
+            job = self._deferred.pop(0) if self._deferred else self._queue.get()
+            if job is None:
+                break
+
+            if self._is_batchable(job):
+                self._execute_batch(self._collect_batch(job))
+            else:
+                self._execute_single(job)
+
+    def _is_batchable(self, job: InferenceJob) -> bool:
+        return job.batchable and job.duration <= self.short_clip_seconds
+
+    def _collect_batch(self, first: InferenceJob) -> List[InferenceJob]:
+        """
+        جمع کلیپ‌های کوتاه هم‌زبان تا پر شدن دسته یا پایان بازه انتظار
+
+        وظایف ناسازگار (زبان یا درخواست timestamp کلمات متفاوت) کنار گذاشته
+        و بعد از دسته اجرا می‌شوند.
+        """
+        batch = [first]
+        language = first.options.get('language')
+        word_timestamps = bool(first.options.get('word_timestamps'))
+        deadline = time.monotonic() + self.batch_window
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is None:
+                self._deferred.append(job)
+                break
+            if (
+                self._is_batchable(job)
+                and job.options.get('language') == language
+                and bool(job.options.get('word_timestamps')) == word_timestamps
+            ):
+                batch.append(job)
+            else:
+                self._deferred.append(job)
+
+        return batch
+
+    def _execute_single(self, job: InferenceJob):
+        self._begin([job])
+        try:
+            job.result = self.backend.transcribe(self.model, job.audio, job.options)
+        except Exception as e:
+            logger.error(f"Inference job {job.id} failed: {str(e)}")
+            job.error = str(e)
+        self._finish([job])
+
+    def _execute_batch(self, jobs: List[InferenceJob]):
+        if len(jobs) == 1:
+            self._execute_single(jobs[0])
+            return
+
+        self._begin(jobs)
+        try:
+            outputs = self.backend.decode_batch(self.model, [job.audio for job in jobs], jobs[0].options)
+            for job, output in zip(jobs, outputs):
+                job.batch_size = len(jobs)
+                job.result = self._batch_output_to_result(job, output)
+        except Exception as e:
+            logger.error(f"Inference batch of {len(jobs)} failed: {str(e)}")
+            for job in jobs:
+                job.error = str(e)
+
+        with self._stats_lock:
+            self.batches += 1
+            self.batched_jobs += len(jobs)
+        self._finish(jobs)
+
+    def _batch_output_to_result(self, job: InferenceJob, output: Dict[str, Any]) -> Dict[str, Any]:
+        """هم‌شکل کردن خروجی decode با خروجی model.transcribe"""
+        text = output['text'].strip()
+        no_speech = (
+            output['no_speech_prob'] > job.options.get('no_speech_threshold', 0.6)
+            and output['avg_logprob'] < job.options.get('logprob_threshold', -1.0)
+        )
+        if no_speech:
+            text = ''
+
+        segment = {
+            'start': 0.0,
+            'end': round(job.duration, 3),
+            'text': text,
+            'avg_logprob': output['avg_logprob'],
+            'no_speech_prob': output['no_speech_prob'],
+        }
+        if output.get('words'):
+            segment['words'] = output['words']
+
+        return {
+            'text': text,
+            'language': output.get('language') or job.options.get('language'),
+            'segments': [segment] if text else [],
+        }
+
+    def _begin(self, jobs: List[InferenceJob]):
+        now = time.monotonic()
+        with self._stats_lock:
+            self.in_flight += len(jobs)
+        for job in jobs:
+            job.started_at = now
+
+    def _finish(self, jobs: List[InferenceJob]):
+        now = time.monotonic()
+        with self._stats_lock:
+            self.in_flight -= len(jobs)
+            for job in jobs:
+                job.finished_at = now
+                self._latencies.append((now - job.submitted_at) * 1000)
+                self._queue_waits.append((job.started_at - job.submitted_at) * 1000)
+                if job.error:
+                    self.failed += 1
+                else:
+                    self.processed += 1
+        for job in jobs:
+            job.done.set()
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {'p50': 0, 'p95': 0, 'max': 0}
+    return {
+        'p50': round(values[len(values) // 2], 1),
+        'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+        'max': round(values[-1], 1),
+    }
+
+
+def _process_rss_bytes() -> int:
+    """حافظه مقیم پردازه جاری"""
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+
+class InferenceServer:
+    """
+    سرور محلی استنتاج
+
+    Args:
+        models: نگاشت اندازه مدل به نام مدل Whisper (مثلاً {'base': 'base'})
+        address: مسیر سوکت Unix یا (host, port)
+        authkey: کلید احراز هویت اتصال‌ها
+    """
+
+    def __init__(self, models: Dict[str, str], address: Address, authkey: bytes,
+                 device: str = 'cpu', backend: Optional[WhisperBackend] = None,
+                 short_clip_seconds: float = 30.0, max_batch_size: int = 8,
+                 batch_window_ms: int = 50):
+        self.address = address
+        self.authkey = authkey
+        self.backend = backend or WhisperBackend()
+        self.workers = {
+            size: ModelWorker(
+                size, name, device, self.backend,
+                short_clip_seconds=short_clip_seconds,
+                max_batch_size=max_batch_size,
+                batch_window_ms=batch_window_ms,
+            )
+            for size, name in models.items()
+        }
+        self.started_at = time.monotonic()
+        self.connections = 0
+        self._listener: Optional[Listener] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """بارگذاری همه مدل‌ها و باز کردن سوکت"""
+        for worker in self.workers.values():
+            worker.start()
+
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        self._listener = Listener(self.address, authkey=self.authkey)
+        self.started_at = time.monotonic()
+        logger.info(f"STT inference server listening on {self.address}")
+
+    def serve_forever(self):
+        """پذیرش اتصال‌ها تا زمان فراخوانی stop"""
+        while not self._stopped.is_set():
+            try:
+                connection = self._listener.accept()
+            except AuthenticationError as e:
+                logger.warning(f"Rejected inference connection: {str(e)}")
+                continue
+            except OSError:
+                if self._stopped.is_set():
+                    break
+                raise
+
+            threading.Thread(
+                target=self._handle_connection, args=(connection,), daemon=True
+            ).start()
+
+    def serve_in_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name='stt-inference-server', daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.close()
+        for worker in self.workers.values():
+            worker.stop()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def stats(self) -> Dict[str, Any]:
+        """آمار کل سرور"""
+        models = {size: worker.stats() for size, worker in self.workers.items()}
+        return {
+            'uptime_seconds': round(time.monotonic() - self.started_at, 1),
+            'connections': self.connections,
+            'queue_depth': sum(model['queue_depth'] for model in models.values()),
+            'model_bytes': sum(model['model_bytes'] for model in models.values()),
+            'process_rss_bytes': _process_rss_bytes(),
+            'models': models,
+        }
+
+    def _handle_connection(self, connection):
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    message = connection.recv()
+                except EOFError:
+                    break
+                connection.send(self._dispatch(message))
+        except Exception as e:
+            logger.error(f"Inference connection error: {str(e)}")
+        finally:
+            connection.close()
+
+    def _dispatch(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        op = message.get('op')
+        if op == 'ping':
+            return {'ok': True, 'models': list(self.workers)}
+        if op == 'stats':
+            return {'ok': True, 'stats': self.stats()}
+        if op != 'transcribe':
+            return {'ok': False, 'error': f'unknown op: {op}'}
+
+        worker = self.workers.get(message.get('model_size'))
+        if worker is None:
+            return {
+                'ok': False,
+                'code': 'model_not_loaded',
+                'error': f"model not loaded: {message.get('model_size')}",
+            }
+
+        try:
+            audio = message.get('audio')
+            if audio is None:
+                audio = self.backend.load_audio(message['audio_path'])
+        except Exception as e:
+            return {'ok': False, 'error': f'audio load failed: {str(e)}'}
+
+        job = worker.submit(InferenceJob(
+            model_size=worker.model_size,
+            audio=audio,
+            options=message.get('options') or {},
+            batchable=bool(message.get('batchable')),
+        ))
+        job.done.wait()
+
+        if job.error:
+            return {'ok': False, 'error': job.error, 'timing': job.timing()}
+        return {'ok': True, 'result': job.result, 'timing': job.timing()}
+
+
+class InferenceClient:
+    """
+    کلاینت سرور استنتاج
+
+    هر فراخوانی یک اتصال کوتاه به سوکت محلی باز می‌کند. اگر سرور در دسترس
+    نباشد ``InferenceUnavailable`` برمی‌گرداند تا فراخواننده به مدل محلی
+    برگردد.
+    """
+
+    def __init__(self, address: Address, authkey: bytes, timeout: float = 600.0):
+        self.address = address
+        self.authkey = authkey
+        self.timeout = timeout
+
+    def transcribe(self, model_size: str, options: Dict[str, Any],
+                   audio_path: Optional[str] = None, audio: Any = None,
+                   batchable: bool = False) -> Dict[str, Any]:
+        """
+        ارسال وظیفه تبدیل
+
+        Args:
+            model_size: اندازه مدل بارگذاری شده در سرور
+            options: تنظیمات model.transcribe
+            audio_path: مسیر فایل صوتی (روی همین میزبان)
+            audio: نمونه‌های float32 با نرخ 16kHz (به جای مسیر)
+            batchable: اجازه تبدیل دسته‌ای برای کلیپ کوتاه (timestamp کلمات حفظ می‌شود)
+
+        Returns:
+            dict: نتیجه هم‌شکل model.transcribe به همراه timing
+        """
+        response = self._request({
+            'op': 'transcribe',
+            'model_size': model_size,
+            'audio_path': audio_path,
+            'audio': audio,
+            'options': options,
+            'batchable': batchable,
+        })
+        if not response.get('ok'):
+            if response.get('code') == 'model_not_loaded':
+                raise InferenceUnavailable(response['error'])
+            raise InferenceError(response.get('error', 'unknown error'))
+
+        result = response['result']
+        result['inference_timing'] = response.get('timing', {})
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request({'op': 'stats'})['stats']
+
+    def ping(self) -> bool:
+        try:
+            return bool(self._request({'op': 'ping'}).get('ok'))
+        except InferenceUnavailable:
+            return False
+
+    def _request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            connection = Client(self.address, authkey=self.authkey)
+        except (OSError, AuthenticationError) as e:
+            raise InferenceUnavailable(str(e))
+
+        try:
+            connection.send(message)
+            if not connection.poll(self.timeout):
+                raise InferenceUnavailable('inference server timed out')
+            return connection.recv()
+        except (EOFError, OSError) as e:
+            raise InferenceUnavailable(str(e))
+        finally:
+            connection.close()
+
+
+def inference_authkey() -> bytes:
+    """کلید احراز هویت سوکت (در صورت عدم تنظیم، مشتق از SECRET_KEY)"""
+    import hashlib
+    from django.conf import settings
+    from .settings import INFERENCE_SETTINGS
+
+    if INFERENCE_SETTINGS['AUTHKEY']:
+        return INFERENCE_SETTINGS['AUTHKEY'].encode()
+    return hashlib.sha256(f"stt-inference:{settings.SECRET_KEY}".encode()).digest()
+
+
+def get_inference_client() -> Optional[InferenceClient]:
+    """کلاینت پیکربندی شده یا None اگر سرور استنتاج غیرفعال باشد"""
+    from .settings import INFERENCE_SETTINGS
+
+    if not INFERENCE_SETTINGS['ENABLED']:
+        return None
+    return InferenceClient(
+        parse_address(INFERENCE_SETTINGS['ADDRESS']),
+        inference_authkey(),
+        timeout=INFERENCE_SETTINGS['TIMEOUT'],
+    )
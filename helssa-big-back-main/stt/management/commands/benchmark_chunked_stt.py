@@ -0,0 +1,196 @@
+"""
+Management command برای مقایسه تبدیل یکجا و قطعه‌ای موازی
+"""
+import json
+import os
+import tempfile
+import time
+import wave
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from stt.chunking import ChunkingConfig, EnergyVADSplitter
+from stt.cores.speech_processor import SpeechProcessorCore
+from stt.inference import get_inference_client
+from stt.settings import CHUNKING_SETTINGS
+
+
+class Command(BaseCommand):
+    """
+    بنچمارک تبدیل قطعه‌ای
+
+    یک فایل صوتی (یا نمونه مصنوعی ۳۰ دقیقه‌ای) یک بار با یک فراخوانی
+    ``model.transcribe`` و یک بار در حالت قطعه‌ای موازی تبدیل و زمان کل،
+    زمان رسیدن اولین نتیجه جزئی و ضریب بلادرنگ گزارش می‌شود.
+
+    استفاده:
+    python manage.py benchmark_chunked_stt --file consult.wav --model base
+    python manage.py benchmark_chunked_stt --duration 1800 --workers 4 --json
+    """
+
+    help = 'مقایسه زمان تبدیل یکجا و قطعه‌ای موازی یک فایل صوتی طولانی'
+
+    def add_arguments(self, parser):
+        """تعریف آرگومان‌های command"""
+        parser.add_argument(
+            '--file',
+            type=str,
+            help='مسیر فایل صوتی (در صورت عدم تعیین، نمونه مصنوعی ساخته می‌شود)'
+        )
+
+        parser.add_argument(
+            '--duration',
+            type=int,
+            default=1800,
+            help='مدت نمونه مصنوعی به ثانیه'
+        )
+
+        parser.add_argument(
+            '--model',
+            type=str,
+            default='base',
+            help='اندازه مدل Whisper'
+        )
+
+        parser.add_argument(
+            '--language',
+            type=str,
+            default='fa',
+            help='زبان گفتار'
+        )
+
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='تعداد پنجره‌های همزمان حالت قطعه‌ای'
+        )
+
+        parser.add_argument(
+            '--skip-single',
+            action='store_true',
+            help='عدم اجرای حالت یکجا'
+        )
+
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='خروجی در فرمت JSON'
+        )
+
+    def handle(self, *args, **options):
+        """اجرای بنچمارک"""
+        if options['workers']:
+            CHUNKING_SETTINGS['WORKERS'] = options['workers']
+
+        audio_path = options['file']
+        generated = False
+        if not audio_path:
+            audio_path = self._generate_sample(options['duration'])
+            generated = True
+
+        processor = SpeechProcessorCore()
+        report = {'file': audio_path, 'model': options['model']}
+
+        try:
+            report['windows'] = self._count_windows(processor, audio_path)
+
+            # بدون سرور استنتاج مدل محلی از پیش بارگذاری می‌شود تا در نتیجه اثر نگذارد
+            client = get_inference_client()
+            report['inference_server'] = client is not None and client.ping()
+            if not report['inference_server']:
+                processor.load_model(options['model'])
+            report['workers'] = ChunkingConfig.from_dict(CHUNKING_SETTINGS).workers
+
+            if not options['skip_single']:
+                processor.load_model(options['model'])
+                started = time.perf_counter()
+                result = processor.process_audio_file(
+                    audio_path, options['language'], options['model'], chunked=False
+                )
+                report['single'] = {
+                    'wall_clock': round(time.perf_counter() - started, 2),
+                    'duration': result['duration'],
+                    'characters': len(result['transcription']),
+                }
+
+            started = time.perf_counter()
+            first_partial = None
+            result = None
+            for partial in processor.iter_transcription(audio_path, options['language'], options['model']):
+                if partial.get('final'):
+                    result = partial['result']
+                elif first_partial is None:
+                    first_partial = time.perf_counter() - started
+
+            report['chunked'] = {
+                'wall_clock': round(time.perf_counter() - started, 2),
+                'first_partial': round(first_partial or 0, 2),
+                'duration': result['duration'],
+                'characters': len(result['transcription']),
+            }
+
+            for mode in ('single', 'chunked'):
+                if mode in report and report[mode]['duration']:
+                    report[mode]['realtime_factor'] = round(
+                        report[mode]['duration'] / report[mode]['wall_clock'], 1
+                    )
+
+            if 'single' in report:
+                report['speedup'] = round(
+                    report['single']['wall_clock'] / report['chunked']['wall_clock'], 2
+                )
+        finally:
+            if generated:
+                os.remove(audio_path)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(
+            f"windows={report['windows']} workers={report['workers']} "
+            f"inference_server={report['inference_server']}"
+        )
+        for mode in ('single', 'chunked'):
+            if mode in report:
+                self.stdout.write(
+                    f"{mode:<8} wall={report[mode]['wall_clock']:.2f}s "
+                    f"realtime_x={report[mode].get('realtime_factor', 0)}"
+                )
+        self.stdout.write(f"first partial after {report['chunked']['first_partial']:.2f}s")
+        if 'speedup' in report:
+            self.stdout.write(self.style.SUCCESS(f"ضریب تسریع: {report['speedup']}x"))
+
+    def _count_windows(self, processor: SpeechProcessorCore, audio_path: str) -> int:
+        """تعداد پنجره‌های تقسیم‌کننده برای فایل"""
+        audio, _ = processor._load_audio(audio_path)
+        splitter = EnergyVADSplitter(ChunkingConfig.from_dict(CHUNKING_SETTINGS), processor.sample_rate)
+        return len(splitter.split(audio))
+
+    def _generate_sample(self, duration: int) -> str:
+        """
+        ساخت نمونه مصنوعی: قطعات صدادار چند ثانیه‌ای با سکوت‌های کوتاه بین آن‌ها
+        """
+        sample_rate = 16000
+        rng = np.random.default_rng(42)
+        parts = []
+        elapsed = 0.0
+        while elapsed < duration:
+            voiced = rng.uniform(2.0, 8.0)
+            pause = rng.uniform(0.3, 1.2)
+            t = np.arange(int(voiced * sample_rate)) / sample_rate
+            tone = 0.3 * np.sin(2 * np.pi * rng.uniform(120, 260) * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+            parts.append(tone + rng.normal(0, 0.005, len(t)))
+            parts.append(rng.normal(0, 0.002, int(pause * sample_rate)))
+            elapsed += voiced + pause
+
+        audio = np.concatenate(parts)[:duration * sample_rate]
+        handle = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
+        handle.close()
+        with wave.open(handle.name, 'wb') as output:
+            output.setnchannels(1)
+            output.setsampwidth(2)
+            output.setframerate(sample_rate)
+            output.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+        return handle.name
@@ -0,0 +1,131 @@
+"""
+Management command برای اجرای سرور استنتاج STT
+"""
+import json
+import signal
+import threading
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from stt.cores.speech_processor import SpeechProcessorCore
+from stt.inference import InferenceServer, get_inference_client, inference_authkey, parse_address
+from stt.settings import INFERENCE_SETTINGS
+
+STATS_CACHE_KEY = 'stt_inference_stats'
+
+
+class Command(BaseCommand):
+    """
+    سرور استنتاج STT
+
+    مدل‌های پیکربندی شده هنگام راه‌اندازی بارگذاری می‌شوند و وظایف
+    ``STTService`` و وظایف رونویسی ملاقات‌ها از طریق سوکت محلی پذیرفته
+    می‌شوند. آمار سرور به صورت دوره‌ای در کش (``stt_inference_stats``)
+    منتشر می‌شود.
+
+    استفاده:
+    python manage.py run_stt_server
+    python manage.py run_stt_server --models base small --address /run/helssa/stt.sock
+    python manage.py run_stt_server --stats
+    """
+
+    help = 'اجرای سرور استنتاج STT با مدل‌های از پیش بارگذاری شده'
+
+    def add_arguments(self, parser):
+        """تعریف آرگومان‌های command"""
+        parser.add_argument(
+            '--models',
+            nargs='+',
+            help='اندازه مدل‌هایی که بارگذاری می‌شوند'
+        )
+
+        parser.add_argument(
+            '--address',
+            type=str,
+            help='مسیر سوکت Unix یا host:port'
+        )
+
+        parser.add_argument(
+            '--device',
+            type=str,
+            default='cpu',
+            help='دستگاه اجرای مدل (cpu/cuda)'
+        )
+
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='نمایش آمار سرور در حال اجرا و خروج'
+        )
+
+    def handle(self, *args, **options):
+        """اجرای سرور"""
+        if options['stats']:
+            self._print_stats()
+            return
+
+        address = parse_address(options['address'] or INFERENCE_SETTINGS['ADDRESS'])
+        model_configs = SpeechProcessorCore.MODEL_CONFIGS
+        sizes = options['models'] or INFERENCE_SETTINGS['PRELOAD_MODELS']
+
+        unknown = [size for size in sizes if size not in model_configs]
+        if unknown:
+            self.stderr.write(self.style.ERROR(f"مدل نامعتبر: {', '.join(unknown)}"))
+            return
+
+        server = InferenceServer(
+            models={size: model_configs[size]['name'] for size in sizes},
+            address=address,
+            authkey=inference_authkey(),
+            device=options['device'],
+            short_clip_seconds=INFERENCE_SETTINGS['SHORT_CLIP_SECONDS'],
+            max_batch_size=INFERENCE_SETTINGS['MAX_BATCH_SIZE'],
+            batch_window_ms=INFERENCE_SETTINGS['BATCH_WINDOW_MS'],
+        )
+
+        self.stdout.write(f"Loading models: {', '.join(sizes)}")
+        server.start()
+        for size, worker in server.workers.items():
+            self.stdout.write(
+                f"  {size:<7} {worker.model_name:<9} "
+                f"{worker.model_bytes / 1024 / 1024:.0f} MB in {worker.load_seconds}s"
+            )
+        self.stdout.write(self.style.SUCCESS(f"STT inference server listening on {address}"))
+
+        stopped = threading.Event()
+        publisher = threading.Thread(
+            target=self._publish_stats, args=(server, stopped), daemon=True
+        )
+        publisher.start()
+
+        def shutdown(signum, frame):
+            stopped.set()
+            server.stop()
+
+        signal.signal(signal.SIGTERM, shutdown)
+        signal.signal(signal.SIGINT, shutdown)
+
+        try:
+            server.serve_forever()
+        finally:
+            stopped.set()
+            cache.delete(STATS_CACHE_KEY)
+            self.stdout.write('STT inference server stopped')
+
+    def _publish_stats(self, server: InferenceServer, stopped: threading.Event):
+        """انتشار دوره‌ای آمار در کش برای داشبورد و سرویس‌ها"""
+        interval = INFERENCE_SETTINGS['STATS_INTERVAL']
+        while not stopped.wait(interval):
+            try:
+                cache.set(STATS_CACHE_KEY, server.stats(), timeout=interval * 3)
+            except Exception as e:
+                self.stderr.write(f"Stats publish failed: {str(e)}")
+
+    def _print_stats(self):
+        """نمایش آمار سرور در حال اجرا"""
+        client = get_inference_client()
+        if client is None or not client.ping():
+            self.stderr.write(self.style.ERROR('سرور استنتاج در دسترس نیست'))
+            return
+        self.stdout.write(json.dumps(client.stats(), ensure_ascii=False, indent=2))
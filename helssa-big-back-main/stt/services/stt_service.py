@@ -413,4 +413,39 @@ class STTService:
             return False, {
                 'error': 'service_error',
                 'message': 'خطا در دریافت لیست بررسی'
-            }
\ No newline at end of file
+            }
+
+    def get_inference_stats(self) -> Tuple[bool, dict]:
+        """
+        دریافت آمار سرور استنتاج (عمق صف، حافظه مدل‌ها، تأخیر وظایف)
+
+        Returns:
+            Tuple[bool, dict]: (موفقیت، آمار/خطا)
+        """
+        try:
+            from django.core.cache import cache
+            from ..inference import InferenceUnavailable, get_inference_client
+
+            client = get_inference_client()
+            if client is not None:
+                try:
+                    return True, {'source': 'live', **client.stats()}
+                except InferenceUnavailable:
+                    pass
+
+            # آخرین آمار منتشر شده توسط سرور
+            cached_stats = cache.get('stt_inference_stats')
+            if cached_stats:
+                return True, {'source': 'cache', **cached_stats}
+
+            return False, {
+                'error': 'inference_unavailable',
+                'message': 'سرور استنتاج در دسترس نیست'
+            }
+
+        except Exception as e:
+            self.logger.error(f"Error getting inference stats: {str(e)}")
+            return False, {
+                'error': 'service_error',
+                'message': 'خطا در دریافت آمار سرور استنتاج'
+            }
@@ -195,6 +195,54 @@ ADVANCED_SETTINGS = {
     'BATCH_SIZE': getattr(settings, 'STT_BATCH_SIZE', 1),
 }
 
+# تنظیمات تبدیل قطعه‌ای (فایل‌های طولانی)
+CHUNKING_SETTINGS = {
+    # فعال بودن حالت قطعه‌ای
+    'ENABLED': getattr(settings, 'STT_CHUNKING_ENABLED', True),
+
+    # حداقل مدت فایل برای استفاده از حالت قطعه‌ای (ثانیه)
+    'MIN_DURATION': getattr(settings, 'STT_CHUNKING_MIN_DURATION', 120),
+
+    # طول هدف، حداقل و حداکثر هر پنجره (ثانیه)
+    'WINDOW_SECONDS': getattr(settings, 'STT_CHUNK_WINDOW_SECONDS', 30),
+    'MIN_WINDOW_SECONDS': getattr(settings, 'STT_CHUNK_MIN_WINDOW_SECONDS', 15),
+    'MAX_WINDOW_SECONDS': getattr(settings, 'STT_CHUNK_MAX_WINDOW_SECONDS', 45),
+
+    # هم‌پوشانی دو طرف هر پنجره (ثانیه)
+    'OVERLAP_SECONDS': getattr(settings, 'STT_CHUNK_OVERLAP_SECONDS', 1.0),
+
+    # تعداد پنجره‌هایی که همزمان به سرور استنتاج فرستاده می‌شوند
+    'WORKERS': getattr(settings, 'STT_CHUNK_WORKERS', 2),
+}
+
+# تنظیمات سرور استنتاج (مدل‌های گرم مشترک)
+INFERENCE_SETTINGS = {
+    # ارسال وظایف به سرور استنتاج (در صورت در دسترس نبودن، مدل محلی استفاده می‌شود)
+    'ENABLED': getattr(settings, 'STT_INFERENCE_ENABLED', True),
+
+    # مسیر سوکت Unix یا host:port
+    'ADDRESS': getattr(settings, 'STT_INFERENCE_ADDRESS', '/tmp/helssa-stt-inference.sock'),
+
+    # کلید احراز هویت اتصال (پیش‌فرض: مشتق از SECRET_KEY)
+    'AUTHKEY': getattr(settings, 'STT_INFERENCE_AUTHKEY', None),
+
+    # مدل‌هایی که هنگام راه‌اندازی سرور بارگذاری می‌شوند
+    'PRELOAD_MODELS': getattr(settings, 'STT_INFERENCE_PRELOAD_MODELS', ['base']),
+
+    # حداکثر زمان انتظار برای پاسخ (ثانیه)
+    'TIMEOUT': getattr(settings, 'STT_INFERENCE_TIMEOUT', 600),
+
+    # کلیپ‌های کوتاه‌تر از این مقدار به صورت دسته‌ای تبدیل می‌شوند (ثانیه)
+    'SHORT_CLIP_SECONDS': getattr(settings, 'STT_INFERENCE_SHORT_CLIP_SECONDS', 30),
+
+    # حداکثر اندازه دسته و بازه جمع‌آوری آن
+    'MAX_BATCH_SIZE': getattr(settings, 'STT_INFERENCE_MAX_BATCH_SIZE', 8),
+    'BATCH_WINDOW_MS': getattr(settings, 'STT_INFERENCE_BATCH_WINDOW_MS', 50),
+
+    # بازه انتشار آمار سرور در کش (ثانیه)
+    'STATS_INTERVAL': getattr(settings, 'STT_INFERENCE_STATS_INTERVAL', 10),
+}
+
 # تنظیمات مانیتورینگ
 MONITORING_SETTINGS = {
     # ارسال متریک به Prometheus
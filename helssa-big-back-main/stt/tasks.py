@@ -194,8 +194,15 @@ def warm_up_models():
     """
     try:
         from .cores.speech_processor import SpeechProcessorCore
+        from .inference import get_inference_client
         from .settings import WHISPER_SETTINGS
         
+        # اگر سرور استنتاج در حال اجراست مدل‌ها در آن گرم هستند
+        client = get_inference_client()
+        if client is not None and client.ping():
+            logger.info("Inference server is running; models are already warm")
+            return
+        
         processor = SpeechProcessorCore()
         
         # بارگذاری مدل پیش‌فرض
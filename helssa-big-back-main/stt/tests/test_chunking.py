@@ -0,0 +1,249 @@
+"""
+تست‌های تبدیل قطعه‌ای
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..chunking import (
+    AudioWindow, ChunkedTranscriber, ChunkingConfig, EnergyVADSplitter,
+    InferenceWindowTranscriber, TranscriptStitcher, shift_result,
+)
+from ..inference import InferenceUnavailable
+
+SAMPLE_RATE = 16000
+
+
+def make_audio(pattern):
+    """ساخت صوت از دنباله (ثانیه، صدادار؟)"""
+    parts = []
+    for seconds, voiced in pattern:
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        if voiced:
+            parts.append(0.3 * np.sin(2 * np.pi * 200 * t))
+        else:
+            parts.append(np.zeros(len(t)))
+    return np.concatenate(parts).astype(np.float32)
+
+
+def word(text, start, end):
+    return {'word': f' {text}', 'start': start, 'end': end, 'probability': 0.9}
+
+
+class EnergyVADSplitterTest(SimpleTestCase):
+    """تست تقسیم‌کننده مبتنی بر انرژی"""
+
+    def setUp(self):
+        self.config = ChunkingConfig(
+            window_seconds=10, min_window_seconds=5, max_window_seconds=15, overlap_seconds=0.5
+        )
+        self.splitter = EnergyVADSplitter(self.config, SAMPLE_RATE)
+
+    def test_cuts_fall_in_silence(self):
+        """نقاط برش در سکوت نزدیک به طول هدف قرار می‌گیرند"""
+        audio = make_audio([(9, True), (1, False), (9, True), (1, False), (9, True)])
+        windows = self.splitter.split(audio)
+
+        self.assertEqual(len(windows), 3)
+        self.assertTrue(9.0 <= windows[0].core_end <= 10.0)
+        self.assertTrue(19.0 <= windows[1].core_end <= 20.0)
+        self.assertEqual(windows[-1].core_end, 29.0)
+
+    def test_windows_overlap_and_cover_audio(self):
+        """پنجره‌ها کل فایل را پوشش می‌دهند و هم‌پوشان هستند"""
+        audio = make_audio([(60, True)])
+        windows = self.splitter.split(audio)
+
+        self.assertEqual(windows[0].core_start, 0.0)
+        self.assertEqual(windows[-1].core_end, 60.0)
+        for previous, current in zip(windows, windows[1:]):
+            self.assertEqual(previous.core_end, current.core_start)
+            self.assertAlmostEqual(current.start, current.core_start - 0.5)
+            self.assertLessEqual(previous.core_end - previous.core_start, 15.0)
+
+    def test_silent_window_is_marked(self):
+        """پنجره‌های بدون گفتار علامت‌گذاری می‌شوند"""
+        audio = make_audio([(10, True), (20, False), (10, True)])
+        windows = self.splitter.split(audio)
+
+        self.assertTrue(any(not window.has_speech for window in windows))
+        self.assertTrue(windows[0].has_speech)
+
+    def test_short_audio_single_window(self):
+        """صوت کوتاه‌تر از حداکثر طول یک پنجره است"""
+        windows = self.splitter.split(make_audio([(8, True)]))
+
+        self.assertEqual(len(windows), 1)
+        self.assertEqual((windows[0].start, windows[0].end), (0.0, 8.0))
+
+
+class TranscriptStitcherTest(SimpleTestCase):
+    """تست دوختن نتایج پنجره‌ها"""
+
+    def test_overlap_words_are_not_repeated(self):
+        """کلمات ناحیه هم‌پوشانی فقط یک بار در متن نهایی می‌آیند"""
+        first = AudioWindow(0, 0.0, 11.0, 0.0, 10.0)
+        second = AudioWindow(1, 9.0, 20.0, 10.0, 20.0)
+        stitcher = TranscriptStitcher(overlap_seconds=1.0)
+
+        stitcher.add(first, {'segments': [{
+            'start': 0.0, 'end': 10.6, 'text': '',
+            'words': [word('سر', 8.0, 8.5), word('درد', 8.6, 9.6), word('دارم', 9.7, 10.6)],
+        }]})
+        # پنجره دوم همان کلمه مرزی را با زمان کمی متفاوت دوباره شنیده است
+        stitcher.add(second, {'segments': [{
+            'start': 9.1, 'end': 12.0, 'text': '',
+            'words': [word('درد', 9.1, 9.6), word('دارم', 9.8, 10.5), word('امروز', 10.6, 11.2)],
+        }]})
+
+        self.assertEqual(stitcher.text, 'سر درد دارم امروز')
+
+    def test_timestamps_are_monotonic(self):
+        """زمان کلمات هرگز به عقب برنمی‌گردد"""
+        first = AudioWindow(0, 0.0, 11.0, 0.0, 10.0)
+        second = AudioWindow(1, 9.0, 20.0, 10.0, 20.0)
+        stitcher = TranscriptStitcher(overlap_seconds=1.0)
+
+        stitcher.add(first, {'segments': [{'start': 0, 'end': 10.4, 'text': '', 'words': [word('الف', 9.5, 10.4)]}]})
+        stitcher.add(second, {'segments': [{'start': 10, 'end': 11, 'text': '', 'words': [word('ب', 10.0, 10.9)]}]})
+
+        starts = [w['start'] for w in stitcher.words]
+        self.assertEqual(starts, sorted(starts))
+        self.assertGreaterEqual(stitcher.words[1]['start'], stitcher.words[0]['end'])
+
+    def test_shift_result_uses_window_offset(self):
+        """زمان‌های نسبی پنجره به زمان مطلق تبدیل می‌شوند"""
+        result = shift_result({'segments': [{'start': 1.0, 'end': 2.0, 'text': 'x', 'words': [word('x', 1.0, 2.0)]}]}, 30.0)
+
+        self.assertEqual(result['segments'][0]['start'], 31.0)
+        self.assertEqual(result['segments'][0]['words'][0]['end'], 32.0)
+
+
+def fake_transcribe(window, audio, options):
+    """تبدیل ساختگی: یک کلمه برای هر پنجره، پنجره‌های اول کندتر تمام می‌شوند"""
+    time.sleep(0.05 if window.index == 0 else 0)
+    middle = (window.core_start + window.core_end) / 2
+    return {
+        'language': 'fa',
+        'segments': [{
+            'start': middle, 'end': middle + 0.5, 'text': '',
+            'words': [word(f'w{window.index}', middle, middle + 0.5)],
+        }],
+    }
+
+
+class ChunkedTranscriberTest(SimpleTestCase):
+    """تست تبدیل موازی و خروجی جریانی"""
+
+    def setUp(self):
+        self.config = ChunkingConfig(
+            window_seconds=10, min_window_seconds=5, max_window_seconds=15, overlap_seconds=0.5
+        )
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_partials_are_streamed_in_order(self):
+        """نتایج جزئی به ترتیب پنجره‌ها و با پیشرفت صعودی برمی‌گردند"""
+        transcriber = ChunkedTranscriber(self.executor, self.config, SAMPLE_RATE, fake_transcribe)
+        partials = list(transcriber.iter_transcribe(make_audio([(45, True)]), {}))
+
+        self.assertEqual([p['index'] for p in partials], list(range(len(partials))))
+        self.assertEqual(partials[-1]['progress'], 100.0)
+        self.assertEqual(partials[-1]['text'], ' '.join(f'w{i}' for i in range(len(partials))))
+
+    def test_windows_run_in_parallel(self):
+        """پنجره‌ها همزمان در executor اجرا می‌شوند"""
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_transcribe(window, audio, options):
+            with lock:
+                active.append(window.index)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.remove(window.index)
+            return {'segments': []}
+
+        transcriber = ChunkedTranscriber(self.executor, self.config, SAMPLE_RATE, slow_transcribe)
+        result = transcriber.transcribe(make_audio([(60, True)]), {'language': 'fa'})
+
+        self.assertGreater(max(peak), 1)
+        self.assertEqual(result['language'], 'fa')
+
+    def test_silent_windows_are_skipped(self):
+        """پنجره‌های بی‌صدا به مدل فرستاده نمی‌شوند"""
+        calls = []
+
+        def recording_transcribe(window, audio, options):
+            calls.append(window.index)
+            return {'segments': []}
+
+        transcriber = ChunkedTranscriber(self.executor, self.config, SAMPLE_RATE, recording_transcribe)
+        result = transcriber.transcribe(make_audio([(10, True), (30, False)]), {})
+
+        self.assertLess(len(calls), result['windows'])
+
+
+class FakeInferenceClient:
+    """کلاینت ساختگی سرور استنتاج"""
+
+    def __init__(self, available=True):
+        self.available = available
+        self.calls = []
+
+    def transcribe(self, model_size, options, audio_path=None, audio=None, batchable=False):
+        self.calls.append((model_size, len(audio), batchable))
+        if not self.available:
+            raise InferenceUnavailable('connection refused')
+        return {
+            'language': 'fa',
+            'segments': [{'start': 1.0, 'end': 2.0, 'text': ' سلام', 'words': [word('سلام', 1.0, 2.0)]}],
+        }
+
+
+class InferenceWindowTranscriberTest(SimpleTestCase):
+    """تست ارسال پنجره‌ها به سرور استنتاج"""
+
+    def setUp(self):
+        self.window = AudioWindow(index=1, start=29.0, end=50.0, core_start=30.0, core_end=49.0)
+        self.audio = np.zeros(21 * SAMPLE_RATE, dtype=np.float32)
+
+    def test_window_is_sent_to_server_with_absolute_times(self):
+        client = FakeInferenceClient()
+        transcribe = InferenceWindowTranscriber(client, 'base', batch_seconds=30)
+
+        result = transcribe(self.window, self.audio, {'word_timestamps': True})
+
+        self.assertEqual(client.calls, [('base', len(self.audio), True)])
+        self.assertEqual(result['segments'][0]['words'][0]['start'], 30.0)
+
+    def test_long_window_is_not_batched(self):
+        client = FakeInferenceClient()
+        InferenceWindowTranscriber(client, 'base', batch_seconds=15)(self.window, self.audio, {})
+
+        self.assertFalse(client.calls[0][2])
+
+    def test_unavailable_server_uses_fallback(self):
+        fallback_calls = []
+
+        def fallback(audio, options):
+            fallback_calls.append(len(audio))
+            return {'language': 'fa', 'segments': []}
+
+        transcribe = InferenceWindowTranscriber(FakeInferenceClient(available=False), 'base', fallback)
+        with self.assertLogs('stt.chunking', 'WARNING'):
+            transcribe(self.window, self.audio, {})
+
+        self.assertEqual(fallback_calls, [len(self.audio)])
+
+    def test_disabled_server_uses_fallback(self):
+        transcribe = InferenceWindowTranscriber(None, 'base', lambda audio, options: {'segments': []})
+
+        self.assertEqual(transcribe(self.window, self.audio, {})['segments'], [])
@@ -0,0 +1,157 @@
+"""
+تست‌های سرور استنتاج STT
+"""
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import SimpleTestCase
+
+from ..inference import (
+    InferenceClient, InferenceServer, InferenceUnavailable, WhisperBackend,
+    parse_address,
+)
+
+AUTHKEY = b'test-key'
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeBackend(WhisperBackend):
+    """بک‌اند ساختگی بدون Whisper"""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.loads = []
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    def load_model(self, model_name, device):
+        self.loads.append(model_name)
+        return FakeModel(model_name)
+
+    def load_audio(self, path):
+        return [0.0] * int(os.path.basename(path).split('_')[0]) * 16000
+
+    def model_bytes(self, model):
+        return 1024 * 1024
+
+    def transcribe(self, model, audio, options):
+        time.sleep(self.delay)
+        return {'text': f'long:{len(audio) // 16000}', 'segments': [], 'language': 'fa'}
+
+    def decode_batch(self, model, audios, options):
+        with self.lock:
+            self.batch_sizes.append(len(audios))
+        time.sleep(self.delay)
+        outputs = []
+        for audio in audios:
+            output = {'text': f' short:{len(audio) // 16000}', 'language': 'fa', 'avg_logprob': -0.2, 'no_speech_prob': 0.01}
+            if options.get('word_timestamps'):
+                output['words'] = [{'word': ' short', 'start': 0.5, 'end': 1.0, 'probability': 0.9}]
+            outputs.append(output)
+        return outputs
+
+
+class InferenceServerTest(SimpleTestCase):
+    """تست سرور و کلاینت روی سوکت محلی"""
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.address = os.path.join(self.tempdir.name, 'stt.sock')
+        self.backend = FakeBackend()
+        self.server = InferenceServer(
+            {'base': 'base'}, self.address, AUTHKEY, backend=self.backend,
+            short_clip_seconds=30, max_batch_size=8, batch_window_ms=100,
+        )
+        self.server.start()
+        self.server.serve_in_background()
+        self.client = InferenceClient(self.address, AUTHKEY, timeout=5)
+
+    def tearDown(self):
+        self.server.stop()
+        self.tempdir.cleanup()
+
+    def test_models_are_preloaded_at_startup(self):
+        """مدل پیش از اولین درخواست بارگذاری شده است"""
+        self.assertEqual(self.backend.loads, ['base'])
+        self.assertTrue(self.client.ping())
+
+        self.client.transcribe('base', {}, audio_path='/x/60_clip.wav')
+        self.assertEqual(self.backend.loads, ['base'])
+
+    def test_short_clips_are_batched(self):
+        """کلیپ‌های کوتاه همزمان در یک دسته تبدیل می‌شوند"""
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(executor.map(
+                lambda i: self.client.transcribe(
+                    'base', {'language': 'fa'}, audio_path=f'/x/{5 + i}_clip.wav', batchable=True
+                ),
+                range(6),
+            ))
+
+        self.assertEqual([r['text'] for r in results], [f'short:{5 + i}' for i in range(6)])
+        self.assertLess(len(self.backend.batch_sizes), 6)
+        self.assertGreater(max(r['inference_timing']['batch_size'] for r in results), 1)
+
+    def test_batched_clips_keep_word_timestamps(self):
+        """کلیپ‌های دسته‌ای timestamp کلمات را برمی‌گردانند"""
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            results = list(executor.map(
+                lambda i: self.client.transcribe(
+                    'base', {'language': 'fa', 'word_timestamps': True},
+                    audio_path=f'/x/{5 + i}_clip.wav', batchable=True
+                ),
+                range(3),
+            ))
+
+        self.assertGreater(max(r['inference_timing']['batch_size'] for r in results), 1)
+        for result in results:
+            self.assertEqual(result['segments'][0]['words'][0]['start'], 0.5)
+
+    def test_long_clips_are_not_batched(self):
+        """کلیپ‌های طولانی به صورت تکی تبدیل می‌شوند"""
+        result = self.client.transcribe('base', {}, audio_path='/x/120_clip.wav', batchable=True)
+
+        self.assertEqual(result['text'], 'long:120')
+        self.assertEqual(self.backend.batch_sizes, [])
+
+    def test_stats_report_queue_memory_and_latency(self):
+        """آمار شامل عمق صف، حافظه مدل و تأخیر وظایف است"""
+        self.client.transcribe('base', {}, audio_path='/x/40_clip.wav')
+        stats = self.client.stats()
+
+        model_stats = stats['models']['base']
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['model_bytes'], 1024 * 1024)
+        self.assertEqual(model_stats['processed'], 1)
+        self.assertGreater(model_stats['latency_ms']['max'], 0)
+
+    def test_unknown_model_is_unavailable(self):
+        """مدل بارگذاری نشده باعث بازگشت به مدل محلی می‌شود"""
+        with self.assertRaises(InferenceUnavailable):
+            self.client.transcribe('large', {}, audio_path='/x/10_clip.wav')
+
+    def test_wrong_authkey_is_rejected(self):
+        """اتصال با کلید نادرست پذیرفته نمی‌شود"""
+        client = InferenceClient(self.address, b'wrong', timeout=1)
+        self.assertFalse(client.ping())
+
+
+class InferenceClientTest(SimpleTestCase):
+    """تست کلاینت بدون سرور"""
+
+    def test_missing_server_is_unavailable(self):
+        client = InferenceClient('/tmp/helssa-missing-stt.sock', AUTHKEY, timeout=1)
+
+        with self.assertRaises(InferenceUnavailable):
+            client.transcribe('base', {}, audio_path='/x/10_clip.wav')
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address('/run/stt.sock'), '/run/stt.sock')
+        self.assertEqual(parse_address('127.0.0.1:7070'), ('127.0.0.1', 7070))